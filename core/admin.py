@@ -244,7 +244,8 @@ class ZipRequestAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'empresa', 'status', 'position_in_queue', 'parte_numero', 'created_at', 'file_size_mb')
     list_filter = ('status', 'empresa', 'created_at', 'parte_numero')
     search_fields = ('user__username', 'user__email', 'empresa__nombre')
-    readonly_fields = ('created_at', 'started_at', 'completed_at', 'file_size_mb', 'current_position', 'estimated_wait_time')
+    readonly_fields = ('created_at', 'started_at', 'completed_at', 'file_size_mb', 'current_position', 'estimated_wait_time',
+                       'worker_id', 'lease_expires_at', 'heartbeat_at', 'attempts')
     ordering = ('-created_at',)
 
     fieldsets = (
@@ -258,6 +259,10 @@ class ZipRequestAdmin(admin.ModelAdmin):
             'fields': ('file_path', 'file_size', 'file_size_mb', 'expires_at'),
             'classes': ('collapse',)
         }),
+        ('Worker', {
+            'fields': ('worker_id', 'lease_expires_at', 'heartbeat_at', 'attempts'),
+            'classes': ('collapse',)
+        }),
         ('Error Info', {
             'fields': ('error_message',),
             'classes': ('collapse',)
@@ -318,6 +323,43 @@ class NotificacionVencimientoAdmin(admin.ModelAdmin):
     ordering = ('-fecha_notificacion',)
 
 
+# Bandeja de salida de emails (core/email_outbox.py)
+from .models import CorreoSaliente
+
+@admin.register(CorreoSaliente)
+class CorreoSalienteAdmin(admin.ModelAdmin):
+    list_display = ('asunto', 'categoria', 'estado', 'intentos', 'creado_en', 'enviado_en')
+    list_filter = ('estado', 'categoria', 'creado_en')
+    search_fields = ('asunto',)
+    readonly_fields = ('creado_en', 'enviado_en', 'worker_id', 'lease_expira', 'ultimo_error')
+    ordering = ('-creado_en',)
+
+
+# Regeneración de PDFs de documentos aprobados (core/regeneracion_pdf.py)
+from .models import RegeneracionPDF
+
+@admin.register(RegeneracionPDF)
+class RegeneracionPDFAdmin(admin.ModelAdmin):
+    list_display = ('tipo', 'objeto_id', 'empresa', 'estado', 'intentos', 'creado_en', 'completado_en')
+    list_filter = ('estado', 'tipo', 'creado_en')
+    search_fields = ('empresa__nombre',)
+    readonly_fields = ('creado_en', 'completado_en', 'worker_id', 'lease_expira', 'ultimo_error')
+    ordering = ('-creado_en',)
+
+
+# Peticiones lentas capturadas por la telemetría (core/telemetria.py)
+from .models import PeticionLenta
+
+@admin.register(PeticionLenta)
+class PeticionLentaAdmin(admin.ModelAdmin):
+    list_display = ('vista', 'duracion_ms', 'num_consultas', 'consultas_ms', 'estado_http', 'empresa_id', 'fecha')
+    list_filter = ('vista', 'fecha')
+    search_fields = ('vista', 'ruta')
+    readonly_fields = ('fecha', 'vista', 'empresa_id', 'ruta', 'metodo', 'estado_http', 'duracion_ms',
+                       'num_consultas', 'consultas_ms', 'consultas')
+    ordering = ('-fecha',)
+
+
 # Admin para Términos y Condiciones
 @admin.register(TerminosYCondiciones)
 class TerminosYCondicionesAdmin(admin.ModelAdmin):
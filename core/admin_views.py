@@ -7,10 +7,12 @@ from django.contrib import messages
 from django.http import JsonResponse, HttpResponse, Http404
 from django.views.decorators.http import require_POST
 from django.utils import timezone
+from datetime import timedelta
 from django.core.paginator import Paginator
 from core.admin_services import AdminService, ScheduleManager
-from core.models import Empresa
+from core.models import Empresa, PeticionLenta
 from core.monitoring import monitor_view
+from core import telemetria
 from core.views.base import superuser_required, access_check
 import json
 import logging
@@ -361,6 +363,12 @@ def system_monitoring(request):
             'system_status': system_status,
             'stats': stats,
             'refresh_interval': 30,  # segundos
+            # Telemetría por vista (core/telemetria.py)
+            'telemetria_vistas': telemetria.resumen_vistas(timezone.now() - timedelta(hours=24))[:20],
+            'regresiones': telemetria.regresiones(),
+            'peticiones_lentas': PeticionLenta.objects.only(
+                'vista', 'duracion_ms', 'num_consultas', 'consultas_ms', 'fecha'
+            )[:10],
         }
 
         return render(request, 'admin/monitoring.html', context)
@@ -645,8 +653,9 @@ def _get_available_backup_files():
         backup_dir = os.path.join(os.getcwd(), 'backups')
 
         if os.path.exists(backup_dir):
-            # Buscar archivos JSON y ZIP
+            # Buscar archivos JSON (anteriores), NDJSON y ZIP
             json_files = glob.glob(os.path.join(backup_dir, '*.json'))
+            json_files += glob.glob(os.path.join(backup_dir, '*.jsonl'))
             zip_files = glob.glob(os.path.join(backup_dir, '*.zip'))
 
             all_files = json_files + zip_files
@@ -716,7 +725,7 @@ def download_backup(request, filename):
             raise Http404("Acceso denegado")
 
         # Verificar que es un archivo de backup válido
-        if not (filename.endswith('.json') or filename.endswith('.zip')):
+        if not filename.endswith(('.json', '.jsonl', '.zip')):
             raise Http404("Tipo de archivo no válido")
 
         # Log de la descarga
@@ -1,19 +1,14 @@
 # core/async_zip_improved.py
 # Sistema asíncrono que mantiene EXACTAMENTE la estructura ZIP existente
 
-import threading
-import time
 import logging
 import os
 import gc
 import tempfile
 import zipfile
-from datetime import datetime, timedelta
-from queue import Queue, Empty
-from django.utils import timezone
+from datetime import datetime
 from django.core.files.storage import default_storage
-from django.db.models import Max
-from .models import ZipRequest, Empresa, Equipo, Proveedor, Procedimiento
+from .models import Equipo, Proveedor, Procedimiento
 from .zip_functions import stream_file_to_zip_local
 from .constants import ESTADO_DE_BAJA
 
@@ -21,157 +16,20 @@ logger = logging.getLogger('core')
 
 class AsyncZipProcessor:
     """
-    Procesador asíncrono que mantiene EXACTAMENTE la misma estructura ZIP
-    pero sin bloquear la aplicación y sin límites de equipos.
-    """
-
-    def __init__(self):
-        self.processing_queue = Queue()
-        self.is_running = False
-        self.current_job = None
-        self.worker_thread = None
-
-    def start_processor(self):
-        """Inicia el procesador en background si no está corriendo"""
-        if not self.is_running:
-            self.is_running = True
-
-            # 🔄 RECUPERAR solicitudes pendientes de la base de datos
-            self._recover_pending_requests()
-
-            self.worker_thread = threading.Thread(
-                target=self._process_queue_worker,
-                daemon=True,
-                name="SAM_ZIP_Processor"
-            )
-            self.worker_thread.start()
-            logger.info("🚀 AsyncZipProcessor iniciado con estructura ZIP original")
-
-    def _recover_pending_requests(self):
-        """Recupera solicitudes pendientes de la DB y las agrega a la cola"""
-        try:
-            from core.models import ZipRequest
-            from django.utils import timezone
-
-            # Buscar solicitudes pendientes o en cola que no hayan expirado
-            pending_requests = ZipRequest.objects.filter(
-                status__in=['pending', 'queued'],
-                expires_at__gt=timezone.now()
-            ).order_by('position_in_queue', 'created_at')
-
-            count = pending_requests.count()
-            if count > 0:
-                logger.info(f"🔄 Recuperando {count} solicitudes pendientes de la base de datos")
-
-                for zip_req in pending_requests:
-                    self.processing_queue.put(zip_req)
-                    logger.info(f"📦 Solicitud recuperada: ID {zip_req.id} - Empresa: {zip_req.empresa.nombre} - Parte {zip_req.parte_numero}/{zip_req.total_partes}")
-
-                logger.info(f"✅ {count} solicitudes recuperadas y agregadas a la cola")
-            else:
-                logger.info("ℹ️ No hay solicitudes pendientes para recuperar")
-
-        except Exception as e:
-            logger.error(f"❌ Error recuperando solicitudes pendientes: {e}", exc_info=True)
-
-    def stop_processor(self):
-        """Detiene el procesador"""
-        self.is_running = False
-        if self.worker_thread:
-            self.worker_thread.join(timeout=5)
-
-    def add_to_queue(self, zip_request):
-        """Agrega una solicitud ZIP a la cola"""
-        try:
-            self.processing_queue.put(zip_request)
-            logger.info(f"📦 Solicitud ZIP agregada a cola: {zip_request.id} - Empresa: {zip_request.empresa.nombre}")
-        except Exception as e:
-            logger.error(f"Error agregando a cola ZIP: {e}")
-
-    def get_queue_status(self):
-        """Obtiene estado de la cola"""
-        return {
-            'queue_size': self.processing_queue.qsize(),
-            'is_running': self.is_running,
-            'current_job': self.current_job.id if self.current_job else None
-        }
-
-    def _process_queue_worker(self):
-        """Worker principal que procesa la cola"""
-        logger.info("🔄 Worker ZIP iniciado")
-
-        while self.is_running:
-            try:
-                # Intentar obtener próxima solicitud (timeout 1 segundo)
-                try:
-                    zip_request = self.processing_queue.get(timeout=1.0)
-                except Empty:
-                    continue
-
-                # Procesar la solicitud
-                self.current_job = zip_request
-                self._process_single_request(zip_request)
-                self.current_job = None
+    Generador de ZIPs en background que mantiene EXACTAMENTE la misma
+    estructura ZIP del sistema original, sin límites de equipos.
 
-                # Marcar como completado en la cola
-                self.processing_queue.task_done()
-
-            except Exception as e:
-                logger.error(f"❌ Error en worker ZIP: {e}")
-                if self.current_job:
-                    self._mark_as_failed(self.current_job, str(e))
-                    self.current_job = None
-
-        logger.info("🛑 Worker ZIP detenido")
-
-    def _process_single_request(self, zip_request):
-        """
-        Procesa una sola solicitud ZIP manteniendo la estructura EXACTA.
-        """
-        try:
-            logger.info(f"🔄 Procesando ZIP para empresa {zip_request.empresa.nombre} - Request ID: {zip_request.id}")
-
-            # Marcar como en proceso
-            zip_request.status = 'processing'
-            zip_request.started_at = timezone.now()
-            zip_request.save()
-
-            # Generar ZIP con la estructura EXACTA
-            result = self._generate_zip_with_original_structure(zip_request)
-
-            if result['success']:
-                # Marcar como completado
-                zip_request.status = 'completed'
-                zip_request.completed_at = timezone.now()
-                zip_request.file_path = result['file_path']
-                zip_request.file_size = result['file_size']
-                zip_request.save()
-
-                logger.info(f"✅ ZIP completado para {zip_request.empresa.nombre} - {result['file_size_mb']}MB")
-
-            else:
-                self._mark_as_failed(zip_request, result['error'])
-
-        except Exception as e:
-            logger.error(f"❌ Error procesando solicitud ZIP {zip_request.id}: {e}")
-            self._mark_as_failed(zip_request, str(e))
-
-    def _mark_as_failed(self, zip_request, error_message):
-        """Marca una solicitud como fallida"""
-        try:
-            zip_request.status = 'failed'
-            zip_request.error_message = error_message
-            zip_request.completed_at = timezone.now()
-            zip_request.save()
-            logger.error(f"❌ ZIP fallido para {zip_request.empresa.nombre}: {error_message}")
-        except Exception as e:
-            logger.error(f"Error marcando como fallido: {e}")
+    La cola y la ejecución viven en core/zip_queue.py (leases sobre
+    ZipRequest); esta clase solo construye y sube el archivo de cada parte.
+    """
 
-    def _generate_zip_with_original_structure(self, zip_request):
+    def _generate_zip_with_original_structure(self, zip_request, progreso=None):
         """
         Genera ZIP con la MISMA estructura exacta que el sistema original.
         Implementa límite de 35 equipos por parte.
         Basado en descarga_directa_rapida() pero optimizado para background.
+
+        ``progreso(procesados, total, codigo_interno)`` se invoca tras cada equipo.
         """
         try:
             empresa = zip_request.empresa
@@ -473,6 +331,9 @@ class AsyncZipProcessor:
                             except Exception as e:
                                 logger.error(f"Error añadiendo documento de baja para {equipo.codigo_interno}: {e}")
 
+                        if progreso:
+                            progreso(idx, num_equipos, equipo.codigo_interno)
+
                         # Liberar memoria cada 10 equipos para evitar overflow
                         if idx % 10 == 0:
                             gc.collect()
@@ -561,20 +422,3 @@ class AsyncZipProcessor:
 # Instancia global del procesador
 async_zip_processor = AsyncZipProcessor()
 
-
-# Funciones de integración con el sistema existente
-def start_async_processor():
-    """Inicia el procesador asíncrono"""
-    async_zip_processor.start_processor()
-
-def stop_async_processor():
-    """Detiene el procesador asíncrono"""
-    async_zip_processor.stop_processor()
-
-def add_zip_request_to_queue(zip_request):
-    """Agrega una solicitud ZIP a la cola asíncrona"""
-    async_zip_processor.add_to_queue(zip_request)
-
-def get_async_queue_status():
-    """Obtiene estado de la cola asíncrona"""
-    return async_zip_processor.get_queue_status()
\ No newline at end of file
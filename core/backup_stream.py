@@ -0,0 +1,362 @@
+# core/backup_stream.py
+# Backup por empresa en streaming: NDJSON por modelo, archivos en paralelo y modo incremental
+
+import hashlib
+import json
+import logging
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core import serializers
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+logger = logging.getLogger('core')
+
+VERSION_FORMATO = '2.0'
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_WORKERS_ARCHIVOS = 8
+DEFAULT_RUTA_MANIFIESTOS = 'backups/manifiestos/'
+
+# (sección, modelo, filtro por empresa) en orden de restauración
+SECCIONES = (
+    ('empresa', 'Empresa', 'pk'),
+    ('usuarios', 'CustomUser', 'empresa'),
+    ('equipos', 'Equipo', 'empresa'),
+    ('calibraciones', 'Calibracion', 'equipo__empresa'),
+    ('mantenimientos', 'Mantenimiento', 'equipo__empresa'),
+    ('comprobaciones', 'Comprobacion', 'equipo__empresa'),
+)
+
+# Adjuntos incluidos con --include-files, por sección
+ARCHIVOS_POR_SECCION = {
+    'empresa': ('logo_empresa',),
+    'equipos': ('archivo_compra_pdf', 'ficha_tecnica_pdf', 'manual_pdf', 'otros_documentos_pdf', 'imagen_equipo'),
+    'calibraciones': ('documento_calibracion', 'confirmacion_metrologica_pdf', 'intervalos_calibracion_pdf'),
+    'mantenimientos': ('documento_mantenimiento',),
+    'comprobaciones': ('documento_comprobacion',),
+}
+
+_PREFETCH = {
+    'usuarios': ('groups', 'user_permissions'),
+}
+
+
+def _config():
+    return getattr(settings, 'BACKUP_CONFIG', {})
+
+
+def chunk_size():
+    return int(_config().get('CHUNK_SIZE', DEFAULT_CHUNK_SIZE))
+
+
+def workers_archivos():
+    return max(1, int(_config().get('WORKERS_ARCHIVOS', DEFAULT_WORKERS_ARCHIVOS)))
+
+
+def _queryset(seccion, modelo, filtro, empresa):
+    from django.apps import apps
+
+    queryset = apps.get_model('core', modelo)._default_manager.filter(**{filtro: empresa.pk}).order_by('pk')
+    if seccion in _PREFETCH:
+        queryset = queryset.prefetch_related(*_PREFETCH[seccion])
+    return queryset
+
+
+def _filas(queryset):
+    """Genera los objetos serializados (dict ``model/pk/fields``) por chunks."""
+    serializador = serializers.get_serializer('python')()
+    tamano = chunk_size()
+    lote = []
+    for objeto in queryset.iterator(chunk_size=tamano):
+        lote.append(objeto)
+        if len(lote) >= tamano:
+            yield from serializador.serialize(lote)
+            lote = []
+    if lote:
+        yield from serializador.serialize(lote)
+
+
+def _linea(objeto):
+    return json.dumps(objeto, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _hash(linea):
+    return hashlib.blake2b(linea.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _rutas_archivos(seccion, objeto, codigos_equipo):
+    """(ruta en el ZIP, ruta en el storage) de los adjuntos de una fila."""
+    campos = objeto['fields']
+    for campo in ARCHIVOS_POR_SECCION.get(seccion, ()):
+        nombre = campos.get(campo)
+        if not nombre:
+            continue
+        base = os.path.basename(nombre)
+        if seccion == 'empresa':
+            yield f'files/empresa/logo_{nombre}', nombre
+        elif seccion == 'equipos':
+            yield f'files/equipos/{campos["codigo_interno"]}/{campo}/{base}', nombre
+        else:
+            codigo = codigos_equipo.get(campos['equipo'], campos['equipo'])
+            yield f'files/equipos/{codigo}/{seccion}/{objeto["pk"]}/{base}', nombre
+
+
+# =============================================================================
+# Manifiestos
+# =============================================================================
+
+def ruta_manifiesto(empresa_id):
+    ruta = _config().get('RUTA_MANIFIESTOS', DEFAULT_RUTA_MANIFIESTOS)
+    return f"{ruta.rstrip('/')}/empresa_{empresa_id}.json"
+
+
+def cargar_manifiesto(empresa_id):
+    """Manifiesto del último backup de la empresa, o None si no hay."""
+    ruta = ruta_manifiesto(empresa_id)
+    try:
+        if not default_storage.exists(ruta):
+            return None
+        with default_storage.open(ruta, 'rb') as archivo:
+            return json.loads(archivo.read().decode('utf-8'))
+    except Exception as e:
+        logger.warning(f'No se pudo leer el manifiesto {ruta}: {e}')
+        return None
+
+
+def guardar_manifiesto(empresa_id, manifiesto):
+    """Reemplaza el manifiesto de la empresa; llamar solo tras un backup exitoso."""
+    ruta = ruta_manifiesto(empresa_id)
+    if default_storage.exists(ruta):
+        default_storage.delete(ruta)
+    default_storage.save(ruta, ContentFile(json.dumps(manifiesto).encode('utf-8')))
+
+
+# =============================================================================
+# Adjuntos
+# =============================================================================
+
+def _leer_archivo(ruta_storage):
+    try:
+        with default_storage.open(ruta_storage, 'rb') as archivo:
+            return archivo.read()
+    except Exception as e:
+        logger.warning(f'No se pudo leer el adjunto {ruta_storage}: {e}')
+        return None
+
+
+def leer_en_paralelo(rutas, workers=None):
+    """
+    Lee ``(ruta_zip, ruta_storage)`` con un pool de hilos y genera
+    ``(ruta_zip, contenido)`` en el mismo orden. El contenido es None si el
+    archivo no existe o no se pudo leer.
+
+    Como mucho ``2 * workers`` archivos están en vuelo o esperando a ser
+    escritos, así que la memoria no depende del número de adjuntos.
+    """
+    workers = workers or workers_archivos()
+    en_vuelo = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='SAM_Backup') as executor:
+        for ruta_zip, ruta_storage in rutas:
+            en_vuelo.append((ruta_zip, executor.submit(_leer_archivo, ruta_storage)))
+            if len(en_vuelo) >= 2 * workers:
+                ruta, futuro = en_vuelo.popleft()
+                yield ruta, futuro.result()
+        while en_vuelo:
+            ruta, futuro = en_vuelo.popleft()
+            yield ruta, futuro.result()
+
+
+# =============================================================================
+# Escritura
+# =============================================================================
+
+def escribir_backup(empresa, ruta_jsonl=None, ruta_zip=None, incluir_archivos=False,
+                    incremental=False, workers=None):
+    """
+    Escribe el backup de ``empresa`` en una sola pasada por la BD.
+
+    Args:
+        ruta_jsonl: archivo NDJSON suelto (metadata en la primera línea)
+        ruta_zip: ZIP con ``data/<seccion>.jsonl``, adjuntos y ``backup_info.json``
+        incremental: solo filas cambiadas desde el manifiesto anterior
+
+    Returns:
+        dict: ``tipo``, ``conteos``, ``eliminados``, ``archivos`` y el
+        ``manifiesto`` nuevo (guardarlo con ``guardar_manifiesto`` cuando el
+        backup quede a salvo)
+    """
+    anterior = cargar_manifiesto(empresa.pk) if incremental else None
+    tipo = 'incremental' if anterior else 'completo'
+    ahora = timezone.now().isoformat()
+    metadata = {
+        'empresa_id': empresa.pk,
+        'empresa_nombre': empresa.nombre,
+        'backup_date': ahora,
+        'version': VERSION_FORMATO,
+        'tipo': tipo,
+        'base': anterior['backup_date'] if anterior else None,
+    }
+
+    conteos, eliminados, hashes = {}, {}, {}
+    codigos_equipo = {}
+    archivos = {}
+
+    salida_jsonl = open(ruta_jsonl, 'w', encoding='utf-8') if ruta_jsonl else None
+    zipf = zipfile.ZipFile(ruta_zip, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) if ruta_zip else None
+    try:
+        if salida_jsonl:
+            salida_jsonl.write(_linea({'metadata': metadata}))
+
+        for seccion, modelo, filtro in SECCIONES:
+            previos = (anterior or {}).get('filas', {}).get(seccion, {})
+            hashes[seccion] = {}
+            conteos[seccion] = 0
+            entrada = zipf.open(f'data/{seccion}.jsonl', 'w', force_zip64=True) if zipf else None
+            try:
+                for objeto in _filas(_queryset(seccion, modelo, filtro, empresa)):
+                    if seccion == 'equipos':
+                        codigos_equipo[objeto['pk']] = objeto['fields']['codigo_interno']
+                    linea = _linea(objeto)
+                    clave = str(objeto['pk'])
+                    hashes[seccion][clave] = _hash(linea)
+                    if anterior and previos.get(clave) == hashes[seccion][clave]:
+                        continue
+
+                    conteos[seccion] += 1
+                    if entrada:
+                        entrada.write(linea.encode('utf-8'))
+                    if salida_jsonl:
+                        salida_jsonl.write(linea)
+                    if incluir_archivos and zipf:
+                        archivos.update(_rutas_archivos(seccion, objeto, codigos_equipo))
+            finally:
+                if entrada:
+                    entrada.close()
+            if anterior:
+                eliminados[seccion] = sorted(set(previos) - set(hashes[seccion]), key=int)
+
+        if salida_jsonl and anterior:
+            salida_jsonl.write(_linea({'eliminados': eliminados}))
+
+        agregados = 0
+        if archivos:
+            for ruta, contenido in leer_en_paralelo(archivos.items(), workers):
+                if contenido is not None:
+                    zipf.writestr(ruta, contenido)
+                    agregados += 1
+
+        if zipf:
+            info = {
+                'empresa': empresa.nombre,
+                'fecha_backup': ahora,
+                'incluye_archivos': incluir_archivos,
+                'version': VERSION_FORMATO,
+                'metadata': metadata,
+                'conteos': conteos,
+                'eliminados': eliminados,
+                'archivos': agregados,
+            }
+            zipf.writestr('backup_info.json', json.dumps(info, ensure_ascii=False, indent=2))
+    finally:
+        if salida_jsonl:
+            salida_jsonl.close()
+        if zipf:
+            zipf.close()
+
+    return {
+        'tipo': tipo,
+        'conteos': conteos,
+        'eliminados': eliminados,
+        'archivos': agregados,
+        'manifiesto': {'version': 1, 'empresa_id': empresa.pk, 'backup_date': ahora, 'filas': hashes},
+    }
+
+
+# =============================================================================
+# Lectura (restore_backup)
+# =============================================================================
+
+def _seccion_de_modelo():
+    from django.apps import apps
+
+    return {apps.get_model('core', modelo)._meta.label_lower: seccion for seccion, modelo, _ in SECCIONES}
+
+
+def _agregar(datos, seccion, objeto):
+    if seccion == 'empresa':
+        datos['empresa'] = objeto
+    else:
+        datos.setdefault(seccion, []).append(objeto)
+
+
+def _datos_vacios(metadata):
+    datos = {seccion: [] for seccion, _, _ in SECCIONES if seccion != 'empresa'}
+    datos.update({'metadata': metadata, 'empresa': None, 'eliminados': {}})
+    return datos
+
+
+def leer_jsonl(ruta):
+    """Carga un ``.jsonl`` de ``escribir_backup`` con la estructura de los backups JSON."""
+    secciones = _seccion_de_modelo()
+    datos = None
+    with open(ruta, 'r', encoding='utf-8') as archivo:
+        for linea in archivo:
+            if not linea.strip():
+                continue
+            objeto = json.loads(linea)
+            if 'metadata' in objeto:
+                datos = _datos_vacios(objeto['metadata'])
+            elif 'eliminados' in objeto:
+                datos['eliminados'] = objeto['eliminados']
+            else:
+                _agregar(datos, secciones[objeto['model']], objeto)
+    return datos
+
+
+def leer_zip(ruta):
+    """Carga un ZIP de backup; acepta el ``data.json`` de la versión anterior."""
+    with zipfile.ZipFile(ruta, 'r') as zipf:
+        nombres = set(zipf.namelist())
+        if 'data.json' in nombres:
+            return json.loads(zipf.read('data.json').decode('utf-8'))
+
+        info = json.loads(zipf.read('backup_info.json').decode('utf-8'))
+        datos = _datos_vacios(info['metadata'])
+        datos['eliminados'] = info.get('eliminados', {})
+        for seccion, _, _ in SECCIONES:
+            nombre = f'data/{seccion}.jsonl'
+            if nombre not in nombres:
+                continue
+            with zipf.open(nombre) as entrada:
+                for linea in entrada:
+                    if linea.strip():
+                        _agregar(datos, seccion, json.loads(linea))
+        return datos
+
+
+def aplicar_incremental(datos, incremental):
+    """
+    Aplica un backup incremental sobre los datos de un completo (o de un
+    incremental ya aplicado): reemplaza filas por pk y quita las eliminadas.
+    """
+    if incremental.get('metadata', {}).get('empresa_id') != datos.get('metadata', {}).get('empresa_id'):
+        raise ValueError('El backup incremental es de otra empresa')
+
+    if incremental.get('empresa'):
+        datos['empresa'] = incremental['empresa']
+    for seccion, _, _ in SECCIONES:
+        if seccion == 'empresa':
+            continue
+        eliminados = {str(pk) for pk in incremental.get('eliminados', {}).get(seccion, [])}
+        filas = {str(fila['pk']): fila for fila in datos.get(seccion, []) if str(fila['pk']) not in eliminados}
+        for fila in incremental.get(seccion, []):
+            filas[str(fila['pk'])] = fila
+        datos[seccion] = sorted(filas.values(), key=lambda fila: fila['pk'])
+    datos['metadata'] = dict(datos.get('metadata', {}), backup_date=incremental['metadata']['backup_date'])
+    return datos
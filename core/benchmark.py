@@ -0,0 +1,402 @@
+# core/benchmark.py
+# Benchmarks reproducibles de los caminos críticos con empresas sintéticas
+
+import gc
+import io
+import logging
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+logger = logging.getLogger('core')
+
+PREFIJO_EMPRESA = 'BENCH'
+FILAS_IMPORTACION = 200
+MAX_EQUIPOS_ZIP = 500
+LOTE = 2000
+
+TIPOS_EQUIPO = ('Equipo de Medición', 'Equipo de Referencia', 'Equipo Auxiliar')
+MARCAS = ('Mettler Toledo', 'Sartorius', 'Fluke', 'Testo', 'Mitutoyo', 'Ohaus', 'Kern')
+NOMBRES = ('Balanza', 'Termómetro', 'Higrómetro', 'Manómetro', 'Multímetro', 'Calibrador', 'Pie de rey')
+UBICACIONES = ('Laboratorio Principal', 'Área de Producción', 'Bodega', 'Sala de Calidad', 'Planta 1')
+
+
+def rss_pico_mb():
+    """RSS pico del proceso en MB (None donde ``resource`` no existe, p. ej. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB; macOS, bytes
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+# =============================================================================
+# DATASET SINTÉTICO
+# =============================================================================
+
+def _datos_confirmacion(rnd):
+    puntos = []
+    for nominal in (10, 50, 100, 200, 500):
+        error = round(rnd.uniform(-0.4, 0.4), 3)
+        puntos.append({
+            'nominal': nominal, 'lectura': round(nominal + error, 3), 'error': error,
+            'incertidumbre': round(rnd.uniform(0.05, 0.2), 3),
+        })
+    return {'puntos_medicion': puntos, 'emp': '0.5', 'emp_unidad': 'g', 'unidad_equipo': 'g'}
+
+
+def _fechas_historial(rnd, desde, hasta, meses):
+    fecha = desde + timedelta(days=rnd.randint(0, 30 * meses))
+    while fecha <= hasta:
+        yield fecha
+        fecha += timedelta(days=int(30.4 * meses) + rnd.randint(-10, 10))
+
+
+def crear_empresa_sintetica(equipos=100, anios=3, semilla=None):
+    """
+    Crea una empresa de ``equipos`` equipos con ``anios`` de actividades.
+
+    Returns:
+        tuple: (empresa, usuario administrador)
+    """
+    from .busqueda_equipos import construir_texto_busqueda
+    from .models import Calibracion, Comprobacion, CustomUser, Empresa, Equipo, Mantenimiento
+
+    rnd = random.Random(equipos if semilla is None else semilla)
+    hoy = date.today()
+    inicio = hoy - timedelta(days=365 * anios)
+    marca = f"{PREFIJO_EMPRESA}-{equipos}-{int(time.time())}"
+
+    empresa = Empresa.objects.create(
+        nombre=f"{PREFIJO_EMPRESA} {equipos} equipos ({marca})", nit=marca,
+        email=f"{marca.lower()}@benchmark.local", limite_equipos_empresa=equipos * 2 + FILAS_IMPORTACION * 10,
+    )
+    usuario = CustomUser.objects.create_user(
+        username=marca.lower(), password=None, empresa=empresa,
+        rol_usuario='ADMINISTRADOR', is_management_user=True,
+    )
+
+    nuevos = []
+    for n in range(equipos):
+        equipo = Equipo(
+            empresa=empresa, codigo_interno=f"EQ-{n:05d}", nombre=f"{rnd.choice(NOMBRES)} {n}",
+            tipo_equipo=rnd.choice(TIPOS_EQUIPO), marca=rnd.choice(MARCAS), modelo=f"M-{rnd.randint(100, 999)}",
+            numero_serie=f"SN-{rnd.randint(10 ** 7, 10 ** 8 - 1)}", ubicacion=rnd.choice(UBICACIONES),
+            responsable=f"Responsable {n % 25}", estado='Activo', fecha_adquisicion=inicio,
+            frecuencia_calibracion_meses=Decimal('12'), frecuencia_mantenimiento_meses=Decimal('6'),
+            frecuencia_comprobacion_meses=Decimal('6'),
+            proxima_calibracion=hoy + timedelta(days=rnd.randint(-60, 365)),
+            proximo_mantenimiento=hoy + timedelta(days=rnd.randint(-30, 180)),
+            proxima_comprobacion=hoy + timedelta(days=rnd.randint(-30, 180)),
+        )
+        equipo.texto_busqueda = construir_texto_busqueda(equipo)
+        nuevos.append(equipo)
+    Equipo.objects.bulk_create(nuevos, batch_size=LOTE)
+    ids = list(Equipo.objects.filter(empresa=empresa).order_by('id').values_list('id', flat=True))
+
+    pendientes = {Calibracion: [], Mantenimiento: [], Comprobacion: []}
+    totales = dict.fromkeys(pendientes, 0)
+
+    def _guardar(forzar=False):
+        for modelo, filas in pendientes.items():
+            if filas and (forzar or len(filas) >= LOTE):
+                modelo.objects.bulk_create(filas, batch_size=LOTE)
+                totales[modelo] += len(filas)
+                filas.clear()
+
+    for equipo_id in ids:
+        for fecha in _fechas_historial(rnd, inicio, hoy, 12):
+            pendientes[Calibracion].append(Calibracion(
+                equipo_id=equipo_id, fecha_calibracion=fecha, nombre_proveedor='Metrolab',
+                resultado='Aprobado' if rnd.random() > 0.1 else 'No Aprobado',
+                numero_certificado=f"C-{equipo_id}-{fecha:%Y%m}", costo_calibracion=Decimal(rnd.randint(80, 400)),
+                confirmacion_metrologica_datos=_datos_confirmacion(rnd),
+            ))
+        for fecha in _fechas_historial(rnd, inicio, hoy, 6):
+            pendientes[Mantenimiento].append(Mantenimiento(
+                equipo_id=equipo_id, fecha_mantenimiento=fecha, tipo_mantenimiento='Preventivo',
+                costo=Decimal(rnd.randint(20, 150)),
+            ))
+        for fecha in _fechas_historial(rnd, inicio, hoy, 6):
+            pendientes[Comprobacion].append(Comprobacion(
+                equipo_id=equipo_id, fecha_comprobacion=fecha, resultado='Aprobado',
+            ))
+        _guardar()
+    _guardar(forzar=True)
+
+    logger.info(
+        f"Benchmark: empresa {empresa.pk} con {equipos} equipos, {totales[Calibracion]} calibraciones, "
+        f"{totales[Mantenimiento]} mantenimientos y {totales[Comprobacion]} comprobaciones"
+    )
+    return empresa, usuario
+
+
+def eliminar_empresa_sintetica(empresa):
+    from .models import CustomUser, Empresa
+
+    CustomUser.objects.filter(empresa_id=empresa.pk).delete()
+    Empresa.objects.filter(pk=empresa.pk).delete()
+
+
+# =============================================================================
+# ESCENARIOS
+# =============================================================================
+
+def _host():
+    permitidos = settings.ALLOWED_HOSTS
+    for host in ('testserver', 'localhost', '127.0.0.1'):
+        if host in permitidos or '*' in permitidos:
+            return host
+    return permitidos[0].lstrip('.') if permitidos else 'localhost'
+
+
+def _cliente(usuario):
+    from django.test import Client
+
+    cliente = Client(HTTP_HOST=_host())
+    cliente.force_login(usuario)
+    return cliente
+
+
+def _get(contexto, nombre_url, params=None, args=None):
+    from django.urls import reverse
+
+    def ejecutar():
+        respuesta = contexto['cliente'].get(reverse(nombre_url, args=args), params or {}, secure=True)
+        if respuesta.status_code != 200:
+            raise RuntimeError(f"{nombre_url} respondió {respuesta.status_code}")
+        if getattr(respuesta, 'streaming', False):
+            for _ in respuesta.streaming_content:
+                pass
+        return respuesta
+    return ejecutar
+
+
+def _escenario_dashboard(contexto):
+    return _get(contexto, 'core:dashboard')
+
+
+def _escenario_panel_decisiones(contexto):
+    return _get(contexto, 'core:panel_decisiones')
+
+
+def _escenario_recalcular_stats(contexto):
+    return contexto['empresa'].recalcular_stats_dashboard
+
+
+def _escenario_calendario(contexto):
+    hoy = date.today()
+    return _get(contexto, 'core:calendario_eventos_api', {
+        'start': hoy.replace(day=1).isoformat(), 'end': (hoy.replace(day=1) + timedelta(days=42)).isoformat(),
+    })
+
+
+def _escenario_importacion(contexto):
+    from openpyxl import Workbook
+    from .views.reports import _process_excel_import
+
+    contexto['importaciones'] = contexto.get('importaciones', 0) + 1
+    lote = contexto['importaciones']
+    libro = Workbook()
+    hoja = libro.active
+    # Columnas de la plantilla de importación (fila 8 en adelante)
+    for fila in range(FILAS_IMPORTACION):
+        valores = {
+            1: f"IMP-{lote}-{fila:04d}", 2: f"Equipo importado {fila}", 3: contexto['empresa'].nombre,
+            4: 'Equipo de Medición', 5: MARCAS[fila % len(MARCAS)], 10: 'Activo',
+            13: (date.today() - timedelta(days=fila % 300)).isoformat(), 21: 12, 22: 6, 23: 6,
+        }
+        for columna, valor in valores.items():
+            hoja.cell(row=8 + fila, column=columna, value=valor)
+    archivo = io.BytesIO()
+    libro.save(archivo)
+
+    def ejecutar():
+        archivo.seek(0)
+        resultado = _process_excel_import(archivo, contexto['usuario'])
+        if not resultado.get('success'):
+            raise RuntimeError(f"importación falló: {resultado.get('errors') or resultado}")
+        return resultado
+    return ejecutar
+
+
+def _escenario_hoja_vida(contexto):
+    from .pdf_cache import renovar_version_contenido
+
+    # Sello nuevo: se mide el render, no la lectura de la caché de PDF
+    renovar_version_contenido(equipo_ids=[contexto['equipo_id']])
+    return _get(contexto, 'core:generar_hoja_vida_pdf', args=[contexto['equipo_id']])
+
+
+def _escenario_zip(contexto):
+    import os
+    from .zip_optimizer import generate_optimized_zip
+
+    if contexto['equipos'] > contexto.get('max_equipos_zip', MAX_EQUIPOS_ZIP):
+        raise EscenarioOmitido(f"más de {contexto.get('max_equipos_zip', MAX_EQUIPOS_ZIP)} equipos")
+
+    def ejecutar():
+        resultado = generate_optimized_zip(contexto['empresa'], ['hoja_vida'], contexto['usuario'])
+        if not isinstance(resultado, dict) or not resultado.get('success'):
+            raise RuntimeError(f"ZIP falló: {resultado}")
+        ruta = resultado.get('file_path')
+        if ruta and os.path.exists(ruta):
+            os.remove(ruta)
+        return resultado
+    return ejecutar
+
+
+class EscenarioOmitido(Exception):
+    """El escenario no aplica al tamaño o al entorno actual."""
+
+
+ESCENARIOS = {
+    'dashboard': _escenario_dashboard,
+    'panel_decisiones': _escenario_panel_decisiones,
+    'recalcular_stats_dashboard': _escenario_recalcular_stats,
+    'importacion_excel': _escenario_importacion,
+    'hoja_de_vida': _escenario_hoja_vida,
+    'zip': _escenario_zip,
+    'calendario_eventos_api': _escenario_calendario,
+}
+
+
+def preparar_contexto(empresa, usuario, **extra):
+    from .models import Equipo
+
+    contexto = {
+        'empresa': empresa, 'usuario': usuario, 'cliente': _cliente(usuario),
+        'equipos': Equipo.objects.filter(empresa=empresa).count(),
+        'equipo_id': Equipo.objects.filter(empresa=empresa).order_by('id').values_list('id', flat=True).first(),
+    }
+    contexto.update(extra)
+    return contexto
+
+
+def _ejecutar_una_vez(preparar, contexto):
+    ejecutar = preparar(contexto)
+    gc.collect()
+    with CaptureQueriesContext(connection) as consultas:
+        inicio = time.perf_counter()
+        ejecutar()
+        duracion = (time.perf_counter() - inicio) * 1000
+    return duracion, len(consultas.captured_queries)
+
+
+def medir(nombre, contexto, repeticiones=3):
+    """
+    Mide un escenario.
+
+    Returns:
+        dict: primera_ms, mediana_ms, min_ms, max_ms, consultas, memoria_pico_mb
+        (o ``omitido`` / ``error`` con el motivo).
+    """
+    preparar = ESCENARIOS[nombre]
+    tiempos, consultas = [], []
+    try:
+        for _ in range(max(1, repeticiones)):
+            duracion, n = _ejecutar_una_vez(preparar, contexto)
+            tiempos.append(duracion)
+            consultas.append(n)
+
+        # Memoria en una ejecución aparte: tracemalloc distorsiona los tiempos
+        tracemalloc.start()
+        try:
+            _ejecutar_una_vez(preparar, contexto)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    except EscenarioOmitido as e:
+        return {'omitido': str(e)}
+    except Exception as e:
+        logger.warning(f"Benchmark {nombre}: {e}")
+        return {'error': str(e)[:500]}
+
+    return {
+        'primera_ms': round(tiempos[0], 1),
+        'mediana_ms': round(statistics.median(tiempos), 1),
+        'min_ms': round(min(tiempos), 1),
+        'max_ms': round(max(tiempos), 1),
+        'consultas': max(consultas),
+        'memoria_pico_mb': round(pico / (1024 * 1024), 2),
+    }
+
+
+def ejecutar_suite(tamanos=(100,), anios=3, escenarios=None, repeticiones=3, semilla=None, conservar=False,
+                   max_equipos_zip=MAX_EQUIPOS_ZIP, salida=None):
+    """
+    Crea una empresa por tamaño, mide los escenarios y (salvo ``conservar``)
+    elimina los datos.
+
+    Returns:
+        dict: resultado serializable a JSON; ``resultados`` usa claves
+        ``"<escenario>@<equipos>"``.
+    """
+    escenarios = list(escenarios or ESCENARIOS)
+    resultado = {
+        'fecha': timezone.now().isoformat(),
+        'entorno': {
+            'python': platform.python_version(),
+            'base_de_datos': connection.vendor,
+            'plataforma': platform.platform(),
+        },
+        'parametros': {'tamanos': list(tamanos), 'anios': anios, 'repeticiones': repeticiones},
+        'resultados': {},
+    }
+
+    for tamano in tamanos:
+        inicio = time.perf_counter()
+        empresa, usuario = crear_empresa_sintetica(tamano, anios, semilla)
+        if salida:
+            salida(f"Empresa sintética de {tamano} equipos creada en {time.perf_counter() - inicio:.1f}s")
+        try:
+            contexto = preparar_contexto(empresa, usuario, max_equipos_zip=max_equipos_zip)
+            for nombre in escenarios:
+                medicion = medir(nombre, contexto, repeticiones)
+                resultado['resultados'][f"{nombre}@{tamano}"] = medicion
+                if salida:
+                    salida(f"  {nombre}@{tamano}: {medicion}")
+        finally:
+            if not conservar:
+                eliminar_empresa_sintetica(empresa)
+
+    resultado['rss_pico_mb'] = rss_pico_mb()
+    return resultado
+
+
+def comparar(resultado, base, tolerancia=0.25):
+    """
+    Regresiones de ``resultado`` frente a la línea base ``base``: mediana más
+    de ``tolerancia`` por encima o más consultas que antes.
+
+    Returns:
+        list[dict]
+    """
+    regresiones = []
+    for clave, actual in resultado.get('resultados', {}).items():
+        anterior = base.get('resultados', {}).get(clave)
+        if not anterior or 'mediana_ms' not in actual or 'mediana_ms' not in anterior:
+            continue
+        if actual['mediana_ms'] > anterior['mediana_ms'] * (1 + tolerancia):
+            regresiones.append({
+                'escenario': clave, 'metrica': 'mediana_ms',
+                'antes': anterior['mediana_ms'], 'ahora': actual['mediana_ms'],
+            })
+        if actual['consultas'] > anterior['consultas']:
+            regresiones.append({
+                'escenario': clave, 'metrica': 'consultas',
+                'antes': anterior['consultas'], 'ahora': actual['consultas'],
+            })
+    return regresiones
@@ -0,0 +1,285 @@
+# core/busqueda_equipos.py
+# Búsqueda indexada y paginación por cursor (keyset) del listado de equipos
+
+import base64
+import json
+import operator
+import unicodedata
+from datetime import date
+from functools import reduce
+
+from django.conf import settings
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils.http import urlencode
+
+CAMPOS_BUSQUEDA = ('codigo_interno', 'nombre', 'marca', 'modelo', 'numero_serie', 'responsable', 'ubicacion')
+MAX_PALABRAS = 8
+
+DEFAULT_CONTEO = 'aproximado'
+DEFAULT_TOPE_CONTEO = 1000
+
+# Órdenes keyset: (campo, descendente, admite_nulos). Los nulos van al final.
+ORDEN_CODIGO = (('codigo_interno', False, False), ('id', False, False))
+ORDEN_RELEVANCIA = (('relevancia', True, False),) + ORDEN_CODIGO
+ORDENES_FECHA = {
+    'calibracion': (('proxima_calibracion', False, True), ('id', False, False)),
+    'mantenimiento': (('proximo_mantenimiento', False, True), ('id', False, False)),
+    'comprobacion': (('proxima_comprobacion', False, True), ('id', False, False)),
+}
+
+
+def _config():
+    return getattr(settings, 'BUSQUEDA_EQUIPOS_CONFIG', {})
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes y con espacios simples."""
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+def construir_texto_busqueda(equipo):
+    """Valor de ``Equipo.texto_busqueda`` para la instancia (sin consultas)."""
+    return ' '.join(filter(None, (normalizar(getattr(equipo, campo)) for campo in CAMPOS_BUSQUEDA)))
+
+
+def palabras(query):
+    return normalizar(query).split()[:MAX_PALABRAS]
+
+
+def filtrar(queryset, query):
+    """Equipos cuyo texto de búsqueda contiene todas las palabras de ``query``."""
+    for palabra in palabras(query):
+        queryset = queryset.filter(texto_busqueda__contains=palabra)
+    return queryset
+
+
+def anotar_relevancia(queryset, query):
+    query = query.strip()
+    return queryset.annotate(relevancia=Case(
+        When(codigo_interno__iexact=query, then=Value(3)),
+        When(codigo_interno__istartswith=query, then=Value(2)),
+        When(nombre__istartswith=query, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    ))
+
+
+# =============================================================================
+# PAGINACIÓN KEYSET
+# =============================================================================
+
+def _expresiones_orden(orden, hacia_atras):
+    expresiones = []
+    for campo, descendente, nulos in orden:
+        ascendente = descendente if hacia_atras else not descendente
+        if ascendente:
+            expresiones.append(F(campo).asc(nulls_last=True) if nulos else F(campo).asc())
+        else:
+            # Al recorrer hacia atrás los nulos (últimos) quedan primero
+            expresiones.append(F(campo).desc(nulls_first=True) if nulos else F(campo).desc())
+    return expresiones
+
+
+def _filtro_cursor(orden, valores, hacia_atras):
+    """
+    Filas posteriores (o anteriores, ``hacia_atras``) a ``valores`` según el
+    orden: (a > a0) OR (a = a0 AND b > b0) OR ...
+    """
+    partes = []
+    iguales = Q()
+    for (campo, descendente, nulos), valor in zip(orden, valores):
+        mayor_es_despues = descendente == hacia_atras
+        if valor is None:
+            # Los nulos van al final: nada va después; antes va todo lo no nulo
+            despues = None if not hacia_atras else Q(**{f'{campo}__isnull': False})
+            igual = Q(**{f'{campo}__isnull': True})
+        else:
+            despues = Q(**{f"{campo}__{'gt' if mayor_es_despues else 'lt'}": valor})
+            if nulos and not hacia_atras:
+                despues |= Q(**{f'{campo}__isnull': True})
+            igual = Q(**{campo: valor})
+        if despues is not None:
+            partes.append(iguales & despues)
+        iguales &= igual
+    return reduce(operator.or_, partes) if partes else Q(pk__in=[])
+
+
+def _a_json(valor):
+    return {'d': valor.isoformat()} if isinstance(valor, date) else valor
+
+
+def _desde_json(valor):
+    return date.fromisoformat(valor['d']) if isinstance(valor, dict) else valor
+
+
+def codificar_cursor(valores, inicio, hacia_atras=False):
+    datos = {'v': [_a_json(v) for v in valores], 'n': inicio, 'a': int(hacia_atras)}
+    return base64.urlsafe_b64encode(json.dumps(datos, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, orden):
+    """
+    Returns:
+        tuple: (valores | None, inicio, hacia_atras). Un cursor inválido o de
+        otro orden vuelve a la primera página.
+    """
+    if not cursor:
+        return None, 0, False
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        valores = [_desde_json(v) for v in datos['v']]
+        inicio = max(0, int(datos['n']))
+        if len(valores) != len(orden):
+            raise ValueError('cursor de otro orden')
+        return valores, inicio, bool(datos.get('a'))
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None, 0, False
+
+
+class PaginaKeyset:
+    """
+    Página de resultados con la interfaz que usan las plantillas
+    (iterable, ``has_next``/``has_previous``, ``start_index``/``end_index``)
+    y los querystrings de la página siguiente/anterior.
+    """
+
+    def __init__(self, objetos, inicio, tamano, cursor_siguiente, cursor_anterior, params, conteo=None,
+                 conteo_exacto=True):
+        self.object_list = objetos
+        self.inicio = inicio
+        self.tamano = tamano
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+        self.params = params
+        self.count = conteo
+        self.count_exacto = conteo_exacto
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, indice):
+        return self.object_list[indice]
+
+    @property
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    @property
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @property
+    def number(self):
+        return self.inicio // self.tamano + 1 if self.tamano else 1
+
+    def start_index(self):
+        return self.inicio + 1 if self.object_list else 0
+
+    def end_index(self):
+        return self.inicio + len(self.object_list)
+
+    def _query(self, cursor):
+        params = [(k, v) for k, v in self.params if k not in ('cursor', 'page')]
+        if cursor:
+            params.append(('cursor', cursor))
+        return urlencode(params)
+
+    @property
+    def query_siguiente(self):
+        return self._query(self.cursor_siguiente)
+
+    @property
+    def query_anterior(self):
+        return self._query(self.cursor_anterior)
+
+    @property
+    def query_primera(self):
+        return self._query(None)
+
+
+def contar(queryset, modo=None, tope=None):
+    """
+    Returns:
+        tuple: (conteo | None, exacto)
+    """
+    modo = modo or _config().get('CONTEO', DEFAULT_CONTEO)
+    if modo == 'ninguno':
+        return None, False
+    if modo == 'exacto':
+        return queryset.count(), True
+    tope = tope or int(_config().get('TOPE_CONTEO', DEFAULT_TOPE_CONTEO))
+    conteo = queryset.order_by()[:tope + 1].count()
+    return min(conteo, tope), conteo <= tope
+
+
+def paginar(queryset, orden, tamano, cursor=None, params=()):
+    """
+    Una página de ``queryset`` según ``orden`` a partir de ``cursor``:
+    una consulta de ``tamano + 1`` filas más el conteo (acotado).
+
+    Returns:
+        PaginaKeyset
+    """
+    valores, inicio, hacia_atras = decodificar_cursor(cursor, orden)
+
+    pagina_qs = queryset.order_by(*_expresiones_orden(orden, hacia_atras))
+    if valores is not None:
+        pagina_qs = pagina_qs.filter(_filtro_cursor(orden, valores, hacia_atras))
+    filas = list(pagina_qs[:tamano + 1])
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+
+    if hacia_atras:
+        filas.reverse()
+        inicio = max(0, inicio - len(filas)) if hay_mas else 0
+        hay_siguiente, hay_anterior = True, hay_mas
+    else:
+        hay_siguiente, hay_anterior = hay_mas, valores is not None
+
+    def _valores(fila):
+        return [getattr(fila, campo) for campo, _, _ in orden]
+
+    cursor_siguiente = cursor_anterior = None
+    if filas and hay_siguiente:
+        cursor_siguiente = codificar_cursor(_valores(filas[-1]), inicio + len(filas))
+    if filas and hay_anterior:
+        cursor_anterior = codificar_cursor(_valores(filas[0]), inicio, hacia_atras=True)
+
+    conteo, exacto = contar(queryset)
+    return PaginaKeyset(filas, inicio, tamano, cursor_siguiente, cursor_anterior, list(params), conteo, exacto)
+
+
+def buscar_y_paginar(request, queryset, query='', orden_fecha=None):
+    """
+    Aplica la búsqueda de ``query`` y devuelve la página pedida en
+    ``request.GET['cursor']``. ``orden_fecha`` ('calibracion', ...) ordena por
+    la próxima fecha de esa actividad; si no, por relevancia (con búsqueda)
+    o por código interno.
+    """
+    if query:
+        queryset = filtrar(queryset, query)
+
+    if orden_fecha in ORDENES_FECHA:
+        orden = ORDENES_FECHA[orden_fecha]
+    elif query and palabras(query):
+        queryset = anotar_relevancia(queryset, query)
+        orden = ORDEN_RELEVANCIA
+    else:
+        orden = ORDEN_CODIGO
+
+    return paginar(
+        queryset, orden, settings.SAM_CONFIG['PAGINATION_SIZE'],
+        cursor=request.GET.get('cursor'), params=_params(request),
+    )
+
+
+def _params(request):
+    return [(clave, valor) for clave, valores in request.GET.lists() for valor in valores]
@@ -0,0 +1,220 @@
+# core/calendario_indice.py
+# Índice materializado de ocurrencias para el calendario de actividades
+
+import hashlib
+import logging
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+from .models.common import meses_decimales_a_relativedelta
+
+logger = logging.getLogger('core')
+
+DEFAULT_HORIZONTE_MESES = 24
+DEFAULT_MAX_HORIZONTE_MESES = 120
+DEFAULT_MAX_EQUIPOS_POR_LECTURA = 200
+LOTE_REINDEXADO = 500
+
+# tipo -> (campo de próxima fecha en Equipo, campo de frecuencia)
+CAMPOS_PROGRAMADOS = {
+    'calibracion': ('proxima_calibracion', 'frecuencia_calibracion_meses'),
+    'mantenimiento': ('proximo_mantenimiento', 'frecuencia_mantenimiento_meses'),
+    'comprobacion': ('proxima_comprobacion', 'frecuencia_comprobacion_meses'),
+}
+TIPOS = tuple(CAMPOS_PROGRAMADOS)
+
+# tipo -> (campo de fecha del registro, {clave en extendedProps: campo del registro})
+CAMPOS_REALIZADOS = {
+    'calibracion': ('fecha_calibracion', {'resultado': 'resultado', 'certificado': 'numero_certificado'}),
+    'mantenimiento': (
+        'fecha_mantenimiento', {'tipo_mantenimiento': 'tipo_mantenimiento', 'descripcion': 'descripcion'}
+    ),
+    'comprobacion': ('fecha_comprobacion', {'resultado': 'resultado'}),
+}
+
+CAMPOS_EQUIPO = ('id', 'empresa_id', 'version_contenido') + tuple(
+    campo for campos in CAMPOS_PROGRAMADOS.values() for campo in campos
+)
+
+
+def _config():
+    return getattr(settings, 'CALENDARIO_INDICE_CONFIG', {})
+
+
+def horizonte(today=None):
+    """Fecha hasta la que se proyectan las ocurrencias por defecto."""
+    today = today or timezone.localdate()
+    return today + relativedelta(months=int(_config().get('HORIZONTE_MESES', DEFAULT_HORIZONTE_MESES)))
+
+
+def tope(today=None):
+    """Fecha máxima proyectable aunque se pida un rango posterior."""
+    today = today or timezone.localdate()
+    return today + relativedelta(months=int(_config().get('MAX_HORIZONTE_MESES', DEFAULT_MAX_HORIZONTE_MESES)))
+
+
+def max_equipos_por_lectura():
+    """Equipos que un request puede reindexar; el resto queda para ``reindexar_calendario``."""
+    return int(_config().get('MAX_EQUIPOS_POR_LECTURA', DEFAULT_MAX_EQUIPOS_POR_LECTURA))
+
+
+def equipos_desactualizados(equipos, necesario):
+    return equipos.filter(
+        Q(calendario_hasta__isnull=True)
+        | Q(calendario_hasta__lt=necesario)
+        | ~Q(version_calendario=F('version_contenido'))
+    )
+
+
+def fechas_programadas(proxima, frecuencia, hasta, today):
+    """
+    La próxima fecha y sus repeticiones cada ``frecuencia`` meses hasta
+    ``hasta``. Si la próxima ya venció se conserva, pero sus repeticiones solo
+    se proyectan desde ``today`` (no se inventan ocurrencias pasadas).
+    """
+    if not proxima or proxima > hasta:
+        return []
+    fechas = [proxima]
+    if not frecuencia or frecuencia <= 0:
+        return fechas
+
+    delta = meses_decimales_a_relativedelta(frecuencia)
+    fecha = proxima + delta
+    if fecha <= proxima:
+        return fechas
+    while fecha <= hasta:
+        if fecha >= today:
+            fechas.append(fecha)
+        fecha = fecha + delta
+    return fechas
+
+
+def reindexar_equipos(equipos, hasta, today=None):
+    """
+    Reconstruye las ocurrencias de ``equipos`` (instancias con ``CAMPOS_EQUIPO``)
+    y registra el sello con el que se materializaron.
+
+    Returns:
+        int: ocurrencias creadas
+    """
+    from .models import Calibracion, Comprobacion, Equipo, Mantenimiento, OcurrenciaActividad
+
+    if not equipos:
+        return 0
+    today = today or timezone.localdate()
+    empresa_de = {equipo.pk: equipo.empresa_id for equipo in equipos}
+
+    filas = []
+    for equipo in equipos:
+        for tipo, (campo_proxima, campo_freq) in CAMPOS_PROGRAMADOS.items():
+            for fecha in fechas_programadas(getattr(equipo, campo_proxima), getattr(equipo, campo_freq), hasta, today):
+                filas.append(OcurrenciaActividad(
+                    empresa_id=equipo.empresa_id, equipo_id=equipo.pk,
+                    tipo=tipo, fecha=fecha, estado='programado',
+                ))
+
+    modelos = {'calibracion': Calibracion, 'mantenimiento': Mantenimiento, 'comprobacion': Comprobacion}
+    for tipo, (campo_fecha, detalle) in CAMPOS_REALIZADOS.items():
+        registros = modelos[tipo].objects.filter(equipo_id__in=list(empresa_de)).values(
+            'equipo_id', campo_fecha, *detalle.values()
+        )
+        for registro in registros:
+            filas.append(OcurrenciaActividad(
+                empresa_id=empresa_de[registro['equipo_id']], equipo_id=registro['equipo_id'],
+                tipo=tipo, fecha=registro[campo_fecha], estado='realizado',
+                detalle={clave: registro[campo] for clave, campo in detalle.items()},
+            ))
+
+    # Se registra el sello leído: si cambió mientras tanto, el equipo sigue
+    # desactualizado y se reconstruye en la siguiente lectura.
+    for equipo in equipos:
+        equipo.version_calendario = equipo.version_contenido
+        equipo.calendario_hasta = hasta
+
+    with transaction.atomic():
+        OcurrenciaActividad.objects.filter(equipo_id__in=list(empresa_de)).delete()
+        OcurrenciaActividad.objects.bulk_create(filas, batch_size=1000)
+        Equipo.objects.bulk_update(equipos, ['version_calendario', 'calendario_hasta'])
+    return len(filas)
+
+
+def asegurar_indice(equipos, hasta=None, today=None, max_equipos=None):
+    """
+    Reconstruye las ocurrencias de los equipos del queryset cuyo sello cambió
+    o cuya proyección no llega hasta ``hasta``. Sin cambios cuesta una consulta.
+
+    Con ``max_equipos`` (lecturas desde las vistas) reindexa como máximo esa
+    cantidad; los demás conservan sus ocurrencias anteriores hasta el
+    siguiente request o ``reindexar_calendario``.
+
+    Cada lote bloquea sus filas de Equipo (``select_for_update``) y vuelve a
+    comprobar el sello, para que dos requests concurrentes no dupliquen
+    ocurrencias del mismo equipo. Las escrituras masivas con
+    ``QuerySet.update()`` deben llamar a ``renovar_version_contenido``.
+
+    Returns:
+        int: equipos reindexados
+    """
+    from .models import Equipo
+
+    today = today or timezone.localdate()
+    limite = tope(today)
+    necesario = min(hasta or today, limite)
+
+    pendientes = equipos_desactualizados(equipos, necesario).order_by('pk').values_list('pk', flat=True)
+    if max_equipos is not None:
+        pendientes = pendientes[:max_equipos]
+    pendientes = list(pendientes)
+    if not pendientes:
+        return 0
+
+    cubrir = min(max(necesario, horizonte(today)), limite)
+    reindexados = 0
+    for inicio in range(0, len(pendientes), LOTE_REINDEXADO):
+        with transaction.atomic():
+            ids = pendientes[inicio:inicio + LOTE_REINDEXADO]
+            lote = list(
+                equipos_desactualizados(Equipo.objects.filter(pk__in=ids), necesario)
+                .select_for_update().order_by('pk').only(*CAMPOS_EQUIPO)
+            )
+            reindexar_equipos(lote, cubrir, today)
+        reindexados += len(lote)
+
+    logger.info(f"Calendario: {reindexados} equipos reindexados hasta {cubrir}")
+    return reindexados
+
+
+def ocurrencias_en_rango(equipos, desde=None, hasta=None, tipos=TIPOS, estado=None, empresa_id=None):
+    """
+    Ocurrencias de los equipos del queryset en [desde, hasta], con los datos
+    del equipo que muestra el calendario.
+    """
+    from .models import OcurrenciaActividad
+
+    ocurrencias = OcurrenciaActividad.objects.filter(
+        equipo__in=equipos.order_by().values('pk'), tipo__in=list(tipos)
+    )
+    if empresa_id is not None:
+        ocurrencias = ocurrencias.filter(empresa_id=empresa_id)
+    if desde is not None:
+        ocurrencias = ocurrencias.filter(fecha__gte=desde)
+    if hasta is not None:
+        ocurrencias = ocurrencias.filter(fecha__lte=hasta)
+    if estado is not None:
+        ocurrencias = ocurrencias.filter(estado=estado)
+    return ocurrencias
+
+
+def etag_ocurrencias(ocurrencias, *partes):
+    """
+    ETag de un conjunto de ocurrencias: cantidad y último id (las filas no se
+    modifican, solo se reemplazan, así que cualquier reindexado del rango lo
+    cambia) más las ``partes`` que identifican al usuario y los filtros.
+    """
+    resumen = ocurrencias.aggregate(n=Count('id'), ultimo=Max('id'))
+    huella = ':'.join(str(parte) for parte in (*partes, resumen['n'], resumen['ultimo']))
+    return '"%s"' % hashlib.md5(huella.encode('utf-8'), usedforsecurity=False).hexdigest()
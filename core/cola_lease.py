@@ -0,0 +1,159 @@
+# core/cola_lease.py
+# Tablas usadas como cola de trabajos con leases (ZIPs, emails, regeneración de PDFs)
+
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger('core')
+
+
+def generar_worker_id(indice=0):
+    """Identificador único del worker: host, pid e índice de proceso (o de hilo)."""
+    return f"{socket.gethostname()}:{os.getpid()}:{indice}"
+
+
+def backoff(base_segundos, intentos):
+    """Espera antes del siguiente intento: ``base_segundos`` * 2^(intentos-1)."""
+    return timedelta(seconds=base_segundos * 2 ** max(0, intentos - 1))
+
+
+class ColaLease:
+    """
+    Cola sobre un modelo de ``core``: las filas ``pendiente`` se reclaman con
+    ``SELECT ... FOR UPDATE SKIP LOCKED`` (en PostgreSQL) y un UPDATE
+    condicional, quedan ``en_curso`` a nombre del worker con un lease y, si el
+    worker muere, ``recuperar_estancados`` las devuelve al expirar el lease.
+
+    Args:
+        modelo: nombre del modelo en la app ``core``
+        en_curso: valor del estado mientras un worker tiene la fila
+        lease_seconds: callable con la duración del lease
+        listas: callable ``ahora -> dict`` con filtros extra de las reclamables
+    """
+
+    def __init__(self, modelo, en_curso, lease_seconds, pendiente='pendiente', campo_estado='estado',
+                 campo_lease='lease_expira', orden=('proximo_intento',), listas=None):
+        self.nombre_modelo = modelo
+        self.en_curso = en_curso
+        self.lease_seconds = lease_seconds
+        self.pendiente = pendiente
+        self.campo_estado = campo_estado
+        self.campo_lease = campo_lease
+        self.orden = orden
+        self.listas = listas
+
+    @property
+    def modelo(self):
+        return apps.get_model('core', self.nombre_modelo)
+
+    def candidatas(self, ahora):
+        """Filas reclamables bloqueadas con SKIP LOCKED (usar dentro de una transacción)."""
+        filtro = {self.campo_estado: self.pendiente, **(self.listas(ahora) if self.listas else {})}
+        return self.modelo.objects.select_for_update(skip_locked=True).filter(**filtro).order_by(*self.orden)
+
+    def tomar(self, ids, worker_id, ahora, **campos):
+        """Pasa a ``en_curso`` las filas ``ids`` que sigan pendientes. Retorna cuántas tomó."""
+        return self.modelo.objects.filter(pk__in=ids, **{self.campo_estado: self.pendiente}).update(
+            worker_id=worker_id,
+            **{self.campo_estado: self.en_curso, self.campo_lease: ahora + timedelta(seconds=self.lease_seconds())},
+            **campos,
+        )
+
+    def propias(self, worker_id):
+        """Filas en curso a nombre de ``worker_id``."""
+        return self.modelo.objects.filter(worker_id=worker_id, **{self.campo_estado: self.en_curso})
+
+    def reclamar_lote(self, worker_id, tamano):
+        """Reclama hasta ``tamano`` filas en el orden de la cola. Returns: list"""
+        ahora = timezone.now()
+        with transaction.atomic():
+            ids = list(self.candidatas(ahora).values_list('pk', flat=True)[:tamano])
+            if not ids:
+                return []
+            self.tomar(ids, worker_id, ahora)
+        return list(self.propias(worker_id).filter(pk__in=ids))
+
+    def renovar_lease(self, pk, worker_id, **campos):
+        """Extiende el lease. False si ``worker_id`` ya no es dueño de la fila."""
+        lease = timezone.now() + timedelta(seconds=self.lease_seconds())
+        return self.propias(worker_id).filter(pk=pk).update(**{self.campo_lease: lease}, **campos) == 1
+
+    def estancados(self, ahora=None):
+        """Filas en curso cuyo lease ya expiró."""
+        return self.modelo.objects.filter(
+            **{self.campo_estado: self.en_curso, f'{self.campo_lease}__lte': ahora or timezone.now()}
+        )
+
+    def recuperar_estancados(self, ahora=None, filtro=None, **campos):
+        """Devuelve a la cola las filas estancadas (las de ``filtro``, si se indica). Retorna cuántas."""
+        return self.estancados(ahora).filter(**(filtro or {})).update(
+            worker_id=None, **{self.campo_estado: self.pendiente, self.campo_lease: None}, **campos
+        )
+
+
+# =============================================================================
+# WORKERS
+# =============================================================================
+
+def bucle_worker(nombre, worker_id, paso, check_interval=5, max_iterations=0):
+    """
+    Loop de un worker: ejecuta ``paso()`` (True si procesó trabajo) y duerme
+    ``check_interval`` segundos solo cuando no hubo trabajo.
+    """
+    logger.info(f"🚀 Worker {nombre} {worker_id} iniciado")
+    iteration = 0
+    while True:
+        iteration += 1
+        try:
+            trabajo = paso()
+        except Exception as e:
+            trabajo = False
+            logger.error(f"Error en worker {nombre} {worker_id}: {e}", exc_info=True)
+
+        if max_iterations > 0 and iteration >= max_iterations:
+            break
+        if not trabajo:
+            time.sleep(check_interval)
+
+    logger.info(f"🛑 Worker {nombre} {worker_id} detenido")
+
+
+def proceso_worker(bucle, indice, args):
+    """Punto de entrada de un proceso worker hijo (multiprocessing spawn)."""
+    import django
+
+    django.setup()
+    bucle(generar_worker_id(indice), *args)
+
+
+def ejecutar_procesos(bucle, procesos, args, nombre, max_iterations=0, **opciones_principal):
+    """
+    Ejecuta ``bucle(worker_id, *args)`` en ``procesos`` procesos: los hijos se
+    lanzan con spawn (compatible con Windows) y el proceso actual es el
+    worker 0, que recibe además ``opciones_principal``.
+    """
+    hijos = []
+    if procesos > 1:
+        connections.close_all()
+        contexto = multiprocessing.get_context('spawn')
+        for indice in range(1, procesos):
+            hijo = contexto.Process(target=proceso_worker, args=(bucle, indice, args), name=f'{nombre}_{indice}')
+            hijo.start()
+            hijos.append(hijo)
+
+    try:
+        bucle(generar_worker_id(0), *args, **opciones_principal)
+    finally:
+        for hijo in hijos:
+            if max_iterations > 0:
+                hijo.join()
+            else:
+                hijo.terminate()
@@ -0,0 +1,150 @@
+# core/contadores_aprobacion.py
+# Contadores cacheados del badge de Aprobaciones
+
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+logger = logging.getLogger('core')
+
+# Red de seguridad si alguna invalidación se pierde (p. ej. update() masivo)
+TTL_CONTADORES = 600
+
+ROLES_APROBADORES = ('ADMINISTRADOR', 'GERENCIA')
+
+
+def clave_pendientes(empresa_id=None):
+    return f"aprobaciones_pendientes_{empresa_id if empresa_id else 'all'}"
+
+
+def clave_rechazados(empresa_id, user_id):
+    return f"aprobaciones_rechazadas_{empresa_id}_{user_id}"
+
+
+def es_aprobador(user):
+    return user.is_superuser or getattr(user, 'rol_usuario', None) in ROLES_APROBADORES
+
+
+# =============================================================================
+# CÁLCULO (solo en caso de fallo de caché)
+# =============================================================================
+
+def _querysets_pendientes(empresa_filter):
+    from .models import Calibracion, Comprobacion
+
+    # Confirmaciones metrológicas pendientes (solo las generadas por plataforma)
+    confirmaciones = Calibracion.objects.filter(
+        empresa_filter,
+        confirmacion_estado_aprobacion='pendiente',
+        confirmacion_metrologica_pdf__isnull=False,
+        confirmacion_metrologica_datos__isnull=False
+    ).exclude(confirmacion_metrologica_datos={})
+
+    # Intervalos de calibración pendientes
+    intervalos = Calibracion.objects.filter(
+        empresa_filter,
+        intervalos_estado_aprobacion='pendiente',
+        intervalos_calibracion_pdf__isnull=False,
+        intervalos_calibracion_datos__isnull=False
+    ).exclude(intervalos_calibracion_datos={})
+
+    # Comprobaciones metrológicas pendientes
+    comprobaciones = Comprobacion.objects.filter(
+        empresa_filter,
+        estado_aprobacion='pendiente',
+        comprobacion_pdf__isnull=False,
+        datos_comprobacion__isnull=False
+    ).exclude(datos_comprobacion={})
+
+    return confirmaciones, intervalos, comprobaciones
+
+
+def calcular_pendientes(empresa_id=None):
+    """
+    Pendientes de aprobación de la empresa (o de todas si ``empresa_id`` es None).
+
+    Returns:
+        dict: {'total': int, 'por_usuario': {creado_por_id: int}}
+    """
+    empresa_filter = Q(equipo__empresa_id=empresa_id) if empresa_id else Q()
+    total = 0
+    por_usuario = {}
+    for queryset in _querysets_pendientes(empresa_filter):
+        for fila in queryset.order_by().values('creado_por_id').annotate(n=Count('id')):
+            total += fila['n']
+            por_usuario[fila['creado_por_id']] = por_usuario.get(fila['creado_por_id'], 0) + fila['n']
+    return {'total': total, 'por_usuario': por_usuario}
+
+
+def calcular_rechazados(empresa_id, user_id):
+    """Documentos del usuario rechazados (confirmaciones, intervalos y comprobaciones)."""
+    from .models import Calibracion, Comprobacion
+
+    filtro = Q(equipo__empresa_id=empresa_id, creado_por_id=user_id)
+    calibraciones = Calibracion.objects.filter(filtro).aggregate(
+        confirmaciones=Count('id', filter=Q(confirmacion_estado_aprobacion='rechazado')),
+        intervalos=Count('id', filter=Q(intervalos_estado_aprobacion='rechazado')),
+    )
+    comprobaciones = Comprobacion.objects.filter(filtro, estado_aprobacion='rechazado').count()
+    return calibraciones['confirmaciones'] + calibraciones['intervalos'] + comprobaciones
+
+
+# =============================================================================
+# LECTURA
+# =============================================================================
+
+def contadores_usuario(user):
+    """
+    Contadores del badge para ``user``.
+
+    Returns:
+        tuple(int, int): (pendientes, rechazados)
+    """
+    if user.is_superuser:
+        empresa_id = None
+    elif user.empresa_id:
+        empresa_id = user.empresa_id
+    else:
+        return 0, 0
+
+    if es_aprobador(user):
+        # Aprobador ve pendientes de otros usuarios
+        clave = clave_pendientes(empresa_id)
+        datos = cache.get(clave)
+        if datos is None:
+            datos = calcular_pendientes(empresa_id)
+            cache.set(clave, datos, TTL_CONTADORES)
+        return datos['total'] - datos['por_usuario'].get(user.id, 0), 0
+
+    # Usuario normal ve sus propios rechazos
+    clave = clave_rechazados(empresa_id, user.id)
+    rechazados = cache.get(clave)
+    if rechazados is None:
+        rechazados = calcular_rechazados(empresa_id, user.id)
+        cache.set(clave, rechazados, TTL_CONTADORES)
+    return 0, rechazados
+
+
+# =============================================================================
+# INVALIDACIÓN
+# =============================================================================
+
+def invalidar_contadores(empresa_id, creado_por_id=None):
+    """
+    Elimina los contadores afectados por un cambio en un documento de la
+    empresa. Se ejecuta al confirmar la transacción para que un render
+    concurrente no vuelva a cachear el valor anterior.
+    """
+    claves = [clave_pendientes(empresa_id), clave_pendientes(None)]
+    if creado_por_id:
+        claves.append(clave_rechazados(empresa_id, creado_por_id))
+
+    def _borrar():
+        try:
+            cache.delete_many(claves)
+        except Exception as e:
+            logger.warning(f"No se pudieron invalidar contadores de aprobación {claves}: {e}")
+
+    transaction.on_commit(_borrar)
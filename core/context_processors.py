@@ -1,8 +1,8 @@
 # core/context_processors.py
 
-from django.db.models import Count, Q
 from django.contrib.auth.models import AnonymousUser
-from .models import Equipo, Mantenimiento, Calibracion, Comprobacion, Empresa
+from .models import Empresa
+from .contadores_aprobacion import contadores_usuario
 
 def company_data(request):
     """
@@ -36,6 +36,8 @@ def aprobaciones_pendientes_count(request):
     - Confirmaciones metrológicas (en Calibracion: confirmacion_estado_aprobacion)
     - Intervalos de calibración (en Calibracion: intervalos_estado_aprobacion)
     - Comprobaciones metrológicas (en Comprobacion: estado_aprobacion)
+
+    Los conteos salen de la caché (ver core/contadores_aprobacion.py).
     """
     if isinstance(request.user, AnonymousUser) or not request.user.is_authenticated:
         return {
@@ -44,74 +46,12 @@ def aprobaciones_pendientes_count(request):
             'aprobaciones_total_badge': 0,
         }
 
-    user = request.user
     pendientes = 0
     rechazados = 0
 
     try:
-        # Determinar si es aprobador (gerente, admin o superuser)
-        es_aprobador = user.is_superuser or (hasattr(user, 'rol_usuario') and user.rol_usuario in ['ADMINISTRADOR', 'GERENCIA'])
-
-        if user.empresa or user.is_superuser:
-            # Filtro base por empresa
-            if user.is_superuser:
-                empresa_filter = Q()  # Sin filtro, ve todas las empresas
-            else:
-                empresa_filter = Q(equipo__empresa=user.empresa)
-
-            if es_aprobador:
-                # Aprobador ve pendientes de otros usuarios
-
-                # Confirmaciones metrológicas pendientes (solo las generadas por plataforma)
-                pendientes += Calibracion.objects.filter(
-                    empresa_filter,
-                    confirmacion_estado_aprobacion='pendiente',
-                    confirmacion_metrologica_pdf__isnull=False,
-                    confirmacion_metrologica_datos__isnull=False
-                ).exclude(
-                    confirmacion_metrologica_datos={}
-                ).exclude(creado_por=user).count()
-
-                # Intervalos de calibración pendientes
-                pendientes += Calibracion.objects.filter(
-                    empresa_filter,
-                    intervalos_estado_aprobacion='pendiente',
-                    intervalos_calibracion_pdf__isnull=False,
-                    intervalos_calibracion_datos__isnull=False
-                ).exclude(
-                    intervalos_calibracion_datos={}
-                ).exclude(creado_por=user).count()
-
-                # Comprobaciones metrológicas pendientes
-                pendientes += Comprobacion.objects.filter(
-                    empresa_filter,
-                    estado_aprobacion='pendiente',
-                    comprobacion_pdf__isnull=False,
-                    datos_comprobacion__isnull=False
-                ).exclude(
-                    datos_comprobacion={}
-                ).exclude(creado_por=user).count()
-            else:
-                # Usuario normal ve sus propios rechazos
-                user_filter = Q(creado_por=user)
-
-                # Confirmaciones rechazadas
-                rechazados += Calibracion.objects.filter(
-                    empresa_filter & user_filter,
-                    confirmacion_estado_aprobacion='rechazado'
-                ).count()
-
-                # Intervalos rechazados
-                rechazados += Calibracion.objects.filter(
-                    empresa_filter & user_filter,
-                    intervalos_estado_aprobacion='rechazado'
-                ).count()
-
-                # Comprobaciones rechazadas
-                rechazados += Comprobacion.objects.filter(
-                    empresa_filter & user_filter,
-                    estado_aprobacion='rechazado'
-                ).count()
+        # Conteos cacheados por empresa/usuario e invalidados por señales
+        pendientes, rechazados = contadores_usuario(request.user)
     except Exception:
         # En caso de error, no mostrar badge
         pass
@@ -0,0 +1,357 @@
+# core/email_outbox.py
+# Bandeja de salida de emails respaldada por la tabla CorreoSaliente
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from . import cola_lease
+
+logger = logging.getLogger('core')
+
+DEFAULT_WORKERS = 4
+DEFAULT_LOTE = 100
+DEFAULT_MAX_INTENTOS = 5
+DEFAULT_BACKOFF_SEGUNDOS = 60
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_LIMITE_POR_SEGUNDO = 5
+DEFAULT_RETENCION_DIAS = 30
+
+CLAVE_ULTIMA_EJECUCION = 'email_outbox_ultima_ejecucion'
+
+
+def _config():
+    return getattr(settings, 'EMAIL_OUTBOX_CONFIG', {})
+
+
+def outbox_activo():
+    return bool(_config().get('ACTIVO', False))
+
+
+def max_intentos():
+    return int(_config().get('MAX_INTENTOS', DEFAULT_MAX_INTENTOS))
+
+
+def lease_seconds():
+    return int(_config().get('LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+
+
+def proveedor_actual():
+    """Clave del proveedor para el límite de envío: el EMAIL_HOST en uso."""
+    return getattr(settings, 'EMAIL_HOST', '') or 'default'
+
+
+def limite_por_segundo(proveedor):
+    limites = _config().get('LIMITES_POR_PROVEEDOR', {})
+    return float(limites.get(proveedor, _config().get('LIMITE_POR_SEGUNDO', DEFAULT_LIMITE_POR_SEGUNDO)))
+
+
+def backoff(intentos):
+    """Espera antes del siguiente intento: BACKOFF_SEGUNDOS * 2^(intentos-1)."""
+    return cola_lease.backoff(int(_config().get('BACKOFF_SEGUNDOS', DEFAULT_BACKOFF_SEGUNDOS)), intentos)
+
+
+COLA = cola_lease.ColaLease(
+    'CorreoSaliente', en_curso='enviando', lease_seconds=lease_seconds,
+    listas=lambda ahora: {'proximo_intento__lte': ahora},
+)
+
+
+# =============================================================================
+# ENCOLADO
+# =============================================================================
+
+def encolar(mensaje, categoria='general'):
+    """
+    Guarda en la bandeja de salida un ``EmailMessage`` ya renderizado.
+
+    Returns:
+        CorreoSaliente
+    """
+    from core.models import CorreoSaliente
+
+    html = next(
+        (contenido for contenido, mimetype in getattr(mensaje, 'alternatives', []) if mimetype == 'text/html'),
+        ''
+    )
+    return CorreoSaliente.objects.create(
+        categoria=categoria,
+        asunto=mensaje.subject[:500],
+        cuerpo_texto=mensaje.body or '',
+        cuerpo_html=html,
+        remitente=mensaje.from_email or settings.DEFAULT_FROM_EMAIL,
+        destinatarios=list(mensaje.to),
+        cc=list(mensaje.cc),
+        bcc=list(mensaje.bcc),
+        reply_to=list(mensaje.reply_to),
+        cabeceras=dict(mensaje.extra_headers),
+    )
+
+
+def despachar(mensaje, categoria='general'):
+    """
+    Punto único de salida de los emails de la aplicación.
+
+    Con la bandeja activa encola el mensaje; si no (o si lleva adjuntos, que
+    no se persisten), lo envía en línea. Los errores de envío en línea se
+    propagan igual que con ``mensaje.send()``.
+
+    Returns:
+        bool: True si el mensaje quedó enviado o encolado
+    """
+    if outbox_activo() and not mensaje.attachments:
+        encolar(mensaje, categoria)
+        return True
+    mensaje.send()
+    return True
+
+
+def _construir_mensaje(correo, connection):
+    mensaje = EmailMultiAlternatives(
+        subject=correo.asunto,
+        body=correo.cuerpo_texto,
+        from_email=correo.remitente,
+        to=correo.destinatarios,
+        cc=correo.cc,
+        bcc=correo.bcc,
+        reply_to=correo.reply_to,
+        headers=correo.cabeceras,
+        connection=connection,
+    )
+    if correo.cuerpo_html:
+        mensaje.attach_alternative(correo.cuerpo_html, 'text/html')
+    return mensaje
+
+
+# =============================================================================
+# RECLAMO Y LEASES
+# =============================================================================
+
+def reclamar_lote(worker_id, tamano):
+    """
+    Reclama hasta ``tamano`` mensajes pendientes cuyo intento ya venció.
+
+    Returns:
+        list[CorreoSaliente]
+    """
+    return COLA.reclamar_lote(worker_id, tamano)
+
+
+def recuperar_estancados():
+    """Devuelve a la cola los mensajes cuyo worker murió con el lease vigente."""
+    recuperados = COLA.recuperar_estancados()
+    if recuperados:
+        logger.warning(f"Outbox email: {recuperados} mensajes estancados devueltos a la cola")
+    return recuperados
+
+
+# =============================================================================
+# ENVÍO
+# =============================================================================
+
+class LimitadorEnvio:
+    """
+    Espacia los envíos a ``por_segundo`` mensajes por segundo como máximo,
+    compartido entre los hilos del pool (límite por proceso).
+    """
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo and por_segundo > 0 else 0.0
+        self._lock = threading.Lock()
+        self._siguiente = time.monotonic()
+
+    def esperar(self):
+        if not self.intervalo:
+            return
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._siguiente)
+            self._siguiente = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+class _PoolConexiones:
+    """Una conexión SMTP abierta por hilo del pool, reutilizada entre mensajes."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._abiertas = []
+
+    def obtener(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = get_connection(fail_silently=False)
+            conexion.open()
+            self._local.conexion = conexion
+            with self._lock:
+                self._abiertas.append(conexion)
+        return conexion
+
+    def descartar(self):
+        """Cierra la conexión del hilo actual (p. ej. tras un error SMTP)."""
+        conexion = getattr(self._local, 'conexion', None)
+        self._local.conexion = None
+        if conexion is not None:
+            with self._lock:
+                if conexion in self._abiertas:
+                    self._abiertas.remove(conexion)
+            try:
+                conexion.close()
+            except Exception:
+                pass
+
+    def cerrar_todas(self):
+        with self._lock:
+            abiertas, self._abiertas = self._abiertas, []
+        for conexion in abiertas:
+            try:
+                conexion.close()
+            except Exception:
+                pass
+
+
+def _enviar_uno(correo, pool, limitador):
+    """Ejecutado en un hilo del pool: solo SMTP, sin acceso a base de datos."""
+    limitador.esperar()
+    try:
+        conexion = pool.obtener()
+        _construir_mensaje(correo, conexion).send()
+        return correo, None
+    except Exception as e:
+        pool.descartar()
+        return correo, f"{type(e).__name__}: {e}"
+
+
+def _registrar_resultados(resultados, metricas):
+    from core.models import CorreoSaliente
+
+    ahora = timezone.now()
+    limite = max_intentos()
+    for correo, error in resultados:
+        correo.worker_id = None
+        correo.lease_expira = None
+        if error is None:
+            correo.estado = 'enviado'
+            correo.enviado_en = ahora
+            correo.ultimo_error = ''
+            metricas['enviados'] += 1
+            continue
+
+        correo.intentos += 1
+        correo.ultimo_error = error[:2000]
+        if correo.intentos >= limite:
+            correo.estado = 'fallido'
+            metricas['fallidos'] += 1
+            logger.error(f"Outbox email: '{correo.asunto}' descartado tras {correo.intentos} intentos: {error}")
+        else:
+            correo.estado = 'pendiente'
+            correo.proximo_intento = ahora + backoff(correo.intentos)
+            metricas['reintentos'] += 1
+
+    CorreoSaliente.objects.bulk_update(
+        [correo for correo, _ in resultados],
+        ['estado', 'enviado_en', 'intentos', 'ultimo_error', 'proximo_intento', 'worker_id', 'lease_expira'],
+    )
+
+
+def drenar(workers=None, lote=None, max_mensajes=None):
+    """
+    Envía los mensajes pendientes hasta vaciar la bandeja (o ``max_mensajes``).
+    Entrega "al menos una vez": si el worker muere tras enviar, el lease
+    expira y el mensaje se reintenta.
+
+    Returns:
+        dict: métricas de la ejecución {'enviados', 'reintentos', 'fallidos',
+        'segundos', 'por_segundo', 'proveedor'}
+    """
+    from .notifications import configure_email_settings
+
+    workers = max(1, int(workers or _config().get('WORKERS', DEFAULT_WORKERS)))
+    lote = max(1, int(lote or _config().get('LOTE', DEFAULT_LOTE)))
+
+    # Aplica la EmailConfiguration activa; sin ella se usan los settings actuales
+    configure_email_settings()
+    recuperar_estancados()
+
+    proveedor = proveedor_actual()
+    limitador = LimitadorEnvio(limite_por_segundo(proveedor))
+    pool = _PoolConexiones()
+    worker_id = cola_lease.generar_worker_id(threading.get_ident())
+    metricas = {'enviados': 0, 'reintentos': 0, 'fallidos': 0}
+    procesados = 0
+    inicio = time.monotonic()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='SAM_Email') as executor:
+            while max_mensajes is None or procesados < max_mensajes:
+                tamano = lote if max_mensajes is None else min(lote, max_mensajes - procesados)
+                correos = reclamar_lote(worker_id, tamano)
+                if not correos:
+                    break
+                resultados = list(executor.map(lambda c: _enviar_uno(c, pool, limitador), correos))
+                _registrar_resultados(resultados, metricas)
+                procesados += len(correos)
+    finally:
+        pool.cerrar_todas()
+
+    segundos = time.monotonic() - inicio
+    metricas.update({
+        'segundos': round(segundos, 3),
+        'por_segundo': round(metricas['enviados'] / segundos, 2) if segundos > 0 else 0.0,
+        'proveedor': proveedor,
+        'finalizado': timezone.now().isoformat(),
+    })
+    cache.set(CLAVE_ULTIMA_EJECUCION, metricas, None)
+    if procesados:
+        logger.info(
+            f"Outbox email: {metricas['enviados']} enviados, {metricas['reintentos']} reintentos, "
+            f"{metricas['fallidos']} fallidos en {metricas['segundos']}s ({workers} hilos, {proveedor})"
+        )
+    return metricas
+
+
+def purgar_enviados(dias=None):
+    """Elimina los mensajes enviados con más de ``dias`` de antigüedad."""
+    from core.models import CorreoSaliente
+
+    dias = int(dias if dias is not None else _config().get('RETENCION_DIAS', DEFAULT_RETENCION_DIAS))
+    borrados, _ = CorreoSaliente.objects.filter(
+        estado='enviado', enviado_en__lt=timezone.now() - timedelta(days=dias)
+    ).delete()
+    return borrados
+
+
+# =============================================================================
+# MÉTRICAS
+# =============================================================================
+
+def metricas_outbox():
+    """
+    Estado de la bandeja: conteos por estado, antigüedad del pendiente más
+    viejo, enviados en la última hora y métricas de la última ejecución.
+    """
+    from core.models import CorreoSaliente
+
+    ahora = timezone.now()
+    por_estado = dict(
+        CorreoSaliente.objects.order_by().values('estado').annotate(n=Count('id')).values_list('estado', 'n')
+    )
+    mas_antiguo = CorreoSaliente.objects.filter(estado='pendiente').aggregate(m=Min('creado_en'))['m']
+    return {
+        'por_estado': {estado: por_estado.get(estado, 0) for estado, _ in CorreoSaliente.ESTADO_CHOICES},
+        'antiguedad_pendiente_segundos': int((ahora - mas_antiguo).total_seconds()) if mas_antiguo else 0,
+        'enviados_ultima_hora': CorreoSaliente.objects.filter(
+            estado='enviado', enviado_en__gte=ahora - timedelta(hours=1)
+        ).count(),
+        'ultima_ejecucion': cache.get(CLAVE_ULTIMA_EJECUCION),
+    }
@@ -0,0 +1,141 @@
+# core/fechas_equipos.py
+# Recálculo en lote de las próximas fechas de calibración, mantenimiento y comprobación
+
+import logging
+
+from django.db.models import Max
+
+logger = logging.getLogger('core')
+
+LOTE = 2000
+
+# tipo -> (related_name en Equipo, campo de fecha de la actividad, campo última fecha, campo próxima fecha, método)
+TIPOS = {
+    'calibracion': ('calibraciones', 'fecha_calibracion', 'fecha_ultima_calibracion',
+                    'proxima_calibracion', 'calcular_proxima_calibracion'),
+    'mantenimiento': ('mantenimientos', 'fecha_mantenimiento', 'fecha_ultimo_mantenimiento',
+                      'proximo_mantenimiento', 'calcular_proximo_mantenimiento'),
+    'comprobacion': ('comprobaciones', 'fecha_comprobacion', 'fecha_ultima_comprobacion',
+                     'proxima_comprobacion', 'calcular_proxima_comprobacion'),
+}
+
+CAMPOS_PROXIMAS = [definicion[3] for definicion in TIPOS.values()]
+
+
+def _en_lotes(items, tamano):
+    for inicio in range(0, len(items), tamano):
+        yield items[inicio:inicio + tamano]
+
+
+def _campos(sincronizar):
+    campos = list(CAMPOS_PROXIMAS)
+    campos.extend(TIPOS[tipo][2] for tipo in sincronizar)
+    return campos
+
+
+def ultimas_fechas(equipo_ids, tipos=tuple(TIPOS), lote=LOTE):
+    """
+    Fecha de la actividad más reciente por equipo y tipo:
+    ``{tipo: {equipo_id: fecha}}``, una consulta agrupada por tipo y lote.
+    Los equipos sin actividades de un tipo no aparecen en su diccionario.
+    """
+    from core.models import Equipo
+
+    ultimas = {tipo: {} for tipo in tipos}
+    equipo_ids = list(equipo_ids)
+    for ids in _en_lotes(equipo_ids, lote):
+        for tipo in tipos:
+            related_name, campo_fecha = TIPOS[tipo][:2]
+            modelo = Equipo._meta.get_field(related_name).related_model
+            ultimas[tipo].update(
+                modelo.objects.filter(equipo_id__in=ids).order_by()
+                .values('equipo_id').annotate(ultima=Max(campo_fecha))
+                .values_list('equipo_id', 'ultima')
+            )
+    return ultimas
+
+
+def aplicar_fechas(equipo, ultimas, sincronizar=()):
+    """
+    Calcula en memoria las próximas fechas de ``equipo`` con las últimas
+    fechas precargadas y devuelve los campos que cambiaron. Para los tipos de
+    ``sincronizar`` también se toma ``fecha_ultima_*`` del historial (lo que
+    hacían las señales de actividad).
+    """
+    cambios = []
+    for tipo, (_, _, campo_ultima, campo_proxima, metodo) in TIPOS.items():
+        ultima = ultimas[tipo].get(equipo.pk)
+        if tipo in sincronizar and getattr(equipo, campo_ultima) != ultima:
+            setattr(equipo, campo_ultima, ultima)
+            cambios.append(campo_ultima)
+
+        anterior = getattr(equipo, campo_proxima)
+        getattr(equipo, metodo)(ultima)
+        if getattr(equipo, campo_proxima) != anterior:
+            cambios.append(campo_proxima)
+    return cambios
+
+
+def recalcular_fechas(equipos, sincronizar=(), guardar=True, lote=LOTE):
+    """
+    Recalcula las próximas fechas de ``equipos`` (queryset o lista de
+    instancias) y escribe solo los equipos con cambios, con un
+    ``bulk_update`` por lote. Con ``guardar=False`` solo calcula (simulación).
+
+    Devuelve una lista ``[(equipo, {campo: (antes, ahora)}), ...]`` con los
+    equipos que cambiaron; las instancias quedan actualizadas en memoria.
+    """
+    from core.models import Equipo
+
+    if hasattr(equipos, 'iterator'):
+        equipos = equipos.order_by('pk').iterator(chunk_size=lote)
+
+    resultado = []
+    pendientes = []
+
+    def _procesar(bloque):
+        ultimas = ultimas_fechas([equipo.pk for equipo in bloque], lote=lote)
+        modificados, campos = [], set()
+        for equipo in bloque:
+            antes = {campo: getattr(equipo, campo) for campo in _campos(sincronizar)}
+            cambios = aplicar_fechas(equipo, ultimas, sincronizar)
+            if cambios:
+                modificados.append(equipo)
+                campos.update(cambios)
+                resultado.append((equipo, {campo: (antes[campo], getattr(equipo, campo)) for campo in cambios}))
+        if guardar and modificados:
+            Equipo.objects.bulk_update(modificados, sorted(campos))
+
+    for equipo in equipos:
+        pendientes.append(equipo)
+        if len(pendientes) >= lote:
+            _procesar(pendientes)
+            pendientes = []
+    if pendientes:
+        _procesar(pendientes)
+
+    if guardar and resultado:
+        logger.info(f"Fechas recalculadas en lote: {len(resultado)} equipos actualizados")
+    return resultado
+
+
+def notificar_cambios(cambios, lote=LOTE):
+    """
+    Sustituye al ``post_save`` de ``Equipo`` que ``bulk_update`` no emite,
+    tras un ``recalcular_fechas`` fuera de las señales de actividad: sello de
+    contenido de las Hojas de Vida, caché del dashboard y recálculo de
+    estadísticas, una vez por empresa afectada.
+    """
+    from core.models import Empresa
+    from core.pdf_cache import renovar_version_contenido
+    from core.signals import invalidate_dashboard_cache
+    from core.stats_queue import solicitar_recalculo_stats
+
+    ids = [equipo.pk for equipo, _ in cambios]
+    for bloque in _en_lotes(ids, lote):
+        renovar_version_contenido(equipo_ids=bloque)
+
+    empresa_ids = {equipo.empresa_id for equipo, _ in cambios}
+    for empresa in Empresa.objects.filter(pk__in=empresa_ids):
+        invalidate_dashboard_cache(empresa.pk)
+        solicitar_recalculo_stats(empresa)
@@ -0,0 +1,569 @@
+# core/graficas.py
+# Gráficas de confirmación metrológica en SVG, memoizadas por datos, EMP y regla de decisión
+
+import base64
+import hashlib
+import json
+import logging
+import math
+import threading
+from collections import OrderedDict
+from html import escape
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('core')
+
+# Subir al cambiar el dibujo: invalida las gráficas cacheadas
+VERSION = 1
+CACHE_PREFIX = f'grafica_conf:v{VERSION}:'
+DEFAULT_BACKEND = 'svg'
+DEFAULT_CACHE_SEGUNDOS = 86400
+DEFAULT_MAX_MEMORIA = 256
+
+# Campos de cada punto que intervienen en la gráfica (clave de memoización)
+_CAMPOS_PUNTO = ('nominal', 'error', 'lectura', 'incertidumbre', 'emp_absoluto')
+
+NOMBRES_REGLA = {
+    'simple_acceptance': 'Aceptación Simple (sin banda de guarda)',
+    'guard_band_U': 'Banda de Guarda U Completa',
+    'guard_band_half': 'Banda de Guarda U/2',
+    'guard_band_sqrt': 'Banda Óptima √(EMP² − U²)',
+    'conditional': 'Aceptación Condicional (zona gris)',
+}
+
+# Entradas de leyenda propias de cada regla: ('limite', color, texto) o ('zona', color, texto)
+LEYENDA_REGLA = {
+    'simple_acceptance': [
+        ('zona', '#22c55e', 'CUMPLE (|error| ≤ EMP)'),
+        ('zona', '#ef4444', 'NO CUMPLE (|error| > EMP)'),
+    ],
+    'guard_band_U': [
+        ('limite', '#16a34a', 'Límite aceptación (EMP−U, por punto)'),
+        ('zona', '#22c55e', 'CUMPLE'),
+        ('zona', '#fde047', 'NO CUMPLE (banda w=U)'),
+        ('zona', '#ef4444', 'NO CUMPLE (fuera EMP)'),
+    ],
+    'guard_band_half': [
+        ('limite', '#16a34a', 'Límite aceptación (EMP−U/2, por punto)'),
+        ('zona', '#22c55e', 'CUMPLE'),
+        ('zona', '#fde047', 'NO CUMPLE (banda w=U/2)'),
+        ('zona', '#ef4444', 'NO CUMPLE (fuera EMP)'),
+    ],
+    'guard_band_sqrt': [
+        ('limite', '#16a34a', 'Límite aceptación (√(EMP²−U²), por punto)'),
+        ('zona', '#22c55e', 'CUMPLE'),
+        ('zona', '#fde047', 'NO CUMPLE (banda óptima)'),
+        ('zona', '#ef4444', 'NO CUMPLE (fuera EMP)'),
+    ],
+    'conditional': [
+        ('limite', '#d97706', 'Límite zona gris (EMP−U, por punto)'),
+        ('zona', '#22c55e', 'CUMPLE'),
+        ('zona', '#fde047', 'CONDICIONAL (zona gris)'),
+        ('zona', '#ef4444', 'NO CUMPLE'),
+    ],
+}
+
+_ALFA_EXT = 0.07    # rojo: fuera de ±EMP
+_ALFA_BANDA = 0.25  # amarillo: banda de guarda
+_ALFA_OK = 0.10     # verde: zona cumple
+
+_lock = threading.Lock()
+# clave -> data URI
+_memoria = OrderedDict()
+
+
+def _config():
+    return getattr(settings, 'GRAFICAS_CONFIG', {})
+
+
+def _a_float(value, default=0.0):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return default
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+
+# ============================================================================
+# Datos normalizados (comunes a ambos backends)
+# ============================================================================
+
+def serie_confirmacion(puntos_medicion, emp_valor, emp_unidad):
+    """
+    Puntos normalizados por EMP: Y = error / EMP_absoluto (±1 = límite EMP),
+    ordenados por nominal, con los rangos de los ejes.
+
+    Returns:
+        dict | None: None si no hay puntos con nominal y error/lectura
+    """
+    puntos_validos = [p for p in puntos_medicion
+                      if p.get('nominal') and (p.get('error') is not None or p.get('lectura') is not None)]
+    if not puntos_validos:
+        return None
+    emp_valor = _a_float(emp_valor)
+
+    nominales = [_a_float(p.get('nominal', 0)) for p in puntos_validos]
+    errores = []
+    for p in puntos_validos:
+        if p.get('error') is not None:
+            errores.append(_a_float(p['error']))
+        else:
+            errores.append(_a_float(p.get('lectura', 0)) - _a_float(p['nominal']))
+    incertidumbres = [_a_float(p.get('incertidumbre', 0)) for p in puntos_validos]
+
+    # EMP absoluto por punto (unifica % y abs)
+    emps_abs = []
+    for n, p in zip(nominales, puntos_validos):
+        if p.get('emp_absoluto') is not None and _a_float(p['emp_absoluto']) != 0:
+            emps_abs.append(_a_float(p['emp_absoluto']))
+        elif emp_unidad == '%':
+            emps_abs.append(abs(n) * (emp_valor / 100) if n != 0 else emp_valor)
+        else:
+            emps_abs.append(emp_valor if emp_valor != 0 else 1)
+
+    y_norm = [e / ea if ea != 0 else 0 for e, ea in zip(errores, emps_abs)]
+    u_norm = [u / ea if ea != 0 else 0 for u, ea in zip(incertidumbres, emps_abs)]
+
+    # Ordenar por nominal: las zonas por punto requieren x monotónico
+    orden = sorted(range(len(nominales)), key=lambda i: nominales[i])
+    nominales = [nominales[i] for i in orden]
+    y_norm = [y_norm[i] for i in orden]
+    u_norm = [u_norm[i] for i in orden]
+    emps_abs = [emps_abs[i] for i in orden]
+
+    # Rango vertical: al menos ±1.6, o lo que requieran los datos
+    y_max_data = max((abs(y) + u for y, u in zip(y_norm, u_norm)), default=1.0)
+
+    # Escala log en X si el rango nominal supera 100x
+    nominales_pos = [n for n in nominales if n > 0]
+    usar_log = len(nominales_pos) > 1 and max(nominales_pos) / min(nominales_pos) > 100
+    if usar_log:
+        log_min = math.log10(min(nominales_pos))
+        log_max = math.log10(max(nominales_pos))
+        pad = (log_max - log_min) * 0.06
+        x_min, x_max = 10 ** (log_min - pad), 10 ** (log_max + pad)
+    else:
+        span = max(nominales) - min(nominales)
+        margin = span * 0.06 if span > 0 else abs(nominales[0]) * 0.5 or 1
+        x_min, x_max = min(nominales) - margin, max(nominales) + margin
+
+    return {
+        'nominales': nominales,
+        'y': y_norm,
+        'u': u_norm,
+        'emps': emps_abs,
+        'emp_variable': max(emps_abs) / min(emps_abs) > 1.05 if min(emps_abs) > 0 else False,
+        'y_max': max(1.6, y_max_data * 1.15),
+        'usar_log': usar_log,
+        'x_min': x_min,
+        'x_max': x_max,
+    }
+
+
+def limites_aceptacion(regla_decision, u_norm):
+    """
+    Límite de aceptación normalizado por punto según la regla, o None si la
+    zona de aceptación es ±1 completa (aceptación simple o regla desconocida).
+    """
+    if regla_decision in ('guard_band_U', 'conditional'):
+        return [max(0.0, 1.0 - un) for un in u_norm]
+    if regla_decision == 'guard_band_half':
+        return [max(0.0, 1.0 - un / 2.0) for un in u_norm]
+    if regla_decision == 'guard_band_sqrt':
+        return [(max(0.0, 1.0 - un ** 2)) ** 0.5 if un < 1.0 else 0.0 for un in u_norm]
+    return None
+
+
+def _titulo(regla_decision):
+    return (f'Confirmación Metrológica — {NOMBRES_REGLA.get(regla_decision, regla_decision)}',
+            'Eje Y normalizado por EMP  (±1 = límite EMP, ILAC G8:09/2019)')
+
+
+# ============================================================================
+# Backend SVG
+# ============================================================================
+
+def _marcas(inicio, fin, objetivo=8):
+    """Marcas "redondas" (1, 2, 2.5, 5 × 10^k) entre inicio y fin."""
+    span = fin - inicio
+    if span <= 0:
+        return [inicio]
+    exponente = 10 ** math.floor(math.log10(span / objetivo))
+    for factor in (1, 2, 2.5, 5, 10):
+        paso = factor * exponente
+        if span / paso <= objetivo:
+            break
+    primera = math.ceil(inicio / paso)
+    ultima = math.floor(fin / paso)
+    return [0.0 if i == 0 else i * paso for i in range(primera, ultima + 1)]
+
+
+def _f(v):
+    return f'{v:.1f}'
+
+
+def svg_confirmacion(serie, unidad_equipo, regla_decision='guard_band_U'):
+    """Documento SVG de la gráfica a partir de ``serie_confirmacion``."""
+    nominales, ys, us = serie['nominales'], serie['y'], serie['u']
+    n_puntos = len(nominales)
+    unidad = escape(str(unidad_equipo or ''))
+
+    ancho = max(760, 60 * n_puntos + 160)
+    leyenda = [('marcador', '#3b82f6', 'Error normalizado (Error/EMP) ± U'),
+               ('emp', '#dc2626', 'Límite EMP (variable)' if serie['emp_variable'] else '±EMP (límite)')]
+    leyenda.extend(LEYENDA_REGLA.get(regla_decision, []))
+    filas_leyenda = math.ceil(len(leyenda) / 3)
+    m_sup, m_der, m_inf, m_izq = 62, 80, 62 + 18 * filas_leyenda, 78
+    alto = 380 + m_inf
+    pw = ancho - m_izq - m_der
+    ph = alto - m_sup - m_inf
+    x_izq, x_der = m_izq, m_izq + pw
+
+    y_max = serie['y_max']
+
+    def ey(v):
+        return m_sup + ph * (y_max - v) / (2 * y_max)
+
+    if serie['usar_log']:
+        l_min, l_max = math.log10(serie['x_min']), math.log10(serie['x_max'])
+
+        def ex(v):
+            if v <= 0:
+                return x_izq
+            return x_izq + pw * (math.log10(v) - l_min) / (l_max - l_min)
+    else:
+        x_min, x_max = serie['x_min'], serie['x_max']
+
+        def ex(v):
+            return x_izq + pw * (v - x_min) / (x_max - x_min)
+
+    svg = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{ancho}" height="{alto}" '
+           f'viewBox="0 0 {ancho} {alto}" font-family="Arial, Helvetica, sans-serif">',
+           f'<rect width="{ancho}" height="{alto}" fill="white"/>']
+
+    def banda(x0, x1, v0, v1, color, alfa):
+        if v1 > v0 and x1 > x0:
+            svg.append(f'<rect x="{_f(x0)}" y="{_f(ey(v1))}" width="{_f(x1 - x0)}" '
+                       f'height="{_f(ey(v0) - ey(v1))}" fill="{color}" fill-opacity="{alfa}"/>')
+
+    # ── Zonas de color según la regla de decisión ──────────────────────────
+    banda(x_izq, x_der, 1.0, y_max, '#ef4444', _ALFA_EXT)
+    banda(x_izq, x_der, -y_max, -1.0, '#ef4444', _ALFA_EXT)
+
+    limites = limites_aceptacion(regla_decision, us)
+    color_limite = '#d97706' if regla_decision == 'conditional' else '#16a34a'
+    if limites is None:
+        alfa = _ALFA_OK if regla_decision == 'simple_acceptance' else 0.06
+        banda(x_izq, x_der, -1.0, 1.0, '#22c55e', alfa)
+    else:
+        if n_puntos == 1:
+            bordes, niveles = [x_izq, x_der], limites
+        else:
+            # Escalón por punto: cada límite rige desde su nominal hasta el siguiente
+            bordes = [x_izq] + [ex(v) for v in nominales] + [x_der]
+            niveles = [limites[0]] + limites
+        escalon_sup, escalon_inf = [], []
+        for x0, x1, lv in zip(bordes, bordes[1:], niveles):
+            banda(x0, x1, -lv, lv, '#22c55e', _ALFA_OK)
+            banda(x0, x1, lv, 1.0, '#fde047', _ALFA_BANDA)
+            banda(x0, x1, -1.0, -lv, '#fde047', _ALFA_BANDA)
+            escalon_sup.append(f'{_f(x0)},{_f(ey(lv))} {_f(x1)},{_f(ey(lv))}')
+            escalon_inf.append(f'{_f(x0)},{_f(ey(-lv))} {_f(x1)},{_f(ey(-lv))}')
+        if n_puntos > 1:
+            for escalon in (escalon_sup, escalon_inf):
+                svg.append(f'<polyline points="{" ".join(escalon)}" fill="none" stroke="{color_limite}" '
+                           f'stroke-width="1.5" stroke-dasharray="2,3"/>')
+
+    # ── Cuadrícula y marcas ────────────────────────────────────────────────
+    for v in _marcas(-y_max, y_max):
+        y = ey(v)
+        svg.append(f'<line x1="{x_izq}" y1="{_f(y)}" x2="{x_der}" y2="{_f(y)}" stroke="#9ca3af" '
+                   f'stroke-opacity="0.3" stroke-dasharray="4,3"/>')
+        svg.append(f'<text x="{x_izq - 6}" y="{_f(y + 4)}" text-anchor="end" font-size="10" '
+                   f'fill="#374151">{v:g}</text>')
+
+    if serie['usar_log']:
+        marcas_x = [10 ** k for k in range(math.ceil(l_min), math.floor(l_max) + 1)]
+    else:
+        marcas_x = _marcas(serie['x_min'], serie['x_max'])
+    for v in marcas_x:
+        x = ex(v)
+        svg.append(f'<line x1="{_f(x)}" y1="{m_sup}" x2="{_f(x)}" y2="{m_sup + ph}" stroke="#9ca3af" '
+                   f'stroke-opacity="0.3" stroke-dasharray="4,3"/>')
+        svg.append(f'<text x="{_f(x)}" y="{m_sup + ph + 15}" text-anchor="middle" font-size="10" '
+                   f'fill="#374151">{v:g}</text>')
+
+    # ── Límites EMP (siempre ±1) y línea cero ──────────────────────────────
+    if serie['emp_variable']:
+        x0, x1 = ex(nominales[0]), ex(nominales[-1])
+        for v in (1.0, -1.0):
+            svg.append(f'<line x1="{_f(x0)}" y1="{_f(ey(v))}" x2="{_f(x1)}" y2="{_f(ey(v))}" '
+                       f'stroke="#dc2626" stroke-width="2" stroke-dasharray="8,5"/>')
+        for v, emp in zip(nominales, serie['emps']):
+            svg.append(f'<text x="{_f(ex(v))}" y="{_f(ey(1.0) - 6)}" text-anchor="middle" font-size="8" '
+                       f'fill="darkred">{emp:.3g} {unidad}</text>')
+    else:
+        for v, etiqueta in ((1.0, '+EMP'), (-1.0, '−EMP')):
+            svg.append(f'<line x1="{x_izq}" y1="{_f(ey(v))}" x2="{x_der}" y2="{_f(ey(v))}" '
+                       f'stroke="#dc2626" stroke-width="2" stroke-dasharray="8,5"/>')
+            svg.append(f'<text x="{x_der + 5}" y="{_f(ey(v) + 4)}" font-size="10" font-weight="bold" '
+                       f'fill="#dc2626">{etiqueta}</text>')
+    svg.append(f'<line x1="{x_izq}" y1="{_f(ey(0))}" x2="{x_der}" y2="{_f(ey(0))}" stroke="black" '
+               f'stroke-opacity="0.3"/>')
+
+    # ── Puntos con barras de incertidumbre ─────────────────────────────────
+    radio = max(4, 9 - max(0, n_puntos - 8)) * 0.6
+    coordenadas = [(ex(v), ey(y)) for v, y in zip(nominales, ys)]
+    for (x, _), y, u in zip(coordenadas, ys, us):
+        if u > 0:
+            y_sup, y_inf = ey(y + u), ey(y - u)
+            svg.append(f'<path d="M{_f(x)},{_f(y_inf)}V{_f(y_sup)}M{_f(x - 4)},{_f(y_sup)}H{_f(x + 4)}'
+                       f'M{_f(x - 4)},{_f(y_inf)}H{_f(x + 4)}" stroke="#60a5fa" stroke-width="2" fill="none"/>')
+    if n_puntos > 1:
+        puntos = ' '.join(f'{_f(x)},{_f(y)}' for x, y in coordenadas)
+        svg.append(f'<polyline points="{puntos}" fill="none" stroke="#3b82f6" stroke-width="2"/>')
+    for x, y in coordenadas:
+        svg.append(f'<circle cx="{_f(x)}" cy="{_f(y)}" r="{_f(radio)}" fill="#3b82f6"/>')
+
+    # ── Marco, títulos y etiquetas ─────────────────────────────────────────
+    svg.append(f'<rect x="{x_izq}" y="{m_sup}" width="{pw}" height="{ph}" fill="none" stroke="#374151"/>')
+    titulo, subtitulo = _titulo(regla_decision)
+    cx = x_izq + pw / 2
+    svg.append(f'<text x="{_f(cx)}" y="22" text-anchor="middle" font-size="14" font-weight="bold" '
+               f'fill="#111827">{titulo}</text>')
+    svg.append(f'<text x="{_f(cx)}" y="40" text-anchor="middle" font-size="11" fill="#374151">{subtitulo}</text>')
+    svg.append(f'<text x="{_f(cx)}" y="{m_sup + ph + 34}" text-anchor="middle" font-size="12" font-weight="bold" '
+               f'fill="#111827">Valor Nominal ({unidad})</text>')
+    cy = m_sup + ph / 2
+    svg.append(f'<text x="20" y="{_f(cy)}" text-anchor="middle" font-size="12" font-weight="bold" fill="#111827" '
+               f'transform="rotate(-90 20 {_f(cy)})">Error normalizado  (Error / EMP)</text>')
+
+    # ── Leyenda inferior (3 columnas) ──────────────────────────────────────
+    ancho_columna = pw / 3
+    for i, (tipo, color, texto) in enumerate(leyenda):
+        x = x_izq + (i % 3) * ancho_columna + 10
+        y = m_sup + ph + 56 + (i // 3) * 18
+        if tipo == 'zona':
+            svg.append(f'<rect x="{_f(x)}" y="{y - 9}" width="22" height="11" fill="{color}" fill-opacity="0.5"/>')
+        else:
+            trazo = {'marcador': '', 'emp': ' stroke-dasharray="6,3"', 'limite': ' stroke-dasharray="2,3"'}[tipo]
+            svg.append(f'<line x1="{_f(x)}" y1="{y - 4}" x2="{_f(x + 22)}" y2="{y - 4}" stroke="{color}" '
+                       f'stroke-width="2"{trazo}/>')
+            if tipo == 'marcador':
+                svg.append(f'<circle cx="{_f(x + 11)}" cy="{y - 4}" r="3.5" fill="{color}"/>')
+        svg.append(f'<text x="{_f(x + 28)}" y="{y}" font-size="10" fill="#111827">{escape(texto)}</text>')
+
+    svg.append('</svg>')
+    return ''.join(svg)
+
+
+def grafica_confirmacion_svg(puntos_medicion, emp_valor, emp_unidad, unidad_equipo,
+                             regla_decision='guard_band_U'):
+    """Gráfica SVG como data URI (None sin puntos válidos)."""
+    serie = serie_confirmacion(puntos_medicion, emp_valor, emp_unidad)
+    if serie is None:
+        return None
+    svg = svg_confirmacion(serie, unidad_equipo, regla_decision)
+    return 'data:image/svg+xml;base64,' + base64.b64encode(svg.encode('utf-8')).decode('ascii')
+
+
+# ============================================================================
+# Backend matplotlib (respaldo)
+# ============================================================================
+
+def grafica_confirmacion_png(puntos_medicion, emp_valor, emp_unidad, unidad_equipo,
+                             regla_decision='guard_band_U'):
+    """Gráfica PNG de 150 dpi con matplotlib como data URI (None sin puntos válidos)."""
+    serie = serie_confirmacion(puntos_medicion, emp_valor, emp_unidad)
+    if serie is None:
+        return None
+
+    import matplotlib
+    matplotlib.use('Agg')  # Backend sin GUI
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as mpatches
+    from matplotlib.lines import Line2D
+
+    nominales, y_norm, u_norm = serie['nominales'], serie['y'], serie['u']
+    x_min_plot, x_max_plot, y_max_plot = serie['x_min'], serie['x_max'], serie['y_max']
+    n_puntos = len(nominales)
+    markersize = max(4, 9 - max(0, n_puntos - 8))
+
+    fig, ax = plt.subplots(figsize=(max(12, n_puntos * 0.9), 6))
+    try:
+        if serie['usar_log']:
+            ax.set_xscale('log')
+        ax.set_xlim(x_min_plot, x_max_plot)
+
+        _Z = 0        # zorder zonas
+        _ZL = 1       # zorder líneas límite
+
+        # Zona roja siempre fuera de ±1 (límite EMP normalizado)
+        ax.axhspan(1.0, y_max_plot, alpha=_ALFA_EXT, color='#ef4444', zorder=_Z)
+        ax.axhspan(-y_max_plot, -1.0, alpha=_ALFA_EXT, color='#ef4444', zorder=_Z)
+
+        limites = limites_aceptacion(regla_decision, u_norm)
+        color_limite = '#d97706' if regla_decision == 'conditional' else '#16a34a'
+        if limites is None:
+            alfa = _ALFA_OK if regla_decision == 'simple_acceptance' else 0.06
+            ax.axhspan(-1.0, 1.0, alpha=alfa, color='#22c55e', zorder=_Z)
+        elif n_puntos == 1:
+            lv = limites[0]
+            ax.axhspan(-lv, lv, alpha=_ALFA_OK, color='#22c55e', zorder=_Z)
+            if lv < 1.0:
+                ax.axhspan(lv, 1.0, alpha=_ALFA_BANDA, color='#fde047', zorder=_Z)
+                ax.axhspan(-1.0, -lv, alpha=_ALFA_BANDA, color='#fde047', zorder=_Z)
+        else:
+            x_ext = [x_min_plot] + list(nominales) + [x_max_plot]
+            lv_ext = [limites[0]] + list(limites) + [limites[-1]]
+            lv_neg = [-v for v in lv_ext]
+            ax.fill_between(x_ext, lv_neg, lv_ext, alpha=_ALFA_OK, color='#22c55e',
+                            step='post', zorder=_Z)
+            ax.fill_between(x_ext, lv_ext, [1.0] * len(x_ext), alpha=_ALFA_BANDA,
+                            color='#fde047', step='post', zorder=_Z)
+            ax.fill_between(x_ext, [-1.0] * len(x_ext), lv_neg, alpha=_ALFA_BANDA,
+                            color='#fde047', step='post', zorder=_Z)
+            ax.step(x_ext, lv_ext, where='post', color=color_limite, linestyle=':',
+                    linewidth=1.5, zorder=_ZL)
+            ax.step(x_ext, lv_neg, where='post', color=color_limite, linestyle=':',
+                    linewidth=1.5, zorder=_ZL)
+
+        ax.errorbar(nominales, y_norm, yerr=u_norm,
+                    fmt='o-', color='#3b82f6', linewidth=2, markersize=markersize,
+                    ecolor='#60a5fa', elinewidth=2, capsize=4, capthick=2,
+                    label='Error normalizado (Error/EMP) ± U', zorder=3)
+
+        if serie['emp_variable']:
+            ax.step(nominales, [1.0] * n_puntos, where='mid',
+                    color='#dc2626', linestyle='--', linewidth=2,
+                    label='Límite EMP (variable)', zorder=2)
+            ax.step(nominales, [-1.0] * n_puntos, where='mid',
+                    color='#dc2626', linestyle='--', linewidth=2, zorder=2)
+            for n, ea in zip(nominales, serie['emps']):
+                ax.annotate(f'{ea:.3g} {unidad_equipo}', xy=(n, 1.0), xytext=(0, 6),
+                            textcoords='offset points', ha='center',
+                            fontsize=7, color='darkred')
+        else:
+            ax.axhline(y=1.0, color='#dc2626', linestyle='--', linewidth=2,
+                       label='+EMP (límite)', zorder=2)
+            ax.axhline(y=-1.0, color='#dc2626', linestyle='--', linewidth=2,
+                       label='−EMP (límite)', zorder=2)
+
+        ax.axhline(y=0, color='black', linestyle='-', linewidth=1, alpha=0.3, zorder=1)
+
+        titulo, subtitulo = _titulo(regla_decision)
+        ax.set_xlabel(f'Valor Nominal ({unidad_equipo})', fontsize=12, fontweight='bold')
+        ax.set_ylabel('Error normalizado  (Error / EMP)', fontsize=12, fontweight='bold')
+        ax.set_title(f'{titulo}\n{subtitulo}', fontsize=12, fontweight='bold', pad=20)
+        ax.set_ylim(-y_max_plot, y_max_plot)
+
+        legend_elements = [
+            Line2D([0], [0], color='#3b82f6', marker='o', markersize=6,
+                   label='Error normalizado (Error/EMP) ± U'),
+            Line2D([0], [0], color='#dc2626', linestyle='--', linewidth=2,
+                   label='Límite EMP (variable)' if serie['emp_variable'] else '±EMP (límite)'),
+        ]
+        for tipo, color, texto in LEYENDA_REGLA.get(regla_decision, []):
+            if tipo == 'zona':
+                legend_elements.append(mpatches.Patch(facecolor=color, alpha=0.5, label=texto))
+            else:
+                legend_elements.append(Line2D([0], [0], color=color, linestyle=':', linewidth=2, label=texto))
+
+        ax.legend(handles=legend_elements, loc='upper center', bbox_to_anchor=(0.5, -0.12),
+                  ncol=3, fontsize=9, framealpha=0.95, edgecolor='gray')
+        ax.grid(True, alpha=0.3, linestyle='--')
+        plt.tight_layout()
+        plt.subplots_adjust(bottom=0.15)
+
+        buffer = BytesIO()
+        plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
+        buffer.seek(0)
+        return 'data:image/png;base64,' + base64.b64encode(buffer.read()).decode('utf-8')
+    finally:
+        plt.close(fig)
+
+
+# ============================================================================
+# API memoizada
+# ============================================================================
+
+def clave_grafica(puntos_medicion, emp_valor, emp_unidad, unidad_equipo, regla_decision, backend=None):
+    """Hash de lo que determina la gráfica (solo los campos dibujados de cada punto)."""
+    puntos = [{campo: p.get(campo) for campo in _CAMPOS_PUNTO} for p in puntos_medicion or []]
+    contenido = json.dumps(
+        [backend or _config().get('BACKEND', DEFAULT_BACKEND), puntos, emp_valor, emp_unidad,
+         unidad_equipo, regla_decision],
+        sort_keys=True, default=str,
+    )
+    return CACHE_PREFIX + hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def _leer(clave):
+    with _lock:
+        imagen = _memoria.get(clave)
+        if imagen is not None:
+            _memoria.move_to_end(clave)
+            return imagen
+    try:
+        imagen = cache.get(clave)
+    except Exception as e:
+        logger.warning(f"Error leyendo gráfica de la caché: {e}")
+        return None
+    if imagen is not None:
+        _guardar_en_memoria(clave, imagen)
+    return imagen
+
+
+def _guardar_en_memoria(clave, imagen):
+    with _lock:
+        _memoria[clave] = imagen
+        _memoria.move_to_end(clave)
+        while len(_memoria) > _config().get('MAX_MEMORIA', DEFAULT_MAX_MEMORIA):
+            _memoria.popitem(last=False)
+
+
+def grafica_confirmacion(puntos_medicion, emp_valor, emp_unidad, unidad_equipo,
+                         regla_decision='guard_band_U'):
+    """
+    Gráfica de confirmación como data URI, memoizada por sus datos.
+    Usa el backend de ``GRAFICAS_CONFIG['BACKEND']`` (``'svg'`` por defecto)
+    y recurre a matplotlib si el SVG falla.
+
+    Returns:
+        str | None: None si no hay puntos válidos o ningún backend pudo dibujarla
+    """
+    backend = _config().get('BACKEND', DEFAULT_BACKEND)
+    clave = clave_grafica(puntos_medicion, emp_valor, emp_unidad, unidad_equipo, regla_decision, backend)
+    imagen = _leer(clave)
+    if imagen is not None:
+        return imagen
+
+    generadores = [('matplotlib', grafica_confirmacion_png)]
+    if backend == 'svg':
+        generadores.insert(0, ('svg', grafica_confirmacion_svg))
+    for nombre, generar in generadores:
+        try:
+            imagen = generar(puntos_medicion, emp_valor, emp_unidad, unidad_equipo, regla_decision)
+            break
+        except Exception as e:
+            logger.error(f"Error generando gráfica confirmacion ({nombre}): {e}")
+    else:
+        return None
+
+    if imagen:
+        _guardar_en_memoria(clave, imagen)
+        try:
+            cache.set(clave, imagen, timeout=_config().get('CACHE_SEGUNDOS', DEFAULT_CACHE_SEGUNDOS))
+        except Exception as e:
+            logger.warning(f"Error guardando gráfica en la caché: {e}")
+    return imagen
+
+
+def limpiar_memoria():
+    """Vacía la caché en memoria del proceso (tests)."""
+    with _lock:
+        _memoria.clear()
@@ -0,0 +1,282 @@
+# core/limitador.py
+# Limitador de peticiones de ventana deslizante: script Lua en Redis, caché compartida o contadores en proceso
+
+import logging
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('core.security')
+
+PREFIJO = 'rl:'
+CLAVE_METRICAS = 'rl:metricas'
+MAX_CONTADORES_MEMORIA = 10000
+
+Resultado = namedtuple('Resultado', 'permitido ambito conteo limite')
+
+# KEYS: actual_1, previa_1, ..., actual_n, previa_n, metricas
+# ARGV: costo, ttl, peso_previa, limite_1, ..., limite_n, tipo
+_SCRIPT_LUA = """
+local n = (#KEYS - 1) / 2
+local costo = tonumber(ARGV[1])
+local peso = tonumber(ARGV[3])
+local excedido = 0
+local estimados = {}
+for i = 1, n do
+    local actual = tonumber(redis.call('GET', KEYS[2 * i - 1]) or '0')
+    local previa = tonumber(redis.call('GET', KEYS[2 * i]) or '0')
+    local estimado = previa * peso + actual
+    estimados[i] = math.floor(estimado)
+    if excedido == 0 and estimado + math.max(costo, 1) > tonumber(ARGV[3 + i]) then
+        excedido = i
+    end
+end
+if excedido == 0 and costo > 0 then
+    for i = 1, n do
+        redis.call('INCRBY', KEYS[2 * i - 1], costo)
+        redis.call('EXPIRE', KEYS[2 * i - 1], ARGV[2])
+    end
+end
+local resultado = ':permitidas'
+if excedido > 0 then
+    resultado = ':bloqueadas'
+end
+redis.call('HINCRBY', KEYS[#KEYS], ARGV[4 + n] .. resultado, 1)
+return {excedido, unpack(estimados)}
+"""
+
+
+def _ventana(periodo, ahora):
+    indice = int(ahora // periodo)
+    peso_previa = 1 - (ahora - indice * periodo) / periodo
+    return indice, peso_previa
+
+
+class _LimitadorRedis:
+    """Todos los ámbitos de una petición en una llamada EVALSHA."""
+
+    nombre = 'redis'
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+        self.script = cliente.register_script(_SCRIPT_LUA)
+
+    def consumir(self, tipo, ambitos, periodo, costo, ahora):
+        indice, peso = _ventana(periodo, ahora)
+        claves = []
+        for ambito, identificador, _ in ambitos:
+            base = f"{PREFIJO}{tipo}:{ambito}:{identificador}:"
+            claves.extend([cache.make_key(f"{base}{indice}"), cache.make_key(f"{base}{indice - 1}")])
+        claves.append(cache.make_key(CLAVE_METRICAS))
+        argumentos = [costo, periodo * 2, peso, *(limite for _, _, limite in ambitos), tipo]
+
+        excedido, *estimados = self.script(keys=claves, args=argumentos)
+        return int(excedido), [int(e) for e in estimados]
+
+    def metricas(self):
+        crudo = self.cliente.hgetall(cache.make_key(CLAVE_METRICAS))
+        return {
+            (campo.decode() if isinstance(campo, bytes) else campo): int(valor)
+            for campo, valor in crudo.items()
+        }
+
+
+class _LimitadorCache:
+    """
+    Contadores de ventana en la caché compartida (``add`` + ``incr`` con TTL).
+    Cada ámbito se incrementa antes de compararlo con su límite y el exceso se
+    deshace, para que peticiones concurrentes no pasen todas la comprobación.
+    """
+
+    nombre = 'cache'
+
+    def _incrementar(self, clave, costo, ttl):
+        """Suma ``costo`` a ``clave`` y retorna el valor resultante."""
+        cache.add(clave, 0, ttl)
+        try:
+            valor = cache.incr(clave, costo)
+        except ValueError:
+            # La clave se desalojó entre add e incr
+            cache.set(clave, costo, ttl)
+            valor = costo
+        # El incr de la caché en BD reescribe la fila con el TIMEOUT por defecto
+        cache.touch(clave, ttl)
+        return valor
+
+    def _deshacer(self, clave, costo, ttl):
+        try:
+            cache.decr(clave, costo)
+        except ValueError:
+            return
+        cache.touch(clave, ttl)
+
+    def consumir(self, tipo, ambitos, periodo, costo, ahora):
+        indice, peso = _ventana(periodo, ahora)
+        claves = []
+        for ambito, identificador, _ in ambitos:
+            base = f"{PREFIJO}{tipo}:{ambito}:{identificador}:"
+            claves.append((f"{base}{indice}", f"{base}{indice - 1}"))
+        valores = cache.get_many([clave for par in claves for clave in par])
+        conteos = [valores.get(previa, 0) * peso + valores.get(actual, 0) for actual, previa in claves]
+        estimados = [int(conteo) for conteo in conteos]
+
+        excedido = 0
+        if costo > 0:
+            incrementadas = []
+            for posicion, ((actual, previa), (_, _, limite)) in enumerate(zip(claves, ambitos), start=1):
+                incrementadas.append(actual)
+                estimado = valores.get(previa, 0) * peso + self._incrementar(actual, costo, periodo * 2)
+                estimados[posicion - 1] = int(estimado - costo)
+                if estimado > limite:
+                    excedido = posicion
+                    break
+            if excedido:
+                for actual in incrementadas:
+                    self._deshacer(actual, costo, periodo * 2)
+        else:
+            excedido = next(
+                (posicion for posicion, (conteo, (_, _, limite)) in enumerate(zip(conteos, ambitos), start=1)
+                 if conteo + 1 > limite),
+                0,
+            )
+
+        resultado = 'bloqueadas' if excedido else 'permitidas'
+        self._incrementar(f"{CLAVE_METRICAS}:{tipo}:{resultado}", 1, None)
+        return excedido, estimados
+
+    def metricas(self):
+        tipos = getattr(settings, 'RATE_LIMIT_CONFIG', {})
+        prefijo = f"{CLAVE_METRICAS}:"
+        claves = [f"{prefijo}{tipo}:{resultado}" for tipo in tipos for resultado in ('permitidas', 'bloqueadas')]
+        return {clave[len(prefijo):]: valor for clave, valor in cache.get_many(claves).items()}
+
+
+class _LimitadorMemoria:
+    """Contadores de ventana por proceso, protegidos por un lock."""
+
+    nombre = 'memoria'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores = {}
+        self._metricas = defaultdict(int)
+
+    def consumir(self, tipo, ambitos, periodo, costo, ahora):
+        indice, peso = _ventana(periodo, ahora)
+        with self._lock:
+            if len(self._contadores) > MAX_CONTADORES_MEMORIA:
+                self._purgar(ahora)
+
+            excedido, estimados = 0, []
+            for posicion, (ambito, identificador, limite) in enumerate(ambitos, start=1):
+                base = (tipo, ambito, identificador)
+                actual = self._contadores.get((*base, indice), (0, 0))[0]
+                previa = self._contadores.get((*base, indice - 1), (0, 0))[0]
+                estimado = previa * peso + actual
+                estimados.append(int(estimado))
+                if not excedido and estimado + max(costo, 1) > limite:
+                    excedido = posicion
+
+            if not excedido and costo > 0:
+                for ambito, identificador, _ in ambitos:
+                    clave = (tipo, ambito, identificador, indice)
+                    actual = self._contadores.get(clave, (0, 0))[0]
+                    self._contadores[clave] = (actual + costo, ahora + periodo * 2)
+
+            self._metricas[f"{tipo}:{'bloqueadas' if excedido else 'permitidas'}"] += 1
+        return excedido, estimados
+
+    def _purgar(self, ahora):
+        vencidas = [clave for clave, (_, vence) in self._contadores.items() if vence <= ahora]
+        for clave in vencidas:
+            del self._contadores[clave]
+        if len(self._contadores) > MAX_CONTADORES_MEMORIA:
+            self._contadores.clear()
+
+    def metricas(self):
+        with self._lock:
+            return dict(self._metricas)
+
+
+_limitador = None
+_lock_limitador = threading.Lock()
+
+
+def _crear_limitador():
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if 'django_redis' in backend:
+        try:
+            from django_redis import get_redis_connection
+            return _LimitadorRedis(get_redis_connection('default'))
+        except Exception as e:
+            logger.error(f"No se pudo usar Redis para rate limiting, se usa la caché: {e}")
+    if 'locmem' in backend or 'dummy' in backend:
+        return _LimitadorMemoria()
+    return _LimitadorCache()
+
+
+def obtener_limitador():
+    """Backend del proceso: Redis, la caché compartida o contadores en memoria (LocMem)."""
+    global _limitador
+    if _limitador is None:
+        with _lock_limitador:
+            if _limitador is None:
+                _limitador = _crear_limitador()
+    return _limitador
+
+
+def reiniciar():
+    """Descarta el backend y sus contadores en memoria (tests)."""
+    global _limitador
+    with _lock_limitador:
+        _limitador = None
+
+
+def ambitos_de_peticion(request, client_ip, config):
+    """
+    Ámbitos a limitar: ``[(ambito, identificador, limite), ...]``.
+    La IP usa ``limit``; ``limit_usuario`` y ``limit_empresa`` (opcionales)
+    limitan además al usuario autenticado y a su empresa.
+    """
+    ambitos = [('ip', client_ip, config.get('limit', 10))]
+    usuario = getattr(request, 'user', None)
+    if usuario is not None and usuario.is_authenticated:
+        if config.get('limit_usuario'):
+            ambitos.append(('usuario', usuario.pk, config['limit_usuario']))
+        if config.get('limit_empresa') and getattr(usuario, 'empresa_id', None):
+            ambitos.append(('empresa', usuario.empresa_id, config['limit_empresa']))
+    return ambitos
+
+
+def consumir(tipo, ambitos, periodo, costo=1):
+    """
+    Comprueba los ``ambitos`` y, si ninguno excede su límite, suma ``costo``
+    a todos (``costo=0`` solo comprueba). Un único viaje a Redis.
+
+    Returns:
+        Resultado(permitido, ambito, conteo, limite): ``ambito`` es el ámbito
+        excedido (o None) y ``conteo`` su conteo estimado.
+    """
+    excedido, estimados = obtener_limitador().consumir(tipo, ambitos, periodo, costo, time.time())
+    if excedido:
+        ambito, _, limite = ambitos[excedido - 1]
+        return Resultado(False, ambito, estimados[excedido - 1], limite)
+    return Resultado(True, None, estimados[0] if estimados else 0, ambitos[0][2] if ambitos else None)
+
+
+def metricas():
+    """
+    ``{'backend': ..., 'tipos': {tipo: {'permitidas': n, 'bloqueadas': n}}}``.
+    """
+    limitador = obtener_limitador()
+    tipos = defaultdict(lambda: {'permitidas': 0, 'bloqueadas': 0})
+    try:
+        for campo, valor in limitador.metricas().items():
+            tipo, _, resultado = campo.rpartition(':')
+            tipos[tipo][resultado] = valor
+    except Exception as e:
+        logger.error(f"Error leyendo métricas de rate limiting: {e}")
+    return {'backend': limitador.nombre, 'tipos': dict(tipos)}
@@ -2,16 +2,11 @@
 # Sistema de backup completo de datos
 
 from django.core.management.base import BaseCommand
-from django.core import serializers
 from django.conf import settings
 from django.utils import timezone
-from django.core.files.storage import default_storage
-from core.models import Empresa, Equipo, Calibracion, Mantenimiento, Comprobacion, CustomUser
-import json
+from core.models import Empresa
+from core import backup_stream
 import os
-import zipfile
-import tempfile
-from datetime import datetime
 import logging
 
 logger = logging.getLogger('core')
@@ -37,6 +32,16 @@ class Command(BaseCommand):
             action='store_true',
             help='Incluir archivos adjuntos en el backup'
         )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Solo filas y archivos cambiados desde el último backup (manifiesto en el storage)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Hilos para leer archivos adjuntos (por defecto BACKUP_CONFIG)'
+        )
         parser.add_argument(
             '--output-dir',
             type=str,
@@ -55,6 +60,8 @@ class Command(BaseCommand):
         include_files = options['include_files']
         output_dir = options['output_dir']
         verbose = options['verbose']
+        self.incremental = options.get('incremental', False)
+        self.workers = options.get('workers')
 
         # Crear directorio de backup
         backup_path = os.path.join(settings.BASE_DIR, output_dir)
@@ -86,258 +93,63 @@ class Command(BaseCommand):
             )
 
     def backup_empresa(self, empresa, backup_path, timestamp, backup_format, include_files, verbose):
-        """Crea backup completo de una empresa."""
+        """Crea backup de una empresa en streaming (ver core/backup_stream.py)."""
         if verbose:
             self.stdout.write(f'   Procesando Procesando: {empresa.nombre}')
 
         try:
-            # Preparar datos para serialización
-            backup_data = self.gather_empresa_data(empresa, verbose)
-
             # Crear nombre de archivo
             safe_name = "".join(c for c in empresa.nombre if c.isalnum() or c in (' ', '-', '_')).rstrip()
             safe_name = safe_name.replace(' ', '_')
+            prefijo = 'incremental' if self.incremental else 'backup'
 
+            json_path = zip_path = None
             if backup_format in ['json', 'both']:
-                json_filename = f'backup_{safe_name}_{timestamp}.json'
-                json_path = os.path.join(backup_path, json_filename)
-                self.create_json_backup(backup_data, json_path, verbose)
-
+                json_path = os.path.join(backup_path, f'{prefijo}_{safe_name}_{timestamp}.jsonl')
             if backup_format in ['zip', 'both']:
-                zip_filename = f'backup_{safe_name}_{timestamp}.zip'
-                zip_path = os.path.join(backup_path, zip_filename)
-                self.create_zip_backup(empresa, backup_data, zip_path, include_files, verbose)
-
-            if verbose:
-                self.stdout.write(f'   OK Backup completado para: {empresa.nombre}')
-
-        except Exception as e:
-            logger.error(f'Error backing up empresa {empresa.nombre}: {e}')
-            self.stdout.write(
-                self.style.ERROR(f'   ERROR Error en backup de {empresa.nombre}: {e}')
+                zip_path = os.path.join(backup_path, f'{prefijo}_{safe_name}_{timestamp}.zip')
+
+            resultado = backup_stream.escribir_backup(
+                empresa,
+                ruta_jsonl=json_path,
+                ruta_zip=zip_path,
+                incluir_archivos=include_files,
+                incremental=self.incremental,
+                workers=self.workers,
             )
-
-    def gather_empresa_data(self, empresa, verbose=False):
-        """Recopila todos los datos de una empresa."""
-        data = {
-            'metadata': {
-                'empresa_id': empresa.id,
-                'empresa_nombre': empresa.nombre,
-                'backup_date': timezone.now().isoformat(),
-                'version': '1.0'
-            },
-            'empresa': {},
-            'usuarios': [],
-            'equipos': [],
-            'calibraciones': [],
-            'mantenimientos': [],
-            'comprobaciones': []
-        }
-
-        try:
-            # Datos de la empresa
-            empresa_data = serializers.serialize('json', [empresa])
-            data['empresa'] = json.loads(empresa_data)[0]
-
-            # Usuarios de la empresa
-            usuarios = CustomUser.objects.filter(empresa=empresa)
-            if usuarios.exists():
-                usuarios_data = serializers.serialize('json', usuarios)
-                data['usuarios'] = json.loads(usuarios_data)
-
-            # Equipos de la empresa
-            equipos = empresa.equipos.all()
-            if equipos.exists():
-                equipos_data = serializers.serialize('json', equipos)
-                data['equipos'] = json.loads(equipos_data)
-
-                # Actividades de cada equipo
-                for equipo in equipos:
-                    # Calibraciones
-                    calibraciones = equipo.calibraciones.all()
-                    if calibraciones.exists():
-                        cal_data = serializers.serialize('json', calibraciones)
-                        data['calibraciones'].extend(json.loads(cal_data))
-
-                    # Mantenimientos
-                    mantenimientos = equipo.mantenimientos.all()
-                    if mantenimientos.exists():
-                        mant_data = serializers.serialize('json', mantenimientos)
-                        data['mantenimientos'].extend(json.loads(mant_data))
-
-                    # Comprobaciones
-                    comprobaciones = equipo.comprobaciones.all()
-                    if comprobaciones.exists():
-                        comp_data = serializers.serialize('json', comprobaciones)
-                        data['comprobaciones'].extend(json.loads(comp_data))
+            # El manifiesto solo avanza cuando el backup quedó escrito
+            backup_stream.guardar_manifiesto(empresa.pk, resultado['manifiesto'])
 
             if verbose:
+                conteos = resultado['conteos']
                 self.stdout.write(
-                    f'     - Equipos: {len(data["equipos"])}, '
-                    f'Calibraciones: {len(data["calibraciones"])}, '
-                    f'Mantenimientos: {len(data["mantenimientos"])}, '
-                    f'Comprobaciones: {len(data["comprobaciones"])}'
+                    f'     - Backup {resultado["tipo"]}: '
+                    f'Equipos: {conteos["equipos"]}, '
+                    f'Calibraciones: {conteos["calibraciones"]}, '
+                    f'Mantenimientos: {conteos["mantenimientos"]}, '
+                    f'Comprobaciones: {conteos["comprobaciones"]}'
                 )
-
-            return data
-
-        except Exception as e:
-            logger.error(f'Error gathering data for {empresa.nombre}: {e}')
-            raise
-
-    def create_json_backup(self, backup_data, json_path, verbose=False):
-        """Crea backup en formato JSON."""
-        try:
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(backup_data, f, ensure_ascii=False, indent=2)
+                if resultado['eliminados']:
+                    total = sum(len(pks) for pks in resultado['eliminados'].values())
+                    self.stdout.write(f'     - Eliminados desde el backup anterior: {total}')
+                if resultado['archivos']:
+                    self.stdout.write(f'     📁 Archivos incluidos: {resultado["archivos"]}')
+
+            for path in (json_path, zip_path):
+                if path:
+                    if verbose:
+                        self.stdout.write(f'     OK Backup: {os.path.basename(path)}')
+                    # Subir a S3 automáticamente
+                    self.upload_to_s3(path, verbose)
 
             if verbose:
-                self.stdout.write(f'     OK JSON backup: {os.path.basename(json_path)}')
-
-            # Subir a S3 automáticamente
-            self.upload_to_s3(json_path, verbose)
-
-        except Exception as e:
-            logger.error(f'Error creating JSON backup: {e}')
-            raise
-
-    def create_zip_backup(self, empresa, backup_data, zip_path, include_files, verbose=False):
-        """Crea backup completo en formato ZIP."""
-        try:
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                # Añadir datos JSON
-                json_data = json.dumps(backup_data, ensure_ascii=False, indent=2)
-                zipf.writestr('data.json', json_data.encode('utf-8'))
-
-                # Añadir archivos si se solicita
-                if include_files:
-                    files_added = self.add_files_to_zip(empresa, zipf, verbose)
-                    if verbose and files_added > 0:
-                        self.stdout.write(f'     📁 Archivos incluidos: {files_added}')
-
-                # Añadir información del backup
-                info = {
-                    'empresa': empresa.nombre,
-                    'fecha_backup': timezone.now().isoformat(),
-                    'incluye_archivos': include_files,
-                    'version': '1.0'
-                }
-                zipf.writestr('backup_info.json', json.dumps(info, ensure_ascii=False, indent=2))
-
-            if verbose:
-                self.stdout.write(f'     OK ZIP backup: {os.path.basename(zip_path)}')
-
-            # Subir a S3 automáticamente
-            self.upload_to_s3(zip_path, verbose)
-
-        except Exception as e:
-            logger.error(f'Error creating ZIP backup: {e}')
-            raise
-
-    def add_files_to_zip(self, empresa, zipf, verbose=False):
-        """Añade archivos de la empresa al ZIP."""
-        files_added = 0
-
-        try:
-            # Logo de empresa
-            if empresa.logo_empresa and hasattr(empresa.logo_empresa, 'name'):
-                if default_storage.exists(empresa.logo_empresa.name):
-                    try:
-                        file_content = default_storage.open(empresa.logo_empresa.name).read()
-                        zipf.writestr(f'files/empresa/logo_{empresa.logo_empresa.name}', file_content)
-                        files_added += 1
-                    except Exception:
-                        pass
-
-            # Archivos de equipos
-            for equipo in empresa.equipos.all():
-                files_added += self.add_equipo_files_to_zip(equipo, zipf)
-
-            return files_added
-
-        except Exception as e:
-            logger.error(f'Error adding files to ZIP: {e}')
-            return files_added
-
-    def add_equipo_files_to_zip(self, equipo, zipf):
-        """Añade archivos de un equipo específico al ZIP."""
-        files_added = 0
-
-        try:
-            # Archivos principales del equipo
-            file_fields = [
-                'archivo_compra_pdf', 'ficha_tecnica_pdf', 'manual_pdf',
-                'otros_documentos_pdf', 'imagen_equipo'
-            ]
-
-            for field_name in file_fields:
-                file_field = getattr(equipo, field_name, None)
-                if file_field and hasattr(file_field, 'name'):
-                    if default_storage.exists(file_field.name):
-                        try:
-                            file_content = default_storage.open(file_field.name).read()
-                            safe_filename = os.path.basename(file_field.name)
-                            zipf.writestr(
-                                f'files/equipos/{equipo.codigo_interno}/{field_name}/{safe_filename}',
-                                file_content
-                            )
-                            files_added += 1
-                        except Exception:
-                            pass
-
-            # Archivos de calibraciones
-            for calibracion in equipo.calibraciones.all():
-                cal_fields = ['documento_calibracion', 'confirmacion_metrologica_pdf', 'intervalos_calibracion_pdf']
-                for field_name in cal_fields:
-                    file_field = getattr(calibracion, field_name, None)
-                    if file_field and hasattr(file_field, 'name'):
-                        if default_storage.exists(file_field.name):
-                            try:
-                                file_content = default_storage.open(file_field.name).read()
-                                safe_filename = os.path.basename(file_field.name)
-                                zipf.writestr(
-                                    f'files/equipos/{equipo.codigo_interno}/calibraciones/{calibracion.id}/{safe_filename}',
-                                    file_content
-                                )
-                                files_added += 1
-                            except Exception:
-                                pass
-
-            # Archivos de mantenimientos
-            for mantenimiento in equipo.mantenimientos.all():
-                if mantenimiento.documento_mantenimiento and hasattr(mantenimiento.documento_mantenimiento, 'name'):
-                    if default_storage.exists(mantenimiento.documento_mantenimiento.name):
-                        try:
-                            file_content = default_storage.open(mantenimiento.documento_mantenimiento.name).read()
-                            safe_filename = os.path.basename(mantenimiento.documento_mantenimiento.name)
-                            zipf.writestr(
-                                f'files/equipos/{equipo.codigo_interno}/mantenimientos/{mantenimiento.id}/{safe_filename}',
-                                file_content
-                            )
-                            files_added += 1
-                        except Exception:
-                            pass
-
-            # Archivos de comprobaciones
-            for comprobacion in equipo.comprobaciones.all():
-                if comprobacion.documento_comprobacion and hasattr(comprobacion.documento_comprobacion, 'name'):
-                    if default_storage.exists(comprobacion.documento_comprobacion.name):
-                        try:
-                            file_content = default_storage.open(comprobacion.documento_comprobacion.name).read()
-                            safe_filename = os.path.basename(comprobacion.documento_comprobacion.name)
-                            zipf.writestr(
-                                f'files/equipos/{equipo.codigo_interno}/comprobaciones/{comprobacion.id}/{safe_filename}',
-                                file_content
-                            )
-                            files_added += 1
-                        except Exception:
-                            pass
-
-            return files_added
+                self.stdout.write(f'   OK Backup completado para: {empresa.nombre}')
 
         except Exception as e:
-            logger.error(f'Error adding equipo files to ZIP: {e}')
-            return files_added
+            logger.error(f'Error backing up empresa {empresa.nombre}: {e}')
+            self.stdout.write(
+                self.style.ERROR(f'   ERROR Error en backup de {empresa.nombre}: {e}')
+            )
 
     def upload_to_s3(self, file_path, verbose=False):
         """Sube archivo de backup a S3."""
@@ -0,0 +1,88 @@
+"""
+Comando para medir los caminos críticos de SAM con empresas sintéticas.
+
+Crea una empresa por tamaño con años de actividades, mide dashboard,
+panel de decisiones, recálculo de estadísticas, importación Excel, Hoja de
+Vida, ZIP y calendario (tiempo, consultas SQL y memoria) y guarda el
+resultado en JSON. Con --baseline compara contra una medición anterior y
+falla si hay regresiones. Ver core/benchmark.py.
+
+Crea y elimina filas reales (confirmadas, se eliminan al terminar salvo
+--conservar): se niega a ejecutarse sin DEBUG salvo con --permitir-produccion.
+
+Uso:
+    python manage.py benchmark_sam --equipos 100 1000 --salida benchmarks/resultado.json
+    python manage.py benchmark_sam --equipos 1000 --baseline benchmarks/baseline.json --tolerancia 0.3
+    python manage.py benchmark_sam --equipos 20000 --escenarios dashboard panel_decisiones
+"""
+
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import ESCENARIOS, MAX_EQUIPOS_ZIP, comparar, ejecutar_suite
+
+
+class Command(BaseCommand):
+    help = 'Mide los caminos críticos con empresas sintéticas y compara contra una línea base'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--equipos', type=int, nargs='+', default=[100],
+                            help='Tamaños de empresa a generar (default: 100)')
+        parser.add_argument('--anios', type=int, default=3, help='Años de historial de actividades (default: 3)')
+        parser.add_argument('--escenarios', nargs='+', choices=sorted(ESCENARIOS), default=None,
+                            help='Escenarios a medir (default: todos)')
+        parser.add_argument('--repeticiones', type=int, default=3, help='Ejecuciones por escenario (default: 3)')
+        parser.add_argument('--semilla', type=int, default=None, help='Semilla del dataset (default: el tamaño)')
+        parser.add_argument('--max-equipos-zip', type=int, default=MAX_EQUIPOS_ZIP,
+                            help=f'Omitir el ZIP por encima de este tamaño (default: {MAX_EQUIPOS_ZIP})')
+        parser.add_argument('--salida', default=None, help='Archivo JSON donde guardar el resultado')
+        parser.add_argument('--baseline', default=None, help='Archivo JSON de una medición anterior')
+        parser.add_argument('--tolerancia', type=float, default=0.25,
+                            help='Aumento de mediana tolerado frente a la línea base (default: 0.25)')
+        parser.add_argument('--conservar', action='store_true', help='No eliminar las empresas sintéticas')
+        parser.add_argument('--permitir-produccion', action='store_true',
+                            help='Ejecutar aunque DEBUG esté desactivado (crea y elimina datos reales)')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['permitir_produccion']:
+            raise CommandError(
+                "benchmark_sam crea y elimina empresas en la base de datos configurada y DEBUG está "
+                "desactivado. Ejecútelo en desarrollo o pase --permitir-produccion."
+            )
+
+        base = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as archivo:
+                    base = json.load(archivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"No se pudo leer la línea base: {e}")
+
+        resultado = ejecutar_suite(
+            tamanos=options['equipos'], anios=options['anios'], escenarios=options['escenarios'],
+            repeticiones=options['repeticiones'], semilla=options['semilla'], conservar=options['conservar'],
+            max_equipos_zip=options['max_equipos_zip'], salida=self.stdout.write,
+        )
+        self.stdout.write(f"RSS pico: {resultado['rss_pico_mb']} MB")
+
+        if options['salida']:
+            directorio = os.path.dirname(options['salida'])
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultado guardado en {options['salida']}")
+
+        if base is not None:
+            regresiones = comparar(resultado, base, options['tolerancia'])
+            for regresion in regresiones:
+                self.stdout.write(self.style.ERROR(
+                    f"Regresión en {regresion['escenario']} ({regresion['metrica']}): "
+                    f"{regresion['antes']} -> {regresion['ahora']}"
+                ))
+            if regresiones:
+                raise CommandError(f"{len(regresiones)} regresiones frente a {options['baseline']}")
+            self.stdout.write(self.style.SUCCESS('Sin regresiones frente a la línea base'))
@@ -0,0 +1,72 @@
+"""
+Comando de gestión para generar los snapshots diarios del Panel de Decisiones.
+
+Uso:
+    python manage.py generar_snapshots_decision
+    python manage.py generar_snapshots_decision --incremental
+    python manage.py generar_snapshots_decision --empresa-id 42
+    python manage.py generar_snapshots_decision --dry-run
+
+Ejecutar una vez por noche (cron) para todas las empresas; durante el día
+``--incremental`` recalcula solo las empresas cuyos datos cambiaron desde su
+último snapshot. La vista SAM solo lee estos snapshots (ver
+core/snapshots_decision.py).
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from core.snapshots_decision import calcular_snapshot, empresas_a_actualizar, purgar_historial
+
+
+class Command(BaseCommand):
+    help = 'Genera los snapshots diarios del Panel de Decisiones por empresa'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--empresa-id',
+            type=int,
+            help='Generar solo para la empresa con este ID',
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Solo empresas sin snapshot hoy o con cambios posteriores a él',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo lista las empresas sin calcular',
+        )
+
+    def handle(self, *args, **options):
+        today = date.today()
+        empresas = empresas_a_actualizar(today, incremental=options['incremental'])
+
+        if options['empresa_id']:
+            empresas = empresas.filter(id=options['empresa_id'])
+
+        ok = 0
+        errores = 0
+
+        for empresa in empresas:
+            try:
+                if not options['dry_run']:
+                    snapshot = calcular_snapshot(empresa, today)
+                    self.stdout.write(
+                        f"OK {empresa.nombre}: salud {snapshot.salud_porcentaje}%, "
+                        f"cumplimiento {snapshot.cumplimiento_porcentaje}%"
+                    )
+                else:
+                    self.stdout.write(f"PENDIENTE {empresa.nombre}")
+                ok += 1
+            except Exception as e:
+                self.stderr.write(f"ERROR {empresa.nombre}: {e}")
+                errores += 1
+
+        if not options['dry_run'] and not options['empresa_id']:
+            borrados = purgar_historial(today)
+            if borrados:
+                self.stdout.write(f"Historial purgado: {borrados} snapshots antiguos")
+
+        self.stdout.write(f"\nTotal: {ok} OK, {errores} errores")
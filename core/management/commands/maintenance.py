@@ -7,6 +7,7 @@ from django.conf import settings
 from django.utils import timezone
 from django.db import connection, transaction
 from core.models import Empresa, Equipo, ZipRequest
+from core.fechas_equipos import notificar_cambios, recalcular_fechas
 from datetime import timedelta
 import os
 import logging
@@ -209,26 +210,12 @@ class Command(BaseCommand):
             if not dry_run:
                 equipos = Equipo.objects.filter(
                     estado__in=['Activo', 'En Mantenimiento', 'En Calibración', 'En Comprobación']
-                ).select_related('empresa')
-
-                for equipo in equipos:
-                    original_cal = equipo.proxima_calibracion
-                    original_mant = equipo.proximo_mantenimiento
-                    original_comp = equipo.proxima_comprobacion
-
-                    equipo.calcular_proxima_calibracion()
-                    equipo.calcular_proximo_mantenimiento()
-                    equipo.calcular_proxima_comprobacion()
-
-                    # Solo guardar si hay cambios
-                    if (equipo.proxima_calibracion != original_cal or
-                        equipo.proximo_mantenimiento != original_mant or
-                        equipo.proxima_comprobacion != original_comp):
-
-                        equipo.save(update_fields=[
-                            'proxima_calibracion', 'proximo_mantenimiento', 'proxima_comprobacion'
-                        ])
-                        equipos_actualizados += 1
+                )
+
+                # Una consulta agrupada por tipo y lote; solo se escriben los equipos con cambios
+                cambios = recalcular_fechas(equipos)
+                notificar_cambios(cambios)
+                equipos_actualizados = len(cambios)
 
             if verbose:
                 self.stdout.write(f'   - Equipos con fechas actualizadas: {equipos_actualizados}')
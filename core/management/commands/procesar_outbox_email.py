@@ -0,0 +1,69 @@
+"""
+Comando para enviar los emails de la bandeja de salida (CorreoSaliente).
+
+Reclama lotes con lease y los envía con un pool de hilos que reutiliza una
+conexión SMTP por hilo, respetando el límite de envío del proveedor y
+reintentando con backoff. Ver core/email_outbox.py.
+
+Uso:
+    python manage.py procesar_outbox_email                 # una pasada
+    python manage.py procesar_outbox_email --continuo      # como servicio
+    python manage.py procesar_outbox_email --workers 8 --metricas
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.cola_lease import bucle_worker, generar_worker_id
+from core.email_outbox import drenar, metricas_outbox, purgar_enviados
+
+
+class Command(BaseCommand):
+    help = 'Envía los emails pendientes de la bandeja de salida'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Hilos de envío (default: EMAIL_OUTBOX_CONFIG["WORKERS"])')
+        parser.add_argument('--lote', type=int, default=None,
+                            help='Mensajes reclamados por ronda')
+        parser.add_argument('--continuo', action='store_true',
+                            help='Seguir revisando la bandeja cada --check-interval segundos')
+        parser.add_argument('--check-interval', type=int, default=10,
+                            help='Segundos entre revisiones en modo continuo (default: 10)')
+        parser.add_argument('--max-iterations', type=int, default=0,
+                            help='Máximo de pasadas en modo continuo (0 = infinito)')
+        parser.add_argument('--purgar', action='store_true',
+                            help='Eliminar enviados más antiguos que RETENCION_DIAS')
+        parser.add_argument('--metricas', action='store_true',
+                            help='Mostrar el estado de la bandeja al terminar')
+
+    def handle(self, *args, **options):
+        def pasada():
+            resultado = drenar(workers=options['workers'], lote=options['lote'])
+            enviado = bool(resultado['enviados'] or resultado['reintentos'] or resultado['fallidos'])
+            if enviado:
+                self.stdout.write(
+                    f"Enviados: {resultado['enviados']} | Reintentos: {resultado['reintentos']} | "
+                    f"Fallidos: {resultado['fallidos']} | {resultado['segundos']}s "
+                    f"({resultado['por_segundo']}/s, {resultado['proveedor']})"
+                )
+            return enviado
+
+        if options['continuo']:
+            bucle_worker(
+                'email', generar_worker_id(), pasada, options['check_interval'], options['max_iterations']
+            )
+        else:
+            pasada()
+
+        if options['purgar']:
+            self.stdout.write(f"Purgados: {purgar_enviados()} emails enviados")
+
+        if options['metricas']:
+            metricas = metricas_outbox()
+            estados = ', '.join(f"{estado}: {n}" for estado, n in metricas['por_estado'].items())
+            self.stdout.write(
+                f"Bandeja: {estados} | Pendiente más antiguo: {metricas['antiguedad_pendiente_segundos']}s | "
+                f"Enviados última hora: {metricas['enviados_ultima_hora']}"
+            )
+
+        self.stdout.write(self.style.SUCCESS('[COMPLETADO] Bandeja de salida procesada'))
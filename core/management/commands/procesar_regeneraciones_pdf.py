@@ -0,0 +1,62 @@
+"""
+Comando para regenerar los PDFs de los documentos aprobados (RegeneracionPDF).
+
+Cada proceso reclama lotes de trabajos con lease (SELECT ... FOR UPDATE SKIP
+LOCKED) y renderiza sus PDFs con WeasyPrint; con --procesos N los trabajos de
+una aprobación en bloque se reparten entre N procesos sin duplicarse.
+Ver core/regeneracion_pdf.py.
+
+Uso:
+    python manage.py procesar_regeneraciones_pdf                   # una pasada
+    python manage.py procesar_regeneraciones_pdf --continuo --procesos 2
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.cola_lease import ejecutar_procesos
+from core.regeneracion_pdf import bucle_worker, drenar, purgar_terminados
+
+
+class Command(BaseCommand):
+    help = 'Regenera los PDFs pendientes de los documentos aprobados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=None,
+                            help='Trabajos reclamados por ronda (default: REGENERACION_PDF_CONFIG["LOTE"])')
+        parser.add_argument('--continuo', action='store_true',
+                            help='Seguir revisando la cola cada --check-interval segundos')
+        parser.add_argument('--procesos', type=int, default=1,
+                            help='Procesos worker concurrentes en modo continuo (default: 1)')
+        parser.add_argument('--check-interval', type=int, default=5,
+                            help='Segundos entre revisiones con la cola vacía (default: 5)')
+        parser.add_argument('--max-iterations', type=int, default=0,
+                            help='Máximo de pasadas por worker en modo continuo (0 = infinito)')
+        parser.add_argument('--purgar', action='store_true',
+                            help='Eliminar trabajos terminados más antiguos que RETENCION_DIAS')
+
+    def handle(self, *args, **options):
+        if options['purgar']:
+            self.stdout.write(f"Purgados: {purgar_terminados()} trabajos terminados")
+
+        if not options['continuo']:
+            resultado = drenar(lote=options['lote'])
+            self.stdout.write(
+                f"Completados: {resultado['completado']} | Omitidos: {resultado['omitido']} | "
+                f"Reprogramados: {resultado['pendiente']} | Fallidos: {resultado['fallido']}"
+            )
+            self.stdout.write(self.style.SUCCESS('[COMPLETADO] Cola de regeneración de PDFs procesada'))
+            return
+
+        procesos = max(1, options['procesos'])
+        check_interval = options['check_interval']
+        max_iterations = options['max_iterations']
+        self.stdout.write(self.style.SUCCESS(
+            f'[INICIO] Regeneración de PDFs iniciada (procesos: {procesos}, intervalo: {check_interval}s)'
+        ))
+
+        ejecutar_procesos(
+            bucle_worker, procesos, (check_interval, max_iterations, options['lote']), 'SAM_PDF_Worker',
+            max_iterations=max_iterations,
+        )
+
+        self.stdout.write(self.style.SUCCESS('[COMPLETADO] Regeneración de PDFs detenida'))
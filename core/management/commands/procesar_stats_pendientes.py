@@ -0,0 +1,83 @@
+"""
+Comando para recalcular las stats del dashboard de las empresas encoladas.
+
+Con STATS_RECALC_CONFIG['DIFERIDO'] activo, las señales de Equipo y actividades
+solo marcan la empresa como pendiente. Este comando hace un único recálculo por
+empresa una vez vencida la ventana de debounce.
+
+Uso:
+    python manage.py procesar_stats_pendientes
+    python manage.py procesar_stats_pendientes --loop --check-interval 5
+    python manage.py procesar_stats_pendientes --debounce 0 --limit 50
+
+En producción corre como el worker sam-stats-processor de render.yaml; fuera de
+Render, como servicio en background:
+    nohup python manage.py procesar_stats_pendientes --loop >> logs/stats_queue.log 2>&1 &
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.stats_queue import procesar_empresas_pendientes, debounce_seconds
+
+
+class Command(BaseCommand):
+    help = 'Recalcula stats del dashboard de las empresas pendientes (una vez por empresa)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Ejecutar continuamente revisando la cola',
+        )
+        parser.add_argument(
+            '--check-interval',
+            type=int,
+            default=5,
+            help='Intervalo en segundos entre pasadas en modo --loop (default: 5)',
+        )
+        parser.add_argument(
+            '--debounce',
+            type=int,
+            default=None,
+            help='Segundos mínimos desde la primera invalidación (default: STATS_RECALC_CONFIG)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Máximo de empresas a procesar por pasada',
+        )
+        parser.add_argument(
+            '--max-iterations',
+            type=int,
+            default=0,
+            help='Máximo número de pasadas en modo --loop (0 = infinito)',
+        )
+
+    def handle(self, *args, **options):
+        debounce = options['debounce']
+        if debounce is None:
+            debounce = debounce_seconds()
+
+        iteration = 0
+        while True:
+            iteration += 1
+            close_old_connections()
+
+            try:
+                resultado = procesar_empresas_pendientes(debounce=debounce, limite=options['limit'])
+                if resultado['procesadas'] or resultado['errores'] or not options['loop']:
+                    self.stdout.write(
+                        f"Pasada {iteration}: {resultado['procesadas']} empresas recalculadas, "
+                        f"{resultado['errores']} errores"
+                    )
+            except Exception as e:
+                self.stderr.write(f"ERROR en pasada {iteration}: {e}")
+
+            if not options['loop']:
+                break
+            if options['max_iterations'] and iteration >= options['max_iterations']:
+                break
+            time.sleep(options['check_interval'])
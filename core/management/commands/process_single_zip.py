@@ -18,6 +18,8 @@ from django.core.files.storage import default_storage
 from django.http import HttpRequest
 from django.contrib.auth import get_user_model
 from core.models import ZipRequest
+from core.cola_lease import generar_worker_id
+from core.zip_queue import ejecutar_trabajo, reclamar_siguiente, recuperar_estancados
 import logging
 
 logger = logging.getLogger(__name__)
@@ -42,14 +44,14 @@ class Command(BaseCommand):
         if cleanup_expired:
             self.cleanup_expired_requests()
 
-        # Buscar próxima solicitud pendiente
-        next_request = ZipRequest.objects.filter(
-            status='pending'
-        ).order_by('position_in_queue').first()
+        # Reclamar próxima solicitud pendiente con lease (ver core/zip_queue.py)
+        recuperar_estancados()
+        worker_id = generar_worker_id()
+        next_request = reclamar_siguiente(worker_id)
 
         if next_request:
             self.stdout.write(f'[PROCESANDO] Solicitud #{next_request.id} de {next_request.user.username}')
-            success = self.process_zip_request(next_request)
+            success = self.process_zip_request(next_request, worker_id)
 
             if success:
                 self.stdout.write('[ÉXITO] Solicitud procesada correctamente')
@@ -61,19 +63,10 @@ class Command(BaseCommand):
             self.stdout.write('[COLA-VACÍA] No hay solicitudes pendientes')
             return
 
-    def process_zip_request(self, zip_request):
-        """Procesa una solicitud ZIP específica."""
+    def process_zip_request(self, zip_request, worker_id):
+        """Procesa una solicitud ZIP ya reclamada por este worker."""
         try:
-            # Importar aquí para evitar problemas de circular imports
-            from core.management.commands.process_zip_queue import Command as QueueCommand
-
-            # Crear instancia del comando original y usar su método
-            queue_command = QueueCommand()
-            queue_command.stdout = self.stdout
-
-            # Procesar la solicitud
-            queue_command.process_zip_request(zip_request)
-            return True
+            return ejecutar_trabajo(zip_request, worker_id)
 
         except Exception as e:
             self.stdout.write(f'[ERROR] Error procesando solicitud {zip_request.id}: {e}')
@@ -1,4 +1,5 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from core.fechas_equipos import LOTE, notificar_cambios, recalcular_fechas
 from core.models import Equipo
 
 class Command(BaseCommand):
@@ -10,6 +11,17 @@ class Command(BaseCommand):
             action='store_true',
             help='Mostrar qué cambios se harían sin ejecutarlos',
         )
+        parser.add_argument(
+            '--empresa',
+            type=int,
+            help='Recalcular solo los equipos de esta empresa (ID)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=LOTE,
+            help=f'Equipos por lote de consultas y escritura (default: {LOTE})',
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
@@ -19,49 +31,31 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING('No se realizarán cambios en la base de datos\n'))
 
         equipos = Equipo.objects.all()
+        if options['empresa']:
+            equipos = equipos.filter(empresa_id=options['empresa'])
         total_equipos = equipos.count()
 
         self.stdout.write(f'Encontrados {total_equipos} equipos para procesar\n')
 
-        actualizados = 0
-        errores = 0
-
-        for equipo in equipos:
-            try:
-                # Guardar valores anteriores para comparación
-                anterior_calibracion = equipo.proxima_calibracion
-                anterior_mantenimiento = equipo.proximo_mantenimiento
-                anterior_comprobacion = equipo.proxima_comprobacion
-
-                # Recalcular todas las fechas
-                equipo.calcular_proxima_calibracion()
-                equipo.calcular_proximo_mantenimiento()
-                equipo.calcular_proxima_comprobacion()
-
-                # Verificar si hubo cambios
-                cambios = []
-                if anterior_calibracion != equipo.proxima_calibracion:
-                    cambios.append(f'  [CAL] Proxima calibracion: {anterior_calibracion} -> {equipo.proxima_calibracion}')
-                if anterior_mantenimiento != equipo.proximo_mantenimiento:
-                    cambios.append(f'  [MAN] Proximo mantenimiento: {anterior_mantenimiento} -> {equipo.proximo_mantenimiento}')
-                if anterior_comprobacion != equipo.proxima_comprobacion:
-                    cambios.append(f'  [COM] Proxima comprobacion: {anterior_comprobacion} -> {equipo.proxima_comprobacion}')
-
-                if cambios:
-                    self.stdout.write(self.style.SUCCESS(f'\n{equipo.codigo_interno} - {equipo.nombre}'))
-                    for cambio in cambios:
-                        self.stdout.write(cambio)
-
-                    if not dry_run:
-                        # Guardar solo los campos de fechas para evitar triggers del modelo
-                        equipo.save(update_fields=['proxima_calibracion', 'proximo_mantenimiento', 'proxima_comprobacion'])
-                        actualizados += 1
-                    else:
-                        actualizados += 1
-
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f'\nX Error en {equipo.codigo_interno}: {str(e)}'))
-                errores += 1
+        # Una consulta agrupada por tipo de actividad y lote, y un bulk_update por lote
+        try:
+            cambios_por_equipo = recalcular_fechas(equipos, guardar=not dry_run, lote=options['lote'])
+        except Exception as e:
+            raise CommandError(f'Error recalculando fechas: {str(e)}')
+
+        etiquetas = {
+            'proxima_calibracion': '[CAL] Proxima calibracion',
+            'proximo_mantenimiento': '[MAN] Proximo mantenimiento',
+            'proxima_comprobacion': '[COM] Proxima comprobacion',
+        }
+        for equipo, cambios in cambios_por_equipo:
+            self.stdout.write(self.style.SUCCESS(f'\n{equipo.codigo_interno} - {equipo.nombre}'))
+            for campo, (antes, ahora) in cambios.items():
+                self.stdout.write(f'  {etiquetas[campo]}: {antes} -> {ahora}')
+        actualizados = len(cambios_por_equipo)
+
+        if not dry_run:
+            notificar_cambios(cambios_por_equipo, lote=options['lote'])
 
         self.stdout.write('\n' + '='*60)
         if dry_run:
@@ -71,11 +65,7 @@ class Command(BaseCommand):
 
         self.stdout.write(f'  - Total equipos: {total_equipos}')
         self.stdout.write(self.style.SUCCESS(f'  - Actualizados: {actualizados}'))
-        if errores > 0:
-            self.stdout.write(self.style.ERROR(f'  - Errores: {errores}'))
-        else:
-            self.stdout.write(f'  - Errores: {errores}')
-        self.stdout.write(f'  - Sin cambios: {total_equipos - actualizados - errores}')
+        self.stdout.write(f'  - Sin cambios: {total_equipos - actualizados}')
 
         if dry_run:
             self.stdout.write(self.style.WARNING('\n[!] Para aplicar los cambios, ejecuta el comando sin --dry-run'))
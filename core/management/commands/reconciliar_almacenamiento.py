@@ -0,0 +1,54 @@
+"""
+Comando para reconstruir el ledger de almacenamiento (RegistroAlmacenamiento).
+
+Lista el storage por prefijo (list_objects_v2 paginado en S3/R2, no un
+head_object por archivo), cruza el resultado con las rutas referenciadas por
+cada empresa y reescribe su ledger. Al terminar, la empresa queda marcada como
+sincronizada y get_total_storage_used_mb pasa a ser un SUM sobre el ledger.
+
+Uso:
+    python manage.py reconciliar_almacenamiento
+    python manage.py reconciliar_almacenamiento --empresa-id 42
+    python manage.py reconciliar_almacenamiento --dry-run
+
+Se ejecuta una vez tras el despliegue y luego cada domingo (cron en render.yaml)
+para corregir la deriva de archivos generados fuera de los helpers de subida.
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import Empresa
+from core.storage_ledger import reconciliar_almacenamiento
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el ledger de almacenamiento a partir del storage real'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--empresa-id',
+            type=int,
+            help='Reconciliar solo la empresa con este ID',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Muestra las diferencias sin modificar el ledger',
+        )
+
+    def handle(self, *args, **options):
+        empresas = Empresa.objects.filter(is_deleted=False)
+        if options['empresa_id']:
+            empresas = empresas.filter(id=options['empresa_id'])
+
+        resultados = reconciliar_almacenamiento(empresas, dry_run=options['dry_run'])
+
+        for r in resultados:
+            anterior_mb = r['bytes_anterior'] / (1024 * 1024)
+            nuevo_mb = r['bytes_nuevo'] / (1024 * 1024)
+            self.stdout.write(
+                f"{'[DRY-RUN] ' if options['dry_run'] else ''}{r['empresa'].nombre}: "
+                f"{r['archivos']} archivos, {r['faltantes']} faltantes, "
+                f"{anterior_mb:.2f}MB -> {nuevo_mb:.2f}MB"
+            )
+
+        self.stdout.write(f"\nTotal: {len(resultados)} empresas reconciliadas")
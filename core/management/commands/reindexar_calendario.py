@@ -0,0 +1,45 @@
+"""
+Comando de gestión para reconstruir el índice del calendario de actividades.
+
+Uso:
+    python manage.py reindexar_calendario
+    python manage.py reindexar_calendario --empresa-id 42
+    python manage.py reindexar_calendario --dry-run
+
+Se ejecuta cada noche (cron en render.yaml): reconstruye los equipos cuyo
+índice quedó desactualizado y extiende la proyección al horizonte del día,
+para que las vistas del calendario solo reindexen lotes pequeños.
+"""
+from django.core.management.base import BaseCommand
+
+from core.calendario_indice import asegurar_indice, equipos_desactualizados, horizonte
+from core.models import Equipo
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de ocurrencias del calendario para los equipos desactualizados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--empresa-id',
+            type=int,
+            help='Reindexar solo los equipos de la empresa con este ID',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo cuenta los equipos desactualizados sin reindexar',
+        )
+
+    def handle(self, *args, **options):
+        equipos = Equipo.objects.all()
+        if options['empresa_id']:
+            equipos = equipos.filter(empresa_id=options['empresa_id'])
+
+        hasta = horizonte()
+        if options['dry_run']:
+            self.stdout.write(f"{equipos_desactualizados(equipos, hasta).count()} equipos desactualizados")
+            return
+
+        reindexados = asegurar_indice(equipos, hasta)
+        self.stdout.write(f"Total: {reindexados} equipos reindexados hasta {hasta}")
@@ -7,6 +7,7 @@ from django.conf import settings
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from core.models import Empresa, Equipo, Calibracion, Mantenimiento, Comprobacion, CustomUser
+from core import backup_stream
 import json
 import os
 import zipfile
@@ -23,7 +24,13 @@ class Command(BaseCommand):
         parser.add_argument(
             'backup_file',
             type=str,
-            help='Ruta del archivo de backup (JSON o ZIP)'
+            help='Ruta del archivo de backup (JSON, JSONL o ZIP)'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='append',
+            default=[],
+            help='Backup incremental a aplicar sobre el completo (repetible, en orden cronológico)'
         )
         parser.add_argument(
             '--dry-run',
@@ -52,6 +59,8 @@ class Command(BaseCommand):
         overwrite = options['overwrite']
         restore_files = options['restore_files']
         new_name = options['new_name']
+        incrementales = options.get('incremental') or []
+        self.incremental_zips = [f for f in incrementales if f.endswith('.zip')]
 
         if dry_run:
             self.stdout.write(
@@ -67,15 +76,11 @@ class Command(BaseCommand):
                 return
 
             # Determinar tipo de archivo
-            if backup_file.endswith('.zip'):
-                backup_data = self.load_zip_backup(backup_file)
-                can_restore_files = True
-            elif backup_file.endswith('.json'):
-                backup_data = self.load_json_backup(backup_file)
-                can_restore_files = False
-            else:
+            backup_data = self.load_backup(backup_file)
+            can_restore_files = backup_file.endswith('.zip')
+            if backup_data is False:
                 self.stdout.write(
-                    self.style.ERROR('ERROR: Tipo de archivo no soportado. Use .json o .zip')
+                    self.style.ERROR('ERROR: Tipo de archivo no soportado. Use .json, .jsonl o .zip')
                 )
                 return
 
@@ -85,6 +90,22 @@ class Command(BaseCommand):
                 )
                 return
 
+            if backup_data.get('metadata', {}).get('tipo') == 'incremental':
+                self.stdout.write(
+                    self.style.ERROR('ERROR: Es un backup incremental. Indique el completo y pase este con --incremental')
+                )
+                return
+
+            # Aplicar incrementales sobre el completo, en orden
+            for incremental_file in incrementales:
+                incremental_data = self.load_backup(incremental_file)
+                if not incremental_data:
+                    self.stdout.write(
+                        self.style.ERROR(f'ERROR: No se pudo cargar el incremental: {incremental_file}')
+                    )
+                    return
+                backup_stream.aplicar_incremental(backup_data, incremental_data)
+
             # Mostrar información del backup
             metadata = backup_data.get('metadata', {})
             empresa_original = metadata.get('empresa_nombre', 'Desconocida')
@@ -133,6 +154,20 @@ class Command(BaseCommand):
                 self.style.ERROR(f'ERROR: Error durante la restauración: {e}')
             )
 
+    def load_backup(self, backup_file):
+        """Carga un backup según su extensión; False si no está soportada."""
+        if backup_file.endswith('.zip'):
+            return self.load_zip_backup(backup_file)
+        if backup_file.endswith('.jsonl'):
+            try:
+                return backup_stream.leer_jsonl(backup_file)
+            except Exception as e:
+                logger.error(f'Error loading JSONL backup: {e}')
+                return None
+        if backup_file.endswith('.json'):
+            return self.load_json_backup(backup_file)
+        return False
+
     def load_json_backup(self, json_file):
         """Carga backup desde archivo JSON."""
         try:
@@ -145,10 +180,8 @@ class Command(BaseCommand):
     def load_zip_backup(self, zip_file):
         """Carga backup desde archivo ZIP."""
         try:
-            with zipfile.ZipFile(zip_file, 'r') as zipf:
-                # Leer data.json del ZIP
-                data_json = zipf.read('data.json').decode('utf-8')
-                return json.loads(data_json)
+            # data.json (backups anteriores) o data/<seccion>.jsonl
+            return backup_stream.leer_zip(zip_file)
         except Exception as e:
             logger.error(f'Error loading ZIP backup: {e}')
             return None
@@ -237,6 +270,9 @@ class Command(BaseCommand):
         # 7. Restaurar archivos (solo para ZIP)
         if restore_files and can_restore_files:
             files_restored = self.restore_files_from_zip(backup_file, empresa, equipos_map)
+            # Los adjuntos de los incrementales reemplazan a los anteriores
+            for incremental_file in self.incremental_zips:
+                files_restored += self.restore_files_from_zip(incremental_file, empresa, equipos_map)
             self.stdout.write(f'   [ARCHIVOS] {files_restored} archivos restaurados')
 
         return empresa
@@ -116,7 +116,19 @@ class Command(BaseCommand):
                         self.style.SUCCESS(f'Recordatorios semanales vencidos enviados: {sent}')
                     )
                 else:
-                    self.stdout.write('   [SIMULADO] Recordatorios semanales vencidos')
+                    reporte = NotificationScheduler.report_weekly_overdue_reminders()
+                    for empresa in reporte['empresas']:
+                        self.stdout.write(
+                            f"   [SIMULADO] {empresa['nombre']}: {empresa['total']} vencidas "
+                            f"(cal: {empresa['calibracion']}, mant: {empresa['mantenimiento']}, "
+                            f"comp: {empresa['comprobacion']})"
+                        )
+                    self.stdout.write(
+                        f"   [SIMULADO] Recordatorios semanales vencidos: {reporte['total_recordatorios']} "
+                        f"en {len(reporte['empresas'])} empresas | Omitidos: "
+                        f"{reporte['descartados']['maximo']} con 3 recordatorios, "
+                        f"{reporte['descartados']['reciente']} enviados hace menos de 7 dias"
+                    )
 
             if not options['dry_run']:
                 self.stdout.write(
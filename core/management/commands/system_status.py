@@ -234,4 +234,11 @@ class Command(BaseCommand):
 
         error_rate = performance_data.get('error_rate', {})
         if error_rate:
-            self.stdout.write(f'⚠️  Errores: {error_rate.get("status", "Sin datos")}')
\ No newline at end of file
+            self.stdout.write(f'⚠️  Errores: {error_rate.get("status", "Sin datos")}')
+        rate_limit = performance_data.get('rate_limit', {})
+        if rate_limit.get('tipos'):
+            self.stdout.write(f'🚦 Rate limiting ({rate_limit.get("backend")}):')
+            for tipo, conteos in rate_limit['tipos'].items():
+                self.stdout.write(
+                    f'   - {tipo}: {conteos["permitidas"]} permitidas, {conteos["bloqueadas"]} bloqueadas'
+                )
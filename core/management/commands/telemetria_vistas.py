@@ -0,0 +1,61 @@
+"""
+Comando para consultar y mantener la telemetría por vista (core/telemetria.py).
+
+Muestra percentiles de latencia, consultas SQL y errores por vista en un
+rango de horas, opcionalmente para una vista o empresa, y las regresiones
+de p95 frente a la semana anterior.
+
+Uso:
+    python manage.py telemetria_vistas                          # últimas 24 h
+    python manage.py telemetria_vistas --horas 168 --empresa 12 --vista core:dashboard
+    python manage.py telemetria_vistas --purgar                 # borra lo anterior a RETENCION_DIAS
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import telemetria
+
+
+class Command(BaseCommand):
+    help = 'Muestra percentiles de latencia por vista y purga la telemetría antigua'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, default=24, help='Rango a resumir (default: 24)')
+        parser.add_argument('--vista', default=None, help='Nombre de la vista (p. ej. core:dashboard)')
+        parser.add_argument('--empresa', type=int, default=None, help='ID de la empresa')
+        parser.add_argument('--limite', type=int, default=20, help='Vistas a mostrar (default: 20)')
+        parser.add_argument('--purgar', action='store_true',
+                            help='Eliminar telemetría más antigua que RETENCION_DIAS')
+
+    def handle(self, *args, **options):
+        # Lo acumulado por este proceso no tiene peticiones; se vuelca por si se llama desde código
+        telemetria.volcar()
+
+        if options['purgar']:
+            agregados, lentas = telemetria.purgar()
+            self.stdout.write(f"Purgados: {agregados} agregados y {lentas} peticiones lentas")
+            return
+
+        resumen = telemetria.resumen_vistas(
+            timezone.now() - timedelta(hours=options['horas']),
+            vista=options['vista'], empresa_id=options['empresa'],
+        )
+        if not resumen:
+            self.stdout.write('Sin telemetría en el rango')
+            return
+
+        self.stdout.write(f"{'Vista':<45} {'Petic.':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL':>6} {'Err%':>6}")
+        for fila in resumen[:options['limite']]:
+            self.stdout.write(
+                f"{fila['vista'][:45]:<45} {fila['peticiones']:>7} {fila['p50_ms']:>8} {fila['p95_ms']:>8} "
+                f"{fila['p99_ms']:>8} {fila['consultas_promedio']:>6} {fila['tasa_error']:>6}"
+            )
+
+        for regresion in telemetria.regresiones():
+            self.stdout.write(self.style.WARNING(
+                f"Regresión: {regresion['vista']} p95 {regresion['p95_ms']} ms "
+                f"(antes {regresion['p95_referencia_ms']} ms, x{regresion['variacion']})"
+            ))
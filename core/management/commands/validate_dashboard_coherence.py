@@ -4,7 +4,7 @@
 from django.core.management.base import BaseCommand
 from core.models import Empresa, Equipo, Calibracion, Mantenimiento, Comprobacion, CustomUser
 from core.views.dashboard import _get_actividades_data
-from core.views.panel_decisiones import _calcular_salud_equipo, _calcular_cumplimiento, _calcular_eficiencia_operacional
+from core.metricas_decision import calcular_cumplimiento, calcular_eficiencia_operacional, calcular_salud_equipo
 from datetime import date
 import json
 
@@ -64,7 +64,7 @@ class Command(BaseCommand):
 
         # 1. VALIDAR SALUD DEL EQUIPO
         self.stdout.write(f"\n1. VALIDANDO SALUD DEL EQUIPO...")
-        salud_data = _calcular_salud_equipo(equipos_para_dashboard, today)
+        salud_data = calcular_salud_equipo(equipos_para_dashboard, today)
 
         # Validación manual de salud
         equipos_saludables_manual = 0
@@ -101,7 +101,7 @@ class Command(BaseCommand):
 
         # 2. VALIDAR CUMPLIMIENTO
         self.stdout.write(f"\n2. VALIDANDO CUMPLIMIENTO...")
-        cumplimiento_data = _calcular_cumplimiento(equipos_para_dashboard, current_year, today)
+        cumplimiento_data = calcular_cumplimiento(equipos_para_dashboard, current_year, today)
 
         # Validación manual de cumplimiento
         total_programadas_manual = 0
@@ -154,7 +154,7 @@ class Command(BaseCommand):
 
         # 3. VALIDAR EFICIENCIA OPERACIONAL
         self.stdout.write(f"\n3. VALIDANDO EFICIENCIA OPERACIONAL...")
-        eficiencia_data = _calcular_eficiencia_operacional(equipos_queryset, equipos_para_dashboard)
+        eficiencia_data = calcular_eficiencia_operacional(equipos_queryset, equipos_para_dashboard)
 
         disponibilidad_manual = round((equipos_activos / total_equipos) * 100, 1) if total_equipos > 0 else 0
 
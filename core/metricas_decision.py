@@ -0,0 +1,283 @@
+# core/metricas_decision.py
+# Pilares del Panel de Decisiones (salud, cumplimiento, eficiencia) por conjunto de equipos
+
+from .constants import ESTADO_ACTIVO
+from .proyecciones import proyectar_anio
+
+
+def calcular_salud_equipo(equipos_para_dashboard, today):
+    """
+    PILAR 1: Salud del Equipo con Fórmula Ponderada
+    Fórmula: 30% Estado del Equipo + 25% Calibraciones + 25% Mantenimientos + 20% Comprobaciones = 100%
+    """
+    total_equipos = equipos_para_dashboard.count()
+    if total_equipos == 0:
+        return {
+            'salud_general_porcentaje': 0,
+            'salud_general_estado': 'CRÍTICO',
+            'equipos_saludables': 0,
+            'equipos_en_riesgo': 0,
+            'equipos_criticos': 0,
+            'total_equipos_salud': 0,
+            'chart_data': [0, 0, 0],
+            'formula_detalle': {
+                'peso_estado': 30,
+                'peso_calibraciones': 25,
+                'peso_mantenimientos': 25,
+                'peso_comprobaciones': 20,
+                'puntuacion_estado': 0,
+                'puntuacion_calibraciones': 0,
+                'puntuacion_mantenimientos': 0,
+                'puntuacion_comprobaciones': 0,
+                'calculo_ejemplo': '(0×30% + 0×25% + 0×25% + 0×20%) = 0%'
+            }
+        }
+
+    # Variables para el cálculo ponderado
+    total_puntuacion = 0
+    equipos_saludables = 0
+    equipos_en_riesgo = 0
+    equipos_criticos = 0
+
+    # Puntuaciones acumuladas para fórmula detallada
+    puntuacion_estado_total = 0
+    puntuacion_calibraciones_total = 0
+    puntuacion_mantenimientos_total = 0
+    puntuacion_comprobaciones_total = 0
+
+    for equipo in equipos_para_dashboard:
+        # 1. ESTADO DEL EQUIPO (30%): Activo/Operativo = 100%, otros estados = 0%
+        if equipo.estado in [ESTADO_ACTIVO, 'Operativo']:
+            puntuacion_estado = 100
+        else:
+            puntuacion_estado = 0
+
+        # 2. CALIBRACIONES (25%): Vigente = 100%, Vencida = 0%
+        if equipo.proxima_calibracion and equipo.proxima_calibracion >= today:
+            puntuacion_calibraciones = 100
+        else:
+            puntuacion_calibraciones = 0
+
+        # 3. MANTENIMIENTOS (25%): Vigente = 100%, Vencido = 0%
+        if equipo.proximo_mantenimiento and equipo.proximo_mantenimiento >= today:
+            puntuacion_mantenimientos = 100
+        else:
+            puntuacion_mantenimientos = 0
+
+        # 4. COMPROBACIONES (20%): Vigente = 100%, Vencida = 0%
+        if equipo.proxima_comprobacion and equipo.proxima_comprobacion >= today:
+            puntuacion_comprobaciones = 100
+        else:
+            puntuacion_comprobaciones = 0
+
+        # Calcular puntuación ponderada del equipo
+        puntuacion_equipo = (
+            puntuacion_estado * 0.30
+            + puntuacion_calibraciones * 0.25
+            + puntuacion_mantenimientos * 0.25
+            + puntuacion_comprobaciones * 0.20
+        )
+
+        # Acumular para promedio general
+        total_puntuacion += puntuacion_equipo
+        puntuacion_estado_total += puntuacion_estado
+        puntuacion_calibraciones_total += puntuacion_calibraciones
+        puntuacion_mantenimientos_total += puntuacion_mantenimientos
+        puntuacion_comprobaciones_total += puntuacion_comprobaciones
+
+        # Clasificar equipo según puntuación
+        if puntuacion_equipo >= 80:
+            equipos_saludables += 1
+        elif puntuacion_equipo >= 40:
+            equipos_en_riesgo += 1
+        else:
+            equipos_criticos += 1
+
+    # Calcular porcentaje de salud general usando fórmula ponderada
+    salud_porcentaje = round(total_puntuacion / total_equipos, 1)
+
+    # Promedios por componente para mostrar en fórmula detallada
+    promedio_estado = round(puntuacion_estado_total / total_equipos, 1)
+    promedio_calibraciones = round(puntuacion_calibraciones_total / total_equipos, 1)
+    promedio_mantenimientos = round(puntuacion_mantenimientos_total / total_equipos, 1)
+    promedio_comprobaciones = round(puntuacion_comprobaciones_total / total_equipos, 1)
+
+    # Calcular contribución ponderada de cada componente
+    contribucion_estado = promedio_estado * 0.30
+    contribucion_calibraciones = promedio_calibraciones * 0.25
+    contribucion_mantenimientos = promedio_mantenimientos * 0.25
+    contribucion_comprobaciones = promedio_comprobaciones * 0.20
+
+    # Ejemplo de cálculo para mostrar transparencia
+    calculo_ejemplo = (
+        f"({promedio_estado}×30% + {promedio_calibraciones}×25% + "
+        f"{promedio_mantenimientos}×25% + {promedio_comprobaciones}×20%) = {salud_porcentaje}%"
+    )
+
+    # Determinar estado general
+    if salud_porcentaje >= 80:
+        estado = 'ÓPTIMO'
+    elif salud_porcentaje >= 60:
+        estado = 'BUENO'
+    elif salud_porcentaje >= 40:
+        estado = 'EN RIESGO'
+    else:
+        estado = 'CRÍTICO'
+
+    return {
+        'salud_general_porcentaje': salud_porcentaje,
+        'salud_general_estado': estado,
+        'equipos_saludables': equipos_saludables,
+        'equipos_en_riesgo': equipos_en_riesgo,
+        'equipos_criticos': equipos_criticos,
+        'total_equipos_salud': total_equipos,
+        'chart_data': [equipos_saludables, equipos_en_riesgo, equipos_criticos],
+        'formula_detalle': {
+            'peso_estado': 30,
+            'peso_calibraciones': 25,
+            'peso_mantenimientos': 25,
+            'peso_comprobaciones': 20,
+            'puntuacion_estado': promedio_estado,
+            'puntuacion_calibraciones': promedio_calibraciones,
+            'puntuacion_mantenimientos': promedio_mantenimientos,
+            'puntuacion_comprobaciones': promedio_comprobaciones,
+            'contribucion_estado': round(contribucion_estado, 1),
+            'contribucion_calibraciones': round(contribucion_calibraciones, 1),
+            'contribucion_mantenimientos': round(contribucion_mantenimientos, 1),
+            'contribucion_comprobaciones': round(contribucion_comprobaciones, 1),
+            'calculo_ejemplo': calculo_ejemplo
+        }
+    }
+
+
+def calcular_cumplimiento(equipos_para_dashboard, current_year, today):
+    """
+    PILAR 2: Cumplimiento
+    Mide el desempeño de la gestión - ¿Actividades a tiempo?
+
+    IMPORTANTE: Usa la MISMA lógica de proyección que Dashboard
+    - Proyecciones basadas en última actividad real (no teóricas)
+    - Jerarquía: última actividad → última calibración → fecha_adquisición
+    """
+    # Obtener actividades proyectadas usando el mismo motor que Dashboard
+    # (columnar: solo se cuentan estados, sin materializar filas). Los
+    # mantenimientos no entran: el Dashboard no los proyecta por año.
+    actividades_calibracion = proyectar_anio(
+        equipos_para_dashboard,
+        'calibracion',
+        current_year,
+        today
+    )
+
+    actividades_comprobacion = proyectar_anio(
+        equipos_para_dashboard,
+        'comprobacion',
+        current_year,
+        today
+    )
+
+    # Contar actividades programadas para el año
+    total_programadas = (
+        len(actividades_calibracion)
+        + len(actividades_comprobacion)
+    )
+
+    # Contar actividades realizadas
+    total_realizadas_a_tiempo = (
+        actividades_calibracion.conteos()['realizadas']
+        + actividades_comprobacion.conteos()['realizadas']
+    )
+
+    # Calcular porcentaje de cumplimiento
+    if total_programadas > 0:
+        cumplimiento_porcentaje = round((total_realizadas_a_tiempo / total_programadas) * 100, 1)
+    else:
+        cumplimiento_porcentaje = 100.0  # Sin actividades programadas = 100% cumplimiento
+
+    # Determinar estado
+    if cumplimiento_porcentaje >= 90:
+        estado = 'EXCELENTE'
+    elif cumplimiento_porcentaje >= 80:
+        estado = 'BUENO'
+    elif cumplimiento_porcentaje >= 70:
+        estado = 'REGULAR'
+    else:
+        estado = 'DEFICIENTE'
+
+    return {
+        'cumplimiento_porcentaje': cumplimiento_porcentaje,
+        'cumplimiento_estado': estado,
+        'actividades_programadas': total_programadas,
+        'actividades_realizadas': total_realizadas_a_tiempo,
+        'actividades_pendientes': total_programadas - total_realizadas_a_tiempo,
+        'chart_data': [total_realizadas_a_tiempo, total_programadas - total_realizadas_a_tiempo],
+        'formula_cumplimiento': {
+            'actividades_completadas': total_realizadas_a_tiempo,
+            'actividades_programadas': total_programadas,
+            'calculo_ejemplo': (
+                f"({total_realizadas_a_tiempo} ÷ {total_programadas}) × 100 = {cumplimiento_porcentaje}%"
+                if total_programadas > 0 else "Sin actividades programadas = 100%"
+            )
+        }
+    }
+
+
+def calcular_eficiencia_operacional(equipos_queryset, equipos_para_dashboard):
+    """
+    PILAR 3: Eficiencia Operacional
+    Combina disponibilidad con uso efectivo
+    """
+    total_equipos = equipos_queryset.count()
+    equipos_disponibles = equipos_para_dashboard.count()  # Excluye De Baja e Inactivo
+
+    if total_equipos == 0:
+        return {
+            'eficiencia_porcentaje': 0,
+            'eficiencia_estado': 'CRÍTICO',
+            'equipos_disponibles': 0,
+            'equipos_no_disponibles': 0,
+            'disponibilidad_porcentaje': 0
+        }
+
+    # Calcular disponibilidad
+    disponibilidad_porcentaje = round((equipos_disponibles / total_equipos) * 100, 1)
+
+    # Por ahora, eficiencia = disponibilidad (se puede expandir con más métricas)
+    eficiencia_porcentaje = disponibilidad_porcentaje
+
+    # Determinar estado
+    if eficiencia_porcentaje >= 95:
+        estado = 'ÓPTIMO'
+    elif eficiencia_porcentaje >= 85:
+        estado = 'BUENO'
+    elif eficiencia_porcentaje >= 70:
+        estado = 'REGULAR'
+    else:
+        estado = 'DEFICIENTE'
+
+    return {
+        'eficiencia_porcentaje': eficiencia_porcentaje,
+        'eficiencia_estado': estado,
+        'equipos_disponibles': equipos_disponibles,
+        'equipos_no_disponibles': total_equipos - equipos_disponibles,
+        'disponibilidad_porcentaje': disponibilidad_porcentaje,
+        'total_equipos_eficiencia': total_equipos,
+        'formula_eficiencia': {
+            'equipos_disponibles': equipos_disponibles,
+            'total_equipos': total_equipos,
+            'equipos_activos': equipos_disponibles,  # Equipos en estado Activo/Operativo
+            'equipos_baja_inactivo': total_equipos - equipos_disponibles,  # Equipos De Baja/Inactivo
+            'calculo_ejemplo': (
+                f"({equipos_disponibles} ÷ {total_equipos}) × 100 = {eficiencia_porcentaje}%"
+                if total_equipos > 0 else "Sin equipos registrados"
+            ),
+            'componentes': {
+                'disponibilidad': {
+                    'peso': 100, 'valor': disponibilidad_porcentaje, 'descripcion': 'Equipos Activos vs Total'
+                },
+                # Para futuras expansiones se pueden agregar más componentes como:
+                # 'utilizacion': {'peso': 0, 'valor': 0, 'descripcion': 'Uso efectivo de equipos'},
+                # 'cronograma': {'peso': 0, 'valor': 0, 'descripcion': 'Cumplimiento de horarios'}
+            }
+        }
+    }
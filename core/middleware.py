@@ -2,14 +2,15 @@
 # Middleware para rate limiting y seguridad
 
 import secrets
-import time
-import hashlib
-from django.core.cache import cache
+import sys
 from django.http import HttpResponse, JsonResponse
 from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 import logging
 
+from . import limitador
+from .presencia import registrar_actividad
+
 logger = logging.getLogger('core.security')
 
 class RateLimitMiddleware(MiddlewareMixin):
@@ -77,66 +78,53 @@ class RateLimitMiddleware(MiddlewareMixin):
 
     def check_rate_limit(self, request, client_ip, limit_type, config):
         """Verifica el límite de rate E incrementa el contador (para APIs/uploads)."""
-        limit = config.get('limit', 10)
-        period = config.get('period', 300)  # 5 minutos por defecto
-
-        # Crear clave de cache única
-        cache_key = f"rate_limit_{limit_type}_{client_ip}"
-
-        try:
-            # Obtener contador actual
-            current_count = cache.get(cache_key, 0)
-
-            if current_count >= limit:
-                self._log_rate_limit_exceeded(request, client_ip, limit_type, current_count, limit)
-                return self._build_rate_limit_response(request, period)
-
-            # Incrementar contador
-            cache.set(cache_key, current_count + 1, period)
-
-        except Exception as e:
-            # Si hay error con el cache, permitir la request pero loguear
-            logger.error(f"Error in rate limiting: {e}")
-
-        return None
+        return self._consumir(request, client_ip, limit_type, config, costo=1)
 
     def check_rate_limit_only(self, request, client_ip, limit_type, config):
         """Solo verifica si se excedió el límite; NO incrementa el contador.
         Usar para login: el contador se incrementa en process_response solo si falló."""
-        limit = config.get('limit', 10)
-        period = config.get('period', 300)
+        return self._consumir(request, client_ip, limit_type, config, costo=0)
 
-        cache_key = f"rate_limit_{limit_type}_{client_ip}"
+    def _consumir(self, request, client_ip, limit_type, config, costo):
+        """
+        Comprueba IP, usuario y empresa (según config) e incrementa de forma
+        atómica en un solo viaje al backend (ver core/limitador.py).
+        """
+        period = config.get('period', 300)  # 5 minutos por defecto
 
         try:
-            current_count = cache.get(cache_key, 0)
-            if current_count >= limit:
-                self._log_rate_limit_exceeded(request, client_ip, limit_type, current_count, limit)
+            resultado = limitador.consumir(
+                limit_type, limitador.ambitos_de_peticion(request, client_ip, config), period, costo
+            )
+            if not resultado.permitido:
+                self._log_rate_limit_exceeded(
+                    request, client_ip, limit_type, resultado.conteo, resultado.limite, resultado.ambito
+                )
                 return self._build_rate_limit_response(request, period)
         except Exception as e:
-            logger.error(f"Error in rate limiting check: {e}")
+            # Si hay error con el backend, permitir la request pero loguear
+            logger.error(f"Error in rate limiting: {e}")
 
         return None
 
     def _increment_rate_limit(self, client_ip, limit_type, period):
         """Incrementa el contador de rate limit para una IP."""
-        cache_key = f"rate_limit_{limit_type}_{client_ip}"
         try:
-            current_count = cache.get(cache_key, 0)
-            cache.set(cache_key, current_count + 1, period)
+            limitador.consumir(limit_type, [('ip', client_ip, sys.maxsize)], period, costo=1)
         except Exception as e:
             logger.error(f"Error incrementing rate limit: {e}")
 
-    def _log_rate_limit_exceeded(self, request, client_ip, limit_type, current_count, limit):
+    def _log_rate_limit_exceeded(self, request, client_ip, limit_type, current_count, limit, ambito='ip'):
         logger.warning(
-            f"Rate limit exceeded for {limit_type}",
+            f"Rate limit exceeded for {limit_type} ({ambito})",
             extra={
                 'client_ip': client_ip,
                 'user_agent': request.META.get('HTTP_USER_AGENT', 'Unknown'),
                 'path': request.path,
                 'limit_type': limit_type,
                 'current_count': current_count,
-                'limit': limit
+                'limit': limit,
+                'scope': ambito,
             }
         )
 
@@ -302,6 +290,7 @@ class SessionActivityMiddleware(MiddlewareMixin):
     - Detecta requests del usuario (GET, POST)
     - Actualiza 'last_activity' en la sesión
     - Extiende la sesión si hay actividad reciente
+    - Registra la presencia del usuario para el monitor (core/presencia.py)
     - Sesión expira después de 30 minutos de INACTIVIDAD real
     """
 
@@ -341,6 +330,12 @@ class SessionActivityMiddleware(MiddlewareMixin):
             # Actualizar última actividad
             request.session['last_activity'] = now.isoformat()
 
+            # Presencia para el monitor (a lo sumo una escritura por minuto y usuario)
+            try:
+                registrar_actividad(request.user, now)
+            except Exception as e:
+                logger.warning(f"No se pudo registrar la presencia de {request.user.username}: {e}")
+
         return None
 
 class CSPNonceMiddleware:
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0074_empresa_modulo_prestamos_activo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empresa',
+            name='stats_pendiente_desde',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.12 on 2026-10-16 23:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0075_empresa_stats_pendiente_desde'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empresa',
+            name='storage_ledger_sincronizado',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='RegistroAlmacenamiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ruta', models.CharField(max_length=500, verbose_name='Ruta en Storage')),
+                ('tamaño_bytes', models.BigIntegerField(default=0, verbose_name='Tamaño (bytes)')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última Actualización')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='registros_almacenamiento', to='core.empresa', verbose_name='Empresa')),
+            ],
+            options={
+                'verbose_name': 'Registro de Almacenamiento',
+                'verbose_name_plural': 'Registros de Almacenamiento',
+                'constraints': [models.UniqueConstraint(fields=('empresa', 'ruta'), name='unique_registro_almacenamiento_empresa_ruta')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.12 on 2026-10-16 23:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0076_registro_almacenamiento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ziprequest',
+            name='attempts',
+            field=models.IntegerField(default=0, verbose_name='Intentos'),
+        ),
+        migrations.AddField(
+            model_name='ziprequest',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Último Latido'),
+        ),
+        migrations.AddField(
+            model_name='ziprequest',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Lease Expira en'),
+        ),
+        migrations.AddField(
+            model_name='ziprequest',
+            name='worker_id',
+            field=models.CharField(blank=True, max_length=100, null=True, verbose_name='Worker Asignado'),
+        ),
+        migrations.AddIndex(
+            model_name='ziprequest',
+            index=models.Index(fields=['status', 'position_in_queue'], name='zipreq_status_pos_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.12 on 2026-10-16 23:49
+
+import core.models.common
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0077_zip_request_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipo',
+            name='version_contenido',
+            field=models.CharField(default=core.models.common.generar_sello_contenido, editable=False, max_length=32, verbose_name='Versión de Contenido'),
+        ),
+        migrations.CreateModel(
+            name='ArtefactoPDF',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=30, verbose_name='Tipo de Documento')),
+                ('version', models.CharField(max_length=32, verbose_name='Versión de Contenido')),
+                ('ruta', models.CharField(max_length=500, verbose_name='Ruta en Storage')),
+                ('tamaño_bytes', models.BigIntegerField(default=0, verbose_name='Tamaño (bytes)')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Creado en')),
+                ('ultimo_acceso', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Último Acceso')),
+                ('equipo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='artefactos_pdf', to='core.equipo', verbose_name='Equipo')),
+            ],
+            options={
+                'verbose_name': 'Artefacto PDF',
+                'verbose_name_plural': 'Artefactos PDF',
+                'constraints': [models.UniqueConstraint(fields=('equipo', 'tipo', 'version'), name='unique_artefacto_pdf_equipo_tipo_version')],
+            },
+        ),
+    ]
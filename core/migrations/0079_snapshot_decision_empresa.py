@@ -0,0 +1,58 @@
+# Generated by Django 5.2.12 on 2026-10-17 00:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0078_artefacto_pdf_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotDecisionEmpresa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha del Snapshot')),
+                ('año', models.IntegerField(verbose_name='Año de Cumplimiento')),
+                ('calculado_en', models.DateTimeField(auto_now=True, verbose_name='Calculado en')),
+                ('salud_porcentaje', models.FloatField(default=0)),
+                ('salud_estado', models.CharField(blank=True, default='', max_length=20)),
+                ('equipos_saludables', models.IntegerField(default=0)),
+                ('equipos_en_riesgo', models.IntegerField(default=0)),
+                ('equipos_criticos', models.IntegerField(default=0)),
+                ('total_equipos_salud', models.IntegerField(default=0)),
+                ('cumplimiento_porcentaje', models.FloatField(default=0)),
+                ('cumplimiento_estado', models.CharField(blank=True, default='', max_length=20)),
+                ('actividades_programadas', models.IntegerField(default=0)),
+                ('actividades_realizadas', models.IntegerField(default=0)),
+                ('eficiencia_porcentaje', models.FloatField(default=0)),
+                ('eficiencia_estado', models.CharField(blank=True, default='', max_length=20)),
+                ('equipos_disponibles', models.IntegerField(default=0)),
+                ('equipos_no_disponibles', models.IntegerField(default=0)),
+                ('ingresos_anuales', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('costos_totales', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_alertas', models.IntegerField(default=0)),
+                ('count_preventivos', models.IntegerField(default=0)),
+                ('count_correctivos', models.IntegerField(default=0)),
+                ('costo_preventivos', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('costo_correctivos', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('iso_total_equipos', models.IntegerField(default=0)),
+                ('iso_equipos_conformes', models.IntegerField(default=0)),
+                ('iso_equipos_riesgo', models.IntegerField(default=0)),
+                ('iso_equipos_no_conformes', models.IntegerField(default=0)),
+                ('ahorro_cronograma', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('detalle', models.JSONField(blank=True, default=dict)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots_decision', to='core.empresa', verbose_name='Empresa')),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Decisión',
+                'verbose_name_plural': 'Snapshots de Decisión',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['fecha'], name='snapshot_decision_fecha_idx')],
+                'constraints': [models.UniqueConstraint(fields=('empresa', 'fecha'), name='unique_snapshot_decision_empresa_fecha')],
+            },
+        ),
+    ]
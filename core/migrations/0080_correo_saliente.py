@@ -0,0 +1,44 @@
+# Generated by Django 5.2.12 on 2026-10-17 00:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0079_snapshot_decision_empresa'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorreoSaliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('categoria', models.CharField(default='general', max_length=50, verbose_name='Categoría')),
+                ('asunto', models.CharField(max_length=500, verbose_name='Asunto')),
+                ('cuerpo_texto', models.TextField(blank=True, default='', verbose_name='Cuerpo (texto)')),
+                ('cuerpo_html', models.TextField(blank=True, default='', verbose_name='Cuerpo (HTML)')),
+                ('remitente', models.CharField(max_length=255, verbose_name='Remitente')),
+                ('destinatarios', models.JSONField(default=list, verbose_name='Destinatarios')),
+                ('cc', models.JSONField(blank=True, default=list, verbose_name='CC')),
+                ('bcc', models.JSONField(blank=True, default=list, verbose_name='BCC')),
+                ('reply_to', models.JSONField(blank=True, default=list, verbose_name='Responder a')),
+                ('cabeceras', models.JSONField(blank=True, default=dict, verbose_name='Cabeceras')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviando', 'Enviando'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('intentos', models.IntegerField(default=0, verbose_name='Intentos')),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próximo Intento')),
+                ('worker_id', models.CharField(blank=True, max_length=100, null=True, verbose_name='Worker Asignado')),
+                ('lease_expira', models.DateTimeField(blank=True, null=True, verbose_name='Lease Expira en')),
+                ('ultimo_error', models.TextField(blank=True, default='', verbose_name='Último Error')),
+                ('creado_en', models.DateTimeField(auto_now_add=True, verbose_name='Creado en')),
+                ('enviado_en', models.DateTimeField(blank=True, null=True, verbose_name='Enviado en')),
+            ],
+            options={
+                'verbose_name': 'Correo Saliente',
+                'verbose_name_plural': 'Correos Salientes',
+                'ordering': ['creado_en'],
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='core_correo_estado_994314_idx'), models.Index(fields=['estado', 'enviado_en'], name='core_correo_estado_e177b4_idx')],
+            },
+        ),
+    ]
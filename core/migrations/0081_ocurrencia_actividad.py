@@ -0,0 +1,41 @@
+# Generated by Django 5.2.12 on 2026-10-17 00:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0080_correo_saliente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipo',
+            name='calendario_hasta',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipo',
+            name='version_calendario',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.CreateModel(
+            name='OcurrenciaActividad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('calibracion', 'Calibración'), ('mantenimiento', 'Mantenimiento'), ('comprobacion', 'Comprobación')], max_length=20, verbose_name='Tipo de Actividad')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('estado', models.CharField(choices=[('programado', 'Programado'), ('realizado', 'Realizado')], max_length=20, verbose_name='Estado')),
+                ('detalle', models.JSONField(blank=True, default=dict, help_text='Datos del registro realizado mostrados en el calendario', verbose_name='Detalle')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ocurrencias_calendario', to='core.empresa', verbose_name='Empresa')),
+                ('equipo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ocurrencias_calendario', to='core.equipo', verbose_name='Equipo')),
+            ],
+            options={
+                'verbose_name': 'Ocurrencia de Actividad',
+                'verbose_name_plural': 'Ocurrencias de Actividades',
+                'indexes': [models.Index(fields=['empresa', 'fecha'], name='core_ocurre_empresa_baddcf_idx'), models.Index(fields=['fecha'], name='core_ocurre_fecha_ba0cf4_idx')],
+            },
+        ),
+    ]
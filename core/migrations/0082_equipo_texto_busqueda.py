@@ -0,0 +1,79 @@
+"""
+Migración: texto de búsqueda normalizado de Equipo (core/busqueda_equipos.py).
+
+1. Agrega Equipo.texto_busqueda y el índice (empresa, codigo_interno, id)
+   para la paginación keyset del listado.
+2. Calcula texto_busqueda para los equipos existentes, por lotes.
+3. Solo en PostgreSQL: índice GIN trigram (pg_trgm) sobre texto_busqueda
+   para que LIKE '%palabra%' no recorra la tabla. Si la extensión no se
+   puede crear (permisos), la búsqueda sigue funcionando sin el índice.
+"""
+
+from django.db import DatabaseError, migrations, models, transaction
+
+from core.busqueda_equipos import construir_texto_busqueda
+
+LOTE = 1000
+
+
+def calcular_texto_busqueda(apps, schema_editor):
+    Equipo = apps.get_model('core', 'Equipo')
+
+    pendientes = []
+    for equipo in Equipo.objects.only(
+        'id', 'codigo_interno', 'nombre', 'marca', 'modelo', 'numero_serie', 'responsable', 'ubicacion'
+    ).iterator(chunk_size=LOTE):
+        equipo.texto_busqueda = construir_texto_busqueda(equipo)
+        pendientes.append(equipo)
+        if len(pendientes) >= LOTE:
+            Equipo.objects.bulk_update(pendientes, ['texto_busqueda'])
+            pendientes = []
+    if pendientes:
+        Equipo.objects.bulk_update(pendientes, ['texto_busqueda'])
+
+
+def crear_indice_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except DatabaseError:
+            # Sin permisos para crear la extensión: búsqueda sin índice trigram
+            return
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS core_equipo_texto_busqueda_trgm "
+            "ON core_equipo USING gin (texto_busqueda gin_trgm_ops)"
+        )
+
+
+def eliminar_indice_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP INDEX IF EXISTS core_equipo_texto_busqueda_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0081_ocurrencia_actividad'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipo',
+            name='texto_busqueda',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='equipo',
+            index=models.Index(fields=['empresa', 'codigo_interno', 'id'], name='equipo_empresa_codigo_idx'),
+        ),
+        migrations.RunPython(calcular_texto_busqueda, migrations.RunPython.noop),
+        migrations.RunPython(crear_indice_trigram, eliminar_indice_trigram),
+    ]
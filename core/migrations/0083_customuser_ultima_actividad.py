@@ -0,0 +1,18 @@
+# Generated by Django 5.2.12 on 2026-10-17 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0082_equipo_texto_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='ultima_actividad',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Última actividad'),
+        ),
+    ]
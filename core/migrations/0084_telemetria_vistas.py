@@ -0,0 +1,58 @@
+# Generated by Django 5.2.12 on 2026-10-17 00:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0083_customuser_ultima_actividad'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeticionLenta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Fecha')),
+                ('vista', models.CharField(max_length=200, verbose_name='Vista')),
+                ('empresa_id', models.IntegerField(blank=True, null=True, verbose_name='Empresa')),
+                ('ruta', models.CharField(blank=True, default='', max_length=500, verbose_name='Ruta')),
+                ('metodo', models.CharField(blank=True, default='', max_length=10, verbose_name='Método')),
+                ('estado_http', models.IntegerField(blank=True, null=True, verbose_name='Estado HTTP')),
+                ('duracion_ms', models.FloatField(verbose_name='Duración (ms)')),
+                ('num_consultas', models.IntegerField(default=0, verbose_name='Consultas SQL')),
+                ('consultas_ms', models.FloatField(default=0, verbose_name='Tiempo en SQL (ms)')),
+                ('consultas', models.JSONField(blank=True, default=list, verbose_name='Consultas (muestra)')),
+            ],
+            options={
+                'verbose_name': 'Petición Lenta',
+                'verbose_name_plural': 'Peticiones Lentas',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['vista', '-fecha'], name='core_petici_vista_47a076_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TelemetriaVista',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('intervalo', models.DateTimeField(verbose_name='Inicio del Intervalo')),
+                ('vista', models.CharField(max_length=200, verbose_name='Vista')),
+                ('empresa_id', models.IntegerField(blank=True, null=True, verbose_name='Empresa')),
+                ('peticiones', models.IntegerField(default=0, verbose_name='Peticiones')),
+                ('errores', models.IntegerField(default=0, verbose_name='Errores (5xx)')),
+                ('duracion_total_ms', models.FloatField(default=0, verbose_name='Duración Total (ms)')),
+                ('duracion_max_ms', models.FloatField(default=0, verbose_name='Duración Máxima (ms)')),
+                ('histograma', models.JSONField(default=list, verbose_name='Histograma de Latencia')),
+                ('consultas', models.IntegerField(default=0, verbose_name='Consultas SQL')),
+                ('consultas_ms', models.FloatField(default=0, verbose_name='Tiempo en SQL (ms)')),
+                ('bytes_respuesta', models.BigIntegerField(default=0, verbose_name='Bytes de Respuesta')),
+            ],
+            options={
+                'verbose_name': 'Telemetría de Vista',
+                'verbose_name_plural': 'Telemetría de Vistas',
+                'indexes': [models.Index(fields=['intervalo', 'vista'], name='core_teleme_interva_0b7a8d_idx'), models.Index(fields=['empresa_id', 'intervalo'], name='core_teleme_empresa_56d4d1_idx')],
+            },
+        ),
+    ]
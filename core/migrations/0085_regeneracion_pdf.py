@@ -0,0 +1,40 @@
+# Generated by Django 5.2.12 on 2026-10-17 01:38
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0084_telemetria_vistas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegeneracionPDF',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('confirmacion', 'Confirmación Metrológica'), ('intervalos', 'Intervalos de Calibración'), ('comprobacion', 'Comprobación Metrológica')], max_length=20, verbose_name='Tipo de Documento')),
+                ('objeto_id', models.IntegerField(verbose_name='ID del Documento')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('omitido', 'Omitido'), ('fallido', 'Fallido')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('intentos', models.IntegerField(default=0, verbose_name='Intentos')),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próximo Intento')),
+                ('worker_id', models.CharField(blank=True, max_length=100, null=True, verbose_name='Worker Asignado')),
+                ('lease_expira', models.DateTimeField(blank=True, null=True, verbose_name='Lease Expira en')),
+                ('ultimo_error', models.TextField(blank=True, default='', verbose_name='Último Error')),
+                ('creado_en', models.DateTimeField(auto_now_add=True, verbose_name='Creado en')),
+                ('completado_en', models.DateTimeField(blank=True, null=True, verbose_name='Completado en')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='regeneraciones_pdf', to='core.empresa', verbose_name='Empresa')),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='regeneraciones_pdf', to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Regeneración de PDF',
+                'verbose_name_plural': 'Regeneraciones de PDF',
+                'ordering': ['creado_en'],
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='core_regene_estado_4013fc_idx'), models.Index(fields=['tipo', 'objeto_id'], name='core_regene_tipo_613d87_idx')],
+            },
+        ),
+    ]
@@ -4,17 +4,17 @@
 import logging
 
 from .common import get_upload_path, meses_decimales_a_relativedelta
-from .empresa import Empresa, PlanSuscripcion, EmpresaFormatoLog
+from .empresa import Empresa, PlanSuscripcion, EmpresaFormatoLog, SnapshotDecisionEmpresa
 from .users import CustomUser, OnboardingProgress
 from .catalogs import Unidad, Ubicacion, Procedimiento, Proveedor
 from .equipment import Equipo, BajaEquipo, NotificacionVencimiento
-from .activities import Calibracion, Mantenimiento, Comprobacion
+from .activities import Calibracion, Mantenimiento, Comprobacion, OcurrenciaActividad
 from .loans import AgrupacionPrestamo, PrestamoEquipo
-from .documents import Documento, ZipRequest, NotificacionZip
+from .documents import Documento, ZipRequest, NotificacionZip, RegistroAlmacenamiento, ArtefactoPDF, RegeneracionPDF
 from .payments import TerminosYCondiciones, AceptacionTerminos, TransaccionPago, LinkPago
 from .system import (
-    EmailConfiguration, SystemScheduleConfig, MetricasEficienciaMetrologica,
-    MaintenanceTask, CommandLog, SystemHealthCheck
+    EmailConfiguration, CorreoSaliente, TelemetriaVista, PeticionLenta, SystemScheduleConfig,
+    MetricasEficienciaMetrologica, MaintenanceTask, CommandLog, SystemHealthCheck
 )
 
 # Signals — importar AL FINAL
@@ -25,15 +25,15 @@ logger = logging.getLogger('core')
 
 __all__ = [
     'get_upload_path', 'meses_decimales_a_relativedelta',
-    'Empresa', 'PlanSuscripcion', 'EmpresaFormatoLog',
+    'Empresa', 'PlanSuscripcion', 'EmpresaFormatoLog', 'SnapshotDecisionEmpresa',
     'CustomUser', 'OnboardingProgress',
     'Unidad', 'Ubicacion', 'Procedimiento', 'Proveedor',
     'Equipo', 'BajaEquipo', 'NotificacionVencimiento',
-    'Calibracion', 'Mantenimiento', 'Comprobacion',
+    'Calibracion', 'Mantenimiento', 'Comprobacion', 'OcurrenciaActividad',
     'AgrupacionPrestamo', 'PrestamoEquipo',
-    'Documento', 'ZipRequest', 'NotificacionZip',
+    'Documento', 'ZipRequest', 'NotificacionZip', 'RegistroAlmacenamiento', 'ArtefactoPDF', 'RegeneracionPDF',
     'TerminosYCondiciones', 'AceptacionTerminos', 'TransaccionPago', 'LinkPago',
-    'EmailConfiguration', 'SystemScheduleConfig', 'MetricasEficienciaMetrologica',
-    'MaintenanceTask', 'CommandLog', 'SystemHealthCheck',
+    'EmailConfiguration', 'CorreoSaliente', 'TelemetriaVista', 'PeticionLenta', 'SystemScheduleConfig',
+    'MetricasEficienciaMetrologica', 'MaintenanceTask', 'CommandLog', 'SystemHealthCheck',
     'update_equipo_calibracion_info',
 ]
@@ -598,3 +598,45 @@ class Comprobacion(models.Model):
         if not self.equipo.frecuencia_comprobacion_meses or not self.fecha_comprobacion:
             return None
         return self.fecha_comprobacion + meses_decimales_a_relativedelta(self.equipo.frecuencia_comprobacion_meses)
+
+
+class OcurrenciaActividad(models.Model):
+    """
+    Índice materializado del calendario de actividades (core/calendario_indice.py).
+
+    Una fila por ocurrencia programada (proyectada desde la próxima fecha del
+    equipo según su frecuencia) o realizada (registro histórico). Se
+    reconstruye por equipo cuando cambia su sello ``version_contenido``.
+    """
+    TIPO_CHOICES = [
+        ('calibracion', 'Calibración'),
+        ('mantenimiento', 'Mantenimiento'),
+        ('comprobacion', 'Comprobación'),
+    ]
+    ESTADO_CHOICES = [
+        ('programado', 'Programado'),
+        ('realizado', 'Realizado'),
+    ]
+
+    empresa = models.ForeignKey(
+        'Empresa', on_delete=models.CASCADE, related_name='ocurrencias_calendario', verbose_name="Empresa"
+    )
+    equipo = models.ForeignKey(
+        Equipo, on_delete=models.CASCADE, related_name='ocurrencias_calendario', verbose_name="Equipo"
+    )
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name="Tipo de Actividad")
+    fecha = models.DateField(verbose_name="Fecha")
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, verbose_name="Estado")
+    detalle = models.JSONField(default=dict, blank=True, verbose_name="Detalle",
+                               help_text="Datos del registro realizado mostrados en el calendario")
+
+    class Meta:
+        verbose_name = "Ocurrencia de Actividad"
+        verbose_name_plural = "Ocurrencias de Actividades"
+        indexes = [
+            models.Index(fields=['empresa', 'fecha']),
+            models.Index(fields=['fecha']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.estado} - {self.equipo_id} ({self.fecha})"
@@ -1,6 +1,8 @@
 # core/models/common.py
 # Funciones auxiliares compartidas por todos los modelos
 
+import uuid
+
 from dateutil.relativedelta import relativedelta
 
 
@@ -113,3 +115,8 @@ def get_upload_path(instance, filename):
     safe_filename = filename # Por simplicidad, se mantiene el nombre original, pero es un punto de mejora
 
     return os.path.join(base_path, subfolder, safe_filename)
+
+
+def generar_sello_contenido():
+    """Sello aleatorio para Equipo.version_contenido (ver core/pdf_cache.py)."""
+    return uuid.uuid4().hex
@@ -1,8 +1,9 @@
 # core/models/documents.py
-# Modelos: Documento, ZipRequest, NotificacionZip
+# Modelos: Documento, ZipRequest, NotificacionZip, RegistroAlmacenamiento, ArtefactoPDF
 
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 
 class Documento(models.Model):
@@ -99,6 +100,12 @@ class ZipRequest(models.Model):
     equipos_procesados = models.IntegerField(default=0, verbose_name="Equipos Procesados")
     estimated_completion = models.DateTimeField(null=True, blank=True, verbose_name="Tiempo Estimado de Finalización")
 
+    # Lease del worker que procesa la solicitud (ver core/zip_queue.py)
+    worker_id = models.CharField(max_length=100, null=True, blank=True, verbose_name="Worker Asignado")
+    lease_expires_at = models.DateTimeField(null=True, blank=True, db_index=True, verbose_name="Lease Expira en")
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name="Último Latido")
+    attempts = models.IntegerField(default=0, verbose_name="Intentos")
+
     def get_current_position(self):
         """Obtiene la posición actual en la cola."""
         if self.status not in ['pending', 'processing']:
@@ -137,6 +144,9 @@ class ZipRequest(models.Model):
         verbose_name = "Solicitud de ZIP"
         verbose_name_plural = "Solicitudes de ZIP"
         ordering = ['position_in_queue', 'created_at']
+        indexes = [
+            models.Index(fields=['status', 'position_in_queue'], name='zipreq_status_pos_idx'),
+        ]
 
 
 class NotificacionZip(models.Model):
@@ -172,3 +182,122 @@ class NotificacionZip(models.Model):
 
     def __str__(self):
         return f"Notificación {self.tipo} - {self.user.username} - {self.get_status_display()}"
+
+
+class RegistroAlmacenamiento(models.Model):
+    """
+    Ledger de tamaños de archivo por empresa (ver core/storage_ledger.py).
+
+    Se escribe al subir/eliminar archivos y se repara con el comando
+    reconciliar_almacenamiento. El uso total de la empresa es un SUM sobre
+    esta tabla en lugar de un head_object por archivo.
+    """
+    empresa = models.ForeignKey(
+        'Empresa',
+        on_delete=models.CASCADE,
+        related_name='registros_almacenamiento',
+        verbose_name="Empresa"
+    )
+    ruta = models.CharField(max_length=500, verbose_name="Ruta en Storage")
+    tamaño_bytes = models.BigIntegerField(default=0, verbose_name="Tamaño (bytes)")
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Última Actualización")
+
+    class Meta:
+        verbose_name = "Registro de Almacenamiento"
+        verbose_name_plural = "Registros de Almacenamiento"
+        constraints = [
+            models.UniqueConstraint(fields=['empresa', 'ruta'], name='unique_registro_almacenamiento_empresa_ruta'),
+        ]
+
+    def __str__(self):
+        return f"{self.ruta} ({self.tamaño_bytes} bytes)"
+
+
+class ArtefactoPDF(models.Model):
+    """
+    PDF renderizado y persistido en storage (ver core/pdf_cache.py).
+
+    Se identifica por equipo + tipo + ``Equipo.version_contenido``: mientras el
+    sello no cambie, el PDF se sirve desde storage sin volver a WeasyPrint.
+    """
+    equipo = models.ForeignKey(
+        'Equipo',
+        on_delete=models.CASCADE,
+        related_name='artefactos_pdf',
+        verbose_name="Equipo"
+    )
+    tipo = models.CharField(max_length=30, verbose_name="Tipo de Documento")
+    version = models.CharField(max_length=32, verbose_name="Versión de Contenido")
+    ruta = models.CharField(max_length=500, verbose_name="Ruta en Storage")
+    tamaño_bytes = models.BigIntegerField(default=0, verbose_name="Tamaño (bytes)")
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Creado en")
+    ultimo_acceso = models.DateTimeField(default=timezone.now, db_index=True, verbose_name="Último Acceso")
+
+    class Meta:
+        verbose_name = "Artefacto PDF"
+        verbose_name_plural = "Artefactos PDF"
+        constraints = [
+            models.UniqueConstraint(fields=['equipo', 'tipo', 'version'], name='unique_artefacto_pdf_equipo_tipo_version'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} equipo {self.equipo_id} ({self.version[:8]})"
+
+
+class RegeneracionPDF(models.Model):
+    """
+    Trabajo de regeneración del PDF de un documento aprobado
+    (core/regeneracion_pdf.py). La aprobación se guarda de inmediato y el
+    PDF con los datos de aprobación se renderiza fuera de la petición.
+    """
+    TIPO_CHOICES = [
+        ('confirmacion', 'Confirmación Metrológica'),
+        ('intervalos', 'Intervalos de Calibración'),
+        ('comprobacion', 'Comprobación Metrológica'),
+    ]
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completado', 'Completado'),
+        ('omitido', 'Omitido'),
+        ('fallido', 'Fallido'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name="Tipo de Documento")
+    objeto_id = models.IntegerField(verbose_name="ID del Documento")
+    empresa = models.ForeignKey(
+        'Empresa',
+        on_delete=models.CASCADE,
+        related_name='regeneraciones_pdf',
+        verbose_name="Empresa"
+    )
+    solicitado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='regeneraciones_pdf',
+        verbose_name="Solicitado por"
+    )
+
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente', verbose_name="Estado")
+    intentos = models.IntegerField(default=0, verbose_name="Intentos")
+    proximo_intento = models.DateTimeField(default=timezone.now, verbose_name="Próximo Intento")
+    worker_id = models.CharField(max_length=100, null=True, blank=True, verbose_name="Worker Asignado")
+    lease_expira = models.DateTimeField(null=True, blank=True, verbose_name="Lease Expira en")
+    ultimo_error = models.TextField(blank=True, default='', verbose_name="Último Error")
+
+    creado_en = models.DateTimeField(auto_now_add=True, verbose_name="Creado en")
+    completado_en = models.DateTimeField(null=True, blank=True, verbose_name="Completado en")
+
+    class Meta:
+        verbose_name = "Regeneración de PDF"
+        verbose_name_plural = "Regeneraciones de PDF"
+        ordering = ['creado_en']
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento']),
+            models.Index(fields=['tipo', 'objeto_id']),
+        ]
+
+    def __str__(self):
+        return f"[{self.estado}] {self.tipo} #{self.objeto_id}"
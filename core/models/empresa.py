@@ -1,5 +1,5 @@
 # core/models/empresa.py
-# Modelos: Empresa, PlanSuscripcion
+# Modelos: Empresa, PlanSuscripcion, EmpresaFormatoLog, SnapshotDecisionEmpresa
 
 from django.db import models
 from datetime import timedelta
@@ -435,8 +435,14 @@ class Empresa(models.Model):
     # Metadatos
     stats_ultima_actualizacion = models.DateTimeField(null=True, blank=True)
     stats_fecha_calculo = models.DateField(null=True, blank=True)
+    # Marcada por las señales en modo diferido; la limpia procesar_stats_pendientes
+    stats_pendiente_desde = models.DateTimeField(null=True, blank=True, db_index=True)
     # ────────────────────────────────────────────────────────────────────────────
 
+    # Ledger de almacenamiento (RegistroAlmacenamiento). Nulo = aún no reconciliado,
+    # get_total_storage_used_mb usa el escaneo legado hasta que se sincronice.
+    storage_ledger_sincronizado = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         verbose_name = "Empresa"
         verbose_name_plural = "Empresas"
@@ -455,18 +461,16 @@ class Empresa(models.Model):
         """
         Calcula y persiste las métricas del dashboard para esta empresa.
 
-        Reutiliza las funciones get_projected_activities_for_year() y
-        get_projected_maintenance_compliance_for_year() de dashboard.py.
+        Usa el motor de proyección compartido (core.proyecciones) y solo
+        cuenta estados, sin materializar filas.
         Se llama desde señales (post_save/post_delete de Equipo, Calibracion,
-        Mantenimiento, Comprobacion) y desde el comando de gestión diario.
+        Mantenimiento, Comprobacion) a través de core.stats_queue, que agrupa
+        las invalidaciones por empresa, y desde el comando de gestión diario.
         """
         from django.db.models import Count, Case, When, IntegerField as IntF
         from django.utils import timezone
         from datetime import date, timedelta
-        from core.views.dashboard import (
-            get_projected_activities_for_year,
-            get_projected_maintenance_compliance_for_year,
-        )
+        from core.proyecciones import proyectar_anio
 
         today = date.today()
         fecha_limite = today + timedelta(days=30)
@@ -516,21 +520,9 @@ class Empresa(models.Model):
 
         # Cumplimiento anual — incluye De Baja/Inactivos del año actual (con select_related)
         equipos_para_compliance = equipos.select_related('baja_registro')
-        cal_proj = get_projected_activities_for_year(equipos_para_compliance, 'calibracion', year, today)
-        comp_proj = get_projected_activities_for_year(equipos_para_compliance, 'comprobacion', year, today)
-        mant_proj = get_projected_maintenance_compliance_for_year(equipos_para_compliance, year, today)
-
-        def _contar(proyeccion):
-            r = n = p = 0
-            for item in proyeccion:
-                s = item['status']
-                if s == 'Realizado':
-                    r += 1
-                elif s == 'No Cumplido':
-                    n += 1
-                else:
-                    p += 1
-            return {'realizadas': r, 'no_cumplidas': n, 'pendientes': p}
+        cal_proj = proyectar_anio(equipos_para_compliance, 'calibracion', year, today)
+        comp_proj = proyectar_anio(equipos_para_compliance, 'comprobacion', year, today)
+        mant_proj = proyectar_anio(equipos_para_compliance, 'mantenimiento', year, today)
 
         self.stats_total_equipos = counts['total'] or 0
         self.stats_equipos_activos = counts['activos'] or 0
@@ -542,9 +534,9 @@ class Empresa(models.Model):
         self.stats_mantenimientos_proximos = actividades['mant_p'] or 0
         self.stats_comprobaciones_vencidas = actividades['comp_v'] or 0
         self.stats_comprobaciones_proximas = actividades['comp_p'] or 0
-        self.stats_compliance_calibracion = _contar(cal_proj)
-        self.stats_compliance_mantenimiento = _contar(mant_proj)
-        self.stats_compliance_comprobacion = _contar(comp_proj)
+        self.stats_compliance_calibracion = cal_proj.conteos()
+        self.stats_compliance_mantenimiento = mant_proj.conteos()
+        self.stats_compliance_comprobacion = comp_proj.conteos()
         self.stats_ultima_actualizacion = timezone.now()
         self.stats_fecha_calculo = today
 
@@ -999,7 +991,11 @@ class Empresa(models.Model):
         """
         Calcula el uso total de almacenamiento en MB para la empresa.
 
-        Optimizado para evitar timeouts en R2/S3:
+        Si el ledger de almacenamiento ya fue reconciliado para la empresa
+        (storage_ledger_sincronizado), el uso es un SUM sobre
+        RegistroAlmacenamiento. Si no, se usa el escaneo legado.
+
+        Escaneo legado, optimizado para evitar timeouts en R2/S3:
         - Cache de 2 horas: la mayoría de las visitas no hacen ninguna llamada a R2.
         - Sin llamadas exists(): cada archivo hace UNA sola llamada a R2 (head_object),
           no dos (exists + size). Esto reduce a la mitad las llamadas.
@@ -1024,6 +1020,16 @@ class Empresa(models.Model):
         except Exception:
             pass
 
+        if self.storage_ledger_sincronizado:
+            # Ledger sincronizado: un solo SUM indexado, sin llamadas a R2
+            from core.storage_ledger import uso_total_bytes
+            total_size_mb = round(uso_total_bytes(self) / (1024 * 1024), 2)
+            try:
+                cache.set(cache_key, total_size_mb, 7200)
+            except Exception:
+                pass
+            return total_size_mb
+
         def _size(archivo):
             """
             Devuelve el tamaño de un FieldFile en bytes.
@@ -1220,3 +1226,77 @@ class EmpresaFormatoLog(models.Model):
 
     def __str__(self):
         return f"{self.empresa} | {self.campo}: {self.valor_anterior} → {self.valor_nuevo}"
+
+
+class SnapshotDecisionEmpresa(models.Model):
+    """
+    Métricas del Panel de Decisiones precalculadas por empresa y día
+    (ver core/snapshots_decision.py).
+
+    El panel SAM agrega la fila más reciente de cada empresa en lugar de
+    recalcular los pilares e inteligencia empresarial de todas las empresas
+    en el request. Las filas de días anteriores forman el historial diario.
+    """
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        related_name='snapshots_decision',
+        verbose_name="Empresa"
+    )
+    fecha = models.DateField(verbose_name="Fecha del Snapshot")
+    año = models.IntegerField(verbose_name="Año de Cumplimiento")
+    calculado_en = models.DateTimeField(auto_now=True, verbose_name="Calculado en")
+
+    # Pilar 1: Salud del equipo
+    salud_porcentaje = models.FloatField(default=0)
+    salud_estado = models.CharField(max_length=20, blank=True, default='')
+    equipos_saludables = models.IntegerField(default=0)
+    equipos_en_riesgo = models.IntegerField(default=0)
+    equipos_criticos = models.IntegerField(default=0)
+    total_equipos_salud = models.IntegerField(default=0)
+
+    # Pilar 2: Cumplimiento
+    cumplimiento_porcentaje = models.FloatField(default=0)
+    cumplimiento_estado = models.CharField(max_length=20, blank=True, default='')
+    actividades_programadas = models.IntegerField(default=0)
+    actividades_realizadas = models.IntegerField(default=0)
+
+    # Pilar 3: Eficiencia operacional
+    eficiencia_porcentaje = models.FloatField(default=0)
+    eficiencia_estado = models.CharField(max_length=20, blank=True, default='')
+    equipos_disponibles = models.IntegerField(default=0)
+    equipos_no_disponibles = models.IntegerField(default=0)
+
+    # Financiero
+    ingresos_anuales = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    costos_totales = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    # Inteligencia empresarial (totales sumables)
+    total_alertas = models.IntegerField(default=0)
+    count_preventivos = models.IntegerField(default=0)
+    count_correctivos = models.IntegerField(default=0)
+    costo_preventivos = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    costo_correctivos = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    iso_total_equipos = models.IntegerField(default=0)
+    iso_equipos_conformes = models.IntegerField(default=0)
+    iso_equipos_riesgo = models.IntegerField(default=0)
+    iso_equipos_no_conformes = models.IntegerField(default=0)
+    ahorro_cronograma = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    # Listas para el detalle (alertas, no conformidades, tendencias mensuales,
+    # vencidas/urgentes...) serializadas sin instancias de modelo
+    detalle = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        verbose_name = "Snapshot de Decisión"
+        verbose_name_plural = "Snapshots de Decisión"
+        ordering = ['-fecha']
+        constraints = [
+            models.UniqueConstraint(fields=['empresa', 'fecha'], name='unique_snapshot_decision_empresa_fecha'),
+        ]
+        indexes = [
+            models.Index(fields=['fecha'], name='snapshot_decision_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.empresa} | {self.fecha}"
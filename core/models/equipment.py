@@ -10,8 +10,13 @@ from core.constants import (
     ESTADO_EN_PRESTAMO, EQUIPO_ESTADO_CHOICES,
     PRESTAMO_ACTIVO,
 )
+from core.busqueda_equipos import CAMPOS_BUSQUEDA, construir_texto_busqueda
+from core.fechas_equipos import CAMPOS_PROXIMAS, aplicar_fechas, ultimas_fechas
 from .empresa import Empresa
-from .common import get_upload_path, meses_decimales_a_relativedelta
+from .common import get_upload_path, meses_decimales_a_relativedelta, generar_sello_contenido
+
+# Marca "sin fecha precargada": los calcular_proxima_* consultan el historial
+_SIN_PRECARGA = object()
 
 
 class Equipo(models.Model):
@@ -69,6 +74,23 @@ class Equipo(models.Model):
     )
     codificacion_formato = models.CharField(max_length=50, blank=True, null=True, verbose_name="Codificación del Formato")
 
+    # Sello de contenido para la caché de PDFs renderizados (core/pdf_cache.py).
+    # save() lo renueva en cada guardado; las señales, cuando cambian sus actividades o el
+    # formato de la empresa.
+    version_contenido = models.CharField(
+        max_length=32,
+        default=generar_sello_contenido,
+        editable=False,
+        verbose_name="Versión de Contenido"
+    )
+    # Estado del índice del calendario (core/calendario_indice.py): sello con el que se
+    # materializaron sus ocurrencias y fecha hasta la que se proyectaron.
+    version_calendario = models.CharField(max_length=32, blank=True, default='', editable=False)
+    calendario_hasta = models.DateField(blank=True, null=True, editable=False)
+    # Campos buscables normalizados (minúsculas, sin tildes) para la búsqueda indexada del
+    # listado (core/busqueda_equipos.py). Lo mantiene save(); en PostgreSQL tiene índice trigram.
+    texto_busqueda = models.TextField(blank=True, default='', editable=False)
+
     # Campos para fechas de próximas actividades y frecuencias (Frecuencia en DecimalField)
     fecha_ultima_calibracion = models.DateField(blank=True, null=True, verbose_name="Fecha Última Calibración")
     proxima_calibracion = models.DateField(blank=True, null=True, verbose_name="Próxima Calibración")
@@ -95,6 +117,10 @@ class Equipo(models.Model):
         ]
         # Restricción de unicidad a nivel de base de datos para 'codigo_interno' por 'empresa'
         unique_together = ('codigo_interno', 'empresa')
+        indexes = [
+            # Paginación keyset del listado por empresa: ORDER BY codigo_interno, id
+            models.Index(fields=['empresa', 'codigo_interno', 'id'], name='equipo_empresa_codigo_idx'),
+        ]
 
 
     def __str__(self):
@@ -102,34 +128,46 @@ class Equipo(models.Model):
 
     def save(self, *args, **kwargs):
         """
-        Sobreescribe save para calcular las próximas fechas.
-        Para equipos nuevos, primero se guarda y luego se calculan las fechas.
+        Sobreescribe save para calcular las próximas fechas antes de guardar,
+        en un único guardado.
+        Para equipos nuevos se parte de las fechas proporcionadas; para los
+        existentes, del historial (una consulta agrupada por tipo).
         """
         is_new = self.pk is None
 
-        # Primero guardar el objeto
-        super().save(*args, **kwargs)
+        # Texto de búsqueda; en guardados parciales solo si cambió algún campo buscable
+        self.texto_busqueda = construir_texto_busqueda(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(CAMPOS_BUSQUEDA):
+            update_fields = kwargs['update_fields'] = [*update_fields, 'texto_busqueda']
+
+        if is_new:
+            # auto_now_add aún no fijó la fecha de registro, que es la base por defecto
+            if self.fecha_registro is None:
+                self.fecha_registro = timezone.now()
+            self.calcular_proxima_calibracion_from_date(self.fecha_ultima_calibracion)
+            self.calcular_proximo_mantenimiento_from_date(self.fecha_ultimo_mantenimiento)
+            self.calcular_proxima_comprobacion_from_date(self.fecha_ultima_comprobacion)
+        else:
+            aplicar_fechas(self, ultimas_fechas([self.pk]))
 
-        # Después calcular las próximas fechas (solo si el objeto ya tiene pk)
-        if self.pk:
-            # Inicializar fechas si es nuevo equipo
-            if is_new:
-                # Para equipos nuevos, usar las fechas proporcionadas como base
-                self.calcular_proxima_calibracion_from_date(self.fecha_ultima_calibracion)
-                self.calcular_proximo_mantenimiento_from_date(self.fecha_ultimo_mantenimiento)
-                self.calcular_proxima_comprobacion_from_date(self.fecha_ultima_comprobacion)
-            else:
-                # Para equipos existentes, usar el historial
-                self.calcular_proxima_calibracion()
-                self.calcular_proximo_mantenimiento()
-                self.calcular_proxima_comprobacion()
+        # Sello nuevo para la caché de PDFs; viaja en el mismo UPDATE del guardado
+        self.version_contenido = generar_sello_contenido()
 
-            # Guardar nuevamente solo las fechas calculadas
-            super().save(update_fields=['proxima_calibracion', 'proximo_mantenimiento', 'proxima_comprobacion'])
+        # Los guardados parciales también escriben las fechas calculadas y el sello
+        if update_fields is not None:
+            kwargs['update_fields'] = [
+                *update_fields,
+                *(c for c in (*CAMPOS_PROXIMAS, 'version_contenido') if c not in update_fields),
+            ]
 
+        super().save(*args, **kwargs)
 
-    def calcular_proxima_calibracion(self):
-        """Calcula la próxima fecha de calibración."""
+    def calcular_proxima_calibracion(self, ultima_calibracion=_SIN_PRECARGA):
+        """
+        Calcula la próxima fecha de calibración.
+        ``ultima_calibracion`` (fecha más reciente del historial, precargada) evita la consulta.
+        """
         if self.estado in ['De Baja', 'Inactivo']: # Si está de baja o inactivo, no hay próxima actividad
             self.proxima_calibracion = None
             return
@@ -138,13 +176,15 @@ class Equipo(models.Model):
             self.proxima_calibracion = None
             return
 
-        latest_calibracion = self.calibraciones.order_by('-fecha_calibracion').first()
+        if ultima_calibracion is _SIN_PRECARGA:
+            latest_calibracion = self.calibraciones.order_by('-fecha_calibracion').first()
+            ultima_calibracion = latest_calibracion.fecha_calibracion if latest_calibracion else None
 
         # Si hay una última calibración, calcular a partir de ella
-        if latest_calibracion and latest_calibracion.fecha_calibracion:
+        if ultima_calibracion:
             # Usar función helper para manejar decimales correctamente
             delta = meses_decimales_a_relativedelta(self.frecuencia_calibracion_meses)
-            self.proxima_calibracion = latest_calibracion.fecha_calibracion + delta
+            self.proxima_calibracion = ultima_calibracion + delta
         else:
             # Si no hay calibraciones previas, proyectar desde la fecha de adquisición o registro del equipo
             base_date = self.fecha_adquisicion if self.fecha_adquisicion else self.fecha_registro.date()
@@ -154,8 +194,11 @@ class Equipo(models.Model):
             else:
                 self.proxima_calibracion = None
 
-    def calcular_proximo_mantenimiento(self):
-        """Calcula la próxima fecha de mantenimiento."""
+    def calcular_proximo_mantenimiento(self, ultimo_mantenimiento=_SIN_PRECARGA):
+        """
+        Calcula la próxima fecha de mantenimiento.
+        ``ultimo_mantenimiento`` (fecha más reciente del historial, precargada) evita la consulta.
+        """
         if self.estado in ['De Baja', 'Inactivo']: # Si está de baja o inactivo, no hay próxima actividad
             self.proximo_mantenimiento = None
             return
@@ -164,11 +207,13 @@ class Equipo(models.Model):
             self.proximo_mantenimiento = None
             return
 
-        latest_mantenimiento = self.mantenimientos.order_by('-fecha_mantenimiento').first()
+        if ultimo_mantenimiento is _SIN_PRECARGA:
+            latest_mantenimiento = self.mantenimientos.order_by('-fecha_mantenimiento').first()
+            ultimo_mantenimiento = latest_mantenimiento.fecha_mantenimiento if latest_mantenimiento else None
 
-        if latest_mantenimiento and latest_mantenimiento.fecha_mantenimiento:
+        if ultimo_mantenimiento:
             delta = meses_decimales_a_relativedelta(self.frecuencia_mantenimiento_meses)
-            self.proximo_mantenimiento = latest_mantenimiento.fecha_mantenimiento + delta
+            self.proximo_mantenimiento = ultimo_mantenimiento + delta
         else:
             # JERARQUÍA CORRECTA: 1. fecha_ultima_mantenimiento, 2. fecha_ultima_calibracion, 3. fecha_adquisicion, 4. fecha_registro
             if self.fecha_ultimo_mantenimiento:
@@ -186,8 +231,11 @@ class Equipo(models.Model):
             else:
                 self.proximo_mantenimiento = None
 
-    def calcular_proxima_comprobacion(self):
-        """Calcula la próxima fecha de comprobación."""
+    def calcular_proxima_comprobacion(self, ultima_comprobacion=_SIN_PRECARGA):
+        """
+        Calcula la próxima fecha de comprobación.
+        ``ultima_comprobacion`` (fecha más reciente del historial, precargada) evita la consulta.
+        """
         if self.estado in ['De Baja', 'Inactivo']: # Si está de baja o inactivo, no hay próxima actividad
             self.proxima_comprobacion = None
             return
@@ -196,11 +244,13 @@ class Equipo(models.Model):
             self.proxima_comprobacion = None
             return
 
-        latest_comprobacion = self.comprobaciones.order_by('-fecha_comprobacion').first()
+        if ultima_comprobacion is _SIN_PRECARGA:
+            latest_comprobacion = self.comprobaciones.order_by('-fecha_comprobacion').first()
+            ultima_comprobacion = latest_comprobacion.fecha_comprobacion if latest_comprobacion else None
 
-        if latest_comprobacion and latest_comprobacion.fecha_comprobacion:
+        if ultima_comprobacion:
             delta = meses_decimales_a_relativedelta(self.frecuencia_comprobacion_meses)
-            self.proxima_comprobacion = latest_comprobacion.fecha_comprobacion + delta
+            self.proxima_comprobacion = ultima_comprobacion + delta
         else:
             # JERARQUÍA CORRECTA: 1. fecha_ultima_comprobacion, 2. fecha_ultima_calibracion, 3. fecha_adquisicion, 4. fecha_registro
             if self.fecha_ultima_comprobacion:
@@ -420,6 +470,7 @@ class NotificacionVencimiento(models.Model):
             (puede_enviar, numero_recordatorio) - tupla con booleano y número de recordatorio
         """
         from django.utils import timezone
+        from core.recordatorios_vencidos import decidir_recordatorio
         # Buscar última notificación para esta actividad
         ultima_notificacion = cls.objects.filter(
             equipo=equipo,
@@ -427,21 +478,13 @@ class NotificacionVencimiento(models.Model):
             fecha_vencimiento=fecha_vencimiento
         ).order_by('-numero_recordatorio').first()
 
-        if not ultima_notificacion:
-            # Primera vez que se envía notificación
-            return (True, 1)
-
-        # Verificar si ya se enviaron 3 recordatorios
-        if ultima_notificacion.numero_recordatorio >= 3:
-            return (False, None)
-
-        # Verificar si han pasado al menos 7 días desde último recordatorio
-        dias_desde_ultimo = (timezone.now().date() - ultima_notificacion.fecha_notificacion.date()).days
-        if dias_desde_ultimo < 7:
-            return (False, None)
+        ultimo = None
+        if ultima_notificacion:
+            ultimo = (ultima_notificacion.numero_recordatorio, ultima_notificacion.fecha_notificacion)
 
-        # Puede enviar el siguiente recordatorio
-        return (True, ultima_notificacion.numero_recordatorio + 1)
+        # Mismas reglas que el planificador semanal: máximo 3, uno cada 7 días
+        puede_enviar, numero_recordatorio, _ = decidir_recordatorio(ultimo, timezone.localdate())
+        return (puede_enviar, numero_recordatorio)
 
     @classmethod
     def marcar_actividad_completada(cls, equipo, tipo_actividad, fecha_vencimiento_anterior):
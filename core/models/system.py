@@ -1,6 +1,6 @@
 # core/models/system.py
-# Modelos: EmailConfiguration, SystemScheduleConfig, MetricasEficienciaMetrologica,
-#           MaintenanceTask, CommandLog, SystemHealthCheck
+# Modelos: EmailConfiguration, CorreoSaliente, TelemetriaVista, PeticionLenta, SystemScheduleConfig,
+#           MetricasEficienciaMetrologica, MaintenanceTask, CommandLog, SystemHealthCheck
 
 from django.db import models
 from django.utils import timezone
@@ -237,6 +237,108 @@ class EmailConfiguration(models.Model):
             return False, str(e)
 
 
+class CorreoSaliente(models.Model):
+    """
+    Bandeja de salida de emails (core/email_outbox.py).
+    Cada fila es un mensaje ya renderizado que el worker envía con reintentos.
+    """
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('enviando', 'Enviando'),
+        ('enviado', 'Enviado'),
+        ('fallido', 'Fallido'),
+    ]
+
+    categoria = models.CharField(max_length=50, default='general', verbose_name="Categoría")
+    asunto = models.CharField(max_length=500, verbose_name="Asunto")
+    cuerpo_texto = models.TextField(blank=True, default='', verbose_name="Cuerpo (texto)")
+    cuerpo_html = models.TextField(blank=True, default='', verbose_name="Cuerpo (HTML)")
+    remitente = models.CharField(max_length=255, verbose_name="Remitente")
+    destinatarios = models.JSONField(default=list, verbose_name="Destinatarios")
+    cc = models.JSONField(default=list, blank=True, verbose_name="CC")
+    bcc = models.JSONField(default=list, blank=True, verbose_name="BCC")
+    reply_to = models.JSONField(default=list, blank=True, verbose_name="Responder a")
+    cabeceras = models.JSONField(default=dict, blank=True, verbose_name="Cabeceras")
+
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente', verbose_name="Estado")
+    intentos = models.IntegerField(default=0, verbose_name="Intentos")
+    proximo_intento = models.DateTimeField(default=timezone.now, verbose_name="Próximo Intento")
+    worker_id = models.CharField(max_length=100, null=True, blank=True, verbose_name="Worker Asignado")
+    lease_expira = models.DateTimeField(null=True, blank=True, verbose_name="Lease Expira en")
+    ultimo_error = models.TextField(blank=True, default='', verbose_name="Último Error")
+
+    creado_en = models.DateTimeField(auto_now_add=True, verbose_name="Creado en")
+    enviado_en = models.DateTimeField(null=True, blank=True, verbose_name="Enviado en")
+
+    class Meta:
+        verbose_name = "Correo Saliente"
+        verbose_name_plural = "Correos Salientes"
+        ordering = ['creado_en']
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento']),
+            models.Index(fields=['estado', 'enviado_en']),
+        ]
+
+    def __str__(self):
+        return f"[{self.estado}] {self.asunto[:60]}"
+
+
+class TelemetriaVista(models.Model):
+    """
+    Agregado de peticiones de una vista en un intervalo (core/telemetria.py).
+    Cada proceso vuelca sus propios agregados: un mismo (intervalo, vista,
+    empresa) puede tener varias filas y se suman al consultar.
+    """
+    intervalo = models.DateTimeField(verbose_name="Inicio del Intervalo")
+    vista = models.CharField(max_length=200, verbose_name="Vista")
+    empresa_id = models.IntegerField(null=True, blank=True, verbose_name="Empresa")
+
+    peticiones = models.IntegerField(default=0, verbose_name="Peticiones")
+    errores = models.IntegerField(default=0, verbose_name="Errores (5xx)")
+    duracion_total_ms = models.FloatField(default=0, verbose_name="Duración Total (ms)")
+    duracion_max_ms = models.FloatField(default=0, verbose_name="Duración Máxima (ms)")
+    histograma = models.JSONField(default=list, verbose_name="Histograma de Latencia")
+    consultas = models.IntegerField(default=0, verbose_name="Consultas SQL")
+    consultas_ms = models.FloatField(default=0, verbose_name="Tiempo en SQL (ms)")
+    bytes_respuesta = models.BigIntegerField(default=0, verbose_name="Bytes de Respuesta")
+
+    class Meta:
+        verbose_name = "Telemetría de Vista"
+        verbose_name_plural = "Telemetría de Vistas"
+        indexes = [
+            models.Index(fields=['intervalo', 'vista']),
+            models.Index(fields=['empresa_id', 'intervalo']),
+        ]
+
+    def __str__(self):
+        return f"{self.vista} @ {self.intervalo:%Y-%m-%d %H:%M} ({self.peticiones})"
+
+
+class PeticionLenta(models.Model):
+    """Muestra de una petición que superó el umbral de lentitud, con sus consultas."""
+    fecha = models.DateTimeField(default=timezone.now, db_index=True, verbose_name="Fecha")
+    vista = models.CharField(max_length=200, verbose_name="Vista")
+    empresa_id = models.IntegerField(null=True, blank=True, verbose_name="Empresa")
+    ruta = models.CharField(max_length=500, blank=True, default='', verbose_name="Ruta")
+    metodo = models.CharField(max_length=10, blank=True, default='', verbose_name="Método")
+    estado_http = models.IntegerField(null=True, blank=True, verbose_name="Estado HTTP")
+    duracion_ms = models.FloatField(verbose_name="Duración (ms)")
+    num_consultas = models.IntegerField(default=0, verbose_name="Consultas SQL")
+    consultas_ms = models.FloatField(default=0, verbose_name="Tiempo en SQL (ms)")
+    consultas = models.JSONField(default=list, blank=True, verbose_name="Consultas (muestra)")
+
+    class Meta:
+        verbose_name = "Petición Lenta"
+        verbose_name_plural = "Peticiones Lentas"
+        ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['vista', '-fecha']),
+        ]
+
+    def __str__(self):
+        return f"{self.vista} {self.duracion_ms:.0f} ms ({self.fecha:%Y-%m-%d %H:%M})"
+
+
 class SystemScheduleConfig(models.Model):
     """Configuración de programación de tareas del sistema."""
 
@@ -34,6 +34,11 @@ class CustomUser(AbstractUser):
         help_text="Define el nivel de acceso y permisos del usuario en el sistema"
     )
 
+    # Última petición autenticada (core/presencia.py, escrita a lo sumo una vez por minuto)
+    ultima_actividad = models.DateTimeField(
+        null=True, blank=True, db_index=True, editable=False, verbose_name="Última actividad"
+    )
+
     # Asegúrate de que estos related_name sean ÚNICOS a nivel de la aplicación
     groups = models.ManyToManyField(
         'auth.Group',
@@ -10,6 +10,8 @@ from datetime import datetime, timedelta
 import logging
 import json
 from .constants import ESTADO_ACTIVO, ESTADO_EN_CALIBRACION
+from .presencia import actividad_por_empresa, detalle_activos, usuarios_activos
+from . import limitador, telemetria
 
 logger = logging.getLogger('core')
 
@@ -164,66 +166,12 @@ class SystemMonitor:
 
             # Incluir información de usuarios activos recientes (últimas 24 horas de actividad)
             last_24h = now - timedelta(hours=24)
-            last_15min = now - timedelta(minutes=15)
 
-            # Obtener usuarios activos usando sesiones de Django
-            from django.contrib.sessions.models import Session
-            from importlib import import_module
-            from django.conf import settings as django_settings
-
-            active_users_details = []
-            active_user_ids = set()
-
-            try:
-                # Obtener todas las sesiones activas
-                active_sessions = Session.objects.filter(expire_date__gte=now)
-                engine = import_module(django_settings.SESSION_ENGINE)
-
-                for session in active_sessions:
-                    try:
-                        session_data = engine.SessionStore(session.session_key)
-                        user_id = session_data.get('_auth_user_id')
-
-                        if user_id:
-                            active_user_ids.add(int(user_id))
-
-                            # Obtener información del usuario
-                            try:
-                                user = CustomUser.objects.get(id=user_id)
-                                # Usar last_login como proxy de actividad reciente
-                                if user.last_login and user.last_login >= last_15min:
-                                    minutes_ago = int((now - user.last_login).total_seconds() / 60)
-                                    active_users_details.append({
-                                        'username': user.username,
-                                        'last_activity': user.last_login.strftime('%H:%M:%S'),
-                                        'minutes_ago': minutes_ago
-                                    })
-                            except CustomUser.DoesNotExist:
-                                continue
-
-                    except Exception:
-                        continue
-
-            except Exception as e:
-                logger.warning(f'Could not read sessions for active users: {e}')
-                # Fallback: usar usuarios con login reciente
-                recent_users = CustomUser.objects.filter(
-                    last_login__gte=last_15min
-                ).order_by('-last_login')
-
-                for user in recent_users:
-                    active_user_ids.add(user.id)
-                    minutes_ago = int((now - user.last_login).total_seconds() / 60)
-                    active_users_details.append({
-                        'username': user.username,
-                        'last_activity': user.last_login.strftime('%H:%M:%S'),
-                        'minutes_ago': minutes_ago
-                    })
-
-            active_users_count = len(active_user_ids)
-
-            # Ordenar por actividad más reciente
-            active_users_details.sort(key=lambda x: x['minutes_ago'])
+            # Usuarios activos según CustomUser.ultima_actividad (core/presencia.py):
+            # una agregación por ventana, sin decodificar sesiones
+            activos = usuarios_activos(now)
+            active_users_count = activos['15min']
+            active_users_details = detalle_activos('15min', now)
 
             # Calcular uso del sistema de manera más realista
             # Basado en usuarios activos, operaciones de DB y actividad general
@@ -240,7 +188,10 @@ class SystemMonitor:
                 'superusers': CustomUser.objects.filter(is_superuser=True).count(),
                 'users_logged_recently': CustomUser.objects.filter(last_login__gte=last_24h).count(),
                 'users_active_15min': active_users_count,
+                'users_active_24h': activos['24h'],
+                'users_active_7d': activos['7d'],
                 'active_users_details': active_users_details,
+                'active_by_empresa': actividad_por_empresa('15min', now),
                 'system_usage_percentage': round(system_usage, 1),
                 'system_load_breakdown': {
                     'base_system': base_usage,
@@ -255,7 +206,7 @@ class SystemMonitor:
                         'empresa': u.empresa.nombre if u.empresa else 'Sin empresa',
                         'last_login': u.last_login.isoformat() if u.last_login else 'Nunca',
                         'is_superuser': u.is_superuser
-                    } for u in CustomUser.objects.filter(is_active=True)[:10]  # Máximo 10
+                    } for u in CustomUser.objects.filter(is_active=True).select_related('empresa')[:10]  # Máximo 10
                 ],
                 'last_check': now.isoformat()
             }
@@ -389,7 +340,10 @@ class SystemMonitor:
                 'timestamp': timezone.now().isoformat(),
                 'cache_stats': SystemMonitor._get_cache_stats(),
                 'database_stats': SystemMonitor._get_database_stats(),
-                'error_rate': SystemMonitor._get_error_rate()
+                'error_rate': SystemMonitor._get_error_rate(),
+                'vistas': telemetria.resumen_vistas(timezone.now() - timedelta(hours=24))[:15],
+                'regresiones': telemetria.regresiones(),
+                'rate_limit': limitador.metricas(),
             }
 
             return metrics
@@ -457,14 +411,19 @@ class SystemMonitor:
 
     @staticmethod
     def _get_error_rate():
-        """Obtiene tasa básica de errores (simplificado)."""
+        """Tasa de errores 5xx de las vistas monitoreadas (core/telemetria.py)."""
         try:
-            # En un sistema real, esto leería de logs estructurados
+            now = timezone.now()
+            peticiones_hora, errores_hora = telemetria.tasa_errores(now - timedelta(hours=1))
+            _, errores_hoy = telemetria.tasa_errores(
+                timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+            )
             return {
-                'error_rate_last_hour': 'unknown',
-                'total_errors_today': 'unknown',
-                'status': 'basic_monitoring',
-                'last_check': timezone.now().isoformat()
+                'error_rate_last_hour': round(errores_hora * 100 / peticiones_hora, 2) if peticiones_hora else 0,
+                'requests_last_hour': peticiones_hora,
+                'total_errors_today': errores_hoy,
+                'status': 'monitored',
+                'last_check': now.isoformat()
             }
 
         except Exception as e:
@@ -573,13 +532,16 @@ class AlertManager:
 # Decorator para monitoreo de views
 def monitor_view(func):
     """
-    Decorator simple para monitorear views (placeholder).
-    En el futuro se puede expandir para métricas de performance.
+    Decorator que registra la telemetría de la vista (core/telemetria.py):
+    latencia, consultas SQL, tamaño de respuesta y peticiones lentas.
     """
     from functools import wraps
 
     @wraps(func)
     def wrapper(*args, **kwargs):
-        return func(*args, **kwargs)
+        request = args[0] if args else None
+        if request is None or not hasattr(request, 'META') or not telemetria.activa():
+            return func(*args, **kwargs)
+        return telemetria.medir(func, request, args[1:], kwargs)
 
-    return wrapper
\ No newline at end of file
+    return wrapper
@@ -8,6 +8,7 @@ from django.utils import timezone
 from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
 from .models import Equipo, Empresa, CustomUser
+from .email_outbox import despachar
 import logging
 from .constants import (
     ESTADO_ACTIVO, ESTADO_INACTIVO, ESTADO_DE_BAJA,
@@ -93,7 +94,7 @@ class NotificationService:
                 to=recipients
             )
             email.attach_alternative(html_content, "text/html")
-            email.send()
+            despachar(email, categoria='recordatorio_calibracion')
 
             logger.info(f"Calibration reminder sent for {equipo.codigo_interno} to {len(recipients)} recipients")
             return True
@@ -139,7 +140,7 @@ class NotificationService:
                 to=recipients
             )
             email.attach_alternative(html_content, "text/html")
-            email.send()
+            despachar(email, categoria='recordatorio_mantenimiento')
 
             logger.info(f"Maintenance reminder sent for {equipo.codigo_interno} to {len(recipients)} recipients")
             return True
@@ -215,7 +216,7 @@ class NotificationService:
                 to=recipients
             )
             email.attach_alternative(html_content, "text/html")
-            email.send()
+            despachar(email, categoria='resumen_semanal')
 
             logger.info(f"Weekly summary sent for {empresa.nombre} to {len(recipients)} recipients")
             return True
@@ -402,7 +403,7 @@ class NotificationScheduler:
                 to=recipients
             )
             email.attach_alternative(html_content, "text/html")
-            email.send()
+            despachar(email, categoria='recordatorio_consolidado')
 
             logger.info(f"Consolidated reminder sent for {empresa.nombre}: {total_actividades} activities due in {days_ahead} days")
             return True
@@ -512,106 +513,30 @@ class NotificationScheduler:
         - Deja de enviar si la actividad fue completada
         - Solo para empresas activas no eliminadas
 
+        La elegibilidad se decide por conjuntos en core/recordatorios_vencidos.py
+        (una consulta agrupada y un bulk_create por ejecución).
+
         Retorna:
             sent_count: Número de recordatorios enviados
         """
-        from .models import NotificacionVencimiento
-
-        today = timezone.localdate()
-        sent_count = 0
-
-        # Obtener todas las empresas activas no eliminadas
-        empresas = Empresa.objects.filter(
-            estado_suscripcion='Activo',
-            is_deleted=False
-        ).prefetch_related('equipos')
+        from .recordatorios_vencidos import planificar_recordatorios, ejecutar_plan
 
-        for empresa in empresas:
-            # Recopilar equipos vencidos por tipo de actividad
-            equipos_vencidos = {
-                'calibracion': [],
-                'mantenimiento': [],
-                'comprobacion': []
-            }
-
-            # CALIBRACIONES VENCIDAS
-            for equipo in empresa.equipos.filter(
-                proxima_calibracion__lt=today,
-                estado__in=['Activo', 'En Mantenimiento', 'En Comprobación']
-            ).select_related('empresa'):
-                # Verificar si la fecha cambió (actividad fue completada)
-                puede_enviar, numero_recordatorio = NotificacionVencimiento.puede_enviar_recordatorio(
-                    equipo, 'calibracion', equipo.proxima_calibracion
-                )
-
-                if puede_enviar:
-                    equipos_vencidos['calibracion'].append(equipo)
-                    # Registrar que se enviará notificación
-                    NotificacionVencimiento.objects.create(
-                        equipo=equipo,
-                        tipo_actividad='calibracion',
-                        fecha_vencimiento=equipo.proxima_calibracion,
-                        numero_recordatorio=numero_recordatorio,
-                        fecha_ultima_revision=equipo.proxima_calibracion
-                    )
-
-            # MANTENIMIENTOS VENCIDOS
-            for equipo in empresa.equipos.filter(
-                proximo_mantenimiento__lt=today,
-                estado__in=['Activo', 'En Calibración', 'En Comprobación']
-            ).select_related('empresa'):
-                puede_enviar, numero_recordatorio = NotificacionVencimiento.puede_enviar_recordatorio(
-                    equipo, 'mantenimiento', equipo.proximo_mantenimiento
-                )
-
-                if puede_enviar:
-                    equipos_vencidos['mantenimiento'].append(equipo)
-                    NotificacionVencimiento.objects.create(
-                        equipo=equipo,
-                        tipo_actividad='mantenimiento',
-                        fecha_vencimiento=equipo.proximo_mantenimiento,
-                        numero_recordatorio=numero_recordatorio,
-                        fecha_ultima_revision=equipo.proximo_mantenimiento
-                    )
-
-            # COMPROBACIONES VENCIDAS
-            for equipo in empresa.equipos.filter(
-                proxima_comprobacion__lt=today,
-                estado__in=[ESTADO_ACTIVO, ESTADO_EN_CALIBRACION, 'En Mantenimiento']
-            ).select_related('empresa'):
-                puede_enviar, numero_recordatorio = NotificacionVencimiento.puede_enviar_recordatorio(
-                    equipo, 'comprobacion', equipo.proxima_comprobacion
-                )
-
-                if puede_enviar:
-                    equipos_vencidos['comprobacion'].append(equipo)
-                    NotificacionVencimiento.objects.create(
-                        equipo=equipo,
-                        tipo_actividad='comprobacion',
-                        fecha_vencimiento=equipo.proxima_comprobacion,
-                        numero_recordatorio=numero_recordatorio,
-                        fecha_ultima_revision=equipo.proxima_comprobacion
-                    )
-
-            # Si hay equipos vencidos para esta empresa, enviar email consolidado
-            total_vencidos = (len(equipos_vencidos['calibracion']) +
-                            len(equipos_vencidos['mantenimiento']) +
-                            len(equipos_vencidos['comprobacion']))
-
-            if total_vencidos > 0:
-                # Enviar email de recordatorio semanal
-                if NotificationScheduler._send_weekly_overdue_email(
-                    empresa,
-                    equipos_vencidos['calibracion'],
-                    equipos_vencidos['mantenimiento'],
-                    equipos_vencidos['comprobacion']
-                ):
-                    sent_count += 1
-                    logger.info(f"Weekly overdue reminder sent to {empresa.nombre}: {total_vencidos} overdue activities")
+        plan = planificar_recordatorios()
+        sent_count = ejecutar_plan(plan, NotificationScheduler._send_weekly_overdue_email)
 
         logger.info(f"Weekly overdue reminders completed. Sent: {sent_count} emails")
         return sent_count
 
+    @staticmethod
+    def report_weekly_overdue_reminders():
+        """
+        Modo simulación de send_weekly_overdue_reminders: qué recordatorios se
+        enviarían hoy, por empresa, sin registrar notificaciones ni enviar emails.
+        """
+        from .recordatorios_vencidos import planificar_recordatorios, reporte_plan
+
+        return reporte_plan(planificar_recordatorios())
+
     @staticmethod
     def _send_weekly_overdue_email(empresa, calibraciones_vencidas, mantenimientos_vencidos, comprobaciones_vencidas):
         """
@@ -657,7 +582,7 @@ class NotificationScheduler:
                 to=recipients
             )
             email.attach_alternative(html_content, "text/html")
-            email.send()
+            despachar(email, categoria='recordatorio_vencidos')
 
             logger.info(f"Weekly overdue reminder sent for {empresa.nombre}: {total_vencidos} overdue activities")
             return True
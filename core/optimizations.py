@@ -6,6 +6,8 @@ from django.db.models import Count, Prefetch, Q
 from datetime import date, timedelta
 from .models import Equipo, Calibracion, Mantenimiento, Comprobacion, Empresa
 from .constants import ESTADO_ACTIVO, ESTADO_INACTIVO, ESTADO_DE_BAJA
+from .busqueda_equipos import construir_texto_busqueda
+from .fechas_equipos import recalcular_fechas
 
 
 class OptimizedQueries:
@@ -208,22 +210,10 @@ class BulkOperations:
     @staticmethod
     def bulk_update_equipment_dates(equipos):
         """
-        Actualiza fechas de equipos en bulk
+        Actualiza fechas de equipos en bulk (una consulta agrupada por tipo y
+        un bulk_update de los equipos con cambios, ver core/fechas_equipos.py)
         """
-        equipos_to_update = []
-
-        for equipo in equipos:
-            equipo.calcular_proxima_calibracion()
-            equipo.calcular_proximo_mantenimiento()
-            equipo.calcular_proxima_comprobacion()
-            equipos_to_update.append(equipo)
-
-        if equipos_to_update:
-            Equipo.objects.bulk_update(
-                equipos_to_update,
-                ['proxima_calibracion', 'proximo_mantenimiento', 'proxima_comprobacion'],
-                batch_size=100
-            )
+        return recalcular_fechas(equipos)
 
     @staticmethod
     def bulk_create_equipos(equipos_data):
@@ -231,6 +221,8 @@ class BulkOperations:
         Crea equipos en bulk de forma eficiente
         """
         equipos = [Equipo(**data) for data in equipos_data]
+        for equipo in equipos:
+            equipo.texto_busqueda = construir_texto_busqueda(equipo)
 
         return Equipo.objects.bulk_create(
             equipos,
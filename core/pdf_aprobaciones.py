@@ -0,0 +1,277 @@
+# core/pdf_aprobaciones.py
+# Render de los PDFs aprobados (confirmación, intervalos, comprobación) con los datos de aprobación
+
+import logging
+
+from .models import Calibracion
+from .storage_ledger import guardar_archivo_generado
+
+logger = logging.getLogger('core')
+
+
+def _guardar_pdf(documento, campo, filename, contenido):
+    """Sube el PDF y actualiza solo su campo (no pisa cambios concurrentes)."""
+    guardar_archivo_generado(documento, campo, filename, contenido)
+    documento.save(update_fields=[campo])
+
+
+def regenerar_pdf_confirmacion(calibracion):
+    """Renderiza y guarda el PDF de la confirmación metrológica con los datos de aprobación."""
+    from .views.confirmacion import _preparar_contexto_confirmacion, _generar_grafica_confirmacion, safe_float
+    from django.template.loader import render_to_string
+    from core.render_pdf import renderizar_pdf
+
+    datos_json = calibracion.confirmacion_metrologica_datos
+
+    # Preparar contexto para el PDF
+    equipo = calibracion.equipo
+    context = _preparar_contexto_confirmacion(None, equipo, calibracion, datos_json)
+
+    # Generar gráfica(s) — soporta v1 (puntos_medicion en raíz) y v2 (magnitudes)
+    if 'magnitudes' in datos_json:
+        # v2: una gráfica por magnitud, embebida en cada entrada de magnitudes_template
+        mags_context = context.get('datos_confirmacion', {}).get('magnitudes', [])
+        for i, mag in enumerate(datos_json.get('magnitudes', [])):
+            puntos_mag = mag.get('puntos_medicion', [])
+            emp_valor_mag = safe_float(mag.get('emp', 0), 0)
+            emp_unidad_mag = mag.get('emp_unidad', '%')
+            unidad_mag = mag.get('unidad', datos_json.get('unidad_equipo', ''))
+            g = _generar_grafica_confirmacion(
+                puntos_mag, emp_valor_mag, emp_unidad_mag, unidad_mag,
+                regla_decision=datos_json.get('regla_decision', 'guard_band_U'),
+            )
+            if i < len(mags_context):
+                mags_context[i]['grafica'] = g
+        context['grafica_imagen'] = mags_context[0].get('grafica') if mags_context else None
+    elif 'puntos_medicion' in datos_json:
+        # v1: gráfica única
+        emp_valor = datos_json.get('emp_valor', 0)
+        emp_unidad = datos_json.get('emp_unidad', '%')
+        unidad_equipo = datos_json.get('unidad_equipo', '')
+        grafica_base64 = _generar_grafica_confirmacion(
+            datos_json['puntos_medicion'],
+            emp_valor,
+            emp_unidad,
+            unidad_equipo,
+            regla_decision=datos_json.get('regla_decision', 'guard_band_U'),
+        )
+        context['grafica_imagen'] = grafica_base64
+
+    # Renderizar y generar PDF
+    html_string = render_to_string('core/confirmacion_metrologica_print.html', context)
+    pdf_file = renderizar_pdf(html_string)
+
+    # Guardar PDF actualizado
+    fecha_str = calibracion.fecha_calibracion.strftime('%Y%m%d')
+    filename = f'confirmacion_metrologica_{equipo.codigo_interno}_{fecha_str}.pdf'
+    _guardar_pdf(calibracion, 'confirmacion_metrologica_pdf', filename, pdf_file)
+
+    logger.info(f"PDF de confirmación #{calibracion.pk} regenerado con información de aprobación")
+
+
+def regenerar_pdf_intervalos(calibracion):
+    """Renderiza y guarda el PDF de intervalos de calibración con los datos de aprobación."""
+    from django.template.loader import render_to_string
+    from core.render_pdf import renderizar_pdf
+    from datetime import datetime
+    import re
+
+    datos_intervalos = calibracion.intervalos_calibracion_datos
+    equipo = calibracion.equipo
+
+    # Calibración anterior
+    cal_anterior = Calibracion.objects.filter(
+        equipo=equipo,
+        fecha_calibracion__lt=calibracion.fecha_calibracion
+    ).order_by('-fecha_calibracion').first()
+
+    # EMP info
+    emp_info = {'valor': 8, 'unidad': '%', 'texto': '8%'}
+    if equipo.error_maximo_permisible:
+        emp_texto = equipo.error_maximo_permisible.strip()
+        emp_match = re.search(r'([\d.]+)\s*(%|mm|lx|μm|°C|g|kg|m)?', emp_texto)
+        if emp_match:
+            emp_info['valor'] = float(emp_match.group(1))
+            emp_info['unidad'] = emp_match.group(2) if emp_match.group(2) else ''
+            emp_info['texto'] = emp_texto
+
+    # Logo
+    logo_empresa_url = None
+    try:
+        if equipo.empresa and equipo.empresa.logo_empresa:
+            logo_empresa_url = equipo.empresa.logo_empresa.url
+    except Exception:
+        pass
+
+    # Formato fecha
+    formato_fecha_formateada_int = None
+    if equipo.empresa.intervalos_fecha_formato_display:
+        formato_fecha_formateada_int = equipo.empresa.intervalos_fecha_formato_display
+        if datos_intervalos.get('formato'):
+            datos_intervalos['formato']['fecha'] = formato_fecha_formateada_int
+    elif datos_intervalos.get('formato', {}).get('fecha'):
+        formato_fecha_formateada_int = datos_intervalos['formato']['fecha']
+
+    # Recalcular derivas para que el PDF aprobado mantenga el cuadro de análisis
+    from .views.confirmacion import _calcular_deriva_variable
+    deriva_automatica_aprobacion = None
+    derivas_por_variable_aprobacion = []
+
+    if cal_anterior and calibracion.confirmacion_metrologica_datos and cal_anterior.confirmacion_metrologica_datos:
+        datos_act = calibracion.confirmacion_metrologica_datos
+        datos_ant = cal_anterior.confirmacion_metrologica_datos
+        mags_act = datos_act.get('magnitudes', [])
+        mags_ant = datos_ant.get('magnitudes', [])
+
+        if mags_act and mags_ant:
+            for mag_act in mags_act:
+                nombre_var = mag_act.get('nombre', '') or ''
+                unidad_var = mag_act.get('unidad', '') or ''
+                pts_act = mag_act.get('puntos_medicion', [])
+                mag_ant = next(
+                    (m for m in mags_ant if (m.get('nombre') or '') == nombre_var),
+                    mags_ant[0] if mags_ant else None,
+                )
+                pts_ant = mag_ant.get('puntos_medicion', []) if mag_ant else []
+                resultado = _calcular_deriva_variable(
+                    pts_act, pts_ant, emp_info,
+                    calibracion.fecha_calibracion, cal_anterior.fecha_calibracion
+                )
+                if resultado:
+                    resultado['nombre'] = nombre_var
+                    resultado['unidad'] = unidad_var
+                    resultado['es_mas_restrictiva'] = False
+                    derivas_por_variable_aprobacion.append(resultado)
+        else:
+            pts_act = datos_act.get('puntos_medicion', [])
+            pts_ant = datos_ant.get('puntos_medicion', [])
+            resultado = _calcular_deriva_variable(
+                pts_act, pts_ant, emp_info,
+                calibracion.fecha_calibracion, cal_anterior.fecha_calibracion
+            )
+            if resultado:
+                resultado['nombre'] = ''
+                resultado['unidad'] = ''
+                resultado['es_mas_restrictiva'] = False
+                derivas_por_variable_aprobacion.append(resultado)
+
+        vars_con_i = [v for v in derivas_por_variable_aprobacion if v.get('intervalo_limitante') is not None]
+        if vars_con_i:
+            var_rest = min(vars_con_i, key=lambda v: v['intervalo_limitante'])
+        elif derivas_por_variable_aprobacion:
+            var_rest = derivas_por_variable_aprobacion[0]
+        else:
+            var_rest = None
+
+        if var_rest:
+            var_rest['es_mas_restrictiva'] = True
+            deriva_automatica_aprobacion = {**var_rest, 'puntos_detalle': var_rest['puntos_detalle']}
+
+    context = {
+        'equipo': equipo,
+        'cal_actual': calibracion,
+        'cal_anterior': cal_anterior,
+        'fecha_actual': datetime.now().date(),
+        'nombre_empresa': equipo.empresa.nombre,
+        'logo_empresa_url': logo_empresa_url,
+        'emp_info': emp_info,
+        'datos_intervalos': datos_intervalos,
+        'deriva_automatica': deriva_automatica_aprobacion,
+        'derivas_por_variable': derivas_por_variable_aprobacion if len(derivas_por_variable_aprobacion) > 1 else [],
+        'total_calibraciones': Calibracion.objects.filter(equipo=equipo).count(),
+        'emp_texto': equipo.error_maximo_permisible or f"{emp_info['valor']} {emp_info['unidad']}",
+    }
+
+    html_string = render_to_string('core/intervalos_calibracion_print.html', context)
+    pdf_file = renderizar_pdf(html_string)
+
+    filename = f'intervalos_calibracion_{equipo.codigo_interno}_{calibracion.fecha_calibracion.strftime("%Y%m%d")}.pdf'
+    _guardar_pdf(calibracion, 'intervalos_calibracion_pdf', filename, pdf_file)
+
+    logger.info(f"PDF de intervalos #{calibracion.pk} regenerado con información de aprobación")
+
+
+def regenerar_pdf_comprobacion(comprobacion):
+    """Renderiza y guarda el PDF de la comprobación metrológica con los datos de aprobación."""
+    from .views.comprobacion import generar_grafica_svg_comprobacion
+    from django.template.loader import render_to_string
+    from core.render_pdf import renderizar_pdf
+    from datetime import datetime
+
+    datos_comprobacion = comprobacion.datos_comprobacion
+    equipo = comprobacion.equipo
+
+    # Detectar v2 (multi-variable) o v1 (una variable)
+    magnitudes_v2 = datos_comprobacion.get('magnitudes', [])
+    magnitudes_template = None
+
+    if magnitudes_v2:
+        # v2: calcular stats y gráfica por cada variable
+        magnitudes_template = []
+        total_conformes_global = 0
+        total_no_conformes_global = 0
+        total_puntos_global = 0
+        for mag in magnitudes_v2:
+            pts = mag.get('puntos_medicion', [])
+            conf = sum(1 for p in pts if p.get('conformidad') == 'CONFORME')
+            no_conf = sum(1 for p in pts if p.get('conformidad') == 'NO CONFORME')
+            unidad_mag = mag.get('unidad', '') or datos_comprobacion.get('unidad_equipo', 'mm')
+            magnitudes_template.append({
+                'nombre': mag.get('nombre', ''),
+                'unidad': unidad_mag,
+                'puntos': pts,
+                'conformes': conf,
+                'no_conformes': no_conf,
+                'total': len(pts),
+                'grafica_svg': generar_grafica_svg_comprobacion(pts, unidad_mag),
+            })
+            total_conformes_global += conf
+            total_no_conformes_global += no_conf
+            total_puntos_global += len(pts)
+        puntos_conformes = total_conformes_global
+        puntos_no_conformes = total_no_conformes_global
+        total_puntos = total_puntos_global
+        puntos = magnitudes_v2[0].get('puntos_medicion', []) if magnitudes_v2 else []
+        grafica_svg = magnitudes_template[0]['grafica_svg'] if magnitudes_template else ''
+    else:
+        # v1: una sola variable
+        puntos = datos_comprobacion.get('puntos_medicion', [])
+        puntos_conformes = sum(1 for p in puntos if p.get('conformidad') == 'CONFORME')
+        puntos_no_conformes = sum(1 for p in puntos if p.get('conformidad') == 'NO CONFORME')
+        total_puntos = len(puntos)
+        unidad = datos_comprobacion.get('unidad_equipo', 'mm')
+        grafica_svg = generar_grafica_svg_comprobacion(puntos, unidad)
+
+    # Logo de empresa
+    logo_empresa_url = None
+    try:
+        if equipo.empresa and equipo.empresa.logo_empresa:
+            logo_empresa_url = equipo.empresa.logo_empresa.url
+    except Exception:
+        pass
+
+    # Contexto
+    context = {
+        'equipo': equipo,
+        'comprobacion': comprobacion,
+        'datos_comprobacion': datos_comprobacion,
+        'empresa': equipo.empresa,
+        'logo_empresa_url': logo_empresa_url,
+        'fecha_generacion': datetime.now(),
+        'puntos_conformes': puntos_conformes,
+        'puntos_no_conformes': puntos_no_conformes,
+        'total_puntos': total_puntos,
+        'grafica_svg': grafica_svg,
+        'magnitudes_template': magnitudes_template,
+    }
+
+    # Renderizar y generar PDF
+    html_string = render_to_string('core/comprobacion_metrologica_print.html', context)
+    pdf_file = renderizar_pdf(html_string)
+
+    # Guardar PDF actualizado
+    fecha_str = comprobacion.fecha_comprobacion.strftime('%Y%m%d')
+    filename = f'comprobacion_{equipo.codigo_interno}_{fecha_str}.pdf'
+    _guardar_pdf(comprobacion, 'comprobacion_pdf', filename, pdf_file)
+
+    logger.info(f"PDF de comprobación #{comprobacion.pk} regenerado con información de aprobación")
@@ -0,0 +1,201 @@
+# core/pdf_cache.py
+# Caché persistente de PDFs renderizados (Hoja de Vida)
+
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Sum
+from django.utils import timezone
+
+logger = logging.getLogger('core')
+
+TIPO_HOJA_VIDA = 'hoja_vida'
+
+DEFAULT_MAX_MB = 500
+DEFAULT_MAX_EDAD_SEGUNDOS = 6000  # Menor que la expiración de los enlaces firmados (7200s)
+# ultimo_acceso solo se reescribe si es más antiguo que esto (evita un UPDATE por lectura)
+INTERVALO_TOQUE = timedelta(minutes=30)
+
+# Campos de Empresa que aparecen en la Hoja de Vida
+CAMPOS_EMPRESA_HOJA_VIDA = (
+    'nombre',
+    'logo_empresa',
+    'formato_version_empresa',
+    'formato_fecha_version_empresa',
+    'formato_fecha_version_empresa_display',
+    'formato_codificacion_empresa',
+)
+
+
+def _config():
+    return getattr(settings, 'PDF_CACHE_CONFIG', {})
+
+
+def cache_activa():
+    return bool(_config().get('ACTIVO', True))
+
+
+def max_bytes():
+    return int(_config().get('MAX_MB', DEFAULT_MAX_MB)) * 1024 * 1024
+
+
+def _enlaces_firmados():
+    return hasattr(default_storage, 'bucket')
+
+
+def _artefacto_vigente(artefacto):
+    if not _enlaces_firmados():
+        return True
+    max_edad = int(_config().get('MAX_EDAD_SEGUNDOS', DEFAULT_MAX_EDAD_SEGUNDOS))
+    return artefacto.fecha_creacion >= timezone.now() - timedelta(seconds=max_edad)
+
+
+# =============================================================================
+# SELLO DE CONTENIDO
+# =============================================================================
+
+def renovar_version_contenido(equipo_ids=None, empresa_id=None):
+    """
+    Asigna un sello nuevo a los equipos indicados (1 UPDATE, sin señales).
+
+    Returns:
+        str: el sello asignado
+    """
+    from core.models import Equipo
+    from core.models.common import generar_sello_contenido
+
+    if equipo_ids is None and empresa_id is None:
+        return None
+
+    sello = generar_sello_contenido()
+    equipos = Equipo.objects.all()
+    if equipo_ids is not None:
+        equipos = equipos.filter(pk__in=equipo_ids)
+    if empresa_id is not None:
+        equipos = equipos.filter(empresa_id=empresa_id)
+    equipos.update(version_contenido=sello)
+    return sello
+
+
+def clave_cache(equipo, tipo=TIPO_HOJA_VIDA):
+    """Clave del artefacto: id del equipo + sello de contenido (sin consultas)."""
+    huella = hashlib.md5(
+        f"{equipo.id}:{equipo.version_contenido}".encode('utf-8'), usedforsecurity=False
+    ).hexdigest()
+    return f"{tipo}_{equipo.id}_{huella}"
+
+
+# =============================================================================
+# LECTURA / ESCRITURA
+# =============================================================================
+
+def obtener_pdf(equipo, tipo=TIPO_HOJA_VIDA):
+    """
+    Devuelve los bytes del PDF cacheado para la versión actual del equipo.
+
+    Returns:
+        bytes | None: None si no hay artefacto vigente
+    """
+    from core.models import ArtefactoPDF
+
+    if not cache_activa():
+        return None
+
+    clave = clave_cache(equipo, tipo)
+    contenido = cache.get(clave)
+    if contenido:
+        return contenido
+
+    artefacto = ArtefactoPDF.objects.filter(
+        equipo_id=equipo.id, tipo=tipo, version=equipo.version_contenido
+    ).first()
+    if artefacto is None or not _artefacto_vigente(artefacto):
+        return None
+
+    try:
+        with default_storage.open(artefacto.ruta, 'rb') as f:
+            contenido = f.read()
+    except Exception as e:
+        logger.warning(f"Artefacto PDF ilegible {artefacto.ruta}, se descarta: {e}")
+        artefacto.delete()
+        return None
+
+    ahora = timezone.now()
+    if artefacto.ultimo_acceso < ahora - INTERVALO_TOQUE:
+        ArtefactoPDF.objects.filter(pk=artefacto.pk).update(ultimo_acceso=ahora)
+    cache.set(clave, contenido, timeout=3600)
+    return contenido
+
+
+def guardar_pdf(equipo, contenido, tipo=TIPO_HOJA_VIDA):
+    """
+    Persiste el PDF renderizado para la versión actual del equipo.
+
+    Elimina las versiones anteriores del mismo equipo (ya no se servirán) y
+    aplica el desalojo LRU. Nunca lanza excepción: un fallo de la caché no
+    debe romper la descarga.
+    """
+    from core.models import ArtefactoPDF, Equipo
+
+    if not cache_activa() or not contenido:
+        return
+
+    cache.set(clave_cache(equipo, tipo), contenido, timeout=3600)
+    try:
+        ruta = default_storage.save(
+            f"pdf_cache/{tipo}/{equipo.empresa_id}/{equipo.id}_{equipo.version_contenido}.pdf",
+            ContentFile(contenido),
+        )
+        ArtefactoPDF.objects.update_or_create(
+            equipo_id=equipo.id, tipo=tipo, version=equipo.version_contenido,
+            defaults={'ruta': ruta, 'tamaño_bytes': len(contenido), 'ultimo_acceso': timezone.now()},
+        )
+        # Las versiones anteriores ya no se servirán; se conserva la versión
+        # actual en BD por si esta instancia del equipo estaba desactualizada
+        vigentes = {equipo.version_contenido}
+        vigentes.update(Equipo.objects.filter(pk=equipo.id).values_list('version_contenido', flat=True))
+        for anterior in ArtefactoPDF.objects.filter(equipo_id=equipo.id, tipo=tipo).exclude(version__in=vigentes):
+            anterior.delete()
+        desalojar()
+    except Exception as e:
+        logger.warning(f"No se pudo guardar el PDF {tipo} del equipo {equipo.id} en caché: {e}")
+
+
+def borrar_archivo(artefacto):
+    """Elimina el archivo del storage (llamado desde post_delete de ArtefactoPDF)."""
+    try:
+        if artefacto.ruta and default_storage.exists(artefacto.ruta):
+            default_storage.delete(artefacto.ruta)
+    except Exception as e:
+        logger.warning(f"No se pudo eliminar el artefacto PDF {artefacto.ruta}: {e}")
+
+
+def desalojar(limite_bytes=None):
+    """
+    Elimina los artefactos menos usados hasta quedar bajo el límite de tamaño.
+
+    Returns:
+        int: artefactos eliminados
+    """
+    from core.models import ArtefactoPDF
+
+    limite = max_bytes() if limite_bytes is None else limite_bytes
+    total = ArtefactoPDF.objects.aggregate(total=Sum('tamaño_bytes'))['total'] or 0
+    if total <= limite:
+        return 0
+
+    eliminados = 0
+    for artefacto in ArtefactoPDF.objects.order_by('ultimo_acceso').iterator():
+        if total <= limite:
+            break
+        total -= artefacto.tamaño_bytes
+        artefacto.delete()
+        eliminados += 1
+
+    logger.info(f"Caché PDF: {eliminados} artefactos desalojados (LRU)")
+    return eliminados
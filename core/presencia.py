@@ -0,0 +1,102 @@
+# core/presencia.py
+# Presencia de usuarios (activos en los últimos 15 min / 24 h / 7 d) sin leer sesiones
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+logger = logging.getLogger('core')
+
+DEFAULT_INTERVALO_ESCRITURA = 60
+CACHE_PREFIX = 'presencia:'
+
+VENTANAS = {
+    '15min': timedelta(minutes=15),
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+}
+
+
+def _config():
+    return getattr(settings, 'PRESENCIA_CONFIG', {})
+
+
+def registrar_actividad(user, ahora=None):
+    """
+    Marca la actividad de ``user``. Devuelve True si se escribió en la base de
+    datos (la primera petición de cada intervalo).
+    """
+    intervalo = int(_config().get('INTERVALO_ESCRITURA_SEGUNDOS', DEFAULT_INTERVALO_ESCRITURA))
+    try:
+        if intervalo > 0 and not cache.add(f'{CACHE_PREFIX}{user.pk}', 1, intervalo):
+            return False
+    except Exception as e:
+        # Sin cache se escribe igual: la presencia no debe romper la petición
+        logger.warning(f'Presencia: cache no disponible ({e})')
+
+    from .models import CustomUser
+
+    ahora = ahora or timezone.now()
+    CustomUser.objects.filter(pk=user.pk).update(ultima_actividad=ahora)
+    user.ultima_actividad = ahora
+    return True
+
+
+def usuarios_activos(ahora=None, usuarios=None):
+    """
+    Usuarios activos por ventana en una consulta.
+
+    Returns:
+        dict: {'15min': n, '24h': n, '7d': n}
+    """
+    from .models import CustomUser
+
+    ahora = ahora or timezone.now()
+    usuarios = usuarios if usuarios is not None else CustomUser.objects.all()
+    return usuarios.aggregate(**{
+        nombre: Count('id', filter=Q(ultima_actividad__gte=ahora - ventana))
+        for nombre, ventana in VENTANAS.items()
+    })
+
+
+def actividad_por_empresa(ventana='15min', ahora=None):
+    """
+    Usuarios activos por empresa en la ventana, en una consulta.
+
+    Returns:
+        list[dict]: {'empresa_id', 'empresa__nombre', 'activos'} ordenado de
+        mayor a menor actividad (``empresa_id`` None = sin empresa).
+    """
+    from .models import CustomUser
+
+    ahora = ahora or timezone.now()
+    return list(
+        CustomUser.objects.filter(ultima_actividad__gte=ahora - VENTANAS[ventana])
+        .values('empresa_id', 'empresa__nombre')
+        .annotate(activos=Count('id'))
+        .order_by('-activos', 'empresa__nombre')
+    )
+
+
+def detalle_activos(ventana='15min', ahora=None, limite=50):
+    """Usuarios activos en la ventana, del más reciente al más antiguo."""
+    from .models import CustomUser
+
+    ahora = ahora or timezone.now()
+    filas = (
+        CustomUser.objects.filter(ultima_actividad__gte=ahora - VENTANAS[ventana])
+        .order_by('-ultima_actividad')
+        .values('username', 'ultima_actividad')[:limite]
+    )
+    return [
+        {
+            'username': fila['username'],
+            'last_activity': timezone.localtime(fila['ultima_actividad']).strftime('%H:%M:%S'),
+            'minutes_ago': int((ahora - fila['ultima_actividad']).total_seconds() / 60),
+        }
+        for fila in filas
+    ]
@@ -0,0 +1,133 @@
+# core/progreso.py
+# Canal de cambios por usuario en la caché: versiones para sondeo condicional y long-poll
+
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger('core')
+
+PREFIJO = 'canal:'
+TEMAS = ('zip', 'notificaciones')
+DEFAULT_ESPERA_MAX_SEGUNDOS = 0
+DEFAULT_INTERVALO_ESPERA = 0.5
+DEFAULT_REINTENTO_MS = 2000
+DEFAULT_REINTENTO_SIN_CANAL_MS = 5000
+# Las versiones viven más que cualquier pestaña abierta
+TTL_VERSION = 86400
+
+# Con una caché por proceso los workers no pueden publicar a la web: sin canal
+_BACKENDS_POR_PROCESO = ('locmem', 'dummy')
+
+
+def _config():
+    return getattr(settings, 'PROGRESO_CONFIG', {})
+
+
+def canal_compartido():
+    """True si la caché es compartida entre procesos (Redis, BD, memcached)."""
+    if not _config().get('ACTIVO', True):
+        return False
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '').lower()
+    return not any(nombre in backend for nombre in _BACKENDS_POR_PROCESO)
+
+
+def espera_maxima():
+    return float(_config().get('ESPERA_MAX_SEGUNDOS', DEFAULT_ESPERA_MAX_SEGUNDOS))
+
+
+def _clave(user_id, tema):
+    return f"{PREFIJO}{tema}:{user_id}"
+
+
+def _publicar_ahora(user_id, tema):
+    clave = _clave(user_id, tema)
+    try:
+        try:
+            cache.incr(clave)
+        except ValueError:
+            # Clave inexistente: add() evita pisar la de otro publicador
+            if not cache.add(clave, int(time.time() * 1000), timeout=TTL_VERSION):
+                cache.incr(clave)
+    except Exception as e:
+        logger.warning(f"No se pudo publicar en el canal {clave}: {e}")
+
+
+def publicar(user_id, tema='zip'):
+    """
+    Avisa a las pestañas del usuario que ``tema`` cambió. Se publica al
+    confirmar la transacción en curso (de inmediato si no hay ninguna).
+    """
+    if user_id is None or not canal_compartido():
+        return
+    transaction.on_commit(lambda: _publicar_ahora(user_id, tema))
+
+
+def version(user_id, tema='zip'):
+    """
+    Versión actual del tema para el usuario (la crea si no existe).
+
+    Returns:
+        int | None: None si el canal no está disponible
+    """
+    if not canal_compartido():
+        return None
+    clave = _clave(user_id, tema)
+    try:
+        actual = cache.get(clave)
+        if actual is None:
+            cache.add(clave, int(time.time() * 1000), timeout=TTL_VERSION)
+            actual = cache.get(clave)
+        return actual
+    except Exception as e:
+        logger.warning(f"No se pudo leer el canal {clave}: {e}")
+        return None
+
+
+def esperar_cambio(user_id, tema, version_cliente, segundos):
+    """
+    Espera hasta ``segundos`` a que la versión deje de ser ``version_cliente``.
+
+    Returns:
+        int | None: la versión al terminar la espera
+    """
+    actual = version(user_id, tema)
+    limite = time.monotonic() + max(0.0, min(segundos, espera_maxima()))
+    intervalo = float(_config().get('INTERVALO_ESPERA', DEFAULT_INTERVALO_ESPERA))
+    while actual is not None and actual == version_cliente and time.monotonic() < limite:
+        time.sleep(intervalo)
+        actual = version(user_id, tema)
+    return actual
+
+
+def consultar(request, tema):
+    """
+    Resuelve la parte del canal de una petición de sondeo: lee ``version`` y
+    ``espera`` del querystring y espera si corresponde.
+
+    Returns:
+        (version_actual, sin_cambios, reintentar_ms)
+    """
+    version_cliente = request.GET.get('version')
+    try:
+        version_cliente = int(version_cliente) if version_cliente else None
+    except ValueError:
+        version_cliente = None
+    try:
+        segundos = float(request.GET.get('espera', 0))
+    except ValueError:
+        segundos = 0.0
+
+    if not canal_compartido():
+        return None, False, int(_config().get('REINTENTO_SIN_CANAL_MS', DEFAULT_REINTENTO_SIN_CANAL_MS))
+
+    usa_espera = segundos > 0 and espera_maxima() > 0
+    reintentar_ms = 0 if usa_espera else int(_config().get('REINTENTO_MS', DEFAULT_REINTENTO_MS))
+    if version_cliente is not None and usa_espera:
+        actual = esperar_cambio(request.user.pk, tema, version_cliente, segundos)
+    else:
+        actual = version(request.user.pk, tema)
+    return actual, actual is not None and actual == version_cliente, reintentar_ms
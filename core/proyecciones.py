@@ -0,0 +1,395 @@
+# core/proyecciones.py
+# Motor vectorizado de proyección de actividades (calibración, comprobación, mantenimiento)
+
+from datetime import date
+
+import numpy as np
+from django.db.models import Max, QuerySet
+
+from .constants import ESTADO_ACTIVO, ESTADO_INACTIVO, ESTADO_DE_BAJA
+
+REALIZADO = 0
+NO_CUMPLIDO = 1
+PENDIENTE = 2
+
+ETIQUETAS_STATUS = ('Realizado', 'No Cumplido', 'Pendiente/Programado')
+CODIGOS_STATUS = {etiqueta: codigo for codigo, etiqueta in enumerate(ETIQUETAS_STATUS)}
+
+TIPOS_ACTIVIDAD = ('calibracion', 'comprobacion', 'mantenimiento')
+
+# Periodo de la secuencia (mes del año, año bisiesto) al sumar meses
+_CICLO_MESES = 48
+_EPOCA_MES = 1970 * 12
+_SIN_BAJA = np.datetime64('NaT', 'D')
+
+
+def _indice_mes(fechas):
+    """datetime64[D] -> índice absoluto de mes (año * 12 + mes - 1)."""
+    return fechas.astype('datetime64[M]').astype(np.int64) + _EPOCA_MES
+
+
+def _dia(fechas):
+    return (fechas - fechas.astype('datetime64[M]').astype('datetime64[D]')).astype(np.int64) + 1
+
+
+def _dias_del_mes(indices_mes):
+    inicio = (indices_mes - _EPOCA_MES).astype('datetime64[M]')
+    return ((inicio + 1).astype('datetime64[D]') - inicio.astype('datetime64[D]')).astype(np.int64)
+
+
+def _a_fecha(indices_mes, dias):
+    return (indices_mes - _EPOCA_MES).astype('datetime64[M]').astype('datetime64[D]') + (dias - 1)
+
+
+class _Dias:
+    """
+    Día de la k-ésima ocurrencia de cada serie (ajuste de fin de mes acumulado).
+    Como al sumar meses de uno en uno (31/ene → 28/feb → 28/mar), el día es
+    ``min(día inicial, largo de los meses visitados 1..k)``.
+
+    Solo las series que empiezan después del día 28 necesitan la tabla de
+    mínimos acumulados; el resto conserva su día.
+    """
+
+    def __init__(self, mes0, freq, dia0):
+        self.dia0 = dia0
+        self.largas = np.flatnonzero(dia0 > 28)
+        self.tabla = None
+        if self.largas.size:
+            pasos = np.arange(1, _CICLO_MESES + 1)
+            meses = mes0[self.largas, None] + freq[self.largas, None] * pasos
+            minimos = np.minimum.accumulate(_dias_del_mes(meses), axis=1)
+            self.tabla = np.minimum(
+                np.concatenate([dia0[self.largas, None], minimos], axis=1),
+                dia0[self.largas, None],
+            )
+            # posición de cada serie dentro de la tabla (-1 si no la necesita)
+            self.fila = np.full(dia0.shape, -1, dtype=np.int64)
+            self.fila[self.largas] = np.arange(self.largas.size)
+
+    def en(self, series, k):
+        """Día para las series ``series`` en el paso ``k`` (arrays alineados)."""
+        dias = self.dia0[series].copy()
+        if self.tabla is not None:
+            filas = self.fila[series]
+            usar = filas >= 0
+            dias[usar] = self.tabla[filas[usar], np.minimum(k[usar], _CICLO_MESES)]
+        return dias
+
+
+def proyectar_series(equipo_ids, inicios, frecuencias, fechas_baja, desde, hasta, today, realizadas=()):
+    """
+    Núcleo vectorizado: proyecta las series de actividades en [desde, hasta].
+
+    Args:
+        equipo_ids: array int de ids (uno por serie)
+        inicios: array datetime64[D] con la fecha de inicio del plan
+        frecuencias: array int de meses (> 0)
+        fechas_baja: array datetime64[D] (NaT si el equipo no está de baja)
+        desde, hasta, today: date
+        realizadas: iterable de (equipo_id, año, mes) con actividad registrada
+
+    Returns:
+        tuple(posiciones, fechas, status): posición de la serie, fecha
+        programada (datetime64[D]) y código de estado, ordenados por serie y fecha.
+    """
+    equipo_ids = np.asarray(equipo_ids, dtype=np.int64)
+    n = equipo_ids.size
+    if n == 0:
+        return np.empty(0, np.int64), np.empty(0, 'datetime64[D]'), np.empty(0, np.int8)
+
+    inicios = np.asarray(inicios, dtype='datetime64[D]')
+    freq = np.asarray(frecuencias, dtype=np.int64)
+    fechas_baja = np.asarray(fechas_baja, dtype='datetime64[D]')
+
+    mes0 = _indice_mes(inicios)
+    dias = _Dias(mes0, freq, _dia(inicios))
+    series = np.arange(n)
+
+    mes_desde = desde.year * 12 + desde.month - 1
+    mes_hasta = hasta.year * 12 + hasta.month - 1
+
+    # Primer paso con fecha >= desde
+    k0 = np.maximum(0, -((mes0 - mes_desde) // freq))
+    antes = (mes0 + k0 * freq == mes_desde) & (dias.en(series, k0) < desde.day)
+    k0 = k0 + antes
+
+    # Último paso con fecha <= hasta
+    k1 = np.floor_divide(mes_hasta - mes0, freq)
+    despues = (k1 >= 0) & (mes0 + k1 * freq == mes_hasta) & (dias.en(series, np.maximum(k1, 0)) > hasta.day)
+    k1 = k1 - despues
+
+    cantidad = np.maximum(0, k1 - k0 + 1)
+    total = int(cantidad.sum())
+    if total == 0:
+        return np.empty(0, np.int64), np.empty(0, 'datetime64[D]'), np.empty(0, np.int8)
+
+    # Expandir: una fila por ocurrencia, en orden de serie y fecha
+    posiciones = np.repeat(series, cantidad)
+    desplazamiento = np.arange(total) - np.repeat(np.cumsum(cantidad) - cantidad, cantidad)
+    k = k0[posiciones] + desplazamiento
+    meses = mes0[posiciones] + k * freq[posiciones]
+    fechas = _a_fecha(meses, dias.en(posiciones, k))
+
+    # Estado
+    status = np.full(total, PENDIENTE, dtype=np.int8)
+    status[fechas < np.datetime64(today, 'D')] = NO_CUMPLIDO
+    baja = fechas_baja[posiciones]
+    status[~np.isnat(baja) & (fechas >= baja)] = NO_CUMPLIDO
+
+    realizadas = list(realizadas)
+    if realizadas:
+        claves_realizadas = np.array(
+            [eid * 100000 + anio * 12 + mes - 1 for eid, anio, mes in realizadas], dtype=np.int64
+        )
+        claves = equipo_ids[posiciones] * 100000 + meses
+        status[np.isin(claves, claves_realizadas)] = REALIZADO
+
+    return posiciones, fechas, status
+
+
+def get_justificacion_incumplimiento(equipo, status):
+    """
+    Obtiene la justificación del incumplimiento según el estado del equipo y el status de la actividad.
+
+    Lógica:
+    - Si estado_equipo == 'Inactivo' → equipo.observaciones
+    - Si estado_equipo == 'De Baja' → baja_registro.razon_baja + observaciones
+    - Si estado_equipo == 'Activo' AND status == 'No Cumplido' → equipo.observaciones
+    """
+    justificacion = ""
+
+    # Solo agregar justificación si no se cumplió
+    if status != 'No Cumplido':
+        return justificacion
+
+    estado = equipo.estado
+
+    if estado == ESTADO_INACTIVO:
+        justificacion = equipo.observaciones or "Equipo inactivo sin observaciones registradas"
+
+    elif estado == ESTADO_DE_BAJA:
+        # Buscar registro de baja
+        if hasattr(equipo, 'baja_registro') and equipo.baja_registro:
+            baja = equipo.baja_registro
+            justificacion = f"BAJA: {baja.razon_baja}"
+            if baja.observaciones:
+                justificacion += f" | {baja.observaciones}"
+        else:
+            justificacion = "Equipo dado de baja sin registro detallado"
+
+    elif estado == ESTADO_ACTIVO:
+        justificacion = equipo.observaciones or "Equipo activo - no cumplió sin observaciones registradas"
+
+    else:
+        # Otros estados (En Calibración, En Mantenimiento, etc.)
+        justificacion = equipo.observaciones or f"Estado: {estado}"
+
+    return justificacion
+
+
+class ProyeccionActividades:
+    """
+    Resultado columnar de una proyección.
+
+    ``equipo_ids``, ``fechas`` (datetime64[D]) y ``status`` (códigos
+    REALIZADO / NO_CUMPLIDO / PENDIENTE) tienen una fila por ocurrencia.
+    """
+
+    def __init__(self, equipo_ids, fechas, status, fuente=None):
+        self.equipo_ids = equipo_ids
+        self.fechas = fechas
+        self.status = status
+        self._fuente = fuente
+        self._equipos = None
+
+    def __len__(self):
+        return int(self.status.size)
+
+    def conteos(self):
+        """Conteo por estado: {'realizadas', 'no_cumplidas', 'pendientes'}."""
+        r, n, p = np.bincount(self.status, minlength=3)[:3]
+        return {'realizadas': int(r), 'no_cumplidas': int(n), 'pendientes': int(p)}
+
+    def _equipo_map(self, ids):
+        from .models import Equipo
+
+        if self._equipos is None:
+            self._equipos = {}
+        faltan = [i for i in ids if i not in self._equipos]
+        if faltan:
+            if isinstance(self._fuente, dict):
+                self._equipos.update({i: self._fuente[i] for i in faltan})
+            elif isinstance(self._fuente, QuerySet) and not self._fuente.query.is_sliced:
+                # Respeta select_related/prefetch del queryset del llamador
+                self._equipos.update(self._fuente.in_bulk(faltan))
+            else:
+                self._equipos.update(Equipo.objects.select_related('baja_registro').in_bulk(faltan))
+        return self._equipos
+
+    def filas(self, status=None, justificacion=True):
+        """
+        Materializa las ocurrencias como dicts (formato histórico de las vistas).
+
+        Args:
+            status: etiqueta ('Realizado', 'No Cumplido', 'Pendiente/Programado')
+                para materializar solo esas filas; None = todas
+            justificacion: incluir 'justificacion' (get_justificacion_incumplimiento)
+        """
+        indices = np.arange(len(self))
+        if status is not None:
+            codigo = CODIGOS_STATUS.get(status)
+            if codigo is None:
+                return []
+            indices = np.flatnonzero(self.status == codigo)
+        if indices.size == 0:
+            return []
+
+        ids = self.equipo_ids[indices].tolist()
+        equipos = self._equipo_map(dict.fromkeys(ids))
+        fechas = self.fechas[indices].astype(object).tolist()
+        etiquetas = [ETIQUETAS_STATUS[c] for c in self.status[indices].tolist()]
+
+        resultado = []
+        for equipo_id, fecha, etiqueta in zip(ids, fechas, etiquetas):
+            equipo = equipos[equipo_id]
+            fila = {'equipo': equipo, 'fecha_programada': fecha, 'status': etiqueta}
+            if justificacion:
+                fila['justificacion'] = get_justificacion_incumplimiento(equipo, etiqueta)
+            resultado.append(fila)
+        return resultado
+
+
+# =============================================================================
+# CARGA DESDE BD
+# =============================================================================
+
+_CAMPO_FRECUENCIA = {
+    'calibracion': 'frecuencia_calibracion_meses',
+    'comprobacion': 'frecuencia_comprobacion_meses',
+    'mantenimiento': 'frecuencia_mantenimiento_meses',
+}
+
+
+def _modelo_y_campo(tipo):
+    from .models import Calibracion, Comprobacion, Mantenimiento
+
+    return {
+        'calibracion': (Calibracion, 'fecha_calibracion'),
+        'comprobacion': (Comprobacion, 'fecha_comprobacion'),
+        'mantenimiento': (Mantenimiento, 'fecha_mantenimiento'),
+    }[tipo]
+
+
+def _filtro_equipos(equipos, ids):
+    # Con un queryset se filtra por subconsulta (sin miles de parámetros IN)
+    if isinstance(equipos, QuerySet) and not equipos.query.is_sliced:
+        return {'equipo_id__in': equipos.order_by().values('id')}
+    return {'equipo_id__in': ids}
+
+
+def _ultimas(tipo, filtro):
+    modelo, campo = _modelo_y_campo(tipo)
+    return dict(
+        modelo.objects.filter(**filtro)
+        .values('equipo_id')
+        .annotate(u=Max(campo))
+        .values_list('equipo_id', 'u')
+    )
+
+
+def _filas_equipos(equipos, tipo):
+    """(id, estado, fecha_adquisicion, frecuencia, tiene_baja, fecha_baja) por equipo."""
+    campo_freq = _CAMPO_FRECUENCIA[tipo]
+    if isinstance(equipos, QuerySet):
+        return list(equipos.values_list(
+            'id', 'estado', 'fecha_adquisicion', campo_freq, 'baja_registro__id', 'baja_registro__fecha_baja'
+        ))
+
+    filas = []
+    for equipo in equipos:
+        baja = None
+        if equipo.estado == ESTADO_DE_BAJA and hasattr(equipo, 'baja_registro'):
+            baja = equipo.baja_registro
+        filas.append((
+            equipo.id, equipo.estado, equipo.fecha_adquisicion, getattr(equipo, campo_freq),
+            baja.id if baja else None, baja.fecha_baja if baja else None,
+        ))
+    return filas
+
+
+def proyectar_actividades(equipos, tipo, desde, hasta, today):
+    """
+    Proyecta las actividades de ``tipo`` de los equipos entre ``desde`` y
+    ``hasta`` (inclusive). 3-4 consultas independientemente del número de equipos.
+
+    Jerarquía de la fecha de inicio del plan:
+    1. Última actividad del tipo
+    2. Última calibración (comprobación y mantenimiento)
+    3. Fecha de adquisición
+
+    Equipos De Baja: sin registro de baja o con baja anterior a ``desde`` se
+    excluyen; sus ocurrencias desde la fecha de baja son No Cumplido.
+
+    Args:
+        equipos: QuerySet de Equipo (preferido) o lista de instancias
+        tipo: 'calibracion' | 'comprobacion' | 'mantenimiento'
+
+    Returns:
+        ProyeccionActividades
+    """
+    if tipo not in TIPOS_ACTIVIDAD:
+        raise ValueError(f"Tipo de actividad inválido: {tipo}")
+
+    fuente = equipos
+    if not isinstance(equipos, QuerySet):
+        equipos = list(equipos)
+        fuente = {e.id: e for e in equipos}
+
+    filas = _filas_equipos(equipos, tipo)
+    if not filas:
+        return ProyeccionActividades(np.empty(0, np.int64), np.empty(0, 'datetime64[D]'), np.empty(0, np.int8))
+
+    filtro = _filtro_equipos(equipos, [f[0] for f in filas])
+    ultimas = _ultimas(tipo, filtro)
+    ultimas_cal = _ultimas('calibracion', filtro) if tipo != 'calibracion' else {}
+
+    modelo, campo = _modelo_y_campo(tipo)
+    realizadas = modelo.objects.filter(
+        **filtro, **{f'{campo}__gte': desde, f'{campo}__lte': hasta}
+    ).values_list('equipo_id', f'{campo}__year', f'{campo}__month')
+
+    ids, inicios, frecuencias, bajas = [], [], [], []
+    for equipo_id, estado, fecha_adquisicion, freq, baja_id, fecha_baja in filas:
+        if not freq:
+            continue
+        inicio = ultimas.get(equipo_id) or ultimas_cal.get(equipo_id) or fecha_adquisicion
+        if not inicio:
+            continue
+        freq = int(freq)
+        if freq <= 0:
+            continue
+        if estado == ESTADO_DE_BAJA:
+            if baja_id is None or fecha_baja is None or fecha_baja < desde:
+                continue
+        else:
+            fecha_baja = None
+        ids.append(equipo_id)
+        inicios.append(inicio)
+        frecuencias.append(freq)
+        bajas.append(fecha_baja if fecha_baja is not None else _SIN_BAJA)
+
+    equipo_ids = np.array(ids, dtype=np.int64)
+    posiciones, fechas, status = proyectar_series(
+        equipo_ids,
+        np.array(inicios, dtype='datetime64[D]'),
+        np.array(frecuencias, dtype=np.int64),
+        np.array(bajas, dtype='datetime64[D]'),
+        desde, hasta, today, realizadas,
+    )
+    return ProyeccionActividades(equipo_ids[posiciones], fechas, status, fuente=fuente)
+
+
+def proyectar_anio(equipos, tipo, year, today):
+    """Atajo: proyección del año calendario ``year``."""
+    return proyectar_actividades(equipos, tipo, date(year, 1, 1), date(year, 12, 31), today)
@@ -0,0 +1,194 @@
+# core/recordatorios_vencidos.py
+# Planificador por conjuntos de los recordatorios semanales de actividades vencidas
+
+import logging
+from collections import OrderedDict
+
+from django.db.models import Max
+from django.utils import timezone
+
+from .constants import (
+    ESTADO_ACTIVO, ESTADO_EN_CALIBRACION, ESTADO_EN_MANTENIMIENTO, ESTADO_EN_COMPROBACION,
+)
+
+logger = logging.getLogger('core')
+
+MAX_RECORDATORIOS = 3
+DIAS_ENTRE_RECORDATORIOS = 7
+
+# (tipo_actividad, campo de próxima fecha, estados del equipo que reciben recordatorio)
+TIPOS_VENCIDOS = (
+    ('calibracion', 'proxima_calibracion', [ESTADO_ACTIVO, ESTADO_EN_MANTENIMIENTO, ESTADO_EN_COMPROBACION]),
+    ('mantenimiento', 'proximo_mantenimiento', [ESTADO_ACTIVO, ESTADO_EN_CALIBRACION, ESTADO_EN_COMPROBACION]),
+    ('comprobacion', 'proxima_comprobacion', [ESTADO_ACTIVO, ESTADO_EN_CALIBRACION, ESTADO_EN_MANTENIMIENTO]),
+)
+
+
+def _empresas_activas():
+    from .models import Empresa
+    return Empresa.objects.filter(estado_suscripcion='Activo', is_deleted=False)
+
+
+def _ultimos_recordatorios(empresas, today):
+    """
+    Último recordatorio por (equipo, tipo_actividad, fecha_vencimiento) de las
+    empresas, en una sola consulta agrupada.
+
+    Returns:
+        dict: {(equipo_id, tipo, fecha_vencimiento): (numero, fecha_notificacion)}
+    """
+    from .models import NotificacionVencimiento
+
+    filas = (
+        NotificacionVencimiento.objects
+        .filter(equipo__empresa__in=empresas, fecha_vencimiento__lt=today)
+        .order_by()
+        .values('equipo_id', 'tipo_actividad', 'fecha_vencimiento')
+        .annotate(ultimo_numero=Max('numero_recordatorio'), ultima_fecha=Max('fecha_notificacion'))
+    )
+    return {
+        (fila['equipo_id'], fila['tipo_actividad'], fila['fecha_vencimiento']):
+            (fila['ultimo_numero'], fila['ultima_fecha'])
+        for fila in filas
+    }
+
+
+def decidir_recordatorio(ultimo, today):
+    """
+    Reglas de ``NotificacionVencimiento.puede_enviar_recordatorio`` sobre el
+    último recordatorio ya cargado.
+
+    Args:
+        ultimo: (numero_recordatorio, fecha_notificacion) o None si nunca se envió
+        today: fecha de referencia
+
+    Returns:
+        tuple: (puede_enviar, numero_recordatorio, motivo_descarte)
+    """
+    if ultimo is None:
+        return True, 1, None
+
+    numero, fecha_notificacion = ultimo
+    if numero >= MAX_RECORDATORIOS:
+        return False, None, 'maximo'
+
+    fecha_local = timezone.localtime(fecha_notificacion).date() if timezone.is_aware(fecha_notificacion) \
+        else fecha_notificacion.date()
+    if (today - fecha_local).days < DIAS_ENTRE_RECORDATORIOS:
+        return False, None, 'reciente'
+
+    return True, numero + 1, None
+
+
+def planificar_recordatorios(today=None, empresas=None):
+    """
+    Decide qué recordatorios corresponden en esta ejecución, sin escribir nada.
+
+    Args:
+        today: fecha de referencia (por defecto hoy)
+        empresas: queryset de empresas (por defecto las activas no eliminadas)
+
+    Returns:
+        dict: {
+            'fecha': date,
+            'empresas': OrderedDict {empresa_id: {'empresa', 'calibracion': [equipos],
+                                                  'mantenimiento': [...], 'comprobacion': [...]}},
+            'notificaciones': [NotificacionVencimiento sin guardar],
+            'descartados': {'maximo': int, 'reciente': int},
+        }
+    """
+    from .models import Equipo, NotificacionVencimiento
+
+    today = today or timezone.localdate()
+    if empresas is None:
+        empresas = _empresas_activas()
+
+    ultimos = _ultimos_recordatorios(empresas, today)
+
+    plan = {
+        'fecha': today,
+        'empresas': OrderedDict(),
+        'notificaciones': [],
+        'descartados': {'maximo': 0, 'reciente': 0},
+    }
+
+    for tipo, campo_proxima, estados in TIPOS_VENCIDOS:
+        equipos = (
+            Equipo.objects
+            .filter(empresa__in=empresas, estado__in=estados, **{f'{campo_proxima}__lt': today})
+            .select_related('empresa')
+            .order_by('empresa_id', 'codigo_interno')
+        )
+        for equipo in equipos:
+            fecha_vencimiento = getattr(equipo, campo_proxima)
+            puede_enviar, numero, motivo = decidir_recordatorio(
+                ultimos.get((equipo.pk, tipo, fecha_vencimiento)), today
+            )
+            if not puede_enviar:
+                plan['descartados'][motivo] += 1
+                continue
+
+            entrada = plan['empresas'].setdefault(equipo.empresa_id, {
+                'empresa': equipo.empresa,
+                'calibracion': [],
+                'mantenimiento': [],
+                'comprobacion': [],
+            })
+            entrada[tipo].append(equipo)
+            plan['notificaciones'].append(NotificacionVencimiento(
+                equipo=equipo,
+                tipo_actividad=tipo,
+                fecha_vencimiento=fecha_vencimiento,
+                numero_recordatorio=numero,
+                fecha_ultima_revision=fecha_vencimiento,
+            ))
+
+    return plan
+
+
+def ejecutar_plan(plan, enviar):
+    """
+    Registra todas las notificaciones del plan (un ``bulk_create``) y entrega a
+    ``enviar(empresa, calibraciones, mantenimientos, comprobaciones)`` los
+    equipos de cada empresa.
+
+    Returns:
+        int: número de empresas cuyo email se envió
+    """
+    from .models import NotificacionVencimiento
+
+    NotificacionVencimiento.objects.bulk_create(plan['notificaciones'], batch_size=1000)
+
+    sent_count = 0
+    for entrada in plan['empresas'].values():
+        empresa = entrada['empresa']
+        total = len(entrada['calibracion']) + len(entrada['mantenimiento']) + len(entrada['comprobacion'])
+        if enviar(empresa, entrada['calibracion'], entrada['mantenimiento'], entrada['comprobacion']):
+            sent_count += 1
+            logger.info(f"Weekly overdue reminder sent to {empresa.nombre}: {total} overdue activities")
+    return sent_count
+
+
+def reporte_plan(plan):
+    """
+    Resumen del plan para el modo simulación.
+
+    Returns:
+        dict: {'fecha', 'empresas': [{'empresa_id', 'nombre', 'calibracion', 'mantenimiento',
+               'comprobacion', 'total'}], 'total_recordatorios', 'descartados'}
+    """
+    empresas = []
+    for empresa_id, entrada in plan['empresas'].items():
+        conteos = {tipo: len(entrada[tipo]) for tipo, _, _ in TIPOS_VENCIDOS}
+        empresas.append({
+            'empresa_id': empresa_id,
+            'nombre': entrada['empresa'].nombre,
+            **conteos,
+            'total': sum(conteos.values()),
+        })
+    return {
+        'fecha': plan['fecha'],
+        'empresas': empresas,
+        'total_recordatorios': len(plan['notificaciones']),
+        'descartados': dict(plan['descartados']),
+    }
@@ -0,0 +1,292 @@
+# core/regeneracion_pdf.py
+# Cola de regeneración de PDFs aprobados respaldada por la tabla RegeneracionPDF
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import cola_lease
+
+logger = logging.getLogger('core')
+
+DEFAULT_LOTE = 10
+DEFAULT_MAX_INTENTOS = 3
+DEFAULT_BACKOFF_SEGUNDOS = 30
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_RETENCION_DIAS = 7
+DEFAULT_MAX_LOTE_APROBACION = 100
+# Sin cola cada documento se renderiza dentro de la petición (timeout de gunicorn)
+DEFAULT_MAX_LOTE_EN_LINEA = 5
+
+ESTADOS_ACTIVOS = ('pendiente', 'procesando')
+
+
+def _config():
+    return getattr(settings, 'REGENERACION_PDF_CONFIG', {})
+
+
+def cola_activa():
+    return bool(_config().get('ACTIVO', True))
+
+
+def max_intentos():
+    return int(_config().get('MAX_INTENTOS', DEFAULT_MAX_INTENTOS))
+
+
+def lease_seconds():
+    return int(_config().get('LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+
+
+def max_lote_aprobacion():
+    """Documentos permitidos en una aprobación en bloque (pocos si se renderizan en línea)."""
+    if not cola_activa():
+        return int(_config().get('MAX_LOTE_EN_LINEA', DEFAULT_MAX_LOTE_EN_LINEA))
+    return int(_config().get('MAX_LOTE_APROBACION', DEFAULT_MAX_LOTE_APROBACION))
+
+
+def backoff(intentos):
+    """Espera antes del siguiente intento: BACKOFF_SEGUNDOS * 2^(intentos-1)."""
+    return cola_lease.backoff(int(_config().get('BACKOFF_SEGUNDOS', DEFAULT_BACKOFF_SEGUNDOS)), intentos)
+
+
+COLA = cola_lease.ColaLease(
+    'RegeneracionPDF', en_curso='procesando', lease_seconds=lease_seconds,
+    listas=lambda ahora: {'proximo_intento__lte': ahora},
+)
+
+
+# =============================================================================
+# DOCUMENTOS
+# =============================================================================
+
+def _modelo(tipo):
+    from core.models import Calibracion, Comprobacion
+
+    return Comprobacion if tipo == 'comprobacion' else Calibracion
+
+
+def esta_aprobado(tipo, documento):
+    campo = {
+        'confirmacion': 'confirmacion_estado_aprobacion',
+        'intervalos': 'intervalos_estado_aprobacion',
+        'comprobacion': 'estado_aprobacion',
+    }[tipo]
+    return getattr(documento, campo) == 'aprobado'
+
+
+def campo_pdf(tipo):
+    return {
+        'confirmacion': 'confirmacion_metrologica_pdf',
+        'intervalos': 'intervalos_calibracion_pdf',
+        'comprobacion': 'comprobacion_pdf',
+    }[tipo]
+
+
+def _regenerar(tipo, documento):
+    from core.pdf_aprobaciones import (
+        regenerar_pdf_comprobacion, regenerar_pdf_confirmacion, regenerar_pdf_intervalos,
+    )
+
+    regenerador = {
+        'confirmacion': regenerar_pdf_confirmacion,
+        'intervalos': regenerar_pdf_intervalos,
+        'comprobacion': regenerar_pdf_comprobacion,
+    }[tipo]
+    regenerador(documento)
+
+
+# =============================================================================
+# ENCOLADO
+# =============================================================================
+
+def encolar(tipo, documento, usuario=None):
+    """
+    Crea el trabajo de regeneración del documento, salvo que ya haya uno
+    pendiente (que regenerará con el estado vigente al procesarse).
+
+    Returns:
+        RegeneracionPDF
+    """
+    from core.models import RegeneracionPDF
+
+    existente = RegeneracionPDF.objects.filter(
+        tipo=tipo, objeto_id=documento.pk, estado='pendiente'
+    ).first()
+    if existente:
+        return existente
+    return RegeneracionPDF.objects.create(
+        tipo=tipo,
+        objeto_id=documento.pk,
+        empresa_id=documento.equipo.empresa_id,
+        solicitado_por=usuario if usuario is not None and usuario.is_authenticated else None,
+    )
+
+
+def solicitar(tipo, documento, usuario=None):
+    """
+    Punto de entrada de las vistas de aprobación. Con la cola activa solo
+    encola; si no, procesa el trabajo en línea.
+
+    Returns:
+        RegeneracionPDF
+    """
+    trabajo = encolar(tipo, documento, usuario)
+    if not cola_activa():
+        procesar(trabajo, documento=documento)
+    return trabajo
+
+
+# =============================================================================
+# RECLAMO Y LEASES
+# =============================================================================
+
+def reclamar_lote(worker_id, tamano):
+    """
+    Reclama hasta ``tamano`` trabajos pendientes cuyo intento ya venció.
+
+    Returns:
+        list[RegeneracionPDF]
+    """
+    return COLA.reclamar_lote(worker_id, tamano)
+
+
+def recuperar_estancados():
+    """Devuelve a la cola los trabajos cuyo worker murió con el lease vigente."""
+    recuperados = COLA.recuperar_estancados()
+    if recuperados:
+        logger.warning(f"Regeneración PDF: {recuperados} trabajos estancados devueltos a la cola")
+    return recuperados
+
+
+# =============================================================================
+# PROCESAMIENTO
+# =============================================================================
+
+def procesar(trabajo, documento=None):
+    """
+    Regenera el PDF de un trabajo y guarda el resultado.
+
+    Returns:
+        str: estado final del trabajo
+    """
+    modelo = _modelo(trabajo.tipo)
+    try:
+        if documento is None:
+            documento = modelo.objects.select_related('equipo__empresa').filter(pk=trabajo.objeto_id).first()
+        if documento is None or not esta_aprobado(trabajo.tipo, documento):
+            trabajo.estado = 'omitido'
+        else:
+            _regenerar(trabajo.tipo, documento)
+            trabajo.estado = 'completado'
+        trabajo.ultimo_error = ''
+        trabajo.completado_en = timezone.now()
+    except Exception as e:
+        trabajo.intentos += 1
+        trabajo.ultimo_error = f"{type(e).__name__}: {e}"[:2000]
+        if trabajo.intentos >= max_intentos() or not cola_activa():
+            trabajo.estado = 'fallido'
+            logger.error(f"Regeneración PDF: {trabajo} falló tras {trabajo.intentos} intentos: {e}")
+        else:
+            trabajo.estado = 'pendiente'
+            trabajo.proximo_intento = timezone.now() + backoff(trabajo.intentos)
+            logger.warning(f"Regeneración PDF: {trabajo} reprogramado: {e}")
+
+    trabajo.worker_id = None
+    trabajo.lease_expira = None
+    trabajo.save(update_fields=[
+        'estado', 'intentos', 'ultimo_error', 'proximo_intento', 'completado_en', 'worker_id', 'lease_expira',
+    ])
+    return trabajo.estado
+
+
+def drenar(lote=None, max_trabajos=None, worker_id=None):
+    """
+    Procesa los trabajos pendientes hasta vaciar la cola (o ``max_trabajos``).
+
+    Returns:
+        dict: {'completado': n, 'omitido': n, 'pendiente': n, 'fallido': n}
+    """
+    lote = max(1, int(lote or _config().get('LOTE', DEFAULT_LOTE)))
+    worker_id = worker_id or cola_lease.generar_worker_id()
+    resultados = {'completado': 0, 'omitido': 0, 'pendiente': 0, 'fallido': 0}
+    procesados = 0
+
+    recuperar_estancados()
+    while max_trabajos is None or procesados < max_trabajos:
+        tamano = lote if max_trabajos is None else min(lote, max_trabajos - procesados)
+        trabajos = reclamar_lote(worker_id, tamano)
+        if not trabajos:
+            break
+        for trabajo in trabajos:
+            resultados[procesar(trabajo)] += 1
+        procesados += len(trabajos)
+
+    if procesados:
+        logger.info(
+            f"Regeneración PDF {worker_id}: {resultados['completado']} completados, "
+            f"{resultados['omitido']} omitidos, {resultados['pendiente']} reprogramados, "
+            f"{resultados['fallido']} fallidos"
+        )
+    return resultados
+
+
+def bucle_worker(worker_id, check_interval=5, max_iterations=0, lote=None):
+    """Loop de un worker: drena la cola y duerme solo cuando está vacía."""
+    from core.render_pdf import precalentar
+
+    precalentar()
+    cola_lease.bucle_worker(
+        'de regeneración PDF', worker_id, lambda: any(drenar(lote=lote, worker_id=worker_id).values()),
+        check_interval, max_iterations,
+    )
+
+
+def purgar_terminados(dias=None):
+    """Elimina los trabajos terminados con más de ``dias`` de antigüedad."""
+    from core.models import RegeneracionPDF
+
+    dias = int(dias if dias is not None else _config().get('RETENCION_DIAS', DEFAULT_RETENCION_DIAS))
+    borrados, _ = RegeneracionPDF.objects.exclude(estado__in=ESTADOS_ACTIVOS).filter(
+        creado_en__lt=timezone.now() - timedelta(days=dias)
+    ).delete()
+    return borrados
+
+
+# =============================================================================
+# ESTADO
+# =============================================================================
+
+def estado_trabajos(ids, usuario):
+    """
+    Estado de los trabajos indicados visibles para el usuario (los de su
+    empresa, o todos para superusuarios), con la URL del PDF ya regenerado.
+
+    Returns:
+        list[dict]
+    """
+    from core.models import RegeneracionPDF
+    from core.urls_firmadas import url_firmada
+
+    trabajos = RegeneracionPDF.objects.filter(pk__in=ids)
+    if not usuario.is_superuser:
+        trabajos = trabajos.filter(empresa_id=usuario.empresa_id)
+
+    resultado = []
+    for trabajo in trabajos.order_by('pk'):
+        pdf_url = None
+        if trabajo.estado == 'completado':
+            documento = _modelo(trabajo.tipo).objects.filter(pk=trabajo.objeto_id).only(campo_pdf(trabajo.tipo)).first()
+            if documento is not None:
+                pdf_url = url_firmada(getattr(documento, campo_pdf(trabajo.tipo))) or None
+        resultado.append({
+            'id': trabajo.pk,
+            'tipo': trabajo.tipo,
+            'objeto_id': trabajo.objeto_id,
+            'estado': trabajo.estado,
+            'intentos': trabajo.intentos,
+            'error': trabajo.ultimo_error if trabajo.estado == 'fallido' else '',
+            'pdf_url': pdf_url,
+        })
+    return resultado
@@ -0,0 +1,285 @@
+# core/render_pdf.py
+# Servicio de render WeasyPrint: fuentes y CSS compartidos, recursos leídos del storage
+
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import threading
+from collections import OrderedDict
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from core.urls_firmadas import es_almacenamiento_firmado
+
+logger = logging.getLogger('core')
+
+DEFAULT_BASE_URL = 'http://localhost/'
+DEFAULT_MAX_CSS = 32
+
+# Plantillas que se precalientan (sus <style> no dependen del contexto)
+PLANTILLAS_PDF = (
+    'core/confirmacion_metrologica_print.html',
+    'core/intervalos_calibracion_print.html',
+    'core/comprobacion_metrologica_print.html',
+    'core/mantenimiento_print.html',
+    'core/hoja_vida_pdf.html',
+)
+
+_RE_STYLE = re.compile(r'<style(?:\s+type=["\']text/css["\'])?\s*>(.*?)</style>', re.S | re.I)
+_HOSTS_LOCALES = {'localhost', '127.0.0.1', 'testserver'}
+
+_lock = threading.Lock()
+_font_config = None
+_hosts_propios = None
+# md5 del CSS -> weasyprint.CSS
+_css = OrderedDict()
+
+
+def _config():
+    return getattr(settings, 'PDF_RENDER_CONFIG', {})
+
+
+def _base_url():
+    return _config().get('BASE_URL', DEFAULT_BASE_URL)
+
+
+def obtener_font_config():
+    """``FontConfiguration`` del proceso (se crea en el primer uso)."""
+    global _font_config
+    if _font_config is None:
+        with _lock:
+            if _font_config is None:
+                from weasyprint.text.fonts import FontConfiguration
+                _font_config = FontConfiguration()
+    return _font_config
+
+
+# ============================================================================
+# Resolución de recursos sin HTTP
+# ============================================================================
+
+def hosts_propios():
+    """Hosts que sirven este sitio: sus URLs se resuelven en local."""
+    global _hosts_propios
+    if _hosts_propios is None:
+        hosts = set(_HOSTS_LOCALES)
+        hosts.update(h.lstrip('.') for h in settings.ALLOWED_HOSTS if h and h != '*')
+        hosts.update(_config().get('HOSTS_PROPIOS', []))
+        hosts.add(urlparse(_base_url()).hostname)
+        try:
+            from django.contrib.sites.models import Site
+            hosts.add(Site.objects.get_current().domain.split(':')[0])
+        except Exception:
+            pass
+        _hosts_propios = {h.lower() for h in hosts if h}
+    return _hosts_propios
+
+
+def _prefijo(url_config):
+    """(host, ruta) de MEDIA_URL/STATIC_URL; host None si es relativa."""
+    partes = urlparse(url_config or '')
+    ruta = '/' + partes.path.lstrip('/')
+    return (partes.hostname.lower() if partes.hostname else None), ruta
+
+
+def _es_del_sitio(host, host_prefijo):
+    if host_prefijo:
+        return host == host_prefijo
+    return not host or host in hosts_propios()
+
+
+def _nombre_en_bucket(partes, storage):
+    """Nombre del archivo en el storage a partir de una URL (firmada) del bucket."""
+    if not es_almacenamiento_firmado(storage):
+        return None
+    host = (partes.hostname or '').lower()
+    ruta = unquote(partes.path).lstrip('/')
+    bucket = getattr(storage, 'bucket_name', '') or ''
+    endpoint = urlparse(getattr(storage, 'endpoint_url', '') or '').hostname
+    custom_domain = (getattr(storage, 'custom_domain', '') or '').split('/')[0]
+
+    if endpoint and host == endpoint.lower() and bucket and ruta.startswith(f'{bucket}/'):
+        ruta = ruta[len(bucket) + 1:]  # URL path-style (R2)
+    elif not ((custom_domain and host == custom_domain.lower()) or (bucket and host.startswith(f'{bucket}.'))):
+        return None
+
+    location = (getattr(storage, 'location', '') or '').strip('/')
+    if location:
+        if not ruta.startswith(f'{location}/'):
+            return None
+        ruta = ruta[len(location) + 1:]
+    return ruta or None
+
+
+def _ruta_estatico(relativa):
+    from django.contrib.staticfiles import finders
+
+    ruta = finders.find(relativa)
+    if not ruta and settings.STATIC_ROOT:
+        candidata = os.path.join(settings.STATIC_ROOT, relativa)
+        if os.path.isfile(candidata):
+            ruta = candidata
+    return ruta
+
+
+def leer_recurso_local(url, storage=None):
+    """
+    Contenido de una URL servida por este sitio o por su bucket.
+
+    Returns:
+        (bytes, mime_type) si la URL es de MEDIA_URL, STATIC_URL o del
+        bucket; None si debe resolverla WeasyPrint (``data:``, externas).
+
+    Raises:
+        FileNotFoundError: la URL es local pero el archivo no existe
+        (WeasyPrint omite el recurso, como con un 404).
+    """
+    storage = storage or default_storage
+    partes = urlparse(url)
+    if partes.scheme not in ('http', 'https', ''):
+        return None
+    host = (partes.hostname or '').lower() or None
+    ruta = unquote(partes.path)
+    mime = mimetypes.guess_type(ruta)[0] or 'application/octet-stream'
+
+    host_media, ruta_media = _prefijo(settings.MEDIA_URL)
+    if ruta.startswith(ruta_media) and _es_del_sitio(host, host_media):
+        nombre = ruta[len(ruta_media):]
+        if es_almacenamiento_firmado(storage):
+            nombre = _nombre_en_bucket(partes, storage) or nombre
+        with storage.open(nombre, 'rb') as archivo:
+            return archivo.read(), mime
+
+    host_static, ruta_static = _prefijo(settings.STATIC_URL)
+    if ruta.startswith(ruta_static) and _es_del_sitio(host, host_static):
+        encontrada = _ruta_estatico(ruta[len(ruta_static):])
+        if not encontrada:
+            raise FileNotFoundError(ruta)
+        with open(encontrada, 'rb') as archivo:
+            return archivo.read(), mime
+
+    nombre = _nombre_en_bucket(partes, storage)
+    if nombre:
+        with storage.open(nombre, 'rb') as archivo:
+            return archivo.read(), mime
+    return None
+
+
+class FetcherLocal:
+    """
+    ``url_fetcher`` de WeasyPrint: lee del storage/estáticos las URLs propias
+    y delega el resto en ``weasyprint.URLFetcher``.
+    """
+
+    def __init__(self, timeout=10):
+        import weasyprint
+
+        self._weasyprint = weasyprint
+        self._red = weasyprint.URLFetcher(timeout=timeout)
+
+    def __call__(self, url):
+        local = leer_recurso_local(url)
+        if local is None:
+            return self._red.fetch(url)
+        contenido, mime = local
+        return self._weasyprint.urls.URLFetcherResponse(
+            url, body=contenido, headers={'Content-Type': mime}
+        )
+
+
+def crear_url_fetcher():
+    """Fetcher para ``HTML``/``CSS`` de WeasyPrint (uno por documento)."""
+    return FetcherLocal()
+
+
+# ============================================================================
+# CSS precompilado
+# ============================================================================
+
+def extraer_estilos(html_string):
+    """Separa los bloques ``<style>``: devuelve (html sin ellos, [css, ...])."""
+    estilos = _RE_STYLE.findall(html_string)
+    if not estilos:
+        return html_string, []
+    return _RE_STYLE.sub('', html_string), estilos
+
+
+def obtener_css(texto, url_fetcher=None):
+    """``weasyprint.CSS`` parseado una vez por proceso para cada contenido."""
+    import weasyprint
+
+    clave = hashlib.md5(texto.encode('utf-8'), usedforsecurity=False).hexdigest()
+    with _lock:
+        css = _css.get(clave)
+        if css is not None:
+            _css.move_to_end(clave)
+            return css
+
+    css = weasyprint.CSS(
+        string=texto,
+        base_url=_base_url(),
+        font_config=obtener_font_config(),
+        url_fetcher=url_fetcher or crear_url_fetcher(),
+    )
+    with _lock:
+        _css[clave] = css
+        while len(_css) > _config().get('MAX_CSS', DEFAULT_MAX_CSS):
+            _css.popitem(last=False)
+    return css
+
+
+# ============================================================================
+# API
+# ============================================================================
+
+def renderizar_pdf(html_string):
+    """Bytes del PDF de un HTML ya renderizado."""
+    import weasyprint
+
+    url_fetcher = crear_url_fetcher()
+    font_config = obtener_font_config()
+    stylesheets = []
+    if _config().get('ACTIVO', True):
+        html_string, estilos = extraer_estilos(html_string)
+        stylesheets = [obtener_css(texto, url_fetcher) for texto in estilos]
+
+    documento = weasyprint.HTML(string=html_string, base_url=_base_url(), url_fetcher=url_fetcher)
+    return documento.write_pdf(stylesheets=stylesheets, font_config=font_config)
+
+
+def renderizar_plantilla(template_path, context):
+    """Renderiza una plantilla de Django y devuelve los bytes del PDF."""
+    from django.template.loader import render_to_string
+
+    return renderizar_pdf(render_to_string(template_path, context))
+
+
+def precalentar(plantillas=PLANTILLAS_PDF):
+    """
+    Crea el ``FontConfiguration`` y parsea el CSS de las plantillas de PDF
+    del proceso. Los errores solo se registran: el primer render los repetirá.
+    """
+    from django.template.loader import get_template
+
+    try:
+        obtener_font_config()
+        url_fetcher = crear_url_fetcher()
+        for plantilla in plantillas:
+            fuente = get_template(plantilla).template.source
+            for texto in extraer_estilos(fuente)[1]:
+                obtener_css(texto, url_fetcher)
+    except Exception as e:
+        logger.warning(f"No se pudo precalentar el render de PDF: {e}")
+
+
+def reiniciar():
+    """Descarta fuentes, CSS y hosts del proceso (tests)."""
+    global _font_config, _hosts_propios
+    with _lock:
+        _font_config = None
+        _hosts_propios = None
+        _css.clear()
@@ -16,6 +16,7 @@ from django.db.models import Sum, Count, Prefetch, Q
 from django.db import models
 from .models import Equipo, Empresa, Calibracion, Mantenimiento, Comprobacion, Documento
 from .security import SecureFileValidator, StorageQuotaManager
+from .storage_ledger import registrar_archivo, eliminar_registros
 
 logger = logging.getLogger('core')
 
@@ -79,6 +80,7 @@ class SecureFileUploadService:
                     subido_por=user,
                     empresa=empresa
                 )
+                registrar_archivo(empresa, file_path, uploaded_file.size)
 
             logger.info(f"Archivo subido exitosamente: {file_path}", extra={
                 'original_name': uploaded_file.name,
@@ -135,6 +137,7 @@ class SecureFileUploadService:
                         archivo_s3_path=file_path,
                         empresa=empresa
                     ).delete()
+                    eliminar_registros(empresa, [file_path])
 
                 logger.info(f"Archivo eliminado: {file_path}", extra={
                     'empresa_id': empresa.id if empresa else None
@@ -2,10 +2,18 @@
 # Signals for cache invalidation
 
 import logging
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.core.cache import cache
-from .models import Equipo, Calibracion, Mantenimiento, Comprobacion, CustomUser, OnboardingProgress, PrestamoEquipo
+from .models import (
+    Equipo, Calibracion, Mantenimiento, Comprobacion, CustomUser, OnboardingProgress, PrestamoEquipo,
+    Empresa, BajaEquipo, ArtefactoPDF, ZipRequest, NotificacionZip,
+)
+from .contadores_aprobacion import invalidar_contadores
+from .pdf_cache import CAMPOS_EMPRESA_HOJA_VIDA, borrar_archivo, renovar_version_contenido
+from .progreso import publicar
+from .stats_queue import solicitar_recalculo_stats
+from .storage_ledger import eliminar_registros_de_instancia
 
 logger = logging.getLogger(__name__)
 
@@ -59,14 +67,11 @@ def invalidate_dashboard_cache(empresa_id=None):
 @receiver(post_delete, sender=Equipo)
 def invalidate_cache_on_equipo_change(sender, instance, **kwargs):
     """
-    Invalida el cache del dashboard y actualiza stats pre-computadas cuando se modifica un equipo.
+    Invalida el cache del dashboard y solicita el recálculo de stats pre-computadas cuando se modifica un equipo.
     """
     if instance.empresa:
         invalidate_dashboard_cache(instance.empresa.id)
-        try:
-            instance.empresa.recalcular_stats_dashboard()
-        except Exception as e:
-            logger.error(f"Error recalculando stats de empresa '{instance.empresa.nombre}': {e}")
+        solicitar_recalculo_stats(instance.empresa)
     else:
         # Si el equipo no tiene empresa, invalidar todo
         invalidate_dashboard_cache()
@@ -76,15 +81,12 @@ def invalidate_cache_on_equipo_change(sender, instance, **kwargs):
 @receiver(post_delete, sender=Calibracion)
 def invalidate_cache_on_calibracion_change(sender, instance, **kwargs):
     """
-    Invalida el cache del dashboard y actualiza stats pre-computadas cuando se modifica una calibración.
+    Invalida el cache del dashboard y solicita el recálculo de stats pre-computadas cuando se modifica una calibración.
     """
     if instance.equipo and instance.equipo.empresa:
         empresa = instance.equipo.empresa
         invalidate_dashboard_cache(empresa.id)
-        try:
-            empresa.recalcular_stats_dashboard()
-        except Exception as e:
-            logger.error(f"Error recalculando stats de empresa '{empresa.nombre}': {e}")
+        solicitar_recalculo_stats(empresa)
     else:
         invalidate_dashboard_cache()
 
@@ -93,15 +95,12 @@ def invalidate_cache_on_calibracion_change(sender, instance, **kwargs):
 @receiver(post_delete, sender=Mantenimiento)
 def invalidate_cache_on_mantenimiento_change(sender, instance, **kwargs):
     """
-    Invalida el cache del dashboard y actualiza stats pre-computadas cuando se modifica un mantenimiento.
+    Invalida el cache del dashboard y solicita el recálculo de stats pre-computadas cuando se modifica un mantenimiento.
     """
     if instance.equipo and instance.equipo.empresa:
         empresa = instance.equipo.empresa
         invalidate_dashboard_cache(empresa.id)
-        try:
-            empresa.recalcular_stats_dashboard()
-        except Exception as e:
-            logger.error(f"Error recalculando stats de empresa '{empresa.nombre}': {e}")
+        solicitar_recalculo_stats(empresa)
     else:
         invalidate_dashboard_cache()
 
@@ -110,19 +109,113 @@ def invalidate_cache_on_mantenimiento_change(sender, instance, **kwargs):
 @receiver(post_delete, sender=Comprobacion)
 def invalidate_cache_on_comprobacion_change(sender, instance, **kwargs):
     """
-    Invalida el cache del dashboard y actualiza stats pre-computadas cuando se modifica una comprobación.
+    Invalida el cache del dashboard y solicita el recálculo de stats pre-computadas cuando se modifica una comprobación.
     """
     if instance.equipo and instance.equipo.empresa:
         empresa = instance.equipo.empresa
         invalidate_dashboard_cache(empresa.id)
-        try:
-            empresa.recalcular_stats_dashboard()
-        except Exception as e:
-            logger.error(f"Error recalculando stats de empresa '{empresa.nombre}': {e}")
+        solicitar_recalculo_stats(empresa)
     else:
         invalidate_dashboard_cache()
 
 
+@receiver(post_save, sender=Calibracion)
+@receiver(post_delete, sender=Calibracion)
+@receiver(post_save, sender=Comprobacion)
+@receiver(post_delete, sender=Comprobacion)
+def invalidar_contadores_aprobacion(sender, instance, **kwargs):
+    """
+    Invalida los contadores del badge de Aprobaciones de la empresa y del
+    creador del documento (pendientes y rechazos).
+    """
+    invalidar_contadores(instance.equipo.empresa_id, instance.creado_por_id)
+
+
+@receiver(post_delete, sender=Equipo)
+@receiver(post_delete, sender=Calibracion)
+@receiver(post_delete, sender=Mantenimiento)
+@receiver(post_delete, sender=Comprobacion)
+def limpiar_ledger_almacenamiento_on_delete(sender, instance, **kwargs):
+    """
+    Quita del ledger de almacenamiento los archivos que referenciaba el objeto
+    eliminado, para que el uso de la empresa deje de contarlos.
+    """
+    empresa = instance.empresa if sender is Equipo else getattr(instance.equipo, 'empresa', None)
+    eliminar_registros_de_instancia(empresa, instance)
+
+
+@receiver(post_save, sender=Calibracion)
+@receiver(post_delete, sender=Calibracion)
+@receiver(post_save, sender=Mantenimiento)
+@receiver(post_delete, sender=Mantenimiento)
+@receiver(post_save, sender=Comprobacion)
+@receiver(post_delete, sender=Comprobacion)
+@receiver(post_save, sender=BajaEquipo)
+@receiver(post_delete, sender=BajaEquipo)
+def renovar_version_contenido_on_actividad_change(sender, instance, **kwargs):
+    """
+    Renueva el sello de contenido del equipo cuando cambia una actividad o su
+    registro de baja (ambos aparecen en la Hoja de Vida).
+    """
+    if instance.equipo_id:
+        renovar_version_contenido(equipo_ids=[instance.equipo_id])
+
+
+@receiver(post_save, sender=ZipRequest)
+def publicar_cambio_zip(sender, instance, **kwargs):
+    """
+    Avisa a las pestañas del usuario (zip_progress_api) que su solicitud
+    cambió. Los UPDATE de los workers publican desde core/zip_queue.py.
+    """
+    publicar(instance.user_id, 'zip')
+
+
+@receiver(post_save, sender=NotificacionZip)
+@receiver(post_delete, sender=NotificacionZip)
+def publicar_cambio_notificacion(sender, instance, **kwargs):
+    """Avisa a las pestañas del usuario (notifications_api) de la notificación nueva o cambiada."""
+    publicar(instance.user_id, 'notificaciones')
+
+
+@receiver(pre_save, sender=Empresa)
+def detectar_cambio_formato_hoja_vida(sender, instance, update_fields=None, **kwargs):
+    """
+    Marca la empresa si cambió algún campo que aparece en la Hoja de Vida
+    (nombre, logo o formato). Los guardados parciales que no tocan esos
+    campos (stats, pagos, etc.) no consultan la BD.
+    """
+    instance._hoja_vida_cambio = False
+    if not instance.pk:
+        return
+    if update_fields is not None and not set(update_fields) & set(CAMPOS_EMPRESA_HOJA_VIDA):
+        return
+
+    anterior = Empresa._base_manager.filter(pk=instance.pk).values(*CAMPOS_EMPRESA_HOJA_VIDA).first()
+    if anterior is None:
+        return
+    instance._hoja_vida_cambio = any(
+        (anterior[campo] or None) != (getattr(getattr(instance, campo), 'name', getattr(instance, campo)) or None)
+        for campo in CAMPOS_EMPRESA_HOJA_VIDA
+    )
+
+
+@receiver(post_save, sender=Empresa)
+def renovar_version_contenido_on_empresa_change(sender, instance, **kwargs):
+    """
+    Renueva el sello de todos los equipos de la empresa (1 UPDATE) cuando
+    cambió su formato o logo.
+    """
+    if getattr(instance, '_hoja_vida_cambio', False):
+        renovar_version_contenido(empresa_id=instance.pk)
+        instance._hoja_vida_cambio = False
+
+
+@receiver(post_delete, sender=ArtefactoPDF)
+def borrar_archivo_artefacto_pdf(sender, instance, **kwargs):
+    """Elimina del storage el PDF de un artefacto desalojado o en cascada."""
+    borrar_archivo(instance)
+
+
 @receiver(post_save, sender=PrestamoEquipo)
 @receiver(post_delete, sender=PrestamoEquipo)
 def invalidate_cache_on_prestamo_change(sender, instance, **kwargs):
@@ -0,0 +1,547 @@
+# core/snapshots_decision.py
+# Snapshots diarios por empresa para el Panel de Decisiones SAM
+
+import calendar
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+
+logger = logging.getLogger('core')
+
+DEFAULT_DIAS_HISTORIAL = 400
+DEFAULT_DIAS_TENDENCIA = 30
+
+# Las actividades críticas se clasifican (vencida/urgente) al leer, así que se
+# guardan las que vencen hasta 7 días después de la ventana de urgencia para
+# que un snapshot de días anteriores siga mostrando las que ya entraron en ella.
+DIAS_URGENTE = 7
+DIAS_MARGEN_CRITICAS = 7
+
+# Máximo de elementos por empresa en las listas de alertas (solo se muestran totales)
+LIMITE_ALERTAS = 20
+
+CAMPOS_FECHA = ('fecha', 'fecha_vencimiento', 'fecha_sugerida')
+
+TIPOS_CRITICAS = (
+    ('calibraciones', 'proxima_calibracion', 'Calibración'),
+    ('mantenimientos', 'proximo_mantenimiento', 'Mantenimiento'),
+    ('comprobaciones', 'proxima_comprobacion', 'Comprobación'),
+)
+
+
+def _config():
+    return getattr(settings, 'PANEL_SNAPSHOT_CONFIG', {})
+
+
+def dias_historial():
+    return int(_config().get('DIAS_HISTORIAL', DEFAULT_DIAS_HISTORIAL))
+
+
+def dias_tendencia():
+    return int(_config().get('DIAS_TENDENCIA', DEFAULT_DIAS_TENDENCIA))
+
+
+# =============================================================================
+# SERIALIZACIÓN DEL DETALLE
+# =============================================================================
+
+def _a_json(valor):
+    """Convierte el resultado de las funciones de cálculo a tipos JSON."""
+    from .models import Equipo
+
+    if isinstance(valor, Equipo):
+        return {'id': valor.pk, 'codigo_interno': valor.codigo_interno, 'nombre': valor.nombre}
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, dict):
+        return {clave: _a_json(v) for clave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_a_json(v) for v in valor]
+    return valor
+
+
+def _desde_json(valor):
+    """Inverso de ``_a_json`` para las fechas que la plantilla formatea."""
+    if isinstance(valor, dict):
+        return {
+            clave: date.fromisoformat(v) if clave in CAMPOS_FECHA and isinstance(v, str) else _desde_json(v)
+            for clave, v in valor.items()
+        }
+    if isinstance(valor, list):
+        return [_desde_json(v) for v in valor]
+    return valor
+
+
+# =============================================================================
+# CÁLCULO POR EMPRESA
+# =============================================================================
+
+def _actividades_criticas(equipos_para_dashboard, today):
+    """Actividades vencidas o próximas a vencer, sin clasificar."""
+    limite = today + timedelta(days=DIAS_URGENTE + DIAS_MARGEN_CRITICAS)
+    criticas = []
+    for _, campo, tipo in TIPOS_CRITICAS:
+        filas = equipos_para_dashboard.filter(**{f'{campo}__lte': limite}).values('codigo_interno', 'nombre', campo)
+        criticas.extend(
+            {'codigo': fila['codigo_interno'], 'nombre': fila['nombre'], 'tipo': tipo, 'fecha': fila[campo]}
+            for fila in filas
+        )
+    return criticas
+
+
+def calcular_snapshot(empresa, today=None):
+    """
+    Calcula y guarda el snapshot del día para ``empresa`` usando las mismas
+    funciones que el panel de empresa individual.
+
+    Returns:
+        SnapshotDecisionEmpresa
+    """
+    from .constants import ESTADO_DE_BAJA, ESTADO_INACTIVO
+    from .models import Calibracion, Comprobacion, Equipo, Mantenimiento, SnapshotDecisionEmpresa
+    from .utils.decision_intelligence import (
+        calcular_alertas_predictivas,
+        calcular_compliance_iso9001,
+        calcular_optimizacion_cronogramas,
+        calcular_roi_rentabilidad,
+        calcular_tendencias_historicas,
+    )
+    from .metricas_decision import calcular_cumplimiento, calcular_eficiencia_operacional, calcular_salud_equipo
+
+    today = today or date.today()
+    year = today.year
+
+    equipos_queryset = Equipo.objects.filter(empresa=empresa)
+    equipos_para_dashboard = equipos_queryset.exclude(estado__in=[ESTADO_DE_BAJA, ESTADO_INACTIVO])
+
+    salud = calcular_salud_equipo(equipos_para_dashboard, today)
+    cumplimiento = calcular_cumplimiento(equipos_queryset.select_related('baja_registro'), year, today)
+    eficiencia = calcular_eficiencia_operacional(equipos_queryset, equipos_para_dashboard)
+
+    alertas = calcular_alertas_predictivas(empresa, today)
+    roi = calcular_roi_rentabilidad(empresa, year)
+    tendencias = calcular_tendencias_historicas(empresa, year)
+    compliance = calcular_compliance_iso9001(empresa, today)
+    optimizacion = calcular_optimizacion_cronogramas(empresa, today)
+
+    costos_totales = (
+        (Calibracion.objects.filter(equipo__empresa=empresa, fecha_calibracion__year=year)
+         .aggregate(total=Sum('costo_calibracion'))['total'] or Decimal('0'))
+        + (Mantenimiento.objects.filter(equipo__empresa=empresa, fecha_mantenimiento__year=year)
+           .aggregate(total=Sum('costo_sam_interno'))['total'] or Decimal('0'))
+        + (Comprobacion.objects.filter(equipo__empresa=empresa, fecha_comprobacion__year=year)
+           .aggregate(total=Sum('costo_comprobacion'))['total'] or Decimal('0'))
+    )
+
+    detalle = _a_json({
+        'criticas': _actividades_criticas(equipos_para_dashboard, today),
+        'alertas': {
+            categoria: alertas['alertas'][categoria][:LIMITE_ALERTAS]
+            for categoria in ('vencidas', 'criticas', 'riesgo_alto')
+        },
+        'no_conformidades': compliance.get('no_conformidades', []),
+        'oportunidades_optimizacion': optimizacion.get('oportunidades_optimizacion', []),
+        'equipos_problematicos': optimizacion.get('equipos_problematicos', []),
+        'datos_mensuales': [
+            {campo: m[campo] for campo in ('mes', 'nombre_mes', 'gasto_total', 'actividades')}
+            for m in tendencias['datos_mensuales']
+        ],
+    })
+
+    snapshot, _ = SnapshotDecisionEmpresa.objects.update_or_create(
+        empresa=empresa,
+        fecha=today,
+        defaults={
+            'año': year,
+            'salud_porcentaje': salud['salud_general_porcentaje'],
+            'salud_estado': salud['salud_general_estado'],
+            'equipos_saludables': salud['equipos_saludables'],
+            'equipos_en_riesgo': salud['equipos_en_riesgo'],
+            'equipos_criticos': salud['equipos_criticos'],
+            'total_equipos_salud': salud['total_equipos_salud'],
+            'cumplimiento_porcentaje': cumplimiento['cumplimiento_porcentaje'],
+            'cumplimiento_estado': cumplimiento['cumplimiento_estado'],
+            'actividades_programadas': cumplimiento['actividades_programadas'],
+            'actividades_realizadas': cumplimiento['actividades_realizadas'],
+            'eficiencia_porcentaje': eficiencia['eficiencia_porcentaje'],
+            'eficiencia_estado': eficiencia['eficiencia_estado'],
+            'equipos_disponibles': eficiencia['equipos_disponibles'],
+            'equipos_no_disponibles': eficiencia['equipos_no_disponibles'],
+            'ingresos_anuales': empresa.get_ingresos_anuales_reales(),
+            'costos_totales': costos_totales,
+            'total_alertas': alertas['total_alertas_criticas'],
+            'count_preventivos': roi['count_preventivos'],
+            'count_correctivos': roi['count_correctivos'],
+            'costo_preventivos': roi['costo_preventivos'],
+            'costo_correctivos': roi['costo_correctivos'],
+            'iso_total_equipos': compliance['total_equipos'],
+            'iso_equipos_conformes': compliance['equipos_conformes'],
+            'iso_equipos_riesgo': compliance['equipos_riesgo'],
+            'iso_equipos_no_conformes': compliance['equipos_no_conformes'],
+            'ahorro_cronograma': optimizacion.get('ahorro_total_cronograma', 0),
+            'detalle': detalle,
+        },
+    )
+    return snapshot
+
+
+def empresas_a_actualizar(today=None, incremental=False):
+    """
+    Empresas activas cuyo snapshot se debe (re)calcular.
+
+    Con ``incremental`` solo las que no tienen snapshot del día o cuyas stats
+    del dashboard (refrescadas por las señales) son posteriores a él.
+    """
+    from .models import Empresa, SnapshotDecisionEmpresa
+
+    today = today or date.today()
+    empresas = Empresa.objects.filter(is_deleted=False)
+    if incremental:
+        calculado_hoy = SnapshotDecisionEmpresa.objects.filter(
+            empresa=OuterRef('pk'), fecha=today
+        ).values('calculado_en')[:1]
+        empresas = empresas.annotate(snapshot_calculado_en=Subquery(calculado_hoy)).filter(
+            Q(snapshot_calculado_en__isnull=True)
+            | Q(stats_ultima_actualizacion__gt=F('snapshot_calculado_en'))
+        )
+    return empresas.order_by('id')
+
+
+def purgar_historial(today=None):
+    """Elimina snapshots más antiguos que DIAS_HISTORIAL. Retorna filas borradas."""
+    from .models import SnapshotDecisionEmpresa
+
+    today = today or date.today()
+    borrados, _ = SnapshotDecisionEmpresa.objects.filter(
+        fecha__lt=today - timedelta(days=dias_historial())
+    ).delete()
+    return borrados
+
+
+# =============================================================================
+# LECTURA
+# =============================================================================
+
+def obtener_snapshots(empresas_queryset):
+    """
+    Snapshot más reciente de cada empresa (una consulta), aunque sea de días
+    anteriores. Nunca calcula en el request: las empresas sin ningún snapshot
+    quedan fuera (ver ``empresas_sin_snapshot``).
+
+    Returns:
+        list[SnapshotDecisionEmpresa] ordenada por nombre de empresa
+    """
+    from .models import SnapshotDecisionEmpresa
+
+    ultima_fecha = SnapshotDecisionEmpresa.objects.filter(
+        empresa=OuterRef('empresa')
+    ).order_by('-fecha').values('fecha')[:1]
+    snapshots = list(
+        SnapshotDecisionEmpresa.objects.filter(
+            empresa__in=empresas_queryset, fecha=Subquery(ultima_fecha)
+        ).select_related('empresa')
+    )
+    snapshots.sort(key=lambda s: s.empresa.nombre)
+    return snapshots
+
+
+def empresas_sin_snapshot(empresas_queryset, snapshots):
+    """
+    Nombres de las empresas que aún no tienen snapshot (p. ej. recién creadas).
+
+    No hace falta encolarlas: ``generar_snapshots_decision --incremental``
+    (cron horario en render.yaml) toma toda empresa sin snapshot del día.
+    """
+    pendientes = empresas_queryset.exclude(id__in=[s.empresa_id for s in snapshots])
+    return list(pendientes.order_by('nombre').values_list('nombre', flat=True))
+
+
+def _porcentaje(parte, total, vacio=0):
+    return round((parte / total) * 100, 1) if total > 0 else vacio
+
+
+def _items_criticos(snapshots, today):
+    """Reclasifica las actividades críticas guardadas respecto a ``today``."""
+    limite_urgente = today + timedelta(days=DIAS_URGENTE)
+    vencidos = []
+    urgentes = []
+    for snapshot in snapshots:
+        for item in _desde_json(snapshot.detalle.get('criticas', [])):
+            item['empresa'] = snapshot.empresa.nombre
+            if item['fecha'] < today:
+                item['dias_atraso'] = (today - item['fecha']).days
+                vencidos.append(item)
+            elif item['fecha'] <= limite_urgente:
+                item['dias_restantes'] = (item['fecha'] - today).days
+                urgentes.append(item)
+    vencidos.sort(key=lambda x: x['dias_atraso'], reverse=True)
+    urgentes.sort(key=lambda x: x['dias_restantes'])
+    return vencidos, urgentes
+
+
+def _alertas_agregadas(snapshots):
+    alertas = {'vencidas': [], 'criticas': [], 'riesgo_alto': []}
+    for snapshot in snapshots:
+        for categoria, lista in _desde_json(snapshot.detalle.get('alertas', {})).items():
+            alertas[categoria].extend(lista)
+    return {'alertas': alertas, 'total_alertas': sum(s.total_alertas for s in snapshots)}
+
+
+def _roi_agregado(snapshots):
+    total_preventivos = sum(s.count_preventivos for s in snapshots)
+    total_correctivos = sum(s.count_correctivos for s in snapshots)
+    costo_preventivos_total = sum((s.costo_preventivos for s in snapshots), Decimal('0'))
+    costo_correctivos_total = sum((s.costo_correctivos for s in snapshots), Decimal('0'))
+
+    # Calcular ROI agregado
+    if costo_preventivos_total > 0:
+        roi_porcentaje = round(((costo_correctivos_total - costo_preventivos_total) / costo_preventivos_total) * 100, 1)
+        ahorro_total = costo_correctivos_total - costo_preventivos_total
+    else:
+        roi_porcentaje = 0
+        ahorro_total = 0
+
+    # Calcular ratio preventivo
+    total_mantenimientos = total_preventivos + total_correctivos
+    ratio_preventivo = round((total_preventivos / total_mantenimientos * 100), 1) if total_mantenimientos > 0 else 0
+
+    # Evaluación del ratio
+    if ratio_preventivo >= 80:
+        evaluacion_ratio = 'EXCELENTE'
+    elif ratio_preventivo >= 65:
+        evaluacion_ratio = 'BUENO'
+    elif ratio_preventivo >= 50:
+        evaluacion_ratio = 'REGULAR'
+    else:
+        evaluacion_ratio = 'DEFICIENTE'
+
+    return {
+        'roi_porcentaje': roi_porcentaje,
+        'ahorro_total': ahorro_total,
+        'count_preventivos': total_preventivos,
+        'count_correctivos': total_correctivos,
+        'costo_preventivos': costo_preventivos_total,
+        'costo_correctivos': costo_correctivos_total,
+        'costo_promedio_preventivo': (
+            round(costo_preventivos_total / total_preventivos, 2) if total_preventivos > 0 else 0
+        ),
+        'costo_promedio_correctivo': (
+            round(costo_correctivos_total / total_correctivos, 2) if total_correctivos > 0 else 0
+        ),
+        'ratio_preventivo': ratio_preventivo,
+        'evaluacion_ratio': evaluacion_ratio,
+        'interpretacion_roi': (
+            'Excelente retorno' if roi_porcentaje > 100
+            else 'Buen retorno' if roi_porcentaje > 50
+            else 'Revisar estrategia'
+        ),
+    }
+
+
+def _tendencias_agregadas(snapshots):
+    por_mes = defaultdict(lambda: {'gasto_total': 0, 'actividades': 0})
+    for snapshot in snapshots:
+        for mes_data in snapshot.detalle.get('datos_mensuales', []):
+            por_mes[mes_data['mes']]['gasto_total'] += mes_data['gasto_total']
+            por_mes[mes_data['mes']]['actividades'] += mes_data['actividades']
+
+    datos_mensuales = [
+        {
+            'mes': mes, 'nombre_mes': calendar.month_name[mes][:3],
+            'gasto_total': data['gasto_total'], 'actividades': data['actividades'],
+        }
+        for mes, data in sorted(por_mes.items())
+    ]
+
+    # Calcular promedios y tendencias
+    gastos = [d['gasto_total'] for d in datos_mensuales if d['gasto_total'] > 0]
+    promedio_mensual = sum(gastos) / len(gastos) if gastos else 0
+
+    # Mes más caro y más barato
+    mes_mas_caro = max(datos_mensuales, key=lambda x: x['gasto_total']) if datos_mensuales else None
+    datos_con_gasto = [d for d in datos_mensuales if d['gasto_total'] > 0]
+    mes_mas_barato = min(datos_con_gasto, key=lambda x: x['gasto_total']) if datos_con_gasto else None
+
+    # Calcular tendencia (últimos 3 meses vs promedio)
+    if len(gastos) >= 3:
+        promedio_ultimos_3 = sum(gastos[-3:]) / 3
+        tendencia_porcentaje = (
+            round(((promedio_ultimos_3 - promedio_mensual) / promedio_mensual) * 100, 1) if promedio_mensual > 0 else 0
+        )
+        if tendencia_porcentaje > 10:
+            tendencia_direccion = 'ASCENDENTE'
+        elif tendencia_porcentaje < -10:
+            tendencia_direccion = 'DESCENDENTE'
+        else:
+            tendencia_direccion = 'ESTABLE'
+    else:
+        tendencia_porcentaje = 0
+        tendencia_direccion = 'ESTABLE'
+
+    return {
+        'datos_mensuales': datos_mensuales,
+        'promedio_mensual': promedio_mensual,
+        'mes_mas_caro': mes_mas_caro,
+        'mes_mas_barato': mes_mas_barato,
+        'meses_con_datos': len(gastos),
+        'tendencia_porcentaje': tendencia_porcentaje,
+        'tendencia_direccion': tendencia_direccion
+    }
+
+
+def _compliance_agregado(snapshots):
+    total_equipos = sum(s.iso_total_equipos for s in snapshots)
+    equipos_conformes = sum(s.iso_equipos_conformes for s in snapshots)
+    no_conformidades = []
+    for snapshot in snapshots:
+        no_conformidades.extend(snapshot.detalle.get('no_conformidades', []))
+
+    score_iso9001 = _porcentaje(equipos_conformes, total_equipos)
+
+    # Evaluación
+    if score_iso9001 >= 90:
+        evaluacion = 'EXCELENTE'
+    elif score_iso9001 >= 75:
+        evaluacion = 'BUENO'
+    elif score_iso9001 >= 60:
+        evaluacion = 'REGULAR'
+    else:
+        evaluacion = 'DEFICIENTE'
+
+    return {
+        'score_iso9001': score_iso9001,
+        'evaluacion': evaluacion,
+        'total_equipos': total_equipos,
+        'equipos_conformes': equipos_conformes,
+        'equipos_riesgo': sum(s.iso_equipos_riesgo for s in snapshots),
+        'equipos_no_conformes': sum(s.iso_equipos_no_conformes for s in snapshots),
+        'no_conformidades': no_conformidades[:10]  # Limitar a 10 para no sobrecargar
+    }
+
+
+def _optimizacion_agregada(snapshots):
+    oportunidades = []
+    equipos_problematicos = []
+    for snapshot in snapshots:
+        oportunidades.extend(_desde_json(snapshot.detalle.get('oportunidades_optimizacion', [])))
+        equipos_problematicos.extend(snapshot.detalle.get('equipos_problematicos', []))
+
+    # Ordenar por ahorro (oportunidades) y por nivel de problema (equipos)
+    oportunidades.sort(key=lambda x: x.get('ahorro_estimado', 0), reverse=True)
+    equipos_problematicos.sort(key=lambda x: x.get('cantidad_correctivos', 0), reverse=True)
+
+    return {
+        'oportunidades_optimizacion': oportunidades[:10],  # Top 10
+        'equipos_problematicos': equipos_problematicos[:10],  # Top 10
+        'ahorro_total_cronograma': sum((s.ahorro_cronograma for s in snapshots), Decimal('0'))
+    }
+
+
+def agregar_snapshots(snapshots, today=None):
+    """
+    Consolida los snapshots de varias empresas para la vista SAM.
+
+    Returns:
+        dict con totales de los 3 pilares, financieros, inteligencia empresarial,
+        actividades críticas, detalle por empresa y frescura de los datos.
+    """
+    today = today or date.today()
+
+    equipos_saludables = sum(s.equipos_saludables for s in snapshots)
+    equipos_criticos = sum(s.equipos_criticos for s in snapshots)
+    total_equipos_salud = sum(s.total_equipos_salud for s in snapshots)
+    actividades_realizadas = sum(s.actividades_realizadas for s in snapshots)
+    actividades_programadas = sum(s.actividades_programadas for s in snapshots)
+    equipos_disponibles = sum(s.equipos_disponibles for s in snapshots)
+    equipos_no_disponibles = sum(s.equipos_no_disponibles for s in snapshots)
+
+    items_vencidos, items_urgentes = _items_criticos(snapshots, today)
+    calculados = [s.calculado_en for s in snapshots]
+
+    return {
+        'salud_agregada': {
+            'equipos_saludables': equipos_saludables,
+            'equipos_criticos': equipos_criticos,
+            'total_equipos_salud': total_equipos_salud,
+        },
+        'cumplimiento_agregado': {
+            'actividades_realizadas': actividades_realizadas,
+            'actividades_programadas': actividades_programadas,
+        },
+        'eficiencia_agregada': {
+            'equipos_disponibles': equipos_disponibles,
+            'equipos_no_disponibles': equipos_no_disponibles,
+        },
+        'salud_general_porcentaje': _porcentaje(equipos_saludables, total_equipos_salud),
+        'cumplimiento_general_porcentaje': _porcentaje(actividades_realizadas, actividades_programadas, vacio=100),
+        'eficiencia_general_porcentaje': _porcentaje(equipos_disponibles, equipos_disponibles + equipos_no_disponibles),
+        'ingresos_anuales': sum((s.ingresos_anuales for s in snapshots), Decimal('0')),
+        'costos_totales': sum((s.costos_totales for s in snapshots), Decimal('0')),
+        'metricas_por_empresa': [
+            {
+                'empresa': s.empresa,
+                'salud_porcentaje': s.salud_porcentaje,
+                'salud_estado': s.salud_estado,
+                'cumplimiento_porcentaje': s.cumplimiento_porcentaje,
+                'cumplimiento_estado': s.cumplimiento_estado,
+                'eficiencia_porcentaje': s.eficiencia_porcentaje,
+                'eficiencia_estado': s.eficiencia_estado,
+                'total_equipos': s.total_equipos_salud,
+                'calculado_en': s.calculado_en,
+            }
+            for s in snapshots
+        ],
+        'alertas_predictivas': _alertas_agregadas(snapshots),
+        'roi_rentabilidad': _roi_agregado(snapshots),
+        'tendencias_historicas': _tendencias_agregadas(snapshots),
+        'compliance_iso9001': _compliance_agregado(snapshots),
+        'optimizacion_cronogramas': _optimizacion_agregada(snapshots),
+        'items_vencidos': items_vencidos,
+        'items_urgentes': items_urgentes,
+        'snapshots_desde': min(calculados) if calculados else None,
+        'snapshots_hasta': max(calculados) if calculados else None,
+    }
+
+
+def historial_diario(empresas_queryset, today=None, dias=None):
+    """
+    Evolución diaria de los 3 pilares consolidados (una consulta agregada).
+
+    Returns:
+        list[dict]: [{'fecha', 'empresas', 'salud', 'cumplimiento', 'eficiencia'}, ...]
+    """
+    from .models import SnapshotDecisionEmpresa
+
+    today = today or date.today()
+    dias = dias if dias is not None else dias_tendencia()
+    filas = (
+        SnapshotDecisionEmpresa.objects
+        .filter(empresa__in=empresas_queryset, fecha__gt=today - timedelta(days=dias))
+        .values('fecha')
+        .annotate(
+            empresas=Count('id'),
+            saludables=Sum('equipos_saludables'),
+            total_salud=Sum('total_equipos_salud'),
+            realizadas=Sum('actividades_realizadas'),
+            programadas=Sum('actividades_programadas'),
+            disponibles=Sum('equipos_disponibles'),
+            no_disponibles=Sum('equipos_no_disponibles'),
+        )
+        .order_by('fecha')
+    )
+    return [
+        {
+            'fecha': fila['fecha'],
+            'empresas': fila['empresas'],
+            'salud': _porcentaje(fila['saludables'], fila['total_salud']),
+            'cumplimiento': _porcentaje(fila['realizadas'], fila['programadas'], vacio=100),
+            'eficiencia': _porcentaje(fila['disponibles'], fila['disponibles'] + fila['no_disponibles']),
+        }
+        for fila in filas
+    ]
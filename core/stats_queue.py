@@ -0,0 +1,185 @@
+# core/stats_queue.py
+# Cola de empresas con stats del dashboard pendientes de recalcular
+
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger('core')
+
+DEFAULT_DEBOUNCE_SECONDS = 15
+
+_local = threading.local()
+
+
+def _config():
+    return getattr(settings, 'STATS_RECALC_CONFIG', {})
+
+
+def modo_diferido():
+    """True si las señales deben encolar la empresa en lugar de recalcular."""
+    return bool(_config().get('DIFERIDO', False))
+
+
+def debounce_seconds():
+    return int(_config().get('DEBOUNCE_SECONDS', DEFAULT_DEBOUNCE_SECONDS))
+
+
+def _marcar_en_bd(empresa_ids):
+    """
+    Marca las empresas como pendientes (1 UPDATE para todo el lote).
+
+    Solo se escribe el timestamp si la empresa no estaba ya pendiente, de modo
+    que la ventana de debounce corre desde la primera invalidación y la
+    latencia máxima queda acotada aunque lleguen cambios continuamente.
+    """
+    from core.models import Empresa
+
+    if not empresa_ids:
+        return 0
+    return Empresa.objects.filter(
+        id__in=list(empresa_ids), stats_pendiente_desde__isnull=True
+    ).update(stats_pendiente_desde=timezone.now())
+
+
+class _FlushPendientes:
+    """Callback on_commit que marca en BD las empresas de la transacción."""
+
+    def __init__(self):
+        self.empresa_ids = set()
+
+    def __call__(self):
+        ids, self.empresa_ids = self.empresa_ids, set()
+        try:
+            _marcar_en_bd(ids)
+        except Exception as e:
+            logger.error(f"Error encolando recálculo de stats para empresas {sorted(ids)}: {e}")
+
+
+def _flush_de_transaccion_actual():
+    """
+    Devuelve el callback on_commit de la transacción en curso, creándolo si
+    hace falta. Si la transacción anterior hizo rollback, su callback ya no
+    está en ``connection.run_on_commit`` y se registra uno nuevo.
+    """
+    flush = getattr(_local, 'flush', None)
+    if flush is not None and any(cb is flush for _, cb, _ in connection.run_on_commit):
+        return flush
+    flush = _FlushPendientes()
+    _local.flush = flush
+    transaction.on_commit(flush)
+    return flush
+
+
+def _recalcular_empresa(empresa):
+    try:
+        empresa.recalcular_stats_dashboard()
+    except Exception as e:
+        logger.error(f"Error recalculando stats de empresa '{empresa.nombre}': {e}")
+
+
+def solicitar_recalculo_stats(empresa):
+    """
+    Punto de entrada de las señales: pide refrescar las stats de ``empresa``.
+
+    Según el contexto, acumula el id (bloque ``diferir_recalculo_stats``),
+    lo encola para el worker (modo diferido) o recalcula de inmediato.
+    """
+    if empresa is None:
+        return
+
+    pendientes = getattr(_local, 'pendientes', None)
+    if pendientes is not None:
+        pendientes.setdefault(empresa.id, empresa)
+        return
+
+    if modo_diferido():
+        if connection.in_atomic_block:
+            _flush_de_transaccion_actual().empresa_ids.add(empresa.id)
+        else:
+            try:
+                _marcar_en_bd([empresa.id])
+            except Exception as e:
+                logger.error(f"Error encolando recálculo de stats de empresa '{empresa.nombre}': {e}")
+        return
+
+    _recalcular_empresa(empresa)
+
+
+@contextmanager
+def diferir_recalculo_stats():
+    """
+    Agrupa las solicitudes de recálculo emitidas dentro del bloque y, al salir,
+    procesa cada empresa una sola vez (recálculo inmediato o encolado según el
+    modo). Los bloques anidados se integran en el más externo.
+
+    Uso:
+        with diferir_recalculo_stats():
+            for fila in filas:
+                Equipo.objects.create(...)
+    """
+    if getattr(_local, 'pendientes', None) is not None:
+        yield
+        return
+
+    _local.pendientes = {}
+    try:
+        yield
+    finally:
+        empresas = list(_local.pendientes.values())
+        _local.pendientes = None
+        for empresa in empresas:
+            solicitar_recalculo_stats(empresa)
+
+
+def procesar_empresas_pendientes(debounce=None, limite=None):
+    """
+    Recalcula las empresas marcadas cuya ventana de debounce ya venció.
+
+    Cada empresa se reclama con un UPDATE condicional sobre el timestamp leído,
+    así varios workers pueden correr a la vez sin recalcular dos veces la misma
+    empresa, y una invalidación que llegue durante el recálculo vuelve a
+    marcarla para la siguiente pasada.
+
+    Returns:
+        dict: {'procesadas': N, 'errores': N}
+    """
+    from core.models import Empresa
+
+    if debounce is None:
+        debounce = debounce_seconds()
+
+    corte = timezone.now() - timedelta(seconds=debounce)
+    candidatas = (
+        Empresa.objects
+        .filter(stats_pendiente_desde__isnull=False, stats_pendiente_desde__lte=corte)
+        .order_by('stats_pendiente_desde')
+        .values_list('id', 'stats_pendiente_desde')
+    )
+    if limite:
+        candidatas = candidatas[:limite]
+
+    procesadas = 0
+    errores = 0
+    for empresa_id, marcada_en in list(candidatas):
+        reclamada = Empresa.objects.filter(
+            id=empresa_id, stats_pendiente_desde=marcada_en
+        ).update(stats_pendiente_desde=None)
+        if not reclamada:
+            continue
+
+        try:
+            Empresa.objects.get(id=empresa_id).recalcular_stats_dashboard()
+            procesadas += 1
+        except Exception as e:
+            errores += 1
+            logger.error(f"Error recalculando stats pendientes de empresa {empresa_id}: {e}")
+            # Re-encolar para reintentar en la siguiente pasada
+            _marcar_en_bd([empresa_id])
+
+    return {'procesadas': procesadas, 'errores': errores}
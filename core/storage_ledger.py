@@ -0,0 +1,233 @@
+# core/storage_ledger.py
+# Ledger persistente de tamaños de archivo por empresa
+
+import logging
+import os
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+logger = logging.getLogger('core')
+
+
+def _campos_archivo(model):
+    """Nombres de los FileField/ImageField de un modelo."""
+    from django.db.models import FileField
+
+    return [f.name for f in model._meta.get_fields() if isinstance(f, FileField)]
+
+
+def _nombre(archivo):
+    if not archivo:
+        return None
+    return getattr(archivo, 'name', archivo) or None
+
+
+def rutas_referenciadas(empresa):
+    """
+    Devuelve el conjunto de rutas de archivo referenciadas por la empresa
+    (logo, equipos, calibraciones, mantenimientos y comprobaciones).
+
+    Una consulta ``values_list`` por modelo; no toca el storage.
+    """
+    from core.models import Equipo, Calibracion, Mantenimiento, Comprobacion
+
+    rutas = set()
+    if empresa.logo_empresa:
+        rutas.add(empresa.logo_empresa.name)
+
+    fuentes = [
+        (Equipo, {'empresa': empresa}),
+        (Calibracion, {'equipo__empresa': empresa}),
+        (Mantenimiento, {'equipo__empresa': empresa}),
+        (Comprobacion, {'equipo__empresa': empresa}),
+    ]
+    for model, filtro in fuentes:
+        campos = _campos_archivo(model)
+        for fila in model.objects.filter(**filtro).values_list(*campos):
+            rutas.update(r for r in fila if r)
+    return rutas
+
+
+def registrar_archivo(empresa, ruta, tamaño_bytes):
+    """
+    Registra (o actualiza) el tamaño de un archivo subido por la empresa.
+
+    Nunca lanza excepción: un fallo del ledger no debe romper la subida, la
+    deriva se corrige con ``reconciliar_almacenamiento``.
+    """
+    from core.models import RegistroAlmacenamiento
+
+    ruta = _nombre(ruta)
+    if empresa is None or not ruta:
+        return
+    try:
+        RegistroAlmacenamiento.objects.update_or_create(
+            empresa=empresa, ruta=ruta,
+            defaults={'tamaño_bytes': int(tamaño_bytes or 0)},
+        )
+        empresa.invalidate_storage_cache()
+    except Exception as e:
+        logger.warning(f"No se pudo registrar '{ruta}' en el ledger de almacenamiento: {e}")
+
+
+def eliminar_registros(empresa, rutas):
+    """Elimina del ledger las rutas indicadas (1 DELETE para todo el lote)."""
+    from core.models import RegistroAlmacenamiento
+
+    rutas = [r for r in (_nombre(r) for r in rutas) if r]
+    if empresa is None or not rutas:
+        return
+    try:
+        RegistroAlmacenamiento.objects.filter(empresa=empresa, ruta__in=rutas).delete()
+        empresa.invalidate_storage_cache()
+    except Exception as e:
+        logger.warning(f"No se pudieron eliminar rutas del ledger de almacenamiento: {e}")
+
+
+def reemplazar_archivo(empresa, anterior, ruta, tamaño_bytes):
+    """Registra ``ruta`` y quita del ledger ``anterior`` si era otro archivo."""
+    anterior = _nombre(anterior)
+    if anterior and anterior != _nombre(ruta):
+        eliminar_registros(empresa, [anterior])
+    registrar_archivo(empresa, ruta, tamaño_bytes)
+
+
+def guardar_archivo_generado(instance, campo, filename, contenido, save=False):
+    """
+    Guarda los bytes de un PDF generado en el FileField ``campo`` de una
+    actividad y lo registra en el ledger con el nombre asignado por el
+    storage, quitando el archivo que reemplaza.
+    """
+    from django.core.files.base import ContentFile
+
+    archivo = getattr(instance, campo)
+    anterior = archivo.name
+    archivo.save(filename, ContentFile(contenido), save=save)
+    reemplazar_archivo(instance.equipo.empresa, anterior, archivo.name, len(contenido))
+
+
+def eliminar_registros_de_instancia(empresa, instance):
+    """Quita del ledger todos los archivos referenciados por ``instance``."""
+    rutas = [_nombre(getattr(instance, campo, None)) for campo in _campos_archivo(type(instance))]
+    eliminar_registros(empresa, rutas)
+
+
+def uso_total_bytes(empresa):
+    """Uso total de la empresa según el ledger (un SUM indexado)."""
+    from core.models import RegistroAlmacenamiento
+
+    return RegistroAlmacenamiento.objects.filter(empresa=empresa).aggregate(
+        total=Sum('tamaño_bytes')
+    )['total'] or 0
+
+
+# =============================================================================
+# RECONCILIACIÓN
+# =============================================================================
+
+def _listar_s3(storage, prefijos):
+    """Lista tamaños con list_objects_v2 paginado (hasta 1000 objetos por llamada)."""
+    location = (getattr(storage, 'location', '') or '').strip('/')
+    tamaños = {}
+    for prefijo in prefijos:
+        prefijo_completo = f"{location}/{prefijo}" if location else prefijo
+        for obj in storage.bucket.objects.filter(Prefix=prefijo_completo):
+            clave = obj.key
+            if location and clave.startswith(location + '/'):
+                clave = clave[len(location) + 1:]
+            tamaños[clave] = obj.size
+    return tamaños
+
+
+def _listar_local(storage, prefijos):
+    """Recorre el storage local con listdir (sin costo de red)."""
+    tamaños = {}
+
+    def _walk(directorio):
+        try:
+            subdirs, archivos = storage.listdir(directorio)
+        except (FileNotFoundError, NotImplementedError, OSError):
+            return
+        for nombre in archivos:
+            ruta = f"{directorio}/{nombre}" if directorio else nombre
+            try:
+                tamaños[ruta] = storage.size(ruta)
+            except Exception:
+                pass
+        for sub in subdirs:
+            _walk(f"{directorio}/{sub}" if directorio else sub)
+
+    for prefijo in prefijos:
+        _walk(prefijo.rstrip('/'))
+    return tamaños
+
+
+def listar_tamaños(prefijos, storage=None):
+    """
+    Devuelve ``{ruta: tamaño_bytes}`` para todos los objetos bajo ``prefijos``
+    usando llamadas de listado en bloque.
+    """
+    storage = storage or default_storage
+    prefijos = sorted(set(prefijos))
+    if hasattr(storage, 'bucket'):
+        return _listar_s3(storage, prefijos)
+    return _listar_local(storage, prefijos)
+
+
+def _prefijo(ruta):
+    directorio = os.path.dirname(ruta)
+    return (directorio.split('/')[0] + '/') if directorio else ''
+
+
+def reconciliar_almacenamiento(empresas, storage=None, dry_run=False):
+    """
+    Reconstruye el ledger de las empresas indicadas a partir del storage real.
+
+    Lista una sola vez los prefijos de primer nivel usados por todas las rutas
+    referenciadas y cruza el resultado en memoria. Las rutas referenciadas que
+    ya no existen en el storage se excluyen del ledger.
+
+    Returns:
+        list[dict]: por empresa, {'empresa', 'archivos', 'faltantes',
+        'bytes_anterior', 'bytes_nuevo'}
+    """
+    from core.models import RegistroAlmacenamiento
+
+    empresas = list(empresas)
+    rutas_por_empresa = {e.id: rutas_referenciadas(e) for e in empresas}
+    prefijos = {_prefijo(r) for rutas in rutas_por_empresa.values() for r in rutas}
+    tamaños = listar_tamaños(prefijos, storage=storage) if prefijos else {}
+
+    resultados = []
+    for empresa in empresas:
+        rutas = rutas_por_empresa[empresa.id]
+        existentes = {r: tamaños[r] for r in rutas if r in tamaños}
+        resultado = {
+            'empresa': empresa,
+            'archivos': len(existentes),
+            'faltantes': len(rutas) - len(existentes),
+            'bytes_anterior': uso_total_bytes(empresa),
+            'bytes_nuevo': sum(existentes.values()),
+        }
+        resultados.append(resultado)
+
+        if dry_run:
+            continue
+
+        with transaction.atomic():
+            RegistroAlmacenamiento.objects.filter(empresa=empresa).delete()
+            RegistroAlmacenamiento.objects.bulk_create(
+                [
+                    RegistroAlmacenamiento(empresa=empresa, ruta=ruta, tamaño_bytes=tamaño)
+                    for ruta, tamaño in existentes.items()
+                ],
+                batch_size=1000,
+            )
+            empresa.storage_ledger_sincronizado = timezone.now()
+            empresa.save(update_fields=['storage_ledger_sincronizado'])
+        empresa.invalidate_storage_cache()
+
+    return resultados
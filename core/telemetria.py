@@ -0,0 +1,333 @@
+# core/telemetria.py
+# Telemetría persistente por vista: histogramas de latencia, consultas SQL y peticiones lentas
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger('core')
+
+# Límites superiores (ms) de los buckets del histograma; el último bucket es "> 10 s"
+LIMITES_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+DEFAULT_INTERVALO_SEGUNDOS = 300
+DEFAULT_VOLCADO_SEGUNDOS = 60
+DEFAULT_UMBRAL_LENTO_MS = 1500
+DEFAULT_MAX_LENTAS_POR_INTERVALO = 20
+DEFAULT_MAX_CONSULTAS_MUESTRA = 50
+DEFAULT_RETENCION_DIAS = 30
+
+_lock = threading.Lock()
+_buffer = {}  # (intervalo, vista, empresa_id) -> agregado
+_lentas = {}  # intervalo -> muestras lentas guardadas por este proceso
+_ultimo_volcado = time.monotonic()
+
+
+def _config():
+    return getattr(settings, 'TELEMETRIA_CONFIG', {})
+
+
+def activa():
+    return bool(_config().get('ACTIVO', True))
+
+
+def _bucket(duracion_ms):
+    for indice, limite in enumerate(LIMITES_MS):
+        if duracion_ms <= limite:
+            return indice
+    return len(LIMITES_MS)
+
+
+def _inicio_intervalo(momento):
+    segundos = int(_config().get('INTERVALO_SEGUNDOS', DEFAULT_INTERVALO_SEGUNDOS))
+    return momento - timedelta(seconds=int(momento.timestamp()) % segundos, microseconds=momento.microsecond)
+
+
+class _ContadorConsultas:
+    """``execute_wrapper`` que cuenta y cronometra las consultas de la petición."""
+
+    def __init__(self, max_muestra):
+        self.total = 0
+        self.ms = 0.0
+        self.muestra = []
+        self.max_muestra = max_muestra
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            self.total += 1
+            self.ms += ms
+            if len(self.muestra) < self.max_muestra:
+                self.muestra.append({'sql': sql[:2000], 'ms': round(ms, 2)})
+
+
+def _nombre_vista(request, func):
+    match = getattr(request, 'resolver_match', None)
+    if match is not None and match.view_name:
+        return match.view_name
+    return f"{func.__module__}.{func.__name__}"
+
+
+def _empresa_id(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return getattr(user, 'empresa_id', None)
+    return None
+
+
+def _tamano_respuesta(respuesta):
+    if respuesta is None or getattr(respuesta, 'streaming', False):
+        return 0
+    try:
+        return len(respuesta.content)
+    except Exception:
+        return 0
+
+
+def medir(func, request, args, kwargs):
+    """Ejecuta la vista ``func`` registrando su telemetría."""
+    contador = _ContadorConsultas(int(_config().get('MAX_CONSULTAS_MUESTRA', DEFAULT_MAX_CONSULTAS_MUESTRA)))
+    respuesta = None
+    inicio = time.perf_counter()
+    try:
+        with connection.execute_wrapper(contador):
+            respuesta = func(request, *args, **kwargs)
+        return respuesta
+    finally:
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        try:
+            registrar(
+                vista=_nombre_vista(request, func),
+                empresa_id=_empresa_id(request),
+                duracion_ms=duracion_ms,
+                estado_http=getattr(respuesta, 'status_code', 500),
+                consultas=contador,
+                bytes_respuesta=_tamano_respuesta(respuesta),
+                request=request,
+            )
+        except Exception as e:
+            logger.warning(f'Telemetría: no se pudo registrar la petición ({e})')
+
+
+def registrar(vista, empresa_id, duracion_ms, estado_http, consultas, bytes_respuesta=0, request=None, ahora=None):
+    """Acumula una petición en el intervalo actual y vuelca si corresponde."""
+    ahora = ahora or timezone.now()
+    intervalo = _inicio_intervalo(ahora)
+    clave = (intervalo, vista, empresa_id)
+    es_error = estado_http >= 500
+
+    guardar_lenta = False
+    with _lock:
+        agregado = _buffer.get(clave)
+        if agregado is None:
+            agregado = _buffer[clave] = {
+                'peticiones': 0, 'errores': 0, 'duracion_total_ms': 0.0, 'duracion_max_ms': 0.0,
+                'histograma': [0] * (len(LIMITES_MS) + 1), 'consultas': 0, 'consultas_ms': 0.0,
+                'bytes_respuesta': 0,
+            }
+        agregado['peticiones'] += 1
+        agregado['errores'] += int(es_error)
+        agregado['duracion_total_ms'] += duracion_ms
+        agregado['duracion_max_ms'] = max(agregado['duracion_max_ms'], duracion_ms)
+        agregado['histograma'][_bucket(duracion_ms)] += 1
+        agregado['consultas'] += consultas.total
+        agregado['consultas_ms'] += consultas.ms
+        agregado['bytes_respuesta'] += bytes_respuesta
+
+        if duracion_ms >= float(_config().get('UMBRAL_LENTO_MS', DEFAULT_UMBRAL_LENTO_MS)):
+            maximo = int(_config().get('MAX_LENTAS_POR_INTERVALO', DEFAULT_MAX_LENTAS_POR_INTERVALO))
+            if intervalo not in _lentas:
+                _lentas.clear()  # solo importa el intervalo actual
+                _lentas[intervalo] = 0
+            if _lentas[intervalo] < maximo:
+                _lentas[intervalo] += 1
+                guardar_lenta = True
+
+        volcar_ahora = time.monotonic() - _ultimo_volcado >= float(
+            _config().get('VOLCADO_SEGUNDOS', DEFAULT_VOLCADO_SEGUNDOS)
+        )
+
+    if guardar_lenta:
+        _guardar_lenta(vista, empresa_id, duracion_ms, estado_http, consultas, request, ahora)
+    if volcar_ahora:
+        volcar()
+
+
+def _guardar_lenta(vista, empresa_id, duracion_ms, estado_http, consultas, request, ahora):
+    from .models import PeticionLenta
+
+    PeticionLenta.objects.create(
+        fecha=ahora, vista=vista[:200], empresa_id=empresa_id,
+        ruta=(getattr(request, 'path', '') or '')[:500], metodo=getattr(request, 'method', '') or '',
+        estado_http=estado_http, duracion_ms=round(duracion_ms, 2),
+        num_consultas=consultas.total, consultas_ms=round(consultas.ms, 2), consultas=consultas.muestra,
+    )
+
+
+def volcar():
+    """
+    Escribe los agregados pendientes de este proceso en ``TelemetriaVista``.
+
+    Returns:
+        int: filas creadas
+    """
+    global _buffer, _ultimo_volcado
+    from .models import TelemetriaVista
+
+    with _lock:
+        pendientes, _buffer = _buffer, {}
+        _ultimo_volcado = time.monotonic()
+    if not pendientes:
+        return 0
+
+    filas = [
+        TelemetriaVista(intervalo=intervalo, vista=vista[:200], empresa_id=empresa_id, **agregado)
+        for (intervalo, vista, empresa_id), agregado in pendientes.items()
+    ]
+    try:
+        TelemetriaVista.objects.bulk_create(filas, batch_size=500)
+    except Exception as e:
+        logger.warning(f'Telemetría: se descartan {len(filas)} agregados ({e})')
+        return 0
+    return len(filas)
+
+
+# =============================================================================
+# CONSULTAS
+# =============================================================================
+
+def percentil(histograma, p, maximo_ms=None):
+    """
+    Percentil ``p`` (0-100) estimado desde el histograma, interpolando dentro
+    del bucket. Para el bucket abierto (> último límite) usa ``maximo_ms``.
+    """
+    total = sum(histograma)
+    if not total:
+        return None
+    objetivo = total * p / 100
+    acumulado = 0
+    for indice, cantidad in enumerate(histograma):
+        if cantidad and acumulado + cantidad >= objetivo:
+            inferior = LIMITES_MS[indice - 1] if indice > 0 else 0
+            if indice < len(LIMITES_MS):
+                superior = LIMITES_MS[indice]
+            else:
+                superior = max(maximo_ms or inferior, inferior)
+            if maximo_ms is not None:
+                superior = min(superior, max(maximo_ms, inferior))
+            return round(inferior + (superior - inferior) * (objetivo - acumulado) / cantidad, 1)
+        acumulado += cantidad
+    return float(LIMITES_MS[-1])
+
+
+def resumen_vistas(desde, hasta=None, vista=None, empresa_id=None):
+    """
+    Agrega la telemetría de [desde, hasta) por vista.
+
+    Returns:
+        list[dict]: por vista, ordenado por p95 descendente.
+    """
+    from .models import TelemetriaVista
+
+    filas = TelemetriaVista.objects.filter(intervalo__gte=desde)
+    if hasta is not None:
+        filas = filas.filter(intervalo__lt=hasta)
+    if vista is not None:
+        filas = filas.filter(vista=vista)
+    if empresa_id is not None:
+        filas = filas.filter(empresa_id=empresa_id)
+
+    por_vista = {}
+    for fila in filas.values(
+        'vista', 'peticiones', 'errores', 'duracion_total_ms', 'duracion_max_ms', 'histograma',
+        'consultas', 'consultas_ms', 'bytes_respuesta',
+    ).iterator(chunk_size=2000):
+        total = por_vista.get(fila['vista'])
+        if total is None:
+            total = por_vista[fila['vista']] = {
+                'peticiones': 0, 'errores': 0, 'duracion_total_ms': 0.0, 'duracion_max_ms': 0.0,
+                'histograma': [0] * (len(LIMITES_MS) + 1), 'consultas': 0, 'consultas_ms': 0.0,
+                'bytes_respuesta': 0,
+            }
+        for campo in ('peticiones', 'errores', 'duracion_total_ms', 'consultas', 'consultas_ms', 'bytes_respuesta'):
+            total[campo] += fila[campo]
+        total['duracion_max_ms'] = max(total['duracion_max_ms'], fila['duracion_max_ms'])
+        for indice, cantidad in enumerate(fila['histograma'][:len(total['histograma'])]):
+            total['histograma'][indice] += cantidad
+
+    resumen = []
+    for nombre, total in por_vista.items():
+        n = total['peticiones'] or 1
+        resumen.append({
+            'vista': nombre,
+            'peticiones': total['peticiones'],
+            'errores': total['errores'],
+            'tasa_error': round(total['errores'] * 100 / n, 2),
+            'p50_ms': percentil(total['histograma'], 50, total['duracion_max_ms']),
+            'p95_ms': percentil(total['histograma'], 95, total['duracion_max_ms']),
+            'p99_ms': percentil(total['histograma'], 99, total['duracion_max_ms']),
+            'promedio_ms': round(total['duracion_total_ms'] / n, 1),
+            'max_ms': round(total['duracion_max_ms'], 1),
+            'consultas_promedio': round(total['consultas'] / n, 1),
+            'consultas_ms_promedio': round(total['consultas_ms'] / n, 1),
+            'bytes_promedio': int(total['bytes_respuesta'] / n),
+        })
+    resumen.sort(key=lambda r: r['p95_ms'] or 0, reverse=True)
+    return resumen
+
+
+def regresiones(ahora=None, factor=1.5, minimo_peticiones=20):
+    """
+    Vistas cuyo p95 de las últimas 24 h supera ``factor`` veces el p95 de los
+    7 días anteriores (con al menos ``minimo_peticiones`` en ambos períodos).
+    """
+    ahora = ahora or timezone.now()
+    inicio_actual = ahora - timedelta(hours=24)
+    actual = {r['vista']: r for r in resumen_vistas(inicio_actual)}
+    referencia = {r['vista']: r for r in resumen_vistas(inicio_actual - timedelta(days=7), inicio_actual)}
+
+    encontradas = []
+    for nombre, hoy in actual.items():
+        antes = referencia.get(nombre)
+        if not antes or min(hoy['peticiones'], antes['peticiones']) < minimo_peticiones:
+            continue
+        if antes['p95_ms'] and hoy['p95_ms'] > antes['p95_ms'] * factor:
+            encontradas.append({
+                'vista': nombre,
+                'p95_ms': hoy['p95_ms'],
+                'p95_referencia_ms': antes['p95_ms'],
+                'variacion': round(hoy['p95_ms'] / antes['p95_ms'], 2),
+                'peticiones': hoy['peticiones'],
+            })
+    encontradas.sort(key=lambda r: r['variacion'], reverse=True)
+    return encontradas
+
+
+def tasa_errores(desde):
+    """Peticiones y errores 5xx registrados desde ``desde``."""
+    from django.db.models import Sum
+    from .models import TelemetriaVista
+
+    totales = TelemetriaVista.objects.filter(intervalo__gte=desde).aggregate(
+        peticiones=Sum('peticiones'), errores=Sum('errores')
+    )
+    return totales['peticiones'] or 0, totales['errores'] or 0
+
+
+def purgar(dias=None):
+    """Borra la telemetría y las muestras lentas anteriores a ``dias``."""
+    from .models import PeticionLenta, TelemetriaVista
+
+    dias = dias or int(_config().get('RETENCION_DIAS', DEFAULT_RETENCION_DIAS))
+    limite = timezone.now() - timedelta(days=dias)
+    borradas, _ = TelemetriaVista.objects.filter(intervalo__lt=limite).delete()
+    lentas, _ = PeticionLenta.objects.filter(fecha__lt=limite).delete()
+    return borradas, lentas
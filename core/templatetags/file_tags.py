@@ -6,6 +6,8 @@ from django.core.files.storage import default_storage
 from django.conf import settings
 import logging
 
+from ..urls_firmadas import url_firmada
+
 register = template.Library()
 logger = logging.getLogger('core')
 
@@ -24,12 +26,8 @@ def secure_file_url(file_field, expire_seconds=3600):
             storage_name = default_storage.__class__.__name__
 
             if 'S3' in storage_name or hasattr(default_storage, 'bucket'):
-                # Para S3 - generar URL firmada
-                try:
-                    return default_storage.url(file_field.name, expire=expire_seconds)
-                except TypeError:
-                    # Fallback si el storage no soporta expire
-                    return default_storage.url(file_field.name)
+                # Para S3 - URL firmada, reutilizada hasta poco antes de vencer
+                return url_firmada(file_field.name, expire_seconds, default_storage)
             else:
                 # Para almacenamiento local - usar URL normal (no soporta expire)
                 return file_field.url if hasattr(file_field, 'url') else default_storage.url(file_field.name)
@@ -38,6 +36,9 @@ def secure_file_url(file_field, expire_seconds=3600):
         logger.error(f"Error obteniendo URL de archivo: {str(e)}")
         return ''
 
+# También como filtro: {{ calibracion.documento_calibracion|secure_file_url }}
+register.filter('secure_file_url', secure_file_url)
+
 @register.simple_tag
 def empresa_logo_url(empresa, expire_seconds=3600):
     """
@@ -77,11 +78,7 @@ def pdf_image_url(file_field):
 
             if 'S3' in storage_name or hasattr(default_storage, 'bucket'):
                 # Para S3, usar URL con mayor tiempo de expiración para PDFs
-                try:
-                    url = default_storage.url(file_field.name, expire=7200)  # 2 horas
-                except TypeError:
-                    # Fallback si el storage no soporta expire
-                    url = default_storage.url(file_field.name)
+                url = url_firmada(file_field.name, 7200, default_storage)  # 2 horas
                 # Asegurar que sea URL absoluta
                 if url.startswith('//'):
                     url = 'https:' + url
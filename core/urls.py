@@ -106,6 +106,8 @@ urlpatterns = [
     path('calibracion/<int:calibracion_id>/rechazar-intervalos/', views.rechazar_intervalos, name='rechazar_intervalos'),
     path('comprobacion/<int:comprobacion_id>/aprobar/', views.aprobar_comprobacion, name='aprobar_comprobacion'),
     path('comprobacion/<int:comprobacion_id>/rechazar/', views.rechazar_comprobacion, name='rechazar_comprobacion'),
+    path('aprobaciones/aprobar-seleccionados/', views.aprobar_seleccionados, name='aprobar_seleccionados'),
+    path('aprobaciones/regeneraciones/estado/', views.estado_regeneraciones, name='estado_regeneraciones'),
 
     # Comprobación Metrológica
     path('equipos/<int:equipo_id>/comprobacion-metrologica/', views.comprobacion_metrologica_view, name='comprobacion_metrologica'),
@@ -268,6 +270,7 @@ urlpatterns = [
     path('api/scheduled/check-trials/', views.trigger_check_trials, name='trigger_check_trials'),
     path('api/scheduled/cleanup/notifications/', views.trigger_cleanup_notifications, name='trigger_cleanup_notifications'),
     path('api/scheduled/renovaciones/', views.trigger_cobrar_renovaciones, name='trigger_cobrar_renovaciones'),
+    path('api/scheduled/email/outbox/', views.trigger_email_outbox, name='trigger_email_outbox'),
 
     # ==============================================================================
     # SISTEMA DE PRÉSTAMOS DE EQUIPOS
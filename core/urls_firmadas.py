@@ -0,0 +1,148 @@
+# core/urls_firmadas.py
+# Caché de URLs firmadas de S3/R2 por archivo y expiración
+
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger('core')
+
+CACHE_PREFIX = 'urlfirmada:'
+DEFAULT_MARGEN = 300
+DEFAULT_MAX_MEMORIA = 5000
+
+# clave -> (url, vence_en)
+_memoria = {}
+_lock = threading.Lock()
+
+
+def _config():
+    return getattr(settings, 'URLS_FIRMADAS_CONFIG', {})
+
+
+def es_almacenamiento_firmado(storage=None):
+    """True si el storage genera URLs firmadas (S3/R2)."""
+    storage = storage or default_storage
+    return 'S3' in storage.__class__.__name__ or hasattr(storage, 'bucket')
+
+
+def _nombre(archivo):
+    if not archivo:
+        return None
+    return getattr(archivo, 'name', archivo) or None
+
+
+def _clave(storage, nombre, expire):
+    # El bucket y el prefijo forman parte de la URL firmada
+    origen = f"{storage.__class__.__name__}:{getattr(storage, 'bucket_name', '')}:{getattr(storage, 'location', '')}"
+    resumen = hashlib.md5(f"{origen}:{nombre}".encode('utf-8'), usedforsecurity=False).hexdigest()
+    return f"{CACHE_PREFIX}{expire}:{resumen}"
+
+
+def _firmar(storage, nombre, expire):
+    try:
+        return storage.url(nombre, expire=expire)
+    except TypeError:
+        # Fallback si el storage no soporta expire
+        return storage.url(nombre)
+
+
+def _guardar_en_memoria(entradas, vence_en):
+    maximo = _config().get('MAX_MEMORIA', DEFAULT_MAX_MEMORIA)
+    with _lock:
+        if len(_memoria) + len(entradas) > maximo:
+            _memoria.clear()
+        for clave, url in entradas.items():
+            _memoria[clave] = (url, vence_en)
+
+
+def urls_firmadas(archivos, expire=3600, storage=None):
+    """
+    Devuelve ``{nombre: url}`` para los archivos indicados (FieldFile o
+    nombres), firmando solo los que no están en caché.
+    """
+    storage = storage or default_storage
+    nombres = list(dict.fromkeys(n for n in map(_nombre, archivos) if n))
+    if not nombres:
+        return {}
+
+    if not es_almacenamiento_firmado(storage):
+        return {nombre: storage.url(nombre) for nombre in nombres}
+
+    config = _config()
+    vigencia = expire - config.get('MARGEN_SEGUNDOS', DEFAULT_MARGEN)
+    if not config.get('ACTIVO', True) or vigencia <= 0:
+        return {nombre: _firmar(storage, nombre, expire) for nombre in nombres}
+
+    claves = {nombre: _clave(storage, nombre, expire) for nombre in nombres}
+    urls = {}
+    ahora = time.time()
+    with _lock:
+        for nombre, clave in claves.items():
+            entrada = _memoria.get(clave)
+            if entrada and entrada[1] > ahora:
+                urls[nombre] = entrada[0]
+
+    pendientes = [nombre for nombre in nombres if nombre not in urls]
+    if pendientes:
+        try:
+            compartidas = cache.get_many([claves[nombre] for nombre in pendientes])
+        except Exception as e:
+            logger.warning(f"No se pudo leer la caché de URLs firmadas: {e}")
+            compartidas = {}
+        # De las de la caché compartida no se sabe cuánto les queda: poco tiempo en memoria
+        _guardar_en_memoria(compartidas, ahora + min(vigencia, 60))
+
+        nuevas = {}
+        for nombre in pendientes:
+            url = compartidas.get(claves[nombre])
+            if url is None:
+                url = _firmar(storage, nombre, expire)
+                nuevas[claves[nombre]] = url
+            urls[nombre] = url
+
+        if nuevas:
+            _guardar_en_memoria(nuevas, ahora + vigencia)
+            try:
+                cache.set_many(nuevas, timeout=vigencia)
+            except Exception as e:
+                logger.warning(f"No se pudo guardar la caché de URLs firmadas: {e}")
+
+    return urls
+
+
+def url_firmada(archivo, expire=3600, storage=None):
+    """URL (firmada si corresponde) de un archivo, o '' si no tiene nombre."""
+    nombre = _nombre(archivo)
+    if not nombre:
+        return ''
+    return urls_firmadas([nombre], expire, storage).get(nombre, '')
+
+
+def precargar(instancias, expire=3600, storage=None):
+    """
+    Firma en una pasada todos los archivos (FileField/ImageField) de las
+    instancias de una página, para que los tags del template los lean de
+    la caché en memoria.
+    """
+    from django.db.models import FileField
+
+    nombres = []
+    for instancia in instancias:
+        if instancia is None:
+            continue
+        for campo in instancia._meta.get_fields():
+            if isinstance(campo, FileField):
+                nombres.append(_nombre(getattr(instancia, campo.name)))
+    return urls_firmadas(nombres, expire, storage)
+
+
+def limpiar_memoria():
+    """Vacía la caché en memoria del proceso (tests)."""
+    with _lock:
+        _memoria.clear()
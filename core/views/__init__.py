@@ -49,6 +49,7 @@ from .scheduled_tasks_api import (
     trigger_check_trials,
     trigger_cleanup_notifications,
     trigger_cobrar_renovaciones,
+    trigger_email_outbox,
 )
 
 # Confirmación Metrológica e Intervalos de Calibración
@@ -89,7 +90,9 @@ from .aprobaciones import (
     aprobar_intervalos,
     rechazar_intervalos,
     aprobar_comprobacion,
-    rechazar_comprobacion
+    rechazar_comprobacion,
+    aprobar_seleccionados,
+    estado_regeneraciones,
 )
 
 # Auto-registro de Trial (público)
@@ -541,6 +541,14 @@ def _validate_single_file_storage(empresa, archivo, form, equipo, tipo_actividad
         raise ValidationError(str(e))
 
 
+def _reemplazar_en_ledger(instance, campo, ruta_guardada, tamaño_bytes):
+    """
+    Registra en el ledger el archivo recién guardado (con el nombre que devolvió
+    el storage) y quita el que reemplaza en ``campo``, si lo había.
+    """
+    reemplazar_archivo(instance.equipo.empresa, getattr(instance, campo, None), ruta_guardada, tamaño_bytes)
+
+
 def _process_calibracion_files(calibracion, files):
     """Procesa y guarda archivos de calibración."""
     archivos = [
@@ -555,7 +563,7 @@ def _process_calibracion_files(calibracion, files):
             nombre_archivo = sanitize_filename(archivo_subido.name)
             ruta_final = f"pdfs/{nombre_archivo}"
             try:
-                default_storage.save(ruta_final, archivo_subido)
+                ruta_guardada = default_storage.save(ruta_final, archivo_subido)
             except Exception as e:
                 logger.error(
                     f"Error al subir archivo '{campo}' a R2 para calibración ID {calibracion.pk}: "
@@ -565,7 +573,8 @@ def _process_calibracion_files(calibracion, files):
                     f"No se pudo subir el archivo '{archivo_subido.name}' al almacenamiento. "
                     "Por favor intenta de nuevo o contacta al soporte."
                 ) from e
-            setattr(calibracion, campo, ruta_final)
+            _reemplazar_en_ledger(calibracion, campo, ruta_guardada, archivo_subido.size)
+            setattr(calibracion, campo, ruta_guardada)
 
     # Documentos subidos manualmente NO entran en flujo de aprobación.
     # Se establece estado_aprobacion=None para excluirlos.
@@ -584,7 +593,7 @@ def _process_single_file(instance, files, field_name):
         nombre_archivo = sanitize_filename(archivo_subido.name)
         ruta_final = f"pdfs/{nombre_archivo}"
         try:
-            default_storage.save(ruta_final, archivo_subido)
+            ruta_guardada = default_storage.save(ruta_final, archivo_subido)
         except Exception as e:
             logger.error(
                 f"Error al subir archivo '{field_name}' a R2 para "
@@ -595,7 +604,8 @@ def _process_single_file(instance, files, field_name):
                 f"No se pudo subir el archivo '{archivo_subido.name}' al almacenamiento. "
                 "Por favor intenta de nuevo o contacta al soporte."
             ) from e
-        setattr(instance, field_name, ruta_final)
+        _reemplazar_en_ledger(instance, field_name, ruta_guardada, archivo_subido.size)
+        setattr(instance, field_name, ruta_guardada)
 
 
 def _create_calibracion_with_files(equipo, form, files):
@@ -869,11 +879,8 @@ def activar_equipo(request, equipo_pk):
                     messages.warning(request, f'Equipo "{equipo.nombre}" activado. No se encontró registro de baja asociado.')
 
             elif equipo.estado == ESTADO_INACTIVO:
-                # Activar y recalcular próximas fechas
+                # Activar; save() recalcula las próximas fechas
                 equipo.estado = ESTADO_ACTIVO
-                equipo.calcular_proxima_calibracion()
-                equipo.calcular_proximo_mantenimiento()
-                equipo.calcular_proxima_comprobacion()
                 equipo.save()
 
                 messages.success(request, f'Equipo "{equipo.nombre}" activado exitosamente.')
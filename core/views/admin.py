@@ -486,7 +486,9 @@ def listar_procedimientos(request):
     elif not request.user.is_superuser and not request.user.empresa:
         procedimientos = Procedimiento.objects.none()
 
-    procedimientos = procedimientos.order_by('codigo')
+    procedimientos = list(procedimientos.order_by('codigo'))
+    # Firmar los PDFs del listado en una pasada (el template usa |secure_file_url)
+    precargar(procedimientos, storage=default_storage)
 
     context = {
         'procedimientos': procedimientos,
@@ -8,10 +8,11 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, render
 from django.utils import timezone
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
 from django.db.models import Q
 import logging
 
+from .. import regeneracion_pdf
 from ..models import Calibracion, Comprobacion
 
 logger = logging.getLogger(__name__)
@@ -185,6 +186,188 @@ def puede_aprobar(usuario, documento):
     return False
 
 
+# Campo con los datos JSON de cada tipo de documento: solo los PDFs generados
+# por la plataforma se regeneran al aprobar
+CAMPOS_DATOS = {
+    'confirmacion': 'confirmacion_metrologica_datos',
+    'intervalos': 'intervalos_calibracion_datos',
+    'comprobacion': 'datos_comprobacion',
+}
+
+
+def _solicitar_regeneracion(tipo, documento, usuario):
+    """
+    Solicita la regeneración del PDF con los datos de aprobación
+    (core/regeneracion_pdf.py). Los PDFs subidos manualmente NO se regeneran
+    para preservar el archivo original.
+
+    Returns:
+        dict | None: ``{'id', 'estado'}`` del trabajo, para el sondeo de estado
+    """
+    datos = getattr(documento, CAMPOS_DATOS[tipo])
+    if not (datos and isinstance(datos, dict)):
+        logger.info(f"{tipo.capitalize()} #{documento.pk}: PDF manual, no se regenera")
+        return None
+    try:
+        trabajo = regeneracion_pdf.solicitar(tipo, documento, usuario)
+    except Exception as e:
+        # No fallar la aprobación si el PDF falla
+        logger.error(f"Error solicitando la regeneración del PDF de {tipo} #{documento.pk}: {e}")
+        return None
+    return {'id': trabajo.pk, 'estado': trabajo.estado}
+
+
+def _aplicar_aprobacion_confirmacion(calibracion, usuario, datos):
+    """Aplica la aprobación de la confirmación con las fechas ajustables de ``datos``."""
+    from datetime import datetime
+
+    # Fecha de realización (por defecto: fecha_calibracion)
+    fecha_realizacion_str = datos.get('fecha_realizacion')
+    if fecha_realizacion_str:
+        try:
+            calibracion.confirmacion_fecha_realizacion = datetime.strptime(fecha_realizacion_str, '%Y-%m-%d').date()
+        except ValueError:
+            calibracion.confirmacion_fecha_realizacion = calibracion.fecha_calibracion
+    else:
+        calibracion.confirmacion_fecha_realizacion = calibracion.fecha_calibracion
+
+    # Fecha de emisión (por defecto: hoy)
+    fecha_emision_str = datos.get('fecha_emision')
+    if fecha_emision_str:
+        try:
+            calibracion.confirmacion_fecha_emision = datetime.strptime(fecha_emision_str, '%Y-%m-%d').date()
+        except ValueError:
+            calibracion.confirmacion_fecha_emision = timezone.now().date()
+    else:
+        calibracion.confirmacion_fecha_emision = timezone.now().date()
+
+    # Fecha de aprobación ajustable (por defecto: hoy)
+    fecha_aprobacion_ajustable_str = datos.get('fecha_aprobacion_ajustable')
+    if fecha_aprobacion_ajustable_str:
+        try:
+            calibracion.confirmacion_fecha_aprobacion_ajustable = datetime.strptime(
+                fecha_aprobacion_ajustable_str, '%Y-%m-%d'
+            ).date()
+        except ValueError:
+            calibracion.confirmacion_fecha_aprobacion_ajustable = timezone.now().date()
+    else:
+        calibracion.confirmacion_fecha_aprobacion_ajustable = timezone.now().date()
+
+    # Aprobar confirmación (campos específicos)
+    calibracion.confirmacion_estado_aprobacion = 'aprobado'
+    calibracion.confirmacion_aprobado_por = usuario
+    calibracion.confirmacion_fecha_aprobacion = timezone.now()
+    calibracion.confirmacion_observaciones_rechazo = None  # Limpiar observaciones previas
+    calibracion.save()
+
+
+def _aplicar_aprobacion_intervalos(calibracion, usuario, datos):
+    """Aplica la aprobación de los intervalos con las fechas ajustables de ``datos``."""
+    from datetime import datetime
+
+    # Fecha de realización: si no se envía explícitamente, usar fecha_analisis del formulario
+    # de intervalos (que es cuando se hizo el análisis real), no la fecha de calibración
+    fecha_realizacion_str = datos.get('fecha_realizacion')
+    if fecha_realizacion_str:
+        try:
+            calibracion.intervalos_fecha_realizacion = datetime.strptime(fecha_realizacion_str, '%Y-%m-%d').date()
+        except ValueError:
+            calibracion.intervalos_fecha_realizacion = calibracion.fecha_calibracion
+    else:
+        datos_int = calibracion.intervalos_calibracion_datos or {}
+        fecha_analisis_guardada = datos_int.get('equipo', {}).get('fecha_analisis', '')
+        if fecha_analisis_guardada:
+            try:
+                calibracion.intervalos_fecha_realizacion = datetime.strptime(
+                    str(fecha_analisis_guardada)[:10], '%Y-%m-%d'
+                ).date()
+            except ValueError:
+                calibracion.intervalos_fecha_realizacion = calibracion.fecha_calibracion
+        else:
+            calibracion.intervalos_fecha_realizacion = calibracion.fecha_calibracion
+
+    # Fecha de emisión (por defecto: hoy)
+    fecha_emision_str = datos.get('fecha_emision')
+    if fecha_emision_str:
+        try:
+            calibracion.intervalos_fecha_emision = datetime.strptime(fecha_emision_str, '%Y-%m-%d').date()
+        except ValueError:
+            calibracion.intervalos_fecha_emision = timezone.now().date()
+    else:
+        calibracion.intervalos_fecha_emision = timezone.now().date()
+
+    # Fecha de aprobación ajustable (por defecto: hoy)
+    fecha_aprobacion_ajustable_str = datos.get('fecha_aprobacion_ajustable')
+    if fecha_aprobacion_ajustable_str:
+        try:
+            calibracion.intervalos_fecha_aprobacion_ajustable = datetime.strptime(
+                fecha_aprobacion_ajustable_str, '%Y-%m-%d'
+            ).date()
+        except ValueError:
+            calibracion.intervalos_fecha_aprobacion_ajustable = timezone.now().date()
+    else:
+        calibracion.intervalos_fecha_aprobacion_ajustable = timezone.now().date()
+
+    # Aprobar intervalos (campos específicos)
+    calibracion.intervalos_estado_aprobacion = 'aprobado'
+    calibracion.intervalos_aprobado_por = usuario
+    calibracion.intervalos_fecha_aprobacion = timezone.now()
+    calibracion.intervalos_observaciones_rechazo = None
+    calibracion.save()
+
+
+def _aplicar_aprobacion_comprobacion(comprobacion, usuario, datos):
+    """Aplica la aprobación de la comprobación con las fechas ajustables de ``datos``."""
+    from datetime import datetime
+
+    # Fecha de realización (por defecto: fecha_comprobacion)
+    fecha_realizacion_str = datos.get('fecha_realizacion')
+    if fecha_realizacion_str:
+        try:
+            comprobacion.fecha_realizacion = datetime.strptime(fecha_realizacion_str, '%Y-%m-%d').date()
+        except ValueError:
+            comprobacion.fecha_realizacion = comprobacion.fecha_comprobacion
+    else:
+        comprobacion.fecha_realizacion = comprobacion.fecha_comprobacion
+
+    # Fecha de emisión (por defecto: hoy)
+    fecha_emision_str = datos.get('fecha_emision')
+    if fecha_emision_str:
+        try:
+            comprobacion.fecha_emision = datetime.strptime(fecha_emision_str, '%Y-%m-%d').date()
+        except ValueError:
+            comprobacion.fecha_emision = timezone.now().date()
+    else:
+        comprobacion.fecha_emision = timezone.now().date()
+
+    # Fecha de aprobación ajustable (por defecto: hoy)
+    fecha_aprobacion_ajustable_str = datos.get('fecha_aprobacion_ajustable')
+    if fecha_aprobacion_ajustable_str:
+        try:
+            comprobacion.fecha_aprobacion_ajustable = datetime.strptime(
+                fecha_aprobacion_ajustable_str, '%Y-%m-%d'
+            ).date()
+        except ValueError:
+            comprobacion.fecha_aprobacion_ajustable = timezone.now().date()
+    else:
+        comprobacion.fecha_aprobacion_ajustable = timezone.now().date()
+
+    # Aprobar
+    comprobacion.estado_aprobacion = 'aprobado'
+    comprobacion.aprobado_por = usuario
+    comprobacion.fecha_aprobacion = timezone.now()
+    comprobacion.observaciones_rechazo = None
+    comprobacion.save()
+
+
+# Tipos de documento aprobables: (modelo, campo del PDF, aplicación de la aprobación)
+TIPOS_APROBACION = {
+    'confirmacion': (Calibracion, 'confirmacion_metrologica_pdf', _aplicar_aprobacion_confirmacion),
+    'intervalos': (Calibracion, 'intervalos_calibracion_pdf', _aplicar_aprobacion_intervalos),
+    'comprobacion': (Comprobacion, 'comprobacion_pdf', _aplicar_aprobacion_comprobacion),
+}
+
+
 @login_required
 @require_POST
 def aprobar_confirmacion(request, calibracion_id):
@@ -216,111 +399,19 @@ def aprobar_confirmacion(request, calibracion_id):
                 'error': 'Esta calibración no tiene confirmación metrológica'
             }, status=400)
 
-        # Obtener fechas ajustables del POST (si se proporcionan)
-        from datetime import datetime
-
-        # Fecha de realización (por defecto: fecha_calibracion)
-        fecha_realizacion_str = request.POST.get('fecha_realizacion')
-        if fecha_realizacion_str:
-            try:
-                calibracion.confirmacion_fecha_realizacion = datetime.strptime(fecha_realizacion_str, '%Y-%m-%d').date()
-            except ValueError:
-                calibracion.confirmacion_fecha_realizacion = calibracion.fecha_calibracion
-        else:
-            calibracion.confirmacion_fecha_realizacion = calibracion.fecha_calibracion
-
-        # Fecha de emisión (por defecto: hoy)
-        fecha_emision_str = request.POST.get('fecha_emision')
-        if fecha_emision_str:
-            try:
-                calibracion.confirmacion_fecha_emision = datetime.strptime(fecha_emision_str, '%Y-%m-%d').date()
-            except ValueError:
-                calibracion.confirmacion_fecha_emision = timezone.now().date()
-        else:
-            calibracion.confirmacion_fecha_emision = timezone.now().date()
-
-        # Fecha de aprobación ajustable (por defecto: hoy)
-        fecha_aprobacion_ajustable_str = request.POST.get('fecha_aprobacion_ajustable')
-        if fecha_aprobacion_ajustable_str:
-            try:
-                calibracion.confirmacion_fecha_aprobacion_ajustable = datetime.strptime(fecha_aprobacion_ajustable_str, '%Y-%m-%d').date()
-            except ValueError:
-                calibracion.confirmacion_fecha_aprobacion_ajustable = timezone.now().date()
-        else:
-            calibracion.confirmacion_fecha_aprobacion_ajustable = timezone.now().date()
-
-        # Aprobar confirmación (campos específicos)
-        calibracion.confirmacion_estado_aprobacion = 'aprobado'
-        calibracion.confirmacion_aprobado_por = request.user
-        calibracion.confirmacion_fecha_aprobacion = timezone.now()
-        calibracion.confirmacion_observaciones_rechazo = None  # Limpiar observaciones previas
-        calibracion.save()
+        _aplicar_aprobacion_confirmacion(calibracion, request.user, request.POST)
 
         logger.info(f"Confirmación metrológica #{calibracion_id} aprobada por {request.user.username}")
 
-        # Regenerar PDF solo si fue generado por la plataforma (tiene datos JSON).
-        # Los PDFs subidos manualmente NO se regeneran para preservar el archivo original.
-        datos_json = calibracion.confirmacion_metrologica_datos
-        if datos_json and isinstance(datos_json, dict) and len(datos_json) > 0:
-            try:
-                from ..views.confirmacion import _preparar_contexto_confirmacion, _generar_grafica_confirmacion, safe_float
-                from django.template.loader import render_to_string
-                from django.core.files.base import ContentFile
-                from weasyprint import HTML
-                from weasyprint.text.fonts import FontConfiguration
-
-                # Preparar contexto para el PDF
-                equipo = calibracion.equipo
-                context = _preparar_contexto_confirmacion(request, equipo, calibracion, datos_json)
-
-                # Generar gráfica(s) — soporta v1 (puntos_medicion en raíz) y v2 (magnitudes)
-                if 'magnitudes' in datos_json:
-                    # v2: una gráfica por magnitud, embebida en cada entrada de magnitudes_template
-                    mags_context = context.get('datos_confirmacion', {}).get('magnitudes', [])
-                    for i, mag in enumerate(datos_json.get('magnitudes', [])):
-                        puntos_mag = mag.get('puntos_medicion', [])
-                        emp_valor_mag = safe_float(mag.get('emp', 0), 0)
-                        emp_unidad_mag = mag.get('emp_unidad', '%')
-                        unidad_mag = mag.get('unidad', datos_json.get('unidad_equipo', ''))
-                        g = _generar_grafica_confirmacion(puntos_mag, emp_valor_mag, emp_unidad_mag, unidad_mag)
-                        if i < len(mags_context):
-                            mags_context[i]['grafica'] = g
-                    context['grafica_imagen'] = mags_context[0].get('grafica') if mags_context else None
-                elif 'puntos_medicion' in datos_json:
-                    # v1: gráfica única
-                    emp_valor = datos_json.get('emp_valor', 0)
-                    emp_unidad = datos_json.get('emp_unidad', '%')
-                    unidad_equipo = datos_json.get('unidad_equipo', '')
-                    grafica_base64 = _generar_grafica_confirmacion(
-                        datos_json['puntos_medicion'],
-                        emp_valor,
-                        emp_unidad,
-                        unidad_equipo
-                    )
-                    context['grafica_imagen'] = grafica_base64
-
-                # Renderizar y generar PDF
-                html_string = render_to_string('core/confirmacion_metrologica_print.html', context)
-                font_config = FontConfiguration()
-                html_pdf = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-                pdf_file = html_pdf.write_pdf(font_config=font_config)
-
-                # Guardar PDF actualizado
-                filename = f'confirmacion_metrologica_{equipo.codigo_interno}_{calibracion.fecha_calibracion.strftime("%Y%m%d")}.pdf'
-                calibracion.confirmacion_metrologica_pdf.save(filename, ContentFile(pdf_file), save=True)
-
-                logger.info(f"PDF de confirmación regenerado con información de aprobación")
-            except Exception as e:
-                logger.error(f"Error regenerando PDF de confirmación: {e}")
-                # No fallar la aprobación si el PDF falla
-        else:
-            logger.info(f"Confirmación #{calibracion_id}: PDF manual, no se regenera")
+        # Regenerar el PDF con los datos de aprobación (en cola o en línea)
+        regeneracion = _solicitar_regeneracion('confirmacion', calibracion, request.user)
 
         return JsonResponse({
             'success': True,
             'message': f'Confirmación aprobada por {request.user.get_full_name() or request.user.username}',
             'aprobado_por': request.user.get_full_name() or request.user.username,
-            'fecha_aprobacion': calibracion.confirmacion_fecha_aprobacion.strftime('%Y-%m-%d %H:%M')
+            'fecha_aprobacion': calibracion.confirmacion_fecha_aprobacion.strftime('%Y-%m-%d %H:%M'),
+            'regeneracion': regeneracion,
         })
 
     except Exception as e:
@@ -421,192 +512,19 @@ def aprobar_intervalos(request, calibracion_id):
                 'error': 'Esta calibración no tiene intervalos de calibración'
             }, status=400)
 
-        # Obtener fechas ajustables del POST (si se proporcionan)
-        from datetime import datetime
-
-        # Fecha de realización: si no se envía explícitamente, usar fecha_analisis del formulario
-        # de intervalos (que es cuando se hizo el análisis real), no la fecha de calibración
-        fecha_realizacion_str = request.POST.get('fecha_realizacion')
-        if fecha_realizacion_str:
-            try:
-                calibracion.intervalos_fecha_realizacion = datetime.strptime(fecha_realizacion_str, '%Y-%m-%d').date()
-            except ValueError:
-                calibracion.intervalos_fecha_realizacion = calibracion.fecha_calibracion
-        else:
-            datos_int = calibracion.intervalos_calibracion_datos or {}
-            fecha_analisis_guardada = datos_int.get('equipo', {}).get('fecha_analisis', '')
-            if fecha_analisis_guardada:
-                try:
-                    calibracion.intervalos_fecha_realizacion = datetime.strptime(str(fecha_analisis_guardada)[:10], '%Y-%m-%d').date()
-                except ValueError:
-                    calibracion.intervalos_fecha_realizacion = calibracion.fecha_calibracion
-            else:
-                calibracion.intervalos_fecha_realizacion = calibracion.fecha_calibracion
-
-        # Fecha de emisión (por defecto: hoy)
-        fecha_emision_str = request.POST.get('fecha_emision')
-        if fecha_emision_str:
-            try:
-                calibracion.intervalos_fecha_emision = datetime.strptime(fecha_emision_str, '%Y-%m-%d').date()
-            except ValueError:
-                calibracion.intervalos_fecha_emision = timezone.now().date()
-        else:
-            calibracion.intervalos_fecha_emision = timezone.now().date()
-
-        # Fecha de aprobación ajustable (por defecto: hoy)
-        fecha_aprobacion_ajustable_str = request.POST.get('fecha_aprobacion_ajustable')
-        if fecha_aprobacion_ajustable_str:
-            try:
-                calibracion.intervalos_fecha_aprobacion_ajustable = datetime.strptime(fecha_aprobacion_ajustable_str, '%Y-%m-%d').date()
-            except ValueError:
-                calibracion.intervalos_fecha_aprobacion_ajustable = timezone.now().date()
-        else:
-            calibracion.intervalos_fecha_aprobacion_ajustable = timezone.now().date()
-
-        # Aprobar intervalos (campos específicos)
-        calibracion.intervalos_estado_aprobacion = 'aprobado'
-        calibracion.intervalos_aprobado_por = request.user
-        calibracion.intervalos_fecha_aprobacion = timezone.now()
-        calibracion.intervalos_observaciones_rechazo = None
-        calibracion.save()
+        _aplicar_aprobacion_intervalos(calibracion, request.user, request.POST)
 
         logger.info(f"Intervalos de calibración #{calibracion_id} aprobados por {request.user.username}")
 
-        # Regenerar PDF solo si fue generado por la plataforma (tiene datos JSON).
-        # Los PDFs subidos manualmente NO se regeneran para preservar el archivo original.
-        datos_intervalos = calibracion.intervalos_calibracion_datos
-        if datos_intervalos and isinstance(datos_intervalos, dict) and len(datos_intervalos) > 0:
-            try:
-                from django.template.loader import render_to_string
-                from django.core.files.base import ContentFile
-                from weasyprint import HTML
-                from weasyprint.text.fonts import FontConfiguration
-                from datetime import datetime
-                import re
-
-                equipo = calibracion.equipo
-
-                # Calibración anterior
-                cal_anterior = Calibracion.objects.filter(
-                    equipo=equipo,
-                    fecha_calibracion__lt=calibracion.fecha_calibracion
-                ).order_by('-fecha_calibracion').first()
-
-                # EMP info
-                emp_info = {'valor': 8, 'unidad': '%', 'texto': '8%'}
-                if equipo.error_maximo_permisible:
-                    emp_texto = equipo.error_maximo_permisible.strip()
-                    emp_match = re.search(r'([\d.]+)\s*(%|mm|lx|μm|°C|g|kg|m)?', emp_texto)
-                    if emp_match:
-                        emp_info['valor'] = float(emp_match.group(1))
-                        emp_info['unidad'] = emp_match.group(2) if emp_match.group(2) else ''
-                        emp_info['texto'] = emp_texto
-
-                # Logo
-                logo_empresa_url = None
-                try:
-                    if equipo.empresa and equipo.empresa.logo_empresa:
-                        logo_empresa_url = equipo.empresa.logo_empresa.url
-                except Exception:
-                    pass
-
-                # Formato fecha
-                formato_fecha_formateada_int = None
-                if equipo.empresa.intervalos_fecha_formato_display:
-                    formato_fecha_formateada_int = equipo.empresa.intervalos_fecha_formato_display
-                    if datos_intervalos.get('formato'):
-                        datos_intervalos['formato']['fecha'] = formato_fecha_formateada_int
-                elif datos_intervalos.get('formato', {}).get('fecha'):
-                    formato_fecha_formateada_int = datos_intervalos['formato']['fecha']
-
-                # Recalcular derivas para que el PDF aprobado mantenga el cuadro de análisis
-                from ..views.confirmacion import _calcular_deriva_variable
-                deriva_automatica_aprobacion = None
-                derivas_por_variable_aprobacion = []
-
-                if cal_anterior and calibracion.confirmacion_metrologica_datos and cal_anterior.confirmacion_metrologica_datos:
-                    datos_act = calibracion.confirmacion_metrologica_datos
-                    datos_ant = cal_anterior.confirmacion_metrologica_datos
-                    mags_act = datos_act.get('magnitudes', [])
-                    mags_ant = datos_ant.get('magnitudes', [])
-
-                    if mags_act and mags_ant:
-                        for mag_act in mags_act:
-                            nombre_var = mag_act.get('nombre', '') or ''
-                            unidad_var = mag_act.get('unidad', '') or ''
-                            pts_act = mag_act.get('puntos_medicion', [])
-                            mag_ant = next((m for m in mags_ant if (m.get('nombre') or '') == nombre_var),
-                                          mags_ant[0] if mags_ant else None)
-                            pts_ant = mag_ant.get('puntos_medicion', []) if mag_ant else []
-                            resultado = _calcular_deriva_variable(
-                                pts_act, pts_ant, emp_info,
-                                calibracion.fecha_calibracion, cal_anterior.fecha_calibracion
-                            )
-                            if resultado:
-                                resultado['nombre'] = nombre_var
-                                resultado['unidad'] = unidad_var
-                                resultado['es_mas_restrictiva'] = False
-                                derivas_por_variable_aprobacion.append(resultado)
-                    else:
-                        pts_act = datos_act.get('puntos_medicion', [])
-                        pts_ant = datos_ant.get('puntos_medicion', [])
-                        resultado = _calcular_deriva_variable(
-                            pts_act, pts_ant, emp_info,
-                            calibracion.fecha_calibracion, cal_anterior.fecha_calibracion
-                        )
-                        if resultado:
-                            resultado['nombre'] = ''
-                            resultado['unidad'] = ''
-                            resultado['es_mas_restrictiva'] = False
-                            derivas_por_variable_aprobacion.append(resultado)
-
-                    vars_con_i = [v for v in derivas_por_variable_aprobacion if v.get('intervalo_limitante') is not None]
-                    if vars_con_i:
-                        var_rest = min(vars_con_i, key=lambda v: v['intervalo_limitante'])
-                    elif derivas_por_variable_aprobacion:
-                        var_rest = derivas_por_variable_aprobacion[0]
-                    else:
-                        var_rest = None
-
-                    if var_rest:
-                        var_rest['es_mas_restrictiva'] = True
-                        deriva_automatica_aprobacion = {**var_rest, 'puntos_detalle': var_rest['puntos_detalle']}
-
-                context = {
-                    'equipo': equipo,
-                    'cal_actual': calibracion,
-                    'cal_anterior': cal_anterior,
-                    'fecha_actual': datetime.now().date(),
-                    'nombre_empresa': equipo.empresa.nombre,
-                    'logo_empresa_url': logo_empresa_url,
-                    'emp_info': emp_info,
-                    'datos_intervalos': datos_intervalos,
-                    'deriva_automatica': deriva_automatica_aprobacion,
-                    'derivas_por_variable': derivas_por_variable_aprobacion if len(derivas_por_variable_aprobacion) > 1 else [],
-                    'total_calibraciones': Calibracion.objects.filter(equipo=equipo).count(),
-                    'emp_texto': equipo.error_maximo_permisible or f"{emp_info['valor']} {emp_info['unidad']}",
-                }
-
-                html_string = render_to_string('core/intervalos_calibracion_print.html', context)
-                font_config = FontConfiguration()
-                html_pdf = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-                pdf_file = html_pdf.write_pdf(font_config=font_config)
-
-                filename = f'intervalos_calibracion_{equipo.codigo_interno}_{calibracion.fecha_calibracion.strftime("%Y%m%d")}.pdf'
-                calibracion.intervalos_calibracion_pdf.save(filename, ContentFile(pdf_file), save=True)
-
-                logger.info(f"PDF de intervalos regenerado con información de aprobación")
-            except Exception as e:
-                logger.error(f"Error regenerando PDF de intervalos: {e}")
-                # No fallar la aprobación si el PDF falla
-        else:
-            logger.info(f"Intervalos #{calibracion_id}: PDF manual, no se regenera")
+        # Regenerar el PDF con los datos de aprobación (en cola o en línea)
+        regeneracion = _solicitar_regeneracion('intervalos', calibracion, request.user)
 
         return JsonResponse({
             'success': True,
             'message': f'Intervalos aprobados por {request.user.get_full_name() or request.user.username}',
             'aprobado_por': request.user.get_full_name() or request.user.username,
-            'fecha_aprobacion': calibracion.intervalos_fecha_aprobacion.strftime('%Y-%m-%d %H:%M')
+            'fecha_aprobacion': calibracion.intervalos_fecha_aprobacion.strftime('%Y-%m-%d %H:%M'),
+            'regeneracion': regeneracion,
         })
 
     except Exception as e:
@@ -706,146 +624,19 @@ def aprobar_comprobacion(request, comprobacion_id):
                 'error': 'Esta comprobación no tiene PDF generado'
             }, status=400)
 
-        # Obtener fechas ajustables del POST (si se proporcionan)
-        from datetime import datetime
-
-        # Fecha de realización (por defecto: fecha_comprobacion)
-        fecha_realizacion_str = request.POST.get('fecha_realizacion')
-        if fecha_realizacion_str:
-            try:
-                comprobacion.fecha_realizacion = datetime.strptime(fecha_realizacion_str, '%Y-%m-%d').date()
-            except ValueError:
-                comprobacion.fecha_realizacion = comprobacion.fecha_comprobacion
-        else:
-            comprobacion.fecha_realizacion = comprobacion.fecha_comprobacion
-
-        # Fecha de emisión (por defecto: hoy)
-        fecha_emision_str = request.POST.get('fecha_emision')
-        if fecha_emision_str:
-            try:
-                comprobacion.fecha_emision = datetime.strptime(fecha_emision_str, '%Y-%m-%d').date()
-            except ValueError:
-                comprobacion.fecha_emision = timezone.now().date()
-        else:
-            comprobacion.fecha_emision = timezone.now().date()
-
-        # Fecha de aprobación ajustable (por defecto: hoy)
-        fecha_aprobacion_ajustable_str = request.POST.get('fecha_aprobacion_ajustable')
-        if fecha_aprobacion_ajustable_str:
-            try:
-                comprobacion.fecha_aprobacion_ajustable = datetime.strptime(fecha_aprobacion_ajustable_str, '%Y-%m-%d').date()
-            except ValueError:
-                comprobacion.fecha_aprobacion_ajustable = timezone.now().date()
-        else:
-            comprobacion.fecha_aprobacion_ajustable = timezone.now().date()
-
-        # Aprobar
-        comprobacion.estado_aprobacion = 'aprobado'
-        comprobacion.aprobado_por = request.user
-        comprobacion.fecha_aprobacion = timezone.now()
-        comprobacion.observaciones_rechazo = None
-        comprobacion.save()
+        _aplicar_aprobacion_comprobacion(comprobacion, request.user, request.POST)
 
         logger.info(f"Comprobación metrológica #{comprobacion_id} aprobada por {request.user.username}")
 
-        # Regenerar PDF solo si fue generado por la plataforma (tiene datos JSON).
-        # Los PDFs subidos manualmente NO se regeneran para preservar el archivo original.
-        datos_comprobacion = comprobacion.datos_comprobacion
-        if datos_comprobacion and isinstance(datos_comprobacion, dict) and len(datos_comprobacion) > 0:
-            try:
-                from ..views.comprobacion import generar_grafica_svg_comprobacion
-                from django.template.loader import render_to_string
-                from django.core.files.base import ContentFile
-                from weasyprint import HTML
-                from datetime import datetime
-
-                equipo = comprobacion.equipo
-
-                # Detectar v2 (multi-variable) o v1 (una variable)
-                magnitudes_v2 = datos_comprobacion.get('magnitudes', [])
-                magnitudes_template = None
-
-                if magnitudes_v2:
-                    # v2: calcular stats y gráfica por cada variable
-                    magnitudes_template = []
-                    total_conformes_global = 0
-                    total_no_conformes_global = 0
-                    total_puntos_global = 0
-                    for mag in magnitudes_v2:
-                        pts = mag.get('puntos_medicion', [])
-                        conf = sum(1 for p in pts if p.get('conformidad') == 'CONFORME')
-                        no_conf = sum(1 for p in pts if p.get('conformidad') == 'NO CONFORME')
-                        unidad_mag = mag.get('unidad', '') or datos_comprobacion.get('unidad_equipo', 'mm')
-                        magnitudes_template.append({
-                            'nombre': mag.get('nombre', ''),
-                            'unidad': unidad_mag,
-                            'puntos': pts,
-                            'conformes': conf,
-                            'no_conformes': no_conf,
-                            'total': len(pts),
-                            'grafica_svg': generar_grafica_svg_comprobacion(pts, unidad_mag),
-                        })
-                        total_conformes_global += conf
-                        total_no_conformes_global += no_conf
-                        total_puntos_global += len(pts)
-                    puntos_conformes = total_conformes_global
-                    puntos_no_conformes = total_no_conformes_global
-                    total_puntos = total_puntos_global
-                    puntos = magnitudes_v2[0].get('puntos_medicion', []) if magnitudes_v2 else []
-                    grafica_svg = magnitudes_template[0]['grafica_svg'] if magnitudes_template else ''
-                else:
-                    # v1: una sola variable
-                    puntos = datos_comprobacion.get('puntos_medicion', [])
-                    puntos_conformes = sum(1 for p in puntos if p.get('conformidad') == 'CONFORME')
-                    puntos_no_conformes = sum(1 for p in puntos if p.get('conformidad') == 'NO CONFORME')
-                    total_puntos = len(puntos)
-                    unidad = datos_comprobacion.get('unidad_equipo', 'mm')
-                    grafica_svg = generar_grafica_svg_comprobacion(puntos, unidad)
-
-                # Logo de empresa
-                logo_empresa_url = None
-                try:
-                    if equipo.empresa and equipo.empresa.logo_empresa:
-                        logo_empresa_url = equipo.empresa.logo_empresa.url
-                except:
-                    pass
-
-                # Contexto
-                context = {
-                    'equipo': equipo,
-                    'comprobacion': comprobacion,
-                    'datos_comprobacion': datos_comprobacion,
-                    'empresa': equipo.empresa,
-                    'logo_empresa_url': logo_empresa_url,
-                    'fecha_generacion': datetime.now(),
-                    'puntos_conformes': puntos_conformes,
-                    'puntos_no_conformes': puntos_no_conformes,
-                    'total_puntos': total_puntos,
-                    'grafica_svg': grafica_svg,
-                    'magnitudes_template': magnitudes_template,
-                }
-
-                # Renderizar y generar PDF
-                html_string = render_to_string('core/comprobacion_metrologica_print.html', context)
-                pdf_file = HTML(string=html_string, base_url=request.build_absolute_uri()).write_pdf()
-
-                # Guardar PDF actualizado
-                fecha_str = comprobacion.fecha_comprobacion.strftime('%Y%m%d')
-                filename = f'comprobacion_{equipo.codigo_interno}_{fecha_str}.pdf'
-                comprobacion.comprobacion_pdf.save(filename, ContentFile(pdf_file), save=True)
-
-                logger.info(f"PDF de comprobación regenerado con información de aprobación")
-            except Exception as e:
-                logger.error(f"Error regenerando PDF de comprobación: {e}")
-                # No fallar la aprobación si el PDF falla
-        else:
-            logger.info(f"Comprobación #{comprobacion_id}: PDF manual, no se regenera")
+        # Regenerar el PDF con los datos de aprobación (en cola o en línea)
+        regeneracion = _solicitar_regeneracion('comprobacion', comprobacion, request.user)
 
         return JsonResponse({
             'success': True,
             'message': f'Comprobación aprobada por {request.user.get_full_name() or request.user.username}',
             'aprobado_por': request.user.get_full_name() or request.user.username,
-            'fecha_aprobacion': comprobacion.fecha_aprobacion.strftime('%Y-%m-%d %H:%M')
+            'fecha_aprobacion': comprobacion.fecha_aprobacion.strftime('%Y-%m-%d %H:%M'),
+            'regeneracion': regeneracion,
         })
 
     except Exception as e:
@@ -913,3 +704,104 @@ def rechazar_comprobacion(request, comprobacion_id):
             'success': False,
             'error': str(e)
         }, status=500)
+
+
+def _aprobar_uno(usuario, tipo, documento_id, fechas):
+    """Aprueba un documento de una selección; devuelve su resultado."""
+    resultado = {'tipo': tipo, 'id': documento_id, 'success': False}
+    if tipo not in TIPOS_APROBACION:
+        resultado['error'] = 'Tipo de documento no soportado'
+        return resultado
+    modelo, campo_pdf, aplicar = TIPOS_APROBACION[tipo]
+
+    try:
+        filtro = {'pk': int(documento_id)}
+        if not usuario.is_superuser:
+            filtro['equipo__empresa'] = usuario.empresa
+        documento = modelo.objects.select_related('equipo__empresa', 'creado_por').filter(**filtro).first()
+        if documento is None:
+            resultado['error'] = 'Documento no encontrado'
+        elif not puede_aprobar(usuario, documento):
+            resultado['error'] = 'No tienes permisos para aprobar este documento'
+        elif not getattr(documento, campo_pdf):
+            resultado['error'] = 'El documento no tiene PDF generado'
+        elif regeneracion_pdf.esta_aprobado(tipo, documento):
+            resultado['error'] = 'El documento ya está aprobado'
+        else:
+            aplicar(documento, usuario, fechas)
+            resultado['success'] = True
+            resultado['regeneracion'] = _solicitar_regeneracion(tipo, documento, usuario)
+    except (TypeError, ValueError):
+        resultado['error'] = 'ID de documento inválido'
+    except Exception as e:
+        logger.error(f"Error aprobando {tipo} {documento_id} en bloque: {e}")
+        resultado['error'] = str(e)
+    return resultado
+
+
+@login_required
+@require_POST
+def aprobar_seleccionados(request):
+    """
+    Aprueba en bloque los documentos seleccionados.
+
+    Body JSON: ``{"documentos": [{"tipo": "confirmacion", "id": 5}, ...]}``
+    con ``fecha_emision`` y ``fecha_aprobacion_ajustable`` opcionales (la
+    fecha de realización es la de cada actividad). Cada aprobación se guarda
+    por separado y encola la regeneración de su PDF, que los workers de
+    ``procesar_regeneraciones_pdf`` se reparten.
+    """
+    import json
+    from ..stats_queue import diferir_recalculo_stats
+
+    try:
+        data = json.loads(request.body or '{}')
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Datos inválidos'}, status=400)
+
+    documentos = data.get('documentos')
+    if not isinstance(documentos, list) or not documentos:
+        return JsonResponse({'success': False, 'error': 'No se seleccionaron documentos'}, status=400)
+    # Sin cola los PDFs se renderizan aquí mismo: el tope es mucho menor
+    maximo = regeneracion_pdf.max_lote_aprobacion()
+    if len(documentos) > maximo:
+        return JsonResponse({
+            'success': False,
+            'error': f'Se pueden aprobar como máximo {maximo} documentos a la vez'
+        }, status=400)
+
+    fechas = {
+        campo: data[campo] for campo in ('fecha_emision', 'fecha_aprobacion_ajustable') if data.get(campo)
+    }
+    # Un recálculo de stats del dashboard por empresa al final, no uno por documento
+    with diferir_recalculo_stats():
+        resultados = [
+            _aprobar_uno(request.user, str(item.get('tipo')), item.get('id'), fechas)
+            for item in documentos if isinstance(item, dict)
+        ]
+
+    aprobados = sum(1 for r in resultados if r['success'])
+    logger.info(f"{aprobados}/{len(resultados)} documentos aprobados en bloque por {request.user.username}")
+    return JsonResponse({
+        'success': aprobados > 0,
+        'message': f'{aprobados} de {len(resultados)} documentos aprobados',
+        'aprobados': aprobados,
+        'resultados': resultados,
+    })
+
+
+@login_required
+@require_GET
+def estado_regeneraciones(request):
+    """
+    Sondeo del estado de los PDFs en regeneración: ``?ids=1,2,3``.
+    Devuelve cada trabajo (con la URL del PDF al completarse) y cuántos
+    siguen en curso.
+    """
+    ids = [int(i) for i in request.GET.get('ids', '').split(',') if i.strip().isdigit()][:200]
+    trabajos = regeneracion_pdf.estado_trabajos(ids, request.user)
+    return JsonResponse({
+        'success': True,
+        'trabajos': trabajos,
+        'en_curso': sum(1 for t in trabajos if t['estado'] in regeneracion_pdf.ESTADOS_ACTIVOS),
+    })
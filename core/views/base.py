@@ -47,6 +47,7 @@ logger = logging.getLogger(__name__)
 
 # Importar validadores de almacenamiento
 from ..storage_validators import StorageLimitValidator
+from ..storage_ledger import registrar_archivo, eliminar_registros, reemplazar_archivo
 
 # Importar los formularios
 from ..forms import (
@@ -79,6 +80,7 @@ from django import forms
 from ..services_new import file_upload_service, equipment_service, cache_manager
 from ..security import StorageQuotaManager
 from ..templatetags.file_tags import secure_file_url, pdf_image_url
+from ..urls_firmadas import url_firmada, precargar
 
 # Importar optimizaciones
 from ..optimizations import OptimizedQueries, CacheHelpers
@@ -141,7 +143,7 @@ def get_secure_file_url(file_field, expire_seconds=3600):
             if hasattr(default_storage, 'url'):
                 # Verificar si es S3Storage (soporta expire) o FileSystemStorage (no soporta expire)
                 if hasattr(default_storage, 'bucket'):  # S3Storage tiene atributo 'bucket'
-                    return default_storage.url(file_field.name, expire=expire_seconds)
+                    return url_firmada(file_field.name, expire_seconds, default_storage)
                 else:  # FileSystemStorage
                     return default_storage.url(file_field.name)
             else:
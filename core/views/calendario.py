@@ -5,10 +5,14 @@ import logging
 from datetime import date, timedelta
 
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils.cache import get_conditional_response, patch_cache_control
 
-from ..models import Equipo, Calibracion, Mantenimiento, Comprobacion
+from ..calendario_indice import (
+    asegurar_indice, etag_ocurrencias, horizonte, max_equipos_por_lectura, ocurrencias_en_rango,
+)
+from ..models import Equipo
 from ..monitoring import monitor_view
 from .base import access_check
 
@@ -29,6 +33,12 @@ TIPO_LABELS = {
     'comprobacion': 'Comprobación',
 }
 
+PREFIJOS_TITULO = {
+    'calibracion': '[Cal]',
+    'mantenimiento': '[Mant]',
+    'comprobacion': '[Comp]',
+}
+
 
 def _build_event(title, start_date, color, extra=None):
     """Construye un dict de evento en formato FullCalendar."""
@@ -51,6 +61,30 @@ def _get_equipos_qs(user):
     return qs
 
 
+def _empresa_id(user):
+    """Empresa que acota el índice (None para superusuarios, que ven todas)."""
+    return None if user.is_superuser else user.empresa_id
+
+
+def _evento_de_ocurrencia(ocurrencia):
+    """Evento FullCalendar de una fila del índice (programada o realizada)."""
+    equipo = ocurrencia.equipo
+    return _build_event(
+        title=f'{PREFIJOS_TITULO[ocurrencia.tipo]} {equipo.nombre}',
+        start_date=ocurrencia.fecha,
+        color=COLORES[ocurrencia.tipo][ocurrencia.estado],
+        extra={
+            'equipo_id': ocurrencia.equipo_id,
+            'equipo_nombre': equipo.nombre,
+            'equipo_codigo': equipo.codigo_interno,
+            'responsable': equipo.responsable or '',
+            'tipo': ocurrencia.tipo,
+            'estado': ocurrencia.estado,
+            **ocurrencia.detalle,
+        },
+    )
+
+
 # ============================================================================
 # Vista principal del calendario
 # ============================================================================
@@ -81,7 +115,13 @@ def calendario_actividades(request):
 @access_check
 @login_required
 def calendario_eventos_api(request):
-    """API que retorna eventos en formato FullCalendar JSON."""
+    """
+    API que retorna eventos en formato FullCalendar JSON.
+
+    Lee del índice de ocurrencias (core/calendario_indice.py) con una consulta
+    por rango de fechas; si el navegador ya tiene la versión vigente del rango
+    (If-None-Match) responde 304 sin construir los eventos.
+    """
     start = request.GET.get('start', '')
     end = request.GET.get('end', '')
     tipo = request.GET.get('tipo', '')
@@ -103,114 +143,30 @@ def calendario_eventos_api(request):
     if responsable:
         equipos_qs = equipos_qs.filter(responsable=responsable)
 
-    eventos = []
     tipos_a_mostrar = [tipo] if tipo else ['calibracion', 'mantenimiento', 'comprobacion']
 
-    # --- Eventos programados (fechas futuras del modelo Equipo) ---
-    for equipo in equipos_qs.iterator():
-        equipo_props = {
-            'equipo_id': equipo.pk,
-            'equipo_nombre': equipo.nombre,
-            'equipo_codigo': equipo.codigo_interno,
-            'responsable': equipo.responsable or '',
-        }
-
-        if 'calibracion' in tipos_a_mostrar and equipo.proxima_calibracion:
-            if start_date <= equipo.proxima_calibracion <= end_date:
-                eventos.append(_build_event(
-                    title=f'[Cal] {equipo.nombre}',
-                    start_date=equipo.proxima_calibracion,
-                    color=COLORES['calibracion']['programado'],
-                    extra={**equipo_props, 'tipo': 'calibracion', 'estado': 'programado'},
-                ))
-
-        if 'mantenimiento' in tipos_a_mostrar and equipo.proximo_mantenimiento:
-            if start_date <= equipo.proximo_mantenimiento <= end_date:
-                eventos.append(_build_event(
-                    title=f'[Mant] {equipo.nombre}',
-                    start_date=equipo.proximo_mantenimiento,
-                    color=COLORES['mantenimiento']['programado'],
-                    extra={**equipo_props, 'tipo': 'mantenimiento', 'estado': 'programado'},
-                ))
-
-        if 'comprobacion' in tipos_a_mostrar and equipo.proxima_comprobacion:
-            if start_date <= equipo.proxima_comprobacion <= end_date:
-                eventos.append(_build_event(
-                    title=f'[Comp] {equipo.nombre}',
-                    start_date=equipo.proxima_comprobacion,
-                    color=COLORES['comprobacion']['programado'],
-                    extra={**equipo_props, 'tipo': 'comprobacion', 'estado': 'programado'},
-                ))
-
-    # --- Eventos realizados (registros históricos) ---
-    equipo_ids = equipos_qs.values_list('pk', flat=True)
-
-    if 'calibracion' in tipos_a_mostrar:
-        calibraciones = Calibracion.objects.filter(
-            equipo_id__in=equipo_ids,
-            fecha_calibracion__range=(start_date, end_date),
-        ).select_related('equipo')
-        for cal in calibraciones:
-            eventos.append(_build_event(
-                title=f'[Cal] {cal.equipo.nombre}',
-                start_date=cal.fecha_calibracion,
-                color=COLORES['calibracion']['realizado'],
-                extra={
-                    'equipo_id': cal.equipo.pk,
-                    'equipo_nombre': cal.equipo.nombre,
-                    'equipo_codigo': cal.equipo.codigo_interno,
-                    'responsable': cal.equipo.responsable or '',
-                    'tipo': 'calibracion',
-                    'estado': 'realizado',
-                    'resultado': getattr(cal, 'resultado', ''),
-                    'certificado': getattr(cal, 'numero_certificado', ''),
-                },
-            ))
-
-    if 'mantenimiento' in tipos_a_mostrar:
-        mantenimientos = Mantenimiento.objects.filter(
-            equipo_id__in=equipo_ids,
-            fecha_mantenimiento__range=(start_date, end_date),
-        ).select_related('equipo')
-        for mant in mantenimientos:
-            eventos.append(_build_event(
-                title=f'[Mant] {mant.equipo.nombre}',
-                start_date=mant.fecha_mantenimiento,
-                color=COLORES['mantenimiento']['realizado'],
-                extra={
-                    'equipo_id': mant.equipo.pk,
-                    'equipo_nombre': mant.equipo.nombre,
-                    'equipo_codigo': mant.equipo.codigo_interno,
-                    'responsable': mant.equipo.responsable or '',
-                    'tipo': 'mantenimiento',
-                    'estado': 'realizado',
-                    'tipo_mantenimiento': getattr(mant, 'tipo_mantenimiento', ''),
-                    'descripcion': getattr(mant, 'descripcion', ''),
-                },
-            ))
-
-    if 'comprobacion' in tipos_a_mostrar:
-        comprobaciones = Comprobacion.objects.filter(
-            equipo_id__in=equipo_ids,
-            fecha_comprobacion__range=(start_date, end_date),
-        ).select_related('equipo')
-        for comp in comprobaciones:
-            eventos.append(_build_event(
-                title=f'[Comp] {comp.equipo.nombre}',
-                start_date=comp.fecha_comprobacion,
-                color=COLORES['comprobacion']['realizado'],
-                extra={
-                    'equipo_id': comp.equipo.pk,
-                    'equipo_nombre': comp.equipo.nombre,
-                    'equipo_codigo': comp.equipo.codigo_interno,
-                    'responsable': comp.equipo.responsable or '',
-                    'tipo': 'comprobacion',
-                    'estado': 'realizado',
-                    'resultado': getattr(comp, 'resultado', ''),
-                },
-            ))
-
-    return JsonResponse(eventos, safe=False)
+    asegurar_indice(equipos_qs, end_date, max_equipos=max_equipos_por_lectura())
+    ocurrencias = ocurrencias_en_rango(
+        equipos_qs, start_date, end_date, tipos_a_mostrar, empresa_id=_empresa_id(request.user)
+    )
+
+    etag = etag_ocurrencias(
+        ocurrencias, request.user.is_superuser, request.user.empresa_id, start_date, end_date, tipo, responsable
+    )
+    no_modificado = get_conditional_response(request, etag=etag)
+    if no_modificado is not None:
+        return no_modificado
+
+    ocurrencias = ocurrencias.select_related('equipo').only(
+        'tipo', 'fecha', 'estado', 'detalle',
+        'equipo', 'equipo__nombre', 'equipo__codigo_interno', 'equipo__responsable',
+    ).order_by('fecha', 'id')
+    eventos = [_evento_de_ocurrencia(ocurrencia) for ocurrencia in ocurrencias]
+
+    response = JsonResponse(eventos, safe=False)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 # ============================================================================
@@ -220,7 +176,7 @@ def calendario_eventos_api(request):
 @access_check
 @login_required
 def calendario_exportar_ical(request):
-    """Exporta actividades programadas como archivo .ics."""
+    """Exporta las actividades programadas del índice como archivo .ics (streaming)."""
     tipo = request.GET.get('tipo', '')
     responsable = request.GET.get('responsable', '')
 
@@ -230,40 +186,44 @@ def calendario_exportar_ical(request):
 
     tipos_a_mostrar = [tipo] if tipo else ['calibracion', 'mantenimiento', 'comprobacion']
 
-    lines = [
+    hasta = horizonte()
+    asegurar_indice(equipos_qs, hasta, max_equipos=max_equipos_por_lectura())
+    ocurrencias = ocurrencias_en_rango(
+        equipos_qs, hasta=hasta, tipos=tipos_a_mostrar, estado='programado',
+        empresa_id=_empresa_id(request.user),
+    ).select_related('equipo').only(
+        'tipo', 'fecha', 'equipo', 'equipo__nombre', 'equipo__codigo_interno', 'equipo__responsable',
+    ).order_by('fecha', 'id')
+
+    response = StreamingHttpResponse(_lineas_ical(ocurrencias), content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="calendario_actividades.ics"'
+    return response
+
+
+def _lineas_ical(ocurrencias):
+    """Genera el .ics línea por línea recorriendo el índice por bloques."""
+    yield from (f'{linea}\r\n' for linea in [
         'BEGIN:VCALENDAR',
         'VERSION:2.0',
         'PRODID:-//SAM Metrologia//Calendario de Actividades//ES',
         'CALSCALE:GREGORIAN',
         'METHOD:PUBLISH',
-    ]
-
-    for equipo in equipos_qs.iterator():
-        actividades = []
-        if 'calibracion' in tipos_a_mostrar and equipo.proxima_calibracion:
-            actividades.append(('Calibración', equipo.proxima_calibracion))
-        if 'mantenimiento' in tipos_a_mostrar and equipo.proximo_mantenimiento:
-            actividades.append(('Mantenimiento', equipo.proximo_mantenimiento))
-        if 'comprobacion' in tipos_a_mostrar and equipo.proxima_comprobacion:
-            actividades.append(('Comprobación', equipo.proxima_comprobacion))
-
-        for act_tipo, act_fecha in actividades:
-            uid = f'{act_tipo.lower()}-{equipo.pk}-{act_fecha.isoformat()}@sam-metrologia'
-            fecha_str = act_fecha.strftime('%Y%m%d')
-            lines.extend([
-                'BEGIN:VEVENT',
-                f'UID:{uid}',
-                f'DTSTART;VALUE=DATE:{fecha_str}',
-                f'DTEND;VALUE=DATE:{fecha_str}',
-                f'SUMMARY:{act_tipo} - {equipo.nombre}',
-                f'DESCRIPTION:Equipo: {equipo.nombre} ({equipo.codigo_interno})\\n'
-                f'Responsable: {equipo.responsable or "N/A"}',
-                'END:VEVENT',
-            ])
-
-    lines.append('END:VCALENDAR')
-
-    content = '\r\n'.join(lines)
-    response = HttpResponse(content, content_type='text/calendar; charset=utf-8')
-    response['Content-Disposition'] = 'attachment; filename="calendario_actividades.ics"'
-    return response
+    ])
+
+    for ocurrencia in ocurrencias.iterator(chunk_size=1000):
+        equipo = ocurrencia.equipo
+        act_tipo = TIPO_LABELS[ocurrencia.tipo]
+        uid = f'{act_tipo.lower()}-{equipo.pk}-{ocurrencia.fecha.isoformat()}@sam-metrologia'
+        fecha_str = ocurrencia.fecha.strftime('%Y%m%d')
+        yield '\r\n'.join([
+            'BEGIN:VEVENT',
+            f'UID:{uid}',
+            f'DTSTART;VALUE=DATE:{fecha_str}',
+            f'DTEND;VALUE=DATE:{fecha_str}',
+            f'SUMMARY:{act_tipo} - {equipo.nombre}',
+            f'DESCRIPTION:Equipo: {equipo.nombre} ({equipo.codigo_interno})\\n'
+            f'Responsable: {equipo.responsable or "N/A"}',
+            'END:VEVENT',
+        ]) + '\r\n'
+
+    yield 'END:VCALENDAR\r\n'
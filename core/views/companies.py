@@ -965,7 +965,7 @@ def _process_company_logo(empresa, logo_file):
     nombre_archivo = sanitize_filename(archivo_subido.name)
     ruta_s3 = f'empresas_logos/{nombre_archivo}'
     try:
-        default_storage.save(ruta_s3, archivo_subido)
+        ruta_s3 = default_storage.save(ruta_s3, archivo_subido)
     except Exception as e:
         logger.error(
             f"Error al subir logo a R2 para empresa '{empresa.nombre}': "
@@ -975,5 +975,8 @@ def _process_company_logo(empresa, logo_file):
             "No se pudo subir el logo de la empresa al almacenamiento. "
             "Por favor intenta de nuevo o contacta al soporte."
         ) from e
+    if empresa.logo_empresa and empresa.logo_empresa.name != ruta_s3:
+        eliminar_registros(empresa, [empresa.logo_empresa.name])
+    registrar_archivo(empresa, ruta_s3, archivo_subido.size)
     empresa.logo_empresa = ruta_s3
     logger.info(f'Logo subido para empresa {empresa.nombre}: {ruta_s3}')
\ No newline at end of file
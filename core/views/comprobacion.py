@@ -10,15 +10,15 @@ from decimal import Decimal
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.files.base import ContentFile
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.views.decorators.http import require_http_methods
-from weasyprint import HTML
 
 from core.models import Comprobacion, Equipo
 from core.decorators_pdf import safe_pdf_response
+from core.render_pdf import renderizar_pdf
+from core.storage_ledger import guardar_archivo_generado
 
 logger = logging.getLogger(__name__)
 
@@ -504,12 +504,12 @@ def generar_pdf_comprobacion(request, equipo_id):
         html_string = render_to_string('core/comprobacion_metrologica_print.html', context)
 
         # Generar PDF
-        pdf_file = HTML(string=html_string, base_url=request.build_absolute_uri()).write_pdf()
+        pdf_file = renderizar_pdf(html_string)
 
         # Guardar PDF en el modelo
         fecha_str = comprobacion.fecha_comprobacion.strftime('%Y%m%d')
         filename = f'comprobacion_{equipo.codigo_interno}_{fecha_str}.pdf'
-        comprobacion.comprobacion_pdf.save(filename, ContentFile(pdf_file), save=False)
+        guardar_archivo_generado(comprobacion, 'comprobacion_pdf', filename, pdf_file)
 
         # ============ SISTEMA DE APROBACIÓN ============
         # Establecer creado_por y estado pendiente
@@ -15,15 +15,9 @@ from core.monitoring import monitor_view
 from datetime import datetime
 import json
 import re
-import base64
-from io import BytesIO
-import matplotlib
-matplotlib.use('Agg')  # Backend sin GUI
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-from matplotlib.lines import Line2D
-import numpy as np
 import logging
+from core.graficas import grafica_confirmacion
+from core.storage_ledger import guardar_archivo_generado
 
 logger = logging.getLogger('core')
 
@@ -54,255 +48,11 @@ def _generar_grafica_confirmacion(puntos_medicion, emp_valor, emp_unidad, unidad
     Genera gráfica de confirmación metrológica normalizada por EMP.
     Y = error / EMP_absoluto  →  límites siempre en ±1, sin efecto embudo.
     Las zonas de color se adaptan a la regla de decisión (ILAC G8:09/2019).
-    """
-    _NOMBRES_REGLA = {
-        'simple_acceptance': 'Aceptación Simple (sin banda de guarda)',
-        'guard_band_U':      'Banda de Guarda U Completa',
-        'guard_band_half':   'Banda de Guarda U/2',
-        'guard_band_sqrt':   'Banda Óptima √(EMP² − U²)',
-        'conditional':       'Aceptación Condicional (zona gris)',
-    }
-    try:
-        puntos_validos = [p for p in puntos_medicion
-                         if p.get('nominal') and (p.get('error') is not None or p.get('lectura') is not None)]
-        if not puntos_validos:
-            return None
-
-        nominales = [safe_float(p.get('nominal', 0), 0) for p in puntos_validos]
-
-        # Calcular error por punto
-        errores = []
-        for p in puntos_validos:
-            if p.get('error') is not None:
-                errores.append(safe_float(p['error'], 0))
-            else:
-                errores.append(safe_float(p.get('lectura', 0), 0) - safe_float(p['nominal'], 0))
-
-        incertidumbres = [safe_float(p.get('incertidumbre', 0), 0) for p in puntos_validos]
 
-        # Calcular EMP absoluto por punto (unifica % y abs)
-        emps_abs = []
-        for i, p in enumerate(puntos_validos):
-            if p.get('emp_absoluto') is not None and safe_float(p['emp_absoluto'], 0) != 0:
-                emps_abs.append(safe_float(p['emp_absoluto'], 0))
-            else:
-                n = nominales[i]
-                if emp_unidad == '%':
-                    emps_abs.append(abs(n) * (emp_valor / 100) if n != 0 else emp_valor)
-                else:
-                    emps_abs.append(emp_valor if emp_valor != 0 else 1)
-
-        # Normalizar: Y = error / EMP_abs  (±1 = en el límite)
-        y_norm = [e / ea if ea != 0 else 0 for e, ea in zip(errores, emps_abs)]
-        u_norm = [u / ea if ea != 0 else 0 for u, ea in zip(incertidumbres, emps_abs)]
-
-        # Ordenar por nominal ascendente — fill_between requiere x monotónico;
-        # si el usuario ingresó los puntos en orden inverso la zona de color queda cruzada
-        if len(nominales) > 1:
-            _ord = sorted(range(len(nominales)), key=lambda i: nominales[i])
-            nominales      = [nominales[i]      for i in _ord]
-            y_norm         = [y_norm[i]         for i in _ord]
-            u_norm         = [u_norm[i]         for i in _ord]
-            emps_abs       = [emps_abs[i]       for i in _ord]
-            puntos_validos = [puntos_validos[i] for i in _ord]
-
-        # Detectar si EMP varía entre puntos
-        emp_variable = max(emps_abs) / min(emps_abs) > 1.05 if min(emps_abs) > 0 else False
-
-        # Rango vertical: al menos ±1.6, o lo que requieran los datos
-        y_max_data = max((abs(y) + u for y, u in zip(y_norm, u_norm)), default=1.0)
-        y_max_plot = max(1.6, y_max_data * 1.15)
-
-        n_puntos = len(puntos_validos)
-        ancho_fig = max(12, n_puntos * 0.9)
-        markersize = max(4, 9 - max(0, n_puntos - 8))
-        fig, ax = plt.subplots(figsize=(ancho_fig, 6))
-
-        # Escala log en X si el rango nominal supera 100x
-        nominales_pos = [n for n in nominales if n > 0]
-        usar_log = len(nominales_pos) > 1 and max(nominales_pos) / min(nominales_pos) > 100
-        if usar_log:
-            ax.set_xscale('log')
-            import math
-            log_min = math.log10(min(nominales_pos))
-            log_max = math.log10(max(nominales_pos))
-            pad = (log_max - log_min) * 0.06
-            x_min_plot = 10 ** (log_min - pad)
-            x_max_plot = 10 ** (log_max + pad)
-            ax.set_xlim(x_min_plot, x_max_plot)
-        elif nominales:
-            span = max(nominales) - min(nominales)
-            margin = span * 0.06 if span > 0 else abs(nominales[0]) * 0.5 or 1
-            x_min_plot = min(nominales) - margin
-            x_max_plot = max(nominales) + margin
-            ax.set_xlim(x_min_plot, x_max_plot)
-        else:
-            x_min_plot, x_max_plot = -1.0, 1.0
-
-        # ── ZONAS DE COLOR según regla de decisión (zorder=0 → detrás de todo) ──
-        _Z = 0        # zorder zonas
-        _ZL = 1       # zorder líneas límite
-        _ALFA_EXT = 0.07    # rojo: fuera de ±EMP
-        _ALFA_BANDA = 0.25  # amarillo: banda de guarda
-        _ALFA_OK = 0.10     # verde: zona cumple
-
-        # Zona roja siempre fuera de ±1 (límite EMP normalizado)
-        ax.axhspan(1.0, y_max_plot, alpha=_ALFA_EXT, color='#ef4444', zorder=_Z)
-        ax.axhspan(-y_max_plot, -1.0, alpha=_ALFA_EXT, color='#ef4444', zorder=_Z)
-
-        legend_extras = []  # Patch/Line2D adicionales para la leyenda inferior
-
-        def _fill_zonas(lv_list, color_banda='#fde047', color_limite='#16a34a'):
-            """Dibuja zonas verde/amarillo per-punto (fill_between) o con axhspan si n=1."""
-            if n_puntos == 1:
-                lv = lv_list[0]
-                ax.axhspan(-lv, lv, alpha=_ALFA_OK, color='#22c55e', zorder=_Z)
-                if lv < 1.0:
-                    ax.axhspan(lv, 1.0, alpha=_ALFA_BANDA, color=color_banda, zorder=_Z)
-                    ax.axhspan(-1.0, -lv, alpha=_ALFA_BANDA, color=color_banda, zorder=_Z)
-                return
-            x_ext = [x_min_plot] + list(nominales) + [x_max_plot]
-            lv_ext = [lv_list[0]] + list(lv_list) + [lv_list[-1]]
-            lv_neg = [-v for v in lv_ext]
-            # Verde: entre -lv y +lv para cada punto
-            ax.fill_between(x_ext, lv_neg, lv_ext, alpha=_ALFA_OK, color='#22c55e',
-                            step='post', zorder=_Z)
-            # Amarillo: entre lv y 1 (y entre -1 y -lv) para cada punto
-            ax.fill_between(x_ext, lv_ext, [1.0] * len(x_ext), alpha=_ALFA_BANDA,
-                            color=color_banda, step='post', zorder=_Z)
-            ax.fill_between(x_ext, [-1.0] * len(x_ext), lv_neg, alpha=_ALFA_BANDA,
-                            color=color_banda, step='post', zorder=_Z)
-            # Línea de límite per-punto en escalón punteado
-            ax.step(x_ext, lv_ext, where='post', color=color_limite, linestyle=':',
-                    linewidth=1.5, zorder=_ZL)
-            ax.step(x_ext, lv_neg, where='post', color=color_limite, linestyle=':',
-                    linewidth=1.5, zorder=_ZL)
-
-        if regla_decision == 'simple_acceptance':
-            ax.axhspan(-1.0, 1.0, alpha=_ALFA_OK, color='#22c55e', zorder=_Z)
-            legend_extras = [
-                mpatches.Patch(facecolor='#22c55e', alpha=0.5, label='CUMPLE (|error| ≤ EMP)'),
-                mpatches.Patch(facecolor='#ef4444', alpha=0.5, label='NO CUMPLE (|error| > EMP)'),
-            ]
-
-        elif regla_decision == 'guard_band_U':
-            lv_por_punto = [max(0.0, 1.0 - un) for un in u_norm]
-            _fill_zonas(lv_por_punto)
-            legend_extras = [
-                Line2D([0], [0], color='#16a34a', linestyle=':', linewidth=2,
-                       label='Límite aceptación (EMP−U, por punto)'),
-                mpatches.Patch(facecolor='#22c55e', alpha=0.5, label='CUMPLE'),
-                mpatches.Patch(facecolor='#fde047', alpha=0.5, label='NO CUMPLE (banda w=U)'),
-                mpatches.Patch(facecolor='#ef4444', alpha=0.5, label='NO CUMPLE (fuera EMP)'),
-            ]
-
-        elif regla_decision == 'guard_band_half':
-            lv_por_punto = [max(0.0, 1.0 - un / 2.0) for un in u_norm]
-            _fill_zonas(lv_por_punto)
-            legend_extras = [
-                Line2D([0], [0], color='#16a34a', linestyle=':', linewidth=2,
-                       label='Límite aceptación (EMP−U/2, por punto)'),
-                mpatches.Patch(facecolor='#22c55e', alpha=0.5, label='CUMPLE'),
-                mpatches.Patch(facecolor='#fde047', alpha=0.5, label='NO CUMPLE (banda w=U/2)'),
-                mpatches.Patch(facecolor='#ef4444', alpha=0.5, label='NO CUMPLE (fuera EMP)'),
-            ]
-
-        elif regla_decision == 'guard_band_sqrt':
-            lv_por_punto = [(max(0.0, 1.0 - un ** 2)) ** 0.5 if un < 1.0 else 0.0
-                            for un in u_norm]
-            _fill_zonas(lv_por_punto)
-            legend_extras = [
-                Line2D([0], [0], color='#16a34a', linestyle=':', linewidth=2,
-                       label='Límite aceptación (√(EMP²−U²), por punto)'),
-                mpatches.Patch(facecolor='#22c55e', alpha=0.5, label='CUMPLE'),
-                mpatches.Patch(facecolor='#fde047', alpha=0.5, label='NO CUMPLE (banda óptima)'),
-                mpatches.Patch(facecolor='#ef4444', alpha=0.5, label='NO CUMPLE (fuera EMP)'),
-            ]
-
-        elif regla_decision == 'conditional':
-            lv_por_punto = [max(0.0, 1.0 - un) for un in u_norm]
-            _fill_zonas(lv_por_punto, color_banda='#fde047', color_limite='#d97706')
-            legend_extras = [
-                Line2D([0], [0], color='#d97706', linestyle=':', linewidth=2,
-                       label='Límite zona gris (EMP−U, por punto)'),
-                mpatches.Patch(facecolor='#22c55e', alpha=0.5, label='CUMPLE'),
-                mpatches.Patch(facecolor='#fde047', alpha=0.5, label='CONDICIONAL (zona gris)'),
-                mpatches.Patch(facecolor='#ef4444', alpha=0.5, label='NO CUMPLE'),
-            ]
-
-        else:
-            # Fallback genérico
-            ax.axhspan(-1.0, 1.0, alpha=0.06, color='#22c55e', zorder=_Z)
-
-        # ── PUNTOS con barras de incertidumbre (zorder=3 → encima de zonas) ──────
-        ax.errorbar(nominales, y_norm, yerr=u_norm,
-                   fmt='o-', color='#3b82f6', linewidth=2, markersize=markersize,
-                   ecolor='#60a5fa', elinewidth=2, capsize=4, capthick=2,
-                   label='Error normalizado (Error/EMP) ± U', zorder=3)
-
-        # ── LÍMITES EMP: siempre ±1 (zorder=2) ──────────────────────────────────
-        if emp_variable:
-            ax.step(nominales, [1.0] * n_puntos, where='mid',
-                   color='#dc2626', linestyle='--', linewidth=2,
-                   label='Límite EMP (variable)', zorder=2)
-            ax.step(nominales, [-1.0] * n_puntos, where='mid',
-                   color='#dc2626', linestyle='--', linewidth=2, zorder=2)
-            for i, (n, ea) in enumerate(zip(nominales, emps_abs)):
-                ax.annotate(f'{ea:.3g} {unidad_equipo}', xy=(n, 1.0), xytext=(0, 6),
-                           textcoords='offset points', ha='center',
-                           fontsize=7, color='darkred')
-        else:
-            ax.axhline(y=1.0, color='#dc2626', linestyle='--', linewidth=2,
-                       label='+EMP (límite)', zorder=2)
-            ax.axhline(y=-1.0, color='#dc2626', linestyle='--', linewidth=2,
-                       label='−EMP (límite)', zorder=2)
-
-        ax.axhline(y=0, color='black', linestyle='-', linewidth=1, alpha=0.3, zorder=1)
-
-        # ── Etiquetas y formato ──────────────────────────────────────────────────
-        nombre_regla = _NOMBRES_REGLA.get(regla_decision, regla_decision)
-        ax.set_xlabel(f'Valor Nominal ({unidad_equipo})', fontsize=12, fontweight='bold')
-        ax.set_ylabel('Error normalizado  (Error / EMP)', fontsize=12, fontweight='bold')
-        ax.set_title(
-            f'Confirmación Metrológica — {nombre_regla}\n'
-            f'Eje Y normalizado por EMP  (±1 = límite EMP, ILAC G8:09/2019)',
-            fontsize=12, fontweight='bold', pad=20
-        )
-        ax.set_ylim(-y_max_plot, y_max_plot)
-
-        # ── Leyenda en la parte inferior ────────────────────────────────────────
-        legend_elements = [
-            Line2D([0], [0], color='#3b82f6', marker='o', markersize=6,
-                   label='Error normalizado (Error/EMP) ± U'),
-        ]
-        if emp_variable:
-            legend_elements.append(
-                Line2D([0], [0], color='#dc2626', linestyle='--', linewidth=2,
-                       label='Límite EMP (variable)')
-            )
-        else:
-            legend_elements.append(
-                Line2D([0], [0], color='#dc2626', linestyle='--', linewidth=2,
-                       label='±EMP (límite)')
-            )
-        legend_elements.extend(legend_extras)
-
-        ax.legend(handles=legend_elements, loc='upper center', bbox_to_anchor=(0.5, -0.12),
-                  ncol=3, fontsize=9, framealpha=0.95, edgecolor='gray')
-        ax.grid(True, alpha=0.3, linestyle='--')
-        plt.tight_layout()
-        plt.subplots_adjust(bottom=0.15)
-
-        buffer = BytesIO()
-        plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.read()).decode('utf-8')
-        plt.close(fig)
-        return f'data:image/png;base64,{image_base64}'
-
-    except Exception as e:
-        logger.error(f"Error generando gráfica confirmacion: {str(e)}")
-        return None
+    SVG memoizado por datos, EMP y regla (core/graficas.py); matplotlib
+    solo como respaldo. Retorna un data URI o None.
+    """
+    return grafica_confirmacion(puntos_medicion, emp_valor, emp_unidad, unidad_equipo, regla_decision)
 
 
 def _preparar_contexto_confirmacion(request, equipo, ultima_calibracion, datos_confirmacion=None):
@@ -967,7 +717,6 @@ def generar_pdf_confirmacion(request, equipo_id):
     Si se pasa calibracion_id por GET, usa esa calibración específica
     """
     from django.template.loader import render_to_string
-    from django.core.files.base import ContentFile
     from django.contrib import messages
     import json
 
@@ -1043,7 +792,7 @@ def generar_pdf_confirmacion(request, equipo_id):
     # Preparar contexto (igual que confirmacion_metrologica pero con datos del POST)
     context = _preparar_contexto_confirmacion(request, equipo, ultima_calibracion, datos_confirmacion)
 
-    # ============ GENERAR GRÁFICA(S) CON MATPLOTLIB ============
+    # ============ GENERAR GRÁFICA(S) (SVG memoizado, core/graficas.py) ============
     es_v2 = datos_confirmacion and 'magnitudes' in datos_confirmacion
     if es_v2:
         # v2: una gráfica por magnitud; la incrustamos en cada magnitud del template
@@ -1089,12 +838,9 @@ def generar_pdf_confirmacion(request, equipo_id):
 
     # Generar PDF con WeasyPrint
     try:
-        from weasyprint import HTML, CSS
-        from weasyprint.text.fonts import FontConfiguration
+        from core.render_pdf import renderizar_pdf
 
-        font_config = FontConfiguration()
-        html_pdf = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-        pdf_file = html_pdf.write_pdf(font_config=font_config)
+        pdf_file = renderizar_pdf(html_string)
 
         # ============ GUARDAR DATOS JSON PARA CÁLCULO DE DERIVA ============
         def _procesar_puntos(puntos):
@@ -1192,9 +938,8 @@ def generar_pdf_confirmacion(request, equipo_id):
 
         # GUARDAR EN BD - Campo confirmacion_metrologica_pdf de Calibracion
         filename = f'confirmacion_metrologica_{equipo.codigo_interno}_{ultima_calibracion.fecha_calibracion.strftime("%Y%m%d")}.pdf'
-        ultima_calibracion.confirmacion_metrologica_pdf.save(
-            filename,
-            ContentFile(pdf_file),
+        guardar_archivo_generado(
+            ultima_calibracion, 'confirmacion_metrologica_pdf', filename, pdf_file,
             save=False  # No guardar aún
         )
 
@@ -1262,7 +1007,6 @@ def generar_pdf_intervalos(request, equipo_id):
     - metodo1_resultado, metodo2_deriva, metodo3_horas: Datos de cada método
     """
     from django.template.loader import render_to_string
-    from django.core.files.base import ContentFile
     from django.contrib import messages
     from django.http import JsonResponse
     from django.urls import reverse
@@ -1450,12 +1194,9 @@ def generar_pdf_intervalos(request, equipo_id):
 
     # Generar PDF con WeasyPrint
     try:
-        from weasyprint import HTML
-        from weasyprint.text.fonts import FontConfiguration
+        from core.render_pdf import renderizar_pdf
 
-        font_config = FontConfiguration()
-        html_pdf = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-        pdf_file = html_pdf.write_pdf(font_config=font_config)
+        pdf_file = renderizar_pdf(html_string)
 
         # ============ ACTUALIZAR INTERVALO AUTOMÁTICAMENTE (ANTES DE GUARDAR PDF) ============
         nuevo_intervalo = safe_float(datos_intervalos.get('intervalo_definitivo', equipo.frecuencia_calibracion_meses or 12), 12)
@@ -1479,9 +1220,8 @@ def generar_pdf_intervalos(request, equipo_id):
 
         try:
             filename = f'intervalos_calibracion_{equipo.codigo_interno}_{calibracion_actual.fecha_calibracion.strftime("%Y%m%d")}.pdf'
-            calibracion_actual.intervalos_calibracion_pdf.save(
-                filename,
-                ContentFile(pdf_file),
+            guardar_archivo_generado(
+                calibracion_actual, 'intervalos_calibracion_pdf', filename, pdf_file,
                 save=False  # No guardar aún
             )
 
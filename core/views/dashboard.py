@@ -4,52 +4,15 @@
 from .base import *
 import json
 from django.core.cache import cache
+from ..proyecciones import (
+    ProyeccionActividades, get_justificacion_incumplimiento, proyectar_actividades, proyectar_anio,
+)
 from ..constants import (
     ESTADO_ACTIVO, ESTADO_INACTIVO, ESTADO_DE_BAJA,
     PRESTAMO_ACTIVO, PRESTAMO_DEVUELTO,
 )
 
 
-def get_justificacion_incumplimiento(equipo, status):
-    """
-    Obtiene la justificación del incumplimiento según el estado del equipo y el status de la actividad.
-
-    Lógica:
-    - Si estado_equipo == 'Inactivo' → equipo.observaciones
-    - Si estado_equipo == 'De Baja' → baja_registro.razon_baja + observaciones
-    - Si estado_equipo == 'Activo' AND status == 'No Cumplido' → equipo.observaciones
-    """
-    justificacion = ""
-
-    # Solo agregar justificación si no se cumplió
-    if status != 'No Cumplido':
-        return justificacion
-
-    estado = equipo.estado
-
-    if estado == ESTADO_INACTIVO:
-        justificacion = equipo.observaciones or "Equipo inactivo sin observaciones registradas"
-
-    elif estado == ESTADO_DE_BAJA:
-        # Buscar registro de baja
-        if hasattr(equipo, 'baja_registro') and equipo.baja_registro:
-            baja = equipo.baja_registro
-            justificacion = f"BAJA: {baja.razon_baja}"
-            if baja.observaciones:
-                justificacion += f" | {baja.observaciones}"
-        else:
-            justificacion = "Equipo dado de baja sin registro detallado"
-
-    elif estado == ESTADO_ACTIVO:
-        justificacion = equipo.observaciones or "Equipo activo - no cumplió sin observaciones registradas"
-
-    else:
-        # Otros estados (En Calibración, En Mantenimiento, etc.)
-        justificacion = equipo.observaciones or f"Estado: {estado}"
-
-    return justificacion
-
-
 def get_projected_activities_for_year(equipos_queryset, activity_type, year, today):
     """
     Obtiene las actividades proyectadas para el año especificado
@@ -64,117 +27,12 @@ def get_projected_activities_for_year(equipos_queryset, activity_type, year, tod
     - Equipo De Baja: actividades desde fecha_baja → No Cumplido; año anterior → excluido
     - Equipo Inactivo: fechas pasadas no realizadas → No Cumplido; fechas futuras → Pendiente
 
-    OPTIMIZACIÓN: Pre-fetch bulk — 2-3 queries total independiente del número de equipos.
-    Elimina el N+1 anterior (1 query por equipo × fecha programada).
+    Materializa un dict por ocurrencia. Para conteos usar directamente
+    core.proyecciones.proyectar_anio(...).conteos().
     """
-    from django.db.models import Max
-
-    equipos = list(equipos_queryset)
-    if not equipos:
+    if activity_type not in ('calibracion', 'comprobacion'):
         return []
-
-    equipo_ids = [e.id for e in equipos]
-
-    # ── Pre-fetch 1: última actividad por equipo (para plan_start_date) ──
-    # ── Pre-fetch 2: actividades del año → set O(1) para lookup ──────────
-    if activity_type == 'calibracion':
-        ultimas = dict(
-            Calibracion.objects.filter(equipo_id__in=equipo_ids)
-            .values('equipo_id')
-            .annotate(u=Max('fecha_calibracion'))
-            .values_list('equipo_id', 'u')
-        )
-        realizadas_set = set(
-            Calibracion.objects.filter(
-                equipo_id__in=equipo_ids,
-                fecha_calibracion__year=year,
-            ).values_list('equipo_id', 'fecha_calibracion__month')
-        )
-    elif activity_type == 'comprobacion':
-        ultimas = dict(
-            Comprobacion.objects.filter(equipo_id__in=equipo_ids)
-            .values('equipo_id')
-            .annotate(u=Max('fecha_comprobacion'))
-            .values_list('equipo_id', 'u')
-        )
-        ultimas_cal = dict(
-            Calibracion.objects.filter(equipo_id__in=equipo_ids)
-            .values('equipo_id')
-            .annotate(u=Max('fecha_calibracion'))
-            .values_list('equipo_id', 'u')
-        )
-        realizadas_set = set(
-            Comprobacion.objects.filter(
-                equipo_id__in=equipo_ids,
-                fecha_comprobacion__year=year,
-            ).values_list('equipo_id', 'fecha_comprobacion__month')
-        )
-    else:
-        return []
-
-    projected_activities = []
-
-    for equipo in equipos:
-        if activity_type == 'calibracion':
-            if not equipo.frecuencia_calibracion_meses:
-                continue
-            freq = int(equipo.frecuencia_calibracion_meses)
-            plan_start_date = ultimas.get(equipo.id) or equipo.fecha_adquisicion
-            if not plan_start_date:
-                continue
-        else:  # comprobacion
-            if not equipo.frecuencia_comprobacion_meses:
-                continue
-            freq = int(equipo.frecuencia_comprobacion_meses)
-            plan_start_date = (
-                ultimas.get(equipo.id)
-                or ultimas_cal.get(equipo.id)
-                or equipo.fecha_adquisicion
-            )
-            if not plan_start_date:
-                continue
-
-        if freq <= 0:
-            continue
-
-        # --- Determinar restricción por baja ---
-        fecha_baja = None
-
-        if equipo.estado == ESTADO_DE_BAJA:
-            if hasattr(equipo, 'baja_registro') and equipo.baja_registro:
-                fecha_baja = equipo.baja_registro.fecha_baja
-                if fecha_baja.year < year:
-                    continue
-            else:
-                continue
-        # ----------------------------------------
-
-        current_date = plan_start_date
-        while current_date.year < year:
-            current_date += relativedelta(months=freq)
-
-        while current_date.year == year:
-            realizadas = (equipo.id, current_date.month) in realizadas_set
-
-            if realizadas:
-                status = 'Realizado'
-            elif fecha_baja and current_date >= fecha_baja:
-                status = 'No Cumplido'
-            elif current_date < today:
-                status = 'No Cumplido'
-            else:
-                status = 'Pendiente/Programado'
-
-            projected_activities.append({
-                'equipo': equipo,
-                'fecha_programada': current_date,
-                'status': status,
-                'justificacion': get_justificacion_incumplimiento(equipo, status),
-            })
-
-            current_date += relativedelta(months=freq)
-
-    return projected_activities
+    return proyectar_anio(equipos_queryset, activity_type, year, today).filas()
 
 
 def get_projected_maintenance_compliance_for_year(equipos_queryset, year, today):
@@ -187,98 +45,9 @@ def get_projected_maintenance_compliance_for_year(equipos_queryset, year, today)
     3. Fecha de adquisición
     4. NUNCA fecha de registro
 
-    Incluye equipos De Baja/Inactivos del año actual para cumplimiento correcto:
-    - Equipo De Baja: actividades desde fecha_baja → No Cumplido; año anterior → excluido
-    - Equipo Inactivo: fechas pasadas no realizadas → No Cumplido; fechas futuras → Pendiente
-
-    OPTIMIZACIÓN: Pre-fetch bulk — 3 queries total independiente del número de equipos.
-    Elimina el N+1 anterior (1 query por equipo × fecha programada).
+    Misma lógica de De Baja/Inactivos que get_projected_activities_for_year.
     """
-    from django.db.models import Max
-
-    equipos = list(equipos_queryset)
-    if not equipos:
-        return []
-
-    equipo_ids = [e.id for e in equipos]
-
-    # ── Pre-fetch bulk: 3 queries total ──────────────────────────────────
-    ultimas_mant = dict(
-        Mantenimiento.objects.filter(equipo_id__in=equipo_ids)
-        .values('equipo_id')
-        .annotate(u=Max('fecha_mantenimiento'))
-        .values_list('equipo_id', 'u')
-    )
-    ultimas_cal = dict(
-        Calibracion.objects.filter(equipo_id__in=equipo_ids)
-        .values('equipo_id')
-        .annotate(u=Max('fecha_calibracion'))
-        .values_list('equipo_id', 'u')
-    )
-    realizados_set = set(
-        Mantenimiento.objects.filter(
-            equipo_id__in=equipo_ids,
-            fecha_mantenimiento__year=year,
-        ).values_list('equipo_id', 'fecha_mantenimiento__month')
-    )
-    # ─────────────────────────────────────────────────────────────────────
-
-    projected_maintenances = []
-
-    for equipo in equipos:
-        if not equipo.frecuencia_mantenimiento_meses:
-            continue
-
-        plan_start_date = (
-            ultimas_mant.get(equipo.id)
-            or ultimas_cal.get(equipo.id)
-            or equipo.fecha_adquisicion
-        )
-        if not plan_start_date:
-            continue
-
-        freq = int(equipo.frecuencia_mantenimiento_meses)
-        if freq <= 0:
-            continue
-
-        # --- Determinar restricción por baja ---
-        fecha_baja = None
-
-        if equipo.estado == ESTADO_DE_BAJA:
-            if hasattr(equipo, 'baja_registro') and equipo.baja_registro:
-                fecha_baja = equipo.baja_registro.fecha_baja
-                if fecha_baja.year < year:
-                    continue
-            else:
-                continue
-        # ----------------------------------------
-
-        current_date = plan_start_date
-        while current_date.year < year:
-            current_date += relativedelta(months=freq)
-
-        while current_date.year == year:
-            realizados = (equipo.id, current_date.month) in realizados_set
-
-            if realizados:
-                status = 'Realizado'
-            elif fecha_baja and current_date >= fecha_baja:
-                status = 'No Cumplido'
-            elif current_date < today:
-                status = 'No Cumplido'
-            else:
-                status = 'Pendiente/Programado'
-
-            projected_maintenances.append({
-                'equipo': equipo,
-                'fecha_programada': current_date,
-                'status': status,
-                'justificacion': get_justificacion_incumplimiento(equipo, status),
-            })
-
-            current_date += relativedelta(months=freq)
-
-    return projected_maintenances
+    return proyectar_anio(equipos_queryset, 'mantenimiento', year, today).filas()
 
 
 @login_required
@@ -921,17 +690,17 @@ def _get_pie_chart_data(equipos_queryset, equipos_para_dashboard, current_year,
     })
 
     # Calibraciones (cumplimiento anual) - Solo equipos activos
-    projected_calibraciones = get_projected_activities_for_year(equipos_para_dashboard, 'calibracion', current_year, today)
+    projected_calibraciones = proyectar_anio(equipos_para_dashboard, 'calibracion', current_year, today)
     cal_data = _process_projected_activities_for_pie(projected_calibraciones, 'cal')
     pie_data.update(cal_data)
 
     # Comprobaciones (cumplimiento anual) - Solo equipos activos
-    projected_comprobaciones = get_projected_activities_for_year(equipos_para_dashboard, 'comprobacion', current_year, today)
+    projected_comprobaciones = proyectar_anio(equipos_para_dashboard, 'comprobacion', current_year, today)
     comp_data = _process_projected_activities_for_pie(projected_comprobaciones, 'comp')
     pie_data.update(comp_data)
 
     # Mantenimientos (cumplimiento anual) - Solo equipos activos
-    projected_mantenimientos = get_projected_maintenance_compliance_for_year(equipos_para_dashboard, current_year, today)
+    projected_mantenimientos = proyectar_anio(equipos_para_dashboard, 'mantenimiento', current_year, today)
     mant_data = _process_projected_activities_for_pie(projected_mantenimientos, 'mant')
     pie_data.update(mant_data)
 
@@ -1028,12 +797,22 @@ def _get_chart_json_data(graficos_data):
 
 
 def _process_projected_activities_for_pie(projected_activities, prefix):
-    """Procesa actividades proyectadas para gráficos de torta"""
+    """
+    Procesa actividades proyectadas para gráficos de torta.
 
+    Acepta una ProyeccionActividades (conteo columnar, sin materializar filas)
+    o la lista de dicts de get_projected_*.
+    """
+    if isinstance(projected_activities, ProyeccionActividades):
+        conteos = projected_activities.conteos()
+        realized = conteos['realizadas']
+        no_cumplido = conteos['no_cumplidas']
+        pendiente = conteos['pendientes']
+    else:
+        realized = sum(1 for act in projected_activities if act['status'] == 'Realizado')
+        no_cumplido = sum(1 for act in projected_activities if act['status'] == 'No Cumplido')
+        pendiente = sum(1 for act in projected_activities if act['status'] == 'Pendiente/Programado')
     total_programmed = len(projected_activities)
-    realized = sum(1 for act in projected_activities if act['status'] == 'Realizado')
-    no_cumplido = sum(1 for act in projected_activities if act['status'] == 'No Cumplido')
-    pendiente = sum(1 for act in projected_activities if act['status'] == 'Pendiente/Programado')
 
     if total_programmed == 0:
         return {
@@ -1307,15 +1086,10 @@ def get_chart_details(request):
     result = []
 
     if chart_type == 'pie':
-        # Obtener actividades proyectadas del año (TODOS los equipos)
-        if activity_type == 'calibracion':
-            projected_activities = get_projected_activities_for_year(equipos_para_proyecciones, 'calibracion', current_year, today)
-        elif activity_type == 'mantenimiento':
-            projected_activities = get_projected_maintenance_compliance_for_year(equipos_para_proyecciones, current_year, today)
-        elif activity_type == 'comprobacion':
-            projected_activities = get_projected_activities_for_year(equipos_para_proyecciones, 'comprobacion', current_year, today)
-        else:
+        # Obtener actividades proyectadas del año (TODOS los equipos), en columnas
+        if activity_type not in ('calibracion', 'mantenimiento', 'comprobacion'):
             return JsonResponse({'error': 'Tipo de actividad inválido'}, status=400)
+        projected_activities = proyectar_anio(equipos_para_proyecciones, activity_type, current_year, today)
 
         # DEBUG: Log de actividades proyectadas
         import logging
@@ -1323,18 +1097,16 @@ def get_chart_details(request):
         logger.info(f"=== API CHART DETAILS DEBUG ===")
         logger.info(f"Activity type: {activity_type}")
         logger.info(f"Current year: {current_year}")
-        logger.info(f"Today: {today}")
-        logger.info(f"Equipos queryset count: {equipos_queryset.count()}")
-        logger.info(f"Equipos para proyecciones count: {equipos_para_proyecciones.count()}")
         logger.info(f"Total projected activities: {len(projected_activities)}")
         logger.info(f"Status filter received: {status_filter}")
 
-        # Contar por status y mostrar detalle
-        status_counts = {}
-        for act in projected_activities:
-            status = act['status']
-            status_counts[status] = status_counts.get(status, 0) + 1
-            logger.info(f"  - {act['equipo'].codigo_interno}: {act['fecha_programada']} -> {status}")
+        # Contar por status
+        conteos = projected_activities.conteos()
+        status_counts = {
+            'Realizado': conteos['realizadas'],
+            'No Cumplido': conteos['no_cumplidas'],
+            'Pendiente/Programado': conteos['pendientes'],
+        }
         logger.info(f"Status distribution: {status_counts}")
 
         # Normalizar el status_filter para manejar plural/singular
@@ -1351,28 +1123,27 @@ def get_chart_details(request):
         # Inicializar normalized_status
         normalized_status = None
 
-        # Si no hay status_filter o es "all", devolver todas
+        # Solo se materializan las filas que se devuelven
         if not status_filter or status_filter.lower() == 'all' or status_filter == 'Todas':
-            filtered = projected_activities
+            filtered = projected_activities.filas()
             logger.info(f"Returning all activities: {len(filtered)}")
         else:
             normalized_status = status_map.get(status_filter, status_filter)
             logger.info(f"Normalized status: {normalized_status}")
 
             # Filtrar por estado
-            filtered = [act for act in projected_activities if act['status'] == normalized_status]
+            filtered = projected_activities.filas(status=normalized_status)
             logger.info(f"Filtered activities count: {len(filtered)}")
 
         # Formatear para respuesta
         for act in filtered:
-            justificacion = get_justificacion_incumplimiento(act['equipo'], act['status'])
             result.append({
                 'codigo': act['equipo'].codigo_interno,
                 'nombre': act['equipo'].nombre,
                 'estado_equipo': act['equipo'].estado,
                 'fecha_programada': act['fecha_programada'].strftime('%d/%m/%Y'),
                 'status': act['status'],
-                'justificacion': justificacion
+                'justificacion': act['justificacion']
             })
 
     elif chart_type == 'line':
@@ -1515,196 +1286,16 @@ def get_projected_activities_for_range(equipos_queryset, activity_type, start_da
     Actividades proyectadas entre start_date y end_date (inclusivo).
     Misma lógica que get_projected_activities_for_year pero para un rango arbitrario.
     """
-    from django.db.models import Max
-
-    equipos = list(equipos_queryset)
-    if not equipos:
+    if activity_type not in ('calibracion', 'comprobacion'):
         return []
-
-    equipo_ids = [e.id for e in equipos]
-
-    if activity_type == 'calibracion':
-        ultimas = dict(
-            Calibracion.objects.filter(equipo_id__in=equipo_ids)
-            .values('equipo_id')
-            .annotate(u=Max('fecha_calibracion'))
-            .values_list('equipo_id', 'u')
-        )
-        realizadas_set = set(
-            Calibracion.objects.filter(
-                equipo_id__in=equipo_ids,
-                fecha_calibracion__gte=start_date,
-                fecha_calibracion__lte=end_date,
-            ).values_list('equipo_id', 'fecha_calibracion__year', 'fecha_calibracion__month')
-        )
-    elif activity_type == 'comprobacion':
-        ultimas = dict(
-            Comprobacion.objects.filter(equipo_id__in=equipo_ids)
-            .values('equipo_id')
-            .annotate(u=Max('fecha_comprobacion'))
-            .values_list('equipo_id', 'u')
-        )
-        ultimas_cal = dict(
-            Calibracion.objects.filter(equipo_id__in=equipo_ids)
-            .values('equipo_id')
-            .annotate(u=Max('fecha_calibracion'))
-            .values_list('equipo_id', 'u')
-        )
-        realizadas_set = set(
-            Comprobacion.objects.filter(
-                equipo_id__in=equipo_ids,
-                fecha_comprobacion__gte=start_date,
-                fecha_comprobacion__lte=end_date,
-            ).values_list('equipo_id', 'fecha_comprobacion__year', 'fecha_comprobacion__month')
-        )
-    else:
-        return []
-
-    projected_activities = []
-
-    for equipo in equipos:
-        if activity_type == 'calibracion':
-            if not equipo.frecuencia_calibracion_meses:
-                continue
-            freq = int(equipo.frecuencia_calibracion_meses)
-            plan_start_date = ultimas.get(equipo.id) or equipo.fecha_adquisicion
-            if not plan_start_date:
-                continue
-        else:
-            if not equipo.frecuencia_comprobacion_meses:
-                continue
-            freq = int(equipo.frecuencia_comprobacion_meses)
-            plan_start_date = (
-                ultimas.get(equipo.id)
-                or ultimas_cal.get(equipo.id)
-                or equipo.fecha_adquisicion
-            )
-            if not plan_start_date:
-                continue
-
-        if freq <= 0:
-            continue
-
-        fecha_baja = None
-        if equipo.estado == ESTADO_DE_BAJA:
-            if hasattr(equipo, 'baja_registro') and equipo.baja_registro:
-                fecha_baja = equipo.baja_registro.fecha_baja
-                if fecha_baja < start_date:
-                    continue
-            else:
-                continue
-
-        current_date = plan_start_date
-        while current_date < start_date:
-            current_date += relativedelta(months=freq)
-
-        while current_date <= end_date:
-            realizadas = (equipo.id, current_date.year, current_date.month) in realizadas_set
-
-            if realizadas:
-                status = 'Realizado'
-            elif fecha_baja and current_date >= fecha_baja:
-                status = 'No Cumplido'
-            elif current_date < today:
-                status = 'No Cumplido'
-            else:
-                status = 'Pendiente/Programado'
-
-            projected_activities.append({
-                'equipo': equipo,
-                'fecha_programada': current_date,
-                'status': status,
-            })
-
-            current_date += relativedelta(months=freq)
-
-    return projected_activities
+    return proyectar_actividades(equipos_queryset, activity_type, start_date, end_date, today).filas(justificacion=False)
 
 
 def get_projected_maintenance_for_range(equipos_queryset, start_date, end_date, today):
     """
     Mantenimientos proyectados entre start_date y end_date (inclusivo).
     """
-    from django.db.models import Max
-
-    equipos = list(equipos_queryset)
-    if not equipos:
-        return []
-
-    equipo_ids = [e.id for e in equipos]
-
-    ultimas_mant = dict(
-        Mantenimiento.objects.filter(equipo_id__in=equipo_ids)
-        .values('equipo_id')
-        .annotate(u=Max('fecha_mantenimiento'))
-        .values_list('equipo_id', 'u')
-    )
-    ultimas_cal = dict(
-        Calibracion.objects.filter(equipo_id__in=equipo_ids)
-        .values('equipo_id')
-        .annotate(u=Max('fecha_calibracion'))
-        .values_list('equipo_id', 'u')
-    )
-    realizados_set = set(
-        Mantenimiento.objects.filter(
-            equipo_id__in=equipo_ids,
-            fecha_mantenimiento__gte=start_date,
-            fecha_mantenimiento__lte=end_date,
-        ).values_list('equipo_id', 'fecha_mantenimiento__year', 'fecha_mantenimiento__month')
-    )
-
-    projected_maintenances = []
-
-    for equipo in equipos:
-        if not equipo.frecuencia_mantenimiento_meses:
-            continue
-
-        plan_start_date = (
-            ultimas_mant.get(equipo.id)
-            or ultimas_cal.get(equipo.id)
-            or equipo.fecha_adquisicion
-        )
-        if not plan_start_date:
-            continue
-
-        freq = int(equipo.frecuencia_mantenimiento_meses)
-        if freq <= 0:
-            continue
-
-        fecha_baja = None
-        if equipo.estado == ESTADO_DE_BAJA:
-            if hasattr(equipo, 'baja_registro') and equipo.baja_registro:
-                fecha_baja = equipo.baja_registro.fecha_baja
-                if fecha_baja < start_date:
-                    continue
-            else:
-                continue
-
-        current_date = plan_start_date
-        while current_date < start_date:
-            current_date += relativedelta(months=freq)
-
-        while current_date <= end_date:
-            realizados = (equipo.id, current_date.year, current_date.month) in realizados_set
-
-            if realizados:
-                status = 'Realizado'
-            elif fecha_baja and current_date >= fecha_baja:
-                status = 'No Cumplido'
-            elif current_date < today:
-                status = 'No Cumplido'
-            else:
-                status = 'Pendiente/Programado'
-
-            projected_maintenances.append({
-                'equipo': equipo,
-                'fecha_programada': current_date,
-                'status': status,
-            })
-
-            current_date += relativedelta(months=freq)
-
-    return projected_maintenances
+    return proyectar_actividades(equipos_queryset, 'mantenimiento', start_date, end_date, today).filas(justificacion=False)
 
 
 @login_required
@@ -1742,9 +1333,9 @@ def tortas_rango(request):
     equipos_queryset = _get_equipos_queryset(user, selected_company_id, empresas_disponibles)
     equipos_para_dashboard = equipos_queryset.select_related('baja_registro')
 
-    projected_cal = get_projected_activities_for_range(equipos_para_dashboard, 'calibracion', start_date, end_date, today)
-    projected_comp = get_projected_activities_for_range(equipos_para_dashboard, 'comprobacion', start_date, end_date, today)
-    projected_mant = get_projected_maintenance_for_range(equipos_para_dashboard, start_date, end_date, today)
+    projected_cal = proyectar_actividades(equipos_para_dashboard, 'calibracion', start_date, end_date, today)
+    projected_comp = proyectar_actividades(equipos_para_dashboard, 'comprobacion', start_date, end_date, today)
+    projected_mant = proyectar_actividades(equipos_para_dashboard, 'mantenimiento', start_date, end_date, today)
 
     cal_data = _process_projected_activities_for_pie(projected_cal, 'cal')
     comp_data = _process_projected_activities_for_pie(projected_comp, 'comp')
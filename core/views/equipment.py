@@ -6,6 +6,8 @@ from ..constants import (
     ESTADO_ACTIVO, ESTADO_INACTIVO, ESTADO_EN_CALIBRACION,
     ESTADO_EN_COMPROBACION, ESTADO_EN_MANTENIMIENTO, ESTADO_DE_BAJA,
 )
+from ..busqueda_equipos import buscar_y_paginar
+from ..stats_queue import diferir_recalculo_stats
 
 
 def sanitize_filename(filename):
@@ -26,8 +28,6 @@ def home(request):
     Página principal: Lista todos los equipos con filtrado y paginación.
     Implementa la funcionalidad completa del home original.
     """
-    from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-    from django.db.models import Q
     from django.utils import timezone
     from django.contrib import messages
     from django.shortcuts import render
@@ -94,18 +94,6 @@ def home(request):
 
     today = timezone.localdate()
 
-    # Filtrar por query de búsqueda
-    if query:
-        equipos_list = equipos_list.filter(
-            Q(codigo_interno__icontains=query) |
-            Q(nombre__icontains=query) |
-            Q(marca__icontains=query) |
-            Q(modelo__icontains=query) |
-            Q(numero_serie__icontains=query) |
-            Q(responsable__icontains=query) |
-            Q(ubicacion__icontains=query)
-        )
-
     # Filtrar por tipo de equipo
     if tipo_equipo_filter:
         equipos_list = equipos_list.filter(tipo_equipo=tipo_equipo_filter)
@@ -118,18 +106,12 @@ def home(request):
         if not user.is_superuser or (user.is_superuser and not selected_company_id):
             equipos_list = equipos_list.exclude(estado=ESTADO_DE_BAJA).exclude(estado=ESTADO_INACTIVO)
 
-    # Ordenamiento por fecha de próxima actividad (nulls al final)
-    from django.db.models import F
-    ORDEN_MAP = {
-        'calibracion': F('proxima_calibracion').asc(nulls_last=True),
-        'mantenimiento': F('proximo_mantenimiento').asc(nulls_last=True),
-        'comprobacion': F('proxima_comprobacion').asc(nulls_last=True),
-    }
-    if orden_filter in ORDEN_MAP:
-        equipos_list = equipos_list.order_by(ORDEN_MAP[orden_filter])
+    # Búsqueda indexada y paginación keyset: el orden por fecha de próxima actividad
+    # deja los nulos al final; con búsqueda, por relevancia; si no, por código interno
+    equipos = buscar_y_paginar(request, equipos_list, query=query or '', orden_fecha=orden_filter)
 
-    # Añadir lógica para el estado de las fechas de próxima actividad
-    for equipo in equipos_list:
+    # Añadir lógica para el estado de las fechas de próxima actividad (solo la página mostrada)
+    for equipo in equipos:
         # Calibración
         if equipo.proxima_calibracion and equipo.estado not in [ESTADO_DE_BAJA, ESTADO_INACTIVO]:
             days_remaining = (equipo.proxima_calibracion - today).days
@@ -172,17 +154,6 @@ def home(request):
         else:
             equipo.proxima_comprobacion_status = 'text-gray-500'
 
-    # Paginación
-    paginator = Paginator(equipos_list, settings.SAM_CONFIG['PAGINATION_SIZE'])
-    page_number = request.GET.get('page')
-
-    try:
-        equipos = paginator.page(page_number)
-    except PageNotAnInteger:
-        equipos = paginator.page(1)
-    except EmptyPage:
-        equipos = paginator.page(paginator.num_pages)
-
     tipo_equipo_choices = Equipo.TIPO_EQUIPO_CHOICES
     estado_choices = Equipo.ESTADO_CHOICES
 
@@ -226,30 +197,14 @@ def equipos(request):
     estado_filtro = request.GET.get('estado', '')
     empresa_filtro = request.GET.get('empresa_id', '')
 
-    if query:
-        equipos_queryset = equipos_queryset.filter(
-            Q(codigo_interno__icontains=query) |
-            Q(nombre__icontains=query) |
-            Q(marca__icontains=query) |
-            Q(modelo__icontains=query) |
-            Q(numero_serie__icontains=query)
-        )
-
     if estado_filtro:
         equipos_queryset = equipos_queryset.filter(estado=estado_filtro)
 
     if empresa_filtro and user.is_superuser:
         equipos_queryset = equipos_queryset.filter(empresa_id=empresa_filtro)
 
-    # Paginación optimizada
-    paginator = Paginator(equipos_queryset, settings.SAM_CONFIG['PAGINATION_SIZE'])
-    page_number = request.GET.get('page')
-    try:
-        equipos_page = paginator.get_page(page_number)
-    except PageNotAnInteger:
-        equipos_page = paginator.get_page(1)
-    except EmptyPage:
-        equipos_page = paginator.get_page(paginator.num_pages)
+    # Búsqueda indexada y paginación keyset (core/busqueda_equipos.py)
+    equipos_page = buscar_y_paginar(request, equipos_queryset, query=query)
 
     # Datos para filtros
     empresas_disponibles = Empresa.objects.all().order_by('nombre') if user.is_superuser else []
@@ -643,13 +598,8 @@ def detalle_equipo(request, pk):
         # SOLO mostrar documento de baja si el equipo realmente está dado de baja
         if (baja_registro and baja_registro.documento_baja and
             equipo.estado == 'De Baja'):
-            # Crear URL para documento de baja
-            from django.core.files.storage import default_storage
-            try:
-                if default_storage.exists(baja_registro.documento_baja.name):
-                    documento_baja_url = default_storage.url(baja_registro.documento_baja.name)
-            except:
-                documento_baja_url = None
+            # URL del documento de baja; el campo con nombre basta (sin exists() contra el bucket)
+            documento_baja_url = get_secure_file_url(baja_registro.documento_baja)
     except:
         pass
 
@@ -1159,12 +1109,14 @@ def _validate_and_process_files(request, equipo, is_edit=False):
                     if archivo_anterior and default_storage.exists(archivo_anterior.name):
                         try:
                             default_storage.delete(archivo_anterior.name)
+                            eliminar_registros(equipo.empresa, [archivo_anterior.name])
                         except Exception as e:
                             logger.warning(f"No se pudo eliminar archivo anterior {archivo_anterior.name}: {e}")
 
                 # Guardar nuevo archivo
-                default_storage.save(ruta_final, archivo)
-                setattr(equipo, campo, ruta_final)
+                ruta_guardada = default_storage.save(ruta_final, archivo)
+                registrar_archivo(equipo.empresa, ruta_guardada, archivo.size)
+                setattr(equipo, campo, ruta_guardada)
 
         return True
 
@@ -1202,6 +1154,13 @@ def _calculate_equipment_metrics(equipo):
 
 def _get_equipment_file_urls(equipo):
     """Obtiene URLs seguras para archivos del equipo y sus actividades"""
+    # Firmar en una pasada los archivos del equipo y de sus actividades (prefetch);
+    # las URLs de abajo y los |secure_file_url del template salen de la caché
+    precargar([
+        equipo, getattr(equipo, 'baja_registro', None), *equipo.calibraciones.all(),
+        *equipo.mantenimientos.all(), *equipo.comprobaciones.all(),
+    ], storage=default_storage)
+
     file_urls = {
         # URLs de archivos del equipo
         'manual_url': get_secure_file_url(equipo.manual_pdf),
@@ -1377,7 +1336,8 @@ def equipos_eliminar_masivo(request):
         # Eliminar equipos
         try:
             cantidad = equipos.count()
-            equipos.delete()
+            with diferir_recalculo_stats():
+                equipos.delete()
             messages.success(request, f'{cantidad} equipo(s) eliminado(s) correctamente.')
         except Exception as e:
             logger.error(f"Error en eliminación masiva: {e}")
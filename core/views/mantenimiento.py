@@ -9,15 +9,15 @@ from datetime import datetime
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.files.base import ContentFile
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.views.decorators.http import require_http_methods
-from weasyprint import HTML
 
 from core.models import Mantenimiento, Equipo
 from core.decorators_pdf import safe_pdf_response
+from core.render_pdf import renderizar_pdf
+from core.storage_ledger import guardar_archivo_generado
 
 logger = logging.getLogger(__name__)
 
@@ -283,12 +283,12 @@ def generar_pdf_mantenimiento(request, equipo_id):
         html_string = render_to_string('core/mantenimiento_print.html', context)
 
         # Generar PDF
-        pdf_file = HTML(string=html_string, base_url=request.build_absolute_uri()).write_pdf()
+        pdf_file = renderizar_pdf(html_string)
 
         # Guardar PDF en el modelo
         fecha_str = mantenimiento.fecha_mantenimiento.strftime('%Y%m%d')
         filename = f'mantenimiento_{equipo.codigo_interno}_{fecha_str}.pdf'
-        mantenimiento.documento_mantenimiento.save(filename, ContentFile(pdf_file), save=True)
+        guardar_archivo_generado(mantenimiento, 'documento_mantenimiento', filename, pdf_file, save=True)
 
         return JsonResponse({
             'success': True,
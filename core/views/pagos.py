@@ -21,6 +21,7 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
+from core.email_outbox import despachar
 from core.models import CustomUser, TransaccionPago, LinkPago
 
 logger = logging.getLogger(__name__)
@@ -585,8 +586,8 @@ def _send_html_email(asunto, texto_plano, html, destinatarios, from_label=None):
     try:
         msg = EmailMultiAlternatives(asunto, texto_plano, remitente, destinatarios)
         msg.attach_alternative(html, 'text/html')
-        msg.send()
-        return True
+        # Con la bandeja de salida activa el checkout no espera al SMTP
+        return despachar(msg, categoria='pago')
     except Exception as e:
         logger.error(f"Error enviando email '{asunto}' a {destinatarios}: {e}")
         return False
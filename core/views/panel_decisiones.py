@@ -20,7 +20,8 @@ from ..utils.decision_intelligence import (
     calcular_compliance_iso9001,
     calcular_optimizacion_cronogramas
 )
-from .dashboard import get_projected_activities_for_year
+from ..metricas_decision import calcular_cumplimiento, calcular_eficiencia_operacional, calcular_salud_equipo
+from ..snapshots_decision import obtener_snapshots, agregar_snapshots, empresas_sin_snapshot, historial_diario
 from django.core.cache import cache
 import json
 
@@ -88,293 +89,6 @@ def panel_decisiones(request):
         })
 
 
-def _calcular_salud_equipo(equipos_para_dashboard, today):
-    """
-    PILAR 1: Salud del Equipo con Fórmula Ponderada
-    Fórmula: 30% Estado del Equipo + 25% Calibraciones + 25% Mantenimientos + 20% Comprobaciones = 100%
-    """
-    from django.db.models import Count, Case, When, IntegerField
-
-    total_equipos = equipos_para_dashboard.count()
-    if total_equipos == 0:
-        return {
-            'salud_general_porcentaje': 0,
-            'salud_general_estado': 'CRÍTICO',
-            'equipos_saludables': 0,
-            'equipos_en_riesgo': 0,
-            'equipos_criticos': 0,
-            'total_equipos_salud': 0,
-            'chart_data': [0, 0, 0],
-            'formula_detalle': {
-                'peso_estado': 30,
-                'peso_calibraciones': 25,
-                'peso_mantenimientos': 25,
-                'peso_comprobaciones': 20,
-                'puntuacion_estado': 0,
-                'puntuacion_calibraciones': 0,
-                'puntuacion_mantenimientos': 0,
-                'puntuacion_comprobaciones': 0,
-                'calculo_ejemplo': '(0×30% + 0×25% + 0×25% + 0×20%) = 0%'
-            }
-        }
-
-    # Variables para el cálculo ponderado
-    total_puntuacion = 0
-    equipos_saludables = 0
-    equipos_en_riesgo = 0
-    equipos_criticos = 0
-
-    # Puntuaciones acumuladas para fórmula detallada
-    puntuacion_estado_total = 0
-    puntuacion_calibraciones_total = 0
-    puntuacion_mantenimientos_total = 0
-    puntuacion_comprobaciones_total = 0
-
-    for equipo in equipos_para_dashboard:
-        # 1. ESTADO DEL EQUIPO (30%): Activo/Operativo = 100%, otros estados = 0%
-        if equipo.estado in [ESTADO_ACTIVO, 'Operativo']:
-            puntuacion_estado = 100
-        else:
-            puntuacion_estado = 0
-
-        # 2. CALIBRACIONES (25%): Vigente = 100%, Vencida = 0%
-        if equipo.proxima_calibracion and equipo.proxima_calibracion >= today:
-            puntuacion_calibraciones = 100
-        else:
-            puntuacion_calibraciones = 0
-
-        # 3. MANTENIMIENTOS (25%): Vigente = 100%, Vencido = 0%
-        if equipo.proximo_mantenimiento and equipo.proximo_mantenimiento >= today:
-            puntuacion_mantenimientos = 100
-        else:
-            puntuacion_mantenimientos = 0
-
-        # 4. COMPROBACIONES (20%): Vigente = 100%, Vencida = 0%
-        if equipo.proxima_comprobacion and equipo.proxima_comprobacion >= today:
-            puntuacion_comprobaciones = 100
-        else:
-            puntuacion_comprobaciones = 0
-
-        # Calcular puntuación ponderada del equipo
-        puntuacion_equipo = (
-            puntuacion_estado * 0.30 +
-            puntuacion_calibraciones * 0.25 +
-            puntuacion_mantenimientos * 0.25 +
-            puntuacion_comprobaciones * 0.20
-        )
-
-        # Acumular para promedio general
-        total_puntuacion += puntuacion_equipo
-        puntuacion_estado_total += puntuacion_estado
-        puntuacion_calibraciones_total += puntuacion_calibraciones
-        puntuacion_mantenimientos_total += puntuacion_mantenimientos
-        puntuacion_comprobaciones_total += puntuacion_comprobaciones
-
-        # Clasificar equipo según puntuación
-        if puntuacion_equipo >= 80:
-            equipos_saludables += 1
-        elif puntuacion_equipo >= 40:
-            equipos_en_riesgo += 1
-        else:
-            equipos_criticos += 1
-
-    # Calcular porcentaje de salud general usando fórmula ponderada
-    salud_porcentaje = round(total_puntuacion / total_equipos, 1)
-
-    # Promedios por componente para mostrar en fórmula detallada
-    promedio_estado = round(puntuacion_estado_total / total_equipos, 1)
-    promedio_calibraciones = round(puntuacion_calibraciones_total / total_equipos, 1)
-    promedio_mantenimientos = round(puntuacion_mantenimientos_total / total_equipos, 1)
-    promedio_comprobaciones = round(puntuacion_comprobaciones_total / total_equipos, 1)
-
-    # Calcular contribución ponderada de cada componente
-    contribucion_estado = promedio_estado * 0.30
-    contribucion_calibraciones = promedio_calibraciones * 0.25
-    contribucion_mantenimientos = promedio_mantenimientos * 0.25
-    contribucion_comprobaciones = promedio_comprobaciones * 0.20
-
-    # Ejemplo de cálculo para mostrar transparencia
-    calculo_ejemplo = f"({promedio_estado}×30% + {promedio_calibraciones}×25% + {promedio_mantenimientos}×25% + {promedio_comprobaciones}×20%) = {salud_porcentaje}%"
-
-    # Determinar estado general
-    if salud_porcentaje >= 80:
-        estado = 'ÓPTIMO'
-    elif salud_porcentaje >= 60:
-        estado = 'BUENO'
-    elif salud_porcentaje >= 40:
-        estado = 'EN RIESGO'
-    else:
-        estado = 'CRÍTICO'
-
-    return {
-        'salud_general_porcentaje': salud_porcentaje,
-        'salud_general_estado': estado,
-        'equipos_saludables': equipos_saludables,
-        'equipos_en_riesgo': equipos_en_riesgo,
-        'equipos_criticos': equipos_criticos,
-        'total_equipos_salud': total_equipos,
-        'chart_data': [equipos_saludables, equipos_en_riesgo, equipos_criticos],
-        'formula_detalle': {
-            'peso_estado': 30,
-            'peso_calibraciones': 25,
-            'peso_mantenimientos': 25,
-            'peso_comprobaciones': 20,
-            'puntuacion_estado': promedio_estado,
-            'puntuacion_calibraciones': promedio_calibraciones,
-            'puntuacion_mantenimientos': promedio_mantenimientos,
-            'puntuacion_comprobaciones': promedio_comprobaciones,
-            'contribucion_estado': round(contribucion_estado, 1),
-            'contribucion_calibraciones': round(contribucion_calibraciones, 1),
-            'contribucion_mantenimientos': round(contribucion_mantenimientos, 1),
-            'contribucion_comprobaciones': round(contribucion_comprobaciones, 1),
-            'calculo_ejemplo': calculo_ejemplo
-        }
-    }
-
-
-def _calcular_cumplimiento(equipos_para_dashboard, current_year, today):
-    """
-    PILAR 2: Cumplimiento
-    Mide el desempeño de la gestión - ¿Actividades a tiempo?
-
-    IMPORTANTE: Usa la MISMA lógica de proyección que Dashboard
-    - Proyecciones basadas en última actividad real (no teóricas)
-    - Jerarquía: última actividad → última calibración → fecha_adquisición
-    """
-    # Obtener actividades proyectadas usando la misma función de Dashboard
-    actividades_calibracion = get_projected_activities_for_year(
-        equipos_para_dashboard,
-        'calibracion',
-        current_year,
-        today
-    )
-
-    actividades_mantenimiento = get_projected_activities_for_year(
-        equipos_para_dashboard,
-        'mantenimiento',
-        current_year,
-        today
-    )
-
-    actividades_comprobacion = get_projected_activities_for_year(
-        equipos_para_dashboard,
-        'comprobacion',
-        current_year,
-        today
-    )
-
-    # Contar actividades programadas para el año
-    total_programadas = (
-        len(actividades_calibracion) +
-        len(actividades_mantenimiento) +
-        len(actividades_comprobacion)
-    )
-
-    # Contar actividades realizadas
-    total_realizadas_a_tiempo = 0
-
-    # Calibraciones realizadas
-    for actividad in actividades_calibracion:
-        if actividad['status'] == 'Realizado':
-            total_realizadas_a_tiempo += 1
-
-    # Mantenimientos realizados
-    for actividad in actividades_mantenimiento:
-        if actividad['status'] == 'Realizado':
-            total_realizadas_a_tiempo += 1
-
-    # Comprobaciones realizadas
-    for actividad in actividades_comprobacion:
-        if actividad['status'] == 'Realizado':
-            total_realizadas_a_tiempo += 1
-
-    # Calcular porcentaje de cumplimiento
-    if total_programadas > 0:
-        cumplimiento_porcentaje = round((total_realizadas_a_tiempo / total_programadas) * 100, 1)
-    else:
-        cumplimiento_porcentaje = 100.0  # Sin actividades programadas = 100% cumplimiento
-
-    # Determinar estado
-    if cumplimiento_porcentaje >= 90:
-        estado = 'EXCELENTE'
-    elif cumplimiento_porcentaje >= 80:
-        estado = 'BUENO'
-    elif cumplimiento_porcentaje >= 70:
-        estado = 'REGULAR'
-    else:
-        estado = 'DEFICIENTE'
-
-    return {
-        'cumplimiento_porcentaje': cumplimiento_porcentaje,
-        'cumplimiento_estado': estado,
-        'actividades_programadas': total_programadas,
-        'actividades_realizadas': total_realizadas_a_tiempo,
-        'actividades_pendientes': total_programadas - total_realizadas_a_tiempo,
-        'chart_data': [total_realizadas_a_tiempo, total_programadas - total_realizadas_a_tiempo],
-        'formula_cumplimiento': {
-            'actividades_completadas': total_realizadas_a_tiempo,
-            'actividades_programadas': total_programadas,
-            'calculo_ejemplo': f"({total_realizadas_a_tiempo} ÷ {total_programadas}) × 100 = {cumplimiento_porcentaje}%" if total_programadas > 0 else "Sin actividades programadas = 100%"
-        }
-    }
-
-
-def _calcular_eficiencia_operacional(equipos_queryset, equipos_para_dashboard):
-    """
-    PILAR 3: Eficiencia Operacional
-    Combina disponibilidad con uso efectivo
-    """
-    total_equipos = equipos_queryset.count()
-    equipos_disponibles = equipos_para_dashboard.count()  # Excluye De Baja e Inactivo
-
-    if total_equipos == 0:
-        return {
-            'eficiencia_porcentaje': 0,
-            'eficiencia_estado': 'CRÍTICO',
-            'equipos_disponibles': 0,
-            'equipos_no_disponibles': 0,
-            'disponibilidad_porcentaje': 0
-        }
-
-    # Calcular disponibilidad
-    disponibilidad_porcentaje = round((equipos_disponibles / total_equipos) * 100, 1)
-
-    # Por ahora, eficiencia = disponibilidad (se puede expandir con más métricas)
-    eficiencia_porcentaje = disponibilidad_porcentaje
-
-    # Determinar estado
-    if eficiencia_porcentaje >= 95:
-        estado = 'ÓPTIMO'
-    elif eficiencia_porcentaje >= 85:
-        estado = 'BUENO'
-    elif eficiencia_porcentaje >= 70:
-        estado = 'REGULAR'
-    else:
-        estado = 'DEFICIENTE'
-
-    return {
-        'eficiencia_porcentaje': eficiencia_porcentaje,
-        'eficiencia_estado': estado,
-        'equipos_disponibles': equipos_disponibles,
-        'equipos_no_disponibles': total_equipos - equipos_disponibles,
-        'disponibilidad_porcentaje': disponibilidad_porcentaje,
-        'total_equipos_eficiencia': total_equipos,
-        'formula_eficiencia': {
-            'equipos_disponibles': equipos_disponibles,
-            'total_equipos': total_equipos,
-            'equipos_activos': equipos_disponibles,  # Equipos en estado Activo/Operativo
-            'equipos_baja_inactivo': total_equipos - equipos_disponibles,  # Equipos De Baja/Inactivo
-            'calculo_ejemplo': f"({equipos_disponibles} ÷ {total_equipos}) × 100 = {eficiencia_porcentaje}%" if total_equipos > 0 else "Sin equipos registrados",
-            'componentes': {
-                'disponibilidad': {'peso': 100, 'valor': disponibilidad_porcentaje, 'descripcion': 'Equipos Activos vs Total'},
-                # Para futuras expansiones se pueden agregar más componentes como:
-                # 'utilizacion': {'peso': 0, 'valor': 0, 'descripcion': 'Uso efectivo de equipos'},
-                # 'cronograma': {'peso': 0, 'valor': 0, 'descripcion': 'Cumplimiento de horarios'}
-            }
-        }
-    }
-
-
 def _get_actividades_criticas(equipos_para_dashboard, today):
     """
     Obtiene actividades críticas usando la misma lógica del dashboard técnico
@@ -494,13 +208,13 @@ def _panel_decisiones_empresa(request, today, current_year, empresa_override=Non
     equipos_para_cumplimiento = equipos_queryset.select_related('baja_registro')
 
     # 1. SALUD DEL EQUIPO (Pilar 1)
-    salud_equipo_data = _calcular_salud_equipo(equipos_para_dashboard, today)
+    salud_equipo_data = calcular_salud_equipo(equipos_para_dashboard, today)
 
     # 2. CUMPLIMIENTO (Pilar 2)
-    cumplimiento_data = _calcular_cumplimiento(equipos_para_cumplimiento, current_year, today)
+    cumplimiento_data = calcular_cumplimiento(equipos_para_cumplimiento, current_year, today)
 
     # 3. EFICIENCIA OPERACIONAL (Pilar 3)
-    eficiencia_data = _calcular_eficiencia_operacional(equipos_queryset, equipos_para_dashboard)
+    eficiencia_data = calcular_eficiencia_operacional(equipos_queryset, equipos_para_dashboard)
 
     # Actividades críticas (usando lógica del dashboard técnico)
     actividades_criticas = _get_actividades_criticas(equipos_para_dashboard, today)
@@ -734,8 +448,6 @@ def _panel_decisiones_sam(request, today, current_year):
     Panel de Decisiones para SUPERUSERS SAM
     Enfoque: Estratégico multi-empresa - "Cómo está el negocio"
     """
-    from django.db.models import Sum, Count, Q
-
     # Filtrado por empresa para superusuarios
     selected_company_id = request.GET.get('empresa_id')
     empresas_disponibles = Empresa.objects.filter(is_deleted=False).order_by('nombre')
@@ -745,97 +457,29 @@ def _panel_decisiones_sam(request, today, current_year):
     else:
         empresas_queryset = empresas_disponibles
 
-    # Agregaciones multi-empresa usando las mismas métricas pilares
+    # Métricas precalculadas por empresa (core/snapshots_decision.py): una
+    # consulta sobre los snapshots en lugar de recalcular cada empresa aquí.
+    # Las empresas sin snapshot se listan como pendientes hasta el próximo cron.
     total_empresas = empresas_queryset.count()
-
-    # Métricas agregadas de todas las empresas
-    salud_agregada = {'equipos_saludables': 0, 'equipos_criticos': 0, 'total_equipos_salud': 0}
-    cumplimiento_agregado = {'actividades_realizadas': 0, 'actividades_programadas': 0}
-    eficiencia_agregada = {'equipos_disponibles': 0, 'equipos_no_disponibles': 0}
-
-    metricas_por_empresa = []
-
-    for empresa in empresas_queryset:
-        equipos_queryset = Equipo.objects.filter(empresa=empresa)
-        equipos_para_dashboard = equipos_queryset.exclude(estado__in=[ESTADO_DE_BAJA, ESTADO_INACTIVO])
-        equipos_para_cumplimiento = equipos_queryset.select_related('baja_registro')
-
-        # Calcular métricas por empresa usando las mismas funciones
-        salud_empresa = _calcular_salud_equipo(equipos_para_dashboard, today)
-        cumplimiento_empresa = _calcular_cumplimiento(equipos_para_cumplimiento, current_year, today)
-        eficiencia_empresa = _calcular_eficiencia_operacional(equipos_queryset, equipos_para_dashboard)
-
-        # Agregar a totales
-        salud_agregada['equipos_saludables'] += salud_empresa['equipos_saludables']
-        salud_agregada['equipos_criticos'] += salud_empresa['equipos_criticos']
-        salud_agregada['total_equipos_salud'] += salud_empresa['total_equipos_salud']
-
-        cumplimiento_agregado['actividades_realizadas'] += cumplimiento_empresa['actividades_realizadas']
-        cumplimiento_agregado['actividades_programadas'] += cumplimiento_empresa['actividades_programadas']
-
-        eficiencia_agregada['equipos_disponibles'] += eficiencia_empresa['equipos_disponibles']
-        eficiencia_agregada['equipos_no_disponibles'] += eficiencia_empresa['equipos_no_disponibles']
-
-        # Guardar métricas por empresa para el detalle
-        metricas_por_empresa.append({
-            'empresa': empresa,
-            'salud_porcentaje': salud_empresa['salud_general_porcentaje'],
-            'salud_estado': salud_empresa['salud_general_estado'],
-            'cumplimiento_porcentaje': cumplimiento_empresa['cumplimiento_porcentaje'],
-            'cumplimiento_estado': cumplimiento_empresa['cumplimiento_estado'],
-            'eficiencia_porcentaje': eficiencia_empresa['eficiencia_porcentaje'],
-            'eficiencia_estado': eficiencia_empresa['eficiencia_estado'],
-            'total_equipos': salud_empresa['total_equipos_salud']
-        })
-
-    # Calcular métricas consolidadas
-    if salud_agregada['total_equipos_salud'] > 0:
-        salud_general_porcentaje = round((salud_agregada['equipos_saludables'] / salud_agregada['total_equipos_salud']) * 100, 1)
-    else:
-        salud_general_porcentaje = 0
-
-    if cumplimiento_agregado['actividades_programadas'] > 0:
-        cumplimiento_general_porcentaje = round((cumplimiento_agregado['actividades_realizadas'] / cumplimiento_agregado['actividades_programadas']) * 100, 1)
-    else:
-        cumplimiento_general_porcentaje = 100
-
+    snapshots = obtener_snapshots(empresas_queryset)
+    empresas_pendientes_snapshot = empresas_sin_snapshot(empresas_queryset, snapshots)
+    consolidado = agregar_snapshots(snapshots, today)
+
+    salud_agregada = consolidado['salud_agregada']
+    cumplimiento_agregado = consolidado['cumplimiento_agregado']
+    eficiencia_agregada = consolidado['eficiencia_agregada']
+    metricas_por_empresa = consolidado['metricas_por_empresa']
+
+    salud_general_porcentaje = consolidado['salud_general_porcentaje']
+    cumplimiento_general_porcentaje = consolidado['cumplimiento_general_porcentaje']
+    eficiencia_general_porcentaje = consolidado['eficiencia_general_porcentaje']
     total_equipos_agregado = salud_agregada['total_equipos_salud']
-    if total_equipos_agregado > 0:
-        eficiencia_general_porcentaje = round((eficiencia_agregada['equipos_disponibles'] / total_equipos_agregado) * 100, 1)
-    else:
-        eficiencia_general_porcentaje = 0
+    total_equipos_eficiencia = eficiencia_agregada['equipos_disponibles'] + eficiencia_agregada['equipos_no_disponibles']
 
     # Datos financieros básicos
-    ingresos_anuales = Decimal('0')
-    costos_totales = Decimal('0')
-    margen_bruto = Decimal('0')
-
-    try:
-        # Calcular ingresos reales empresa por empresa
-        for empresa in empresas_queryset:
-            ingresos_anuales += empresa.get_ingresos_anuales_reales()
-
-        # Costos operativos del año
-        costos_cal = Calibracion.objects.filter(
-            equipo__empresa__in=empresas_queryset,
-            fecha_calibracion__year=current_year
-        ).aggregate(total=Sum('costo_calibracion'))['total'] or Decimal('0')
-
-        costos_mant = Mantenimiento.objects.filter(
-            equipo__empresa__in=empresas_queryset,
-            fecha_mantenimiento__year=current_year
-        ).aggregate(total=Sum('costo_sam_interno'))['total'] or Decimal('0')
-
-        costos_comp = Comprobacion.objects.filter(
-            equipo__empresa__in=empresas_queryset,
-            fecha_comprobacion__year=current_year
-        ).aggregate(total=Sum('costo_comprobacion'))['total'] or Decimal('0')
-
-        costos_totales = costos_cal + costos_mant + costos_comp
-        margen_bruto = ingresos_anuales - costos_totales
-
-    except Exception as e:
-        logger.error(f"Error calculando datos financieros: {e}")
+    ingresos_anuales = consolidado['ingresos_anuales']
+    costos_totales = consolidado['costos_totales']
+    margen_bruto = ingresos_anuales - costos_totales
 
     # MÉTRICAS FINANCIERAS DEL NEGOCIO SAM (NUEVO)
     metricas_financieras_sam = calcular_metricas_financieras_sam(empresas_queryset, current_year, current_year - 1)
@@ -854,7 +498,7 @@ def _panel_decisiones_sam(request, today, current_year):
         'contribucion_calibraciones': round(((salud_agregada['equipos_saludables'] / max(salud_agregada['total_equipos_salud'], 1)) * 100) * 0.25, 1),
         'contribucion_mantenimientos': round(((salud_agregada['equipos_saludables'] / max(salud_agregada['total_equipos_salud'], 1)) * 100) * 0.25, 1),
         'contribucion_comprobaciones': round(((salud_agregada['equipos_saludables'] / max(salud_agregada['total_equipos_salud'], 1)) * 100) * 0.20, 1),
-        'calculo_ejemplo': f"Promedio ponderado de {empresas_queryset.count()} empresas = {salud_general_porcentaje}%"
+        'calculo_ejemplo': f"Promedio ponderado de {total_empresas} empresas = {salud_general_porcentaje}%"
     }
 
     formula_cumplimiento_sam = {
@@ -865,10 +509,10 @@ def _panel_decisiones_sam(request, today, current_year):
 
     formula_eficiencia_sam = {
         'equipos_disponibles': eficiencia_agregada['equipos_disponibles'],
-        'total_equipos': total_equipos_agregado,
+        'total_equipos': total_equipos_eficiencia,
         'equipos_activos': eficiencia_agregada['equipos_disponibles'],
         'equipos_baja_inactivo': eficiencia_agregada['equipos_no_disponibles'],
-        'calculo_ejemplo': f"({eficiencia_agregada['equipos_disponibles']} ÷ {total_equipos_agregado}) × 100 = {eficiencia_general_porcentaje}%" if total_equipos_agregado > 0 else "Sin equipos registrados",
+        'calculo_ejemplo': f"({eficiencia_agregada['equipos_disponibles']} ÷ {total_equipos_eficiencia}) × 100 = {eficiencia_general_porcentaje}%" if total_equipos_eficiencia > 0 else "Sin equipos registrados",
         'componentes': {
             'disponibilidad': {'peso': 100, 'valor': eficiencia_general_porcentaje, 'descripcion': 'Equipos Activos vs Total Agregado'}
         }
@@ -879,8 +523,8 @@ def _panel_decisiones_sam(request, today, current_year):
     formulas_sam = {
         'ingresos_formula': {
             'valor_total': metricas_financieras_sam['ingreso_ytd_actual'],
-            'num_empresas': empresas_queryset.count(),
-            'calculo_ejemplo': f"Suma de pagos recibidos de {empresas_queryset.count()} empresas activas = ${metricas_financieras_sam['ingreso_ytd_actual']:,.0f} COP",
+            'num_empresas': total_empresas,
+            'calculo_ejemplo': f"Suma de pagos recibidos de {total_empresas} empresas activas = ${metricas_financieras_sam['ingreso_ytd_actual']:,.0f} COP",
             'periodo': f"Enero-{today.strftime('%B')} {current_year}"
         },
         'crecimiento_formula': {
@@ -897,58 +541,22 @@ def _panel_decisiones_sam(request, today, current_year):
         }
     }
 
-    # MÉTRICAS DE INTELIGENCIA EMPRESARIAL (usando filtro de empresa)
-    # Si hay una empresa seleccionada, usar métricas de esa empresa
-    # Si no, agregar métricas de todas las empresas
-    if selected_company_id and empresas_queryset.count() == 1:
-        # Vista filtrada por una empresa específica
-        empresa_filtrada = empresas_queryset.first()
-        alertas_predictivas = calcular_alertas_predictivas(empresa_filtrada, today)
-        roi_rentabilidad = calcular_roi_rentabilidad(empresa_filtrada, current_year)
-        tendencias_historicas = calcular_tendencias_historicas(empresa_filtrada, current_year)
-        compliance_iso9001 = calcular_compliance_iso9001(empresa_filtrada, today)
-        optimizacion_cronogramas = calcular_optimizacion_cronogramas(empresa_filtrada, today)
-    else:
-        # Vista agregada de todas las empresas
-        alertas_predictivas = _calcular_alertas_predictivas_agregadas(empresas_queryset, today)
-        roi_rentabilidad = _calcular_roi_rentabilidad_agregado(empresas_queryset, current_year)
-        tendencias_historicas = _calcular_tendencias_historicas_agregadas(empresas_queryset, current_year)
-        compliance_iso9001 = _calcular_compliance_iso9001_agregado(empresas_queryset, today)
-        optimizacion_cronogramas = _calcular_optimizacion_cronogramas_agregado(empresas_queryset, today)
+    # MÉTRICAS DE INTELIGENCIA EMPRESARIAL (agregadas desde los snapshots)
+    alertas_predictivas = consolidado['alertas_predictivas']
+    roi_rentabilidad = consolidado['roi_rentabilidad']
+    tendencias_historicas = consolidado['tendencias_historicas']
+    compliance_iso9001 = consolidado['compliance_iso9001']
+    optimizacion_cronogramas = consolidado['optimizacion_cronogramas']
 
     # Listas consolidadas de vencidas y urgentes para vista SAM
-    items_vencidos_sam = []
-    items_urgentes_sam = []
-    fecha_limite_urgente = today + timedelta(days=7)
-
-    for empresa in empresas_queryset:
-        equipos_emp = Equipo.objects.filter(empresa=empresa).exclude(estado__in=[ESTADO_DE_BAJA, ESTADO_INACTIVO])
-        act_criticas_emp = _get_actividades_criticas(equipos_emp, today)
-
-        for eq in act_criticas_emp['calibraciones_vencidas']:
-            dias = (today - eq['proxima_calibracion']).days
-            items_vencidos_sam.append({'codigo': eq['codigo_interno'], 'nombre': eq['nombre'], 'tipo': 'Calibración', 'fecha': eq['proxima_calibracion'], 'dias_atraso': dias, 'empresa': empresa.nombre})
-        for eq in act_criticas_emp['mantenimientos_vencidos']:
-            dias = (today - eq['proximo_mantenimiento']).days
-            items_vencidos_sam.append({'codigo': eq['codigo_interno'], 'nombre': eq['nombre'], 'tipo': 'Mantenimiento', 'fecha': eq['proximo_mantenimiento'], 'dias_atraso': dias, 'empresa': empresa.nombre})
-        for eq in act_criticas_emp['comprobaciones_vencidas']:
-            dias = (today - eq['proxima_comprobacion']).days
-            items_vencidos_sam.append({'codigo': eq['codigo_interno'], 'nombre': eq['nombre'], 'tipo': 'Comprobación', 'fecha': eq['proxima_comprobacion'], 'dias_atraso': dias, 'empresa': empresa.nombre})
-        for eq in act_criticas_emp['calibraciones_urgentes']:
-            dias = (eq['proxima_calibracion'] - today).days
-            items_urgentes_sam.append({'codigo': eq['codigo_interno'], 'nombre': eq['nombre'], 'tipo': 'Calibración', 'fecha': eq['proxima_calibracion'], 'dias_restantes': dias, 'empresa': empresa.nombre})
-        for eq in act_criticas_emp['mantenimientos_urgentes']:
-            dias = (eq['proximo_mantenimiento'] - today).days
-            items_urgentes_sam.append({'codigo': eq['codigo_interno'], 'nombre': eq['nombre'], 'tipo': 'Mantenimiento', 'fecha': eq['proximo_mantenimiento'], 'dias_restantes': dias, 'empresa': empresa.nombre})
-        for eq in act_criticas_emp['comprobaciones_urgentes']:
-            dias = (eq['proxima_comprobacion'] - today).days
-            items_urgentes_sam.append({'codigo': eq['codigo_interno'], 'nombre': eq['nombre'], 'tipo': 'Comprobación', 'fecha': eq['proxima_comprobacion'], 'dias_restantes': dias, 'empresa': empresa.nombre})
-
-    items_vencidos_sam.sort(key=lambda x: x['dias_atraso'], reverse=True)
-    items_urgentes_sam.sort(key=lambda x: x['dias_restantes'])
+    items_vencidos_sam = consolidado['items_vencidos']
+    items_urgentes_sam = consolidado['items_urgentes']
     total_vencidas_sam = len(items_vencidos_sam)
     total_urgentes_sam = len(items_urgentes_sam)
 
+    # Evolución diaria de los pilares (historial de snapshots)
+    historial_pilares = historial_diario(empresas_queryset, today)
+
     # Recomendaciones estratégicas
     recomendaciones_sam = []
 
@@ -1050,6 +658,12 @@ def _panel_decisiones_sam(request, today, current_year):
         'compliance_iso9001': compliance_iso9001,
         'optimizacion_cronogramas': optimizacion_cronogramas,
 
+        # Frescura de los snapshots y evolución diaria
+        'snapshots_desde': consolidado['snapshots_desde'],
+        'snapshots_hasta': consolidado['snapshots_hasta'],
+        'empresas_pendientes_snapshot': empresas_pendientes_snapshot,
+        'historial_pilares': historial_pilares,
+
         # Gráficos JSON
         'salud_consolidada_chart': json.dumps(decimal_to_float([salud_agregada['equipos_saludables'], salud_agregada['equipos_criticos']])),
         'cumplimiento_consolidado_chart': json.dumps(decimal_to_float([cumplimiento_agregado['actividades_realizadas'], cumplimiento_agregado['actividades_programadas'] - cumplimiento_agregado['actividades_realizadas']])),
@@ -1064,191 +678,6 @@ def _panel_decisiones_sam(request, today, current_year):
     return render(request, 'core/panel_decisiones.html', context)
 
 
-def _calcular_alertas_predictivas_agregadas(empresas_queryset, today):
-    """Calcula alertas predictivas agregadas para múltiples empresas"""
-    alertas_agregadas = {'alertas': {'vencidas': [], 'criticas': [], 'riesgo_alto': []}, 'total_alertas': 0}
-
-    for empresa in empresas_queryset:
-        alertas_empresa = calcular_alertas_predictivas(empresa, today)
-        alertas_agregadas['alertas']['vencidas'].extend(alertas_empresa['alertas']['vencidas'])
-        alertas_agregadas['alertas']['criticas'].extend(alertas_empresa['alertas']['criticas'])
-        alertas_agregadas['alertas']['riesgo_alto'].extend(alertas_empresa['alertas']['riesgo_alto'])
-
-    alertas_agregadas['total_alertas'] = (
-        len(alertas_agregadas['alertas']['vencidas']) +
-        len(alertas_agregadas['alertas']['criticas']) +
-        len(alertas_agregadas['alertas']['riesgo_alto'])
-    )
-
-    return alertas_agregadas
-
-
-def _calcular_roi_rentabilidad_agregado(empresas_queryset, current_year):
-    """Calcula ROI y rentabilidad agregado para múltiples empresas"""
-    total_preventivos = 0
-    total_correctivos = 0
-    costo_preventivos_total = 0
-    costo_correctivos_total = 0
-
-    for empresa in empresas_queryset:
-        roi_empresa = calcular_roi_rentabilidad(empresa, current_year)
-        total_preventivos += roi_empresa['count_preventivos']
-        total_correctivos += roi_empresa['count_correctivos']
-        costo_preventivos_total += roi_empresa['costo_preventivos']
-        costo_correctivos_total += roi_empresa['costo_correctivos']
-
-    # Calcular ROI agregado
-    if costo_preventivos_total > 0:
-        roi_porcentaje = round(((costo_correctivos_total - costo_preventivos_total) / costo_preventivos_total) * 100, 1)
-        ahorro_total = costo_correctivos_total - costo_preventivos_total
-    else:
-        roi_porcentaje = 0
-        ahorro_total = 0
-
-    # Calcular ratio preventivo
-    total_mantenimientos = total_preventivos + total_correctivos
-    ratio_preventivo = round((total_preventivos / total_mantenimientos * 100), 1) if total_mantenimientos > 0 else 0
-
-    # Evaluación del ratio
-    if ratio_preventivo >= 80:
-        evaluacion_ratio = 'EXCELENTE'
-    elif ratio_preventivo >= 65:
-        evaluacion_ratio = 'BUENO'
-    elif ratio_preventivo >= 50:
-        evaluacion_ratio = 'REGULAR'
-    else:
-        evaluacion_ratio = 'DEFICIENTE'
-
-    return {
-        'roi_porcentaje': roi_porcentaje,
-        'ahorro_total': ahorro_total,
-        'count_preventivos': total_preventivos,
-        'count_correctivos': total_correctivos,
-        'costo_preventivos': costo_preventivos_total,
-        'costo_correctivos': costo_correctivos_total,
-        'costo_promedio_preventivo': round(costo_preventivos_total / total_preventivos, 2) if total_preventivos > 0 else 0,
-        'costo_promedio_correctivo': round(costo_correctivos_total / total_correctivos, 2) if total_correctivos > 0 else 0,
-        'ratio_preventivo': ratio_preventivo,
-        'evaluacion_ratio': evaluacion_ratio,
-        'interpretacion_roi': 'Excelente retorno' if roi_porcentaje > 100 else 'Buen retorno' if roi_porcentaje > 50 else 'Revisar estrategia'
-    }
-
-
-def _calcular_tendencias_historicas_agregadas(empresas_queryset, current_year):
-    """Calcula tendencias históricas agregadas para múltiples empresas"""
-    from collections import defaultdict
-
-    datos_mensuales_agregados = defaultdict(lambda: {'gasto_total': 0, 'actividades': 0})
-
-    for empresa in empresas_queryset:
-        tendencias_empresa = calcular_tendencias_historicas(empresa, current_year)
-        for mes_data in tendencias_empresa['datos_mensuales']:
-            mes_key = mes_data['nombre_mes']
-            datos_mensuales_agregados[mes_key]['gasto_total'] += mes_data['gasto_total']
-            datos_mensuales_agregados[mes_key]['actividades'] += mes_data['actividades']
-
-    # Convertir a lista
-    datos_mensuales = [
-        {'nombre_mes': mes, 'gasto_total': data['gasto_total'], 'actividades': data['actividades']}
-        for mes, data in sorted(datos_mensuales_agregados.items())
-    ]
-
-    # Calcular promedios y tendencias
-    gastos = [d['gasto_total'] for d in datos_mensuales if d['gasto_total'] > 0]
-    promedio_mensual = sum(gastos) / len(gastos) if gastos else 0
-
-    # Mes más caro y más barato
-    mes_mas_caro = max(datos_mensuales, key=lambda x: x['gasto_total']) if datos_mensuales else None
-    datos_con_gasto = [d for d in datos_mensuales if d['gasto_total'] > 0]
-    mes_mas_barato = min(datos_con_gasto, key=lambda x: x['gasto_total']) if datos_con_gasto else None
-
-    # Calcular tendencia (últimos 3 meses vs promedio)
-    if len(gastos) >= 3:
-        ultimos_3_meses = gastos[-3:]
-        promedio_ultimos_3 = sum(ultimos_3_meses) / 3
-        tendencia_porcentaje = round(((promedio_ultimos_3 - promedio_mensual) / promedio_mensual) * 100, 1) if promedio_mensual > 0 else 0
-        tendencia_direccion = 'ASCENDENTE' if tendencia_porcentaje > 10 else 'DESCENDENTE' if tendencia_porcentaje < -10 else 'ESTABLE'
-    else:
-        tendencia_porcentaje = 0
-        tendencia_direccion = 'ESTABLE'
-
-    return {
-        'datos_mensuales': datos_mensuales,
-        'promedio_mensual': promedio_mensual,
-        'mes_mas_caro': mes_mas_caro,
-        'mes_mas_barato': mes_mas_barato,
-        'meses_con_datos': len(gastos),
-        'tendencia_porcentaje': tendencia_porcentaje,
-        'tendencia_direccion': tendencia_direccion
-    }
-
-
-def _calcular_compliance_iso9001_agregado(empresas_queryset, today):
-    """Calcula compliance ISO 9001 agregado para múltiples empresas"""
-    total_equipos = 0
-    equipos_conformes = 0
-    equipos_riesgo = 0
-    equipos_no_conformes = 0
-    no_conformidades_todas = []
-
-    for empresa in empresas_queryset:
-        compliance_empresa = calcular_compliance_iso9001(empresa, today)
-        total_equipos += compliance_empresa['total_equipos']
-        equipos_conformes += compliance_empresa['equipos_conformes']
-        equipos_riesgo += compliance_empresa['equipos_riesgo']
-        equipos_no_conformes += compliance_empresa['equipos_no_conformes']
-        if compliance_empresa.get('no_conformidades'):
-            no_conformidades_todas.extend(compliance_empresa['no_conformidades'])
-
-    # Calcular score
-    score_iso9001 = round((equipos_conformes / total_equipos * 100), 1) if total_equipos > 0 else 0
-
-    # Evaluación
-    if score_iso9001 >= 90:
-        evaluacion = 'EXCELENTE'
-    elif score_iso9001 >= 75:
-        evaluacion = 'BUENO'
-    elif score_iso9001 >= 60:
-        evaluacion = 'REGULAR'
-    else:
-        evaluacion = 'DEFICIENTE'
-
-    return {
-        'score_iso9001': score_iso9001,
-        'evaluacion': evaluacion,
-        'total_equipos': total_equipos,
-        'equipos_conformes': equipos_conformes,
-        'equipos_riesgo': equipos_riesgo,
-        'equipos_no_conformes': equipos_no_conformes,
-        'no_conformidades': no_conformidades_todas[:10]  # Limitar a 10 para no sobrecargar
-    }
-
-
-def _calcular_optimizacion_cronogramas_agregado(empresas_queryset, today):
-    """Calcula optimización de cronogramas agregado para múltiples empresas"""
-    oportunidades_todas = []
-    equipos_problematicos_todos = []
-    ahorro_total = 0
-
-    for empresa in empresas_queryset:
-        optimizacion_empresa = calcular_optimizacion_cronogramas(empresa, today)
-        if optimizacion_empresa.get('oportunidades_optimizacion'):
-            oportunidades_todas.extend(optimizacion_empresa['oportunidades_optimizacion'])
-            ahorro_total += optimizacion_empresa.get('ahorro_total_cronograma', 0)
-        if optimizacion_empresa.get('equipos_problematicos'):
-            equipos_problematicos_todos.extend(optimizacion_empresa['equipos_problematicos'])
-
-    # Ordenar por ahorro (oportunidades) y por nivel de problema (equipos)
-    oportunidades_todas.sort(key=lambda x: x.get('ahorro_estimado', 0), reverse=True)
-    equipos_problematicos_todos.sort(key=lambda x: x.get('cantidad_correctivos', 0), reverse=True)
-
-    return {
-        'oportunidades_optimizacion': oportunidades_todas[:10],  # Top 10
-        'equipos_problematicos': equipos_problematicos_todos[:10],  # Top 10
-        'ahorro_total_cronograma': ahorro_total
-    }
-
-
 @login_required
 @monitor_view
 def get_equipos_salud_detalles(request):
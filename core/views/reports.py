@@ -6,6 +6,9 @@ import zipfile
 import threading
 import time
 from ..constants import ESTADO_ACTIVO, ESTADO_INACTIVO, ESTADO_DE_BAJA
+from ..stats_queue import diferir_recalculo_stats
+from ..busqueda_equipos import CAMPOS_BUSQUEDA, construir_texto_busqueda
+from .. import progreso
 
 # =============================================================================
 # API ENDPOINTS FOR PROGRESS TRACKING (Fase 3)
@@ -17,13 +20,28 @@ def zip_progress_api(request):
     """
     API endpoint para consultar progreso de solicitudes ZIP del usuario.
     Retorna información en tiempo real del estado de generación.
+
+    Con ``?version=<v>`` (la de la respuesta anterior) responde
+    ``sin_cambios`` sin consultar la BD si nada cambió; con ``&espera=<s>``
+    espera el cambio (long-poll) si el servidor lo permite (core/progreso.py).
     """
     try:
+        from core.models import ZipRequest
+
+        version, sin_cambios, reintentar_ms = progreso.consultar(request, 'zip')
+        if sin_cambios:
+            return JsonResponse({
+                'success': True,
+                'sin_cambios': True,
+                'version': version,
+                'reintentar_ms': reintentar_ms,
+            })
+
         # Obtener todas las solicitudes activas del usuario
         user_requests = ZipRequest.objects.filter(
             user=request.user,
             status__in=['pending', 'processing']
-        ).order_by('-created_at')
+        ).select_related('empresa').order_by('-created_at')
 
         progress_data = []
         for zip_req in user_requests:
@@ -44,7 +62,9 @@ def zip_progress_api(request):
         return JsonResponse({
             'success': True,
             'requests': progress_data,
-            'total_active': len(progress_data)
+            'total_active': len(progress_data),
+            'version': version,
+            'reintentar_ms': reintentar_ms,
         })
 
     except Exception as e:
@@ -61,6 +81,7 @@ def notifications_api(request):
     """
     API endpoint para obtener notificaciones del usuario.
     Soporta marcar como leídas y obtener conteo de no leídas.
+    El GET admite ``version`` y ``espera`` como ``zip_progress_api``.
     """
     try:
         from core.models import NotificacionZip
@@ -87,11 +108,21 @@ def notifications_api(request):
                 except NotificacionZip.DoesNotExist:
                     return JsonResponse({'success': False, 'error': 'Notificación no encontrada'})
 
+        # GET: sin cambios desde la versión del cliente → sin consultas a la BD
+        version, sin_cambios, reintentar_ms = progreso.consultar(request, 'notificaciones')
+        if sin_cambios:
+            return JsonResponse({
+                'success': True,
+                'sin_cambios': True,
+                'version': version,
+                'reintentar_ms': reintentar_ms,
+            })
+
         # GET: Obtener notificaciones
         notifications = NotificacionZip.objects.filter(
             user=request.user,
             status__in=['unread', 'read']
-        ).order_by('-created_at')[:10]  # Últimas 10
+        ).select_related('zip_request__empresa').order_by('-created_at')[:10]  # Últimas 10
 
         notifications_data = []
         for notif in notifications:
@@ -117,7 +148,9 @@ def notifications_api(request):
         return JsonResponse({
             'success': True,
             'notifications': notifications_data,
-            'unread_count': unread_count
+            'unread_count': unread_count,
+            'version': version,
+            'reintentar_ms': reintentar_ms,
         })
 
     except Exception as e:
@@ -1311,33 +1344,16 @@ def valores_son_diferentes(valor_actual, nuevo_valor):
 def _generate_pdf_content(request, template_path, context):
     """
     Generates PDF content (bytes) from a template and context using WeasyPrint.
+
+    Las imágenes del sitio (logo, archivos de MEDIA) se leen del storage vía
+    core.render_pdf, así que el request ya no determina el base_url.
     """
-    from django.template.loader import get_template
+    from core.render_pdf import renderizar_plantilla
     import logging
     logger = logging.getLogger(__name__)
 
     try:
-        template = get_template(template_path)
-        html_string = template.render(context)
-
-        # base_url es crucial para que WeasyPrint resuelva rutas de CSS e imágenes
-        # Mejorar el manejo del base_url para mock requests
-        try:
-            base_url = request.build_absolute_uri('/')
-        except Exception as e:
-            logger.warning(f"Error building absolute URI: {e}, using fallback")
-            # Fallback para mock requests
-            if hasattr(request, 'META') and 'HTTP_HOST' in request.META:
-                scheme = request.META.get('wsgi.url_scheme', 'https')
-                host = request.META.get('HTTP_HOST', 'sam-9o6o.onrender.com')
-                base_url = f"{scheme}://{host}/"
-            else:
-                base_url = "https://sam-9o6o.onrender.com/"
-
-        logger.info(f"Generating PDF with base_url: {base_url}")
-        pdf_file = HTML(string=html_string, base_url=base_url).write_pdf()
-
-        return pdf_file
+        return renderizar_plantilla(template_path, context)
 
     except Exception as e:
         logger.error(f"Error generando PDF con template {template_path}: {e}")
@@ -1365,11 +1381,7 @@ def _get_pdf_file_url(request, file_field):
             # Para S3/R2, generar URL directamente sin verificar existencia
             # La verificación exists() puede fallar con Cloudflare R2
             # Si el campo tiene nombre, asumimos que el archivo existe
-            try:
-                url = default_storage.url(file_field.name, expire=7200)  # 2 horas
-            except TypeError:
-                # Fallback si el storage no soporta expire
-                url = default_storage.url(file_field.name)
+            url = url_firmada(file_field.name, 7200, default_storage)  # 2 horas, cacheada
 
             # Asegurar que sea URL absoluta
             if url.startswith('//'):
@@ -1449,43 +1461,18 @@ def _generate_hoja_vida_cache_key(equipo):
     """
     Helper: Genera clave de caché para hoja de vida de equipo.
 
+    La clave depende solo del sello ``Equipo.version_contenido`` (renovado por
+    señales), por lo que no hace consultas. Ver core/pdf_cache.py.
+
     Args:
         equipo: Objeto Equipo
 
     Returns:
         str: Clave de caché única
     """
-    import hashlib
+    from core.pdf_cache import clave_cache
 
-    # Obtener datos de formato de la empresa para incluir en la clave de caché
-    empresa = equipo.empresa
-    empresa_formato_data = {
-        'empresa_formato_codificacion': empresa.formato_codificacion_empresa or '',
-        'empresa_formato_version': empresa.formato_version_empresa or '',
-        'empresa_formato_fecha_display': empresa.formato_fecha_version_empresa_display or '',
-        'empresa_formato_fecha': empresa.formato_fecha_version_empresa.isoformat() if empresa.formato_fecha_version_empresa else '',
-    }
-
-    cache_data = {
-        'equipo_id': equipo.id,
-        'equipo_updated': equipo.fecha_actualizacion.isoformat() if hasattr(equipo, 'fecha_actualizacion') else '',
-        'calibraciones_count': equipo.calibraciones.count(),
-        'mantenimientos_count': equipo.mantenimientos.count(),
-        'comprobaciones_count': equipo.comprobaciones.count(),
-        'estado': equipo.estado,
-        'last_calibration': equipo.calibraciones.first().fecha_calibracion.isoformat() if equipo.calibraciones.exists() else '',
-        'last_maintenance': equipo.mantenimientos.first().fecha_mantenimiento.isoformat() if equipo.mantenimientos.exists() else '',
-        'codificacion_formato': equipo.codificacion_formato or '',
-        'version_formato': equipo.version_formato or '',
-        'fecha_version_formato': equipo.fecha_version_formato.isoformat() if equipo.fecha_version_formato else '',
-        # Incluir datos de formato de la empresa para invalidar caché cuando cambien
-        **empresa_formato_data,
-    }
-
-    cache_key_data = str(cache_data).encode('utf-8')
-    cache_key = f"hoja_vida_{equipo.id}_{hashlib.md5(cache_key_data).hexdigest()}"
-
-    return cache_key
+    return clave_cache(equipo, 'hoja_vida')
 
 
 def _get_hoja_vida_activities(equipo):
@@ -1598,6 +1585,9 @@ def _get_hoja_vida_file_urls(request, equipo, calibraciones, mantenimientos, com
     logo_empresa_url = _get_pdf_image_data(equipo.empresa.logo_empresa) if equipo.empresa and equipo.empresa.logo_empresa else None
     imagen_equipo_url = _get_pdf_image_data(equipo.imagen_equipo) if equipo.imagen_equipo else None
 
+    # Firmar en una pasada todos los documentos; los _get_pdf_file_url leen de la caché
+    precargar([equipo, baja_registro, *calibraciones, *mantenimientos, *comprobaciones], 7200, default_storage)
+
     # URL de documento de baja (solo si está dado de baja)
     documento_baja_url = (_get_pdf_file_url(request, baja_registro.documento_baja)
                          if baja_registro and baja_registro.documento_baja and equipo.estado == ESTADO_DE_BAJA
@@ -1680,12 +1670,11 @@ def _generate_equipment_hoja_vida_pdf_content(request, equipo):
 
     Refactorizada: 147 líneas → 50 líneas (usa 5 helpers)
     """
-    from django.core.cache import cache
+    from core.pdf_cache import obtener_pdf, guardar_pdf
 
     try:
-        # Verificar caché
-        cache_key = _generate_hoja_vida_cache_key(equipo)
-        cached_pdf = cache.get(cache_key)
+        # Verificar caché persistente (sello de contenido del equipo)
+        cached_pdf = obtener_pdf(equipo)
         if cached_pdf:
             logger.info(f"Hoja de vida obtenida del caché para equipo {equipo.codigo_interno}")
             return cached_pdf
@@ -1705,9 +1694,9 @@ def _generate_equipment_hoja_vida_pdf_content(request, equipo):
         # Generar PDF
         pdf_content = _generate_pdf_content(request, 'core/hoja_vida_pdf.html', context)
 
-        # Guardar en caché por 1 hora (3600 segundos)
+        # Guardar en caché persistente (storage + caché de Django)
         if pdf_content and len(pdf_content) > 1000:  # Verificar que sea un PDF válido
-            cache.set(cache_key, pdf_content, timeout=3600)
+            guardar_pdf(equipo, pdf_content)
             logger.info(f"Hoja de vida guardada en caché para equipo {equipo.codigo_interno}")
 
         return pdf_content
@@ -3179,6 +3168,22 @@ def _update_existing_equipment(equipo_existente, row_data, dates_dict):
         row_data: Datos de la fila del Excel
         dates_dict: Diccionario con las fechas procesadas
 
+    Returns:
+        list: Lista de campos actualizados
+    """
+    campos_actualizados = _aplicar_cambios_equipo(equipo_existente, row_data, dates_dict)
+
+    # Guardar cambios si hay campos actualizados
+    if campos_actualizados:
+        equipo_existente.save(update_fields=campos_actualizados)
+
+    return campos_actualizados
+
+
+def _aplicar_cambios_equipo(equipo_existente, row_data, dates_dict):
+    """
+    Asigna en memoria los valores del Excel a un equipo existente (sin guardar).
+
     Returns:
         list: Lista de campos actualizados
     """
@@ -3274,10 +3279,6 @@ def _update_existing_equipment(equipo_existente, row_data, dates_dict):
         equipo_existente.fecha_ultima_comprobacion = dates_dict['fecha_ultima_comprobacion']
         campos_actualizados.append('fecha_ultima_comprobacion')
 
-    # Guardar cambios si hay campos actualizados
-    if campos_actualizados:
-        equipo_existente.save(update_fields=campos_actualizados)
-
     return campos_actualizados
 
 
@@ -3293,7 +3294,14 @@ def _create_new_equipment(row_data, empresa, dates_dict):
     Returns:
         Equipo: Nueva instancia de Equipo creada
     """
-    equipo = Equipo.objects.create(
+    equipo = _nuevo_equipo(row_data, empresa, dates_dict)
+    equipo.save(force_insert=True)
+    return equipo
+
+
+def _nuevo_equipo(row_data, empresa, dates_dict):
+    """Construye (sin guardar) el Equipo nuevo descrito por una fila del Excel."""
+    return Equipo(
         codigo_interno=row_data['codigo_interno'],
         nombre=row_data['nombre'],
         empresa=empresa,
@@ -3321,8 +3329,6 @@ def _create_new_equipment(row_data, empresa, dates_dict):
         fecha_ultima_comprobacion=dates_dict.get('fecha_ultima_comprobacion')
     )
 
-    return equipo
-
 
 def _validar_capacidad_plan(sheet, column_mapping, user_empresa):
     """
@@ -3413,59 +3419,215 @@ def _validar_capacidad_plan(sheet, column_mapping, user_empresa):
     }
 
 
-def _crear_actividades_desde_excel(equipo, dates_dict, row_data, user):
+# Tamaño de lote para bulk_create/bulk_update y listas IN de la importación
+IMPORT_EXCEL_LOTE = 500
+
+CAMPOS_FECHAS_IMPORTACION = [
+    'fecha_ultima_calibracion', 'proxima_calibracion',
+    'fecha_ultimo_mantenimiento', 'proximo_mantenimiento',
+    'fecha_ultima_comprobacion', 'proxima_comprobacion',
+]
+
+
+def _en_lotes(items, tamano=IMPORT_EXCEL_LOTE):
+    """Divide una lista en trozos de ``tamano`` elementos."""
+    items = list(items)
+    for inicio in range(0, len(items), tamano):
+        yield items[inicio:inicio + tamano]
+
+
+def _leer_filas_excel(sheet, column_mapping, start_row):
+    """
+    Lee las filas de datos en una sola pasada (``iter_rows``) con la misma
+    normalización que ``_extract_row_data``.
+
+    Returns:
+        list: [(row_num, row_data)] solo de filas con código interno
+    """
+    from openpyxl.utils import column_index_from_string
+
+    columnas = [(column_index_from_string(col) - 1, field) for col, field in column_mapping.items()]
+    ultima_columna = max(indice for indice, _ in columnas) + 1
+
+    filas = []
+    for row_num, valores in enumerate(
+        sheet.iter_rows(min_row=start_row, max_col=ultima_columna, values_only=True), start=start_row
+    ):
+        row_data = {}
+        for indice, field in columnas:
+            cell_value = valores[indice] if indice < len(valores) else None
+            if cell_value is not None:
+                if isinstance(cell_value, str):
+                    cell_value = cell_value.strip()
+                row_data[field] = cell_value
+        if row_data.get('codigo_interno'):
+            filas.append((row_num, row_data))
+    return filas
+
+
+def _validar_equipo_en_memoria(equipo, campos=None):
+    """
+    Valida longitudes, decimales y fechas de los campos que se van a escribir,
+    para que un valor inválido falle en su fila y no en el lote completo.
+    """
+    nombres = {f.name for f in Equipo._meta.concrete_fields}
+    if campos is None:
+        excluir = ['empresa']
+    else:
+        excluir = list(nombres - set(campos))
+    equipo.clean_fields(exclude=excluir)
+
+
+def _planificar_actividades(actividades, equipo_key, dates_dict, row_data):
+    """Registra las actividades de la fila; la primera fila con una fecha manda."""
+    for tipo, campo_fecha in (
+        ('calibracion', 'fecha_ultima_calibracion'),
+        ('mantenimiento', 'fecha_ultimo_mantenimiento'),
+        ('comprobacion', 'fecha_ultima_comprobacion'),
+    ):
+        fecha = dates_dict.get(campo_fecha)
+        if fecha:
+            actividades.setdefault((equipo_key, tipo, fecha), row_data.get(f'proveedor_{tipo}') or None)
+
+
+def _crear_actividades_en_lote(actividades, equipos, user):
     """
-    Crea registros de Calibracion, Mantenimiento y Comprobacion
-    a partir de las fechas de última actividad del Excel.
-    Usa los proveedores específicos por actividad si vienen en el archivo.
-    Solo crea si no existe ya un registro para esa fecha en ese equipo.
+    Crea con ``bulk_create`` las actividades planificadas que no existan ya para
+    esa fecha y equipo. Equivale a ``_crear_actividades_desde_excel`` por fila,
+    incluido el consecutivo de comprobaciones que asigna ``Comprobacion.save``.
+
+    Returns:
+        dict: {tipo: set(equipo_id)} equipos con actividades nuevas
     """
+    from django.db.models import Max
     from ..models import Calibracion, Mantenimiento, Comprobacion
 
-    fecha_cal = dates_dict.get('fecha_ultima_calibracion')
-    if fecha_cal:
-        if not Calibracion.objects.filter(equipo=equipo, fecha_calibracion=fecha_cal).exists():
-            nombre_prov = row_data.get('proveedor_calibracion') or None
-            Calibracion.objects.create(
-                equipo=equipo,
-                fecha_calibracion=fecha_cal,
-                resultado='Aprobado',
-                nombre_proveedor=nombre_prov,
-                creado_por=user if not user.is_superuser else None,
-            )
-            logger.info(f"Calibración creada para {equipo.codigo_interno} ({fecha_cal}) — proveedor: {nombre_prov}")
-
-    fecha_mant = dates_dict.get('fecha_ultimo_mantenimiento')
-    if fecha_mant:
-        if not Mantenimiento.objects.filter(equipo=equipo, fecha_mantenimiento=fecha_mant).exists():
-            nombre_prov = row_data.get('proveedor_mantenimiento') or None
-            Mantenimiento.objects.create(
-                equipo=equipo,
-                fecha_mantenimiento=fecha_mant,
-                tipo_mantenimiento='Preventivo',
-                nombre_proveedor=nombre_prov,
-                descripcion='Registro importado desde plantilla Excel',
-            )
-            logger.info(f"Mantenimiento creado para {equipo.codigo_interno} ({fecha_mant}) — proveedor: {nombre_prov}")
-
-    fecha_comp = dates_dict.get('fecha_ultima_comprobacion')
-    if fecha_comp:
-        if not Comprobacion.objects.filter(equipo=equipo, fecha_comprobacion=fecha_comp).exists():
-            nombre_prov = row_data.get('proveedor_comprobacion') or None
-            Comprobacion.objects.create(
-                equipo=equipo,
-                fecha_comprobacion=fecha_comp,
-                resultado='Aprobado',
-                nombre_proveedor=nombre_prov,
-                creado_por=user if not user.is_superuser else None,
+    creado_por = user if not user.is_superuser else None
+    modelos = {
+        'calibracion': (Calibracion, 'fecha_calibracion'),
+        'mantenimiento': (Mantenimiento, 'fecha_mantenimiento'),
+        'comprobacion': (Comprobacion, 'fecha_comprobacion'),
+    }
+
+    pendientes = {tipo: [] for tipo in modelos}
+    for (equipo_key, tipo, fecha), nombre_prov in actividades.items():
+        pendientes[tipo].append((equipos[equipo_key], fecha, nombre_prov))
+
+    equipos_con_actividad = {tipo: set() for tipo in modelos}
+    for tipo, (modelo, campo_fecha) in modelos.items():
+        if not pendientes[tipo]:
+            continue
+
+        existentes = set()
+        for ids in _en_lotes({equipo.pk for equipo, _, _ in pendientes[tipo]}):
+            existentes.update(
+                modelo.objects.filter(equipo_id__in=ids).values_list('equipo_id', campo_fecha)
             )
-            logger.info(f"Comprobación creada para {equipo.codigo_interno} ({fecha_comp}) — proveedor: {nombre_prov}")
+
+        nuevas = []
+        for equipo, fecha, nombre_prov in pendientes[tipo]:
+            if (equipo.pk, fecha) in existentes:
+                continue
+            if tipo == 'calibracion':
+                nuevas.append(Calibracion(
+                    equipo=equipo, fecha_calibracion=fecha, resultado='Aprobado',
+                    nombre_proveedor=nombre_prov, creado_por=creado_por,
+                ))
+            elif tipo == 'mantenimiento':
+                nuevas.append(Mantenimiento(
+                    equipo=equipo, fecha_mantenimiento=fecha, tipo_mantenimiento='Preventivo',
+                    nombre_proveedor=nombre_prov, descripcion='Registro importado desde plantilla Excel',
+                ))
+            else:
+                nuevas.append(Comprobacion(
+                    equipo=equipo, fecha_comprobacion=fecha, resultado='Aprobado',
+                    nombre_proveedor=nombre_prov, creado_por=creado_por,
+                ))
+            equipos_con_actividad[tipo].add(equipo.pk)
+
+        if tipo == 'comprobacion' and nuevas:
+            # Consecutivo por empresa, como en Comprobacion.save()
+            ultimos = {}
+            for comprobacion in nuevas:
+                empresa = comprobacion.equipo.empresa
+                if empresa.pk not in ultimos:
+                    ultimos[empresa.pk] = Comprobacion.objects.filter(
+                        equipo__empresa=empresa, consecutivo__isnull=False
+                    ).aggregate(ultimo=Max('consecutivo'))['ultimo'] or 0
+                ultimos[empresa.pk] += 1
+                comprobacion.consecutivo = ultimos[empresa.pk]
+                prefijo = empresa.comprobacion_prefijo_consecutivo or 'CB'
+                comprobacion.consecutivo_texto = f"{prefijo}-{comprobacion.consecutivo:03d}"
+
+        modelo.objects.bulk_create(nuevas, batch_size=IMPORT_EXCEL_LOTE)
+
+    return equipos_con_actividad
+
+
+def _recalcular_fechas_en_lote(equipos, equipos_con_actividad):
+    """
+    Pasada única de fechas para los equipos importados. Reproduce el estado
+    final del flujo por fila (señales de actividad + doble save de Equipo):
+    la última fecha sale del historial y la próxima de ``calcular_proxima_*``,
+    con el historial precargado en una consulta agregada por tipo y lote.
+    """
+    from ..fechas_equipos import ultimas_fechas
+
+    ultimas = ultimas_fechas([equipo.pk for equipo in equipos], lote=IMPORT_EXCEL_LOTE)
+
+    for equipo in equipos:
+        ultima_cal = ultimas['calibracion'].get(equipo.pk)
+        ultimo_mant = ultimas['mantenimiento'].get(equipo.pk)
+        ultima_comp = ultimas['comprobacion'].get(equipo.pk)
+
+        # Las señales de actividad fijan la última fecha desde el historial
+        if equipo.pk in equipos_con_actividad['calibracion']:
+            equipo.fecha_ultima_calibracion = ultima_cal
+        if equipo.pk in equipos_con_actividad['mantenimiento']:
+            equipo.fecha_ultimo_mantenimiento = ultimo_mant
+        if equipo.pk in equipos_con_actividad['comprobacion']:
+            equipo.fecha_ultima_comprobacion = ultima_comp
+
+        equipo.calcular_proxima_calibracion(ultima_cal)
+        equipo.calcular_proximo_mantenimiento(ultimo_mant)
+        equipo.calcular_proxima_comprobacion(ultima_comp)
+
+    Equipo.objects.bulk_update(equipos, CAMPOS_FECHAS_IMPORTACION, batch_size=IMPORT_EXCEL_LOTE)
+
+
+def _notificar_importacion(empresas, equipo_ids, equipos_con_actividad):
+    """
+    Sustituye a las señales post_save que ``bulk_create``/``bulk_update`` no
+    emiten: caché del dashboard, un recálculo de estadísticas por empresa,
+    sello de contenido de las Hojas de Vida y contadores de aprobación.
+    """
+    from ..signals import invalidate_dashboard_cache
+    from ..stats_queue import solicitar_recalculo_stats
+    from ..pdf_cache import renovar_version_contenido
+    from ..contadores_aprobacion import invalidar_contadores
+
+    with diferir_recalculo_stats():
+        for empresa in empresas.values():
+            invalidate_dashboard_cache(empresa.id)
+            solicitar_recalculo_stats(empresa)
+
+    for ids in _en_lotes(equipo_ids):
+        renovar_version_contenido(equipo_ids=ids)
+
+    if equipos_con_actividad['calibracion'] or equipos_con_actividad['comprobacion']:
+        for empresa_id in empresas:
+            invalidar_contadores(empresa_id)
 
 
 def _process_excel_import(excel_file, user):
     """
     Procesa el archivo Excel importado y crea los equipos.
 
+    Trabaja en lote: valida todas las filas en memoria contra los equipos
+    existentes (precargados en un dict por código interno) y después escribe
+    equipos, actividades y fechas con bulk_create/bulk_update en una sola
+    transacción, con un único recálculo de estadísticas por empresa.
+
     Args:
         excel_file: Archivo Excel subido
         user: Usuario que realiza la importación
@@ -3473,6 +3635,8 @@ def _process_excel_import(excel_file, user):
     Returns:
         dict: Resultado con success, imported, errors
     """
+    import copy
+
     result = {
         'success': False,
         'imported': 0,
@@ -3493,7 +3657,6 @@ def _process_excel_import(excel_file, user):
 
         # Comenzar desde la fila 8 (después de headers)
         start_row = 8
-        imported_count = 0
         created_count = 0
         updated_count = 0
         errors = []
@@ -3515,121 +3678,100 @@ def _process_excel_import(excel_file, user):
             f"Slots disponibles: {capacidad['slots_disponibles']} de {capacidad['limite']}"
         )
 
-        # Procesar fila por fila fuera de transacción para mejor manejo de errores
-        for row_num in range(start_row, sheet.max_row + 1):
+        # Fase 1: validación de filas en memoria
+        filas_validas = []
+        empresas_por_nombre = {}
+        for row_num, row_data in _leer_filas_excel(sheet, column_mapping, start_row):
             try:
-                # Extraer datos de la fila
-                row_data = _extract_row_data(sheet, row_num, column_mapping)
-
-                # Verificar si hay datos en la fila (al menos código interno)
-                if not row_data.get('codigo_interno'):
-                    continue
-
-                # Log de diagnóstico para frecuencias (mostrar TODAS, incluso None)
-                freq_debug = []
-                for key in ['frecuencia_calibracion_meses', 'frecuencia_mantenimiento_meses', 'frecuencia_comprobacion_meses']:
-                    value = row_data.get(key, 'NO_EXISTE')
-                    freq_debug.append(f"{key}: {repr(value)}")
-                logger.info(f"Fila {row_num} - TODAS las frecuencias: {', '.join(freq_debug)}")
-
-                # Validaciones básicas con mensajes claros
-                validation_result = _validate_row_data(row_data, row_num, user_empresa)
+                validation_result = _validate_row_data(row_data, row_num, user_empresa, empresas_por_nombre)
                 if validation_result['errors']:
                     errors.extend(validation_result['errors'])
                     continue
 
-                empresa = validation_result['empresa']
-
-                # Verificar si el equipo ya existe para decidir crear o actualizar
-                equipo_existente = Equipo.objects.filter(
-                    codigo_interno=row_data['codigo_interno'],
-                    empresa=empresa
-                ).first()
-
-                es_actualizacion = equipo_existente is not None
-
-                # Procesar todas las fechas de la fila
                 dates_result = _process_all_row_dates(row_data, row_num)
                 if dates_result['errors']:
                     errors.extend(dates_result['errors'])
                     continue
 
-                # Crear o actualizar el equipo en transacción individual
-                try:
-                    with transaction.atomic():
-                        if es_actualizacion:
-                            # Actualizar equipo existente
-                            campos_actualizados = _update_existing_equipment(
-                                equipo_existente,
-                                row_data,
-                                dates_result['dates']
-                            )
-                            equipo = equipo_existente
-                        else:
-                            # Crear nuevo equipo
-                            equipo = _create_new_equipment(
-                                row_data,
-                                empresa,
-                                dates_result['dates']
-                            )
-                            campos_actualizados = []
-
-                        # Calcular fechas próximas basadas en las fechas de última actividad y frecuencias
-                        _calcular_fechas_proximas(equipo)
-
-                        # Crear registros de actividad si vienen fechas en el Excel
-                        _crear_actividades_desde_excel(equipo, dates_result['dates'], row_data, user)
-
-                        imported_count += 1
-                        if es_actualizacion:
-                            updated_count += 1
-                        else:
-                            created_count += 1
-
-                        # Log detallado de importación con frecuencias y fechas
-                        freq_info = []
-                        if equipo.frecuencia_calibracion_meses:
-                            freq_info.append(f"Calib: {equipo.frecuencia_calibracion_meses}m")
-                        if equipo.frecuencia_mantenimiento_meses:
-                            freq_info.append(f"Mant: {equipo.frecuencia_mantenimiento_meses}m")
-                        if equipo.frecuencia_comprobacion_meses:
-                            freq_info.append(f"Comp: {equipo.frecuencia_comprobacion_meses}m")
-
-                        fecha_info = []
-                        if equipo.fecha_ultima_calibracion:
-                            fecha_info.append(f"Últ.Calib: {equipo.fecha_ultima_calibracion}")
-                        if equipo.fecha_ultimo_mantenimiento:
-                            fecha_info.append(f"Últ.Mant: {equipo.fecha_ultimo_mantenimiento}")
-                        if equipo.fecha_ultima_comprobacion:
-                            fecha_info.append(f"Últ.Comp: {equipo.fecha_ultima_comprobacion}")
-
-                        proxima_info = []
-                        if equipo.proxima_calibracion:
-                            proxima_info.append(f"Prox.Calib: {equipo.proxima_calibracion}")
-                        if equipo.proximo_mantenimiento:
-                            proxima_info.append(f"Prox.Mant: {equipo.proximo_mantenimiento}")
-                        if equipo.proxima_comprobacion:
-                            proxima_info.append(f"Prox.Comp: {equipo.proxima_comprobacion}")
-
-                        # Log diferenciado para creación vs actualización
-                        accion = "🔄 ACTUALIZADO" if es_actualizacion else "✅ CREADO"
-                        extra_info = ""
-                        if es_actualizacion and 'campos_actualizados' in locals():
-                            extra_info = f" | Campos actualizados: {len(campos_actualizados)}"
-
-                        logger.info(f"{accion}: {equipo.codigo_interno}{extra_info} | " +
-                                  f"Frecuencias: [{', '.join(freq_info) if freq_info else 'Ninguna'}] | " +
-                                  f"Últimas: [{', '.join(fecha_info) if fecha_info else 'Ninguna'}] | " +
-                                  f"Próximas: [{', '.join(proxima_info) if proxima_info else 'Ninguna'}]")
-
-                except Exception as create_error:
-                    errors.append(f"Fila {row_num}: ❌ Error creando equipo - {str(create_error)}")
-                    continue
-
+                filas_validas.append((row_num, row_data, validation_result['empresa'], dates_result['dates']))
             except Exception as e:
                 errors.append(f"Fila {row_num}: ❌ Error procesando fila - {str(e)}")
+
+        # Fase 2: precargar equipos existentes por (empresa, código interno)
+        codigos_por_empresa = defaultdict(set)
+        for _, row_data, empresa, _ in filas_validas:
+            codigos_por_empresa[empresa.id].add(row_data['codigo_interno'])
+        existentes = {}
+        for empresa_id, codigos in codigos_por_empresa.items():
+            for lote in _en_lotes(codigos):
+                for equipo in Equipo.objects.filter(empresa_id=empresa_id, codigo_interno__in=lote).select_related('empresa'):
+                    existentes[(empresa_id, equipo.codigo_interno)] = equipo
+
+        # Fase 3: aplicar cada fila sobre su equipo en memoria
+        nuevos = {}
+        actualizados = {}
+        campos_actualizados = set()
+        actividades = {}
+        empresas = {}
+        for row_num, row_data, empresa, dates_dict in filas_validas:
+            equipo_key = (empresa.id, row_data['codigo_interno'])
+            try:
+                # Un código repetido en el archivo actualiza el equipo de la fila anterior
+                pendiente = nuevos.get(equipo_key) or actualizados.get(equipo_key) or existentes.get(equipo_key)
+                if pendiente is not None:
+                    equipo = copy.copy(pendiente)
+                    campos = _aplicar_cambios_equipo(equipo, row_data, dates_dict)
+                    _validar_equipo_en_memoria(equipo, campos)
+                else:
+                    equipo = _nuevo_equipo(row_data, empresa, dates_dict)
+                    _validar_equipo_en_memoria(equipo)
+            except Exception as create_error:
+                if isinstance(create_error, ValidationError):
+                    create_error = '; '.join(create_error.messages)
+                errors.append(f"Fila {row_num}: ❌ Error creando equipo - {str(create_error)}")
                 continue
 
+            if equipo_key in nuevos or pendiente is None:
+                nuevos[equipo_key] = equipo
+            else:
+                actualizados[equipo_key] = equipo
+                campos_actualizados.update(campos)
+            if pendiente is None:
+                created_count += 1
+            else:
+                updated_count += 1
+
+            empresas[empresa.id] = empresa
+            _planificar_actividades(actividades, equipo_key, dates_dict, row_data)
+
+        # Fase 4: escritura en lote
+        if nuevos or actualizados:
+            equipos = {**actualizados, **nuevos}
+            # bulk_create/bulk_update no pasan por Equipo.save(): texto de búsqueda aquí
+            for equipo in equipos.values():
+                equipo.texto_busqueda = construir_texto_busqueda(equipo)
+            if campos_actualizados & set(CAMPOS_BUSQUEDA):
+                campos_actualizados.add('texto_busqueda')
+            try:
+                with transaction.atomic():
+                    Equipo.objects.bulk_create(list(nuevos.values()), batch_size=IMPORT_EXCEL_LOTE)
+                    if actualizados and campos_actualizados:
+                        Equipo.objects.bulk_update(
+                            list(actualizados.values()), sorted(campos_actualizados),
+                            batch_size=IMPORT_EXCEL_LOTE
+                        )
+                    equipos_con_actividad = _crear_actividades_en_lote(actividades, equipos, user)
+                    _recalcular_fechas_en_lote(list(equipos.values()), equipos_con_actividad)
+            except Exception as e:
+                logger.error(f"Error guardando lote de importación Excel: {e}")
+                errors.append(f"❌ Error guardando los equipos importados - {str(e)}")
+                created_count = updated_count = 0
+            else:
+                _notificar_importacion(
+                    empresas, [equipo.pk for equipo in equipos.values()], equipos_con_actividad
+                )
+
+        imported_count = created_count + updated_count
         result['success'] = imported_count > 0
         result['imported'] = imported_count
         result['created'] = created_count
@@ -3737,9 +3879,10 @@ def _parse_decimal(value):
         return None
 
 
-def _validate_row_data(row_data, row_num, user_empresa):
+def _validate_row_data(row_data, row_num, user_empresa, empresas_por_nombre=None):
     """
     Valida los datos de una fila y retorna empresa y errores.
+    ``empresas_por_nombre`` (dict) memoriza las empresas ya buscadas entre filas.
 
     Returns:
         dict: {'empresa': Empresa|None, 'errors': [lista_errores]}
@@ -3773,7 +3916,14 @@ def _validate_row_data(row_data, row_num, user_empresa):
             return result
 
         try:
-            result['empresa'] = Empresa.objects.get(nombre=empresa_nombre)
+            if empresas_por_nombre is None:
+                result['empresa'] = Empresa.objects.get(nombre=empresa_nombre)
+            else:
+                if empresa_nombre not in empresas_por_nombre:
+                    empresas_por_nombre[empresa_nombre] = Empresa.objects.filter(nombre=empresa_nombre).first()
+                if empresas_por_nombre[empresa_nombre] is None:
+                    raise Empresa.DoesNotExist
+                result['empresa'] = empresas_por_nombre[empresa_nombre]
         except Empresa.DoesNotExist:
             result['errors'].append(f"Fila {row_num}: ❌ Empresa '{empresa_nombre}' no encontrada. Empresas disponibles: {list(Empresa.objects.values_list('nombre', flat=True))}")
             return result
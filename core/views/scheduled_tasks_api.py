@@ -285,6 +285,34 @@ def trigger_cobrar_renovaciones(request):
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
+@csrf_exempt
+@require_http_methods(["POST", "GET"])
+def trigger_email_outbox(request):
+    """
+    Envía los emails pendientes de la bandeja de salida (core/email_outbox.py).
+    Endpoint: /core/api/scheduled/email/outbox/
+    """
+    if not verify_token(request):
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+
+    try:
+        from core.email_outbox import drenar, metricas_outbox
+
+        metricas = drenar()
+        logger.info(f'✅ Outbox email drenado: {metricas}')
+
+        return JsonResponse({
+            'success': True,
+            'task': 'email_outbox',
+            'run': metricas,
+            'outbox': metricas_outbox()['por_estado'],
+        })
+
+    except Exception as e:
+        logger.error(f'❌ Error drenando outbox email: {e}')
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def health_check(request):
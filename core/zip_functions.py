@@ -2,17 +2,16 @@
 # Funciones ZIP migradas desde views.py para evitar problemas de importación
 
 import logging
-import io
 import os
-import zipfile
 from datetime import datetime
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from django.db.models import Max
 from django.core.files.storage import default_storage
 from datetime import timedelta
 from core.models import ZipRequest, Empresa, Equipo, Proveedor, Procedimiento
+from core.zip_stream import ZipStream
 
 logger = logging.getLogger(__name__)
 
@@ -425,7 +424,8 @@ def generar_descarga_multipartes(request, empresa, equipos_count, max_equipos_po
             user=request.user,
             empresa=empresa,
             status='pending',
-            position_in_queue=max_position + parte_num,
+            # La última parte (con Procedimientos) va primero en la cola
+            position_in_queue=max_position + (1 if parte_num == total_partes else parte_num + 1),
             parte_numero=parte_num,
             total_partes=total_partes,
             rango_equipos_inicio=inicio,
@@ -448,33 +448,8 @@ def generar_descarga_multipartes(request, empresa, equipos_count, max_equipos_po
 
     logger.info(f"✅ Creadas {total_partes} solicitudes ZIP para empresa {empresa.nombre}")
 
-    # Iniciar procesamiento asíncrono si está disponible
-    try:
-        from .async_zip_improved import start_async_processor, add_zip_request_to_queue
-        start_async_processor()
-
-        # Agregar a cola en orden optimizado: Parte 3 primero (tiene procedimientos)
-        # Luego Parte 1, Parte 2, etc.
-        orden_optimizado = [total_partes] + list(range(1, total_partes))
-
-        for parte_num in orden_optimizado:
-            # ✅ Usar filter().first() en lugar de get() para evitar MultipleObjectsReturned
-            # Ordenar por created_at descendente para tomar la más reciente
-            zip_req = ZipRequest.objects.filter(
-                user=request.user,
-                empresa=empresa,
-                parte_numero=parte_num,
-                status='pending'
-            ).order_by('-created_at').first()
-
-            if zip_req:
-                add_zip_request_to_queue(zip_req)
-                logger.info(f"📦 Parte {parte_num} agregada a cola asíncrona (ID: {zip_req.id})")
-            else:
-                logger.warning(f"⚠️ No se encontró solicitud ZIP para parte {parte_num}")
-
-    except Exception as e:
-        logger.warning(f"No se pudo iniciar procesamiento asíncrono: {e}")
+    # Las partes quedan en la cola de BD; los workers de process_zip_queue las
+    # reclaman en paralelo (ver core/zip_queue.py)
 
     return JsonResponse({
         'status': 'multi_part',
@@ -531,9 +506,6 @@ def descarga_directa_rapida(request, empresa):
             empresa=empresa
         ).select_related('equipo', 'empresa').order_by('-fecha_prestamo')
 
-        # Crear ZIP en memoria con compresión adaptativa
-        zip_buffer = io.BytesIO()
-
         # Optimizar nivel de compresión basado en cantidad de equipos
         num_equipos = len(equipos_empresa)
         if num_equipos <= 5:
@@ -547,251 +519,19 @@ def descarga_directa_rapida(request, empresa):
 
         empresa_nombre = empresa.nombre
 
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as zf:
-            # Excel consolidado (importar desde views/reports)
-            try:
-                from .views.reports import _generate_consolidated_excel_content
-                excel_consolidado = _generate_consolidated_excel_content(
-                    equipos_empresa, proveedores_empresa, procedimientos_empresa, prestamos_empresa
-                )
-                zf.writestr(f"{empresa_nombre}/Informe_Consolidado.xlsx", excel_consolidado)
-            except ImportError as e:
-                logger.error(f"Error importando función Excel: {e}")
-                # Crear archivo de error temporal
-                zf.writestr(f"{empresa_nombre}/ERROR_Excel.txt", f"Error generando Excel: {e}")
-
-            # Carpeta de Procedimientos de la empresa
-            procedimientos_count = procedimientos_empresa.count()
-            logger.info(f"[DEBUG PROCEDIMIENTOS] Empresa {empresa_nombre} tiene {procedimientos_count} procedimientos")
-
-            # Debug: Listar todos los procedimientos
-            for p in procedimientos_empresa:
-                logger.info(f"[DEBUG] Procedimiento encontrado: ID={p.id}, Código={p.codigo}, Tiene PDF={bool(p.documento_pdf)}")
-
-            procedimientos_agregados = 0
-            for idx, procedimiento in enumerate(procedimientos_empresa, 1):
-                tiene_archivo = bool(procedimiento.documento_pdf)
-                archivo_path = procedimiento.documento_pdf.name if procedimiento.documento_pdf else "No hay archivo"
-                logger.info(f"Procedimiento {idx}: '{procedimiento.codigo}' - '{procedimiento.nombre}' - Archivo: {tiene_archivo} - Path: {archivo_path}")
-
-                if procedimiento.documento_pdf:
-                    try:
-                        # Nombre descriptivo: CODIGO_Nombre.pdf
-                        safe_codigo = procedimiento.codigo.replace('/', '_').replace('\\', '_')
-                        safe_nombre = procedimiento.nombre.replace('/', '_').replace('\\', '_')[:50]  # Limitar longitud
-                        filename = f"{safe_codigo}_{safe_nombre}.pdf"
-
-                        # Usar función local de streaming
-                        if stream_file_to_zip_local(zf, procedimiento.documento_pdf.name, f"{empresa_nombre}/Procedimientos/{filename}"):
-                            procedimientos_agregados += 1
-                            logger.info(f"✅ Procedimiento agregado: {filename}")
-                        else:
-                            logger.warning(f"❌ No se pudo agregar procedimiento: {filename}")
-                    except Exception as e:
-                        logger.error(f"❌ Error añadiendo procedimiento {procedimiento.codigo}: {e}")
-                else:
-                    logger.warning(f"⚠️ Procedimiento {procedimiento.codigo} sin documento PDF")
-
-            # Crear carpeta vacía si no hay procedimientos para que aparezca en el ZIP
-            if procedimientos_agregados == 0:
-                zf.writestr(f"{empresa_nombre}/Procedimientos/README.txt", "No hay procedimientos con documentos PDF disponibles para esta empresa.")
-                logger.info(f"📁 Carpeta /Procedimientos/ creada (vacía) para {empresa_nombre}")
-            else:
-                logger.info(f"✅ {procedimientos_agregados} procedimientos agregados a la carpeta /Procedimientos/")
-
-            # Procesar cada equipo (lógica igual a producción)
-            for idx, equipo in enumerate(equipos_empresa, 1):
-                safe_codigo = equipo.codigo_interno.replace('/', '_').replace('\\', '_')
-                equipo_folder = f"{empresa_nombre}/Equipos/{safe_codigo}"
-
-                # Hoja de vida PDF
-                try:
-                    from .views.reports import _generate_equipment_hoja_vida_pdf_content
-                    hoja_vida_pdf_content = _generate_equipment_hoja_vida_pdf_content(request, equipo)
-                    zf.writestr(f"{equipo_folder}/Hoja_de_vida.pdf", hoja_vida_pdf_content)
-                except ImportError as e:
-                    logger.error(f"Error importando función PDF: {e}")
-                    zf.writestr(f"{equipo_folder}/Hoja_de_vida_ERROR.txt", f"Error: {e}")
-                except Exception as e:
-                    logger.error(f"Error generando PDF para {equipo.codigo_interno}: {e}")
-                    zf.writestr(f"{equipo_folder}/Hoja_de_vida_ERROR.txt", f"Error: {e}")
-
-                # Documentos de actividades con subcarpetas organizadas
-                # Calibraciones - TODOS los archivos en subcarpetas específicas
-                calibraciones = equipo.calibraciones.all()
-                cal_idx = 1
-                conf_idx = 1
-                int_idx = 1
-
-                for cal in calibraciones:
-                    # Documento de calibración principal -> Subcarpeta "Certificados_Calibracion"
-                    if cal.documento_calibracion:
-                        try:
-                            if default_storage.exists(cal.documento_calibracion.name):
-                                with default_storage.open(cal.documento_calibracion.name, 'rb') as f:
-                                    content = f.read()
-                                    filename = f"cal_{cal_idx}.pdf"
-                                    zf.writestr(f"{equipo_folder}/Calibraciones/Certificados_Calibracion/{filename}", content)
-                                    cal_idx += 1
-                        except Exception as e:
-                            logger.error(f"Error añadiendo certificado calibración: {e}")
-
-                    # Confirmación metrológica PDF -> Subcarpeta "Confirmacion_Metrologica"
-                    if cal.confirmacion_metrologica_pdf:
-                        try:
-                            if default_storage.exists(cal.confirmacion_metrologica_pdf.name):
-                                with default_storage.open(cal.confirmacion_metrologica_pdf.name, 'rb') as f:
-                                    content = f.read()
-                                    filename = f"conf_{conf_idx}.pdf"
-                                    zf.writestr(f"{equipo_folder}/Calibraciones/Confirmacion_Metrologica/{filename}", content)
-                                    conf_idx += 1
-                        except Exception as e:
-                            logger.error(f"Error añadiendo confirmación metrológica: {e}")
-
-                    # Intervalos de calibración PDF -> Subcarpeta "Intervalos_Calibracion"
-                    if cal.intervalos_calibracion_pdf:
-                        try:
-                            if default_storage.exists(cal.intervalos_calibracion_pdf.name):
-                                with default_storage.open(cal.intervalos_calibracion_pdf.name, 'rb') as f:
-                                    content = f.read()
-                                    filename = f"int_{int_idx}.pdf"
-                                    zf.writestr(f"{equipo_folder}/Calibraciones/Intervalos_Calibracion/{filename}", content)
-                                    int_idx += 1
-                        except Exception as e:
-                            logger.error(f"Error añadiendo intervalos calibración: {e}")
-
-                # Mantenimientos
-                mantenimientos = equipo.mantenimientos.all()
-                for mant_idx, mant in enumerate(mantenimientos, 1):
-                    # Documento Externo
-                    if mant.documento_externo:
-                        try:
-                            if default_storage.exists(mant.documento_externo.name):
-                                with default_storage.open(mant.documento_externo.name, 'rb') as f:
-                                    content = f.read()
-                                    filename = os.path.basename(mant.documento_externo.name)
-                                    zf.writestr(f"{equipo_folder}/Mantenimientos/Documentos_Externos/{filename}", content)
-                        except Exception as e:
-                            logger.error(f"Error añadiendo documento externo mantenimiento: {e}")
-
-                    # Documento Interno (CORREGIDO: era analisis_interno)
-                    if mant.documento_interno:
-                        try:
-                            if default_storage.exists(mant.documento_interno.name):
-                                with default_storage.open(mant.documento_interno.name, 'rb') as f:
-                                    content = f.read()
-                                    filename = os.path.basename(mant.documento_interno.name)
-                                    zf.writestr(f"{equipo_folder}/Mantenimientos/Documentos_Internos/{filename}", content)
-                        except Exception as e:
-                            logger.error(f"Error añadiendo documento interno mantenimiento: {e}")
-
-                    # Documento General
-                    if mant.documento_mantenimiento:
-                        try:
-                            if default_storage.exists(mant.documento_mantenimiento.name):
-                                with default_storage.open(mant.documento_mantenimiento.name, 'rb') as f:
-                                    content = f.read()
-                                    filename = os.path.basename(mant.documento_mantenimiento.name)
-                                    zf.writestr(f"{equipo_folder}/Mantenimientos/Documentos_Generales/{filename}", content)
-                        except Exception as e:
-                            logger.error(f"Error añadiendo archivo mantenimiento: {e}")
-
-                # Comprobaciones
-                comprobaciones = equipo.comprobaciones.all()
-                comp_cert_idx = 1
-                for comp_idx, comp in enumerate(comprobaciones, 1):
-                    # Comprobación PDF (certificados principales)
-                    if comp.comprobacion_pdf:
-                        try:
-                            if default_storage.exists(comp.comprobacion_pdf.name):
-                                with default_storage.open(comp.comprobacion_pdf.name, 'rb') as f:
-                                    content = f.read()
-                                    filename = f"comp_{comp_cert_idx}.pdf"
-                                    zf.writestr(f"{equipo_folder}/Comprobaciones/Certificados_Comprobacion/{filename}", content)
-                                    comp_cert_idx += 1
-                        except Exception as e:
-                            logger.error(f"Error añadiendo certificado comprobación: {e}")
-
-                    # Documento Externo
-                    if comp.documento_externo:
-                        try:
-                            if default_storage.exists(comp.documento_externo.name):
-                                with default_storage.open(comp.documento_externo.name, 'rb') as f:
-                                    content = f.read()
-                                    filename = os.path.basename(comp.documento_externo.name)
-                                    zf.writestr(f"{equipo_folder}/Comprobaciones/Documentos_Externos/{filename}", content)
-                        except Exception as e:
-                            logger.error(f"Error añadiendo documento externo comprobación: {e}")
-
-                    # Documento Interno (CORREGIDO: era analisis_interno)
-                    if comp.documento_interno:
-                        try:
-                            if default_storage.exists(comp.documento_interno.name):
-                                with default_storage.open(comp.documento_interno.name, 'rb') as f:
-                                    content = f.read()
-                                    filename = os.path.basename(comp.documento_interno.name)
-                                    zf.writestr(f"{equipo_folder}/Comprobaciones/Documentos_Internos/{filename}", content)
-                        except Exception as e:
-                            logger.error(f"Error añadiendo documento interno comprobación: {e}")
-
-                    # Documento General
-                    if comp.documento_comprobacion:
-                        try:
-                            if default_storage.exists(comp.documento_comprobacion.name):
-                                with default_storage.open(comp.documento_comprobacion.name, 'rb') as f:
-                                    content = f.read()
-                                    filename = os.path.basename(comp.documento_comprobacion.name)
-                                    zf.writestr(f"{equipo_folder}/Comprobaciones/Documentos_Generales/{filename}", content)
-                        except Exception as e:
-                            logger.error(f"Error añadiendo archivo comprobación: {e}")
-
-                # Documentos del equipo
-                equipment_docs = [
-                    (equipo.archivo_compra_pdf, 'compra'),
-                    (equipo.ficha_tecnica_pdf, 'ficha_tecnica'),
-                    (equipo.manual_pdf, 'manual'),
-                    (equipo.otros_documentos_pdf, 'otros_documentos')
-                ]
-
-                for doc_field, doc_type in equipment_docs:
-                    if doc_field:
-                        try:
-                            if doc_field.name.lower().endswith('.pdf'):
-                                nombre_descriptivo = f"{doc_type}.pdf"
-                                if default_storage.exists(doc_field.name):
-                                    with default_storage.open(doc_field.name, 'rb') as f:
-                                        content = f.read()
-                                        zf.writestr(f"{equipo_folder}/{nombre_descriptivo}", content)
-                        except Exception as e:
-                            logger.error(f"Error añadiendo documento del equipo: {e}")
-
-                # LÓGICA NUEVA: Carpeta de Baja SOLO si equipo está dado de baja
-                if equipo.estado == 'De Baja':
-                    try:
-                        baja_registro = equipo.baja_registro
-                        if baja_registro and baja_registro.documento_baja:
-                            if default_storage.exists(baja_registro.documento_baja.name):
-                                with default_storage.open(baja_registro.documento_baja.name, 'rb') as f:
-                                    content = f.read()
-                                    filename = "documento_baja.pdf"
-                                    zf.writestr(f"{equipo_folder}/Baja/{filename}", content)
-                                    logger.info(f"Carpeta /Baja/ agregada para equipo dado de baja: {equipo.codigo_interno}")
-                    except Exception as e:
-                        logger.error(f"Error añadiendo documento de baja para {equipo.codigo_interno}: {e}")
-
-        # Crear respuesta HTTP INMEDIATA (como producción)
-        zip_buffer.seek(0)
+        # Respuesta en STREAMING: el ZIP (zip64) se genera mientras se envía,
+        # sin BytesIO del archivo completo; el primer byte sale de inmediato
         timestamp = datetime.now().strftime('%Y%m%d_%H%M')
         filename = f"SAM_Equipos_{empresa_nombre}_{timestamp}.zip"
 
-        response = HttpResponse(zip_buffer.getvalue(), content_type='application/zip')
+        response = StreamingHttpResponse(
+            _iterar_zip_directo(
+                request, empresa_nombre, equipos_empresa, proveedores_empresa,
+                procedimientos_empresa, prestamos_empresa, compresslevel
+            ),
+            content_type='application/zip'
+        )
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        response['Content-Length'] = len(zip_buffer.getvalue())
-
-        # Log exitoso
-        equipos_count = equipos_empresa.count()
-        logger.info(f"ZIP INMEDIATO generado exitosamente para {empresa_nombre}: {equipos_count} equipos")
-
         return response
 
     except Exception as e:
@@ -800,6 +540,157 @@ def descarga_directa_rapida(request, empresa):
         return solicitar_zip_fallback(request, empresa, str(e))
 
 
+def _iterar_zip_directo(request, empresa_nombre, equipos_empresa, proveedores_empresa,
+                        procedimientos_empresa, prestamos_empresa, compresslevel):
+    """
+    Generador de la descarga directa: produce los bytes del ZIP a medida que
+    se leen los archivos de cada equipo (misma estructura que producción).
+
+    Una vez iniciado el envío ya no es posible el fallback a la cola: un error
+    inesperado se registra y corta la descarga.
+    """
+    zs = ZipStream(compresslevel=compresslevel)
+    try:
+        # Excel consolidado (importar desde views/reports)
+        try:
+            from .views.reports import _generate_consolidated_excel_content
+            excel_consolidado = _generate_consolidated_excel_content(
+                equipos_empresa, proveedores_empresa, procedimientos_empresa, prestamos_empresa
+            )
+            yield from zs.agregar_bytes(f"{empresa_nombre}/Informe_Consolidado.xlsx", excel_consolidado)
+        except ImportError as e:
+            logger.error(f"Error importando función Excel: {e}")
+            # Crear archivo de error temporal
+            yield from zs.agregar_bytes(f"{empresa_nombre}/ERROR_Excel.txt", f"Error generando Excel: {e}")
+
+        # Carpeta de Procedimientos de la empresa
+        procedimientos_agregados = 0
+        for procedimiento in procedimientos_empresa:
+            if procedimiento.documento_pdf:
+                # Nombre descriptivo: CODIGO_Nombre.pdf
+                safe_codigo = procedimiento.codigo.replace('/', '_').replace('\\', '_')
+                safe_nombre = procedimiento.nombre.replace('/', '_').replace('\\', '_')[:50]  # Limitar longitud
+                filename = f"{safe_codigo}_{safe_nombre}.pdf"
+
+                if (yield from zs.agregar_storage(f"{empresa_nombre}/Procedimientos/{filename}", procedimiento.documento_pdf.name)):
+                    procedimientos_agregados += 1
+                else:
+                    logger.warning(f"❌ No se pudo agregar procedimiento: {filename}")
+            else:
+                logger.warning(f"⚠️ Procedimiento {procedimiento.codigo} sin documento PDF")
+
+        # Crear carpeta vacía si no hay procedimientos para que aparezca en el ZIP
+        if procedimientos_agregados == 0:
+            yield from zs.agregar_bytes(
+                f"{empresa_nombre}/Procedimientos/README.txt",
+                "No hay procedimientos con documentos PDF disponibles para esta empresa."
+            )
+        else:
+            logger.info(f"✅ {procedimientos_agregados} procedimientos agregados a la carpeta /Procedimientos/")
+
+        # Procesar cada equipo (lógica igual a producción)
+        for equipo in equipos_empresa:
+            safe_codigo = equipo.codigo_interno.replace('/', '_').replace('\\', '_')
+            equipo_folder = f"{empresa_nombre}/Equipos/{safe_codigo}"
+
+            # Hoja de vida PDF
+            try:
+                from .views.reports import _generate_equipment_hoja_vida_pdf_content
+                hoja_vida_pdf_content = _generate_equipment_hoja_vida_pdf_content(request, equipo)
+            except Exception as e:
+                logger.error(f"Error generando PDF para {equipo.codigo_interno}: {e}")
+                yield from zs.agregar_bytes(f"{equipo_folder}/Hoja_de_vida_ERROR.txt", f"Error: {e}")
+            else:
+                yield from zs.agregar_bytes(f"{equipo_folder}/Hoja_de_vida.pdf", hoja_vida_pdf_content)
+
+            # Calibraciones - TODOS los archivos en subcarpetas específicas
+            cal_idx = 1
+            conf_idx = 1
+            int_idx = 1
+            for cal in equipo.calibraciones.all():
+                # Documento de calibración principal -> Subcarpeta "Certificados_Calibracion"
+                if cal.documento_calibracion:
+                    if (yield from zs.agregar_storage(
+                            f"{equipo_folder}/Calibraciones/Certificados_Calibracion/cal_{cal_idx}.pdf",
+                            cal.documento_calibracion.name)):
+                        cal_idx += 1
+
+                # Confirmación metrológica PDF -> Subcarpeta "Confirmacion_Metrologica"
+                if cal.confirmacion_metrologica_pdf:
+                    if (yield from zs.agregar_storage(
+                            f"{equipo_folder}/Calibraciones/Confirmacion_Metrologica/conf_{conf_idx}.pdf",
+                            cal.confirmacion_metrologica_pdf.name)):
+                        conf_idx += 1
+
+                # Intervalos de calibración PDF -> Subcarpeta "Intervalos_Calibracion"
+                if cal.intervalos_calibracion_pdf:
+                    if (yield from zs.agregar_storage(
+                            f"{equipo_folder}/Calibraciones/Intervalos_Calibracion/int_{int_idx}.pdf",
+                            cal.intervalos_calibracion_pdf.name)):
+                        int_idx += 1
+
+            # Mantenimientos
+            for mant in equipo.mantenimientos.all():
+                for campo, subcarpeta in (
+                    (mant.documento_externo, 'Documentos_Externos'),
+                    (mant.documento_interno, 'Documentos_Internos'),
+                    (mant.documento_mantenimiento, 'Documentos_Generales'),
+                ):
+                    if campo:
+                        yield from zs.agregar_storage(
+                            f"{equipo_folder}/Mantenimientos/{subcarpeta}/{os.path.basename(campo.name)}",
+                            campo.name
+                        )
+
+            # Comprobaciones
+            comp_cert_idx = 1
+            for comp in equipo.comprobaciones.all():
+                # Comprobación PDF (certificados principales)
+                if comp.comprobacion_pdf:
+                    if (yield from zs.agregar_storage(
+                            f"{equipo_folder}/Comprobaciones/Certificados_Comprobacion/comp_{comp_cert_idx}.pdf",
+                            comp.comprobacion_pdf.name)):
+                        comp_cert_idx += 1
+
+                for campo, subcarpeta in (
+                    (comp.documento_externo, 'Documentos_Externos'),
+                    (comp.documento_interno, 'Documentos_Internos'),
+                    (comp.documento_comprobacion, 'Documentos_Generales'),
+                ):
+                    if campo:
+                        yield from zs.agregar_storage(
+                            f"{equipo_folder}/Comprobaciones/{subcarpeta}/{os.path.basename(campo.name)}",
+                            campo.name
+                        )
+
+            # Documentos del equipo
+            equipment_docs = [
+                (equipo.archivo_compra_pdf, 'compra'),
+                (equipo.ficha_tecnica_pdf, 'ficha_tecnica'),
+                (equipo.manual_pdf, 'manual'),
+                (equipo.otros_documentos_pdf, 'otros_documentos')
+            ]
+            for doc_field, doc_type in equipment_docs:
+                if doc_field and doc_field.name.lower().endswith('.pdf'):
+                    yield from zs.agregar_storage(f"{equipo_folder}/{doc_type}.pdf", doc_field.name)
+
+            # LÓGICA NUEVA: Carpeta de Baja SOLO si equipo está dado de baja
+            if equipo.estado == 'De Baja':
+                baja_registro = getattr(equipo, 'baja_registro', None)
+                if baja_registro and baja_registro.documento_baja:
+                    yield from zs.agregar_storage(f"{equipo_folder}/Baja/documento_baja.pdf", baja_registro.documento_baja.name)
+
+        yield from zs.cerrar()
+        logger.info(
+            f"ZIP INMEDIATO enviado para {empresa_nombre}: {len(equipos_empresa)} equipos, "
+            f"{zs.bytes_enviados / (1024 * 1024):.2f} MB"
+        )
+
+    except Exception as e:
+        logger.error(f"Error en streaming de descarga INMEDIATA para {empresa_nombre}: {e}", exc_info=True)
+        raise
+
+
 def solicitar_zip_fallback(request, empresa, error_directo):
     """Fallback a cola si falla descarga directa"""
     logger.warning(f"Usando cola como fallback para {empresa.nombre}: {error_directo}")
@@ -877,14 +768,7 @@ def solicitar_zip_asincrono(request, empresa):
             expires_at=timezone.now() + timedelta(hours=6)
         )
 
-        # Agregar a la cola asíncrona para procesamiento en background
-        from .async_zip_improved import add_zip_request_to_queue, start_async_processor
-
-        # Asegurar que el procesador esté corriendo
-        start_async_processor()
-
-        # Agregar a cola asíncrona
-        add_zip_request_to_queue(zip_request)
+        # La solicitud queda en la cola de BD para los workers de process_zip_queue
 
         tiempo_estimado = _calcular_tiempo_estimado_equipos(equipos_count)
 
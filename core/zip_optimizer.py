@@ -5,21 +5,193 @@ import zipfile
 import tempfile
 import os
 import gc
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
+from queue import Queue
+from django.db import connection
 from django.http import StreamingHttpResponse
 from django.core.files.storage import default_storage
 from django.conf import settings
 from django.utils import timezone
 from io import BytesIO
 import logging
+from .zip_stream import ZipStream
 from .constants import ESTADO_ACTIVO, ESTADO_EN_MANTENIMIENTO, ESTADO_EN_CALIBRACION, ESTADO_EN_COMPROBACION
 
 logger = logging.getLogger('core')
 
+# Formatos que se renderizan por equipo (CPU) y pueden ir al pool de procesos
+FORMATOS_RENDER = ('hoja_vida', 'manual')
+
+
+def _render_config():
+    return getattr(settings, 'ZIP_RENDER_CONFIG', {})
+
+
+def procesos_render():
+    """Procesos del pool de render (1 = render secuencial en el proceso actual)."""
+    return max(1, int(_render_config().get('PROCESOS', 1)))
+
+
+def max_en_vuelo():
+    """Máximo de equipos renderizados pendientes de escribir (backpressure)."""
+    return max(1, int(_render_config().get('MAX_EN_VUELO', 8)))
+
+
+def _inicializar_proceso_render():
+    """Initializer de los procesos del pool (multiprocessing spawn)."""
+    import django
+
+    django.setup()
+
+    from core.render_pdf import precalentar
+    precalentar()
+
+
+def renderizar_artefactos_equipo(equipo_id, formatos):
+    """
+    Renderiza la Hoja de Vida y/o el Manual Excel de un equipo.
+
+    Se ejecuta dentro de los procesos del pool: recibe solo el id para no
+    serializar instancias y devuelve ``{formato: bytes | None}``.
+    """
+    from core.models import Equipo
+
+    equipo = Equipo.objects.select_related('empresa').prefetch_related(
+        'calibraciones', 'mantenimientos', 'comprobaciones'
+    ).get(pk=equipo_id)
+
+    return {
+        'hoja_vida': _generar_pdf_equipo(equipo) if 'hoja_vida' in formatos else None,
+        'manual': _generar_excel_equipo(equipo) if 'manual' in formatos else None,
+    }
+
+
+def _generar_pdf_equipo(equipo):
+    """
+    Genera PDF optimizado para el equipo.
+    """
+    try:
+        from core.views.reports import _generate_equipment_hoja_vida_pdf_content
+
+        pdf_content = _generate_equipment_hoja_vida_pdf_content(None, equipo)
+
+        # Si es exitoso, retornar el contenido
+        if pdf_content:
+            return pdf_content
+
+        return None
+
+    except Exception as e:
+        logger.warning(f"Error generating PDF for {equipo.codigo_interno}: {e}")
+        return None
+
+
+def _generar_excel_equipo(equipo):
+    """
+    Genera Excel optimizado para el equipo.
+    """
+    try:
+        import pandas as pd
+
+        # Crear datos básicos del equipo
+        data = {
+            'Código Interno': [equipo.codigo_interno],
+            'Nombre': [equipo.nombre],
+            'Marca': [equipo.marca],
+            'Modelo': [equipo.modelo],
+            'Serie': [equipo.numero_serie],
+            'Estado': [equipo.estado],
+            'Próxima Calibración': [equipo.proxima_calibracion],
+            'Próximo Mantenimiento': [equipo.proximo_mantenimiento],
+            'Ubicación': [str(equipo.ubicacion) if equipo.ubicacion else 'N/A']
+        }
+
+        # Crear Excel en memoria
+        excel_buffer = BytesIO()
+        df = pd.DataFrame(data)
+
+        with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
+            df.to_excel(writer, sheet_name='Datos_Equipo', index=False)
+
+            # Agregar calibraciones si existen
+            calibraciones = equipo.calibraciones.all()[:20]  # Limitar a 20 más recientes
+            if calibraciones:
+                cal_data = []
+                for cal in calibraciones:
+                    cal_data.append({
+                        'Fecha': cal.fecha_calibracion,
+                        'Resultado': cal.resultado,
+                        'Procedimiento': str(cal.procedimiento) if cal.procedimiento else 'N/A',
+                        'Observaciones': cal.observaciones or 'N/A'
+                    })
+
+                cal_df = pd.DataFrame(cal_data)
+                cal_df.to_excel(writer, sheet_name='Calibraciones', index=False)
+
+        excel_buffer.seek(0)
+        return excel_buffer.getvalue()
+
+    except Exception as e:
+        logger.warning(f"Error generating Excel for {equipo.codigo_interno}: {e}")
+        return None
+
+
+class _EscritorZip(threading.Thread):
+    """
+    Único thread que escribe en el ZIP.
+
+    Recibe (posición, equipo, artefactos) en el orden de los equipos y agrega
+    los artefactos renderizados más los adjuntos del storage. La cola es
+    acotada: si el escritor se atrasa, el productor se bloquea.
+    """
+
+    _FIN = object()
+
+    def __init__(self, generador, zip_file):
+        super().__init__(daemon=True, name="SAM_ZIP_Escritor")
+        self.generador = generador
+        self.zip_file = zip_file
+        self.cola = Queue(maxsize=2)
+        self.error = None
+
+    def run(self):
+        try:
+            while True:
+                item = self.cola.get()
+                if item is self._FIN:
+                    break
+                if self.error is None:
+                    self.generador._escribir_equipo(self.zip_file, *item)
+        except Exception as e:
+            self.error = e
+        finally:
+            connection.close()
+
+    def encolar(self, posicion, equipo, artefactos):
+        self.cola.put((posicion, equipo, artefactos))
+
+    def cerrar(self):
+        self.cola.put(self._FIN)
+        self.join()
+        if self.error is not None:
+            raise self.error
+
+
 class OptimizedZipGenerator:
     """
     Generador de ZIP optimizado para manejar más equipos con menos RAM.
     Usa streaming y procesamiento por chunks.
+
+    Con ``ZIP_RENDER_CONFIG['PROCESOS'] > 1`` la Hoja de Vida y el Manual
+    Excel de cada equipo se renderizan en un pool de procesos (WeasyPrint es
+    CPU-bound) mientras un único thread escritor los agrega al ZIP en el orden
+    de los equipos. Como mucho ``MAX_EN_VUELO`` equipos renderizados esperan
+    en memoria a ser escritos.
     """
 
     # Configuración optimizada
@@ -32,6 +204,7 @@ class OptimizedZipGenerator:
         self.formatos_seleccionados = formatos_seleccionados
         self.user = user
         self.temp_files = []  # Track temporary files for cleanup
+        self._render_pool = None
 
     def generate_streaming_zip(self):
         """
@@ -57,25 +230,8 @@ class OptimizedZipGenerator:
             logger.info(f"Generating optimized ZIP for {total_equipos} equipos from {self.empresa.nombre}")
 
             with zipfile.ZipFile(temp_zip.name, 'w', zipfile.ZIP_DEFLATED, compresslevel=self.COMPRESSION_LEVEL) as zip_file:
-                # Procesar equipos por chunks
-                for chunk_start in range(0, total_equipos, self.CHUNK_SIZE):
-                    chunk_end = min(chunk_start + self.CHUNK_SIZE, total_equipos)
-                    equipos_chunk = equipos[chunk_start:chunk_end]
-
-                    logger.info(f"Processing chunk {chunk_start}-{chunk_end} of {total_equipos}")
-
-                    # Procesar chunk actual
-                    self._process_chunk(zip_file, equipos_chunk, chunk_start)
-
-                    # Forzar liberación de memoria
-                    gc.collect()
-
-                # Agregar archivos de empresa
-                self._add_empresa_files(zip_file)
-
-                # Agregar procedimientos de la empresa si está seleccionado
-                if 'procedimientos' in self.formatos_seleccionados:
-                    self._add_procedimientos(zip_file)
+                for _ in self._escribir_contenido(zip_file, equipos, total_equipos):
+                    pass
 
             # Retornar información del archivo generado
             file_size = os.path.getsize(temp_zip.name)
@@ -96,121 +252,178 @@ class OptimizedZipGenerator:
                 'error': str(e)
             }
 
+    def iterar_zip_stream(self):
+        """
+        Genera el ZIP en streaming: entrega los bytes a medida que se escribe
+        cada equipo, sin archivo temporal (ver core/zip_stream.py).
+        """
+        zs = ZipStream(compresslevel=self.COMPRESSION_LEVEL)
+        equipos = self.empresa.equipos.all().select_related().prefetch_related(
+            'calibraciones',
+            'mantenimientos',
+            'comprobaciones'
+        )
+        total_equipos = equipos.count()
+        logger.info(f"Streaming optimized ZIP for {total_equipos} equipos from {self.empresa.nombre}")
+
+        for _ in self._escribir_contenido(zs.zip_file, equipos, total_equipos):
+            datos = zs.pendiente()
+            if datos:
+                yield datos
+        yield from zs.cerrar()
+
+    def _escribir_contenido(self, zip_file, equipos, total_equipos):
+        """
+        Escribe equipos, archivos de empresa y procedimientos en ``zip_file``.
+
+        Es un generador que cede el control después de cada equipo para que el
+        modo streaming pueda enviar lo escrito; el modo archivo lo consume entero.
+        """
+        with self._crear_pool_render() as self._render_pool:
+            # Procesar equipos por chunks
+            for chunk_start in range(0, total_equipos, self.CHUNK_SIZE):
+                chunk_end = min(chunk_start + self.CHUNK_SIZE, total_equipos)
+                equipos_chunk = equipos[chunk_start:chunk_end]
+
+                logger.info(f"Processing chunk {chunk_start}-{chunk_end} of {total_equipos}")
+
+                # Procesar chunk actual
+                yield from self._iterar_chunk(zip_file, equipos_chunk, chunk_start)
+
+                # Forzar liberación de memoria
+                gc.collect()
+
+        # Agregar archivos de empresa
+        self._add_empresa_files(zip_file)
+        yield
+
+        # Agregar procedimientos de la empresa si está seleccionado
+        if 'procedimientos' in self.formatos_seleccionados:
+            self._add_procedimientos(zip_file)
+            yield
+
+    def _formatos_render(self):
+        return [f for f in FORMATOS_RENDER if f in self.formatos_seleccionados]
+
+    def _crear_pool_render(self):
+        """Pool de procesos para el render, o un contexto nulo si no aplica."""
+        procesos = procesos_render()
+        if procesos <= 1 or not self._formatos_render():
+            return nullcontext(None)
+
+        # spawn: cada proceso arranca limpio (sin conexiones heredadas) y funciona en Windows
+        connection.close()
+        return ProcessPoolExecutor(
+            max_workers=procesos,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_inicializar_proceso_render,
+        )
+
     def _process_chunk(self, zip_file, equipos_chunk, chunk_start):
         """
         Procesa un chunk de equipos de forma optimizada.
         """
-        from core.views.reports import _generate_equipment_hoja_vida_pdf_content
+        for _ in self._iterar_chunk(zip_file, equipos_chunk, chunk_start):
+            pass
 
-        for idx, equipo in enumerate(equipos_chunk):
-            try:
-                equipo_folder = f"Equipos/{equipo.codigo_interno}_{equipo.nombre}/"
+    def _iterar_chunk(self, zip_file, equipos_chunk, chunk_start):
+        """
+        Escribe un chunk de equipos cediendo el control tras cada equipo
+        (escrito, o entregado al thread escritor si hay pool de render).
+        """
+        equipos = list(equipos_chunk)
+
+        if self._render_pool is None:
+            for idx, equipo in enumerate(equipos):
+                self._escribir_equipo(zip_file, chunk_start + idx, equipo, self._renderizar_local(equipo))
+                yield
+            return
+
+        formatos = self._formatos_render()
+        limite = max_en_vuelo()
+        escritor = _EscritorZip(self, zip_file)
+        escritor.start()
+        en_vuelo = deque()
+        try:
+            for idx, equipo in enumerate(equipos):
+                futuro = self._render_pool.submit(renderizar_artefactos_equipo, equipo.pk, formatos)
+                en_vuelo.append((chunk_start + idx, equipo, futuro))
+                # Backpressure: no lanzar más renders hasta entregar el más antiguo
+                if len(en_vuelo) >= limite:
+                    escritor.encolar(*self._resultado_render(en_vuelo.popleft()))
+                    yield
+            while en_vuelo:
+                escritor.encolar(*self._resultado_render(en_vuelo.popleft()))
+                yield
+        finally:
+            for _, _, futuro in en_vuelo:
+                futuro.cancel()
+            escritor.cerrar()
+
+    def _resultado_render(self, item):
+        posicion, equipo, futuro = item
+        try:
+            artefactos = futuro.result()
+        except Exception as e:
+            logger.warning(f"Error rendering artifacts for {equipo.codigo_interno}: {e}")
+            artefactos = {}
+        return posicion, equipo, artefactos
+
+    def _renderizar_local(self, equipo):
+        """Render secuencial en el proceso actual (sin pool)."""
+        return {
+            'hoja_vida': self._generate_pdf_optimized(equipo) if 'hoja_vida' in self.formatos_seleccionados else None,
+            'manual': self._generate_excel_optimized(equipo) if 'manual' in self.formatos_seleccionados else None,
+        }
+
+    def _escribir_equipo(self, zip_file, posicion, equipo, artefactos):
+        """
+        Escribe en el ZIP los artefactos renderizados y los adjuntos de un equipo.
+        """
+        try:
+            equipo_folder = f"Equipos/{equipo.codigo_interno}_{equipo.nombre}/"
 
-                # Generar Hoja de Vida PDF si está seleccionado
-                if 'hoja_vida' in self.formatos_seleccionados:
-                    pdf_content = self._generate_pdf_optimized(equipo)
-                    if pdf_content:
-                        zip_file.writestr(
-                            f"{equipo_folder}Hoja_Vida_{equipo.codigo_interno}.pdf",
-                            pdf_content
-                        )
+            # Hoja de Vida PDF si está seleccionado
+            if artefactos.get('hoja_vida'):
+                zip_file.writestr(
+                    f"{equipo_folder}Hoja_Vida_{equipo.codigo_interno}.pdf",
+                    artefactos['hoja_vida']
+                )
 
-                # Generar Manual Excel si está seleccionado
-                if 'manual' in self.formatos_seleccionados:
-                    excel_content = self._generate_excel_optimized(equipo)
-                    if excel_content:
-                        zip_file.writestr(
-                            f"{equipo_folder}Manual_Datos_{equipo.codigo_interno}.xlsx",
-                            excel_content
-                        )
+            # Manual Excel si está seleccionado
+            if artefactos.get('manual'):
+                zip_file.writestr(
+                    f"{equipo_folder}Manual_Datos_{equipo.codigo_interno}.xlsx",
+                    artefactos['manual']
+                )
 
-                # Agregar documentos de calibraciones con subcarpetas
-                self._add_calibraciones_subcarpetas(zip_file, equipo, equipo_folder)
+            # Agregar documentos de calibraciones con subcarpetas
+            self._add_calibraciones_subcarpetas(zip_file, equipo, equipo_folder)
 
-                # Agregar documentos de mantenimientos
-                self._add_mantenimientos(zip_file, equipo, equipo_folder)
+            # Agregar documentos de mantenimientos
+            self._add_mantenimientos(zip_file, equipo, equipo_folder)
 
-                # Agregar documentos de comprobaciones
-                self._add_comprobaciones(zip_file, equipo, equipo_folder)
+            # Agregar documentos de comprobaciones
+            self._add_comprobaciones(zip_file, equipo, equipo_folder)
 
-                # Liberar memoria cada 10 equipos
-                if (chunk_start + idx + 1) % 10 == 0:
-                    gc.collect()
+            # Liberar memoria cada 10 equipos
+            if (posicion + 1) % 10 == 0:
+                gc.collect()
 
-            except Exception as e:
-                logger.warning(f"Error processing equipo {equipo.codigo_interno}: {e}")
-                continue
+        except Exception as e:
+            logger.warning(f"Error processing equipo {equipo.codigo_interno}: {e}")
 
     def _generate_pdf_optimized(self, equipo):
         """
         Genera PDF optimizado para el equipo.
         """
-        try:
-            from core.views.reports import _generate_equipment_hoja_vida_pdf_content
-
-            # Generar PDF en memoria
-            pdf_buffer = BytesIO()
-            pdf_content = _generate_equipment_hoja_vida_pdf_content(None, equipo)
-
-            # Si es exitoso, retornar el contenido
-            if pdf_content:
-                return pdf_content
-
-            return None
-
-        except Exception as e:
-            logger.warning(f"Error generating PDF for {equipo.codigo_interno}: {e}")
-            return None
+        return _generar_pdf_equipo(equipo)
 
     def _generate_excel_optimized(self, equipo):
         """
         Genera Excel optimizado para el equipo.
         """
-        try:
-            import pandas as pd
-            from io import BytesIO
-
-            # Crear datos básicos del equipo
-            data = {
-                'Código Interno': [equipo.codigo_interno],
-                'Nombre': [equipo.nombre],
-                'Marca': [equipo.marca],
-                'Modelo': [equipo.modelo],
-                'Serie': [equipo.numero_serie],
-                'Estado': [equipo.estado],
-                'Próxima Calibración': [equipo.proxima_calibracion],
-                'Próximo Mantenimiento': [equipo.proximo_mantenimiento],
-                'Ubicación': [str(equipo.ubicacion) if equipo.ubicacion else 'N/A']
-            }
-
-            # Crear Excel en memoria
-            excel_buffer = BytesIO()
-            df = pd.DataFrame(data)
-
-            with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name='Datos_Equipo', index=False)
-
-                # Agregar calibraciones si existen
-                calibraciones = equipo.calibraciones.all()[:20]  # Limitar a 20 más recientes
-                if calibraciones:
-                    cal_data = []
-                    for cal in calibraciones:
-                        cal_data.append({
-                            'Fecha': cal.fecha_calibracion,
-                            'Resultado': cal.resultado,
-                            'Procedimiento': str(cal.procedimiento) if cal.procedimiento else 'N/A',
-                            'Observaciones': cal.observaciones or 'N/A'
-                        })
-
-                    cal_df = pd.DataFrame(cal_data)
-                    cal_df.to_excel(writer, sheet_name='Calibraciones', index=False)
-
-            excel_buffer.seek(0)
-            return excel_buffer.getvalue()
-
-        except Exception as e:
-            logger.warning(f"Error generating Excel for {equipo.codigo_interno}: {e}")
-            return None
+        return _generar_excel_equipo(equipo)
 
     def _add_empresa_files(self, zip_file):
         """
@@ -414,16 +627,26 @@ Total de Equipos: {self.empresa.equipos.filter(estado__in=[ESTADO_ACTIVO, ESTADO
 class StreamingZipResponse:
     """
     Respuesta de streaming para descargas ZIP grandes.
+
+    Acepta un ZIP ya generado en disco (``zip_file_path``) o un iterable de
+    bytes (``chunks``) que produce el ZIP mientras se envía; en este último
+    caso no hay Content-Length y el primer byte sale de inmediato.
     """
 
-    def __init__(self, zip_file_path, filename):
+    def __init__(self, zip_file_path, filename, chunks=None):
         self.zip_file_path = zip_file_path
         self.filename = filename
+        self.chunks = chunks
 
     def generate_response(self):
         """
         Genera respuesta de streaming HTTP.
         """
+        if self.chunks is not None:
+            response = StreamingHttpResponse(self.chunks, content_type='application/zip')
+            response['Content-Disposition'] = f'attachment; filename="{self.filename}"'
+            return response
+
         def file_iterator():
             try:
                 with open(self.zip_file_path, 'rb') as f:
@@ -471,4 +694,17 @@ def create_streaming_download(zip_file_path, empresa_nombre):
     filename = f"SAM_Equipos_{empresa_nombre}_{timestamp}.zip"
 
     streamer = StreamingZipResponse(zip_file_path, filename)
-    return streamer.generate_response()
\ No newline at end of file
+    return streamer.generate_response()
+
+
+def create_live_streaming_download(empresa, formatos_seleccionados, user):
+    """
+    Crea respuesta de descarga que genera el ZIP mientras se envía (sin
+    archivo temporal). Memoria constante independiente del tamaño de la empresa.
+    """
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M')
+    filename = f"SAM_Equipos_{empresa.nombre}_{timestamp}.zip"
+
+    generator = OptimizedZipGenerator(empresa, formatos_seleccionados, user)
+    streamer = StreamingZipResponse(None, filename, chunks=generator.iterar_zip_stream())
+    return streamer.generate_response()
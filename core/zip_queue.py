@@ -0,0 +1,354 @@
+# core/zip_queue.py
+# Cola de generación de ZIPs respaldada por la tabla ZipRequest
+
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from core.cola_lease import ColaLease, bucle_worker as _bucle_worker
+from core.progreso import publicar
+
+logger = logging.getLogger('core')
+
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_MAX_ATTEMPTS = 3
+# Candidatas bloqueadas por cada reclamo para elegir la empresa menos atendida
+VENTANA_CANDIDATOS = 20
+HORAS_EXPIRACION_ZIP = 6
+
+
+def _config():
+    return getattr(settings, 'ZIP_QUEUE_CONFIG', {})
+
+
+def lease_seconds():
+    return int(_config().get('LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+
+
+def max_attempts():
+    return int(_config().get('MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS))
+
+
+def max_jobs_por_empresa():
+    """Trabajos simultáneos permitidos por empresa (0 = sin límite)."""
+    return int(_config().get('MAX_JOBS_PER_EMPRESA', 0))
+
+
+COLA = ColaLease(
+    'ZipRequest', en_curso='processing', lease_seconds=lease_seconds, pendiente='pending',
+    campo_estado='status', campo_lease='lease_expires_at', orden=('position_in_queue', 'created_at'),
+)
+
+
+# =============================================================================
+# RECLAMO Y LEASES
+# =============================================================================
+
+def _trabajos_activos_por_empresa(ahora):
+    """{empresa_id: n} de solicitudes con lease vigente."""
+    from core.models import ZipRequest
+
+    return dict(
+        ZipRequest.objects.filter(status='processing', lease_expires_at__gt=ahora)
+        .order_by()
+        .values('empresa_id')
+        .annotate(n=Count('id'))
+        .values_list('empresa_id', 'n')
+    )
+
+
+def reclamar_siguiente(worker_id):
+    """
+    Reclama la próxima solicitud pendiente para ``worker_id``.
+
+    Bloquea una ventana de candidatas con SKIP LOCKED (las filas que otro
+    worker está reclamando se saltan en lugar de esperar) y elige la de la
+    empresa con menos trabajos en curso; a igualdad, la de menor posición.
+
+    Returns:
+        ZipRequest | None
+    """
+    ahora = timezone.now()
+    limite_empresa = max_jobs_por_empresa()
+
+    with transaction.atomic():
+        activos = _trabajos_activos_por_empresa(ahora)
+
+        candidatas = COLA.candidatas(ahora)
+        if limite_empresa:
+            saturadas = [e for e, n in activos.items() if n >= limite_empresa]
+            candidatas = candidatas.exclude(empresa_id__in=saturadas)
+        candidatas = list(candidatas[:VENTANA_CANDIDATOS])
+
+        # sorted es estable: a igualdad de carga se respeta el orden de la cola
+        for candidata in sorted(candidatas, key=lambda z: activos.get(z.empresa_id, 0)):
+            reclamada = COLA.tomar(
+                [candidata.pk], worker_id, ahora,
+                heartbeat_at=ahora,
+                attempts=F('attempts') + 1,
+                started_at=ahora,
+                current_step='Inicializando generación de ZIP...',
+                progress_percentage=0,
+                equipos_procesados=0,
+            )
+            if reclamada:
+                candidata.refresh_from_db()
+                publicar(candidata.user_id, 'zip')
+                return candidata
+
+    return None
+
+
+def renovar_lease(zip_request_id, worker_id):
+    """
+    Extiende el lease de una solicitud en curso.
+
+    Returns:
+        bool: False si el worker ya no es dueño de la solicitud (lease expirado
+        y reclamado por otro worker, o solicitud cancelada).
+    """
+    return COLA.renovar_lease(zip_request_id, worker_id, heartbeat_at=timezone.now())
+
+
+def recuperar_estancados():
+    """
+    Devuelve a la cola las solicitudes cuyo worker dejó de enviar latidos.
+
+    Las que ya agotaron ``MAX_ATTEMPTS`` se marcan como fallidas y se notifica
+    al usuario.
+
+    Returns:
+        dict: {'reencoladas': n, 'fallidas': n}
+    """
+    ahora = timezone.now()
+    estancadas = COLA.estancados(ahora)
+
+    reintentables = dict(estancadas.filter(attempts__lt=max_attempts()).values_list('pk', 'user_id'))
+    reencoladas = 0
+    if reintentables:
+        reencoladas = COLA.recuperar_estancados(
+            ahora, filtro={'pk__in': reintentables},
+            current_step='Reintentando: el worker anterior dejó de responder',
+        )
+        for user_id in set(reintentables.values()):
+            publicar(user_id, 'zip')
+
+    fallidas = 0
+    for zip_request in estancadas.filter(attempts__gte=max_attempts()):
+        actualizada = COLA.estancados(ahora).filter(pk=zip_request.pk).update(
+            status='failed',
+            worker_id=None,
+            lease_expires_at=None,
+            completed_at=ahora,
+            error_message=f'El worker dejó de responder tras {zip_request.attempts} intentos',
+            current_step='Error: el worker dejó de responder',
+        )
+        if actualizada:
+            fallidas += 1
+            zip_request.refresh_from_db()
+            publicar(zip_request.user_id, 'zip')
+            crear_notificacion_zip(zip_request, 'zip_failed')
+
+    if reencoladas or fallidas:
+        logger.warning(f"ZIP: {reencoladas} solicitudes estancadas reencoladas, {fallidas} marcadas como fallidas")
+
+    return {'reencoladas': reencoladas, 'fallidas': fallidas}
+
+
+# =============================================================================
+# EJECUCIÓN
+# =============================================================================
+
+class _Latido(threading.Thread):
+    """Thread que renueva el lease mientras el worker genera el ZIP."""
+
+    def __init__(self, zip_request_id, worker_id, intervalo):
+        super().__init__(daemon=True, name=f"SAM_ZIP_Latido_{zip_request_id}")
+        self.zip_request_id = zip_request_id
+        self.worker_id = worker_id
+        self.intervalo = intervalo
+        self.perdido = False
+        self._detener = threading.Event()
+
+    def run(self):
+        try:
+            while not self._detener.wait(self.intervalo):
+                if not renovar_lease(self.zip_request_id, self.worker_id):
+                    self.perdido = True
+                    logger.warning(f"ZIP {self.zip_request_id}: lease perdido por {self.worker_id}")
+                    break
+        except Exception as e:
+            logger.error(f"Error renovando lease de ZIP {self.zip_request_id}: {e}")
+        finally:
+            connection.close()
+
+    def detener(self):
+        self._detener.set()
+        self.join(timeout=5)
+
+
+def _actualizar_progreso(zip_request, worker_id, procesados, total, codigo):
+    from core.models import ZipRequest
+
+    ZipRequest.objects.filter(pk=zip_request.pk, worker_id=worker_id).update(
+        equipos_procesados=procesados,
+        progress_percentage=min(95, 5 + int(procesados / max(total, 1) * 90)),
+        current_step=f'Procesando equipo {procesados}/{total}: {codigo}',
+    )
+    publicar(zip_request.user_id, 'zip')
+
+
+def _borrar_archivo_huerfano(file_path):
+    from django.core.files.storage import default_storage
+
+    try:
+        if file_path and default_storage.exists(file_path):
+            default_storage.delete(file_path)
+    except Exception as e:
+        logger.warning(f"No se pudo borrar ZIP huérfano {file_path}: {e}")
+
+
+def ejecutar_trabajo(zip_request, worker_id):
+    """
+    Genera el ZIP de una solicitud ya reclamada por ``worker_id``.
+
+    El cierre (completed/failed) es condicional al lease: si otro worker tomó
+    la solicitud porque este dejó de latir, el resultado se descarta.
+
+    Returns:
+        bool: True si el ZIP quedó completado por este worker.
+    """
+    from core.async_zip_improved import async_zip_processor
+
+    latido = _Latido(zip_request.pk, worker_id, intervalo=max(1, lease_seconds() // 3))
+    latido.start()
+    try:
+        resultado = async_zip_processor._generate_zip_with_original_structure(
+            zip_request,
+            progreso=lambda procesados, total, codigo: _actualizar_progreso(
+                zip_request, worker_id, procesados, total, codigo
+            ),
+        )
+    except Exception as e:
+        logger.error(f"Error generando ZIP {zip_request.pk}: {e}", exc_info=True)
+        resultado = {'success': False, 'error': str(e)}
+    finally:
+        latido.detener()
+
+    ahora = timezone.now()
+    propias = COLA.propias(worker_id).filter(pk=zip_request.pk)
+
+    if resultado['success']:
+        actualizada = propias.update(
+            status='completed',
+            completed_at=ahora,
+            file_path=resultado['file_path'],
+            file_size=resultado['file_size'],
+            expires_at=ahora + timedelta(hours=HORAS_EXPIRACION_ZIP),
+            current_step='ZIP completado y listo para descarga',
+            progress_percentage=100,
+            lease_expires_at=None,
+        )
+        tipo = 'zip_ready'
+    else:
+        actualizada = propias.update(
+            status='failed',
+            completed_at=ahora,
+            error_message=resultado['error'],
+            current_step=f"Error en generación: {str(resultado['error'])[:100]}",
+            lease_expires_at=None,
+        )
+        tipo = 'zip_failed'
+
+    if not actualizada:
+        logger.warning(f"ZIP {zip_request.pk}: resultado descartado, {worker_id} ya no tiene el lease")
+        if resultado['success']:
+            _borrar_archivo_huerfano(resultado['file_path'])
+        return False
+
+    zip_request.refresh_from_db()
+    publicar(zip_request.user_id, 'zip')
+    crear_notificacion_zip(zip_request, tipo)
+    if resultado['success']:
+        logger.info(f"✅ ZIP {zip_request.pk} completado por {worker_id} - {resultado['file_size_mb']}MB")
+    return resultado['success']
+
+
+def crear_notificacion_zip(zip_request, tipo):
+    """Crea la notificación push para el usuario cuando el ZIP está listo o falla."""
+    from core.models import NotificacionZip
+
+    try:
+        if tipo == 'zip_ready':
+            titulo = f"✅ ZIP Listo - {zip_request.empresa.nombre}"
+            mensaje = (
+                f"Tu archivo ZIP para la empresa {zip_request.empresa.nombre} está listo para descarga. "
+                f"Expira en {HORAS_EXPIRACION_ZIP} horas."
+            )
+        elif tipo == 'zip_failed':
+            titulo = f"❌ Error en ZIP - {zip_request.empresa.nombre}"
+            mensaje = (
+                f"Hubo un error generando el ZIP para {zip_request.empresa.nombre}. "
+                f"Error: {(zip_request.error_message or '')[:100]}"
+            )
+        else:
+            titulo = f"📁 Actualización ZIP - {zip_request.empresa.nombre}"
+            mensaje = f"Estado actualizado para ZIP de {zip_request.empresa.nombre}"
+
+        NotificacionZip.objects.create(
+            user=zip_request.user,
+            zip_request=zip_request,
+            tipo=tipo,
+            titulo=titulo,
+            mensaje=mensaje
+        )
+        logger.info(f"Notificación {tipo} creada para usuario {zip_request.user.username}, ZIP {zip_request.id}")
+
+    except Exception as e:
+        logger.error(f"Error creando notificación {tipo} para ZIP {zip_request.id}: {e}")
+
+
+def estado_cola():
+    """Resumen de la cola para monitoreo."""
+    from core.models import ZipRequest
+
+    ahora = timezone.now()
+    return {
+        'pending': ZipRequest.objects.filter(status='pending').count(),
+        'processing': ZipRequest.objects.filter(status='processing', lease_expires_at__gt=ahora).count(),
+        'stalled': ZipRequest.objects.filter(status='processing', lease_expires_at__lte=ahora).count(),
+        'workers': list(
+            ZipRequest.objects.filter(status='processing', lease_expires_at__gt=ahora)
+            .order_by().values_list('worker_id', flat=True).distinct()
+        ),
+    }
+
+
+# =============================================================================
+# LOOP DEL WORKER
+# =============================================================================
+
+def bucle_worker(worker_id, check_interval=5, max_iterations=0, tarea_periodica=None):
+    """
+    Loop de un worker: recupera estancados, reclama y procesa. Tras procesar
+    una solicitud se reclama la siguiente sin esperar.
+    """
+    def paso():
+        recuperar_estancados()
+        zip_request = reclamar_siguiente(worker_id)
+        if zip_request:
+            logger.info(
+                f"🔄 {worker_id} procesa ZIP {zip_request.pk} - Empresa: {zip_request.empresa.nombre} "
+                f"- Parte {zip_request.parte_numero}/{zip_request.total_partes} (intento {zip_request.attempts})"
+            )
+            ejecutar_trabajo(zip_request, worker_id)
+        if tarea_periodica:
+            tarea_periodica()
+        return zip_request is not None
+
+    _bucle_worker('ZIP', worker_id, paso, check_interval, max_iterations)
@@ -0,0 +1,125 @@
+# core/zip_stream.py
+# Escritura de ZIP en streaming (sin archivo temporal ni BytesIO del archivo completo)
+
+import io
+import logging
+import threading
+import zipfile
+
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger('core')
+
+CHUNK_LOCAL = 64 * 1024
+CHUNK_S3 = 256 * 1024
+
+
+def tamano_chunk():
+    """Tamaño de lectura según el storage (S3/R2 favorece lecturas más grandes)."""
+    return CHUNK_S3 if 'S3' in default_storage.__class__.__name__ else CHUNK_LOCAL
+
+
+class _SalidaIncremental(io.RawIOBase):
+    """
+    Salida no posicionable que acumula los bytes escritos hasta ``vaciar()``.
+
+    Al no soportar ``tell``/``seek``, ``zipfile`` usa data descriptors en lugar
+    de volver atrás a reescribir las cabeceras. Es segura para un escritor y
+    un lector concurrentes (thread escritor de ``OptimizedZipGenerator``).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._partes = []
+        self._lock = threading.Lock()
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        datos = bytes(datos)
+        with self._lock:
+            self._partes.append(datos)
+        return len(datos)
+
+    def vaciar(self):
+        with self._lock:
+            partes, self._partes = self._partes, []
+        return b''.join(partes)
+
+
+class ZipStream:
+    """
+    Escritor de ZIP cuyos métodos son generadores de bytes listos para enviar:
+    cada ``yield`` entrega lo escrito desde el anterior, así que la memoria
+    queda acotada por el chunk de lectura y no por el tamaño del ZIP.
+
+    ``zip_file`` es un ``ZipFile`` normal: el código existente que escribe con
+    ``writestr`` puede usarlo y luego entregar ``pendiente()``.
+    """
+
+    def __init__(self, compresslevel=6):
+        self._salida = _SalidaIncremental()
+        self.zip_file = zipfile.ZipFile(
+            self._salida, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel, allowZip64=True
+        )
+        self.bytes_enviados = 0
+
+    def pendiente(self):
+        """Bytes escritos desde la última entrega."""
+        datos = self._salida.vaciar()
+        self.bytes_enviados += len(datos)
+        return datos
+
+    def _entregar(self):
+        datos = self.pendiente()
+        if datos:
+            yield datos
+
+    def agregar_bytes(self, ruta_zip, contenido):
+        """Agrega una entrada con contenido en memoria (PDF, Excel, texto)."""
+        if isinstance(contenido, str):
+            contenido = contenido.encode('utf-8')
+        with self.zip_file.open(ruta_zip, 'w', force_zip64=True) as entrada:
+            entrada.write(contenido)
+        yield from self._entregar()
+
+    def agregar_storage(self, ruta_zip, ruta_storage):
+        """
+        Copia un archivo del storage por chunks, entregando los bytes de cada uno.
+
+        El archivo se abre antes de crear la entrada, así que un archivo
+        inexistente o ilegible no deja una entrada vacía en el ZIP.
+
+        Returns:
+            bool: True si se agregó (valor de ``yield from``)
+        """
+        try:
+            if not default_storage.exists(ruta_storage):
+                logger.warning(f"Archivo no existe: {ruta_storage}")
+                return False
+            origen = default_storage.open(ruta_storage, 'rb')
+        except Exception as e:
+            logger.warning(f"Error abriendo archivo {ruta_storage}: {e}")
+            return False
+
+        chunk_size = tamano_chunk()
+        with origen, self.zip_file.open(ruta_zip, 'w', force_zip64=True) as entrada:
+            while True:
+                try:
+                    chunk = origen.read(chunk_size)
+                except Exception as e:
+                    # La entrada ya está en curso: se cierra con lo leído
+                    logger.error(f"Error leyendo {ruta_storage} a mitad de la copia: {e}")
+                    break
+                if not chunk:
+                    break
+                entrada.write(chunk)
+                yield from self._entregar()
+        yield from self._entregar()
+        return True
+
+    def cerrar(self):
+        """Escribe el directorio central (zip64 si hace falta) y lo entrega."""
+        self.zip_file.close()
+        yield from self._entregar()
@@ -87,13 +87,13 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.middleware.gzip.GZipMiddleware',  # Añadido para compresión
     'whitenoise.middleware.WhiteNoiseMiddleware',
-    'core.middleware.RateLimitMiddleware',  # Rate limiting para seguridad
     'core.middleware.SecurityHeadersMiddleware',  # Headers de seguridad adicionales
     'core.middleware.FileUploadSecurityMiddleware',  # Seguridad en uploads
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.RateLimitMiddleware',  # Rate limiting por IP, usuario y empresa (tras autenticación)
     'core.middleware.SessionActivityMiddleware',  # Auto-logout inteligente (NUEVO 2025-11-19)
     'core.middleware.TerminosCondicionesMiddleware',  # Verificación de términos y condiciones
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -586,11 +586,157 @@ SAM_CONFIG = {
     'MAX_SEARCH_RESULTS': 100,
 }
 
+# Recálculo de stats del dashboard (core/stats_queue.py)
+# DIFERIDO=True (por defecto): las señales solo encolan la empresa y el worker
+# `procesar_stats_pendientes --loop` (sam-stats-processor en render.yaml) recalcula
+# una vez por empresa tras el debounce. DIFERIDO=False recalcula dentro del request;
+# en desarrollo sin worker, correr el comando a mano o desactivarlo.
+STATS_RECALC_CONFIG = {
+    'DIFERIDO': os.environ.get('STATS_RECALC_DIFERIDO', 'True') == 'True',
+    'DEBOUNCE_SECONDS': int(os.environ.get('STATS_RECALC_DEBOUNCE_SECONDS', '15')),
+}
+
+# Cola de generación de ZIPs (core/zip_queue.py)
+# Cada worker `process_zip_queue` reclama solicitudes con un lease renovado por
+# latidos; si el worker muere, la solicitud se reintenta al expirar el lease.
+ZIP_QUEUE_CONFIG = {
+    'LEASE_SECONDS': int(os.environ.get('ZIP_QUEUE_LEASE_SECONDS', '120')),
+    'MAX_ATTEMPTS': int(os.environ.get('ZIP_QUEUE_MAX_ATTEMPTS', '3')),
+    'MAX_JOBS_PER_EMPRESA': int(os.environ.get('ZIP_QUEUE_MAX_JOBS_PER_EMPRESA', '0')),  # 0 = sin límite
+}
+
+# Render paralelo de Hojas de Vida / Manuales en OptimizedZipGenerator
+# PROCESOS=1 conserva el render secuencial; cada proceso extra carga Django y
+# WeasyPrint (~150MB), ajustar según la RAM del servidor.
+ZIP_RENDER_CONFIG = {
+    'PROCESOS': int(os.environ.get('ZIP_RENDER_PROCESOS', '1')),
+    'MAX_EN_VUELO': int(os.environ.get('ZIP_RENDER_MAX_EN_VUELO', '8')),  # equipos renderizados en memoria
+}
+
+# Caché persistente de Hojas de Vida renderizadas (core/pdf_cache.py)
+PDF_CACHE_CONFIG = {
+    'ACTIVO': os.environ.get('PDF_CACHE_ACTIVO', 'True') == 'True',
+    'MAX_MB': int(os.environ.get('PDF_CACHE_MAX_MB', '500')),  # desalojo LRU por tamaño total
+    'MAX_EDAD_SEGUNDOS': 6000,  # solo S3/R2: los enlaces firmados del PDF expiran a las 2h
+}
+
+# Snapshots diarios del Panel de Decisiones (core/snapshots_decision.py)
+# Generados por `generar_snapshots_decision` (cron nocturno y `--incremental` cada hora en render.yaml)
+PANEL_SNAPSHOT_CONFIG = {
+    'DIAS_HISTORIAL': int(os.environ.get('PANEL_SNAPSHOT_DIAS_HISTORIAL', '400')),  # retención del historial diario
+    'DIAS_TENDENCIA': 30,  # días mostrados en la evolución diaria de la vista SAM
+}
+
+# Regeneración de PDFs al aprobar documentos (core/regeneracion_pdf.py)
+# ACTIVO=True (por defecto): la aprobación responde de inmediato y el worker
+# `procesar_regeneraciones_pdf --continuo` (sam-pdf-processor en render.yaml)
+# renderiza los PDFs. ACTIVO=False los renderiza en línea dentro de la
+# aprobación; en desarrollo sin worker, correr el comando a mano.
+REGENERACION_PDF_CONFIG = {
+    'ACTIVO': os.environ.get('REGENERACION_PDF_ACTIVO', 'True') == 'True',
+    'LOTE': 10,  # trabajos reclamados por ronda
+    'MAX_INTENTOS': 3,
+    'BACKOFF_SEGUNDOS': 30,  # 30 s, 1 min, 2 min
+    'LEASE_SECONDS': 300,
+    'RETENCION_DIAS': 7,  # trabajos terminados que se conservan para el sondeo
+    'MAX_LOTE_APROBACION': 100,  # documentos por aprobación en bloque
+    'MAX_LOTE_EN_LINEA': 5,  # tope de la aprobación en bloque sin cola
+}
+
+# Bandeja de salida de emails (core/email_outbox.py)
+# ACTIVO=True: los emails se guardan en CorreoSaliente y los envía
+# `procesar_outbox_email` (cron procesar-outbox-email en render.yaml, cada 5 min)
+# con un pool de hilos que reutiliza la conexión SMTP de cada hilo.
+# Opcional (False por defecto): envía en línea hasta activarlo con EMAIL_OUTBOX_ACTIVO.
+EMAIL_OUTBOX_CONFIG = {
+    'ACTIVO': os.environ.get('EMAIL_OUTBOX_ACTIVO', 'False') == 'True',
+    'WORKERS': int(os.environ.get('EMAIL_OUTBOX_WORKERS', '4')),
+    'LOTE': 100,  # mensajes reclamados por ronda
+    'MAX_INTENTOS': 5,
+    'BACKOFF_SEGUNDOS': 60,  # 1 min, 2 min, 4 min, ...
+    'LEASE_SECONDS': 300,
+    'LIMITE_POR_SEGUNDO': float(os.environ.get('EMAIL_OUTBOX_LIMITE_POR_SEGUNDO', '5')),
+    'LIMITES_POR_PROVEEDOR': {},  # {'smtp.gmail.com': 1.0} — por EMAIL_HOST
+    'RETENCION_DIAS': 30,  # enviados más antiguos se purgan
+}
+
+# Índice materializado del calendario de actividades (core/calendario_indice.py)
+CALENDARIO_INDICE_CONFIG = {
+    'HORIZONTE_MESES': 24,  # ocurrencias programadas proyectadas por adelantado
+    'MAX_HORIZONTE_MESES': 120,  # tope para rangos pedidos más allá del horizonte
+    'MAX_EQUIPOS_POR_LECTURA': 200,  # reindexado máximo dentro de un request; el resto, `reindexar_calendario`
+}
+
+# Búsqueda y paginación keyset de los listados de equipos (core/busqueda_equipos.py)
+# CONTEO: 'aproximado' (cuenta hasta TOPE_CONTEO), 'exacto' (COUNT completo) o 'ninguno'
+BUSQUEDA_EQUIPOS_CONFIG = {
+    'CONTEO': os.environ.get('BUSQUEDA_EQUIPOS_CONTEO', 'aproximado'),
+    'TOPE_CONTEO': 1000,
+}
+
+# Presencia de usuarios para el monitor (core/presencia.py)
+PRESENCIA_CONFIG = {
+    'INTERVALO_ESCRITURA_SEGUNDOS': 60,  # una escritura de ultima_actividad por usuario y minuto
+}
+
+# Telemetría por vista de monitor_view (core/telemetria.py)
+TELEMETRIA_CONFIG = {
+    'ACTIVO': os.environ.get('TELEMETRIA_ACTIVA', 'True') == 'True',
+    'INTERVALO_SEGUNDOS': 300,  # granularidad de los agregados guardados
+    'VOLCADO_SEGUNDOS': 60,  # cada cuánto vuelca cada proceso sus agregados
+    'UMBRAL_LENTO_MS': 1500,  # peticiones guardadas con su lista de consultas
+    'MAX_LENTAS_POR_INTERVALO': 20,
+    'MAX_CONSULTAS_MUESTRA': 50,
+    'RETENCION_DIAS': 30,
+}
+
+# Caché de URLs firmadas de S3/R2 (core/urls_firmadas.py)
+URLS_FIRMADAS_CONFIG = {
+    'ACTIVO': True,
+    'MARGEN_SEGUNDOS': 300,  # una URL cacheada sigue siendo válida al menos este tiempo
+    'MAX_MEMORIA': 5000,  # entradas en la caché en memoria de cada proceso
+}
+
+# Render de PDFs con WeasyPrint (core/render_pdf.py)
+PDF_RENDER_CONFIG = {
+    'ACTIVO': True,  # extraer y cachear el CSS de las plantillas
+    'BASE_URL': 'http://localhost/',  # base de las URLs relativas; se resuelven sin HTTP
+    'HOSTS_PROPIOS': [],  # hosts adicionales (además de ALLOWED_HOSTS) servidos por este sitio
+    'MAX_CSS': 32,  # hojas de estilo parseadas que guarda cada proceso
+}
+
+# Gráficas de confirmación metrológica (core/graficas.py)
+GRAFICAS_CONFIG = {
+    'BACKEND': 'svg',  # 'svg' (matplotlib solo si falla) o 'matplotlib' (PNG)
+    'CACHE_SEGUNDOS': 86400,  # gráficas memoizadas en la caché de Django
+    'MAX_MEMORIA': 256,  # gráficas que guarda cada proceso
+}
+
+# Canal de progreso de ZIPs y notificaciones por usuario (core/progreso.py)
+PROGRESO_CONFIG = {
+    'ACTIVO': True,  # requiere caché compartida (Redis/BD); con LocMem se ignora
+    # Long-poll: segundos que una petición espera un cambio. En 0 con los workers
+    # síncronos de Gunicorn (start.sh), donde cada espera bloquearía un worker.
+    'ESPERA_MAX_SEGUNDOS': 0,
+    'INTERVALO_ESPERA': 0.5,
+    'REINTENTO_MS': 2000,  # pausa sugerida al cliente entre sondeos
+    'REINTENTO_SIN_CANAL_MS': 5000,
+}
+
+# Backups por empresa de backup_data (core/backup_stream.py)
+BACKUP_CONFIG = {
+    'CHUNK_SIZE': 500,  # filas leídas por consulta al recorrer cada modelo
+    'WORKERS_ARCHIVOS': int(os.environ.get('BACKUP_WORKERS_ARCHIVOS', '8')),  # lecturas de adjuntos en paralelo
+    'RUTA_MANIFIESTOS': 'backups/manifiestos/',  # en el storage; base de --incremental
+}
+
 # Configuración de rate limiting
+# Ventana deslizante atómica en Redis (o en proceso con otra caché), ver core/limitador.py.
+# 'limit' aplica por IP; 'limit_usuario' y 'limit_empresa' (opcionales) por usuario autenticado y su empresa.
 RATE_LIMIT_CONFIG = {
     'LOGIN_ATTEMPTS': {'limit': 5, 'period': 300},  # 5 intentos por 5 minutos
-    'UPLOAD_FILES': {'limit': 10, 'period': 300},   # 10 uploads por 5 minutos
-    'API_CALLS': {'limit': 100, 'period': 3600},    # 100 llamadas por hora
+    'UPLOAD_FILES': {'limit': 10, 'period': 300, 'limit_usuario': 10, 'limit_empresa': 60},   # 10 uploads por 5 minutos
+    'API_CALLS': {'limit': 100, 'period': 3600, 'limit_usuario': 100, 'limit_empresa': 1000},    # 100 llamadas por hora
 }
 
 # ==============================================================================
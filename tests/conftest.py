@@ -70,9 +70,12 @@ def pytest_terminal_summary(terminalreporter, exitstatus, config):
 def clear_cache():
     """Limpia el cache entre tests para evitar interferencia."""
     from django.core.cache import cache
+    from core import limitador
     cache.clear()
+    limitador.reiniciar()  # los contadores en proceso del rate limiting también
     yield
     cache.clear()
+    limitador.reiniciar()
 
 
 # ============================================================================
@@ -320,6 +323,15 @@ def email_backend(settings):
     settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
 
 
+@pytest.fixture(autouse=True)
+def telemetria_inactiva(settings):
+    """
+    Desactiva la telemetría de monitor_view: un volcado a mitad de un test
+    alteraría los conteos de consultas. Los tests de telemetría la activan.
+    """
+    settings.TELEMETRIA_CONFIG = {**settings.TELEMETRIA_CONFIG, 'ACTIVO': False}
+
+
 @pytest.fixture
 def disable_cache(settings):
     """
@@ -0,0 +1,87 @@
+"""
+Tests para la presencia de usuarios (core/presencia.py) y su uso en
+SystemMonitor._get_user_metrics.
+"""
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import CustomUser
+from core.monitoring import SystemMonitor
+from core.presencia import actividad_por_empresa, registrar_actividad, usuarios_activos
+from tests.factories import EmpresaFactory, UserFactory
+
+
+@pytest.fixture(autouse=True)
+def limpiar_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _activo(usuario, hace):
+    CustomUser.objects.filter(pk=usuario.pk).update(ultima_actividad=timezone.now() - hace)
+
+
+@pytest.mark.django_db
+class TestRegistrarActividad:
+
+    def test_escribe_una_vez_por_intervalo(self):
+        usuario = UserFactory()
+
+        assert registrar_actividad(usuario) is True
+        assert registrar_actividad(usuario) is False
+
+        usuario.refresh_from_db()
+        assert usuario.ultima_actividad is not None
+
+    def test_middleware_registra_peticiones_autenticadas(self):
+        usuario = UserFactory(empresa=EmpresaFactory())
+        client = Client()
+        client.force_login(usuario)
+
+        client.get(reverse('core:home'))
+
+        usuario.refresh_from_db()
+        assert timezone.now() - usuario.ultima_actividad < timedelta(minutes=1)
+
+
+@pytest.mark.django_db
+class TestConsultasDePresencia:
+
+    def test_ventanas_y_actividad_por_empresa(self):
+        empresa_a = EmpresaFactory(nombre='A')
+        empresa_b = EmpresaFactory(nombre='B')
+        _activo(UserFactory(empresa=empresa_a), timedelta(minutes=2))
+        _activo(UserFactory(empresa=empresa_a), timedelta(minutes=5))
+        _activo(UserFactory(empresa=empresa_b), timedelta(hours=3))
+        _activo(UserFactory(empresa=empresa_b), timedelta(days=3))
+        UserFactory(empresa=empresa_b)
+
+        assert usuarios_activos() == {'15min': 2, '24h': 3, '7d': 4}
+        assert actividad_por_empresa('15min') == [
+            {'empresa_id': empresa_a.pk, 'empresa__nombre': 'A', 'activos': 2},
+        ]
+        assert [fila['activos'] for fila in actividad_por_empresa('7d')] == [2, 2]
+
+    def test_metricas_del_monitor_sin_leer_sesiones(self):
+        empresa = EmpresaFactory()
+        for n in range(5):
+            usuario = UserFactory(empresa=empresa)
+            Client().force_login(usuario)
+            _activo(usuario, timedelta(minutes=n))
+
+        with CaptureQueriesContext(connection) as consultas:
+            metricas = SystemMonitor._get_user_metrics()
+
+        assert metricas['users_active_15min'] == 5
+        assert metricas['users_active_7d'] == 5
+        assert len(metricas['active_users_details']) == 5
+        assert metricas['active_by_empresa'][0]['activos'] == 5
+        assert not any('django_session' in q['sql'] for q in consultas.captured_queries)
@@ -0,0 +1,151 @@
+"""
+Tests para la telemetría por vista (core/telemetria.py) registrada por
+monitor_view.
+"""
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+
+from core import telemetria
+from core.models import Empresa, PeticionLenta, TelemetriaVista
+from core.monitoring import monitor_view
+from tests.factories import EmpresaFactory, UserFactory
+
+
+@pytest.fixture
+def telemetria_activa(settings):
+    settings.TELEMETRIA_CONFIG = {**settings.TELEMETRIA_CONFIG, 'ACTIVO': True, 'UMBRAL_LENTO_MS': 60000}
+    telemetria.volcar()
+    yield settings.TELEMETRIA_CONFIG
+    telemetria.volcar()
+
+
+def _request(user=None):
+    request = RequestFactory().get('/panel/')
+    request.user = user or AnonymousUser()
+    return request
+
+
+@monitor_view
+def vista_con_consultas(request):
+    for _ in range(3):
+        list(Empresa.objects.all()[:1])
+    return HttpResponse('x' * 100)
+
+
+@monitor_view
+def vista_que_falla(request):
+    raise ValueError('fallo')
+
+
+def _fila(vista, horas=0, peticiones=30, histograma=None, empresa_id=None):
+    histograma = histograma or [0, 0, 0, peticiones, 0, 0, 0, 0, 0, 0, 0]
+    return TelemetriaVista.objects.create(
+        intervalo=timezone.now() - timedelta(hours=horas), vista=vista, empresa_id=empresa_id,
+        peticiones=peticiones, duracion_total_ms=peticiones * 80, duracion_max_ms=100, histograma=histograma,
+        consultas=peticiones * 4,
+    )
+
+
+def test_percentil_interpola_dentro_del_bucket():
+    # 100 peticiones: 50 en (10, 25] ms y 50 en (250, 500] ms
+    histograma = [0, 50, 0, 0, 0, 50, 0, 0, 0, 0, 0]
+
+    assert telemetria.percentil(histograma, 50) == 25
+    assert telemetria.percentil(histograma, 95) == 475
+    assert telemetria.percentil([0] * 11, 95) is None
+
+
+@pytest.mark.django_db
+class TestRegistro:
+
+    def test_registra_consultas_tamano_y_empresa(self, telemetria_activa):
+        empresa = EmpresaFactory()
+        usuario = UserFactory(empresa=empresa)
+
+        vista_con_consultas(_request(usuario))
+        vista_con_consultas(_request(usuario))
+        assert telemetria.volcar() == 1
+
+        fila = TelemetriaVista.objects.get()
+        assert fila.vista.endswith('vista_con_consultas')
+        assert fila.empresa_id == empresa.pk
+        assert (fila.peticiones, fila.consultas, fila.bytes_respuesta) == (2, 6, 200)
+        assert sum(fila.histograma) == 2
+
+    def test_excepcion_cuenta_como_error(self, telemetria_activa):
+        with pytest.raises(ValueError):
+            vista_que_falla(_request())
+        telemetria.volcar()
+
+        assert TelemetriaVista.objects.get().errores == 1
+
+    def test_peticion_lenta_guarda_sus_consultas(self, telemetria_activa):
+        telemetria_activa['UMBRAL_LENTO_MS'] = 0
+
+        vista_con_consultas(_request())
+
+        lenta = PeticionLenta.objects.get()
+        assert lenta.num_consultas == 3
+        assert 'SELECT' in lenta.consultas[0]['sql']
+        assert lenta.ruta == '/panel/'
+
+    def test_inactiva_no_registra(self):
+        vista_con_consultas(_request())
+
+        assert telemetria.volcar() == 0
+
+
+@pytest.mark.django_db
+class TestConsultas:
+
+    def test_resumen_por_empresa_suma_filas_de_varios_procesos(self):
+        _fila('core:dashboard', empresa_id=1, peticiones=10)
+        _fila('core:dashboard', empresa_id=1, peticiones=10, histograma=[0, 0, 0, 0, 0, 0, 10, 0, 0, 0, 0])
+        _fila('core:dashboard', empresa_id=2, peticiones=50)
+
+        resumen = telemetria.resumen_vistas(timezone.now() - timedelta(days=7), empresa_id=1)
+
+        assert len(resumen) == 1
+        assert resumen[0]['peticiones'] == 20
+        assert resumen[0]['p95_ms'] >= 500
+
+    def test_regresion_de_p95(self):
+        _fila('core:dashboard', horas=48)
+        _fila('core:dashboard', horas=1, histograma=[0, 0, 0, 0, 0, 0, 30, 0, 0, 0, 0])
+        _fila('core:home', horas=48)
+        _fila('core:home', horas=1)
+
+        regresiones = telemetria.regresiones()
+
+        assert [r['vista'] for r in regresiones] == ['core:dashboard']
+        assert regresiones[0]['variacion'] > 1.5
+
+    def test_comando_resume_y_purga(self):
+        _fila('core:dashboard')
+        _fila('core:dashboard', horas=24 * 60)
+        salida = StringIO()
+
+        call_command('telemetria_vistas', stdout=salida)
+        call_command('telemetria_vistas', purgar=True, stdout=salida)
+
+        assert 'core:dashboard' in salida.getvalue()
+        assert 'Purgados: 1 agregados' in salida.getvalue()
+
+    def test_panel_de_monitoreo_muestra_percentiles(self):
+        _fila('core:dashboard')
+        client = Client()
+        client.force_login(UserFactory(is_superuser=True, is_staff=True))
+
+        response = client.get(reverse('core:admin_monitoring'))
+
+        assert response.status_code == 200
+        assert response.context['telemetria_vistas'][0]['vista'] == 'core:dashboard'
+        assert 'Latencia por Vista' in response.content.decode()
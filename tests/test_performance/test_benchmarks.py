@@ -0,0 +1,103 @@
+"""
+Benchmarks de los caminos críticos con empresas sintéticas (core/benchmark.py).
+
+Los tests del arnés corren siempre. Los benchmarks usan pytest-benchmark
+(requirements_test.txt) y se omiten si no está instalado:
+
+    pytest tests/test_performance/test_benchmarks.py -m performance --benchmark-json=benchmarks/pytest.json
+    SAM_BENCHMARK_EQUIPOS=100,1000 pytest tests/test_performance/test_benchmarks.py -m performance
+
+El ZIP no se incluye aquí: su render en procesos no ve los datos de la
+transacción del test. Se mide con ``python manage.py benchmark_sam``.
+"""
+import json
+import os
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from core.benchmark import ESCENARIOS, comparar, crear_empresa_sintetica, medir, preparar_contexto
+from core.models import Calibracion, Equipo
+
+try:
+    import pytest_benchmark  # noqa: F401
+    HAY_PYTEST_BENCHMARK = True
+except ImportError:
+    HAY_PYTEST_BENCHMARK = False
+
+TAMANOS = [int(n) for n in os.environ.get('SAM_BENCHMARK_EQUIPOS', '100').split(',')]
+ESCENARIOS_PYTEST = [nombre for nombre in ESCENARIOS if nombre != 'zip']
+
+
+@pytest.mark.django_db
+class TestArnesBenchmark:
+
+    def test_empresa_sintetica_reproducible(self):
+        empresa, usuario = crear_empresa_sintetica(equipos=20, anios=2, semilla=7)
+
+        assert Equipo.objects.filter(empresa=empresa).count() == 20
+        calibraciones = Calibracion.objects.filter(equipo__empresa=empresa)
+        assert calibraciones.count() >= 20
+        assert calibraciones.first().confirmacion_metrologica_datos['puntos_medicion']
+        assert usuario.empresa_id == empresa.pk
+
+    def test_medir_registra_tiempos_y_consultas(self):
+        empresa, usuario = crear_empresa_sintetica(equipos=10, anios=1)
+        contexto = preparar_contexto(empresa, usuario)
+
+        medicion = medir('calendario_eventos_api', contexto, repeticiones=2)
+
+        assert medicion['consultas'] > 0
+        assert medicion['mediana_ms'] > 0
+        assert medicion['memoria_pico_mb'] >= 0
+
+    def test_comparar_detecta_regresiones(self):
+        base = {'resultados': {'dashboard@100': {'mediana_ms': 100, 'consultas': 20}}}
+        actual = {'resultados': {'dashboard@100': {'mediana_ms': 140, 'consultas': 21}}}
+
+        regresiones = comparar(actual, base, tolerancia=0.25)
+
+        assert {r['metrica'] for r in regresiones} == {'mediana_ms', 'consultas'}
+        assert comparar(actual, base, tolerancia=0.5)[0]['metrica'] == 'consultas'
+
+    def test_comando_sin_debug_se_niega(self, settings):
+        settings.DEBUG = False
+
+        with pytest.raises(CommandError, match='--permitir-produccion'):
+            call_command('benchmark_sam', equipos=[10], stdout=StringIO())
+
+        assert not Equipo.objects.filter(empresa__nombre__startswith='BENCH').exists()
+
+    def test_comando_guarda_json_y_falla_ante_regresion(self, tmp_path, settings):
+        settings.DEBUG = True
+        salida = tmp_path / 'resultado.json'
+        baseline = tmp_path / 'baseline.json'
+        baseline.write_text(json.dumps({'resultados': {
+            'recalcular_stats_dashboard@10': {'mediana_ms': 0.001, 'consultas': 0},
+        }}))
+
+        with pytest.raises(CommandError, match='regresiones'):
+            call_command(
+                'benchmark_sam', equipos=[10], anios=1, escenarios=['recalcular_stats_dashboard'],
+                repeticiones=1, salida=str(salida), baseline=str(baseline), stdout=StringIO(),
+            )
+
+        resultado = json.loads(salida.read_text())
+        assert 'recalcular_stats_dashboard@10' in resultado['resultados']
+        assert not Equipo.objects.filter(empresa__nombre__startswith='BENCH').exists()
+
+
+@pytest.mark.performance
+@pytest.mark.django_db
+@pytest.mark.skipif(not HAY_PYTEST_BENCHMARK, reason='pytest-benchmark no instalado')
+@pytest.mark.parametrize('tamano', TAMANOS)
+@pytest.mark.parametrize('escenario', ESCENARIOS_PYTEST)
+def test_benchmark_escenario(benchmark, escenario, tamano):
+    empresa, usuario = crear_empresa_sintetica(equipos=tamano)
+    contexto = preparar_contexto(empresa, usuario)
+    preparar = ESCENARIOS[escenario]
+
+    benchmark.extra_info['equipos'] = tamano
+    benchmark.pedantic(lambda ejecutar: ejecutar(), setup=lambda: ((preparar(contexto),), {}), rounds=3)
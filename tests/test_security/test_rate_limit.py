@@ -0,0 +1,148 @@
+"""
+Tests para el limitador de ventana deslizante (core/limitador.py) y
+RateLimitMiddleware.
+"""
+from unittest.mock import patch
+
+import pytest
+from django.test import Client
+
+from core import limitador
+from tests.factories import EmpresaFactory, UserFactory
+
+IP = [('ip', '10.0.0.1', 3)]
+
+
+class TestVentanaDeslizante:
+
+    def test_bloquea_sin_contar_las_rechazadas(self):
+        backend = limitador._LimitadorMemoria()
+
+        resultados = [backend.consumir('API', IP, 60, 1, ahora=600.0)[0] for _ in range(5)]
+
+        assert resultados == [0, 0, 0, 1, 1]
+        assert backend.consumir('API', IP, 60, 0, ahora=600.0) == (1, [3])
+
+    def test_la_ventana_previa_pesa_segun_el_tiempo_transcurrido(self):
+        backend = limitador._LimitadorMemoria()
+        for _ in range(3):
+            backend.consumir('API', IP, 60, 1, ahora=610.0)
+
+        # Inicio de la ventana siguiente: la previa aún pesa completa
+        assert backend.consumir('API', IP, 60, 1, ahora=660.0)[0] == 1
+        # A mitad de ventana pesa 1.5: cabe una más (2.5) pero no dos
+        assert backend.consumir('API', IP, 60, 1, ahora=690.0)[0] == 0
+        assert backend.consumir('API', IP, 60, 1, ahora=690.0)[0] == 1
+
+    def test_ambito_excedido_no_incrementa_los_demas(self):
+        backend = limitador._LimitadorMemoria()
+        empresa = ('empresa', 7, 2)
+
+        backend.consumir('API', [('ip', 'a', 10), empresa], 60, 1, ahora=0.0)
+        backend.consumir('API', [('ip', 'b', 10), empresa], 60, 1, ahora=0.0)
+
+        assert backend.consumir('API', [('ip', 'c', 10), empresa], 60, 1, ahora=1.0) == (2, [0, 2])
+        assert backend.consumir('API', [('ip', 'c', 10)], 60, 0, ahora=1.0) == (0, [0])
+
+    def test_redis_resuelve_todo_en_una_llamada_al_script(self):
+        llamadas = []
+
+        class ClienteFalso:
+            def register_script(self, script):
+                assert 'INCRBY' in script and 'HINCRBY' in script
+                return lambda keys, args: llamadas.append((keys, args)) or [0, 1, 4]
+
+        backend = limitador._LimitadorRedis(ClienteFalso())
+
+        excedido, estimados = backend.consumir('API', [('ip', 'a', 10), ('usuario', 5, 20)], 60, 1, ahora=630.0)
+
+        assert (excedido, estimados) == (0, [1, 4])
+        keys, args = llamadas[0]
+        assert len(llamadas) == 1 and len(keys) == 5
+        assert keys[0].endswith('rl:API:ip:a:10') and keys[1].endswith('rl:API:ip:a:9')
+        assert args == [1, 120, 0.5, 10, 20, 'API']
+
+
+class TestCacheCompartida:
+
+    def test_seleccion_del_backend_segun_la_cache(self, settings):
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'x'}}
+        assert isinstance(limitador._crear_limitador(), limitador._LimitadorCache)
+
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        assert isinstance(limitador._crear_limitador(), limitador._LimitadorMemoria)
+
+    def test_workers_comparten_los_contadores_de_la_cache(self, settings):
+        settings.RATE_LIMIT_CONFIG = {'API': {'limit': 3, 'period': 60}}
+        # Dos "workers" con su propia instancia ven el mismo contador
+        workers = [limitador._LimitadorCache(), limitador._LimitadorCache()]
+
+        resultados = [workers[i % 2].consumir('API', IP, 60, 1, ahora=600.0)[0] for i in range(5)]
+
+        assert resultados == [0, 0, 0, 1, 1]
+        assert workers[0].metricas() == {'API:permitidas': 3, 'API:bloqueadas': 2}
+
+    def test_lecturas_concurrentes_no_superan_el_limite(self):
+        from django.core.cache import cache
+
+        backend = limitador._LimitadorCache()
+        # Todos los workers leyeron antes de que nadie incrementara
+        with patch.object(cache, 'get_many', return_value={}):
+            resultados = [backend.consumir('API', IP, 60, 1, ahora=600.0)[0] for _ in range(5)]
+
+        assert resultados == [0, 0, 0, 1, 1]
+        assert cache.get('rl:API:ip:10.0.0.1:10') == 3
+
+    def test_ambito_excedido_deshace_los_incrementos(self):
+        from django.core.cache import cache
+
+        backend = limitador._LimitadorCache()
+        ambitos = [('ip', '10.0.0.1', 10), ('empresa', 7, 1)]
+
+        assert backend.consumir('API', ambitos, 60, 1, ahora=600.0)[0] == 0
+        assert backend.consumir('API', ambitos, 60, 1, ahora=600.0)[0] == 2
+        assert cache.get_many(['rl:API:ip:10.0.0.1:10', 'rl:API:empresa:7:10']) == {
+            'rl:API:ip:10.0.0.1:10': 1, 'rl:API:empresa:7:10': 1,
+        }
+
+    def test_contadores_con_ttl_de_dos_periodos(self):
+        with patch('core.limitador.cache') as cache:
+            cache.get_many.return_value = {}
+            cache.incr.return_value = 1
+            limitador._LimitadorCache().consumir('API', IP, 60, 1, ahora=600.0)
+
+        cache.add.assert_any_call('rl:API:ip:10.0.0.1:10', 0, 120)
+        cache.touch.assert_any_call('rl:API:ip:10.0.0.1:10', 120)
+
+
+@pytest.mark.django_db
+class TestMiddleware:
+
+    @pytest.fixture(autouse=True)
+    def limites(self, settings):
+        settings.DEBUG = False
+        settings.RATE_LIMIT_CONFIG = {
+            'LOGIN_ATTEMPTS': {'limit': 2, 'period': 300},
+            'API_CALLS': {'limit': 100, 'period': 3600, 'limit_usuario': 100, 'limit_empresa': 3},
+        }
+
+    def test_limite_por_empresa_entre_usuarios_e_ips(self):
+        empresa = EmpresaFactory()
+        codigos = []
+        for i in range(4):
+            client = Client(REMOTE_ADDR=f'10.0.0.{i}')
+            client.force_login(UserFactory(empresa=empresa))
+            codigos.append(client.get('/api/inexistente/').status_code)
+
+        assert codigos[:3] == [404, 404, 404]
+        assert codigos[3] == 429
+        metricas = limitador.metricas()
+        assert metricas['tipos']['API_CALLS'] == {'permitidas': 3, 'bloqueadas': 1}
+
+    def test_login_solo_cuenta_intentos_fallidos(self):
+        client = Client(REMOTE_ADDR='10.0.0.9')
+        datos = {'username': 'nadie', 'password': 'incorrecta'}
+
+        assert client.post('/core/login/', datos).status_code == 200
+        assert client.post('/core/login/', datos).status_code == 200
+        assert client.post('/core/login/', datos).status_code == 429
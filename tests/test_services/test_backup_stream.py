@@ -0,0 +1,198 @@
+"""
+Tests para el backup por empresa en streaming (core/backup_stream.py),
+backup_data --incremental y su restauración con restore_backup.
+"""
+import io
+import json
+import threading
+import time
+import zipfile
+from unittest.mock import patch
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core import backup_stream
+from core.models import Calibracion, CustomUser, Empresa, Equipo
+from tests.factories import (
+    CalibracionFactory, ComprobacionFactory, EmpresaFactory, EquipoFactory,
+    MantenimientoFactory, UserFactory,
+)
+
+
+@pytest.fixture
+def empresa(db):
+    empresa = EmpresaFactory(nombre='Metrología Norte')
+    UserFactory(empresa=empresa)
+    for _ in range(2):
+        equipo = EquipoFactory(empresa=empresa)
+        CalibracionFactory(equipo=equipo)
+        MantenimientoFactory(equipo=equipo)
+        ComprobacionFactory(equipo=equipo)
+    # Datos de otra empresa que no deben entrar
+    CalibracionFactory(equipo=EquipoFactory())
+    return empresa
+
+
+def _backup(tmp_path, empresa, **opciones):
+    call_command(
+        'backup_data', empresa_id=empresa.pk, output_dir=str(tmp_path), stdout=io.StringIO(), **opciones
+    )
+    prefijo = 'incremental' if opciones.get('incremental') else 'backup'
+    return sorted(tmp_path.glob(f'{prefijo}_*'), key=lambda ruta: ruta.stat().st_mtime)
+
+
+def _perder(empresa):
+    """Simula la pérdida de la empresa antes de restaurarla."""
+    CustomUser.objects.filter(empresa=empresa).delete()
+    empresa.delete()
+
+
+def _lineas(zipf, seccion):
+    return [json.loads(linea) for linea in zipf.read(f'data/{seccion}.jsonl').splitlines()]
+
+
+@pytest.mark.django_db
+class TestBackupCompleto:
+
+    def test_ndjson_por_modelo_y_archivos(self, tmp_path, empresa):
+        equipo = empresa.equipos.first()
+        equipo.manual_pdf.save('manual.pdf', ContentFile(b'%PDF manual'), save=True)
+
+        rutas = _backup(tmp_path, empresa, format='both', include_files=True)
+
+        jsonl, zip_path = sorted(rutas, key=lambda ruta: ruta.suffix)
+        assert (jsonl.suffix, zip_path.suffix) == ('.jsonl', '.zip')
+        with zipfile.ZipFile(zip_path) as zipf:
+            assert [o['fields']['nombre'] for o in _lineas(zipf, 'empresa')] == ['Metrología Norte']
+            assert len(_lineas(zipf, 'equipos')) == 2
+            assert len(_lineas(zipf, 'calibraciones')) == 2
+            info = json.loads(zipf.read('backup_info.json'))
+            archivo = f'files/equipos/{equipo.codigo_interno}/manual_pdf/{equipo.manual_pdf.name.split("/")[-1]}'
+            assert zipf.read(archivo) == b'%PDF manual'
+        assert info['metadata']['tipo'] == 'completo' and info['archivos'] == 1
+
+        primera = json.loads(jsonl.read_text(encoding='utf-8').splitlines()[0])
+        assert primera['metadata']['empresa_id'] == empresa.pk
+        en_zip = backup_stream.leer_zip(str(zip_path))
+        assert backup_stream.leer_jsonl(str(jsonl))['calibraciones'] == en_zip['calibraciones']
+
+    def test_consultas_no_crecen_con_los_equipos(self, tmp_path, empresa):
+        with CaptureQueriesContext(connection) as pocos:
+            backup_stream.escribir_backup(empresa, ruta_zip=str(tmp_path / 'a.zip'))
+
+        for _ in range(5):
+            CalibracionFactory(equipo=EquipoFactory(empresa=empresa))
+        with CaptureQueriesContext(connection) as muchos:
+            resultado = backup_stream.escribir_backup(empresa, ruta_zip=str(tmp_path / 'b.zip'))
+
+        assert resultado['conteos']['equipos'] == 7
+        assert len(muchos.captured_queries) == len(pocos.captured_queries)
+
+    def test_restaura_el_formato_nuevo_y_el_anterior(self, tmp_path, empresa):
+        (zip_path,) = _backup(tmp_path, empresa, format='zip')
+        _perder(empresa)
+
+        call_command('restore_backup', str(zip_path), new_name='Copia', stdout=io.StringIO())
+
+        copia = Empresa.objects.get(nombre='Copia')
+        assert copia.equipos.count() == 2
+        assert Calibracion.objects.filter(equipo__empresa=copia).count() == 2
+
+        # ZIP de la versión anterior: un único data.json
+        anterior = tmp_path / 'anterior.zip'
+        datos = backup_stream.leer_zip(str(zip_path))
+        with zipfile.ZipFile(anterior, 'w') as zipf:
+            zipf.writestr('data.json', json.dumps(datos))
+        assert backup_stream.leer_zip(str(anterior))['equipos'] == datos['equipos']
+
+
+@pytest.mark.django_db
+class TestIncremental:
+
+    def test_sin_manifiesto_hace_un_completo(self, tmp_path, empresa):
+        resultado = backup_stream.escribir_backup(empresa, ruta_zip=str(tmp_path / 'a.zip'), incremental=True)
+
+        assert resultado['tipo'] == 'completo' and resultado['conteos']['equipos'] == 2
+
+    def test_solo_cambios_y_eliminados(self, tmp_path, empresa):
+        _backup(tmp_path / 'completo', empresa, format='zip', include_files=True)
+
+        cambiado, igual = empresa.equipos.order_by('pk')
+        cambiado.nombre = 'Balanza recalibrada'
+        cambiado.save()
+        cambiado.manual_pdf.save('nuevo.pdf', ContentFile(b'%PDF nuevo'), save=True)
+        borrada = Calibracion.objects.filter(equipo=igual).get().pk
+        Calibracion.objects.filter(pk=borrada).delete()
+        nueva = MantenimientoFactory(equipo=igual)
+
+        (zip_path,) = _backup(tmp_path / 'inc', empresa, format='zip', include_files=True, incremental=True)
+
+        with zipfile.ZipFile(zip_path) as zipf:
+            # ``igual`` también puede cambiar: borrar su calibración recalcula sus fechas
+            assert cambiado.pk in [o['pk'] for o in _lineas(zipf, 'equipos')]
+            assert [o['pk'] for o in _lineas(zipf, 'mantenimientos')] == [nueva.pk]
+            assert _lineas(zipf, 'calibraciones') == [] and _lineas(zipf, 'comprobaciones') == []
+            info = json.loads(zipf.read('backup_info.json'))
+            adjuntos = [n for n in zipf.namelist() if n.startswith('files/')]
+        assert info['metadata']['tipo'] == 'incremental'
+        assert info['eliminados']['calibraciones'] == [str(borrada)]
+        manual = cambiado.manual_pdf.name.split('/')[-1]
+        assert adjuntos == [f'files/equipos/{cambiado.codigo_interno}/manual_pdf/{manual}']
+
+        # Sin cambios desde el incremental: el siguiente queda vacío
+        siguiente = backup_stream.escribir_backup(empresa, ruta_zip=str(tmp_path / 'vacio.zip'), incremental=True)
+        assert not any(siguiente['conteos'].values())
+
+    def test_restaurar_completo_mas_incremental(self, tmp_path, empresa):
+        (completo,) = _backup(tmp_path / 'completo', empresa, format='zip')
+        igual = empresa.equipos.order_by('pk').last()
+        Calibracion.objects.filter(equipo=igual).delete()
+        EquipoFactory(empresa=empresa, nombre='Equipo nuevo')
+        (incremental,) = _backup(tmp_path / 'inc', empresa, format='zip', incremental=True)
+
+        _perder(empresa)
+
+        salida = io.StringIO()
+        call_command('restore_backup', str(incremental), new_name='Copia', stdout=salida)
+        assert 'incremental' in salida.getvalue() and not Empresa.objects.filter(nombre='Copia').exists()
+
+        call_command(
+            'restore_backup', str(completo), incremental=[str(incremental)], new_name='Copia', stdout=io.StringIO()
+        )
+        copia = Empresa.objects.get(nombre='Copia')
+        assert copia.equipos.count() == 3
+        assert Equipo.objects.filter(empresa=copia, nombre='Equipo nuevo').exists()
+        assert Calibracion.objects.filter(equipo__empresa=copia).count() == 1
+
+    def test_manifiesto_no_avanza_si_falla_el_backup(self, tmp_path, empresa):
+        with patch('core.backup_stream.escribir_backup', side_effect=OSError('disco lleno')):
+            _backup(tmp_path, empresa, format='zip')
+
+        assert backup_stream.cargar_manifiesto(empresa.pk) is None
+
+
+class TestLecturaParalela:
+
+    def test_mantiene_el_orden_y_acota_las_lecturas(self):
+        activos, maximo, lock = [0], [0], threading.Lock()
+
+        def leer(ruta):
+            with lock:
+                activos[0] += 1
+                maximo[0] = max(maximo[0], activos[0])
+            time.sleep(0.01)
+            with lock:
+                activos[0] -= 1
+            return None if ruta == 'falta' else ruta.encode()
+
+        rutas = [(f'zip/{i}', 'falta' if i == 3 else f'f{i}') for i in range(20)]
+        with patch('core.backup_stream._leer_archivo', side_effect=leer):
+            resultado = list(backup_stream.leer_en_paralelo(rutas, workers=3))
+
+        assert [ruta for ruta, _ in resultado] == [ruta for ruta, _ in rutas]
+        assert resultado[3][1] is None and resultado[4][1] == b'f4'
+        assert 1 < maximo[0] <= 3
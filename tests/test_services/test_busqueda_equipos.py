@@ -0,0 +1,153 @@
+"""
+Tests para la búsqueda indexada y la paginación keyset de equipos
+(core/busqueda_equipos.py) y su uso en las vistas home y equipos.
+"""
+from datetime import date, timedelta
+
+import pytest
+from django.test import Client, RequestFactory
+from django.urls import reverse
+
+from core.busqueda_equipos import (
+    ORDEN_CODIGO, ORDENES_FECHA, buscar_y_paginar, contar, normalizar, paginar,
+)
+from core.models import Equipo
+from tests.factories import EmpresaFactory, EquipoFactory, UserFactory
+
+
+@pytest.fixture
+def empresa():
+    return EmpresaFactory()
+
+
+def _recorrer(queryset, orden, tamano):
+    """Recorre todas las páginas hacia adelante y luego vuelve hacia atrás."""
+    paginas = [paginar(queryset, orden, tamano)]
+    while paginas[-1].has_next:
+        paginas.append(paginar(queryset, orden, tamano, cursor=paginas[-1].cursor_siguiente))
+    atras = [paginas[-1]]
+    while atras[-1].has_previous:
+        atras.append(paginar(queryset, orden, tamano, cursor=atras[-1].cursor_anterior))
+    return paginas, atras
+
+
+def test_normalizar_quita_tildes_y_mayusculas():
+    assert normalizar('  Balanza  ANALÍTICA Ñandú ') == 'balanza analitica nandu'
+
+
+@pytest.mark.django_db
+class TestBusqueda:
+
+    def test_todas_las_palabras_sin_tildes_ni_mayusculas(self, empresa):
+        EquipoFactory(empresa=empresa, nombre='Balanza Analítica', marca='Mettler')
+        EquipoFactory(empresa=empresa, nombre='Balanza de piso', marca='Ohaus')
+        EquipoFactory(empresa=empresa, nombre='Termómetro', marca='Mettler')
+        request = RequestFactory().get('/')
+
+        pagina = buscar_y_paginar(request, Equipo.objects.filter(empresa=empresa), 'balanza METTLER analitica')
+
+        assert [e.nombre for e in pagina] == ['Balanza Analítica']
+
+    def test_relevancia_prioriza_codigo_exacto_y_prefijos(self, empresa):
+        EquipoFactory(empresa=empresa, codigo_interno='X-001', nombre='Equipo con BAL-7 en el nombre')
+        EquipoFactory(empresa=empresa, codigo_interno='BAL-70', nombre='Balanza grande')
+        EquipoFactory(empresa=empresa, codigo_interno='BAL-7', nombre='Balanza')
+        request = RequestFactory().get('/', {'q': 'bal-7'})
+
+        pagina = buscar_y_paginar(request, Equipo.objects.filter(empresa=empresa), 'bal-7')
+
+        assert [e.codigo_interno for e in pagina] == ['BAL-7', 'BAL-70', 'X-001']
+
+    def test_save_parcial_actualiza_texto_busqueda(self, empresa):
+        equipo = EquipoFactory(empresa=empresa, nombre='Balanza')
+        equipo.nombre = 'Micrómetro'
+        equipo.save(update_fields=['nombre'])
+
+        equipo.refresh_from_db()
+        assert 'micrometro' in equipo.texto_busqueda
+        assert 'balanza' not in equipo.texto_busqueda
+
+
+@pytest.mark.django_db
+class TestPaginacionKeyset:
+
+    def test_recorre_todo_sin_duplicados_en_ambos_sentidos(self, empresa):
+        for n in range(11):
+            EquipoFactory(empresa=empresa, codigo_interno=f'EQ-{n:03d}')
+        qs = Equipo.objects.filter(empresa=empresa)
+
+        adelante, atras = _recorrer(qs, ORDEN_CODIGO, 4)
+
+        codigos = [e.codigo_interno for pagina in adelante for e in pagina]
+        assert codigos == [f'EQ-{n:03d}' for n in range(11)]
+        assert [p.start_index() for p in adelante] == [1, 5, 9]
+        assert [[e.codigo_interno for e in p] for p in reversed(atras)] == [
+            [e.codigo_interno for e in p] for p in adelante
+        ]
+        assert atras[-1].start_index() == 1
+
+    def test_orden_por_fecha_con_nulos_al_final(self, empresa):
+        hoy = date.today()
+        for n in range(7):
+            equipo = EquipoFactory(empresa=empresa)
+            Equipo.objects.filter(pk=equipo.pk).update(
+                proxima_calibracion=None if n % 3 == 0 else hoy + timedelta(days=10 - n)
+            )
+        qs = Equipo.objects.filter(empresa=empresa)
+
+        adelante, atras = _recorrer(qs, ORDENES_FECHA['calibracion'], 2)
+
+        fechas = [e.proxima_calibracion for pagina in adelante for e in pagina]
+        assert len(fechas) == 7
+        assert fechas[:4] == sorted(fechas[:4])
+        assert fechas[4:] == [None, None, None]
+        assert len(atras) == len(adelante)
+
+    def test_cursor_invalido_vuelve_a_la_primera_pagina(self, empresa):
+        EquipoFactory(empresa=empresa, codigo_interno='A-1')
+
+        pagina = paginar(Equipo.objects.filter(empresa=empresa), ORDEN_CODIGO, 10, cursor='no-es-un-cursor')
+
+        assert [e.codigo_interno for e in pagina] == ['A-1']
+        assert not pagina.has_previous
+
+    def test_conteo_aproximado_acotado(self, empresa):
+        for _ in range(5):
+            EquipoFactory(empresa=empresa)
+        qs = Equipo.objects.filter(empresa=empresa)
+
+        assert contar(qs, 'aproximado', tope=3) == (3, False)
+        assert contar(qs, 'aproximado', tope=10) == (5, True)
+        assert contar(qs, 'ninguno') == (None, False)
+
+    def test_querystring_conserva_filtros(self, empresa):
+        for n in range(3):
+            EquipoFactory(empresa=empresa, codigo_interno=f'EQ-{n}')
+        request = RequestFactory().get('/', {'estado': 'Activo', 'page': '3'})
+
+        pagina = buscar_y_paginar(request, Equipo.objects.filter(empresa=empresa), '')
+
+        assert 'estado=Activo' in pagina.query_primera
+        assert 'page=' not in pagina.query_primera
+
+
+@pytest.mark.django_db
+def test_home_navega_con_cursor(empresa, settings):
+    settings.SAM_CONFIG = {**settings.SAM_CONFIG, 'PAGINATION_SIZE': 2}
+    for n in range(5):
+        EquipoFactory(empresa=empresa, codigo_interno=f'EQ-{n}', estado='Activo')
+    client = Client()
+    client.force_login(UserFactory(empresa=empresa, rol_usuario='ADMINISTRADOR'))
+
+    vistos = []
+    query = ''
+    while True:
+        response = client.get(reverse('core:home') + '?' + query)
+        assert response.status_code == 200
+        pagina = response.context['equipos']
+        vistos += [e.codigo_interno for e in pagina]
+        if not pagina.has_next:
+            break
+        query = pagina.query_siguiente
+
+    assert vistos == [f'EQ-{n}' for n in range(5)]
@@ -0,0 +1,143 @@
+"""
+Tests para el índice de ocurrencias del calendario (core/calendario_indice.py)
+y su uso en calendario_eventos_api.
+"""
+import io
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+
+from core.calendario_indice import asegurar_indice, fechas_programadas
+from core.models import Equipo, Mantenimiento, OcurrenciaActividad
+from tests.factories import EmpresaFactory, EquipoFactory, UserFactory
+
+
+def _equipo(empresa, dias=10, **campos):
+    equipo = EquipoFactory(empresa=empresa, estado='Activo', frecuencia_calibracion_meses=Decimal('3'), **campos)
+    Equipo.objects.filter(pk=equipo.pk).update(
+        proxima_calibracion=date.today() + timedelta(days=dias), proximo_mantenimiento=None, proxima_comprobacion=None
+    )
+    return equipo
+
+
+@pytest.fixture
+def empresa():
+    return EmpresaFactory()
+
+
+@pytest.fixture
+def cliente(empresa):
+    client = Client()
+    client.force_login(UserFactory(empresa=empresa, rol_usuario='TECNICO'))
+    return client
+
+
+def _eventos(cliente, dias=200, **extra):
+    hoy = date.today()
+    return cliente.get(reverse('core:calendario_eventos_api'), {
+        'start': hoy.isoformat(), 'end': (hoy + timedelta(days=dias)).isoformat(),
+    }, **extra)
+
+
+class TestFechasProgramadas:
+
+    def test_repite_segun_frecuencia(self):
+        hoy = date(2026, 1, 1)
+        assert fechas_programadas(date(2026, 1, 31), Decimal('1'), date(2026, 4, 30), hoy) == [
+            date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 28), date(2026, 4, 28),
+        ]
+
+    def test_vencida_no_inventa_ocurrencias_pasadas(self):
+        hoy = date(2026, 1, 15)
+        assert fechas_programadas(date(2025, 10, 1), Decimal('2'), date(2026, 6, 1), hoy) == [
+            date(2025, 10, 1), date(2026, 2, 1), date(2026, 4, 1), date(2026, 6, 1),
+        ]
+
+    def test_sin_frecuencia_solo_la_proxima(self):
+        assert fechas_programadas(date(2026, 3, 1), None, date(2027, 1, 1), date(2026, 1, 1)) == [date(2026, 3, 1)]
+
+
+@pytest.mark.django_db
+class TestCalendarioDesdeIndice:
+
+    def test_proyecta_ocurrencias_recurrentes(self, empresa, cliente):
+        equipo = _equipo(empresa)
+
+        data = _eventos(cliente).json()
+
+        fechas = [e['start'] for e in data if e['extendedProps']['equipo_id'] == equipo.pk]
+        assert len(fechas) == 3  # hoy+10, +3 meses, +6 meses
+        assert fechas[0] == (date.today() + timedelta(days=10)).isoformat()
+
+    def test_etag_responde_304_hasta_que_cambian_los_datos(self, empresa, cliente):
+        equipo = _equipo(empresa)
+        primera = _eventos(cliente)
+        etag = primera['ETag']
+
+        assert _eventos(cliente, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        Mantenimiento.objects.create(
+            equipo=equipo, fecha_mantenimiento=date.today() + timedelta(days=1), tipo_mantenimiento='Preventivo',
+        )
+        respuesta = _eventos(cliente, HTTP_IF_NONE_MATCH=etag)
+
+        assert respuesta.status_code == 200
+        assert respuesta['ETag'] != etag
+        realizados = [e for e in respuesta.json() if e['extendedProps']['estado'] == 'realizado']
+        assert realizados[0]['extendedProps']['tipo_mantenimiento'] == 'Preventivo'
+
+    def test_cambio_del_equipo_reindexa_solo_ese_equipo(self, empresa):
+        equipos = [_equipo(empresa, dias=n) for n in range(1, 4)]
+        qs = Equipo.objects.filter(empresa=empresa)
+        assert asegurar_indice(qs, date.today() + timedelta(days=60)) == 3
+        assert asegurar_indice(qs, date.today() + timedelta(days=60)) == 0
+
+        equipos[0].nombre = 'Renombrado'
+        equipos[0].save()
+
+        assert asegurar_indice(qs, date.today() + timedelta(days=60)) == 1
+        # Un rango más allá de lo proyectado extiende el índice
+        assert asegurar_indice(qs, date.today() + timedelta(days=365 * 5)) == 3
+
+    def test_lectura_reindexa_un_lote_acotado(self, empresa, cliente, settings):
+        settings.CALENDARIO_INDICE_CONFIG = {'MAX_EQUIPOS_POR_LECTURA': 2}
+        equipos = [_equipo(empresa, dias=n) for n in range(1, 6)]
+
+        data = _eventos(cliente).json()
+
+        indexados = {e['extendedProps']['equipo_id'] for e in data}
+        assert indexados == {equipos[0].pk, equipos[1].pk}
+
+        salida = io.StringIO()
+        call_command('reindexar_calendario', stdout=salida)
+        assert 'Total: 3 equipos' in salida.getvalue()
+        assert len({e['extendedProps']['equipo_id'] for e in _eventos(cliente).json()}) == 5
+
+    def test_reindexado_repetido_no_duplica_ocurrencias(self, empresa):
+        equipo = _equipo(empresa)
+        qs = Equipo.objects.filter(empresa=empresa)
+        hasta = date.today() + timedelta(days=60)
+        asegurar_indice(qs, hasta)
+        filas = OcurrenciaActividad.objects.filter(equipo=equipo).count()
+
+        # Otro request ya reindexó el lote: al re-comprobar bajo bloqueo no se repite
+        with patch('core.calendario_indice.equipos_desactualizados', side_effect=[qs, qs.none()]):
+            assert asegurar_indice(qs, hasta) == 0
+
+        assert OcurrenciaActividad.objects.filter(equipo=equipo).count() == filas
+
+    def test_consultas_constantes_con_indice_vigente(self, empresa, cliente, django_assert_max_num_queries):
+        for n in range(30):
+            _equipo(empresa, dias=n + 1)
+        _eventos(cliente)
+
+        with django_assert_max_num_queries(12):
+            data = _eventos(cliente, dias=60).json()
+
+        assert len(data) == 30
+        assert OcurrenciaActividad.objects.filter(empresa=empresa, estado='programado').count() > 30
@@ -0,0 +1,80 @@
+"""
+Tests para la cola con leases compartida (core/cola_lease.py).
+"""
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from core import cola_lease
+from core.models import RegeneracionPDF
+from tests.factories import EmpresaFactory
+
+COLA = cola_lease.ColaLease(
+    'RegeneracionPDF', en_curso='procesando', lease_seconds=lambda: 60,
+    listas=lambda ahora: {'proximo_intento__lte': ahora},
+)
+
+
+@pytest.mark.django_db
+class TestColaLease:
+
+    def _trabajos(self, n, **campos):
+        empresa = EmpresaFactory()
+        return [
+            RegeneracionPDF.objects.create(tipo='comprobacion', objeto_id=i, empresa_id=empresa.pk, **campos)
+            for i in range(n)
+        ]
+
+    def test_reclamar_respeta_tamano_y_no_repite(self):
+        self._trabajos(3)
+        self._trabajos(1, proximo_intento=timezone.now() + timedelta(hours=1))
+
+        primero = COLA.reclamar_lote('a', 2)
+        segundo = COLA.reclamar_lote('b', 5)
+
+        assert len(primero) == 2 and len(segundo) == 1
+        assert {t.worker_id for t in segundo} == {'b'} and segundo[0].estado == 'procesando'
+        assert COLA.reclamar_lote('c', 5) == []
+
+    def test_lease_expirado_vuelve_a_la_cola(self):
+        self._trabajos(1)
+        (trabajo,) = COLA.reclamar_lote('a', 1)
+        assert COLA.renovar_lease(trabajo.pk, 'b') is False
+
+        RegeneracionPDF.objects.filter(pk=trabajo.pk).update(lease_expira=timezone.now() - timedelta(seconds=1))
+
+        assert COLA.renovar_lease(trabajo.pk, 'a') is True
+        RegeneracionPDF.objects.filter(pk=trabajo.pk).update(lease_expira=timezone.now() - timedelta(seconds=1))
+        assert COLA.recuperar_estancados() == 1
+        assert [t.pk for t in COLA.reclamar_lote('b', 1)] == [trabajo.pk]
+
+
+class TestBucleWorker:
+
+    def test_solo_duerme_sin_trabajo_y_sobrevive_a_errores(self):
+        pasos = iter([True, ValueError('caído'), False])
+
+        def paso():
+            resultado = next(pasos)
+            if isinstance(resultado, Exception):
+                raise resultado
+            return resultado
+
+        with patch('core.cola_lease.time.sleep') as dormir:
+            cola_lease.bucle_worker('prueba', 'w', paso, check_interval=7, max_iterations=3)
+
+        # Tras el trabajo no duerme; tras el error sí; la última iteración sale sin dormir
+        assert [c.args for c in dormir.call_args_list] == [(7,)]
+
+    def test_un_proceso_ejecuta_el_worker_en_el_actual(self):
+        llamadas = []
+
+        cola_lease.ejecutar_procesos(
+            lambda worker_id, *args, **opciones: llamadas.append((worker_id, args, opciones)),
+            1, (5, 1), 'Prueba', max_iterations=1, extra='x',
+        )
+
+        ((worker_id, args, opciones),) = llamadas
+        assert worker_id.endswith(':0') and args == (5, 1) and opciones == {'extra': 'x'}
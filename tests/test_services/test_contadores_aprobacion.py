@@ -0,0 +1,102 @@
+"""
+Tests para los contadores cacheados del badge de Aprobaciones
+(core/contadores_aprobacion.py y context processor aprobaciones_pendientes_count).
+"""
+import pytest
+from django.core.cache import cache
+from django.test import RequestFactory
+
+from core.context_processors import aprobaciones_pendientes_count
+from core.contadores_aprobacion import clave_pendientes
+from tests.factories import UserFactory, EmpresaFactory, EquipoFactory, CalibracionFactory, ComprobacionFactory
+
+
+@pytest.fixture(autouse=True)
+def limpiar_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _badge(user):
+    request = RequestFactory().get('/')
+    request.user = user
+    return aprobaciones_pendientes_count(request)
+
+
+def _confirmacion_pendiente(equipo, creado_por, commit):
+    with commit(execute=True):
+        return CalibracionFactory(
+            equipo=equipo,
+            creado_por=creado_por,
+            confirmacion_estado_aprobacion='pendiente',
+            confirmacion_metrologica_pdf='pdfs/conf.pdf',
+            confirmacion_metrologica_datos={'punto': 1},
+        )
+
+
+@pytest.mark.django_db
+class TestBadgeAprobaciones:
+
+    def test_aprobador_no_cuenta_sus_propios_documentos(self, django_capture_on_commit_callbacks):
+        empresa = EmpresaFactory()
+        gerente = UserFactory(empresa=empresa, rol_usuario='GERENCIA')
+        tecnico = UserFactory(empresa=empresa, rol_usuario='TECNICO')
+        equipo = EquipoFactory(empresa=empresa)
+        _confirmacion_pendiente(equipo, tecnico, django_capture_on_commit_callbacks)
+        _confirmacion_pendiente(equipo, gerente, django_capture_on_commit_callbacks)
+        with django_capture_on_commit_callbacks(execute=True):
+            ComprobacionFactory(
+                equipo=equipo, creado_por=tecnico, estado_aprobacion='pendiente',
+                comprobacion_pdf='pdfs/comp.pdf', datos_comprobacion={},
+            )  # datos vacíos: no generada por plataforma
+
+        assert _badge(gerente)['aprobaciones_pendientes_count'] == 1
+
+    def test_segunda_lectura_sin_consultas(self, django_assert_num_queries):
+        empresa = EmpresaFactory()
+        gerente = UserFactory(empresa=empresa, rol_usuario='ADMINISTRADOR')
+        _badge(gerente)
+
+        with django_assert_num_queries(0):
+            _badge(gerente)
+
+    def test_guardar_documento_invalida_el_contador(self, django_capture_on_commit_callbacks):
+        empresa = EmpresaFactory()
+        gerente = UserFactory(empresa=empresa, rol_usuario='GERENCIA')
+        tecnico = UserFactory(empresa=empresa, rol_usuario='TECNICO')
+        equipo = EquipoFactory(empresa=empresa)
+        calibracion = _confirmacion_pendiente(equipo, tecnico, django_capture_on_commit_callbacks)
+        assert _badge(gerente)['aprobaciones_pendientes_count'] == 1
+
+        calibracion.confirmacion_estado_aprobacion = 'aprobado'
+        with django_capture_on_commit_callbacks(execute=True):
+            calibracion.save()
+
+        assert cache.get(clave_pendientes(empresa.id)) is None
+        assert _badge(gerente)['aprobaciones_pendientes_count'] == 0
+
+    def test_rechazos_del_usuario(self, django_capture_on_commit_callbacks):
+        empresa = EmpresaFactory()
+        tecnico = UserFactory(empresa=empresa, rol_usuario='TECNICO')
+        equipo = EquipoFactory(empresa=empresa)
+        assert _badge(tecnico)['aprobaciones_total_badge'] == 0
+
+        with django_capture_on_commit_callbacks(execute=True):
+            CalibracionFactory(
+                equipo=equipo, creado_por=tecnico,
+                confirmacion_estado_aprobacion='rechazado', intervalos_estado_aprobacion='rechazado',
+            )
+
+        badge = _badge(tecnico)
+        assert badge['aprobaciones_rechazadas_count'] == 2
+        assert badge['aprobaciones_total_badge'] == 2
+
+    def test_superusuario_ve_todas_las_empresas(self, django_capture_on_commit_callbacks):
+        admin = UserFactory(is_superuser=True, empresa=None)
+        for _ in range(2):
+            empresa = EmpresaFactory()
+            tecnico = UserFactory(empresa=empresa, rol_usuario='TECNICO')
+            _confirmacion_pendiente(EquipoFactory(empresa=empresa), tecnico, django_capture_on_commit_callbacks)
+
+        assert _badge(admin)['aprobaciones_pendientes_count'] == 2
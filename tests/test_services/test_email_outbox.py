@@ -0,0 +1,134 @@
+"""
+Tests para la bandeja de salida de emails (core/email_outbox.py).
+"""
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.management import call_command
+from django.utils import timezone
+
+from core.email_outbox import LimitadorEnvio, despachar, drenar, metricas_outbox
+from core.models import CorreoSaliente
+
+
+OUTBOX_ACTIVO = {
+    'ACTIVO': True, 'WORKERS': 3, 'LOTE': 10, 'MAX_INTENTOS': 2,
+    'BACKOFF_SEGUNDOS': 60, 'LIMITE_POR_SEGUNDO': 0,
+}
+
+
+def _mensaje(n=1, html=True):
+    mensaje = EmailMultiAlternatives(
+        subject=f'Recordatorio {n}', body='Texto', from_email='sam@example.com', to=[f'u{n}@example.com'],
+    )
+    if html:
+        mensaje.attach_alternative(f'<p>Recordatorio {n}</p>', 'text/html')
+    return mensaje
+
+
+@pytest.fixture
+def outbox_activo(settings):
+    settings.EMAIL_OUTBOX_CONFIG = OUTBOX_ACTIVO
+
+
+@pytest.mark.django_db
+class TestDespachar:
+
+    def test_sin_bandeja_envia_en_linea(self):
+        assert despachar(_mensaje(), categoria='pago') is True
+
+        assert len(mail.outbox) == 1
+        assert not CorreoSaliente.objects.exists()
+
+    def test_con_bandeja_encola_sin_enviar(self, outbox_activo):
+        despachar(_mensaje(), categoria='recordatorio_calibracion')
+
+        assert mail.outbox == []
+        correo = CorreoSaliente.objects.get()
+        assert (correo.estado, correo.categoria) == ('pendiente', 'recordatorio_calibracion')
+        assert correo.destinatarios == ['u1@example.com']
+        assert correo.cuerpo_html == '<p>Recordatorio 1</p>'
+
+    def test_adjuntos_se_envian_en_linea(self, outbox_activo):
+        mensaje = _mensaje()
+        mensaje.attach('reporte.txt', 'contenido', 'text/plain')
+
+        despachar(mensaje)
+
+        assert len(mail.outbox) == 1
+        assert not CorreoSaliente.objects.exists()
+
+
+@pytest.mark.django_db
+class TestDrenar:
+
+    def test_envia_reutilizando_una_conexion_por_hilo(self, outbox_activo):
+        for n in range(25):
+            despachar(_mensaje(n))
+
+        with patch('core.email_outbox.get_connection', wraps=get_connection) as conexiones:
+            metricas = drenar()
+
+        assert metricas['enviados'] == 25
+        assert conexiones.call_count <= OUTBOX_ACTIVO['WORKERS']
+        assert len(mail.outbox) == 25
+        assert mail.outbox[0].alternatives[0][1] == 'text/html'
+        assert not CorreoSaliente.objects.exclude(estado='enviado').exists()
+
+    def test_fallo_reprograma_y_luego_descarta(self, outbox_activo):
+        despachar(_mensaje())
+
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                   side_effect=ConnectionError('SMTP caído')):
+            assert drenar()['reintentos'] == 1
+            correo = CorreoSaliente.objects.get()
+            assert correo.estado == 'pendiente'
+            assert correo.intentos == 1
+            assert correo.proximo_intento > timezone.now() + timedelta(seconds=50)
+            assert 'SMTP caído' in correo.ultimo_error
+
+            # Aún no toca reintentar
+            assert drenar()['reintentos'] == 0
+
+            CorreoSaliente.objects.update(proximo_intento=timezone.now())
+            assert drenar()['fallidos'] == 1
+
+        assert CorreoSaliente.objects.get().estado == 'fallido'
+        assert mail.outbox == []
+
+    def test_recupera_mensajes_con_lease_vencido(self, outbox_activo):
+        despachar(_mensaje())
+        CorreoSaliente.objects.update(
+            estado='enviando', worker_id='muerto', lease_expira=timezone.now() - timedelta(seconds=1)
+        )
+
+        assert drenar()['enviados'] == 1
+
+    def test_comando_y_metricas(self, outbox_activo):
+        despachar(_mensaje(1))
+        despachar(_mensaje(2))
+        salida = StringIO()
+
+        call_command('procesar_outbox_email', metricas=True, stdout=salida)
+
+        metricas = metricas_outbox()
+        assert metricas['por_estado']['enviado'] == 2
+        assert metricas['por_estado']['pendiente'] == 0
+        assert metricas['enviados_ultima_hora'] == 2
+        assert metricas['ultima_ejecucion']['enviados'] == 2
+        assert 'Enviados: 2' in salida.getvalue()
+
+
+def test_limitador_espacia_los_envios():
+    limitador = LimitadorEnvio(50)
+    inicio = time.monotonic()
+    for _ in range(6):
+        limitador.esperar()
+
+    # El primero sale de inmediato; los otros cinco esperan 1/50 s cada uno
+    assert time.monotonic() - inicio >= 0.09
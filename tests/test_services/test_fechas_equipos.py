@@ -0,0 +1,127 @@
+"""
+Tests para el motor de recálculo de fechas en lote (core/fechas_equipos.py)
+y su uso desde Equipo.save, las señales de actividad y recalcular_fechas_equipos.
+"""
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from dateutil.relativedelta import relativedelta
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.fechas_equipos import recalcular_fechas
+from core.models import Calibracion, Equipo
+from tests.factories import CalibracionFactory, EmpresaFactory, EquipoFactory, MantenimientoFactory
+
+
+def _equipo(empresa, **campos):
+    campos = {
+        'estado': 'Activo', 'frecuencia_calibracion_meses': Decimal('12'),
+        'frecuencia_mantenimiento_meses': Decimal('6'), 'frecuencia_comprobacion_meses': None,
+        'fecha_adquisicion': date(2020, 1, 1), **campos,
+    }
+    return EquipoFactory(empresa=empresa, **campos)
+
+
+def _updates_de_fechas(queries):
+    return [q for q in queries if q['sql'].startswith('UPDATE') and 'proxima_calibracion' in q['sql']]
+
+
+@pytest.fixture
+def empresa():
+    return EmpresaFactory()
+
+
+@pytest.mark.django_db
+class TestMotor:
+
+    def test_recalcula_la_flota_con_consultas_constantes(self, empresa):
+        equipos = [_equipo(empresa) for _ in range(6)]
+        for i, equipo in enumerate(equipos):
+            CalibracionFactory(equipo=equipo, fecha_calibracion=date(2024, 1, 1 + i))
+            CalibracionFactory(equipo=equipo, fecha_calibracion=date(2023, 1, 1))
+        Equipo.objects.filter(empresa=empresa).update(proxima_calibracion=None)
+
+        with CaptureQueriesContext(connection) as ctx:
+            cambios = recalcular_fechas(Equipo.objects.filter(empresa=empresa))
+
+        # Equipos + una agregación por tipo + un bulk_update
+        assert len(ctx.captured_queries) == 5
+        assert len(cambios) == 6
+        equipo = Equipo.objects.get(pk=equipos[2].pk)
+        assert equipo.proxima_calibracion == date(2024, 1, 3) + relativedelta(months=12)
+
+    def test_simulacion_y_equipos_sin_cambios_no_escriben(self, empresa):
+        equipo = _equipo(empresa)
+        CalibracionFactory(equipo=equipo, fecha_calibracion=date(2024, 5, 1))
+        Equipo.objects.filter(pk=equipo.pk).update(proxima_calibracion=None)
+
+        assert len(recalcular_fechas(Equipo.objects.filter(pk=equipo.pk), guardar=False)) == 1
+        assert Equipo.objects.get(pk=equipo.pk).proxima_calibracion is None
+
+        recalcular_fechas(Equipo.objects.filter(pk=equipo.pk))
+        with CaptureQueriesContext(connection) as ctx:
+            assert recalcular_fechas(Equipo.objects.filter(pk=equipo.pk)) == []
+        assert not _updates_de_fechas(ctx.captured_queries)
+
+    def test_equipo_de_baja_queda_sin_proximas_fechas(self, empresa):
+        equipo = _equipo(empresa)
+        Equipo.objects.filter(pk=equipo.pk).update(estado='De Baja', proxima_calibracion=date(2030, 1, 1))
+
+        recalcular_fechas(Equipo.objects.filter(pk=equipo.pk))
+
+        assert Equipo.objects.get(pk=equipo.pk).proxima_calibracion is None
+
+
+@pytest.mark.django_db
+class TestUsos:
+
+    def test_save_de_equipo_existente_escribe_una_vez(self, empresa):
+        equipo = _equipo(empresa)
+        CalibracionFactory(equipo=equipo, fecha_calibracion=date(2024, 3, 1))
+        equipo.refresh_from_db()
+        equipo.frecuencia_calibracion_meses = Decimal('6')
+
+        with CaptureQueriesContext(connection) as ctx:
+            equipo.save(update_fields=['frecuencia_calibracion_meses'])
+
+        assert len(_updates_de_fechas(ctx.captured_queries)) == 1
+        assert Equipo.objects.get(pk=equipo.pk).proxima_calibracion == date(2024, 9, 1)
+
+    def test_equipo_nuevo_parte_de_la_fecha_proporcionada(self, empresa):
+        equipo = _equipo(empresa, fecha_ultima_calibracion=date(2024, 2, 1))
+
+        assert Equipo.objects.get(pk=equipo.pk).proxima_calibracion == date(2025, 2, 1)
+
+    def test_senales_sincronizan_ultima_y_proxima_fecha(self, empresa):
+        equipo = _equipo(empresa)
+        CalibracionFactory(equipo=equipo, fecha_calibracion=date(2023, 6, 1))
+        reciente = CalibracionFactory(equipo=equipo, fecha_calibracion=date(2024, 6, 1))
+        MantenimientoFactory(equipo=equipo, fecha_mantenimiento=date(2024, 7, 1))
+
+        equipo.refresh_from_db()
+        assert equipo.fecha_ultima_calibracion == date(2024, 6, 1)
+        assert equipo.proxima_calibracion == date(2025, 6, 1)
+        assert equipo.proximo_mantenimiento == date(2025, 1, 1)
+
+        Calibracion.objects.get(pk=reciente.pk).delete()
+
+        equipo.refresh_from_db()
+        assert equipo.fecha_ultima_calibracion == date(2023, 6, 1)
+        assert equipo.proxima_calibracion == date(2024, 6, 1)
+
+    def test_comando_corrige_fechas_y_respeta_dry_run(self, empresa):
+        equipo = _equipo(empresa)
+        CalibracionFactory(equipo=equipo, fecha_calibracion=date(2024, 4, 1))
+        Equipo.objects.filter(pk=equipo.pk).update(proxima_calibracion=date(2000, 1, 1))
+        salida = StringIO()
+
+        call_command('recalcular_fechas_equipos', dry_run=True, empresa=empresa.pk, stdout=salida)
+        assert Equipo.objects.get(pk=equipo.pk).proxima_calibracion == date(2000, 1, 1)
+
+        call_command('recalcular_fechas_equipos', empresa=empresa.pk, stdout=salida)
+        assert Equipo.objects.get(pk=equipo.pk).proxima_calibracion == date(2025, 4, 1)
+        assert '[CAL] Proxima calibracion: 2000-01-01 -> 2025-04-01' in salida.getvalue()
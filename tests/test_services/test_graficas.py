@@ -0,0 +1,111 @@
+"""
+Tests para las gráficas de confirmación metrológica (core/graficas.py):
+backend SVG, memoización y respaldo matplotlib.
+"""
+import base64
+import xml.etree.ElementTree as ET
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+
+from core import graficas
+
+PUNTOS = [
+    {'nominal': 300.0, 'error': 0.08, 'incertidumbre': 0.03, 'conformidad': 'CONFORME'},
+    {'nominal': 100.0, 'error': 0.05, 'incertidumbre': 0.03},
+    {'nominal': 200.0, 'lectura': 199.96, 'incertidumbre': 0.03},
+]
+
+
+@pytest.fixture(autouse=True)
+def limpiar():
+    graficas.limpiar_memoria()
+    cache.clear()
+    yield
+    graficas.limpiar_memoria()
+
+
+def _svg(data_uri):
+    prefijo = 'data:image/svg+xml;base64,'
+    assert data_uri.startswith(prefijo)
+    return base64.b64decode(data_uri[len(prefijo):]).decode('utf-8')
+
+
+class TestSVG:
+
+    def test_sin_puntos_validos(self):
+        assert graficas.grafica_confirmacion_svg([], 1.0, '%', 'kg') is None
+        assert graficas.grafica_confirmacion_svg([{'lectura': 1.0}], 1.0, '%', 'kg') is None
+
+    def test_documento_valido_con_texto_escapado(self):
+        svg = _svg(graficas.grafica_confirmacion_svg(PUNTOS, 0.1, 'mm', '<b>mm</b>', 'conditional'))
+
+        raiz = ET.fromstring(svg)
+        assert raiz.tag.endswith('svg')
+        assert 'Aceptación Condicional' in svg and 'CONDICIONAL (zona gris)' in svg
+        assert '&lt;b&gt;mm&lt;/b&gt;' in svg and '<b>' not in svg
+        assert len(raiz.findall('{http://www.w3.org/2000/svg}circle')) >= len(PUNTOS)
+
+    def test_zonas_segun_regla(self):
+        simple = _svg(graficas.grafica_confirmacion_svg(PUNTOS, 0.1, 'mm', 'mm', 'simple_acceptance'))
+        banda = _svg(graficas.grafica_confirmacion_svg(PUNTOS, 0.1, 'mm', 'mm', 'guard_band_U'))
+
+        assert '#fde047' not in simple
+        # Dos bandas amarillas por tramo (antes del primer punto, entre puntos y
+        # después) más la muestra de la leyenda
+        assert banda.count('fill="#fde047"') == 2 * (len(PUNTOS) + 1) + 1
+
+    def test_escala_logaritmica_y_emp_variable(self):
+        puntos = [{'nominal': 1.0, 'error': 0.001}, {'nominal': 1000.0, 'error': 0.5}]
+        serie = graficas.serie_confirmacion(puntos, 0.1, '%')
+
+        assert serie['usar_log'] and serie['emp_variable']
+        svg = _svg(graficas.grafica_confirmacion_svg(puntos, 0.1, '%', 'g'))
+        assert '>100<' in svg and 'Límite EMP (variable)' in svg
+
+    def test_ordena_por_nominal_y_normaliza(self):
+        serie = graficas.serie_confirmacion(PUNTOS, 0.1, 'mm')
+
+        assert serie['nominales'] == [100.0, 200.0, 300.0]
+        assert serie['y'] == pytest.approx([0.5, -0.4, 0.8])
+        assert serie['u'] == pytest.approx([0.3, 0.3, 0.3])
+
+
+class TestMemoizacion:
+
+    def test_reutiliza_la_grafica_de_los_mismos_datos(self):
+        with patch('core.graficas.svg_confirmacion', wraps=graficas.svg_confirmacion) as dibujar:
+            primera = graficas.grafica_confirmacion(PUNTOS, 0.1, 'mm', 'mm')
+            # Campos que no se dibujan no cambian la clave
+            otros = [dict(p, conformidad='NO CONFORME', desviacion_abs=1) for p in PUNTOS]
+            segunda = graficas.grafica_confirmacion(otros, 0.1, 'mm', 'mm')
+            graficas.grafica_confirmacion(PUNTOS, 0.1, 'mm', 'mm', 'guard_band_half')
+
+        assert primera == segunda
+        assert dibujar.call_count == 2
+
+    def test_comparte_entre_procesos_por_la_cache(self):
+        primera = graficas.grafica_confirmacion(PUNTOS, 0.1, 'mm', 'mm')
+        graficas.limpiar_memoria()
+
+        with patch('core.graficas.svg_confirmacion') as dibujar:
+            assert graficas.grafica_confirmacion(PUNTOS, 0.1, 'mm', 'mm') == primera
+        dibujar.assert_not_called()
+
+    def test_matplotlib_solo_como_respaldo(self):
+        with patch('core.graficas.grafica_confirmacion_png', return_value='data:image/png;base64,AA') as png:
+            assert graficas.grafica_confirmacion(PUNTOS, 0.1, 'mm', 'mm').startswith('data:image/svg+xml')
+            png.assert_not_called()
+
+            with patch('core.graficas.grafica_confirmacion_svg', side_effect=ValueError('svg')):
+                assert graficas.grafica_confirmacion(PUNTOS, 0.2, 'mm', 'mm') == 'data:image/png;base64,AA'
+            png.assert_called_once()
+
+    def test_backend_matplotlib_configurable(self, settings):
+        settings.GRAFICAS_CONFIG = {'BACKEND': 'matplotlib'}
+
+        with patch('core.graficas.grafica_confirmacion_png', return_value='data:image/png;base64,AA'), \
+             patch('core.graficas.grafica_confirmacion_svg') as svg:
+            assert graficas.grafica_confirmacion(PUNTOS, 0.1, 'mm', 'mm') == 'data:image/png;base64,AA'
+        svg.assert_not_called()
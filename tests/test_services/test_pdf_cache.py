@@ -0,0 +1,141 @@
+"""
+Tests para la caché persistente de Hojas de Vida (core/pdf_cache.py).
+"""
+import pytest
+from datetime import timedelta
+from unittest.mock import patch
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+
+from core.models import ArtefactoPDF, Equipo
+from core.pdf_cache import clave_cache, obtener_pdf, guardar_pdf, desalojar
+from tests.factories import EmpresaFactory, EquipoFactory, CalibracionFactory
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = FileSystemStorage(location=str(tmp_path))
+    with patch('core.pdf_cache.default_storage', storage):
+        yield storage
+    cache.clear()
+
+
+def _sello(equipo):
+    return Equipo.objects.values_list('version_contenido', flat=True).get(pk=equipo.pk)
+
+
+@pytest.mark.django_db
+class TestSelloContenido:
+
+    def test_guardar_equipo_renueva_sello(self):
+        equipo = EquipoFactory()
+        anterior = _sello(equipo)
+
+        equipo.nombre = 'Otro nombre'
+        equipo.save()
+
+        assert _sello(equipo) != anterior
+        assert equipo.version_contenido == _sello(equipo)
+
+    def test_guardado_parcial_renueva_sello_en_el_mismo_update(self, django_assert_num_queries):
+        equipo = EquipoFactory()
+        anterior = _sello(equipo)
+
+        equipo.nombre = 'Otro nombre'
+        # Últimas fechas (una consulta por tipo) + un único UPDATE con el sello
+        with django_assert_num_queries(4) as consultas:
+            equipo.save(update_fields=['nombre'])
+
+        (update,) = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('UPDATE')]
+        assert 'version_contenido' in update
+        assert _sello(equipo) == equipo.version_contenido != anterior
+
+    def test_calibracion_renueva_sello(self):
+        equipo = EquipoFactory()
+        anterior = _sello(equipo)
+
+        CalibracionFactory(equipo=equipo)
+
+        assert _sello(equipo) != anterior
+
+    def test_cambio_de_formato_empresa_renueva_todos_los_equipos(self):
+        empresa = EmpresaFactory()
+        equipos = [EquipoFactory(empresa=empresa) for _ in range(3)]
+        otro = EquipoFactory()
+        anteriores = {e.pk: _sello(e) for e in equipos + [otro]}
+
+        empresa.formato_version_empresa = '99'
+        empresa.save()
+
+        for equipo in equipos:
+            assert _sello(equipo) != anteriores[equipo.pk]
+        assert _sello(otro) == anteriores[otro.pk]
+
+    def test_guardado_parcial_ajeno_no_renueva(self):
+        empresa = EmpresaFactory()
+        equipo = EquipoFactory(empresa=empresa)
+        anterior = _sello(equipo)
+
+        empresa.limite_equipos_empresa = 500
+        empresa.save(update_fields=['limite_equipos_empresa'])
+
+        assert _sello(equipo) == anterior
+
+    def test_clave_sin_consultas(self, django_assert_num_queries):
+        equipo = EquipoFactory()
+
+        with django_assert_num_queries(0):
+            clave = clave_cache(equipo)
+
+        assert clave.startswith(f"hoja_vida_{equipo.id}_")
+
+
+@pytest.mark.django_db
+class TestArtefactos:
+
+    def test_guardar_y_obtener(self, storage):
+        equipo = EquipoFactory()
+
+        guardar_pdf(equipo, b'%PDF-contenido')
+        cache.clear()
+
+        assert obtener_pdf(equipo) == b'%PDF-contenido'
+        assert ArtefactoPDF.objects.filter(equipo=equipo).count() == 1
+
+    def test_nueva_version_no_sirve_la_anterior_y_la_elimina(self, storage):
+        equipo = EquipoFactory()
+        guardar_pdf(equipo, b'%PDF-v1')
+        ruta_v1 = ArtefactoPDF.objects.get(equipo=equipo).ruta
+
+        equipo.save()
+        assert obtener_pdf(equipo) is None
+
+        guardar_pdf(equipo, b'%PDF-v2')
+
+        assert ArtefactoPDF.objects.filter(equipo=equipo).count() == 1
+        assert not storage.exists(ruta_v1)
+        assert obtener_pdf(equipo) == b'%PDF-v2'
+
+    def test_desalojo_lru(self, storage):
+        empresa = EmpresaFactory()
+        equipos = [EquipoFactory(empresa=empresa) for _ in range(3)]
+        for equipo in equipos:
+            guardar_pdf(equipo, b'x' * 100)
+        ahora = timezone.now()
+        for i, equipo in enumerate(equipos):
+            ArtefactoPDF.objects.filter(equipo=equipo).update(ultimo_acceso=ahora - timedelta(hours=3 - i))
+
+        eliminados = desalojar(limite_bytes=150)
+
+        assert eliminados == 2
+        assert list(ArtefactoPDF.objects.values_list('equipo_id', flat=True)) == [equipos[2].pk]
+
+    def test_cache_desactivada(self, storage, settings):
+        settings.PDF_CACHE_CONFIG = {'ACTIVO': False}
+        equipo = EquipoFactory()
+
+        guardar_pdf(equipo, b'%PDF')
+
+        assert obtener_pdf(equipo) is None
+        assert not ArtefactoPDF.objects.exists()
@@ -0,0 +1,136 @@
+"""
+Tests para el motor vectorizado de proyección (core/proyecciones.py).
+"""
+import random
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from core.models import Calibracion, BajaEquipo
+from core.proyecciones import (
+    ETIQUETAS_STATUS,
+    proyectar_series,
+    proyectar_anio,
+)
+from tests.factories import EmpresaFactory, EquipoFactory
+
+
+def _referencia(series, desde, hasta, today, realizadas):
+    """Proyección iterativa original (relativedelta paso a paso)."""
+    filas = []
+    for posicion, (equipo_id, inicio, freq, fecha_baja) in enumerate(series):
+        actual = inicio
+        while actual < desde:
+            actual += relativedelta(months=freq)
+        while actual <= hasta:
+            if (equipo_id, actual.year, actual.month) in realizadas:
+                status = 'Realizado'
+            elif fecha_baja and actual >= fecha_baja:
+                status = 'No Cumplido'
+            elif actual < today:
+                status = 'No Cumplido'
+            else:
+                status = 'Pendiente/Programado'
+            filas.append((posicion, actual, status))
+            actual += relativedelta(months=freq)
+    return filas
+
+
+def _proyectar(series, desde, hasta, today, realizadas):
+    ids = [s[0] for s in series]
+    posiciones, fechas, status = proyectar_series(
+        ids,
+        np.array([s[1] for s in series], dtype='datetime64[D]'),
+        [s[2] for s in series],
+        np.array([s[3] or np.datetime64('NaT') for s in series], dtype='datetime64[D]'),
+        desde, hasta, today, realizadas,
+    )
+    return [
+        (p, f, ETIQUETAS_STATUS[c])
+        for p, f, c in zip(posiciones.tolist(), fechas.astype(object).tolist(), status.tolist())
+    ]
+
+
+class TestProyectarSeries:
+
+    def test_equivale_a_la_iteracion_original(self):
+        rng = random.Random(7)
+        series = []
+        for equipo_id in range(1, 400):
+            inicio = date(2010, 1, 1) + timedelta(days=rng.randrange(0, 365 * 17))
+            if rng.random() < 0.3:  # forzar fines de mes (ajuste de día acumulado)
+                inicio = (inicio.replace(day=1) + relativedelta(months=1)) - timedelta(days=rng.choice([1, 2, 3]))
+            fecha_baja = date(2025, rng.randrange(1, 13), 15) if rng.random() < 0.2 else None
+            series.append((equipo_id, inicio, rng.choice([1, 2, 3, 5, 6, 7, 12, 18, 24, 36]), fecha_baja))
+        realizadas = {(rng.randrange(1, 400), 2025, rng.randrange(1, 13)) for _ in range(300)}
+        today = date(2025, 7, 14)
+
+        for desde, hasta in [
+            (date(2025, 1, 1), date(2025, 12, 31)),
+            (date(2024, 3, 1), date(2025, 2, 28)),
+            (date(2025, 1, 30), date(2025, 3, 29)),
+        ]:
+            assert _proyectar(series, desde, hasta, today, realizadas) == \
+                _referencia(series, desde, hasta, today, realizadas)
+
+    def test_ajuste_fin_de_mes_se_arrastra(self):
+        filas = _proyectar(
+            [(1, date(2024, 1, 31), 1, None)], date(2024, 1, 1), date(2024, 4, 30), date(2024, 1, 1), set()
+        )
+
+        assert [f for _, f, _ in filas] == [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 29), date(2024, 4, 29)]
+
+    @pytest.mark.performance
+    def test_diez_mil_equipos_bajo_100ms(self):
+        rng = np.random.default_rng(0)
+        n = 10_000
+        inicios = np.datetime64('2015-01-01') + rng.integers(0, 365 * 10, n).astype('timedelta64[D]')
+        frecuencias = rng.choice([1, 3, 6, 12, 24], n)
+        bajas = np.full(n, np.datetime64('NaT'), dtype='datetime64[D]')
+        realizadas = [(int(i), 2025, int(m)) for i, m in zip(rng.integers(1, n, 5000), rng.integers(1, 13, 5000))]
+
+        proyectar_series(np.arange(1, n + 1), inicios, frecuencias, bajas,
+                         date(2025, 1, 1), date(2025, 12, 31), date(2025, 6, 1), realizadas)
+        t0 = time.perf_counter()
+        posiciones, _, _ = proyectar_series(np.arange(1, n + 1), inicios, frecuencias, bajas,
+                                            date(2025, 1, 1), date(2025, 12, 31), date(2025, 6, 1), realizadas)
+        transcurrido = time.perf_counter() - t0
+
+        assert posiciones.size > n
+        assert transcurrido < 0.1
+
+
+@pytest.mark.django_db
+class TestProyectarDesdeBD:
+
+    def test_conteos_y_filas_filtradas(self):
+        empresa = EmpresaFactory()
+        equipo = EquipoFactory(
+            empresa=empresa, estado='Activo', frecuencia_calibracion_meses=3,
+            fecha_adquisicion=date(2024, 10, 10),
+        )
+        Calibracion.objects.create(equipo=equipo, fecha_calibracion=date(2025, 1, 10), resultado='Aprobado')
+
+        proyeccion = proyectar_anio(empresa.equipos.all(), 'calibracion', 2025, date(2025, 6, 1))
+
+        # Plan desde la última calibración: ene (realizada), abr (vencida), jul y oct (pendientes)
+        assert proyeccion.conteos() == {'realizadas': 1, 'no_cumplidas': 1, 'pendientes': 2}
+        vencidas = proyeccion.filas(status='No Cumplido')
+        assert [(f['equipo'].pk, f['fecha_programada']) for f in vencidas] == [(equipo.pk, date(2025, 4, 10))]
+
+    def test_baja_anterior_al_rango_se_excluye(self):
+        empresa = EmpresaFactory()
+        equipo = EquipoFactory(
+            empresa=empresa, estado='De Baja', frecuencia_calibracion_meses=6,
+            fecha_adquisicion=date(2020, 1, 1),
+        )
+        BajaEquipo.objects.create(equipo=equipo, razon_baja='Obsoleto', fecha_baja=date(2024, 5, 1))
+
+        proyeccion = proyectar_anio(
+            empresa.equipos.select_related('baja_registro'), 'calibracion', 2025, date(2025, 6, 1)
+        )
+
+        assert len(proyeccion) == 0
@@ -0,0 +1,125 @@
+"""
+Tests para el planificador de recordatorios semanales de vencidos
+(core/recordatorios_vencidos.py).
+"""
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from core.models import Equipo, NotificacionVencimiento
+from core.notifications import NotificationScheduler
+from core.recordatorios_vencidos import planificar_recordatorios
+from tests.factories import EmpresaFactory, EquipoFactory
+
+
+def _vencido(empresa, dias=10, **campos):
+    equipo = EquipoFactory(empresa=empresa, estado='Activo')
+    fecha = timezone.localdate() - timedelta(days=dias)
+    Equipo.objects.filter(pk=equipo.pk).update(
+        proxima_calibracion=fecha, proximo_mantenimiento=None, proxima_comprobacion=None, **campos
+    )
+    equipo.refresh_from_db()
+    return equipo
+
+
+def _notificado(equipo, numero, hace_dias):
+    notificacion = NotificacionVencimiento.objects.create(
+        equipo=equipo, tipo_actividad='calibracion', fecha_vencimiento=equipo.proxima_calibracion,
+        numero_recordatorio=numero,
+    )
+    NotificacionVencimiento.objects.filter(pk=notificacion.pk).update(
+        fecha_notificacion=timezone.now() - timedelta(days=hace_dias)
+    )
+
+
+@pytest.mark.django_db
+class TestPlanificarRecordatorios:
+
+    def test_reglas_de_elegibilidad(self):
+        empresa = EmpresaFactory()
+        nuevo = _vencido(empresa)
+        segundo = _vencido(empresa)
+        _notificado(segundo, 1, hace_dias=8)
+        reciente = _vencido(empresa)
+        _notificado(reciente, 1, hace_dias=3)
+        agotado = _vencido(empresa)
+        _notificado(agotado, 3, hace_dias=30)
+
+        plan = planificar_recordatorios()
+
+        numeros = {n.equipo_id: n.numero_recordatorio for n in plan['notificaciones']}
+        assert numeros == {nuevo.pk: 1, segundo.pk: 2}
+        assert plan['descartados'] == {'maximo': 1, 'reciente': 1}
+        # Coincide con la comprobación individual del modelo
+        for equipo in (nuevo, segundo, reciente, agotado):
+            puede, numero = NotificacionVencimiento.puede_enviar_recordatorio(
+                equipo, 'calibracion', equipo.proxima_calibracion
+            )
+            assert (puede, numero) == ((True, numeros[equipo.pk]) if equipo.pk in numeros else (False, None))
+
+    def test_consultas_constantes(self, django_assert_num_queries):
+        for _ in range(3):
+            empresa = EmpresaFactory()
+            for _ in range(5):
+                _notificado(_vencido(empresa), 1, hace_dias=10)
+
+        # Recordatorios previos + un listado por tipo de actividad
+        with django_assert_num_queries(4):
+            plan = planificar_recordatorios()
+
+        assert len(plan['notificaciones']) == 15
+        assert len(plan['empresas']) == 3
+
+    def test_excluye_empresas_inactivas_y_estados_fuera_de_servicio(self):
+        activa = EmpresaFactory()
+        _vencido(activa)
+        _vencido(activa, estado='De Baja')
+        _vencido(EmpresaFactory(is_deleted=True))
+
+        plan = planificar_recordatorios()
+
+        assert list(plan['empresas']) == [activa.pk]
+        assert len(plan['notificaciones']) == 1
+
+
+@pytest.mark.django_db
+class TestEnvioSemanal:
+
+    def test_registra_en_lote_y_entrega_por_empresa(self):
+        empresa = EmpresaFactory()
+        equipo = _vencido(empresa)
+        Equipo.objects.filter(pk=equipo.pk).update(proximo_mantenimiento=equipo.proxima_calibracion)
+
+        with patch(
+            'core.notifications.NotificationScheduler._send_weekly_overdue_email', return_value=True
+        ) as enviar:
+            assert NotificationScheduler.send_weekly_overdue_reminders() == 1
+
+        empresa_enviada, calibraciones, mantenimientos, comprobaciones = enviar.call_args.args
+        assert empresa_enviada == empresa
+        assert [e.pk for e in calibraciones] == [equipo.pk]
+        assert [e.pk for e in mantenimientos] == [equipo.pk]
+        assert comprobaciones == []
+        assert NotificacionVencimiento.objects.filter(equipo=equipo).count() == 2
+
+        # La semana siguiente aún no toca: no se reenvía ni se registra nada
+        with patch('core.notifications.NotificationScheduler._send_weekly_overdue_email') as enviar:
+            assert NotificationScheduler.send_weekly_overdue_reminders() == 0
+        assert not enviar.called
+
+    def test_simulacion_no_escribe(self):
+        empresa = EmpresaFactory(nombre='Metrología Andina')
+        _vencido(empresa)
+
+        reporte = NotificationScheduler.report_weekly_overdue_reminders()
+        salida = StringIO()
+        call_command('send_notifications', type='weekly_overdue', dry_run=True, stdout=salida)
+
+        assert reporte['total_recordatorios'] == 1
+        assert reporte['empresas'][0]['calibracion'] == 1
+        assert 'Metrología Andina: 1 vencidas' in salida.getvalue()
+        assert not NotificacionVencimiento.objects.exists()
@@ -0,0 +1,219 @@
+"""
+Tests para la cola de regeneración de PDFs aprobados (core/regeneracion_pdf.py)
+y la aprobación en bloque.
+"""
+import json
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import pytest
+from django.core.files.base import ContentFile
+from django.urls import reverse
+from django.utils import timezone
+
+from core import regeneracion_pdf
+from core.models import RegeneracionPDF
+from tests.factories import ComprobacionFactory, EmpresaFactory, EquipoFactory, UserFactory
+
+COLA_ACTIVA = {'ACTIVO': True, 'LOTE': 2, 'MAX_INTENTOS': 2, 'BACKOFF_SEGUNDOS': 60}
+
+
+@pytest.fixture
+def empresa(db):
+    return EmpresaFactory()
+
+
+@pytest.fixture
+def tecnico(empresa):
+    return UserFactory(empresa=empresa, rol_usuario='TECNICO')
+
+
+@pytest.fixture
+def aprobador(empresa):
+    return UserFactory(empresa=empresa, rol_usuario='ADMINISTRADOR')
+
+
+def _comprobacion(empresa, creado_por, pdf=True):
+    comprobacion = ComprobacionFactory(
+        equipo=EquipoFactory(empresa=empresa),
+        fecha_comprobacion=date.today(),
+        creado_por=creado_por,
+        estado_aprobacion='pendiente',
+        datos_comprobacion={'puntos_medicion': [{'valor': 1.0}]},
+    )
+    if pdf:
+        comprobacion.comprobacion_pdf.save('comprobacion.pdf', ContentFile(b'%PDF-1.4 original'), save=True)
+    return comprobacion
+
+
+@pytest.fixture
+def comprobacion(empresa, tecnico):
+    return _comprobacion(empresa, tecnico)
+
+
+@pytest.fixture
+def cola_activa(settings):
+    settings.REGENERACION_PDF_CONFIG = COLA_ACTIVA
+
+
+def _aprobar(comprobacion):
+    comprobacion.estado_aprobacion = 'aprobado'
+    comprobacion.save(update_fields=['estado_aprobacion'])
+
+
+@pytest.mark.django_db
+class TestCola:
+
+    def test_sin_cola_se_regenera_en_linea(self, settings, comprobacion):
+        settings.REGENERACION_PDF_CONFIG = {'ACTIVO': False}
+        _aprobar(comprobacion)
+
+        with patch('core.render_pdf.renderizar_pdf', return_value=b'%PDF-1.4 aprobado'):
+            trabajo = regeneracion_pdf.solicitar('comprobacion', comprobacion)
+
+        assert trabajo.estado == 'completado'
+        comprobacion.refresh_from_db()
+        with comprobacion.comprobacion_pdf.open('rb') as archivo:
+            assert archivo.read() == b'%PDF-1.4 aprobado'
+
+    def test_con_cola_solo_encola_y_no_duplica(self, cola_activa, comprobacion):
+        _aprobar(comprobacion)
+
+        with patch('core.regeneracion_pdf._regenerar') as regenerar:
+            primero = regeneracion_pdf.solicitar('comprobacion', comprobacion)
+            segundo = regeneracion_pdf.solicitar('comprobacion', comprobacion)
+
+        regenerar.assert_not_called()
+        assert primero.pk == segundo.pk and primero.estado == 'pendiente'
+        assert primero.empresa_id == comprobacion.equipo.empresa_id
+
+    def test_drenar_procesa_y_omite_los_ya_no_aprobados(self, cola_activa, empresa, tecnico):
+        aprobadas = [_comprobacion(empresa, tecnico) for _ in range(3)]
+        for comprobacion in aprobadas:
+            _aprobar(comprobacion)
+            regeneracion_pdf.encolar('comprobacion', comprobacion)
+        rechazada = aprobadas[-1]
+        rechazada.estado_aprobacion = 'rechazado'
+        rechazada.save(update_fields=['estado_aprobacion'])
+
+        with patch('core.regeneracion_pdf._regenerar') as regenerar:
+            resultados = regeneracion_pdf.drenar()
+
+        assert resultados == {'completado': 2, 'omitido': 1, 'pendiente': 0, 'fallido': 0}
+        assert regenerar.call_count == 2
+        assert not RegeneracionPDF.objects.filter(estado__in=regeneracion_pdf.ESTADOS_ACTIVOS).exists()
+
+    def test_fallo_reprograma_con_backoff_y_luego_falla(self, cola_activa, comprobacion):
+        _aprobar(comprobacion)
+        trabajo = regeneracion_pdf.encolar('comprobacion', comprobacion)
+
+        with patch('core.regeneracion_pdf._regenerar', side_effect=OSError('storage caído')):
+            assert regeneracion_pdf.drenar() == {'completado': 0, 'omitido': 0, 'pendiente': 1, 'fallido': 0}
+            trabajo.refresh_from_db()
+            assert trabajo.proximo_intento > timezone.now() + timedelta(seconds=50)
+            assert 'storage caído' in trabajo.ultimo_error
+
+            # Aún no vence su próximo intento
+            assert not any(regeneracion_pdf.drenar().values())
+
+            RegeneracionPDF.objects.filter(pk=trabajo.pk).update(proximo_intento=timezone.now())
+            assert regeneracion_pdf.drenar()['fallido'] == 1
+
+        trabajo.refresh_from_db()
+        assert (trabajo.estado, trabajo.intentos) == ('fallido', 2)
+
+    def test_lease_vencido_vuelve_a_la_cola(self, cola_activa, comprobacion):
+        _aprobar(comprobacion)
+        regeneracion_pdf.encolar('comprobacion', comprobacion)
+        (trabajo,) = regeneracion_pdf.reclamar_lote('muerto:1:0', 5)
+        assert regeneracion_pdf.reclamar_lote('otro:2:0', 5) == []
+
+        RegeneracionPDF.objects.filter(pk=trabajo.pk).update(lease_expira=timezone.now() - timedelta(seconds=1))
+        with patch('core.regeneracion_pdf._regenerar'):
+            assert regeneracion_pdf.drenar()['completado'] == 1
+
+
+@pytest.mark.django_db
+class TestVistas:
+
+    def test_aprobar_con_cola_responde_sin_renderizar(self, cola_activa, client, aprobador, comprobacion):
+        client.force_login(aprobador)
+
+        with patch('core.render_pdf.renderizar_pdf') as renderizar:
+            response = client.post(reverse('core:aprobar_comprobacion', args=[comprobacion.pk]))
+
+        assert response.status_code == 200
+        renderizar.assert_not_called()
+        regeneracion = response.json()['regeneracion']
+        assert regeneracion['estado'] == 'pendiente'
+        assert RegeneracionPDF.objects.get(pk=regeneracion['id']).tipo == 'comprobacion'
+
+    def test_aprobar_seleccionados(self, cola_activa, client, empresa, aprobador, tecnico):
+        pendiente = _comprobacion(empresa, tecnico)
+        propia = _comprobacion(empresa, aprobador)
+        ajena = _comprobacion(EmpresaFactory(), tecnico)
+        sin_pdf = _comprobacion(empresa, tecnico, pdf=False)
+        client.force_login(aprobador)
+
+        documentos = [{'tipo': 'comprobacion', 'id': c.pk} for c in (pendiente, propia, ajena, sin_pdf)]
+        documentos.append({'tipo': 'mantenimiento', 'id': pendiente.pk})
+        response = client.post(
+            reverse('core:aprobar_seleccionados'),
+            data=json.dumps({'documentos': documentos}),
+            content_type='application/json',
+        )
+
+        data = response.json()
+        assert response.status_code == 200 and data['aprobados'] == 1
+        errores = [r.get('error') for r in data['resultados']]
+        assert errores == [
+            None,
+            'No tienes permisos para aprobar este documento',
+            'Documento no encontrado',
+            'El documento no tiene PDF generado',
+            'Tipo de documento no soportado',
+        ]
+        pendiente.refresh_from_db()
+        assert pendiente.estado_aprobacion == 'aprobado' and pendiente.aprobado_por == aprobador
+        assert RegeneracionPDF.objects.filter(estado='pendiente').count() == 1
+
+    def test_aprobar_seleccionados_respeta_el_maximo(self, settings, client, aprobador, comprobacion):
+        settings.REGENERACION_PDF_CONFIG = {'MAX_LOTE_APROBACION': 1}
+        client.force_login(aprobador)
+
+        response = client.post(
+            reverse('core:aprobar_seleccionados'),
+            data=json.dumps({'documentos': [{'tipo': 'comprobacion', 'id': comprobacion.pk}] * 2}),
+            content_type='application/json',
+        )
+
+        assert response.status_code == 400
+        comprobacion.refresh_from_db()
+        assert comprobacion.estado_aprobacion == 'pendiente'
+
+    def test_sin_cola_la_aprobacion_en_bloque_se_limita(self, settings, client, aprobador, comprobacion):
+        settings.REGENERACION_PDF_CONFIG = {'ACTIVO': False, 'MAX_LOTE_EN_LINEA': 1}
+        client.force_login(aprobador)
+
+        with patch('core.render_pdf.renderizar_pdf') as renderizar:
+            response = client.post(
+                reverse('core:aprobar_seleccionados'),
+                data=json.dumps({'documentos': [{'tipo': 'comprobacion', 'id': comprobacion.pk}] * 2}),
+                content_type='application/json',
+            )
+
+        assert response.status_code == 400 and 'como máximo 1' in response.json()['error']
+        renderizar.assert_not_called()
+
+    def test_estado_solo_de_la_propia_empresa(self, cola_activa, client, aprobador, comprobacion, tecnico):
+        _aprobar(comprobacion)
+        propio = regeneracion_pdf.encolar('comprobacion', comprobacion)
+        otra = _comprobacion(EmpresaFactory(), tecnico)
+        _aprobar(otra)
+        ajeno = regeneracion_pdf.encolar('comprobacion', otra)
+        client.force_login(aprobador)
+
+        data = client.get(reverse('core:estado_regeneraciones'), {'ids': f'{propio.pk},{ajeno.pk},x'}).json()
+
+        assert [t['id'] for t in data['trabajos']] == [propio.pk]
+        assert data['en_curso'] == 1
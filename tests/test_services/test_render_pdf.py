@@ -0,0 +1,120 @@
+"""
+Tests para el servicio de render de PDFs (core/render_pdf.py): resolución
+local de recursos, CSS precompilado y FontConfiguration compartido.
+"""
+from unittest.mock import patch
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+from core import render_pdf
+
+HTML_PLANTILLA = '<html><head><style>body { color: red; }</style></head><body>%s</body></html>'
+
+
+class StorageBucketFalso:
+    """Storage con los atributos de un S3Storage apuntando a R2; lee de disco."""
+
+    bucket_name = 'sam-media'
+    bucket = object()
+    endpoint_url = 'https://cuenta.r2.cloudflarestorage.com'
+    custom_domain = None
+    location = 'media'
+
+    def __init__(self, raiz):
+        self.local = FileSystemStorage(location=raiz)
+
+    def open(self, name, mode='rb'):
+        return self.local.open(name, mode)
+
+
+@pytest.fixture(autouse=True)
+def limpiar():
+    render_pdf.reiniciar()
+    yield
+    render_pdf.reiniciar()
+
+
+@pytest.fixture
+def media(tmp_path, settings):
+    settings.MEDIA_URL = '/media/'
+    storage = FileSystemStorage(location=tmp_path)
+    storage.save('empresas/logo.png', ContentFile(b'PNG'))
+    return storage
+
+
+class TestRecursosLocales:
+
+    def test_media_del_sitio_se_lee_del_storage(self, media, settings):
+        settings.ALLOWED_HOSTS = ['app.sammetrologia.com']
+
+        for url in ('/media/empresas/logo.png',
+                    'http://localhost/media/empresas/logo.png',
+                    'https://app.sammetrologia.com/media/empresas/logo.png'):
+            assert render_pdf.leer_recurso_local(url, media) == (b'PNG', 'image/png')
+
+    def test_urls_externas_y_data_quedan_para_weasyprint(self, media):
+        assert render_pdf.leer_recurso_local('https://otro.example/media/empresas/logo.png', media) is None
+        assert render_pdf.leer_recurso_local('data:image/png;base64,AAAA', media) is None
+
+    def test_archivo_inexistente_no_cae_a_http(self, media):
+        with pytest.raises(FileNotFoundError):
+            render_pdf.leer_recurso_local('/media/empresas/otro.png', media)
+
+    def test_url_firmada_del_bucket_se_lee_por_nombre(self, tmp_path):
+        storage = StorageBucketFalso(tmp_path)
+        storage.local.save('empresas/logo.png', ContentFile(b'PNG'))
+        url = ('https://cuenta.r2.cloudflarestorage.com/sam-media/media/empresas/logo.png'
+               '?X-Amz-Signature=abc&X-Amz-Expires=7200')
+
+        assert render_pdf.leer_recurso_local(url, storage) == (b'PNG', 'image/png')
+
+    def test_estaticos(self, settings, tmp_path):
+        (tmp_path / 'img').mkdir()
+        (tmp_path / 'img' / 'sello.png').write_bytes(b'SELLO')
+        settings.STATIC_URL = 'static/'
+        settings.STATIC_ROOT = str(tmp_path)
+
+        assert render_pdf.leer_recurso_local('/static/img/sello.png') == (b'SELLO', 'image/png')
+
+
+class TestRender:
+
+    def test_css_y_fuentes_se_crean_una_vez_por_proceso(self):
+        with patch('weasyprint.HTML') as mock_html, \
+             patch('weasyprint.CSS') as mock_css, \
+             patch('weasyprint.text.fonts.FontConfiguration') as mock_fonts:
+            mock_html.return_value.write_pdf.return_value = b'%PDF'
+
+            pdfs = [render_pdf.renderizar_pdf(HTML_PLANTILLA % i) for i in range(3)]
+
+        assert pdfs == [b'%PDF'] * 3
+        assert mock_css.call_count == 1
+        assert mock_fonts.call_count == 1
+        html_enviado = mock_html.call_args.kwargs['string']
+        assert '<style>' not in html_enviado and '<body>2</body>' in html_enviado
+        opciones = mock_html.return_value.write_pdf.call_args.kwargs
+        assert opciones['stylesheets'] == [mock_css.return_value]
+        assert opciones['font_config'] is mock_fonts.return_value
+
+    def test_sin_cache_de_css_deja_el_html_intacto(self, settings):
+        settings.PDF_RENDER_CONFIG = {'ACTIVO': False}
+
+        with patch('weasyprint.HTML') as mock_html, patch('weasyprint.CSS') as mock_css:
+            render_pdf.renderizar_pdf(HTML_PLANTILLA % '')
+
+        assert mock_css.call_count == 0
+        assert mock_html.call_args.kwargs['string'] == HTML_PLANTILLA % ''
+
+    def test_precalentar_parsea_las_plantillas_de_pdf(self):
+        with patch('weasyprint.CSS') as mock_css, patch('weasyprint.text.fonts.FontConfiguration'):
+            render_pdf.precalentar()
+            precalentadas = mock_css.call_count
+
+            with patch('weasyprint.HTML'):
+                from django.template.loader import get_template
+                render_pdf.renderizar_pdf(get_template('core/mantenimiento_print.html').template.source)
+
+        assert precalentadas == len(render_pdf.PLANTILLAS_PDF)
+        assert mock_css.call_count == precalentadas
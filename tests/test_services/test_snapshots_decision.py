@@ -0,0 +1,134 @@
+"""
+Tests para los snapshots diarios del Panel de Decisiones (core/snapshots_decision.py).
+"""
+from datetime import date, timedelta
+
+import pytest
+from django.utils import timezone
+
+from core.models import Empresa, Equipo, SnapshotDecisionEmpresa
+from core.snapshots_decision import (
+    agregar_snapshots,
+    calcular_snapshot,
+    empresas_a_actualizar,
+    empresas_sin_snapshot,
+    historial_diario,
+    obtener_snapshots,
+)
+from tests.factories import EmpresaFactory, EquipoFactory
+
+HOY = date(2025, 6, 10)
+
+
+def _equipo(empresa, estado='Activo', **proximas):
+    """Equipo con fechas próximas fijas (save() las recalcula desde el historial)."""
+    equipo = EquipoFactory(empresa=empresa, estado=estado)
+    Equipo.objects.filter(pk=equipo.pk).update(**proximas)
+    return equipo
+
+
+def _vigente(dias):
+    return {
+        'proxima_calibracion': HOY + timedelta(days=dias),
+        'proximo_mantenimiento': HOY + timedelta(days=90),
+        'proxima_comprobacion': HOY + timedelta(days=90),
+    }
+
+
+def _empresa_con_equipos(vigentes=1, vencidos=0, inactivos=0):
+    empresa = EmpresaFactory()
+    for _ in range(vigentes):
+        _equipo(empresa, **_vigente(90))
+    for _ in range(vencidos):
+        _equipo(empresa, **_vigente(-3))
+    for _ in range(inactivos):
+        _equipo(empresa, estado='Inactivo')
+    return empresa
+
+
+@pytest.mark.django_db
+class TestCalculoYLectura:
+
+    def test_lectura_en_consultas_constantes(self, django_assert_max_num_queries):
+        for _ in range(3):
+            calcular_snapshot(_empresa_con_equipos(), HOY)
+
+        with django_assert_max_num_queries(2):
+            snapshots = obtener_snapshots(Empresa.objects.filter(is_deleted=False))
+            agregar_snapshots(snapshots, HOY)
+
+        assert len(snapshots) == 3
+
+    def test_empresa_sin_snapshot_queda_pendiente_sin_calcular(self):
+        empresa = _empresa_con_equipos(vigentes=2)
+        calcular_snapshot(_empresa_con_equipos(), HOY)
+        empresas = Empresa.objects.all()
+
+        snapshots = obtener_snapshots(empresas)
+
+        assert empresa.pk not in [s.empresa_id for s in snapshots]
+        assert empresas_sin_snapshot(empresas, snapshots) == [empresa.nombre]
+        assert not SnapshotDecisionEmpresa.objects.filter(empresa=empresa).exists()
+
+    def test_se_lee_el_snapshot_mas_reciente(self):
+        empresa = _empresa_con_equipos()
+        calcular_snapshot(empresa, HOY - timedelta(days=1))
+        calcular_snapshot(empresa, HOY)
+
+        snapshots = obtener_snapshots(Empresa.objects.filter(pk=empresa.pk))
+
+        assert [s.fecha for s in snapshots] == [HOY]
+
+    def test_agregado_suma_pilares_de_todas_las_empresas(self):
+        calcular_snapshot(_empresa_con_equipos(vigentes=2, inactivos=1), HOY)
+        calcular_snapshot(_empresa_con_equipos(vigentes=1, vencidos=1), HOY)
+
+        consolidado = agregar_snapshots(obtener_snapshots(Empresa.objects.all()), HOY)
+
+        assert consolidado['salud_agregada']['total_equipos_salud'] == 4
+        assert consolidado['eficiencia_agregada'] == {'equipos_disponibles': 4, 'equipos_no_disponibles': 1}
+        assert consolidado['eficiencia_general_porcentaje'] == 80.0
+        assert [(i['tipo'], i['fecha'], i['dias_atraso']) for i in consolidado['items_vencidos']] == [
+            ('Calibración', HOY - timedelta(days=3), 3)
+        ]
+        assert consolidado['snapshots_hasta'] is not None
+
+    def test_actividades_criticas_se_reclasifican_al_leer(self):
+        empresa = EmpresaFactory()
+        _equipo(empresa, **_vigente(10))
+        snapshot = calcular_snapshot(empresa, HOY)
+
+        # Fuera de la ventana de urgencia el día del snapshot...
+        assert agregar_snapshots([snapshot], HOY)['items_urgentes'] == []
+        # ...urgente tres días después y vencida dos semanas después
+        urgentes = agregar_snapshots([snapshot], HOY + timedelta(days=3))['items_urgentes']
+        assert [i['dias_restantes'] for i in urgentes] == [7]
+        vencidos = agregar_snapshots([snapshot], HOY + timedelta(days=14))['items_vencidos']
+        assert [i['dias_atraso'] for i in vencidos] == [4]
+
+
+@pytest.mark.django_db
+class TestIncrementalEHistorial:
+
+    def test_incremental_solo_empresas_sin_snapshot_o_con_cambios(self):
+        con_snapshot = _empresa_con_equipos()
+        sin_snapshot = _empresa_con_equipos()
+        calcular_snapshot(con_snapshot, HOY)
+
+        assert list(empresas_a_actualizar(HOY, incremental=True)) == [sin_snapshot]
+
+        Empresa.objects.filter(pk=con_snapshot.pk).update(
+            stats_ultima_actualizacion=timezone.now() + timedelta(seconds=5)
+        )
+        assert set(empresas_a_actualizar(HOY, incremental=True)) == {con_snapshot, sin_snapshot}
+        assert empresas_a_actualizar(HOY).count() == 2
+
+    def test_historial_diario_por_fecha(self):
+        empresa = _empresa_con_equipos(vigentes=1, vencidos=1)
+        for dias in (2, 1, 0):
+            calcular_snapshot(empresa, HOY - timedelta(days=dias))
+
+        historial = historial_diario(Empresa.objects.all(), HOY, dias=2)
+
+        assert [d['fecha'] for d in historial] == [HOY - timedelta(days=1), HOY]
+        assert all(d['empresas'] == 1 and d['eficiencia'] == 100.0 for d in historial)
@@ -0,0 +1,205 @@
+"""
+Tests para el ledger de almacenamiento (core/storage_ledger.py).
+"""
+import pytest
+from unittest.mock import patch
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.utils import timezone
+
+from core.models import Equipo, Calibracion, RegistroAlmacenamiento
+from core.storage_ledger import (
+    guardar_archivo_generado,
+    registrar_archivo,
+    eliminar_registros,
+    uso_total_bytes,
+    rutas_referenciadas,
+    reconciliar_almacenamiento,
+)
+
+MB = 1024 * 1024
+
+
+def _make_equipo(empresa, codigo='EQ-001', **kwargs):
+    return Equipo.objects.create(
+        empresa=empresa,
+        codigo_interno=codigo,
+        nombre='Equipo Test',
+        tipo_equipo='Equipo de Medición',
+        estado='Activo',
+        **kwargs,
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.services
+class TestLedgerRegistro:
+
+    def test_registrar_y_sumar(self, empresa_factory):
+        empresa = empresa_factory()
+        registrar_archivo(empresa, 'pdfs/a.pdf', 2 * MB)
+        registrar_archivo(empresa, 'pdfs/b.pdf', 1 * MB)
+
+        assert uso_total_bytes(empresa) == 3 * MB
+
+    def test_registrar_misma_ruta_actualiza_tamano(self, empresa_factory):
+        empresa = empresa_factory()
+        registrar_archivo(empresa, 'pdfs/a.pdf', 2 * MB)
+        registrar_archivo(empresa, 'pdfs/a.pdf', 5 * MB)
+
+        assert RegistroAlmacenamiento.objects.filter(empresa=empresa).count() == 1
+        assert uso_total_bytes(empresa) == 5 * MB
+
+    def test_eliminar_registros(self, empresa_factory):
+        empresa = empresa_factory()
+        registrar_archivo(empresa, 'pdfs/a.pdf', 2 * MB)
+        registrar_archivo(empresa, 'pdfs/b.pdf', 1 * MB)
+
+        eliminar_registros(empresa, ['pdfs/a.pdf'])
+
+        assert uso_total_bytes(empresa) == 1 * MB
+
+    def test_ledgers_aislados_por_empresa(self, empresa_factory):
+        empresa_a = empresa_factory()
+        empresa_b = empresa_factory()
+        registrar_archivo(empresa_a, 'pdfs/a.pdf', 2 * MB)
+
+        assert uso_total_bytes(empresa_b) == 0
+
+    def test_borrar_actividad_limpia_ledger(self, empresa_factory):
+        empresa = empresa_factory()
+        equipo = _make_equipo(empresa)
+        cal = Calibracion.objects.create(
+            equipo=equipo, fecha_calibracion=timezone.now().date(),
+            resultado='Aprobado', documento_calibracion='pdfs/cert.pdf',
+        )
+        registrar_archivo(empresa, 'pdfs/cert.pdf', 3 * MB)
+
+        cal.delete()
+
+        assert uso_total_bytes(empresa) == 0
+
+    def test_reemplazar_adjunto_quita_el_anterior_y_registra_el_nombre_guardado(self, empresa_factory):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from core.views.activities import _process_calibracion_files
+
+        empresa = empresa_factory()
+        cal = Calibracion.objects.create(
+            equipo=_make_equipo(empresa), fecha_calibracion=timezone.now().date(),
+            resultado='Aprobado', documento_calibracion='pdfs/cert.pdf',
+        )
+        registrar_archivo(empresa, 'pdfs/cert.pdf', 3 * MB)
+        nuevo = SimpleUploadedFile('cert.pdf', b'%PDF' * 10, content_type='application/pdf')
+
+        with patch('core.views.activities.default_storage') as storage:
+            # El storage renombra para no sobrescribir el existente
+            storage.save.return_value = 'pdfs/cert_a1b2c3.pdf'
+            _process_calibracion_files(cal, {'documento_calibracion': nuevo})
+
+        assert cal.documento_calibracion.name == 'pdfs/cert_a1b2c3.pdf'
+        assert list(RegistroAlmacenamiento.objects.filter(empresa=empresa).values_list('ruta', 'tamaño_bytes')) == [
+            ('pdfs/cert_a1b2c3.pdf', 40)
+        ]
+
+
+@pytest.mark.django_db
+@pytest.mark.services
+class TestStorageUsadoConLedger:
+
+    def test_empresa_sincronizada_usa_sum_del_ledger(self, empresa_factory):
+        empresa = empresa_factory()
+        empresa.storage_ledger_sincronizado = timezone.now()
+        empresa.save(update_fields=['storage_ledger_sincronizado'])
+        registrar_archivo(empresa, 'pdfs/a.pdf', 3 * MB)
+
+        with patch('django.core.files.storage.default_storage.size') as mock_size:
+            assert empresa.get_total_storage_used_mb() == 3.0
+            mock_size.assert_not_called()
+
+    def test_registrar_invalida_cache_de_uso(self, empresa_factory):
+        empresa = empresa_factory()
+        empresa.storage_ledger_sincronizado = timezone.now()
+        empresa.save(update_fields=['storage_ledger_sincronizado'])
+
+        assert empresa.get_total_storage_used_mb() == 0
+        registrar_archivo(empresa, 'pdfs/a.pdf', 2 * MB)
+        assert empresa.get_total_storage_used_mb() == 2.0
+
+    def test_pdf_generado_reemplaza_el_anterior_en_el_ledger(self, empresa_factory, tmp_path):
+        empresa = empresa_factory()
+        cal = Calibracion.objects.create(
+            equipo=_make_equipo(empresa), fecha_calibracion=timezone.now().date(),
+            resultado='Aprobado', confirmacion_metrologica_pdf='pdfs/viejo.pdf',
+        )
+        registrar_archivo(empresa, 'pdfs/viejo.pdf', 3 * MB)
+        campo = Calibracion._meta.get_field('confirmacion_metrologica_pdf')
+
+        with patch.object(campo, 'storage', FileSystemStorage(location=str(tmp_path))):
+            guardar_archivo_generado(cal, 'confirmacion_metrologica_pdf', 'confirmacion.pdf', b'%PDF' * 5)
+
+        assert list(RegistroAlmacenamiento.objects.filter(empresa=empresa).values_list('ruta', 'tamaño_bytes')) == [
+            (cal.confirmacion_metrologica_pdf.name, 20)
+        ]
+        assert cal.confirmacion_metrologica_pdf.name != 'pdfs/viejo.pdf'
+
+
+@pytest.mark.django_db
+@pytest.mark.services
+class TestReconciliacion:
+
+    @pytest.fixture
+    def storage(self, tmp_path):
+        storage = FileSystemStorage(location=str(tmp_path))
+        storage.save('pdfs/manual.pdf', ContentFile(b'x' * 1000))
+        storage.save('pdfs/cert.pdf', ContentFile(b'x' * 500))
+        storage.save('pdfs/huerfano.pdf', ContentFile(b'x' * 9999))
+        return storage
+
+    def test_rutas_referenciadas(self, empresa_factory):
+        empresa = empresa_factory()
+        equipo = _make_equipo(empresa, manual_pdf='pdfs/manual.pdf')
+        Calibracion.objects.create(
+            equipo=equipo, fecha_calibracion=timezone.now().date(),
+            resultado='Aprobado', documento_calibracion='pdfs/cert.pdf',
+        )
+
+        assert rutas_referenciadas(empresa) == {'pdfs/manual.pdf', 'pdfs/cert.pdf'}
+
+    def test_reconciliar_reconstruye_ledger(self, empresa_factory, storage):
+        empresa = empresa_factory()
+        equipo = _make_equipo(empresa, manual_pdf='pdfs/manual.pdf', ficha_tecnica_pdf='pdfs/no_existe.pdf')
+        Calibracion.objects.create(
+            equipo=equipo, fecha_calibracion=timezone.now().date(),
+            resultado='Aprobado', documento_calibracion='pdfs/cert.pdf',
+        )
+        registrar_archivo(empresa, 'pdfs/obsoleto.pdf', 50 * MB)
+
+        [resultado] = reconciliar_almacenamiento([empresa], storage=storage)
+
+        assert resultado['archivos'] == 2
+        assert resultado['faltantes'] == 1
+        assert resultado['bytes_nuevo'] == 1500
+        assert uso_total_bytes(empresa) == 1500
+        empresa.refresh_from_db()
+        assert empresa.storage_ledger_sincronizado is not None
+
+    def test_reconciliar_dry_run_no_modifica(self, empresa_factory, storage):
+        empresa = empresa_factory()
+        _make_equipo(empresa, manual_pdf='pdfs/manual.pdf')
+
+        reconciliar_almacenamiento([empresa], storage=storage, dry_run=True)
+
+        assert uso_total_bytes(empresa) == 0
+        empresa.refresh_from_db()
+        assert empresa.storage_ledger_sincronizado is None
+
+    def test_comando_reconciliar(self, empresa_factory, storage, capsys):
+        empresa = empresa_factory()
+        _make_equipo(empresa, manual_pdf='pdfs/manual.pdf')
+
+        with patch('core.storage_ledger.default_storage', storage):
+            call_command('reconciliar_almacenamiento', '--empresa-id', str(empresa.id))
+
+        assert uso_total_bytes(empresa) == 1000
+        assert '1 empresas reconciliadas' in capsys.readouterr().out
@@ -0,0 +1,111 @@
+"""
+Tests para la caché de URLs firmadas (core/urls_firmadas.py) y su uso en
+los template tags de archivos y el detalle de equipo.
+"""
+import pytest
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.test import Client
+from django.urls import reverse
+
+from core import urls_firmadas
+from core.models import Calibracion, Equipo
+from core.templatetags.file_tags import secure_file_url
+from tests.factories import CalibracionFactory, EmpresaFactory, EquipoFactory, UserFactory
+
+
+class StorageFirmadoFalso:
+    """Storage con ``bucket`` (como S3) que cuenta las firmas y prohíbe exists()."""
+
+    bucket = 'sam-test'
+
+    def __init__(self):
+        self.firmas = []
+
+    def url(self, name, expire=3600):
+        self.firmas.append((name, expire))
+        return f"https://r2.example/{name}?X-Amz-Expires={expire}&n={len(self.firmas)}"
+
+    def exists(self, name):
+        raise AssertionError('exists() no debe llamarse al mostrar archivos')
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    falso = StorageFirmadoFalso()
+    for modulo in ('core.urls_firmadas', 'core.templatetags.file_tags', 'core.views.base', 'core.views.equipment'):
+        monkeypatch.setattr(f'{modulo}.default_storage', falso)
+    urls_firmadas.limpiar_memoria()
+    cache.clear()
+    yield falso
+    urls_firmadas.limpiar_memoria()
+
+
+class TestBroker:
+
+    def test_reutiliza_la_firma_en_memoria_y_entre_procesos(self, storage):
+        primera = urls_firmadas.url_firmada('equipos/manual.pdf')
+        assert urls_firmadas.url_firmada('equipos/manual.pdf') == primera
+
+        # Otro worker: sin memoria local, pero con la caché compartida
+        urls_firmadas.limpiar_memoria()
+        assert urls_firmadas.url_firmada('equipos/manual.pdf') == primera
+        assert storage.firmas == [('equipos/manual.pdf', 3600)]
+
+    def test_firma_en_lote_solo_lo_que_falta(self, storage):
+        urls_firmadas.url_firmada('a.pdf')
+
+        urls = urls_firmadas.urls_firmadas(['a.pdf', 'b.pdf', 'c.pdf', 'b.pdf', None])
+
+        assert set(urls) == {'a.pdf', 'b.pdf', 'c.pdf'}
+        assert [nombre for nombre, _ in storage.firmas] == ['a.pdf', 'b.pdf', 'c.pdf']
+
+    def test_cada_expiracion_tiene_su_firma(self, storage):
+        urls_firmadas.url_firmada('a.pdf', 3600)
+        urls_firmadas.url_firmada('a.pdf', 7200)
+
+        assert storage.firmas == [('a.pdf', 3600), ('a.pdf', 7200)]
+
+    def test_expiracion_menor_que_el_margen_no_se_cachea(self, storage):
+        urls_firmadas.url_firmada('a.pdf', 60)
+        urls_firmadas.url_firmada('a.pdf', 60)
+
+        assert len(storage.firmas) == 2
+
+    def test_almacenamiento_local_no_firma(self, tmp_path):
+        local = FileSystemStorage(location=tmp_path, base_url='/media/')
+
+        assert urls_firmadas.url_firmada('a.pdf', storage=local) == '/media/a.pdf'
+
+    @pytest.mark.django_db
+    def test_template_tag_usa_la_cache(self, storage):
+        calibracion = CalibracionFactory()
+        Calibracion.objects.filter(pk=calibracion.pk).update(documento_calibracion='calibraciones/cert.pdf')
+        calibracion.refresh_from_db()
+
+        urls_firmadas.precargar([calibracion])
+        url = secure_file_url(calibracion.documento_calibracion)
+
+        assert url.startswith('https://r2.example/calibraciones/cert.pdf')
+        assert len(storage.firmas) == 1
+
+
+@pytest.mark.django_db
+def test_detalle_equipo_sin_llamadas_al_storage_con_cache_caliente(storage):
+    empresa = EmpresaFactory()
+    equipo = EquipoFactory(empresa=empresa, estado='De Baja')
+    Equipo.objects.filter(pk=equipo.pk).update(manual_pdf='equipos/manual.pdf', ficha_tecnica_pdf='equipos/ficha.pdf')
+    calibracion = CalibracionFactory(equipo=equipo)
+    Calibracion.objects.filter(pk=calibracion.pk).update(documento_calibracion='calibraciones/cert.pdf')
+    client = Client()
+    client.force_login(UserFactory(empresa=empresa, rol_usuario='ADMINISTRADOR'))
+
+    response = client.get(reverse('core:detalle_equipo', args=[equipo.pk]))
+    assert response.status_code == 200
+    assert 'https://r2.example/calibraciones/cert.pdf' in response.content.decode()
+    firmas_en_frio = len(storage.firmas)
+
+    client.get(reverse('core:detalle_equipo', args=[equipo.pk]))
+
+    assert firmas_en_frio == 3
+    assert len(storage.firmas) == firmas_en_frio
@@ -0,0 +1,149 @@
+"""
+Tests para la cola de recálculo de stats del dashboard (core/stats_queue.py).
+"""
+import pytest
+from datetime import date, timedelta
+from django.core.management import call_command
+from django.utils import timezone
+
+from core.models import Empresa, Equipo, Calibracion
+from core.stats_queue import (
+    diferir_recalculo_stats,
+    procesar_empresas_pendientes,
+)
+
+
+def _make_equipo(empresa, codigo):
+    return Equipo.objects.create(
+        empresa=empresa,
+        codigo_interno=codigo,
+        nombre='Equipo Test',
+        tipo_equipo='Equipo de Medición',
+        estado='Activo',
+    )
+
+
+@pytest.fixture
+def contar_recalculos(monkeypatch):
+    """Sustituye el recálculo real por un registro de llamadas (ids de empresa)."""
+    llamadas = []
+
+    def _spy(self):
+        llamadas.append(self.id)
+
+    monkeypatch.setattr(Empresa, 'recalcular_stats_dashboard', _spy)
+    return llamadas
+
+
+@pytest.fixture
+def modo_diferido(settings):
+    settings.STATS_RECALC_CONFIG = {'DIFERIDO': True, 'DEBOUNCE_SECONDS': 0}
+
+
+@pytest.fixture
+def modo_inmediato(settings):
+    settings.STATS_RECALC_CONFIG = {'DIFERIDO': False}
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+@pytest.mark.usefixtures('modo_inmediato')
+class TestDiferirRecalculoStats:
+
+    def test_operacion_masiva_recalcula_una_vez_por_empresa(self, empresa_factory, contar_recalculos):
+        empresa = empresa_factory()
+
+        with diferir_recalculo_stats():
+            for i in range(5):
+                equipo = _make_equipo(empresa, f'EQ-{i:03d}')
+                Calibracion.objects.create(
+                    equipo=equipo, fecha_calibracion=date.today(), resultado='Aprobado'
+                )
+            assert contar_recalculos == []
+
+        assert contar_recalculos == [empresa.id]
+
+    def test_bloques_anidados_se_integran_en_el_externo(self, empresa_factory, contar_recalculos):
+        empresa = empresa_factory()
+
+        with diferir_recalculo_stats():
+            with diferir_recalculo_stats():
+                _make_equipo(empresa, 'EQ-001')
+            assert contar_recalculos == []
+            _make_equipo(empresa, 'EQ-002')
+
+        assert contar_recalculos == [empresa.id]
+
+    def test_fuera_del_bloque_sigue_siendo_inmediato(self, empresa_factory, contar_recalculos):
+        empresa = empresa_factory()
+        _make_equipo(empresa, 'EQ-001')
+        _make_equipo(empresa, 'EQ-002')
+        assert len(contar_recalculos) >= 2
+        assert set(contar_recalculos) == {empresa.id}
+
+
+@pytest.mark.django_db
+@pytest.mark.unit
+class TestModoDiferido:
+
+    def test_senal_solo_marca_empresa_una_vez_por_transaccion(
+        self, empresa_factory, contar_recalculos, modo_diferido, django_capture_on_commit_callbacks
+    ):
+        empresa = empresa_factory()
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            for i in range(10):
+                _make_equipo(empresa, f'EQ-{i:03d}')
+
+        assert len(callbacks) == 1
+        assert contar_recalculos == []
+        empresa.refresh_from_db()
+        assert empresa.stats_pendiente_desde is not None
+
+    def test_worker_recalcula_y_limpia_marca(self, empresa_factory, contar_recalculos, modo_diferido):
+        empresa = empresa_factory()
+        _make_equipo(empresa, 'EQ-001')
+        Empresa.objects.filter(id=empresa.id).update(stats_pendiente_desde=timezone.now())
+
+        resultado = procesar_empresas_pendientes(debounce=0)
+
+        assert resultado == {'procesadas': 1, 'errores': 0}
+        assert contar_recalculos == [empresa.id]
+        empresa.refresh_from_db()
+        assert empresa.stats_pendiente_desde is None
+
+    def test_worker_respeta_ventana_debounce(self, empresa_factory, contar_recalculos):
+        empresa = empresa_factory()
+        Empresa.objects.filter(id=empresa.id).update(stats_pendiente_desde=timezone.now())
+
+        resultado = procesar_empresas_pendientes(debounce=60)
+
+        assert resultado['procesadas'] == 0
+        empresa.refresh_from_db()
+        assert empresa.stats_pendiente_desde is not None
+
+    def test_error_en_recalculo_reencola_empresa(self, empresa_factory, monkeypatch):
+        empresa = empresa_factory()
+        Empresa.objects.filter(id=empresa.id).update(
+            stats_pendiente_desde=timezone.now() - timedelta(minutes=5)
+        )
+
+        def _raise(self):
+            raise RuntimeError("Error simulado")
+
+        monkeypatch.setattr(Empresa, 'recalcular_stats_dashboard', _raise)
+
+        resultado = procesar_empresas_pendientes(debounce=0)
+
+        assert resultado == {'procesadas': 0, 'errores': 1}
+        empresa.refresh_from_db()
+        assert empresa.stats_pendiente_desde is not None
+
+    def test_comando_procesa_cola(self, empresa_factory, contar_recalculos, capsys):
+        empresa = empresa_factory()
+        Empresa.objects.filter(id=empresa.id).update(stats_pendiente_desde=timezone.now())
+
+        call_command('procesar_stats_pendientes', '--debounce', '0')
+
+        assert contar_recalculos == [empresa.id]
+        assert '1 empresas recalculadas' in capsys.readouterr().out
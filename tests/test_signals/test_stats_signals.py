@@ -16,6 +16,12 @@ def _make_equipo(empresa, estado='Activo'):
     )
 
 
+@pytest.fixture(autouse=True)
+def modo_inmediato(settings):
+    """Estas pruebas cubren el recálculo síncrono; el diferido está en test_stats_queue.py."""
+    settings.STATS_RECALC_CONFIG = {'DIFERIDO': False}
+
+
 @pytest.mark.django_db
 @pytest.mark.unit
 class TestStatsSignals:
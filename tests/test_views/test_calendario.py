@@ -17,6 +17,11 @@ from core.models import (
 )
 
 
+def _ical(response):
+    """Contenido del .ics (la exportación se envía en streaming)."""
+    return b''.join(response.streaming_content).decode('utf-8')
+
+
 # ============================================================================
 # Fixtures
 # ============================================================================
@@ -526,7 +531,7 @@ class TestCalendarioExportarICal:
     def test_formato_vcalendar_valido(self, user_client, equipo_activo):
         url = reverse('core:calendario_exportar_ical')
         response = user_client.get(url)
-        content = response.content.decode('utf-8')
+        content = _ical(response)
         assert content.startswith('BEGIN:VCALENDAR')
         assert 'END:VCALENDAR' in content
         assert 'VERSION:2.0' in content
@@ -534,28 +539,28 @@ class TestCalendarioExportarICal:
     def test_contiene_eventos_programados(self, user_client, equipo_activo):
         url = reverse('core:calendario_exportar_ical')
         response = user_client.get(url)
-        content = response.content.decode('utf-8')
+        content = _ical(response)
         assert 'BEGIN:VEVENT' in content
         assert equipo_activo.nombre in content
 
     def test_excluye_equipos_inactivos(self, user_client, equipo_activo, equipo_inactivo):
         url = reverse('core:calendario_exportar_ical')
         response = user_client.get(url)
-        content = response.content.decode('utf-8')
+        content = _ical(response)
         assert equipo_activo.nombre in content
         assert equipo_inactivo.nombre not in content
 
     def test_excluye_equipos_de_baja(self, user_client, equipo_activo, equipo_de_baja):
         url = reverse('core:calendario_exportar_ical')
         response = user_client.get(url)
-        content = response.content.decode('utf-8')
+        content = _ical(response)
         assert equipo_activo.nombre in content
         assert equipo_de_baja.nombre not in content
 
     def test_filtro_tipo_calibracion(self, user_client, equipo_activo):
         url = reverse('core:calendario_exportar_ical')
         response = user_client.get(url, {'tipo': 'calibracion'})
-        content = response.content.decode('utf-8')
+        content = _ical(response)
         assert 'Calibración' in content
         assert 'Mantenimiento' not in content
         assert 'Comprobación' not in content
@@ -563,20 +568,20 @@ class TestCalendarioExportarICal:
     def test_filtro_tipo_mantenimiento(self, user_client, equipo_activo):
         url = reverse('core:calendario_exportar_ical')
         response = user_client.get(url, {'tipo': 'mantenimiento'})
-        content = response.content.decode('utf-8')
+        content = _ical(response)
         assert 'Mantenimiento' in content
         assert 'Calibración' not in content
 
     def test_filtro_responsable(self, user_client, equipo_activo):
         url = reverse('core:calendario_exportar_ical')
         response = user_client.get(url, {'responsable': 'Juan Perez'})
-        content = response.content.decode('utf-8')
+        content = _ical(response)
         assert equipo_activo.nombre in content
 
     def test_filtro_responsable_inexistente(self, user_client, equipo_activo):
         url = reverse('core:calendario_exportar_ical')
         response = user_client.get(url, {'responsable': 'Nadie Existe'})
-        content = response.content.decode('utf-8')
+        content = _ical(response)
         assert 'BEGIN:VEVENT' not in content
 
     def test_multitenancy_no_exporta_otra_empresa(
@@ -584,20 +589,20 @@ class TestCalendarioExportarICal:
     ):
         url = reverse('core:calendario_exportar_ical')
         response = user_client.get(url)
-        content = response.content.decode('utf-8')
+        content = _ical(response)
         assert equipo_activo.nombre in content
         assert equipo_otra_empresa.nombre not in content
 
     def test_evento_tiene_uid(self, user_client, equipo_activo):
         url = reverse('core:calendario_exportar_ical')
         response = user_client.get(url)
-        content = response.content.decode('utf-8')
+        content = _ical(response)
         assert 'UID:' in content
 
     def test_evento_tiene_dtstart(self, user_client, equipo_activo):
         url = reverse('core:calendario_exportar_ical')
         response = user_client.get(url)
-        content = response.content.decode('utf-8')
+        content = _ical(response)
         assert 'DTSTART;VALUE=DATE:' in content
 
     def test_equipo_sin_fechas_programadas_no_genera_eventos(self, user_client, empresa):
@@ -610,7 +615,7 @@ class TestCalendarioExportarICal:
         )
         url = reverse('core:calendario_exportar_ical')
         response = user_client.get(url)
-        content = response.content.decode('utf-8')
+        content = _ical(response)
         assert 'Equipo Sin Fechas' not in content
 
 
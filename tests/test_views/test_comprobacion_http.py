@@ -537,7 +537,7 @@ class TestGenerarPdfComprobacion:
         settings.MEDIA_ROOT = str(tmp_path)
 
         with patch('core.views.comprobacion.render_to_string', return_value='<html></html>'):
-            with patch('core.views.comprobacion.HTML') as mock_html_cls:
+            with patch('weasyprint.HTML') as mock_html_cls:
                 mock_html_cls.return_value.write_pdf.return_value = b'%PDF-1.4 fake'
                 url = reverse(self.URL_NAME, args=[equipo.pk])
                 response = auth_client.get(url, {'comprobacion_id': str(comprobacion.pk)})
@@ -561,7 +561,7 @@ class TestGenerarPdfComprobacion:
         })
 
         with patch('core.views.comprobacion.render_to_string', return_value='<html></html>'):
-            with patch('core.views.comprobacion.HTML') as mock_html_cls:
+            with patch('weasyprint.HTML') as mock_html_cls:
                 mock_html_cls.return_value.write_pdf.return_value = b'%PDF-1.4 from post'
                 url = reverse(self.URL_NAME, args=[equipo.pk])
                 response = auth_client.post(
@@ -593,7 +593,7 @@ class TestGenerarPdfComprobacion:
         settings.MEDIA_ROOT = str(tmp_path)
 
         with patch('core.views.comprobacion.render_to_string', return_value='<html></html>'):
-            with patch('core.views.comprobacion.HTML') as mock_html_cls:
+            with patch('weasyprint.HTML') as mock_html_cls:
                 mock_html_cls.return_value.write_pdf.return_value = b'%PDF-1.4 super'
                 url = reverse(self.URL_NAME, args=[equipo.pk])
                 response = super_client.get(url, {'comprobacion_id': str(comprobacion.pk)})
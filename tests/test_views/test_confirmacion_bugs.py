@@ -165,6 +165,11 @@ class TestGraficaEnAprobacionV2:
     en formato v2 (multi-magnitud). Solo el formato v1 era detectado.
     """
 
+    @pytest.fixture(autouse=True)
+    def regeneracion_en_linea(self, settings):
+        """Estos tests revisan el PDF renderizado dentro de la aprobación (sin cola)."""
+        settings.REGENERACION_PDF_CONFIG = {'ACTIVO': False}
+
     def _datos_v2_guardados(self):
         """Simula los datos JSON guardados en BD después de generar el PDF v2."""
         return {
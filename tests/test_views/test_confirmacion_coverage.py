@@ -3,7 +3,7 @@ Tests de cobertura adicional para core/views/confirmacion.py.
 
 Complementa test_confirmacion_views.py apuntando a las líneas sin cubrir:
 - safe_float (41-46)
-- _generar_grafica_confirmacion (57-211)
+- _generar_grafica_confirmacion (respaldo matplotlib de core/graficas.py)
 - confirmacion_metrologica con datos de confirmación (505-644)
 - intervalos_calibracion con datos de confirmación (661-715)
 - guardar_confirmacion — ramas superuser y sin calibración (1336, 1343-1344)
@@ -165,13 +165,13 @@ class TestSafeFloat:
 # ---------------------------------------------------------------------------
 
 class TestGenerarGraficaConfirmacion:
-    """Cubre core/views/confirmacion.py líneas 57-211."""
+    """Cubre el backend matplotlib (respaldo) de core/graficas.py."""
 
     def setup_method(self):
         import matplotlib.pyplot as plt
         plt.close('all')  # Limpiar figuras de otros tests para evitar ResourceWarning
-        from core.views.confirmacion import _generar_grafica_confirmacion
-        self.generar = _generar_grafica_confirmacion
+        from core.graficas import grafica_confirmacion_png
+        self.generar = grafica_confirmacion_png
 
     def teardown_method(self):
         import matplotlib.pyplot as plt
@@ -256,8 +256,12 @@ class TestGenerarGraficaConfirmacion:
         assert result is not None
 
     def test_excepcion_interna_retorna_none(self):
-        """Línea 209-211: si matplotlib falla, retorna None."""
-        with patch('matplotlib.pyplot.subplots', side_effect=RuntimeError('mock fail')):
+        """Si fallan el SVG y el respaldo matplotlib, retorna None."""
+        from core import graficas
+        graficas.limpiar_memoria()
+        with patch('core.graficas.grafica_confirmacion_svg', side_effect=RuntimeError('svg fail')), \
+             patch('matplotlib.pyplot.subplots', side_effect=RuntimeError('mock fail')), \
+             patch('core.graficas.cache.get', return_value=None):
             from core.views import confirmacion as mod
             result = mod._generar_grafica_confirmacion(
                 [{'nominal': 1.0, 'error': 0.1}], 0.5, 'mm', 'mm'
@@ -279,7 +283,7 @@ class TestGenerarGraficaConfirmacion:
 
     def test_regla_guard_band_U(self):
         """Banda guarda U completa — zonas per-punto con fill_between (n>1)."""
-        from core.views.confirmacion import _generar_grafica_confirmacion
+        from core.graficas import grafica_confirmacion_png as _generar_grafica_confirmacion
         fake_png = b'\x89PNG\r\n\x1a\n' + b'\x00' * 100
         mock_ax = MagicMock()
         mock_fig = MagicMock()
@@ -297,7 +301,7 @@ class TestGenerarGraficaConfirmacion:
 
     def test_regla_guard_band_half(self):
         """Banda guarda U/2 — zonas per-punto con fill_between."""
-        from core.views.confirmacion import _generar_grafica_confirmacion
+        from core.graficas import grafica_confirmacion_png as _generar_grafica_confirmacion
         fake_png = b'\x89PNG\r\n\x1a\n' + b'\x00' * 100
         mock_ax = MagicMock()
         mock_fig = MagicMock()
@@ -312,7 +316,7 @@ class TestGenerarGraficaConfirmacion:
 
     def test_regla_guard_band_sqrt(self):
         """Banda óptima √(EMP²−U²) — zonas per-punto con fill_between."""
-        from core.views.confirmacion import _generar_grafica_confirmacion
+        from core.graficas import grafica_confirmacion_png as _generar_grafica_confirmacion
         fake_png = b'\x89PNG\r\n\x1a\n' + b'\x00' * 100
         mock_ax = MagicMock()
         mock_fig = MagicMock()
@@ -327,7 +331,7 @@ class TestGenerarGraficaConfirmacion:
 
     def test_regla_conditional(self):
         """Regla condicional — zonas per-punto (verde/gris/rojo) con fill_between."""
-        from core.views.confirmacion import _generar_grafica_confirmacion
+        from core.graficas import grafica_confirmacion_png as _generar_grafica_confirmacion
         fake_png = b'\x89PNG\r\n\x1a\n' + b'\x00' * 100
         mock_ax = MagicMock()
         mock_fig = MagicMock()
@@ -342,7 +346,7 @@ class TestGenerarGraficaConfirmacion:
 
     def test_regla_desconocida_usa_fallback(self):
         """Regla no reconocida — fallback genérico sin excepción."""
-        from core.views.confirmacion import _generar_grafica_confirmacion
+        from core.graficas import grafica_confirmacion_png as _generar_grafica_confirmacion
         fake_png = b'\x89PNG\r\n\x1a\n' + b'\x00' * 100
         mock_ax = MagicMock()
         mock_fig = MagicMock()
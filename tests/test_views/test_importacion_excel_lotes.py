@@ -0,0 +1,132 @@
+"""
+Tests para la importación de equipos desde Excel en lote
+(_process_excel_import en core/views/reports.py).
+"""
+from datetime import date
+from decimal import Decimal
+from io import BytesIO
+
+import pytest
+from openpyxl import Workbook
+
+from core.models import Calibracion, Comprobacion, Equipo, Mantenimiento
+from core.views.reports import _process_excel_import
+from tests.factories import CalibracionFactory, EmpresaFactory, EquipoFactory, UserFactory
+
+COLUMNAS = {
+    'codigo_interno': 1, 'nombre': 2, 'empresa_nombre': 3, 'tipo_equipo': 4, 'marca': 5,
+    'estado': 10, 'fecha_adquisicion': 11, 'fecha_ultima_calibracion': 13,
+    'fecha_ultimo_mantenimiento': 14, 'fecha_ultima_comprobacion': 15,
+    'frecuencia_calibracion_meses': 21, 'frecuencia_mantenimiento_meses': 22,
+    'frecuencia_comprobacion_meses': 23, 'proveedor_calibracion': 24,
+}
+
+
+def _excel(filas):
+    workbook = Workbook()
+    sheet = workbook.active
+    for offset, fila in enumerate(filas):
+        for campo, valor in fila.items():
+            sheet.cell(row=8 + offset, column=COLUMNAS[campo], value=valor)
+    archivo = BytesIO()
+    workbook.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+
+@pytest.fixture
+def empresa():
+    return EmpresaFactory(limite_equipos_empresa=10000, comprobacion_prefijo_consecutivo='CMP')
+
+
+@pytest.fixture
+def usuario(empresa):
+    return UserFactory(empresa=empresa, rol_usuario='ADMINISTRADOR')
+
+
+@pytest.mark.django_db
+class TestImportacionExcelLotes:
+
+    def test_crea_actualiza_y_registra_actividades(self, empresa, usuario):
+        existente = EquipoFactory(empresa=empresa, codigo_interno='EQ-1', nombre='Viejo', marca='Fluke')
+        archivo = _excel([
+            {'codigo_interno': 'EQ-1', 'nombre': 'Balanza', 'frecuencia_calibracion_meses': 12,
+             'fecha_ultima_calibracion': '2025-01-10', 'proveedor_calibracion': 'Metrolab'},
+            {'codigo_interno': 'EQ-2', 'nombre': 'Termómetro', 'fecha_adquisicion': '2024-03-01',
+             'frecuencia_mantenimiento_meses': 6, 'frecuencia_comprobacion_meses': 3,
+             'fecha_ultima_comprobacion': '2025-02-01'},
+            # Código repetido: actualiza el equipo de la fila anterior
+            {'codigo_interno': 'EQ-2', 'nombre': 'Termómetro digital'},
+        ])
+
+        result = _process_excel_import(archivo, usuario)
+
+        assert result['success'] is True
+        assert (result['created'], result['updated'], result['imported']) == (1, 2, 3)
+
+        existente.refresh_from_db()
+        assert existente.nombre == 'Balanza'
+        assert existente.marca == 'Fluke'
+        assert existente.fecha_ultima_calibracion == date(2025, 1, 10)
+        assert existente.proxima_calibracion == date(2026, 1, 10)
+        calibracion = Calibracion.objects.get(equipo=existente)
+        assert calibracion.nombre_proveedor == 'Metrolab'
+        assert calibracion.creado_por == usuario
+
+        nuevo = Equipo.objects.get(empresa=empresa, codigo_interno='EQ-2')
+        assert nuevo.nombre == 'Termómetro digital'
+        assert nuevo.frecuencia_mantenimiento_meses == Decimal('6')
+        assert nuevo.proximo_mantenimiento == date(2024, 9, 1)  # desde la adquisición
+        assert nuevo.proxima_comprobacion == date(2025, 5, 1)
+        comprobacion = Comprobacion.objects.get(equipo=nuevo)
+        assert comprobacion.consecutivo == 1
+        assert comprobacion.consecutivo_texto == 'CMP-001'
+        assert not Mantenimiento.objects.filter(equipo=nuevo).exists()
+
+    def test_historial_posterior_manda_sobre_el_excel(self, empresa, usuario):
+        equipo = EquipoFactory(empresa=empresa, codigo_interno='EQ-1', frecuencia_calibracion_meses=6)
+        CalibracionFactory(equipo=equipo, fecha_calibracion=date(2025, 6, 1))
+
+        _process_excel_import(_excel([
+            {'codigo_interno': 'EQ-1', 'nombre': 'Balanza', 'fecha_ultima_calibracion': '2025-01-10'},
+        ]), usuario)
+
+        equipo.refresh_from_db()
+        assert equipo.calibraciones.count() == 2
+        assert equipo.fecha_ultima_calibracion == date(2025, 6, 1)
+        assert equipo.proxima_calibracion == date(2025, 12, 1)
+
+    def test_fila_invalida_no_detiene_el_lote(self, empresa, usuario):
+        result = _process_excel_import(_excel([
+            {'codigo_interno': 'EQ-1', 'nombre': 'Balanza'},
+            {'codigo_interno': 'EQ-2', 'nombre': 'Pinza', 'marca': 'X' * 150},
+            {'codigo_interno': 'EQ-3', 'nombre': 'Termómetro', 'estado': 'Inventado'},
+            {'codigo_interno': 'EQ-4', 'nombre': 'Manómetro', 'fecha_ultima_calibracion': 'no es fecha'},
+        ]), usuario)
+
+        assert result['created'] == 1
+        assert sorted(Equipo.objects.filter(empresa=empresa).values_list('codigo_interno', flat=True)) == ['EQ-1']
+        assert any(e.startswith('Fila 9: ❌ Error creando equipo') for e in result['errors'])
+        assert any(e.startswith('Fila 10:') for e in result['errors'])
+        assert any(e.startswith('Fila 11:') for e in result['errors'])
+
+    def test_consultas_no_crecen_con_las_filas(self, empresa, usuario, django_assert_max_num_queries):
+        for n in range(50):
+            EquipoFactory(empresa=empresa, codigo_interno=f'EQ-{n:04d}')
+        archivo = _excel([
+            {'codigo_interno': f'EQ-{n:04d}', 'nombre': f'Equipo {n}', 'frecuencia_calibracion_meses': 12,
+             'fecha_ultima_calibracion': '2025-01-10', 'fecha_ultima_comprobacion': '2025-02-10'}
+            for n in range(300)
+        ])
+
+        # SQLite parte los INSERT en lotes pequeños; aun así muy lejos de una consulta por fila
+        with django_assert_max_num_queries(80):
+            result = _process_excel_import(archivo, usuario)
+
+        assert (result['created'], result['updated']) == (250, 50)
+        assert Calibracion.objects.filter(equipo__empresa=empresa).count() == 300
+        assert list(
+            Comprobacion.objects.filter(equipo__empresa=empresa).order_by('consecutivo')
+            .values_list('consecutivo', flat=True)
+        ) == list(range(1, 301))
+        assert not Equipo.objects.filter(empresa=empresa, proxima_calibracion__isnull=True).exists()
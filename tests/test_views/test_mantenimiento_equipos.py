@@ -1193,7 +1193,7 @@ class TestMantenimientoCoberturaBranches:
             kwargs={'equipo_id': empresa_usuario_equipo['equipo'].id}
         )
         with patch('core.views.mantenimiento.render_to_string', return_value='<html></html>'):
-            with patch('core.views.mantenimiento.HTML') as mock_html:
+            with patch('weasyprint.HTML') as mock_html:
                 mock_html.return_value.write_pdf.return_value = b'%PDF-1.4 fake'
                 response = client.post(
                     url,
@@ -1229,7 +1229,7 @@ class TestMantenimientoCoberturaBranches:
             kwargs={'equipo_id': empresa_usuario_equipo['equipo'].id}
         )
         with patch('core.views.mantenimiento.render_to_string', return_value='<html></html>'):
-            with patch('core.views.mantenimiento.HTML') as mock_html:
+            with patch('weasyprint.HTML') as mock_html:
                 mock_html.return_value.write_pdf.return_value = b'%PDF-1.4 fake'
                 response = client.post(
                     url,
@@ -1265,7 +1265,7 @@ class TestMantenimientoCoberturaBranches:
             kwargs={'equipo_id': data['equipo'].id}
         )
         with patch('core.views.mantenimiento.render_to_string', return_value='<html></html>'):
-            with patch('core.views.mantenimiento.HTML') as mock_html:
+            with patch('weasyprint.HTML') as mock_html:
                 mock_html.return_value.write_pdf.return_value = b'%PDF-1.4 fake'
                 response = client.post(
                     url,
@@ -1303,7 +1303,7 @@ class TestMantenimientoCoberturaBranches:
             kwargs={'equipo_id': data['equipo'].id}
         )
         with patch('core.views.mantenimiento.render_to_string', return_value='<html></html>'):
-            with patch('core.views.mantenimiento.HTML') as mock_html:
+            with patch('weasyprint.HTML') as mock_html:
                 mock_html.return_value.write_pdf.return_value = b'%PDF-1.4 fake'
                 response = client.post(
                     url,
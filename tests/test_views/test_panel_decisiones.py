@@ -300,6 +300,31 @@ class TestPanelDecisionesSuperusuario:
         # Verificar que se muestran datos de múltiples empresas
         # (La implementación puede variar según el código)
 
+    def test_panel_superusuario_usa_snapshots(self, client, setup_multiples_empresas):
+        """La vista SAM agrega los snapshots por empresa y muestra su frescura"""
+        from core.models import SnapshotDecisionEmpresa
+        from core.snapshots_decision import calcular_snapshot
+
+        client.login(username='superadmin', password='test123')
+        response = client.get(reverse('core:panel_decisiones'))
+
+        # Sin snapshots no se calcula en el request: las empresas quedan pendientes
+        assert response.status_code == 200
+        assert SnapshotDecisionEmpresa.objects.count() == 0
+        assert len(response.context['empresas_pendientes_snapshot']) == 2
+        assert 'pendientes de cálculo' in response.content.decode()
+
+        for empresa in setup_multiples_empresas['empresas']:
+            calcular_snapshot(empresa)
+        response = client.get(reverse('core:panel_decisiones'))
+
+        context = response.context
+        assert context['empresas_pendientes_snapshot'] == []
+        assert len(context['metricas_por_empresa']) == 2
+        assert context['total_equipos_gestionados'] == 2
+        assert context['snapshots_hasta'] is not None
+        assert [d['empresas'] for d in context['historial_pilares']] == [2]
+
     def test_panel_superusuario_vista_empresa_especifica(self, client, setup_multiples_empresas):
         """Superusuario puede ver panel de una empresa específica"""
         data = setup_multiples_empresas
@@ -1,7 +1,7 @@
 """
 Tests para core/views/scheduled_tasks_api.py
 
-Cubre: verify_token, health_check y los 7 endpoints de tareas programadas.
+Cubre: verify_token, health_check y los 8 endpoints de tareas programadas.
 """
 import json
 import pytest
@@ -312,3 +312,34 @@ class TestTriggerCobrarRenovaciones:
     def test_exception_returns_500(self, mock_cmd):
         response = _post_with_token(self.URL)
         assert response.status_code == 500
+
+
+# ---------------------------------------------------------------------------
+# trigger_email_outbox
+# ---------------------------------------------------------------------------
+
+class TestTriggerEmailOutbox:
+
+    URL = 'trigger_email_outbox'
+
+    @patch('core.views.scheduled_tasks_api.SCHEDULED_TASKS_TOKEN', VALID_TOKEN)
+    def test_no_token_returns_401(self):
+        client = Client()
+        response = client.post(reverse(f'core:{self.URL}'))
+        assert response.status_code == 401
+
+    @pytest.mark.django_db
+    @patch('core.views.scheduled_tasks_api.SCHEDULED_TASKS_TOKEN', VALID_TOKEN)
+    def test_valid_token_returns_200(self):
+        response = _post_with_token(self.URL)
+        assert response.status_code == 200
+        data = json.loads(response.content)
+        assert data['success'] is True
+        assert data['task'] == 'email_outbox'
+        assert data['run']['enviados'] == 0
+
+    @patch('core.views.scheduled_tasks_api.SCHEDULED_TASKS_TOKEN', VALID_TOKEN)
+    @patch('core.email_outbox.drenar', side_effect=Exception('smtp error'))
+    def test_exception_returns_500(self, mock_drenar):
+        response = _post_with_token(self.URL)
+        assert response.status_code == 500
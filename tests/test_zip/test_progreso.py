@@ -0,0 +1,169 @@
+"""
+Tests para el canal de progreso por usuario (core/progreso.py) y su uso en
+zip_progress_api / notifications_api.
+"""
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import progreso
+from core.models import NotificacionZip, ZipRequest
+from core.zip_queue import _actualizar_progreso, reclamar_siguiente
+from tests.factories import EmpresaFactory, UserFactory
+
+
+@pytest.fixture
+def canal():
+    """Canal activo: la LocMem de los tests hace de caché compartida."""
+    cache.clear()
+    with patch('core.progreso.canal_compartido', return_value=True):
+        yield
+    cache.clear()
+
+
+@pytest.fixture
+def usuario(db):
+    return UserFactory(empresa=EmpresaFactory())
+
+
+def _solicitud(user, posicion=1, **kwargs):
+    return ZipRequest.objects.create(
+        user=user,
+        empresa=user.empresa,
+        position_in_queue=posicion,
+        expires_at=timezone.now() + timedelta(hours=6),
+        **kwargs,
+    )
+
+
+def _consultas_a(tabla, contexto):
+    return [q['sql'] for q in contexto.captured_queries if tabla in q['sql']]
+
+
+class TestCanal:
+
+    def test_locmem_desactiva_el_canal(self, settings):
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        assert not progreso.canal_compartido()
+        assert progreso.version(1) is None
+
+        settings.CACHES = {'default': {'BACKEND': 'django_redis.cache.RedisCache'}}
+        assert progreso.canal_compartido()
+        settings.PROGRESO_CONFIG = {'ACTIVO': False}
+        assert not progreso.canal_compartido()
+
+    @pytest.mark.django_db
+    def test_publicar_al_confirmar_cambia_la_version(self, canal, django_capture_on_commit_callbacks):
+        inicial = progreso.version(7, 'zip')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            progreso.publicar(7, 'zip')
+            assert progreso.version(7, 'zip') == inicial
+
+        assert progreso.version(7, 'zip') == inicial + 1
+
+    @pytest.mark.django_db
+    def test_version_perdida_no_coincide_con_la_del_cliente(self, canal):
+        anterior = progreso.version(7, 'zip')
+        cache.delete(f'{progreso.PREFIJO}zip:7')
+
+        with patch('core.progreso.time.time', return_value=anterior / 1000 + 1):
+            assert progreso.version(7, 'zip') != anterior
+
+    @pytest.mark.django_db
+    def test_esperar_cambio_respeta_el_maximo(self, canal, settings):
+        settings.PROGRESO_CONFIG = {'ESPERA_MAX_SEGUNDOS': 1, 'INTERVALO_ESPERA': 0.01}
+        actual = progreso.version(7, 'zip')
+
+        with patch('core.progreso.time.sleep', side_effect=lambda s: progreso._publicar_ahora(7, 'zip')) as dormir:
+            assert progreso.esperar_cambio(7, 'zip', actual, 30) == actual + 1
+        dormir.assert_called_once()
+
+
+@pytest.mark.django_db
+class TestPublicadores:
+
+    def test_worker_y_signals_publican(self, canal, usuario, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            solicitud = _solicitud(usuario)
+        inicial = progreso.version(usuario.pk, 'zip')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            reclamada = reclamar_siguiente('worker-a')
+        tras_reclamo = progreso.version(usuario.pk, 'zip')
+        assert reclamada.pk == solicitud.pk and tras_reclamo > inicial
+
+        with django_capture_on_commit_callbacks(execute=True):
+            _actualizar_progreso(reclamada, 'worker-a', 1, 3, 'EQ-1')
+        assert progreso.version(usuario.pk, 'zip') > tras_reclamo
+
+        notificaciones = progreso.version(usuario.pk, 'notificaciones')
+        with django_capture_on_commit_callbacks(execute=True):
+            NotificacionZip.objects.create(
+                user=usuario, zip_request=solicitud, tipo='zip_ready', titulo='Listo', mensaje='ok'
+            )
+        assert progreso.version(usuario.pk, 'notificaciones') > notificaciones
+
+
+@pytest.mark.django_db
+class TestAPIs:
+
+    def test_sin_cambios_no_consulta_solicitudes(self, canal, client, usuario):
+        _solicitud(usuario)
+        client.force_login(usuario)
+
+        primera = client.get(reverse('core:zip_progress_api')).json()
+        assert primera['total_active'] == 1 and primera['reintentar_ms'] > 0
+
+        with CaptureQueriesContext(connection) as contexto:
+            segunda = client.get(reverse('core:zip_progress_api'), {'version': primera['version']}).json()
+
+        assert segunda == {
+            'success': True, 'sin_cambios': True,
+            'version': primera['version'], 'reintentar_ms': primera['reintentar_ms'],
+        }
+        assert not _consultas_a('core_ziprequest', contexto)
+
+    def test_cambio_devuelve_datos_nuevos(self, canal, client, usuario, django_capture_on_commit_callbacks):
+        client.force_login(usuario)
+        primera = client.get(reverse('core:notifications_api')).json()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            NotificacionZip.objects.create(
+                user=usuario, zip_request=_solicitud(usuario), tipo='zip_ready', titulo='Listo', mensaje='ok'
+            )
+        segunda = client.get(reverse('core:notifications_api'), {'version': primera['version']}).json()
+
+        assert 'sin_cambios' not in segunda
+        assert segunda['unread_count'] == 1 and segunda['version'] != primera['version']
+
+    def test_sin_canal_responde_siempre_desde_la_bd(self, client, usuario, settings):
+        settings.PROGRESO_CONFIG = {'ACTIVO': False}
+        _solicitud(usuario)
+        client.force_login(usuario)
+
+        data = client.get(reverse('core:zip_progress_api'), {'version': '123'}).json()
+
+        assert data['total_active'] == 1 and data['version'] is None
+        assert data['reintentar_ms'] == progreso.DEFAULT_REINTENTO_SIN_CANAL_MS
+
+    def test_empresa_sin_consultas_por_fila(self, client, usuario):
+        client.force_login(usuario)
+        _solicitud(usuario, 1)
+        with CaptureQueriesContext(connection) as una:
+            client.get(reverse('core:zip_progress_api'))
+
+        _solicitud(usuario, 2)
+        _solicitud(usuario, 3)
+        with CaptureQueriesContext(connection) as tres:
+            assert client.get(reverse('core:zip_progress_api')).json()['total_active'] == 3
+
+        # La empresa viene en la misma consulta de las solicitudes
+        assert len(_consultas_a('core_ziprequest', tres)) == len(_consultas_a('core_ziprequest', una)) == 1
+        assert _consultas_a('core_empresa', tres) == _consultas_a('core_ziprequest', tres)
@@ -0,0 +1,103 @@
+"""
+Tests para el pipeline de render de OptimizedZipGenerator (core/zip_optimizer.py).
+"""
+import os
+import random
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from core.zip_optimizer import OptimizedZipGenerator
+from tests.factories import UserFactory, EmpresaFactory, EquipoFactory
+
+
+def _render_falso():
+    """Render sustituto: bytes deterministas por equipo y orden de llegada aleatorio."""
+
+    def _render(equipo_id, formatos):
+        time.sleep(random.uniform(0, 0.02))
+        return {
+            'hoja_vida': f'PDF-{equipo_id}'.encode() if 'hoja_vida' in formatos else None,
+            'manual': None,
+        }
+
+    return _render
+
+
+@pytest.fixture
+def empresa_con_equipos(db):
+    empresa = EmpresaFactory()
+    equipos = [EquipoFactory(empresa=empresa, codigo_interno=f'EQ-{i:03d}') for i in range(12)]
+    return empresa, equipos
+
+
+def _generar(empresa, formatos=('hoja_vida',)):
+    generador = OptimizedZipGenerator(empresa, list(formatos), UserFactory(empresa=empresa))
+    resultado = generador.generate_streaming_zip()
+    assert resultado['success'], resultado
+    with zipfile.ZipFile(resultado['file_path']) as zf:
+        contenido = {n: zf.read(n) for n in zf.namelist()}
+        nombres = zf.namelist()
+    os.unlink(resultado['file_path'])
+    return nombres, contenido
+
+
+@pytest.mark.django_db
+class TestPipelineRender:
+
+    def test_pool_escribe_en_orden_determinista(self, empresa_con_equipos, settings):
+        empresa, equipos = empresa_con_equipos
+        settings.ZIP_RENDER_CONFIG = {'PROCESOS': 4, 'MAX_EN_VUELO': 3}
+
+        with patch.object(OptimizedZipGenerator, '_crear_pool_render', lambda self: ThreadPoolExecutor(4)), \
+                patch('core.zip_optimizer.renderizar_artefactos_equipo', _render_falso()):
+            nombres, contenido = _generar(empresa)
+
+        hojas = [n for n in nombres if 'Hoja_Vida' in n]
+        assert hojas == [
+            f"Equipos/{e.codigo_interno}_{e.nombre}/Hoja_Vida_{e.codigo_interno}.pdf"
+            for e in empresa.equipos.all()
+        ]
+        for equipo in equipos:
+            ruta = f"Equipos/{equipo.codigo_interno}_{equipo.nombre}/Hoja_Vida_{equipo.codigo_interno}.pdf"
+            assert contenido[ruta] == f'PDF-{equipo.pk}'.encode()
+
+    def test_backpressure_limita_renders_pendientes(self, empresa_con_equipos, settings):
+        empresa, _ = empresa_con_equipos
+        settings.ZIP_RENDER_CONFIG = {'PROCESOS': 4, 'MAX_EN_VUELO': 2}
+        lanzados = []
+        escritos = []
+        maximo_pendientes = []
+        escribir_original = OptimizedZipGenerator._escribir_equipo
+
+        def _escribir(self, zip_file, posicion, equipo, artefactos):
+            escribir_original(self, zip_file, posicion, equipo, artefactos)
+            escritos.append(equipo.pk)
+
+        def _render(equipo_id, formatos):
+            maximo_pendientes.append(len(lanzados) - len(escritos))
+            lanzados.append(equipo_id)
+            return {'hoja_vida': b'PDF', 'manual': None}
+
+        with patch.object(OptimizedZipGenerator, '_crear_pool_render', lambda self: ThreadPoolExecutor(4)), \
+                patch.object(OptimizedZipGenerator, '_escribir_equipo', _escribir), \
+                patch('core.zip_optimizer.renderizar_artefactos_equipo', _render):
+            _generar(empresa)
+
+        assert len(escritos) == 12
+        # MAX_EN_VUELO futuros + cola del escritor (2) + el que se está escribiendo
+        assert max(maximo_pendientes) <= 2 + 2 + 1
+
+    def test_sin_pool_renderiza_en_el_proceso(self, empresa_con_equipos, settings):
+        empresa, equipos = empresa_con_equipos
+        settings.ZIP_RENDER_CONFIG = {'PROCESOS': 1}
+
+        with patch('core.zip_optimizer._generar_pdf_equipo', lambda equipo: f'PDF-{equipo.pk}'.encode()), \
+                patch('core.zip_optimizer.ProcessPoolExecutor') as mock_pool:
+            nombres, _ = _generar(empresa)
+
+        mock_pool.assert_not_called()
+        assert len([n for n in nombres if 'Hoja_Vida' in n]) == len(equipos)
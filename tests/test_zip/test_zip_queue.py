@@ -0,0 +1,177 @@
+"""
+Tests para la cola de ZIPs con leases en BD (core/zip_queue.py).
+"""
+import pytest
+from datetime import timedelta
+from unittest.mock import patch
+from django.core.management import call_command
+from django.utils import timezone
+
+from core.models import ZipRequest, NotificacionZip
+from core.zip_queue import (
+    reclamar_siguiente,
+    renovar_lease,
+    recuperar_estancados,
+    ejecutar_trabajo,
+)
+from tests.factories import UserFactory, EmpresaFactory
+
+GENERADOR = 'core.async_zip_improved.AsyncZipProcessor._generate_zip_with_original_structure'
+
+RESULTADO_OK = {
+    'success': True,
+    'file_path': 'zips/test.zip',
+    'file_size': 1024,
+    'file_size_mb': 0.0,
+}
+
+
+def _solicitud(empresa, posicion, **kwargs):
+    user = kwargs.pop('user', None) or UserFactory(empresa=empresa)
+    return ZipRequest.objects.create(
+        user=user,
+        empresa=empresa,
+        position_in_queue=posicion,
+        expires_at=timezone.now() + timedelta(hours=6),
+        **kwargs,
+    )
+
+
+@pytest.mark.django_db
+class TestReclamarSiguiente:
+
+    def test_reclamo_toma_lease(self):
+        empresa = EmpresaFactory()
+        solicitud = _solicitud(empresa, 1)
+
+        reclamada = reclamar_siguiente('worker-a')
+
+        assert reclamada.pk == solicitud.pk
+        assert reclamada.status == 'processing'
+        assert reclamada.worker_id == 'worker-a'
+        assert reclamada.attempts == 1
+        assert reclamada.lease_expires_at > timezone.now()
+
+    def test_dos_workers_no_reclaman_la_misma(self):
+        empresa = EmpresaFactory()
+        primera = _solicitud(empresa, 1)
+        segunda = _solicitud(empresa, 2)
+
+        a = reclamar_siguiente('worker-a')
+        b = reclamar_siguiente('worker-b')
+
+        assert {a.pk, b.pk} == {primera.pk, segunda.pk}
+        assert reclamar_siguiente('worker-c') is None
+
+    def test_prioriza_empresa_con_menos_trabajos_en_curso(self):
+        grande = EmpresaFactory()
+        pequena = EmpresaFactory()
+        _solicitud(grande, 1)
+        _solicitud(grande, 2)
+        _solicitud(grande, 3)
+        solicitud_pequena = _solicitud(pequena, 4)
+
+        reclamar_siguiente('worker-a')  # grande, posición 1
+        segunda = reclamar_siguiente('worker-b')
+
+        assert segunda.pk == solicitud_pequena.pk
+
+    def test_limite_de_trabajos_por_empresa(self, settings):
+        settings.ZIP_QUEUE_CONFIG = {'MAX_JOBS_PER_EMPRESA': 1}
+        empresa = EmpresaFactory()
+        _solicitud(empresa, 1)
+        _solicitud(empresa, 2)
+
+        assert reclamar_siguiente('worker-a') is not None
+        assert reclamar_siguiente('worker-b') is None
+
+
+@pytest.mark.django_db
+class TestLeases:
+
+    def test_renovar_lease_solo_para_el_dueno(self):
+        _solicitud(EmpresaFactory(), 1)
+        reclamada = reclamar_siguiente('worker-a')
+
+        assert renovar_lease(reclamada.pk, 'worker-a') is True
+        assert renovar_lease(reclamada.pk, 'worker-b') is False
+
+    def test_lease_expirado_vuelve_a_la_cola(self):
+        _solicitud(EmpresaFactory(), 1)
+        reclamada = reclamar_siguiente('worker-a')
+        ZipRequest.objects.filter(pk=reclamada.pk).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        resultado = recuperar_estancados()
+
+        assert resultado == {'reencoladas': 1, 'fallidas': 0}
+        otra_vez = reclamar_siguiente('worker-b')
+        assert otra_vez.pk == reclamada.pk
+        assert otra_vez.attempts == 2
+
+    def test_agotar_intentos_marca_fallida_y_notifica(self, settings):
+        settings.ZIP_QUEUE_CONFIG = {'MAX_ATTEMPTS': 1}
+        _solicitud(EmpresaFactory(), 1)
+        reclamada = reclamar_siguiente('worker-a')
+        ZipRequest.objects.filter(pk=reclamada.pk).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        resultado = recuperar_estancados()
+
+        assert resultado == {'reencoladas': 0, 'fallidas': 1}
+        reclamada.refresh_from_db()
+        assert reclamada.status == 'failed'
+        assert NotificacionZip.objects.filter(zip_request=reclamada, tipo='zip_failed').exists()
+
+
+@pytest.mark.django_db
+class TestEjecutarTrabajo:
+
+    def test_trabajo_completado(self):
+        _solicitud(EmpresaFactory(), 1)
+        reclamada = reclamar_siguiente('worker-a')
+
+        with patch(GENERADOR, return_value=RESULTADO_OK):
+            assert ejecutar_trabajo(reclamada, 'worker-a') is True
+
+        reclamada.refresh_from_db()
+        assert reclamada.status == 'completed'
+        assert reclamada.file_path == 'zips/test.zip'
+        assert reclamada.progress_percentage == 100
+        assert NotificacionZip.objects.filter(zip_request=reclamada, tipo='zip_ready').exists()
+
+    def test_error_de_generacion_marca_fallida(self):
+        _solicitud(EmpresaFactory(), 1)
+        reclamada = reclamar_siguiente('worker-a')
+
+        with patch(GENERADOR, return_value={'success': False, 'error': 'sin espacio'}):
+            assert ejecutar_trabajo(reclamada, 'worker-a') is False
+
+        reclamada.refresh_from_db()
+        assert reclamada.status == 'failed'
+        assert reclamada.error_message == 'sin espacio'
+
+    def test_resultado_descartado_si_se_perdio_el_lease(self):
+        _solicitud(EmpresaFactory(), 1)
+        reclamada = reclamar_siguiente('worker-a')
+        ZipRequest.objects.filter(pk=reclamada.pk).update(worker_id='worker-b')
+
+        with patch(GENERADOR, return_value=RESULTADO_OK), \
+                patch('core.zip_queue._borrar_archivo_huerfano') as mock_borrar:
+            assert ejecutar_trabajo(reclamada, 'worker-a') is False
+
+        mock_borrar.assert_called_once_with('zips/test.zip')
+        reclamada.refresh_from_db()
+        assert reclamada.status == 'processing'
+        assert reclamada.worker_id == 'worker-b'
+
+    def test_comando_procesa_la_cola(self):
+        solicitud = _solicitud(EmpresaFactory(), 1)
+
+        with patch(GENERADOR, return_value=RESULTADO_OK):
+            call_command('process_zip_queue', '--max-iterations', '1', '--check-interval', '0')
+
+        solicitud.refresh_from_db()
+        assert solicitud.status == 'completed'
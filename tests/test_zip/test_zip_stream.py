@@ -0,0 +1,92 @@
+"""
+Tests para la escritura de ZIP en streaming (core/zip_stream.py).
+"""
+import io
+import os
+import zipfile
+from unittest.mock import patch
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+from core.zip_optimizer import OptimizedZipGenerator
+from core.zip_stream import ZipStream, CHUNK_LOCAL
+from tests.factories import UserFactory, EmpresaFactory, EquipoFactory
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = FileSystemStorage(location=str(tmp_path))
+    with patch('core.zip_stream.default_storage', storage):
+        yield storage
+
+
+def _consumir(generador):
+    return list(generador)
+
+
+class TestZipStream:
+
+    def test_zip_valido_con_bytes_y_storage(self, storage):
+        storage.save('docs/cert.pdf', ContentFile(b'%PDF-certificado'))
+        zs = ZipStream()
+
+        chunks = _consumir(zs.agregar_bytes('a/informe.txt', 'hola'))
+        chunks += _consumir(zs.agregar_storage('a/cert.pdf', 'docs/cert.pdf'))
+        chunks += _consumir(zs.cerrar())
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as zf:
+            assert zf.testzip() is None
+            assert zf.read('a/informe.txt') == b'hola'
+            assert zf.read('a/cert.pdf') == b'%PDF-certificado'
+
+    def test_archivo_grande_se_entrega_por_chunks(self, storage):
+        contenido = os.urandom(CHUNK_LOCAL * 8)  # incompresible
+        storage.save('grande.bin', ContentFile(contenido))
+        zs = ZipStream()
+
+        chunks = _consumir(zs.agregar_storage('grande.bin', 'grande.bin'))
+        chunks += _consumir(zs.cerrar())
+
+        assert len(chunks) >= 8
+        assert max(len(c) for c in chunks) < CHUNK_LOCAL * 2
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as zf:
+            assert zf.read('grande.bin') == contenido
+
+    def test_archivo_inexistente_no_crea_entrada(self, storage):
+        zs = ZipStream()
+
+        agregado = []
+
+        def _agregar():
+            agregado.append((yield from zs.agregar_storage('falta.pdf', 'no/existe.pdf')))
+
+        chunks = _consumir(_agregar()) + _consumir(zs.cerrar())
+
+        assert agregado == [False]
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as zf:
+            assert zf.namelist() == []
+
+
+@pytest.mark.django_db
+class TestOptimizedZipStreaming:
+
+    def test_streaming_igual_que_archivo(self, settings):
+        settings.ZIP_RENDER_CONFIG = {'PROCESOS': 1}
+        empresa = EmpresaFactory()
+        for i in range(3):
+            EquipoFactory(empresa=empresa, codigo_interno=f'EQ-{i:03d}')
+        user = UserFactory(empresa=empresa)
+
+        with patch('core.zip_optimizer._generar_pdf_equipo', lambda equipo: f'PDF-{equipo.pk}'.encode()):
+            datos = b''.join(OptimizedZipGenerator(empresa, ['hoja_vida'], user).iterar_zip_stream())
+            generador = OptimizedZipGenerator(empresa, ['hoja_vida'], user)
+            resultado = generador.generate_streaming_zip()
+
+        with zipfile.ZipFile(resultado['file_path']) as zf:
+            nombres_archivo = zf.namelist()
+        os.unlink(resultado['file_path'])
+        with zipfile.ZipFile(io.BytesIO(datos)) as zf:
+            assert zf.testzip() is None
+            assert zf.namelist() == nombres_archivo